@@ -0,0 +1,167 @@
+"""Partition audit_logs by month on created_at
+
+Revision ID: partition_audit_logs
+Revises: salary_schema_update
+Create Date: 2026-10-18
+
+Converts audit_logs into a RANGE-partitioned table with one partition per
+month (audit_logs_pYYYYMM) plus a default partition. Retention then drops
+whole partitions instead of DELETEing rows, and summary queries bounded by
+created_at only touch the partitions in their window.
+
+New partitions are created ahead of time by the
+maintain_audit_log_partitions Celery task.
+
+The user_id foreign key and every secondary index of the old table (the
+model's ix_audit_logs_* indexes and those added by earlier migrations) are
+recreated on the new parent under their existing names.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'partition_audit_logs'
+down_revision = 'salary_schema_update'
+branch_labels = None
+depends_on = None
+
+
+def _move_indexes(source: str, target: str) -> None:
+    """Drop ``source`` and recreate its secondary indexes on ``target``.
+
+    Index names are unique per schema, so the definitions are captured and
+    the old table dropped before they are replayed on the new one.
+    """
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            definitions text[];
+            definition text;
+        BEGIN
+            SELECT COALESCE(array_agg(pg_get_indexdef(i.indexrelid)), '{{}}')
+              INTO definitions
+              FROM pg_index i
+             WHERE i.indrelid = '{source}'::regclass
+               AND NOT i.indisprimary
+               AND NOT EXISTS (
+                   SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid
+               );
+            EXECUTE 'DROP TABLE {source}';
+            FOREACH definition IN ARRAY definitions LOOP
+                EXECUTE regexp_replace(
+                    definition,
+                    ' ON (ONLY )?((\\S+\\.)?){source} ',
+                    ' ON \\2{target} '
+                );
+            END LOOP;
+        END $$;
+        """
+    )
+
+
+def _add_user_fk() -> None:
+    op.execute(
+        "ALTER TABLE audit_logs ADD CONSTRAINT audit_logs_user_id_fkey "
+        "FOREIGN KEY (user_id) REFERENCES users (id)"
+    )
+
+
+def _create_model_indexes() -> None:
+    op.execute("CREATE INDEX IF NOT EXISTS ix_audit_logs_id ON audit_logs (id)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_audit_logs_action ON audit_logs (action)")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_audit_logs_resource_type ON audit_logs (resource_type)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_audit_logs_resource_id ON audit_logs (resource_id)"
+    )
+
+
+def upgrade() -> None:
+    # The partition key must be part of the primary key and cannot be NULL
+    op.execute("UPDATE audit_logs SET created_at = now() WHERE created_at IS NULL")
+
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_legacy")
+    op.execute(
+        "ALTER TABLE audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey"
+    )
+    op.execute(
+        """
+        CREATE TABLE audit_logs (
+            LIKE audit_logs_legacy INCLUDING DEFAULTS INCLUDING COMMENTS
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("ALTER TABLE audit_logs ALTER COLUMN created_at SET NOT NULL")
+    op.execute("ALTER TABLE audit_logs ADD PRIMARY KEY (id, created_at)")
+    op.execute("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT")
+
+    # One partition per month from the oldest row up to three months ahead
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month_start date;
+            last_month date := date_trunc('month', now() + interval '3 months')::date;
+        BEGIN
+            SELECT COALESCE(date_trunc('month', min(created_at)), date_trunc('month', now()))::date
+              INTO month_start FROM audit_logs_legacy;
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF audit_logs FOR VALUES FROM (%L) TO (%L)',
+                    'audit_logs_p' || to_char(month_start, 'YYYYMM'),
+                    month_start,
+                    (month_start + interval '1 month')::date
+                );
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+        END $$;
+        """
+    )
+
+    op.execute("INSERT INTO audit_logs SELECT * FROM audit_logs_legacy")
+
+    # Keep the id sequence alive when the legacy table is dropped
+    op.execute(
+        "ALTER SEQUENCE IF EXISTS audit_logs_id_seq OWNED BY audit_logs.id"
+    )
+
+    # Indexes on the parent cascade to every partition
+    _move_indexes("audit_logs_legacy", "audit_logs")
+    _add_user_fk()
+
+    # Model indexes, in case the old table predates them
+    _create_model_indexes()
+    op.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_created_at ON audit_logs (created_at)")
+    op.execute("CREATE INDEX ix_audit_logs_action_created ON audit_logs (action, created_at)")
+    op.execute(
+        "CREATE INDEX ix_audit_logs_resource ON audit_logs (resource_type, resource_id, created_at)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_partitioned")
+    op.execute(
+        "ALTER TABLE audit_logs_partitioned "
+        "RENAME CONSTRAINT audit_logs_pkey TO audit_logs_partitioned_pkey"
+    )
+    op.execute(
+        """
+        CREATE TABLE audit_logs (
+            LIKE audit_logs_partitioned INCLUDING DEFAULTS INCLUDING COMMENTS
+        )
+        """
+    )
+    op.execute("INSERT INTO audit_logs SELECT * FROM audit_logs_partitioned")
+    op.execute("ALTER TABLE audit_logs ADD PRIMARY KEY (id)")
+    op.execute(
+        "ALTER SEQUENCE IF EXISTS audit_logs_id_seq OWNED BY audit_logs.id"
+    )
+    _move_indexes("audit_logs_partitioned", "audit_logs")
+    _add_user_fk()
+    _create_model_indexes()
+
+    # Only needed for partition-bounded summary queries
+    op.execute("DROP INDEX IF EXISTS ix_audit_logs_action_created")
+    op.execute("DROP INDEX IF EXISTS ix_audit_logs_resource")
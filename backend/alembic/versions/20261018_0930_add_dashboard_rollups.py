@@ -0,0 +1,56 @@
+"""Add dashboard_rollups aggregate table
+
+Revision ID: dashboard_rollups
+Revises: partition_audit_logs
+Create Date: 2026-10-18
+
+Pre-aggregated per-organization dashboard counts (current state plus daily
+and hourly buckets). Maintained by refresh_dashboard_rollups_task; the
+dashboard endpoints read only this table.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dashboard_rollups'
+down_revision = 'partition_audit_logs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'dashboard_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('organization_id', sa.Integer(), nullable=False,
+                  comment='Organization ID for multi-tenant isolation'),
+        sa.Column('period', sa.String(10), nullable=False, comment='current, day or hour'),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False,
+                  comment='Bucket start (UTC)'),
+        sa.Column('metric', sa.String(50), nullable=False,
+                  comment='e.g. courier_status, delivery_status'),
+        sa.Column('dimension', sa.String(100), nullable=False, server_default='',
+                  comment="Dimension value ('' when none)"),
+        sa.Column('count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('total', sa.Numeric(20, 4), nullable=False, server_default='0',
+                  comment='Sum for averaged metrics'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('organization_id', 'period', 'bucket_start', 'metric', 'dimension',
+                            name='uq_dashboard_rollups_bucket'),
+    )
+    op.create_index('ix_dashboard_rollups_id', 'dashboard_rollups', ['id'])
+    op.create_index('ix_dashboard_rollups_organization_id', 'dashboard_rollups',
+                    ['organization_id'])
+    op.create_index('ix_dashboard_rollups_org_period_bucket', 'dashboard_rollups',
+                    ['organization_id', 'period', 'bucket_start'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dashboard_rollups_org_period_bucket', table_name='dashboard_rollups')
+    op.drop_index('ix_dashboard_rollups_organization_id', table_name='dashboard_rollups')
+    op.drop_index('ix_dashboard_rollups_id', table_name='dashboard_rollups')
+    op.drop_table('dashboard_rollups')
@@ -0,0 +1,31 @@
+"""Add partial claim index on priority_queue_entries
+
+Revision ID: priority_queue_claim_index
+Revises: dashboard_rollups
+Create Date: 2026-10-18
+
+Supports workers claiming the next queued entries in priority order with
+SELECT ... FOR UPDATE SKIP LOCKED. Only QUEUED rows are indexed.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'priority_queue_claim_index'
+down_revision = 'dashboard_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_priority_queue_entries_claim',
+        'priority_queue_entries',
+        ['organization_id', sa.text('total_priority_score DESC'), 'queued_at', 'id'],
+        postgresql_where=sa.text("status = 'QUEUED'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_priority_queue_entries_claim', table_name='priority_queue_entries')
@@ -0,0 +1,59 @@
+"""Add priority_sort_key to priority_queue_entries
+
+Revision ID: priority_sort_key
+Revises: priority_queue_claim_index
+Create Date: 2026-10-18
+
+Time-invariant ordering key computed from the organization's scoring policy
+(see app/services/operations/priority_scoring.py). Queued rows are backfilled
+with the default linear aging policy; the claim index moves to the new key.
+Re-key after changing PRIORITY_QUEUE_SCORING_POLICY with
+rescore_priority_queue_task.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'priority_sort_key'
+down_revision = 'priority_queue_claim_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'priority_queue_entries',
+        sa.Column('priority_sort_key', sa.Float(), nullable=True,
+                  comment='Time-invariant queue order key from the org scoring policy'),
+    )
+
+    # LinearAgingPolicy defaults: 10/hour for age and for deadline urgency
+    op.execute(
+        """
+        UPDATE priority_queue_entries
+        SET priority_sort_key = total_priority_score
+            - 10 * EXTRACT(EPOCH FROM queued_at) / 3600
+            - 10 * EXTRACT(EPOCH FROM sla_deadline) / 3600
+        WHERE status = 'QUEUED'
+        """
+    )
+
+    op.drop_index('ix_priority_queue_entries_claim', table_name='priority_queue_entries')
+    op.create_index(
+        'ix_priority_queue_entries_claim',
+        'priority_queue_entries',
+        ['organization_id', sa.text('priority_sort_key DESC'), 'queued_at', 'id'],
+        postgresql_where=sa.text("status = 'QUEUED'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_priority_queue_entries_claim', table_name='priority_queue_entries')
+    op.create_index(
+        'ix_priority_queue_entries_claim',
+        'priority_queue_entries',
+        ['organization_id', sa.text('total_priority_score DESC'), 'queued_at', 'id'],
+        postgresql_where=sa.text("status = 'QUEUED'"),
+    )
+    op.drop_column('priority_queue_entries', 'priority_sort_key')
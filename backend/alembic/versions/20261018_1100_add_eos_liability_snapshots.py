@@ -0,0 +1,55 @@
+"""Add eos_liability_snapshots table
+
+Revision ID: eos_liability_snapshots
+Revises: priority_sort_key
+Create Date: 2026-10-18
+
+Monthly organization-wide End of Service liability totals, written by
+EOSLiabilityService and read by the finance dashboards.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'eos_liability_snapshots'
+down_revision = 'priority_sort_key'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'eos_liability_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('organization_id', sa.Integer(), nullable=False,
+                  comment='Organization ID for multi-tenant isolation'),
+        sa.Column('month', sa.Date(), nullable=False, comment='First day of the snapshot month'),
+        sa.Column('as_of_date', sa.Date(), nullable=False,
+                  comment='Service end date used for the calculation'),
+        sa.Column('courier_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total_liability', sa.Numeric(16, 2), nullable=False, server_default='0',
+                  comment='SAR'),
+        sa.Column('defaulted_salary_count', sa.Integer(), nullable=False, server_default='0',
+                  comment='Couriers without a salary record'),
+        sa.Column('breakdown', sa.JSON(), nullable=False, comment='By status and service band'),
+        sa.Column('computed_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('organization_id', 'month', name='uq_eos_liability_snapshots_month'),
+    )
+    op.create_index('ix_eos_liability_snapshots_id', 'eos_liability_snapshots', ['id'])
+    op.create_index('ix_eos_liability_snapshots_organization_id', 'eos_liability_snapshots',
+                    ['organization_id'])
+    op.create_index('ix_eos_liability_snapshots_org_month', 'eos_liability_snapshots',
+                    ['organization_id', 'month'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_eos_liability_snapshots_org_month', table_name='eos_liability_snapshots')
+    op.drop_index('ix_eos_liability_snapshots_organization_id',
+                  table_name='eos_liability_snapshots')
+    op.drop_index('ix_eos_liability_snapshots_id', table_name='eos_liability_snapshots')
+    op.drop_table('eos_liability_snapshots')
@@ -0,0 +1,89 @@
+"""Add feedback_daily_rollups table
+
+Revision ID: feedback_daily_rollups
+Revises: eos_liability_snapshots
+Create Date: 2026-10-18
+
+Additive customer feedback aggregates per (organization, day, courier,
+category), maintained by FeedbackRollupService and read by the feedback
+metrics and courier summary endpoints.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'feedback_daily_rollups'
+down_revision = 'eos_liability_snapshots'
+branch_labels = None
+depends_on = None
+
+COUNT_COLUMNS = (
+    'feedback_count',
+    'rating_sum',
+    'rating_count',
+    'delivery_speed_sum',
+    'delivery_speed_count',
+    'courier_behavior_sum',
+    'courier_behavior_count',
+    'package_condition_sum',
+    'package_condition_count',
+    'communication_sum',
+    'communication_count',
+    'rating_1_count',
+    'rating_2_count',
+    'rating_3_count',
+    'rating_4_count',
+    'rating_5_count',
+    'positive_count',
+    'neutral_count',
+    'negative_count',
+    'complaint_count',
+    'compliment_count',
+    'escalated_count',
+    'responded_count',
+    'response_hours_count',
+    'resolved_count',
+    'satisfaction_sum',
+    'satisfaction_count',
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'feedback_daily_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('organization_id', sa.Integer(), nullable=False,
+                  comment='Organization ID for multi-tenant isolation'),
+        sa.Column('day', sa.Date(), nullable=False, comment='Submission day (UTC)'),
+        sa.Column('courier_id', sa.Integer(), nullable=False, server_default='0',
+                  comment='0 when no courier'),
+        sa.Column('category', sa.String(length=100), nullable=False, server_default='',
+                  comment="'' when uncategorized"),
+        *[
+            sa.Column(name, sa.Integer(), nullable=False, server_default='0')
+            for name in COUNT_COLUMNS
+        ],
+        sa.Column('response_hours_sum', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('organization_id', 'day', 'courier_id', 'category',
+                            name='uq_feedback_daily_rollups_bucket'),
+    )
+    op.create_index('ix_feedback_daily_rollups_id', 'feedback_daily_rollups', ['id'])
+    op.create_index('ix_feedback_daily_rollups_organization_id', 'feedback_daily_rollups',
+                    ['organization_id'])
+    op.create_index('ix_feedback_daily_rollups_org_day', 'feedback_daily_rollups',
+                    ['organization_id', 'day'])
+    op.create_index('ix_feedback_daily_rollups_org_courier', 'feedback_daily_rollups',
+                    ['organization_id', 'courier_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_feedback_daily_rollups_org_courier', table_name='feedback_daily_rollups')
+    op.drop_index('ix_feedback_daily_rollups_org_day', table_name='feedback_daily_rollups')
+    op.drop_index('ix_feedback_daily_rollups_organization_id', table_name='feedback_daily_rollups')
+    op.drop_index('ix_feedback_daily_rollups_id', table_name='feedback_daily_rollups')
+    op.drop_table('feedback_daily_rollups')
@@ -0,0 +1,48 @@
+"""Add zone tags to deliveries and couriers
+
+Revision ID: zone_tags
+Revises: feedback_daily_rollups
+Create Date: 2026-10-18
+
+Zone ids resolved from the zone polygon index at ingest: the zone of a
+delivery's drop-off point and of a courier's last FMS GPS position.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'zone_tags'
+down_revision = 'feedback_daily_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'deliveries',
+        sa.Column('zone_id', sa.Integer(), nullable=True,
+                  comment='Zone containing the drop-off point, tagged at ingest'),
+    )
+    op.create_foreign_key('fk_deliveries_zone_id', 'deliveries', 'zones',
+                          ['zone_id'], ['id'], ondelete='SET NULL')
+    op.create_index('ix_deliveries_zone_id', 'deliveries', ['zone_id'])
+
+    op.add_column(
+        'couriers',
+        sa.Column('current_zone_id', sa.Integer(), nullable=True,
+                  comment='Zone of the last FMS GPS position'),
+    )
+    op.create_foreign_key('fk_couriers_current_zone_id', 'couriers', 'zones',
+                          ['current_zone_id'], ['id'], ondelete='SET NULL')
+    op.create_index('ix_couriers_current_zone_id', 'couriers', ['current_zone_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_couriers_current_zone_id', table_name='couriers')
+    op.drop_constraint('fk_couriers_current_zone_id', 'couriers', type_='foreignkey')
+    op.drop_column('couriers', 'current_zone_id')
+
+    op.drop_index('ix_deliveries_zone_id', table_name='deliveries')
+    op.drop_constraint('fk_deliveries_zone_id', 'deliveries', type_='foreignkey')
+    op.drop_column('deliveries', 'zone_id')
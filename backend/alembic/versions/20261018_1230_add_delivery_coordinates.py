@@ -0,0 +1,60 @@
+"""Add delivery coordinates and geocode_cache table
+
+Revision ID: delivery_coordinates
+Revises: zone_tags
+Create Date: 2026-10-18
+
+Pickup and drop-off coordinates geocoded from delivery addresses at ingest,
+and the shared normalized address -> coordinates cache the geocoder reads
+before calling its backend.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'delivery_coordinates'
+down_revision = 'zone_tags'
+branch_labels = None
+depends_on = None
+
+COORDINATE_COLUMNS = (
+    ('pickup_latitude', sa.Numeric(10, 8)),
+    ('pickup_longitude', sa.Numeric(11, 8)),
+    ('delivery_latitude', sa.Numeric(10, 8)),
+    ('delivery_longitude', sa.Numeric(11, 8)),
+)
+
+
+def upgrade() -> None:
+    for name, type_ in COORDINATE_COLUMNS:
+        op.add_column('deliveries', sa.Column(name, type_, nullable=True))
+
+    op.create_table(
+        'geocode_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('address_hash', sa.String(length=64), nullable=False,
+                  comment='SHA-256 of the normalized address'),
+        sa.Column('normalized_address', sa.Text(), nullable=False),
+        sa.Column('latitude', sa.Float(), nullable=True,
+                  comment='Null when the address was not found'),
+        sa.Column('longitude', sa.Float(), nullable=True,
+                  comment='Null when the address was not found'),
+        sa.Column('provider', sa.String(length=50), nullable=False,
+                  comment='Geocoder backend that resolved it'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_geocode_cache_id', 'geocode_cache', ['id'])
+    op.create_index('ix_geocode_cache_address_hash', 'geocode_cache', ['address_hash'],
+                    unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_geocode_cache_address_hash', table_name='geocode_cache')
+    op.drop_index('ix_geocode_cache_id', table_name='geocode_cache')
+    op.drop_table('geocode_cache')
+
+    for name, _ in reversed(COORDINATE_COLUMNS):
+        op.drop_column('deliveries', name)
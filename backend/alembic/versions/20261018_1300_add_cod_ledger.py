@@ -0,0 +1,123 @@
+"""Add COD ledger and courier COD balances
+
+Revision ID: cod_ledger
+Revises: delivery_coordinates
+Create Date: 2026-10-18
+
+Append-only COD movements (cod_ledger_entries) and running per-courier
+balances (courier_cod_balances) maintained by CODLedgerService. Existing COD
+rows are backfilled as opening entries and their per-courier totals.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cod_ledger'
+down_revision = 'delivery_coordinates'
+branch_labels = None
+depends_on = None
+
+TRACKED_STATUSES = ('pending', 'collected', 'deposited')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'cod_ledger_entries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('organization_id', sa.Integer(), nullable=False,
+                  comment='Organization ID for multi-tenant isolation'),
+        sa.Column('cod_id', sa.Integer(), nullable=True,
+                  comment='NULL for reconciliation adjustments'),
+        sa.Column('courier_id', sa.Integer(), nullable=False, server_default='0',
+                  comment='0 when no courier'),
+        sa.Column('from_status', sa.String(length=20), nullable=True),
+        sa.Column('to_status', sa.String(length=20), nullable=True),
+        sa.Column('amount', sa.Numeric(12, 2), nullable=False),
+        sa.Column('reason', sa.String(length=30), nullable=False),
+        sa.Column('reference_number', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_cod_ledger_entries_id', 'cod_ledger_entries', ['id'])
+    op.create_index('ix_cod_ledger_entries_organization_id', 'cod_ledger_entries',
+                    ['organization_id'])
+    op.create_index('ix_cod_ledger_entries_org_courier', 'cod_ledger_entries',
+                    ['organization_id', 'courier_id'])
+    op.create_index('ix_cod_ledger_entries_cod_id', 'cod_ledger_entries', ['cod_id'])
+
+    op.create_table(
+        'courier_cod_balances',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('organization_id', sa.Integer(), nullable=False,
+                  comment='Organization ID for multi-tenant isolation'),
+        sa.Column('courier_id', sa.Integer(), nullable=False, comment='0 when no courier'),
+        *[
+            column
+            for status in TRACKED_STATUSES
+            for column in (
+                sa.Column(f'{status}_amount', sa.Numeric(12, 2), nullable=False,
+                          server_default='0'),
+                sa.Column(f'{status}_count', sa.Integer(), nullable=False, server_default='0'),
+            )
+        ],
+        sa.Column('outstanding_amount', sa.Numeric(12, 2), nullable=False, server_default='0'),
+        sa.Column('reconciled_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('organization_id', 'courier_id',
+                            name='uq_courier_cod_balances_courier'),
+    )
+    op.create_index('ix_courier_cod_balances_id', 'courier_cod_balances', ['id'])
+    op.create_index('ix_courier_cod_balances_organization_id', 'courier_cod_balances',
+                    ['organization_id'])
+    op.create_index('ix_courier_cod_balances_org_outstanding', 'courier_cod_balances',
+                    ['organization_id', 'outstanding_amount'])
+
+    # Opening entries: every existing COD row enters the ledger in its current status
+    op.execute(
+        """
+        INSERT INTO cod_ledger_entries
+            (organization_id, cod_id, courier_id, from_status, to_status, amount, reason,
+             reference_number)
+        SELECT organization_id, id, COALESCE(courier_id, 0), NULL, status::text, amount,
+               'opening', reference_number
+        FROM cod_transactions
+        """
+    )
+
+    bucket_columns = ', '.join(
+        f'{status}_amount, {status}_count' for status in TRACKED_STATUSES
+    )
+    bucket_values = ', '.join(
+        f"COALESCE(SUM(amount) FILTER (WHERE status::text = '{status}'), 0), "
+        f"COUNT(*) FILTER (WHERE status::text = '{status}')"
+        for status in TRACKED_STATUSES
+    )
+    op.execute(
+        f"""
+        INSERT INTO courier_cod_balances
+            (organization_id, courier_id, {bucket_columns}, outstanding_amount, reconciled_at)
+        SELECT organization_id, COALESCE(courier_id, 0), {bucket_values},
+               COALESCE(SUM(amount) FILTER (WHERE status::text IN ('pending', 'collected')), 0),
+               now()
+        FROM cod_transactions
+        GROUP BY organization_id, COALESCE(courier_id, 0)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_courier_cod_balances_org_outstanding', table_name='courier_cod_balances')
+    op.drop_index('ix_courier_cod_balances_organization_id', table_name='courier_cod_balances')
+    op.drop_index('ix_courier_cod_balances_id', table_name='courier_cod_balances')
+    op.drop_table('courier_cod_balances')
+    op.drop_index('ix_cod_ledger_entries_cod_id', table_name='cod_ledger_entries')
+    op.drop_index('ix_cod_ledger_entries_org_courier', table_name='cod_ledger_entries')
+    op.drop_index('ix_cod_ledger_entries_organization_id', table_name='cod_ledger_entries')
+    op.drop_index('ix_cod_ledger_entries_id', table_name='cod_ledger_entries')
+    op.drop_table('cod_ledger_entries')
@@ -0,0 +1,54 @@
+"""Encrypt courier PII columns and add blind indexes
+
+Revision ID: courier_blind_indexes
+Revises: cod_ledger
+Create Date: 2026-10-19
+
+national_id, iqama_number, passport_number, bank_account_number and iban
+become EncryptedField (base64 AES-GCM ciphertext, so widened to TEXT).
+Uniqueness of the identity documents moves from the ciphertext columns to
+their HMAC blind index columns. Existing rows keep their plaintext until
+backfill_blind_indexes_task encrypts them and fills the digests; the
+application reads both forms in the meantime.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'courier_blind_indexes'
+down_revision = 'cod_ledger'
+branch_labels = None
+depends_on = None
+
+ENCRYPTED_COLUMNS = (
+    'national_id', 'iqama_number', 'passport_number', 'bank_account_number', 'iban',
+)
+UNIQUE_INDEXED = ('national_id', 'iqama_number', 'passport_number')
+
+
+def upgrade() -> None:
+    for column in UNIQUE_INDEXED:
+        op.execute(f'ALTER TABLE couriers DROP CONSTRAINT IF EXISTS couriers_{column}_key')
+
+    for column in ENCRYPTED_COLUMNS:
+        op.alter_column('couriers', column, type_=sa.Text(), existing_nullable=True)
+
+    for column in UNIQUE_INDEXED + ('iban',):
+        op.add_column(
+            'couriers',
+            sa.Column(f'{column}_bidx', sa.String(length=80), nullable=True,
+                      comment=f'Blind index of {column}'),
+        )
+    for column in UNIQUE_INDEXED:
+        op.create_unique_constraint(f'couriers_{column}_bidx_key', 'couriers', [f'{column}_bidx'])
+    op.create_index('ix_couriers_iban_bidx', 'couriers', ['iban_bidx'])
+
+
+def downgrade() -> None:
+    # Columns stay TEXT: encrypted values do not fit the old VARCHAR(50)
+    op.drop_index('ix_couriers_iban_bidx', table_name='couriers')
+    for column in UNIQUE_INDEXED:
+        op.drop_constraint(f'couriers_{column}_bidx_key', 'couriers', type_='unique')
+    for column in UNIQUE_INDEXED + ('iban',):
+        op.drop_column('couriers', f'{column}_bidx')
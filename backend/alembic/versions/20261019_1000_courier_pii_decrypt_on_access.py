@@ -0,0 +1,29 @@
+"""Courier PII columns hold ciphertext decrypted on access
+
+Revision ID: courier_pii_decrypt_on_access
+Revises: courier_blind_indexes
+Create Date: 2026-10-19
+
+No schema change. national_id, iqama_number, passport_number,
+bank_account_number and iban stay TEXT columns holding base64 AES-GCM
+ciphertext (legacy rows: plaintext until backfill_blind_indexes_task
+rewrites them). The Courier model now maps them to _<field> attributes and
+decrypts through encrypted_attribute() when read instead of an
+EncryptedField type, so nothing in the database differs from the previous
+revision. This revision records that mapping for the migration history.
+"""
+
+
+# revision identifiers, used by Alembic.
+revision = 'courier_pii_decrypt_on_access'
+down_revision = 'courier_blind_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    pass
+
+
+def downgrade() -> None:
+    pass
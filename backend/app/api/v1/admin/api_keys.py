@@ -1,6 +1,5 @@
 """Admin API Keys Management API"""
 
-import hashlib
 from datetime import datetime
 from typing import List, Optional
 
@@ -18,15 +17,11 @@ from app.schemas.admin.api_key import (
     ApiKeyUpdate,
     ApiKeyWithSecret,
 )
+from app.services.api_key_service import api_key_service, hash_api_key
 
 router = APIRouter()
 
 
-def hash_api_key(key: str) -> str:
-    """Hash API key for secure storage"""
-    return hashlib.sha256(key.encode()).hexdigest()
-
-
 @router.get("/", response_model=ApiKeyListResponse)
 def list_api_keys(
     skip: int = Query(0, ge=0),
@@ -149,6 +144,7 @@ def update_api_key(
         setattr(api_key, field, value)
 
     db.commit()
+    api_key_service.invalidate(api_key.key_hash)
     db.refresh(api_key)
     return api_key
 
@@ -174,6 +170,7 @@ def delete_api_key(
 
     db.delete(api_key)
     db.commit()
+    api_key_service.invalidate(api_key.key_hash)
     return None
 
 
@@ -199,6 +196,7 @@ def revoke_api_key(
     api_key.status = ApiKeyStatus.REVOKED.value
 
     db.commit()
+    api_key_service.invalidate(api_key.key_hash)
     db.refresh(api_key)
     return api_key
 
@@ -227,6 +225,7 @@ def rotate_api_key(
     secret_key = ApiKey.generate_key()
     key_prefix = secret_key[:8]
     key_hash = hash_api_key(secret_key)
+    old_key_hash = api_key.key_hash
 
     # Update API key
     api_key.key_prefix = key_prefix
@@ -236,6 +235,7 @@ def rotate_api_key(
     api_key.total_requests = 0
 
     db.commit()
+    api_key_service.invalidate(old_key_hash)
     db.refresh(api_key)
 
     # Return response with new secret key
@@ -256,7 +256,8 @@ def get_api_key_usage(
 
     Requires superuser permission.
 
-    Returns request counts, last used info, and rate limit status.
+    Returns request counts, last used info, and rate limit status. Counts are
+    written in batches, so the last few seconds of usage may not be included.
     """
     api_key = db.query(ApiKey).filter(ApiKey.id == api_key_id).first()
     if not api_key:
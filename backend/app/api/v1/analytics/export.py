@@ -3,18 +3,26 @@
 Export analytics data in various formats (CSV, Excel, JSON) with streaming support.
 """
 
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any, Tuple
 from fastapi import APIRouter, Depends, Query, HTTPException
 from fastapi.responses import StreamingResponse, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from datetime import date, datetime, timedelta
+from sqlalchemy.sql import ColumnElement, Select
+from datetime import date, datetime, time, timedelta
 from pydantic import BaseModel
-import io
 import json
 
-from app.core.dependencies import get_db, get_current_user
+from app.core.database import db_manager
+from app.core.dependencies import get_db, get_current_organization, get_current_user
+from app.models.fleet.vehicle import Vehicle
+from app.models.hr.salary import Salary
+from app.models.operations.delivery import Delivery, DeliveryStatus
+from app.models.tenant.organization import Organization
 from app.models.user import User
 from app.utils.export import (
+    STREAM_FORMATS,
+    column_python_types,
     export_to_csv,
     export_to_json,
     export_to_excel_dict,
@@ -22,12 +30,17 @@ from app.utils.export import (
     filter_columns,
     sort_data,
     generate_export_filename,
-    chunk_data_for_export,
+    gzip_stream,
+    iter_keyset_batches,
+    stream_parquet,
 )
 
 
 router = APIRouter()
 
+# Rows fetched per keyset page; each page is encoded and flushed before the next read
+EXPORT_BATCH_SIZE = 2000
+
 
 class ExportRequest(BaseModel):
     """Export request schema"""
@@ -122,13 +135,187 @@ def generate_export(
         raise HTTPException(status_code=400, detail=f"Unsupported format: {request.format}")
 
 
+def _delivery_export(
+    org_id: int, start_date: date, end_date: date, status: Optional[str] = None
+) -> Tuple[Select, ColumnElement, List[str]]:
+    """Build the keyset-paginated delivery export statement"""
+    stmt = select(
+        Delivery.id,
+        Delivery.tracking_number,
+        Delivery.courier_id,
+        Delivery.status,
+        Delivery.pickup_address,
+        Delivery.delivery_address,
+        Delivery.pickup_time,
+        Delivery.delivery_time,
+        Delivery.cod_amount,
+        Delivery.created_at,
+    ).where(
+        Delivery.organization_id == org_id,
+        Delivery.created_at >= datetime.combine(start_date, time.min),
+        Delivery.created_at <= datetime.combine(end_date, time.max),
+    )
+    if status:
+        try:
+            stmt = stmt.where(Delivery.status == DeliveryStatus(status))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid delivery status: {status}")
+    columns = [
+        "id",
+        "tracking_number",
+        "courier_id",
+        "status",
+        "pickup_address",
+        "delivery_address",
+        "pickup_time",
+        "delivery_time",
+        "cod_amount",
+        "created_at",
+    ]
+    return stmt, Delivery.id, columns
+
+
+def _fleet_export(
+    org_id: int, vehicle_id: Optional[int] = None
+) -> Tuple[Select, ColumnElement, List[str]]:
+    """Build the keyset-paginated vehicle export statement"""
+    stmt = select(
+        Vehicle.id,
+        Vehicle.plate_number,
+        Vehicle.vehicle_type,
+        Vehicle.make,
+        Vehicle.model,
+        Vehicle.year,
+        Vehicle.status,
+        Vehicle.ownership_type,
+        Vehicle.current_mileage,
+        Vehicle.assigned_to_city,
+        Vehicle.assigned_to_project,
+        Vehicle.next_service_due_date,
+        Vehicle.insurance_expiry_date,
+    ).where(Vehicle.organization_id == org_id)
+    if vehicle_id:
+        stmt = stmt.where(Vehicle.id == vehicle_id)
+    columns = [
+        "id",
+        "plate_number",
+        "vehicle_type",
+        "make",
+        "model",
+        "year",
+        "status",
+        "ownership_type",
+        "current_mileage",
+        "assigned_to_city",
+        "assigned_to_project",
+        "next_service_due_date",
+        "insurance_expiry_date",
+    ]
+    return stmt, Vehicle.id, columns
+
+
+def _financial_export(
+    org_id: int, start_date: date, end_date: date
+) -> Tuple[Select, ColumnElement, List[str]]:
+    """Build the keyset-paginated salary export statement"""
+    period = Salary.year * 100 + Salary.month
+    stmt = select(
+        Salary.id,
+        Salary.courier_id,
+        Salary.year,
+        Salary.month,
+        Salary.base_salary,
+        Salary.allowances,
+        Salary.bonus_amount,
+        Salary.deductions,
+        Salary.loan_deduction,
+        Salary.gosi_employee,
+        Salary.gross_salary,
+        Salary.net_salary,
+        Salary.is_paid,
+        Salary.payment_date,
+    ).where(
+        Salary.organization_id == org_id,
+        period >= start_date.year * 100 + start_date.month,
+        period <= end_date.year * 100 + end_date.month,
+    )
+    columns = [
+        "id",
+        "courier_id",
+        "year",
+        "month",
+        "base_salary",
+        "allowances",
+        "bonus_amount",
+        "deductions",
+        "loan_deduction",
+        "gosi_employee",
+        "gross_salary",
+        "net_salary",
+        "is_paid",
+        "payment_date",
+    ]
+    return stmt, Salary.id, columns
+
+
+def _streaming_export_response(
+    export_query: Tuple[Select, ColumnElement, List[str]],
+    base_name: str,
+    format: str = "csv",
+    compress: bool = False,
+) -> StreamingResponse:
+    """
+    Stream an export straight from the database to the client.
+
+    The generator opens its own read session so it outlives the request
+    dependencies, fetches one keyset batch at a time and encodes it before
+    fetching the next. The session's connection goes back to the pool after
+    each batch, so none is held while the client drains the response.
+    Starlette pulls the next chunk only after the previous one was handed to
+    the transport, so a slow client slows the reads down instead of buffering
+    the export in memory.
+    """
+    stmt, key_column, columns = export_query
+    spec = STREAM_FORMATS[format]
+    batch_size = EXPORT_BATCH_SIZE
+
+    def generate() -> Iterator[bytes]:
+        session = db_manager.create_session(use_read_replica=True)
+        try:
+            batches = iter_keyset_batches(
+                session, stmt, key_column, batch_size=batch_size, release_connection=True
+            )
+            if format == "parquet":
+                chunks = stream_parquet(batches, columns, column_python_types(stmt))
+            else:
+                chunks = spec["encoder"](batches, columns)
+            if compress:
+                chunks = gzip_stream(chunks)
+            yield from chunks
+        finally:
+            session.close()
+
+    filename = generate_export_filename(base_name, spec["extension"])
+    media_type = spec["media_type"]
+    if compress:
+        filename = f"{filename}.gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
 @router.get("/deliveries/csv")
 def export_deliveries_csv(
-    db: Session = Depends(get_db),
     start_date: date = Query(default=None),
     end_date: date = Query(default=None),
     status: Optional[str] = Query(None),
+    compress: bool = Query(False, description="Gzip the CSV on the fly"),
     current_user: User = Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
 ):
     """Export deliveries data as CSV"""
     if not end_date:
@@ -136,45 +323,33 @@ def export_deliveries_csv(
     if not start_date:
         start_date = end_date - timedelta(days=30)
 
-    # Fetch delivery data - implement actual query
-    data = []
-
-    csv_content = export_to_csv(data)
-    filename = generate_export_filename("deliveries", "csv")
-
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    return _streaming_export_response(
+        _delivery_export(current_org.id, start_date, end_date, status),
+        "deliveries",
+        compress=compress,
     )
 
 
 @router.get("/fleet/csv")
 def export_fleet_csv(
-    db: Session = Depends(get_db),
     vehicle_id: Optional[int] = Query(None),
+    compress: bool = Query(False, description="Gzip the CSV on the fly"),
     current_user: User = Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
 ):
     """Export fleet data as CSV"""
-    # Fetch fleet data - implement actual query
-    data = []
-
-    csv_content = export_to_csv(data)
-    filename = generate_export_filename("fleet", "csv")
-
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    return _streaming_export_response(
+        _fleet_export(current_org.id, vehicle_id), "fleet", compress=compress
     )
 
 
 @router.get("/financial/csv")
 def export_financial_csv(
-    db: Session = Depends(get_db),
     start_date: date = Query(default=None),
     end_date: date = Query(default=None),
+    compress: bool = Query(False, description="Gzip the CSV on the fly"),
     current_user: User = Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
 ):
     """Export financial data as CSV"""
     if not end_date:
@@ -182,94 +357,44 @@ def export_financial_csv(
     if not start_date:
         start_date = end_date - timedelta(days=30)
 
-    # Fetch financial data - implement actual query
-    data = []
-
-    csv_content = export_to_csv(data)
-    filename = generate_export_filename("financial", "csv")
-
-    return Response(
-        content=csv_content,
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    return _streaming_export_response(
+        _financial_export(current_org.id, start_date, end_date), "financial", compress=compress
     )
 
 
 @router.get("/stream/{data_type}")
 def stream_export(
     data_type: str,
-    db: Session = Depends(get_db),
     start_date: date = Query(default=None),
     end_date: date = Query(default=None),
-    format: str = Query("csv", regex="^(csv|json)$"),
+    format: str = Query("csv", regex="^(csv|json|jsonl|parquet)$"),
+    compress: bool = Query(False, description="Gzip the output on the fly"),
     current_user: User = Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
 ):
-    """Stream large dataset export"""
+    """Stream large dataset export (deliveries, fleet or financial)"""
     if not end_date:
         end_date = date.today()
     if not start_date:
         start_date = end_date - timedelta(days=90)
 
-    def generate_csv_stream():
-        """Generator for streaming CSV data"""
-        # Yield header
-        yield "id,date,metric1,metric2,metric3\n"
-
-        # Fetch and yield data in chunks
-        chunk_size = 1000
-        offset = 0
-
-        while True:
-            # Fetch chunk - implement actual query with offset/limit
-            chunk = []  # Replace with actual data fetch
-
-            if not chunk:
-                break
-
-            for row in chunk:
-                yield f"{row.get('id')},{row.get('date')},{row.get('metric1')},{row.get('metric2')},{row.get('metric3')}\n"
-
-            offset += chunk_size
-
-    def generate_json_stream():
-        """Generator for streaming JSON data"""
-        yield '{"data": ['
-
-        chunk_size = 1000
-        offset = 0
-        first = True
-
-        while True:
-            # Fetch chunk - implement actual query
-            chunk = []  # Replace with actual data fetch
-
-            if not chunk:
-                break
-
-            for row in chunk:
-                if not first:
-                    yield ","
-                yield json.dumps(row)
-                first = False
-
-            offset += chunk_size
-
-        yield "]}"
-
-    # Select generator based on format
-    if format == "csv":
-        generator = generate_csv_stream()
-        media_type = "text/csv"
+    if data_type == "deliveries":
+        export_query = _delivery_export(current_org.id, start_date, end_date)
+    elif data_type == "fleet":
+        export_query = _fleet_export(current_org.id)
+    elif data_type == "financial":
+        export_query = _financial_export(current_org.id, start_date, end_date)
     else:
-        generator = generate_json_stream()
-        media_type = "application/json"
+        raise HTTPException(status_code=404, detail=f"Unknown export data type: {data_type}")
 
-    filename = generate_export_filename(f"{data_type}_stream", format)
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Parquet export requires pyarrow")
 
-    return StreamingResponse(
-        generator,
-        media_type=media_type,
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    return _streaming_export_response(
+        export_query, f"{data_type}_stream", format=format, compress=compress
     )
 
 
@@ -422,6 +547,20 @@ def get_supported_formats(
                 "supports_streaming": True,
                 "max_rows": 100000,
             },
+            {
+                "format": "jsonl",
+                "description": "JSON Lines (one object per line)",
+                "mime_type": "application/x-ndjson",
+                "supports_streaming": True,
+                "max_rows": None,
+            },
+            {
+                "format": "parquet",
+                "description": "Apache Parquet (columnar)",
+                "mime_type": "application/vnd.apache.parquet",
+                "supports_streaming": True,
+                "max_rows": None,
+            },
             {
                 "format": "excel",
                 "description": "Microsoft Excel",
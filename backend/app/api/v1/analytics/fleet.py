@@ -9,7 +9,9 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, case
 from datetime import date, datetime, timedelta
 
-from app.core.dependencies import get_db, get_current_user
+from app.core.dependencies import get_db, get_current_organization, get_current_user
+from app.models.fleet.vehicle import VehicleStatus
+from app.models.tenant.organization import Organization
 from app.models.user import User
 from app.schemas.analytics.common import (
     TrendDataPoint,
@@ -17,6 +19,7 @@ from app.schemas.analytics.common import (
     DistributionBucket,
     PeriodType,
 )
+from app.services.analytics import fleet_analytics_service
 from app.utils.analytics import calculate_percentage_change, calculate_distribution
 
 
@@ -29,7 +32,9 @@ def get_vehicle_utilization(
     start_date: date = Query(default=None),
     end_date: date = Query(default=None),
     vehicle_id: Optional[int] = Query(None),
+    granularity: str = Query("daily", pattern="^(daily|weekly)$"),
     current_user: User = Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
 ):
     """Get vehicle utilization rates and statistics"""
     if not end_date:
@@ -37,18 +42,36 @@ def get_vehicle_utilization(
     if not start_date:
         start_date = end_date - timedelta(days=30)
 
-    # Template response - implement actual queries based on models
+    result = fleet_analytics_service.get_vehicle_utilization(
+        db, current_org.id, start_date, end_date, vehicle_id=vehicle_id, granularity=granularity
+    )
+    if vehicle_id:
+        vehicles = [
+            {
+                "vehicle_id": vehicle_id,
+                "assigned_days": result["assigned_days"],
+                "utilization_rate": result["utilization_rate"],
+            }
+        ]
+        average_rate = result["utilization_rate"]
+    else:
+        vehicles = result["vehicles"]
+        average_rate = result["fleet_summary"]["average_utilization_rate"]
+
+    active = sum(1 for v in vehicles if v["assigned_days"] > 0)
     return {
         "period": {"start_date": start_date.isoformat(), "end_date": end_date.isoformat()},
         "overall_utilization": {
-            "average_rate": 0.0,
-            "total_vehicles": 0,
-            "active_vehicles": 0,
-            "idle_vehicles": 0,
-            "maintenance_vehicles": 0,
+            "average_rate": average_rate,
+            "total_vehicles": len(vehicles),
+            "active_vehicles": active,
+            "idle_vehicles": len(vehicles) - active,
+            "maintenance_vehicles": sum(
+                1 for v in vehicles if v.get("status") == VehicleStatus.MAINTENANCE.value
+            ),
         },
-        "utilization_by_vehicle": [],
-        "utilization_trends": [],
+        "utilization_by_vehicle": vehicles,
+        "utilization_trends": result["trend"],
         "peak_hours": [],
     }
 
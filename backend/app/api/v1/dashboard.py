@@ -1,15 +1,14 @@
 import logging
-from datetime import date, datetime, timedelta
+from datetime import datetime, timedelta
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy import and_, case, extract, func, or_
 from sqlalchemy.orm import Session
 
 from app.core.dependencies import get_current_user, get_current_organization, get_db
 from app.models.fleet.assignment import CourierVehicleAssignment
 from app.models.fleet.courier import Courier, CourierStatus, ProjectType, SponsorshipStatus
-from app.models.fleet.vehicle import Vehicle, VehicleStatus
+from app.models.fleet.vehicle import VehicleStatus
 from app.models.tenant.organization import Organization
 from app.models.user import User
 from app.schemas.analytics import (
@@ -26,6 +25,24 @@ from app.schemas.analytics import (
     RecentActivityResponse,
     ExecutiveSummaryResponse,
 )
+from app.services.analytics.dashboard_rollup_service import (
+    COURIER_CITY,
+    COURIER_CREATED,
+    COURIER_DELIVERIES,
+    COURIER_FLAGS,
+    COURIER_PERFORMANCE,
+    COURIER_PROJECT,
+    COURIER_SPONSORSHIP,
+    COURIER_STATUS,
+    COURIER_TERMINATED,
+    DELIVERY_STATUS,
+    DOCUMENT_WARNING_DAYS,
+    VEHICLE_ASSIGNED,
+    VEHICLE_STATUS,
+    RollupView,
+    dashboard_rollup_service,
+)
+from app.services.dashboard_performance_service import dashboard_service
 
 # BigQuery client for performance data
 try:
@@ -39,7 +56,7 @@ logger = logging.getLogger(__name__)
 
 # Try importing optional models
 try:
-    from app.models.operations.delivery import Delivery, DeliveryStatus
+    from app.models.operations.delivery import DeliveryStatus
 
     HAS_DELIVERY = True
 except ImportError:
@@ -70,239 +87,10 @@ def get_dashboard_stats(
 ) -> DashboardStatsResponse:
     """
     Get comprehensive dashboard statistics for the current organization.
-    """
-    org_id = current_org.id
-
-    # Basic counts - filtered by organization
-    total_vehicles = db.query(Vehicle).filter(Vehicle.organization_id == org_id).count()
-    total_couriers = db.query(Courier).filter(Courier.organization_id == org_id).count()
-    total_assignments = (
-        db.query(CourierVehicleAssignment)
-        .filter(CourierVehicleAssignment.organization_id == org_id)
-        .count()
-    )
-
-    # Note: User model may not have organization_id, so we skip filtering for users
-    # or count users through OrganizationUser relationship if needed
-    total_users = 0  # Placeholder - implement based on OrganizationUser if needed
-
-    # Courier status breakdown
-    active_couriers = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.status == CourierStatus.ACTIVE)
-        .count()
-    )
-    inactive_couriers = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.status == CourierStatus.INACTIVE)
-        .count()
-    )
-    on_leave_couriers = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.status == CourierStatus.ON_LEAVE)
-        .count()
-    )
-    onboarding_couriers = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.status == CourierStatus.ONBOARDING)
-        .count()
-    )
-    suspended_couriers = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.status == CourierStatus.SUSPENDED)
-        .count()
-    )
-
-    # Vehicle status breakdown - using correct VehicleStatus enum
-    # ACTIVE vehicles that are not assigned to any courier are "available"
-    vehicles_active = (
-        db.query(Vehicle)
-        .filter(Vehicle.organization_id == org_id, Vehicle.status == VehicleStatus.ACTIVE)
-        .count()
-    )
-    # Count vehicles that have assigned couriers
-    vehicles_assigned = (
-        db.query(Vehicle)
-        .filter(
-            Vehicle.organization_id == org_id,
-            Vehicle.status == VehicleStatus.ACTIVE,
-            Vehicle.assigned_couriers.any()
-        )
-        .count()
-    )
-    vehicles_available = vehicles_active - vehicles_assigned
-    vehicles_maintenance = (
-        db.query(Vehicle)
-        .filter(Vehicle.organization_id == org_id, Vehicle.status == VehicleStatus.MAINTENANCE)
-        .count()
-    )
-    # "Out of service" maps to INACTIVE, RETIRED, or REPAIR
-    vehicles_out_of_service = (
-        db.query(Vehicle)
-        .filter(
-            Vehicle.organization_id == org_id,
-            Vehicle.status.in_([VehicleStatus.INACTIVE, VehicleStatus.RETIRED, VehicleStatus.REPAIR])
-        )
-        .count()
-    )
-
-    # Recent activity (last 7 days)
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    month_ago = datetime.utcnow() - timedelta(days=30)
-
-    new_couriers_this_week = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.created_at >= week_ago)
-        .count()
-    )
-    new_couriers_this_month = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.created_at >= month_ago)
-        .count()
-    )
-    new_assignments_this_week = (
-        db.query(CourierVehicleAssignment)
-        .filter(
-            CourierVehicleAssignment.organization_id == org_id,
-            CourierVehicleAssignment.created_at >= week_ago,
-        )
-        .count()
-    )
-
-    # Calculate percentages
-    courier_utilization = round(
-        (active_couriers / total_couriers * 100) if total_couriers > 0 else 0, 1
-    )
-    vehicle_utilization = round(
-        (vehicles_assigned / total_vehicles * 100) if total_vehicles > 0 else 0, 1
-    )
 
-    # Sponsorship breakdown
-    ajeer_count = (
-        db.query(Courier)
-        .filter(
-            Courier.organization_id == org_id,
-            Courier.sponsorship_status == SponsorshipStatus.AJEER,
-        )
-        .count()
-    )
-    inhouse_count = (
-        db.query(Courier)
-        .filter(
-            Courier.organization_id == org_id,
-            Courier.sponsorship_status == SponsorshipStatus.INHOUSE,
-        )
-        .count()
-    )
-    freelancer_count = (
-        db.query(Courier)
-        .filter(
-            Courier.organization_id == org_id,
-            Courier.sponsorship_status == SponsorshipStatus.FREELANCER,
-        )
-        .count()
-    )
-
-    # Project type breakdown
-    ecommerce_count = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.project_type == ProjectType.ECOMMERCE)
-        .count()
-    )
-    food_count = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.project_type == ProjectType.FOOD)
-        .count()
-    )
-    warehouse_count = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.project_type == ProjectType.WAREHOUSE)
-        .count()
-    )
-    barq_count = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.project_type == ProjectType.BARQ)
-        .count()
-    )
-
-    # Couriers with vehicles
-    couriers_with_vehicle = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.current_vehicle_id.isnot(None))
-        .count()
-    )
-
-    # Calculate growth rates
-    two_weeks_ago = datetime.utcnow() - timedelta(days=14)
-    couriers_two_weeks = (
-        db.query(Courier)
-        .filter(
-            Courier.organization_id == org_id,
-            and_(Courier.created_at >= two_weeks_ago, Courier.created_at < week_ago),
-        )
-        .count()
-    )
-
-    growth_rate = 0
-    if couriers_two_weeks > 0:
-        growth_rate = round(
-            ((new_couriers_this_week - couriers_two_weeks) / couriers_two_weeks) * 100, 1
-        )
-    elif new_couriers_this_week > 0:
-        growth_rate = 100
-
-    return {
-        "total_users": total_users,
-        "total_vehicles": total_vehicles,
-        "total_couriers": total_couriers,
-        "total_assignments": total_assignments,
-        # Courier status
-        "active_couriers": active_couriers,
-        "inactive_couriers": inactive_couriers,
-        "on_leave_couriers": on_leave_couriers,
-        "onboarding_couriers": onboarding_couriers,
-        "suspended_couriers": suspended_couriers,
-        # Vehicle status
-        "vehicles_available": vehicles_available,
-        "vehicles_assigned": vehicles_assigned,
-        "vehicles_maintenance": vehicles_maintenance,
-        "vehicles_out_of_service": vehicles_out_of_service,
-        # Trends
-        "new_couriers_this_week": new_couriers_this_week,
-        "new_couriers_this_month": new_couriers_this_month,
-        "new_assignments_this_week": new_assignments_this_week,
-        "courier_growth_rate": growth_rate,
-        # Utilization
-        "courier_utilization": courier_utilization,
-        "vehicle_utilization": vehicle_utilization,
-        "couriers_with_vehicle": couriers_with_vehicle,
-        # Sponsorship breakdown
-        "sponsorship_breakdown": {
-            "ajeer": ajeer_count,
-            "inhouse": inhouse_count,
-            "freelancer": freelancer_count,
-        },
-        # Project breakdown
-        "project_breakdown": {
-            "ecommerce": ecommerce_count,
-            "food": food_count,
-            "warehouse": warehouse_count,
-            "barq": barq_count,
-        },
-        # Summary insights
-        "insights": {
-            "fleet_health": "good" if vehicle_utilization > 50 else "needs_attention",
-            "courier_availability": (
-                "high"
-                if active_couriers > total_couriers * 0.7
-                else "moderate" if active_couriers > total_couriers * 0.4 else "low"
-            ),
-            "growth_trend": (
-                "growing" if growth_rate > 0 else "stable" if growth_rate == 0 else "declining"
-            ),
-            "vehicle_coverage": "full" if couriers_with_vehicle >= active_couriers else "partial",
-        },
-    }
+    Served from the dashboard rollups (cached, invalidated on refresh).
+    """
+    return dashboard_service.get_dashboard_stats(db, current_org.id)
 
 
 @router.get("/charts/deliveries", response_model=DeliveryTrendsResponse)
@@ -319,56 +107,19 @@ def get_delivery_trends(
     data = []
 
     if HAS_DELIVERY:
+        view = dashboard_rollup_service.load(db, org_id, since=today - timedelta(days=6))
+        daily = view.daily(DELIVERY_STATUS)
+
         for i in range(6, -1, -1):
             day_date = today - timedelta(days=i)
-            next_day = day_date + timedelta(days=1)
-
-            # Get actual delivery counts filtered by organization
-            total = (
-                db.query(Delivery)
-                .filter(
-                    Delivery.organization_id == org_id,
-                    and_(
-                        func.date(Delivery.created_at) >= day_date,
-                        func.date(Delivery.created_at) < next_day,
-                    ),
-                )
-                .count()
-            )
-
-            completed = (
-                db.query(Delivery)
-                .filter(
-                    Delivery.organization_id == org_id,
-                    and_(
-                        func.date(Delivery.created_at) >= day_date,
-                        func.date(Delivery.created_at) < next_day,
-                        Delivery.status == DeliveryStatus.DELIVERED.value,
-                    ),
-                )
-                .count()
-            )
-
-            failed = (
-                db.query(Delivery)
-                .filter(
-                    Delivery.organization_id == org_id,
-                    and_(
-                        func.date(Delivery.created_at) >= day_date,
-                        func.date(Delivery.created_at) < next_day,
-                        Delivery.status == DeliveryStatus.FAILED.value,
-                    ),
-                )
-                .count()
-            )
-
+            counts = daily.get(day_date, {})
             data.append(
                 {
                     "date": day_date.strftime("%Y-%m-%d"),
                     "day": day_date.strftime("%a"),
-                    "deliveries": total,
-                    "completed": completed,
-                    "failed": failed,
+                    "deliveries": sum(counts.values()),
+                    "completed": counts.get(DeliveryStatus.DELIVERED.value, 0),
+                    "failed": counts.get(DeliveryStatus.FAILED.value, 0),
                 }
             )
     else:
@@ -402,38 +153,17 @@ def get_fleet_status(
     """
     Get fleet status distribution for pie chart for the current organization.
     """
-    org_id = current_org.id
+    view = dashboard_rollup_service.load(db, current_org.id)
+    vehicles = view.breakdown(VEHICLE_STATUS)
 
     # ACTIVE vehicles that are not assigned to any courier are "available"
-    vehicles_active = (
-        db.query(Vehicle)
-        .filter(Vehicle.organization_id == org_id, Vehicle.status == VehicleStatus.ACTIVE)
-        .count()
-    )
-    # Count vehicles that have assigned couriers
-    vehicles_assigned = (
-        db.query(Vehicle)
-        .filter(
-            Vehicle.organization_id == org_id,
-            Vehicle.status == VehicleStatus.ACTIVE,
-            Vehicle.assigned_couriers.any()
-        )
-        .count()
-    )
-    vehicles_available = vehicles_active - vehicles_assigned
-    vehicles_maintenance = (
-        db.query(Vehicle)
-        .filter(Vehicle.organization_id == org_id, Vehicle.status == VehicleStatus.MAINTENANCE)
-        .count()
-    )
+    vehicles_assigned = view.count(VEHICLE_ASSIGNED, VehicleStatus.ACTIVE.value)
+    vehicles_available = vehicles.get(VehicleStatus.ACTIVE.value, 0) - vehicles_assigned
+    vehicles_maintenance = vehicles.get(VehicleStatus.MAINTENANCE.value, 0)
     # "Out of service" maps to INACTIVE, RETIRED, or REPAIR
-    vehicles_out_of_service = (
-        db.query(Vehicle)
-        .filter(
-            Vehicle.organization_id == org_id,
-            Vehicle.status.in_([VehicleStatus.INACTIVE, VehicleStatus.RETIRED, VehicleStatus.REPAIR])
-        )
-        .count()
+    vehicles_out_of_service = sum(
+        vehicles.get(s.value, 0)
+        for s in (VehicleStatus.INACTIVE, VehicleStatus.RETIRED, VehicleStatus.REPAIR)
     )
 
     return {
@@ -455,7 +185,7 @@ def get_courier_status_distribution(
     """
     Get courier status distribution for charts for the current organization.
     """
-    org_id = current_org.id
+    counts = dashboard_rollup_service.load(db, current_org.id).breakdown(COURIER_STATUS)
 
     status_counts = []
     status_colors = {
@@ -468,11 +198,7 @@ def get_courier_status_distribution(
     }
 
     for status in CourierStatus:
-        count = (
-            db.query(Courier)
-            .filter(Courier.organization_id == org_id, Courier.status == status)
-            .count()
-        )
+        count = counts.get(status.value, 0)
         if count > 0:
             status_counts.append(
                 {
@@ -494,7 +220,7 @@ def get_sponsorship_distribution(
     """
     Get courier sponsorship distribution for the current organization.
     """
-    org_id = current_org.id
+    counts = dashboard_rollup_service.load(db, current_org.id).breakdown(COURIER_SPONSORSHIP)
 
     colors = {
         SponsorshipStatus.AJEER: "#3B82F6",
@@ -505,11 +231,7 @@ def get_sponsorship_distribution(
 
     result = []
     for status in SponsorshipStatus:
-        count = (
-            db.query(Courier)
-            .filter(Courier.organization_id == org_id, Courier.sponsorship_status == status)
-            .count()
-        )
+        count = counts.get(status.value, 0)
         if count > 0:
             result.append(
                 {
@@ -531,7 +253,7 @@ def get_project_type_distribution(
     """
     Get courier distribution by project type for the current organization.
     """
-    org_id = current_org.id
+    counts = dashboard_rollup_service.load(db, current_org.id).breakdown(COURIER_PROJECT)
 
     colors = {
         ProjectType.ECOMMERCE: "#3B82F6",
@@ -543,11 +265,7 @@ def get_project_type_distribution(
 
     result = []
     for project in ProjectType:
-        count = (
-            db.query(Courier)
-            .filter(Courier.organization_id == org_id, Courier.project_type == project)
-            .count()
-        )
+        count = counts.get(project.value, 0)
         if count > 0:
             result.append(
                 {
@@ -569,16 +287,14 @@ def get_city_distribution(
     """
     Get courier distribution by city for the current organization.
     """
-    org_id = current_org.id
+    counts = dashboard_rollup_service.load(db, current_org.id).breakdown(COURIER_CITY)
 
-    city_counts = (
-        db.query(Courier.city, func.count(Courier.id).label("count"))
-        .filter(Courier.organization_id == org_id, Courier.city.isnot(None))
-        .group_by(Courier.city)
-        .order_by(func.count(Courier.id).desc())
-        .limit(10)
-        .all()
-    )
+    # Couriers without a city are stored under the empty dimension
+    city_counts = sorted(
+        ((city, count) for city, count in counts.items() if city),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:10]
 
     colors = [
         "#3B82F6",
@@ -609,45 +325,31 @@ def get_monthly_trends(
     """
     Get monthly courier onboarding trends for the last 6 months for the current organization.
     """
-    org_id = current_org.id
     today = datetime.utcnow().date()
-    data = []
 
-    for i in range(5, -1, -1):
-        # Get the first day of the month
-        month_date = today.replace(day=1) - timedelta(days=i * 30)
-        month_start = month_date.replace(day=1)
-
-        # Get next month start
-        if month_start.month == 12:
-            next_month = month_start.replace(year=month_start.year + 1, month=1)
-        else:
-            next_month = month_start.replace(month=month_start.month + 1)
-
-        # Count new couriers
-        new_couriers = (
-            db.query(Courier)
-            .filter(
-                Courier.organization_id == org_id,
-                and_(Courier.created_at >= month_start, Courier.created_at < next_month),
-            )
-            .count()
-        )
+    # First day of each of the last 6 months, oldest first
+    months = []
+    month_start = today.replace(day=1)
+    for _ in range(6):
+        months.insert(0, month_start)
+        month_start = (month_start - timedelta(days=1)).replace(day=1)
 
-        # Count terminated couriers
-        terminated = (
-            db.query(Courier)
-            .filter(
-                Courier.organization_id == org_id,
-                and_(
-                    Courier.status == CourierStatus.TERMINATED,
-                    Courier.updated_at >= month_start,
-                    Courier.updated_at < next_month,
-                ),
-            )
-            .count()
-        )
+    view = dashboard_rollup_service.load(db, current_org.id, since=months[0])
+
+    def monthly_totals(metric: str) -> dict:
+        totals = {}
+        for day, counts in view.daily(metric).items():
+            key = day.replace(day=1)
+            totals[key] = totals.get(key, 0) + sum(counts.values())
+        return totals
 
+    new_by_month = monthly_totals(COURIER_CREATED)
+    terminated_by_month = monthly_totals(COURIER_TERMINATED)
+
+    data = []
+    for month_start in months:
+        new_couriers = new_by_month.get(month_start, 0)
+        terminated = terminated_by_month.get(month_start, 0)
         data.append(
             {
                 "month": month_start.strftime("%b %Y"),
@@ -669,82 +371,22 @@ def get_dashboard_alerts(
     """
     Get system alerts and warnings for the current organization.
     """
-    org_id = current_org.id
+    view = dashboard_rollup_service.load(db, current_org.id)
     alerts = []
-    today = date.today()
-    warning_days = 30
-    critical_days = 7
-
-    # Check for expiring documents
-    expiring_iqamas = (
-        db.query(Courier)
-        .filter(
-            Courier.organization_id == org_id,
-            and_(
-                Courier.iqama_expiry_date.isnot(None),
-                Courier.iqama_expiry_date <= today + timedelta(days=warning_days),
-                Courier.iqama_expiry_date > today,
-                Courier.status == CourierStatus.ACTIVE,
-            ),
-        )
-        .count()
-    )
+    warning_days = DOCUMENT_WARNING_DAYS
 
-    expired_iqamas = (
-        db.query(Courier)
-        .filter(
-            Courier.organization_id == org_id,
-            and_(
-                Courier.iqama_expiry_date.isnot(None),
-                Courier.iqama_expiry_date <= today,
-                Courier.status == CourierStatus.ACTIVE,
-            ),
-        )
-        .count()
-    )
-
-    expiring_licenses = (
-        db.query(Courier)
-        .filter(
-            Courier.organization_id == org_id,
-            and_(
-                Courier.license_expiry_date.isnot(None),
-                Courier.license_expiry_date <= today + timedelta(days=warning_days),
-                Courier.license_expiry_date > today,
-                Courier.status == CourierStatus.ACTIVE,
-            ),
-        )
-        .count()
-    )
-
-    expired_licenses = (
-        db.query(Courier)
-        .filter(
-            Courier.organization_id == org_id,
-            and_(
-                Courier.license_expiry_date.isnot(None),
-                Courier.license_expiry_date <= today,
-                Courier.status == CourierStatus.ACTIVE,
-            ),
-        )
-        .count()
-    )
+    # Document expiry counts (active couriers only)
+    expiring_iqamas = view.count(COURIER_FLAGS, "iqama_expiring")
+    expired_iqamas = view.count(COURIER_FLAGS, "iqama_expired")
+    expiring_licenses = view.count(COURIER_FLAGS, "license_expiring")
+    expired_licenses = view.count(COURIER_FLAGS, "license_expired")
 
     # Vehicles in maintenance
-    vehicles_in_maintenance = (
-        db.query(Vehicle)
-        .filter(Vehicle.organization_id == org_id, Vehicle.status == VehicleStatus.MAINTENANCE)
-        .count()
-    )
+    vehicles_in_maintenance = view.count(VEHICLE_STATUS, VehicleStatus.MAINTENANCE.value)
 
     # Couriers without vehicles
-    active_without_vehicle = (
-        db.query(Courier)
-        .filter(
-            Courier.organization_id == org_id,
-            and_(Courier.status == CourierStatus.ACTIVE, Courier.current_vehicle_id.is_(None)),
-        )
-        .count()
+    active_without_vehicle = view.count(COURIER_STATUS, CourierStatus.ACTIVE.value) - view.count(
+        COURIER_FLAGS, "active_with_vehicle"
     )
 
     # Build alerts list
@@ -982,48 +624,23 @@ def get_executive_summary(
     """
     Get executive summary with key metrics and insights for the current organization.
     """
-    org_id = current_org.id
+    today = datetime.utcnow().date()
+    view = dashboard_rollup_service.load(db, current_org.id, since=today - timedelta(days=13))
 
     # Get basic counts
-    total_couriers = db.query(Courier).filter(Courier.organization_id == org_id).count()
-    active_couriers = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.status == CourierStatus.ACTIVE)
-        .count()
-    )
-    total_vehicles = db.query(Vehicle).filter(Vehicle.organization_id == org_id).count()
-
-    # Calculate averages
-    avg_performance = (
-        db.query(func.avg(Courier.performance_score))
-        .filter(Courier.organization_id == org_id, Courier.status == CourierStatus.ACTIVE)
-        .scalar()
-        or 0
-    )
+    total_couriers = view.count(COURIER_STATUS)
+    active_couriers = view.count(COURIER_STATUS, CourierStatus.ACTIVE.value)
+    total_vehicles = view.count(VEHICLE_STATUS)
 
-    avg_deliveries = (
-        db.query(func.avg(Courier.total_deliveries))
-        .filter(Courier.organization_id == org_id, Courier.status == CourierStatus.ACTIVE)
-        .scalar()
-        or 0
-    )
+    # Averages over active couriers
+    avg_performance = view.average(COURIER_PERFORMANCE)
+    avg_deliveries = view.average(COURIER_DELIVERIES)
 
-    # Week over week changes
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    two_weeks_ago = datetime.utcnow() - timedelta(days=14)
-
-    this_week_couriers = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.created_at >= week_ago)
-        .count()
-    )
-    last_week_couriers = (
-        db.query(Courier)
-        .filter(
-            Courier.organization_id == org_id,
-            and_(Courier.created_at >= two_weeks_ago, Courier.created_at < week_ago),
-        )
-        .count()
+    # Week over week changes (last 7 days vs the 7 before)
+    week_start = today - timedelta(days=6)
+    this_week_couriers = view.sum_days(COURIER_CREATED, week_start, today)
+    last_week_couriers = view.sum_days(
+        COURIER_CREATED, week_start - timedelta(days=7), week_start - timedelta(days=1)
     )
 
     courier_change = this_week_couriers - last_week_couriers
@@ -1050,64 +667,35 @@ def get_executive_summary(
                 "up" if courier_change > 0 else "down" if courier_change < 0 else "stable"
             ),
         },
-        "health_score": calculate_fleet_health_score(db, org_id),
+        "health_score": calculate_fleet_health_score(view),
     }
 
 
-def calculate_fleet_health_score(db: Session, org_id: int) -> dict:
+def calculate_fleet_health_score(view: RollupView) -> dict:
     """
-    Calculate overall fleet health score (0-100) for a specific organization.
+    Calculate overall fleet health score (0-100) from an organization's rollups.
     """
     scores = []
 
     # Courier availability score (weight: 30%)
-    total_couriers = db.query(Courier).filter(Courier.organization_id == org_id).count()
-    active_couriers = (
-        db.query(Courier)
-        .filter(Courier.organization_id == org_id, Courier.status == CourierStatus.ACTIVE)
-        .count()
-    )
+    total_couriers = view.count(COURIER_STATUS)
+    active_couriers = view.count(COURIER_STATUS, CourierStatus.ACTIVE.value)
     courier_score = (active_couriers / total_couriers * 100) if total_couriers > 0 else 0
     scores.append(("Courier Availability", courier_score, 0.30))
 
     # Vehicle utilization score (weight: 25%)
-    total_vehicles = db.query(Vehicle).filter(Vehicle.organization_id == org_id).count()
-    vehicles_active = (
-        db.query(Vehicle)
-        .filter(
-            Vehicle.organization_id == org_id, Vehicle.status == VehicleStatus.ACTIVE
-        )
-        .count()
-    )
+    total_vehicles = view.count(VEHICLE_STATUS)
+    vehicles_active = view.count(VEHICLE_STATUS, VehicleStatus.ACTIVE.value)
     vehicle_score = (vehicles_active / total_vehicles * 100) if total_vehicles > 0 else 0
     scores.append(("Vehicle Utilization", vehicle_score, 0.25))
 
     # Document compliance score (weight: 25%)
-    today = date.today()
-    couriers_with_valid_docs = (
-        db.query(Courier)
-        .filter(
-            Courier.organization_id == org_id,
-            and_(
-                Courier.status == CourierStatus.ACTIVE,
-                or_(Courier.iqama_expiry_date.is_(None), Courier.iqama_expiry_date > today),
-                or_(Courier.license_expiry_date.is_(None), Courier.license_expiry_date > today),
-            ),
-        )
-        .count()
-    )
+    couriers_with_valid_docs = view.count(COURIER_FLAGS, "active_valid_documents")
     doc_score = (couriers_with_valid_docs / active_couriers * 100) if active_couriers > 0 else 100
     scores.append(("Document Compliance", doc_score, 0.25))
 
     # Assignment coverage score (weight: 20%)
-    couriers_with_vehicle = (
-        db.query(Courier)
-        .filter(
-            Courier.organization_id == org_id,
-            and_(Courier.status == CourierStatus.ACTIVE, Courier.current_vehicle_id.isnot(None)),
-        )
-        .count()
-    )
+    couriers_with_vehicle = view.count(COURIER_FLAGS, "active_with_vehicle")
     assignment_score = (couriers_with_vehicle / active_couriers * 100) if active_couriers > 0 else 0
     scores.append(("Assignment Coverage", assignment_score, 0.20))
 
@@ -10,7 +10,8 @@ from sqlalchemy.orm import Session
 
 from app.core.dependencies import get_current_user, get_db
 from app.models.user import User
-from app.services.fms.sync import get_sync_service
+from app.services.fms.location_ingest import location_ingest_service
+from app.services.fms.sync import AssetMatcher, get_sync_service
 
 router = APIRouter()
 
@@ -47,6 +48,7 @@ async def preview_sync(
     """
     sync_service = get_sync_service(db)
     assets = sync_service.get_all_fms_assets(max_pages=1)[:limit]
+    matcher = AssetMatcher(db, assets)
 
     preview_results = []
     for asset in assets:
@@ -57,13 +59,7 @@ async def preview_sync(
         }
 
         # Check potential matches
-        courier = sync_service.match_courier_by_barq_id(asset.get("PlateNumber"))
-        if not courier:
-            tracking_unit = asset.get("Trackingunit", {})
-            driver = tracking_unit.get("Driver", {})
-            if driver.get("IDNumber"):
-                courier = sync_service.match_courier_by_iqama(driver.get("IDNumber"))
-
+        courier = matcher.courier_for(asset)
         if courier:
             result["courier_match"] = {
                 "id": courier.id,
@@ -72,7 +68,7 @@ async def preview_sync(
                 "already_linked": courier.fms_asset_id == asset.get("Id"),
             }
 
-        vehicle = sync_service.match_vehicle_by_plate(asset.get("AssetName"))
+        vehicle = matcher.vehicle_for(asset)
         if vehicle:
             result["vehicle_match"] = {
                 "id": vehicle.id,
@@ -86,27 +82,33 @@ async def preview_sync(
 
 
 @router.get("/live-locations")
-async def get_live_locations(
+def get_live_locations(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Get real-time locations for all couriers/assets.
 
-    Returns position data including:
+    Served from the shared location snapshot (refreshed from FMS when older
+    than FMS_LOCATION_MAX_AGE). Returns position data including:
     - GPS coordinates (lat/lng)
     - Speed
     - Direction
     - Driver info
+    - When the position was fetched
     """
     sync_service = get_sync_service(db)
     locations = sync_service.get_all_couriers_live_locations()
 
-    return {"count": len(locations), "locations": locations}
+    return {
+        "count": len(locations),
+        "fetched_at": location_ingest_service.get_stats()["fetched_at"],
+        "locations": locations,
+    }
 
 
 @router.get("/courier/{courier_id}/location")
-async def get_courier_location(
+def get_courier_location(
     courier_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
@@ -124,7 +126,7 @@ async def get_courier_location(
 
 
 @router.get("/stats")
-async def get_sync_stats(
+def get_sync_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -141,8 +143,7 @@ async def get_sync_stats(
     total_vehicles = db.query(Vehicle).count()
     linked_vehicles = db.query(Vehicle).filter(Vehicle.fms_asset_id.isnot(None)).count()
 
-    sync_service = get_sync_service(db)
-    fms_assets = sync_service.get_all_fms_assets(max_pages=1)
+    snapshot = location_ingest_service.get_snapshot(get_sync_service(db).fms_client)
 
     return {
         "couriers": {
@@ -161,5 +162,5 @@ async def get_sync_stats(
                 (linked_vehicles / total_vehicles * 100) if total_vehicles > 0 else 0, 1
             ),
         },
-        "fms": {"total_assets": len(fms_assets) if fms_assets else 0},
+        "fms": {"total_assets": len(snapshot.positions), "fetched_at": snapshot.fetched_at_iso},
     }
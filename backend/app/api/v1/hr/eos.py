@@ -15,16 +15,43 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from app.core.database import get_db
 from app.core.dependencies import get_current_organization, get_current_user
 from app.models.tenant.organization import Organization
 from app.models.fleet.courier import Courier, CourierStatus
-from app.models.hr.salary import Salary
+from app.services.hr.eos_liability_service import (
+    DEFAULT_BASIC_SALARY,
+    calculate_eos_benefit,
+    eos_liability_service,
+)
+from app.utils.export import stream_csv, stream_xlsx
 
 router = APIRouter()
 
+BATCH_EXPORT_COLUMNS = [
+    "employee_id",
+    "full_name",
+    "joining_date",
+    "termination_date",
+    "years_of_service",
+    "basic_salary",
+    "full_eos",
+    "final_eos",
+    "calculation_type",
+]
+BATCH_EXPORT_HEADER = [
+    "Employee ID",
+    "Name",
+    "Joining Date",
+    "Termination Date",
+    "Years of Service",
+    "Last Basic Salary (SAR)",
+    "Full EOS (SAR)",
+    "Final EOS (SAR)",
+    "Calculation Type",
+]
+
 
 class EOSCalculation(BaseModel):
     """EOS calculation result"""
@@ -42,6 +69,19 @@ class EOSCalculation(BaseModel):
     calculation_breakdown: dict
 
 
+class EOSLiabilitySnapshotResponse(BaseModel):
+    """Monthly EOS liability for an organization"""
+    month: date
+    as_of_date: date
+    courier_count: int
+    total_liability: float
+    defaulted_salary_count: int
+    breakdown: dict
+    computed_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
 class EOSSummary(BaseModel):
     """EOS summary for multiple employees"""
     total_employees: int
@@ -49,89 +89,6 @@ class EOSSummary(BaseModel):
     by_termination_type: dict
 
 
-def calculate_eos_benefit(
-    joining_date: date,
-    termination_date: date,
-    basic_salary: Decimal,
-    is_resignation: bool = False,
-) -> dict:
-    """
-    Calculate End of Service benefits according to Saudi Labor Law.
-
-    Per Saudi Labor Law Article 84-85:
-    - First 5 years: 15 days salary per year (1/2 month)
-    - After 5 years: 30 days salary per year (1 month)
-
-    Resignation rules (Article 85):
-    - Less than 2 years: No EOS
-    - 2-5 years: 1/3 of total EOS
-    - 5-10 years: 2/3 of total EOS
-    - More than 10 years: Full EOS
-
-    Termination by employer: Full EOS
-    """
-    # Calculate service period
-    service_days = (termination_date - joining_date).days
-    service_years = service_days / 365.25
-    service_months = int(service_days / 30.4375)
-
-    # Daily wage (salary / 30)
-    daily_wage = basic_salary / Decimal("30")
-
-    # Calculate full EOS first
-    full_years = int(service_years)
-    remaining_fraction = Decimal(str(service_years - full_years))
-
-    # First 5 years: 15 days per year
-    years_in_first_tier = min(full_years, 5)
-    first_tier_eos = years_in_first_tier * daily_wage * Decimal("15")
-
-    # Years after 5: 30 days per year
-    years_in_second_tier = max(0, full_years - 5)
-    second_tier_eos = years_in_second_tier * daily_wage * Decimal("30")
-
-    # Fractional year calculation
-    if full_years < 5:
-        fractional_eos = remaining_fraction * daily_wage * Decimal("15")
-    else:
-        fractional_eos = remaining_fraction * daily_wage * Decimal("30")
-
-    full_eos = first_tier_eos + second_tier_eos + fractional_eos
-
-    # Apply resignation discount if applicable
-    calculation_type = "full"
-    if is_resignation:
-        if service_years < 2:
-            final_eos = Decimal("0")
-            calculation_type = "resignation_no_entitlement"
-        elif service_years < 5:
-            final_eos = full_eos / Decimal("3")
-            calculation_type = "resignation_one_third"
-        elif service_years < 10:
-            final_eos = full_eos * Decimal("2") / Decimal("3")
-            calculation_type = "resignation_two_thirds"
-        else:
-            final_eos = full_eos
-            calculation_type = "resignation_full"
-    else:
-        final_eos = full_eos
-
-    return {
-        "years_of_service": round(service_years, 2),
-        "months_of_service": service_months,
-        "days_of_service": service_days,
-        "daily_wage": float(daily_wage),
-        "first_tier_years": years_in_first_tier,
-        "first_tier_amount": float(first_tier_eos),
-        "second_tier_years": years_in_second_tier,
-        "second_tier_amount": float(second_tier_eos),
-        "fractional_amount": float(fractional_eos),
-        "full_eos": float(full_eos),
-        "final_eos": float(round(final_eos, 2)),
-        "calculation_type": calculation_type,
-    }
-
-
 @router.get("/export/{courier_id}")
 def export_eos(
     courier_id: int,
@@ -169,15 +126,10 @@ def export_eos(
     term_date = termination_date or date.today()
 
     # Get last salary to determine basic salary
-    last_salary = (
-        db.query(Salary)
-        .filter(Salary.courier_id == courier_id)
-        .order_by(Salary.year.desc(), Salary.month.desc())
-        .first()
+    basic_salary = eos_liability_service.latest_salaries(db, [courier_id]).get(
+        courier_id, DEFAULT_BASIC_SALARY
     )
 
-    basic_salary = Decimal(str(last_salary.base_salary if last_salary else 3000))
-
     # Calculate EOS
     eos = calculate_eos_benefit(
         joining_date=courier.joining_date,
@@ -303,15 +255,10 @@ def calculate_eos(
     term_date = termination_date or date.today()
 
     # Get last salary
-    last_salary = (
-        db.query(Salary)
-        .filter(Salary.courier_id == courier_id)
-        .order_by(Salary.year.desc(), Salary.month.desc())
-        .first()
+    basic_salary = eos_liability_service.latest_salaries(db, [courier_id]).get(
+        courier_id, DEFAULT_BASIC_SALARY
     )
 
-    basic_salary = Decimal(str(last_salary.base_salary if last_salary else 3000))
-
     # Calculate EOS
     eos = calculate_eos_benefit(
         joining_date=courier.joining_date,
@@ -350,90 +297,93 @@ def calculate_eos(
 
 @router.get("/batch-export")
 def batch_export_eos(
-    status_filter: str = Query("TERMINATED", description="Courier status to filter"),
+    status_filter: CourierStatus = Query(
+        CourierStatus.TERMINATED, description="Courier status to filter"
+    ),
+    format: str = Query("csv", pattern="^(csv|xlsx)$", description="Export format"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_user),
     current_org: Organization = Depends(get_current_organization),
 ):
-    """Export EOS for all terminated employees
+    """Export EOS for all employees with the given status
 
-    Generates a summary CSV for all employees matching the status filter.
+    Streams a summary CSV or XLSX with one row per employee and a TOTAL row.
+    Terminated employees are calculated up to their last working day, others
+    up to today (employer termination).
     """
-    # Get terminated couriers
-    couriers = (
-        db.query(Courier)
-        .filter(
-            Courier.organization_id == current_org.id,
-            Courier.status == CourierStatus.TERMINATED,
-            Courier.joining_date.isnot(None),
-            Courier.last_working_day.isnot(None),
-        )
-        .all()
+    today = date.today()
+
+    def rows():
+        total_eos = Decimal("0")
+        for batch in eos_liability_service.iter_batches(
+            db, current_org.id, [status_filter], as_of=today
+        ):
+            for row in batch:
+                total_eos += Decimal(str(row["final_eos"]))
+                row["employee_id"] = row["employee_id"] or row["barq_id"]
+            yield batch
+        yield [{}, {"employee_id": "TOTAL", "final_eos": float(total_eos)}]
+
+    stream = stream_xlsx if format == "xlsx" else stream_csv
+    media_type = (
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        if format == "xlsx"
+        else "text/csv"
     )
 
-    # Create CSV
-    output = io.StringIO()
-    writer = csv.writer(output)
+    return StreamingResponse(
+        stream(rows(), BATCH_EXPORT_COLUMNS, header=BATCH_EXPORT_HEADER),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": (
+                f"attachment; filename=eos_batch_report_{today.isoformat()}.{format}"
+            )
+        },
+    )
 
-    # Header
-    writer.writerow([
-        "Employee ID",
-        "Name",
-        "Joining Date",
-        "Termination Date",
-        "Years of Service",
-        "Last Basic Salary (SAR)",
-        "Full EOS (SAR)",
-        "Final EOS (SAR)",
-        "Calculation Type",
-    ])
-
-    total_eos = Decimal("0")
-
-    for courier in couriers:
-        # Get last salary
-        last_salary = (
-            db.query(Salary)
-            .filter(Salary.courier_id == courier.id)
-            .order_by(Salary.year.desc(), Salary.month.desc())
-            .first()
-        )
 
-        basic_salary = Decimal(str(last_salary.base_salary if last_salary else 3000))
-        term_date = courier.last_working_day or date.today()
+def _liability_period(month: Optional[str]) -> date:
+    if not month:
+        return date.today().replace(day=1)
+    year, month_number = (int(part) for part in month.split("-"))
+    if not 1 <= month_number <= 12:
+        raise HTTPException(status_code=400, detail="Invalid month")
+    return date(year, month_number, 1)
 
-        # Calculate EOS (assuming employer termination for batch)
-        eos = calculate_eos_benefit(
-            joining_date=courier.joining_date,
-            termination_date=term_date,
-            basic_salary=basic_salary,
-            is_resignation=False,
-        )
 
-        total_eos += Decimal(str(eos["final_eos"]))
-
-        writer.writerow([
-            courier.employee_id or courier.barq_id,
-            courier.full_name,
-            courier.joining_date.isoformat(),
-            term_date.isoformat(),
-            eos["years_of_service"],
-            float(basic_salary),
-            eos["full_eos"],
-            eos["final_eos"],
-            eos["calculation_type"],
-        ])
-
-    # Summary
-    writer.writerow([])
-    writer.writerow(["TOTAL", "", "", "", "", "", "", float(total_eos), ""])
+@router.get("/liability", response_model=EOSLiabilitySnapshotResponse)
+def get_eos_liability(
+    month: Optional[str] = Query(
+        None, pattern=r"^\d{4}-\d{2}$", description="Month (YYYY-MM), defaults to current"
+    ),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """Get the End of Service liability for all couriers not yet terminated
 
-    output.seek(0)
+    Read-only: serves the stored monthly snapshot, which the daily
+    snapshot_eos_liability_task keeps current. Use POST /liability/refresh
+    to recompute on demand.
+    """
+    period = _liability_period(month)
+    snapshot = eos_liability_service.find_snapshot(db, current_org.id, period)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=404, detail=f"No EOS liability snapshot for {period:%Y-%m}"
+        )
+    return snapshot
 
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={
-            "Content-Disposition": f"attachment; filename=eos_batch_report_{date.today().isoformat()}.csv"
-        },
-    )
+
+@router.post("/liability/refresh", response_model=EOSLiabilitySnapshotResponse)
+def refresh_eos_liability(
+    month: Optional[str] = Query(
+        None, pattern=r"^\d{4}-\d{2}$", description="Month (YYYY-MM), defaults to current"
+    ),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """Recompute and store the End of Service liability snapshot for a month"""
+    period = _liability_period(month)
+    return eos_liability_service.refresh_snapshot(db, current_org.id, period)
@@ -18,6 +18,7 @@ from sqlalchemy import and_
 
 from app.core.database import get_db
 from app.core.dependencies import get_current_organization, get_current_user
+from app.core.encryption import decrypt_attributes
 from app.models.tenant.organization import Organization
 from app.models.fleet.courier import Courier, CourierStatus
 from app.models.hr.salary import Salary
@@ -126,6 +127,8 @@ def export_gosi(
         )
     )
     salaries_map = {s.courier_id: s for s in salaries_query.all()}
+    couriers = [courier for courier in couriers if courier.id in salaries_map]
+    decrypt_attributes(couriers, "national_id", "iqama_number")
 
     # Build GOSI records
     records = []
@@ -1,6 +1,7 @@
 """COD Management API Routes"""
 
 from datetime import date
+from decimal import Decimal
 from typing import List, Optional
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
@@ -10,8 +11,15 @@ from app.core.dependencies import get_current_organization, get_current_user, ge
 from app.models.operations.cod import CODStatus
 from app.models.tenant.organization import Organization
 from app.models.user import User
-from app.schemas.operations import CODCreate, CODResponse, CODUpdate
-from app.services.operations import cod_service
+from app.schemas.operations import (
+    CODCreate,
+    CODLedgerEntryResponse,
+    CODResponse,
+    CODSettlement,
+    CODUpdate,
+    CourierCODBalanceResponse,
+)
+from app.services.operations import cod_ledger_service, cod_service
 
 router = APIRouter()
 
@@ -121,6 +129,42 @@ def get_courier_cod_balance(
     )
 
 
+@router.get("/balances", response_model=List[CourierCODBalanceResponse])
+def list_courier_cod_balances(
+    db: Session = Depends(get_db),
+    min_outstanding: Optional[Decimal] = Query(None, ge=0),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """
+    Get COD balances of all couriers, largest outstanding amount first
+
+    Filters:
+    - min_outstanding: Only couriers holding at least this much
+    """
+    return cod_ledger_service.list_balances(
+        db, current_org.id, min_outstanding=min_outstanding, skip=skip, limit=limit
+    )
+
+
+@router.get("/ledger", response_model=List[CODLedgerEntryResponse])
+def get_cod_ledger(
+    db: Session = Depends(get_db),
+    courier_id: Optional[int] = None,
+    cod_id: Optional[int] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """Get COD ledger movements, newest first"""
+    return cod_ledger_service.get_entries(
+        db, current_org.id, courier_id=courier_id, cod_id=cod_id, skip=skip, limit=limit
+    )
+
+
 @router.get("/{cod_id}", response_model=CODResponse)
 def get_cod_transaction(
     cod_id: int,
@@ -259,6 +303,23 @@ def bulk_deposit_cod(
     }
 
 
+@router.post("/settle", response_model=dict)
+def settle_couriers_cod(
+    settlement: CODSettlement,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """Settle all pending and collected COD for several couriers at once"""
+    return cod_service.settle_couriers(
+        db,
+        courier_ids=settlement.courier_ids,
+        organization_id=current_org.id,
+        deposit_date=settlement.deposit_date,
+        reference_number=settlement.reference_number,
+    )
+
+
 @router.post("/settle/{courier_id}", response_model=dict)
 def settle_courier_cod(
     courier_id: int,
@@ -7,7 +7,7 @@ from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, s
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, or_
 
 from app.core.database import get_async_db, get_db
 from app.core.dependencies import get_current_organization, get_current_user
@@ -15,7 +15,7 @@ from app.models.tenant.organization import Organization
 from app.models.operations.delivery import Delivery, DeliveryStatus
 from app.models.operations.dispatch import DispatchAssignment
 from app.models.fleet.courier import Courier, CourierStatus
-from app.services.operations import dispatch_assignment_service
+from app.services.operations import dispatch_assignment_service, geocoding_service
 from app.schemas.operations.dispatch import (
     CourierAvailability,
     DispatchAcceptance,
@@ -577,7 +577,8 @@ def get_available_couriers(
     - Returns couriers who are:
       - Status ACTIVE
       - Current load < max capacity
-      - In specified zone (if provided)
+      - In specified zone (if provided): last GPS position inside the zone,
+        or no position yet and based in the zone's city
     - Includes distance to pickup location
     - Includes current load and rating
     - Sorted by availability and proximity
@@ -590,12 +591,18 @@ def get_available_couriers(
         Courier.status == CourierStatus.ACTIVE,
     )
 
-    # Filter by zone if specified (using city as proxy for zone)
+    # Filter by zone if specified (zone of the courier's last GPS position,
+    # falling back to the zone's city for couriers without one)
     if zone_id:
         from app.models.operations.zone import Zone
         zone = db.query(Zone).filter(Zone.id == zone_id).first()
+        zone_filter = Courier.current_zone_id == zone_id
         if zone and zone.city:
-            query = query.filter(Courier.city == zone.city)
+            zone_filter = or_(
+                zone_filter,
+                and_(Courier.current_zone_id.is_(None), Courier.city == zone.city),
+            )
+        query = query.filter(zone_filter)
 
     couriers = query.all()
 
@@ -626,7 +633,7 @@ def get_available_couriers(
             current_load=current_load,
             max_capacity=max_capacity,
             rating=Decimal(str(courier.performance_score or 0)),
-            zone_id=zone_id,
+            zone_id=courier.current_zone_id or zone_id,
             distance_to_pickup_km=distance_km,
             estimated_arrival_minutes=None,
         ))
@@ -683,10 +690,16 @@ def get_dispatch_recommendation(
             detail="Delivery not found",
         )
 
-    # Get delivery coordinates (using placeholder for demo)
-    # In production, these would come from geocoding the pickup address
-    delivery_lat = 24.7136 + (delivery.id % 100) * 0.001  # Riyadh area placeholder
-    delivery_lon = 46.6753 + (delivery.id % 100) * 0.001
+    # Pickup coordinates are geocoded at ingest; deliveries created before
+    # that are geocoded once here (through the geocode cache) and stored
+    if delivery.pickup_point is None and geocoding_service.locate_deliveries(db, [delivery]):
+        db.commit()
+    if delivery.pickup_point is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Delivery pickup address could not be geocoded",
+        )
+    delivery_lat, delivery_lon = delivery.pickup_point
 
     max_capacity = 10
 
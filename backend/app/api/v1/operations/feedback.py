@@ -5,7 +5,7 @@ Customer Feedback API Routes
 import logging
 import re
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import func
@@ -14,9 +14,21 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.dependencies import get_current_organization, get_current_user
 from app.models.tenant.organization import Organization
-from app.models.operations.feedback import CustomerFeedback
-from app.services.operations import customer_feedback_service, feedback_template_service, delivery_service
+from app.models.tenant.organization_user import OrganizationRole
+from app.services.operations import (
+    customer_feedback_service,
+    delivery_service,
+    feedback_rollup_service,
+    feedback_template_service,
+)
+from app.services.operations.feedback_analysis import (
+    SETTINGS_KEY as FEEDBACK_KEYWORDS_KEY,
+    FeedbackAnalyzer,
+    analyzer_for_keywords,
+    analyzer_for_organization,
+)
 from app.services.fleet import courier_service
+from app.services.tenant.organization_user_service import organization_user_service
 from app.services.user_service import user_service
 from app.services.email_notification_service import email_notification_service, EmailRecipient
 from app.schemas.operations.feedback import (
@@ -25,6 +37,8 @@ from app.schemas.operations.feedback import (
     CustomerFeedbackUpdate,
     FeedbackEscalateSchema,
     FeedbackFollowupSchema,
+    FeedbackKeywordResponse,
+    FeedbackKeywordSettings,
     FeedbackMetrics,
     FeedbackResolveSchema,
     FeedbackRespondSchema,
@@ -43,7 +57,7 @@ logger = logging.getLogger(__name__)
 # Feedback Analysis Utilities
 def analyze_sentiment(text: str, rating: int) -> FeedbackSentiment:
     """
-    Analyze sentiment of feedback text using keyword-based analysis.
+    Analyze sentiment of feedback text using the default keyword tables.
     Combines text analysis with overall rating for better accuracy.
 
     Args:
@@ -53,54 +67,12 @@ def analyze_sentiment(text: str, rating: int) -> FeedbackSentiment:
     Returns:
         FeedbackSentiment enum value
     """
-    text_lower = text.lower()
-
-    # Positive keywords
-    positive_keywords = [
-        'excellent', 'amazing', 'great', 'fantastic', 'wonderful', 'perfect',
-        'best', 'love', 'thank', 'thanks', 'appreciate', 'happy', 'satisfied',
-        'quick', 'fast', 'professional', 'friendly', 'helpful', 'awesome',
-        'outstanding', 'exceptional', 'recommend', 'impressed', 'pleasant'
-    ]
-
-    # Negative keywords
-    negative_keywords = [
-        'terrible', 'horrible', 'awful', 'bad', 'worst', 'hate', 'angry',
-        'disappointed', 'frustrat', 'poor', 'slow', 'late', 'damaged',
-        'broken', 'rude', 'unprofessional', 'missing', 'lost', 'never',
-        'wrong', 'complaint', 'refund', 'unacceptable', 'disgusting'
-    ]
-
-    # Count keyword matches
-    positive_count = sum(1 for keyword in positive_keywords if keyword in text_lower)
-    negative_count = sum(1 for keyword in negative_keywords if keyword in text_lower)
-
-    # Combine text analysis with rating
-    # Rating: 1-2 = negative, 3 = neutral, 4-5 = positive
-    rating_sentiment = 0 if rating <= 2 else (1 if rating == 3 else 2)
-
-    # Text sentiment
-    if negative_count > positive_count:
-        text_sentiment = 0
-    elif positive_count > negative_count:
-        text_sentiment = 2
-    else:
-        text_sentiment = 1
-
-    # Combined score
-    combined_score = (rating_sentiment + text_sentiment) / 2
-
-    if combined_score < 0.8:
-        return FeedbackSentiment.NEGATIVE
-    elif combined_score > 1.2:
-        return FeedbackSentiment.POSITIVE
-    else:
-        return FeedbackSentiment.NEUTRAL
+    return FeedbackSentiment(analyzer_for_keywords(None).sentiment(text, rating).value)
 
 
 def auto_categorize_feedback(text: str, feedback_type: FeedbackType) -> str:
     """
-    Auto-categorize feedback based on text content and feedback type.
+    Auto-categorize feedback using the default keyword tables.
 
     Args:
         text: The feedback text to analyze
@@ -109,44 +81,7 @@ def auto_categorize_feedback(text: str, feedback_type: FeedbackType) -> str:
     Returns:
         Category string
     """
-    text_lower = text.lower()
-
-    # Category keyword mappings
-    category_keywords = {
-        'delivery_speed': ['fast', 'slow', 'late', 'delay', 'time', 'quick', 'wait', 'early', 'on time'],
-        'courier_behavior': ['rude', 'friendly', 'polite', 'professional', 'helpful', 'attitude', 'behavior', 'manner'],
-        'package_handling': ['damaged', 'broken', 'condition', 'package', 'item', 'handling', 'careful', 'intact'],
-        'communication': ['call', 'message', 'notify', 'update', 'inform', 'contact', 'respond', 'communication'],
-        'pricing': ['price', 'cost', 'expensive', 'cheap', 'fee', 'charge', 'value', 'money'],
-        'app_experience': ['app', 'website', 'interface', 'tracking', 'order', 'easy', 'difficult', 'navigation'],
-        'customer_service': ['support', 'help', 'service', 'issue', 'problem', 'resolve', 'complaint', 'assistance'],
-        'general': []
-    }
-
-    # Score each category
-    category_scores = {}
-    for category, keywords in category_keywords.items():
-        if keywords:
-            score = sum(1 for keyword in keywords if keyword in text_lower)
-            category_scores[category] = score
-
-    # Find best matching category
-    if category_scores:
-        best_category = max(category_scores, key=category_scores.get)
-        if category_scores[best_category] > 0:
-            return best_category
-
-    # Default based on feedback type
-    type_defaults = {
-        FeedbackType.DELIVERY: 'delivery_speed',
-        FeedbackType.COURIER: 'courier_behavior',
-        FeedbackType.SERVICE: 'customer_service',
-        FeedbackType.APP: 'app_experience',
-        FeedbackType.SUPPORT: 'customer_service',
-        FeedbackType.GENERAL: 'general'
-    }
-
-    return type_defaults.get(feedback_type, 'general')
+    return analyzer_for_keywords(None).category(text, feedback_type)
 
 
 def send_feedback_response_email(
@@ -467,6 +402,118 @@ def list_feedbacks_requiring_followup(
     return feedbacks
 
 
+def _require_org_admin(db: Session, current_user, organization_id: int, action: str) -> None:
+    """Only owners and admins of the organization (or superusers) may proceed"""
+    if current_user.is_superuser:
+        return
+    role = organization_user_service.get_user_role(db, organization_id, current_user.id)
+    if role not in [OrganizationRole.OWNER, OrganizationRole.ADMIN]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Only owners and admins can {action}",
+        )
+
+
+def _keyword_response(analyzer: FeedbackAnalyzer, task_id: Optional[str] = None):
+    return FeedbackKeywordResponse(**analyzer.keywords, reclassify_task_id=task_id)
+
+
+@router.get("/keywords", response_model=FeedbackKeywordResponse)
+def get_feedback_keywords(
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """Get the keyword tables used for sentiment analysis and categorization"""
+    return _keyword_response(analyzer_for_organization(db, current_org.id))
+
+
+@router.put("/keywords", response_model=FeedbackKeywordResponse)
+def update_feedback_keywords(
+    keywords_in: FeedbackKeywordSettings,
+    reclassify: bool = Query(False, description="Re-run classification over existing feedback"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """Change the organization's keyword tables
+
+    Requires OWNER or ADMIN role, or superuser.
+
+    Business Logic:
+    - Omitted tables keep the defaults
+    - Takes effect on the next classification in every worker, no restart
+    - Optionally queues a backfill that reclassifies existing feedback
+    """
+    _require_org_admin(db, current_user, current_org.id, "change feedback keywords")
+
+    tables = keywords_in.model_dump(exclude_none=True)
+    try:
+        analyzer = analyzer_for_keywords(tables)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    org = db.get(Organization, current_org.id)
+    settings = dict(org.settings or {})
+    settings[FEEDBACK_KEYWORDS_KEY] = tables
+    org.settings = settings
+    db.commit()
+
+    task_id = None
+    if reclassify:
+        from app.workers.tasks import reclassify_feedback_task
+
+        task_id = reclassify_feedback_task.delay(org_id=current_org.id).id
+    return _keyword_response(analyzer, task_id)
+
+
+@router.post("/reclassify", status_code=status.HTTP_202_ACCEPTED)
+def reclassify_feedback(
+    recategorize: bool = Query(False, description="Also overwrite existing categories"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """Queue reclassification of the organization's existing feedback
+
+    Requires OWNER or ADMIN role, or superuser.
+    """
+    _require_org_admin(db, current_user, current_org.id, "reclassify feedback")
+
+    from app.workers.tasks import reclassify_feedback_task
+
+    task = reclassify_feedback_task.delay(org_id=current_org.id, recategorize=recategorize)
+    return {"task_id": task.id, "status": "queued"}
+
+
+@router.get("/metrics", response_model=FeedbackMetrics)
+def get_feedback_metrics(
+    period: str = Query("month", pattern="^(week|month|quarter|year)$"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """Get feedback performance metrics
+
+    Returns:
+    - Total feedbacks
+    - Average ratings
+    - Response rate
+    - Resolution rate
+    - Escalation rate
+    - Sentiment distribution
+    - Top categories
+
+    Computed from the per-day feedback rollups, so the cost does not grow
+    with feedback history.
+    """
+    days = {"week": 7, "month": 30, "quarter": 90, "year": 365}[period]
+    start_date = (datetime.utcnow() - timedelta(days=days)).date()
+
+    metrics = feedback_rollup_service.get_metrics(db, current_org.id, since=start_date)
+    return FeedbackMetrics(period=period, **metrics)
+
+
 @router.get("/{feedback_id}", response_model=CustomerFeedbackResponse)
 def get_feedback(
     feedback_id: int,
@@ -521,21 +568,22 @@ def create_feedback(
         db, obj_in=feedback_in, organization_id=current_org.id
     )
 
-    # AI sentiment analysis
-    sentiment = analyze_sentiment(feedback_in.feedback_text, feedback_in.overall_rating)
-    feedback.sentiment = sentiment
-
-    # Auto-categorization (only if category not provided)
-    if not feedback_in.category:
-        category = auto_categorize_feedback(feedback_in.feedback_text, feedback_in.feedback_type)
-        feedback.category = category
+    # Sentiment analysis and auto-categorization (one scan with the org's keyword tables)
+    analysis = analyzer_for_organization(db, current_org.id).classify(
+        feedback_in.feedback_text,
+        feedback_in.overall_rating,
+        feedback_in.feedback_type,
+        category=feedback_in.category,
+    )
+    feedback.sentiment = analysis.sentiment
+    feedback.category = analysis.category
 
     # Mark as complaint if negative sentiment or low rating
-    if sentiment == FeedbackSentiment.NEGATIVE or feedback_in.overall_rating <= 2:
+    if analysis.is_complaint:
         feedback.is_complaint = True
 
     # Mark as compliment if positive sentiment and high rating
-    if sentiment == FeedbackSentiment.POSITIVE and feedback_in.overall_rating >= 4:
+    if analysis.is_compliment:
         feedback.is_compliment = True
 
     db.add(feedback)
@@ -817,184 +865,22 @@ def get_courier_feedback_summary(
     Returns:
     - Total feedbacks
     - Average rating
-    - Sentiment distribution
+    - Rating-based sentiment distribution
     - Complaints count
     - Recent feedbacks
+
+    Counts come from the feedback rollups (updated within a minute of writes).
     """
     feedbacks = customer_feedback_service.get_by_courier(
         db, courier_id=courier_id, skip=0, limit=10, organization_id=current_org.id
     )
-    all_feedbacks = customer_feedback_service.get_by_courier(
-        db, courier_id=courier_id, skip=0, limit=1000, organization_id=current_org.id
-    )
-
-    total = len(all_feedbacks)
-    avg_rating = customer_feedback_service.get_avg_rating_by_courier(
-        db, courier_id=courier_id, organization_id=current_org.id
-    )
-
-    positive = len([f for f in all_feedbacks if f.overall_rating >= 4])
-    neutral = len([f for f in all_feedbacks if f.overall_rating == 3])
-    negative = len([f for f in all_feedbacks if f.overall_rating <= 2])
-    complaints = len([f for f in all_feedbacks if f.is_complaint])
+    summary = feedback_rollup_service.get_courier_summary(db, current_org.id, courier_id)
 
     return FeedbackSummary(
         subject_id=courier_id,
         subject_type="courier",
-        total_feedbacks=total,
-        avg_rating=avg_rating,
-        positive_count=positive,
-        neutral_count=neutral,
-        negative_count=negative,
-        complaints_count=complaints,
         recent_feedbacks=feedbacks,
-    )
-
-
-@router.get("/metrics", response_model=FeedbackMetrics)
-def get_feedback_metrics(
-    period: str = Query("month", pattern="^(week|month|quarter|year)$"),
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
-    current_org: Organization = Depends(get_current_organization),
-):
-    """Get feedback performance metrics
-
-    Returns:
-    - Total feedbacks
-    - Average ratings
-    - Response rate
-    - Resolution rate
-    - Escalation rate
-    - Sentiment distribution
-    - Top categories
-    """
-    # Calculate date range based on period
-    now = datetime.utcnow()
-    if period == "week":
-        start_date = now - timedelta(days=7)
-    elif period == "month":
-        start_date = now - timedelta(days=30)
-    elif period == "quarter":
-        start_date = now - timedelta(days=90)
-    else:  # year
-        start_date = now - timedelta(days=365)
-
-    # Base query with organization and date filters
-    base_query = db.query(CustomerFeedback).filter(
-        CustomerFeedback.organization_id == current_org.id,
-        CustomerFeedback.submitted_at >= start_date
-    )
-
-    # Get all feedbacks in period
-    feedbacks = base_query.all()
-    total_feedbacks = len(feedbacks)
-
-    if total_feedbacks == 0:
-        return FeedbackMetrics(
-            period=period,
-            total_feedbacks=0,
-            avg_overall_rating=0.0,
-            avg_delivery_speed_rating=0.0,
-            avg_courier_behavior_rating=0.0,
-            avg_package_condition_rating=0.0,
-            avg_communication_rating=0.0,
-            complaints_count=0,
-            compliments_count=0,
-            response_rate=0.0,
-            avg_response_time_hours=0.0,
-            resolution_rate=0.0,
-            avg_resolution_satisfaction=0.0,
-            escalation_rate=0.0,
-            sentiment_distribution={"positive": 0, "neutral": 0, "negative": 0},
-            rating_distribution={"1": 0, "2": 0, "3": 0, "4": 0, "5": 0},
-            top_categories=[],
-        )
-
-    # Calculate average ratings
-    overall_ratings = [f.overall_rating for f in feedbacks if f.overall_rating]
-    delivery_speed_ratings = [f.delivery_speed_rating for f in feedbacks if f.delivery_speed_rating]
-    courier_behavior_ratings = [f.courier_behavior_rating for f in feedbacks if f.courier_behavior_rating]
-    package_condition_ratings = [f.package_condition_rating for f in feedbacks if f.package_condition_rating]
-    communication_ratings = [f.communication_rating for f in feedbacks if f.communication_rating]
-
-    avg_overall_rating = sum(overall_ratings) / len(overall_ratings) if overall_ratings else 0.0
-    avg_delivery_speed = sum(delivery_speed_ratings) / len(delivery_speed_ratings) if delivery_speed_ratings else 0.0
-    avg_courier_behavior = sum(courier_behavior_ratings) / len(courier_behavior_ratings) if courier_behavior_ratings else 0.0
-    avg_package_condition = sum(package_condition_ratings) / len(package_condition_ratings) if package_condition_ratings else 0.0
-    avg_communication = sum(communication_ratings) / len(communication_ratings) if communication_ratings else 0.0
-
-    # Count complaints and compliments
-    complaints_count = sum(1 for f in feedbacks if f.is_complaint)
-    compliments_count = sum(1 for f in feedbacks if f.is_compliment)
-
-    # Calculate response rate and average response time
-    responded_feedbacks = [f for f in feedbacks if f.responded_at]
-    response_rate = (len(responded_feedbacks) / total_feedbacks * 100) if total_feedbacks > 0 else 0.0
-
-    response_times = [f.response_time_hours for f in responded_feedbacks if f.response_time_hours]
-    avg_response_time = sum(float(rt) for rt in response_times) / len(response_times) if response_times else 0.0
-
-    # Calculate resolution rate and satisfaction
-    resolved_feedbacks = [f for f in feedbacks if f.status in [FeedbackStatus.RESOLVED, FeedbackStatus.CLOSED]]
-    resolution_rate = (len(resolved_feedbacks) / total_feedbacks * 100) if total_feedbacks > 0 else 0.0
-
-    resolution_satisfactions = [f.resolution_satisfaction for f in resolved_feedbacks if f.resolution_satisfaction]
-    avg_resolution_satisfaction = (
-        sum(resolution_satisfactions) / len(resolution_satisfactions)
-        if resolution_satisfactions else 0.0
-    )
-
-    # Calculate escalation rate
-    escalated_feedbacks = [f for f in feedbacks if f.is_escalated]
-    escalation_rate = (len(escalated_feedbacks) / total_feedbacks * 100) if total_feedbacks > 0 else 0.0
-
-    # Sentiment distribution
-    sentiment_distribution = {
-        "positive": sum(1 for f in feedbacks if f.sentiment == FeedbackSentiment.POSITIVE),
-        "neutral": sum(1 for f in feedbacks if f.sentiment == FeedbackSentiment.NEUTRAL),
-        "negative": sum(1 for f in feedbacks if f.sentiment == FeedbackSentiment.NEGATIVE),
-    }
-
-    # Rating distribution
-    rating_distribution = {
-        "1": sum(1 for f in feedbacks if f.overall_rating == 1),
-        "2": sum(1 for f in feedbacks if f.overall_rating == 2),
-        "3": sum(1 for f in feedbacks if f.overall_rating == 3),
-        "4": sum(1 for f in feedbacks if f.overall_rating == 4),
-        "5": sum(1 for f in feedbacks if f.overall_rating == 5),
-    }
-
-    # Top categories
-    category_counts: Dict[str, int] = {}
-    for f in feedbacks:
-        if f.category:
-            category_counts[f.category] = category_counts.get(f.category, 0) + 1
-
-    top_categories = sorted(
-        [{"category": k, "count": v} for k, v in category_counts.items()],
-        key=lambda x: x["count"],
-        reverse=True
-    )[:10]
-
-    return FeedbackMetrics(
-        period=period,
-        total_feedbacks=total_feedbacks,
-        avg_overall_rating=round(avg_overall_rating, 2),
-        avg_delivery_speed_rating=round(avg_delivery_speed, 2),
-        avg_courier_behavior_rating=round(avg_courier_behavior, 2),
-        avg_package_condition_rating=round(avg_package_condition, 2),
-        avg_communication_rating=round(avg_communication, 2),
-        complaints_count=complaints_count,
-        compliments_count=compliments_count,
-        response_rate=round(response_rate, 2),
-        avg_response_time_hours=round(avg_response_time, 2),
-        resolution_rate=round(resolution_rate, 2),
-        avg_resolution_satisfaction=round(avg_resolution_satisfaction, 2),
-        escalation_rate=round(escalation_rate, 2),
-        sentiment_distribution=sentiment_distribution,
-        rating_distribution=rating_distribution,
-        top_categories=top_categories,
+        **summary,
     )
 
 
@@ -1,7 +1,6 @@
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
@@ -10,7 +9,15 @@ from app.models.operations.delivery import Delivery
 from app.models.operations.priority_queue import PriorityQueueEntry, QueueStatus
 from app.models.operations.zone import Zone
 from app.services.operations import delivery_service, priority_queue_service, zone_service
+from app.services.operations.priority_scoring import (
+    SCORING_POLICIES,
+    SETTINGS_KEY,
+    build_policy,
+    policy_for_organization,
+)
 from app.models.tenant.organization import Organization
+from app.models.tenant.organization_user import OrganizationRole
+from app.services.tenant.organization_user_service import organization_user_service
 from app.schemas.operations.priority_queue import (
     PriorityQueueEntryCreate,
     PriorityQueueEntryEscalate,
@@ -19,11 +26,19 @@ from app.schemas.operations.priority_queue import (
     QueueMetrics,
     QueuePosition,
     QueuePriority,
+    ScoringPolicyResponse,
+    ScoringPolicySettings,
 )
 
 router = APIRouter()
 
 
+def _with_position(db: Session, entry: PriorityQueueEntry, organization_id: int) -> PriorityQueueEntry:
+    """Attach the live queue position and wait estimate to a response entry"""
+    priority_queue_service.annotate_positions(db, [entry], organization_id)
+    return entry
+
+
 @router.get("/", response_model=List[PriorityQueueEntryResponse])
 def list_queue_entries(
     skip: int = 0,
@@ -37,7 +52,8 @@ def list_queue_entries(
     """List all queue entries ordered by priority
 
     Returns entries sorted by:
-    1. Total priority score (descending)
+    1. Effective priority score (descending) - the total priority score
+       aged by the organization's scoring policy
     2. Queue time (ascending - older first)
     """
     if priority:
@@ -50,7 +66,7 @@ def list_queue_entries(
         )
     else:
         entries = priority_queue_service.get_queued(db, skip=skip, limit=limit, organization_id=current_org.id)
-    return entries
+    return priority_queue_service.annotate_positions(db, entries, current_org.id)
 
 
 @router.get("/urgent", response_model=List[PriorityQueueEntryResponse])
@@ -67,7 +83,7 @@ def list_urgent_entries(
     - Sorted by SLA deadline (closest first)
     """
     entries = priority_queue_service.get_urgent(db, organization_id=current_org.id)
-    return entries
+    return priority_queue_service.annotate_positions(db, entries, current_org.id)
 
 
 @router.get("/at-risk", response_model=List[PriorityQueueEntryResponse])
@@ -85,7 +101,7 @@ def list_at_risk_entries(
     - Triggers escalation if not assigned soon
     """
     entries = priority_queue_service.get_at_risk(db, organization_id=current_org.id)
-    return entries
+    return priority_queue_service.annotate_positions(db, entries, current_org.id)
 
 
 @router.get("/escalated", response_model=List[PriorityQueueEntryResponse])
@@ -102,7 +118,69 @@ def list_escalated_entries(
     - May have exceeded normal assignment attempts
     """
     entries = priority_queue_service.get_escalated(db, organization_id=current_org.id)
-    return entries
+    return priority_queue_service.annotate_positions(db, entries, current_org.id)
+
+
+@router.get("/scoring-policy", response_model=ScoringPolicyResponse)
+def get_scoring_policy(
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """Get the organization's priority scoring policy
+
+    Business Logic:
+    - Queued entries gain priority with age and as their SLA deadline nears
+    - The policy defines how fast; the default applies when none is set
+    """
+    policy = policy_for_organization(db, current_org.id)
+    return ScoringPolicyResponse(
+        policy=policy.name, params=policy.params(), available_policies=sorted(SCORING_POLICIES)
+    )
+
+
+@router.put("/scoring-policy", response_model=ScoringPolicyResponse)
+def update_scoring_policy(
+    policy_in: ScoringPolicySettings,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """Change the organization's priority scoring policy
+
+    Requires OWNER or ADMIN role, or superuser.
+
+    Business Logic:
+    - Validates the policy name and parameters
+    - Stores the policy in organization settings
+    - Re-keys all queued entries in one batch so the queue order follows it
+    """
+    if not current_user.is_superuser:
+        role = organization_user_service.get_user_role(db, current_org.id, current_user.id)
+        if role not in [OrganizationRole.OWNER, OrganizationRole.ADMIN]:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only owners and admins can change the scoring policy",
+            )
+
+    try:
+        policy = build_policy(policy_in.policy, policy_in.params)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    org = db.get(Organization, current_org.id)
+    settings = dict(org.settings or {})
+    settings[SETTINGS_KEY] = {"policy": policy.name, "params": policy.params()}
+    org.settings = settings
+    db.commit()
+
+    rescored = priority_queue_service.rescore_organization(db, current_org.id, policy=policy)
+    return ScoringPolicyResponse(
+        policy=policy.name,
+        params=policy.params(),
+        available_policies=sorted(SCORING_POLICIES),
+        rescored_entries=rescored,
+    )
 
 
 @router.get("/{entry_id}", response_model=PriorityQueueEntryResponse)
@@ -116,7 +194,7 @@ def get_queue_entry(
     entry = priority_queue_service.get(db, id=entry_id)
     if not entry or entry.organization_id != current_org.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Queue entry not found")
-    return entry
+    return _with_position(db, entry, current_org.id)
 
 
 @router.get("/delivery/{delivery_id}", response_model=PriorityQueueEntryResponse)
@@ -132,7 +210,28 @@ def get_entry_by_delivery(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Queue entry not found for this delivery"
         )
-    return entry
+    return _with_position(db, entry, current_org.id)
+
+
+@router.post("/claim", response_model=List[PriorityQueueEntryResponse])
+def claim_queue_entries(
+    zone_id: int = Query(None, description="Only claim entries for this zone"),
+    limit: int = Query(1, ge=1, le=50, description="Number of entries to claim"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """Claim the next entries in priority order for assignment
+
+    Business Logic:
+    - Picks the highest-priority queued entries (oldest first on ties)
+    - Rows being claimed by another worker are skipped, never double-claimed
+    - Claimed entries move to PROCESSING and leave the queue
+    - Claims feed the measured throughput used for wait estimates
+    """
+    return priority_queue_service.claim_next(
+        db, organization_id=current_org.id, zone_id=zone_id, limit=limit
+    )
 
 
 @router.post("/", response_model=PriorityQueueEntryResponse, status_code=status.HTTP_201_CREATED)
@@ -152,8 +251,7 @@ def create_queue_entry(
       - Customer tier score
       - SLA factor score
     - Calculates warning threshold
-    - Sets initial queue position
-    - Updates all queue positions
+    - Adds the entry to the queue index (positions are computed on read)
     """
     # Check if delivery already in queue within organization
     existing = priority_queue_service.get_by_delivery(
@@ -192,7 +290,7 @@ def create_queue_entry(
             )
 
     entry = priority_queue_service.create_with_number(db, obj_in=entry_in, organization_id=current_org.id)
-    return entry
+    return _with_position(db, entry, current_org.id)
 
 
 @router.put("/{entry_id}", response_model=PriorityQueueEntryResponse)
@@ -214,14 +312,14 @@ def update_queue_entry(
     if not entry or entry.organization_id != current_org.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Queue entry not found")
 
-    if entry.status not in ["queued", "processing"]:
+    if entry.status not in [QueueStatus.QUEUED, QueueStatus.PROCESSING]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot update entry that is already assigned or completed",
         )
 
     entry = priority_queue_service.update(db, db_obj=entry, obj_in=entry_in)
-    return entry
+    return _with_position(db, entry, current_org.id)
 
 
 @router.delete("/{entry_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -251,21 +349,21 @@ def mark_as_processing(
     Business Logic:
     - Updates status to PROCESSING
     - Records processing start time
-    - Prevents multiple processors from picking same entry
-    - Updates queue positions
+    - Locks the row, so concurrent processors cannot pick the same entry
+    - Removes the entry from the queue index
     """
     entry = priority_queue_service.get(db, id=entry_id)
     if not entry or entry.organization_id != current_org.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Queue entry not found")
 
-    if entry.status != "queued":
+    if entry.status != QueueStatus.QUEUED:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Only queued entries can be marked as processing",
         )
 
     entry = priority_queue_service.mark_as_processing(db, entry_id=entry_id)
-    return entry
+    return _with_position(db, entry, current_org.id)
 
 
 @router.post("/{entry_id}/assign", response_model=PriorityQueueEntryResponse)
@@ -282,20 +380,19 @@ def mark_as_assigned(
     - Records assignment time
     - Calculates time spent in queue
     - Removes from active queue
-    - Updates remaining queue positions
     """
     entry = priority_queue_service.get(db, id=entry_id)
     if not entry or entry.organization_id != current_org.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Queue entry not found")
 
-    if entry.status not in ["queued", "processing"]:
+    if entry.status not in [QueueStatus.QUEUED, QueueStatus.PROCESSING]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Only queued or processing entries can be assigned",
         )
 
     entry = priority_queue_service.mark_as_assigned(db, entry_id=entry_id)
-    return entry
+    return _with_position(db, entry, current_org.id)
 
 
 @router.post("/{entry_id}/complete", response_model=PriorityQueueEntryResponse)
@@ -320,7 +417,7 @@ def mark_as_completed(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Queue entry not found")
 
     entry = priority_queue_service.mark_as_completed(db, entry_id=entry_id, sla_met=sla_met)
-    return entry
+    return _with_position(db, entry, current_org.id)
 
 
 @router.post("/{entry_id}/expire", response_model=PriorityQueueEntryResponse)
@@ -343,14 +440,14 @@ def mark_as_expired(
     if not entry or entry.organization_id != current_org.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Queue entry not found")
 
-    if entry.status != "queued":
+    if entry.status != QueueStatus.QUEUED:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Only queued entries can be marked as expired",
         )
 
     entry = priority_queue_service.mark_as_expired(db, entry_id=entry_id)
-    return entry
+    return _with_position(db, entry, current_org.id)
 
 
 @router.post("/{entry_id}/escalate", response_model=PriorityQueueEntryResponse)
@@ -387,7 +484,7 @@ def escalate_entry(
         entry_update = PriorityQueueEntryUpdate(priority=escalation.new_priority)
         entry = priority_queue_service.update(db, db_obj=entry, obj_in=entry_update)
 
-    return entry
+    return _with_position(db, entry, current_org.id)
 
 
 @router.get("/delivery/{delivery_id}/position", response_model=QueuePosition)
@@ -410,16 +507,14 @@ def get_queue_position(
     if not entry:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Delivery not in queue")
 
-    # Get total queued count
-    all_queued = priority_queue_service.get_queued(db, skip=0, limit=10000, organization_id=current_org.id)
-    total_in_queue = len(all_queued)
+    queue_position = priority_queue_service.get_queue_position(db, entry=entry)
 
     position = QueuePosition(
         delivery_id=delivery_id,
         queue_number=entry.queue_number,
-        current_position=entry.queue_position or 0,
-        total_in_queue=total_in_queue,
-        estimated_wait_minutes=entry.estimated_wait_time_minutes or 0,
+        current_position=queue_position["current_position"],
+        total_in_queue=queue_position["total_in_queue"],
+        estimated_wait_minutes=queue_position["estimated_wait_minutes"],
         priority=entry.priority,
         is_at_risk=entry.is_at_risk if hasattr(entry, "is_at_risk") else False,
     )
@@ -437,101 +532,10 @@ def get_queue_metrics(
 
     Returns:
     - Total entries by status
-    - Average wait time
+    - Average and p50/p90 wait time
     - Average processing time
     - SLA compliance rate
     - Escalation rate
     - Entries by priority distribution
     """
-    # Base query with organization filter
-    base_query = db.query(PriorityQueueEntry).filter(
-        PriorityQueueEntry.organization_id == current_org.id
-    )
-
-    # Count by status
-    total_entries = base_query.count()
-    queued_entries = base_query.filter(
-        PriorityQueueEntry.status == QueueStatus.QUEUED
-    ).count()
-    processing_entries = base_query.filter(
-        PriorityQueueEntry.status == QueueStatus.PROCESSING
-    ).count()
-    assigned_entries = base_query.filter(
-        PriorityQueueEntry.status == QueueStatus.ASSIGNED
-    ).count()
-    completed_entries = base_query.filter(
-        PriorityQueueEntry.status == QueueStatus.COMPLETED
-    ).count()
-    expired_entries = base_query.filter(
-        PriorityQueueEntry.status == QueueStatus.EXPIRED
-    ).count()
-
-    # Calculate average wait time (for completed/assigned entries)
-    avg_wait_result = db.query(
-        func.avg(PriorityQueueEntry.time_in_queue_minutes)
-    ).filter(
-        PriorityQueueEntry.organization_id == current_org.id,
-        PriorityQueueEntry.time_in_queue_minutes.isnot(None),
-    ).scalar()
-    avg_wait_time_minutes = float(avg_wait_result) if avg_wait_result else 0.0
-
-    # Calculate average processing time (time from processing_started_at to assigned_at)
-    # For entries that have both timestamps
-    processing_entries_with_times = db.query(PriorityQueueEntry).filter(
-        PriorityQueueEntry.organization_id == current_org.id,
-        PriorityQueueEntry.processing_started_at.isnot(None),
-        PriorityQueueEntry.assigned_at.isnot(None),
-    ).all()
-
-    if processing_entries_with_times:
-        total_processing_time = sum(
-            (e.assigned_at - e.processing_started_at).total_seconds() / 60
-            for e in processing_entries_with_times
-        )
-        avg_processing_time_minutes = total_processing_time / len(processing_entries_with_times)
-    else:
-        avg_processing_time_minutes = 0.0
-
-    # Calculate SLA compliance rate
-    completed_with_sla = base_query.filter(
-        PriorityQueueEntry.status == QueueStatus.COMPLETED,
-        PriorityQueueEntry.was_sla_met.isnot(None),
-    ).count()
-    sla_met_count = base_query.filter(
-        PriorityQueueEntry.status == QueueStatus.COMPLETED,
-        PriorityQueueEntry.was_sla_met == True,
-    ).count()
-    sla_compliance_rate = (sla_met_count / completed_with_sla * 100) if completed_with_sla > 0 else 0.0
-
-    # Calculate escalation rate
-    escalated_count = base_query.filter(
-        PriorityQueueEntry.is_escalated == True
-    ).count()
-    escalation_rate = (escalated_count / total_entries * 100) if total_entries > 0 else 0.0
-
-    # Count entries by priority
-    entries_by_priority = {}
-    priority_counts = db.query(
-        PriorityQueueEntry.priority,
-        func.count(PriorityQueueEntry.id)
-    ).filter(
-        PriorityQueueEntry.organization_id == current_org.id
-    ).group_by(PriorityQueueEntry.priority).all()
-
-    for priority, count in priority_counts:
-        if priority:
-            entries_by_priority[priority.value if hasattr(priority, 'value') else str(priority)] = count
-
-    return QueueMetrics(
-        total_entries=total_entries,
-        queued_entries=queued_entries,
-        processing_entries=processing_entries,
-        assigned_entries=assigned_entries,
-        completed_entries=completed_entries,
-        expired_entries=expired_entries,
-        avg_wait_time_minutes=round(avg_wait_time_minutes, 2),
-        avg_processing_time_minutes=round(avg_processing_time_minutes, 2),
-        sla_compliance_rate=round(sla_compliance_rate, 2),
-        escalation_rate=round(escalation_rate, 2),
-        entries_by_priority=entries_by_priority,
-    )
+    return QueueMetrics(**priority_queue_service.get_metrics(db, organization_id=current_org.id))
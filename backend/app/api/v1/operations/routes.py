@@ -1,6 +1,6 @@
 import math
-from datetime import datetime
-from typing import List, Tuple
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
@@ -8,7 +8,9 @@ from sqlalchemy import func
 
 from app.core.database import get_db
 from app.core.dependencies import get_current_organization, get_current_user
-from app.services.operations import route_service
+from app.core.performance_config import performance_config
+from app.services.operations import geocoding_service, route_optimizer, route_service
+from app.services.operations.route_optimizer import PlannedRoute, RoutePlan, RouteStop
 from app.models.tenant.organization import Organization
 from app.models.operations.delivery import Delivery
 from app.models.operations.dispatch import DispatchAssignment
@@ -19,10 +21,14 @@ from app.schemas.operations.route import (
     RouteCreate,
     RouteMetrics,
     RouteOptimize,
+    RoutePlanRequest,
+    RoutePlanResponse,
     RouteResponse,
     RouteUpdate,
 )
 
+OPTIMIZER_ALGORITHM = "insertion_2opt_oropt_relocate"
+
 
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate the great circle distance between two points on earth (in kilometers)"""
@@ -44,77 +50,177 @@ def estimate_duration_minutes(distance_km: float, avg_speed_kmh: float = 30) ->
     return int((distance_km / avg_speed_kmh) * 60)
 
 
-def optimize_waypoint_order(waypoints: List[dict], start_point: Tuple[float, float] = None) -> List[dict]:
+def optimize_waypoint_order(
+    waypoints: List[dict], start_point: Tuple[float, float] = None, objective: str = "distance"
+) -> List[dict]:
     """
-    Optimize waypoint order using nearest neighbor algorithm (greedy TSP).
-    Returns waypoints in optimized order.
+    Order waypoints with the route optimizer (one vehicle, no time windows).
+    Returns waypoints in optimized order with sequence numbers and leg distances.
     """
-    if not waypoints or len(waypoints) <= 1:
+    if not waypoints:
         return waypoints
 
-    # Get coordinates from waypoints
-    remaining = list(range(len(waypoints)))
-    optimized_order = []
+    stops = [
+        RouteStop(key=index, latitude=float(wp.get("latitude", 0)), longitude=float(wp.get("longitude", 0)))
+        for index, wp in enumerate(waypoints)
+    ]
+    route = route_optimizer.solve(stops, start_point, objective=objective).routes[0]
+    return [
+        {**waypoints[stop.key], "sequence": seq, "distance": round(leg, 2)}
+        for seq, (stop, leg) in enumerate(zip(route.stops, route.legs_km), 1)
+    ]
 
-    # Start from start_point or first waypoint
-    if start_point:
-        current_lat, current_lon = start_point
-    else:
-        current_lat = waypoints[0].get("latitude", 0)
-        current_lon = waypoints[0].get("longitude", 0)
-        optimized_order.append(0)
-        remaining.remove(0)
-
-    # Greedy nearest neighbor
-    while remaining:
-        nearest_idx = None
-        nearest_distance = float("inf")
-
-        for idx in remaining:
-            wp = waypoints[idx]
-            wp_lat = wp.get("latitude", 0)
-            wp_lon = wp.get("longitude", 0)
-            dist = haversine_distance(current_lat, current_lon, wp_lat, wp_lon)
-            if dist < nearest_distance:
-                nearest_distance = dist
-                nearest_idx = idx
-
-        if nearest_idx is not None:
-            optimized_order.append(nearest_idx)
-            remaining.remove(nearest_idx)
-            current_lat = waypoints[nearest_idx].get("latitude", 0)
-            current_lon = waypoints[nearest_idx].get("longitude", 0)
-
-    # Reorder waypoints and add sequence numbers and distances
-    result = []
-    prev_lat, prev_lon = start_point if start_point else (None, None)
-
-    for seq, idx in enumerate(optimized_order, 1):
-        wp = waypoints[idx].copy()
-        wp["sequence"] = seq
-        wp_lat = wp.get("latitude", 0)
-        wp_lon = wp.get("longitude", 0)
-
-        if prev_lat is not None and prev_lon is not None:
-            wp["distance"] = round(haversine_distance(prev_lat, prev_lon, wp_lat, wp_lon), 2)
-        else:
-            wp["distance"] = 0
-
-        prev_lat, prev_lon = wp_lat, wp_lon
-        result.append(wp)
-
-    return result
+
+def delivery_waypoints(db: Session, deliveries: List[Delivery]) -> List[dict]:
+    """
+    Waypoints at the deliveries' drop-off points.
+
+    Coordinates are geocoded at ingest; deliveries created before that are
+    geocoded once here (through the geocode cache) and stored.
+    """
+    if any(d.delivery_point is None for d in deliveries):
+        if geocoding_service.locate_deliveries(db, deliveries):
+            db.commit()
+    missing = [d.id for d in deliveries if d.delivery_point is None]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Delivery addresses could not be geocoded: {missing}",
+        )
+
+    waypoints = []
+    for delivery in deliveries:
+        latitude, longitude = delivery.delivery_point
+        waypoints.append({
+            "delivery_id": delivery.id,
+            "tracking_number": delivery.tracking_number,
+            "address": delivery.delivery_address,
+            "latitude": latitude,
+            "longitude": longitude,
+            "type": "delivery",
+        })
+    return waypoints
 
 
 def calculate_route_totals(waypoints: List[dict]) -> Tuple[float, int]:
     """Calculate total distance and duration from waypoints"""
+    config = performance_config.route_optimizer
     total_distance = sum(wp.get("distance", 0) for wp in waypoints)
-    # Estimate 30 km/h average speed + 5 minutes per stop for delivery
-    travel_time = estimate_duration_minutes(total_distance)
-    stop_time = len(waypoints) * 5  # 5 minutes per delivery stop
-    total_duration = travel_time + stop_time
+    # Average city speed plus handling time per delivery stop
+    travel_time = estimate_duration_minutes(total_distance, config.average_speed_kmh)
+    stop_time = len(waypoints) * config.service_minutes
+    total_duration = int(travel_time + stop_time)
     return round(total_distance, 2), total_duration
 
+
+def _minutes_after(value: datetime, departure: datetime) -> float:
+    """Minutes from departure to value, comparing aware datetimes in UTC"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - departure).total_seconds() / 60
+
+
+def plan_delivery_routes(
+    db: Session,
+    deliveries: List[Delivery],
+    plan_in: RouteOptimize,
+    vehicles: Optional[int],
+) -> Tuple[RoutePlan, datetime, Optional[Tuple[float, float]]]:
+    """Run the route optimizer over deliveries with the request's constraints"""
+    departure = plan_in.departure_time or datetime.utcnow()
+    if departure.tzinfo is not None:
+        departure = departure.astimezone(timezone.utc).replace(tzinfo=None)
+
+    start_point = None
+    if plan_in.start_location:
+        start_point = (
+            plan_in.start_location.get("latitude", 24.7136),
+            plan_in.start_location.get("longitude", 46.6753),
+        )
+
+    constraints = {stop.delivery_id: stop for stop in plan_in.stops}
+    stops = []
+    for wp in delivery_waypoints(db, deliveries):
+        constraint = constraints.get(wp["delivery_id"])
+        stop = RouteStop(key=wp, latitude=wp["latitude"], longitude=wp["longitude"], demand=1)
+        if constraint:
+            stop.demand = constraint.demand
+            stop.service_minutes = constraint.service_minutes
+            if constraint.earliest_arrival:
+                stop.earliest = max(0.0, _minutes_after(constraint.earliest_arrival, departure))
+            if constraint.latest_arrival:
+                stop.latest = _minutes_after(constraint.latest_arrival, departure)
+        stops.append(stop)
+
+    plan = route_optimizer.solve(
+        stops,
+        start_point,
+        vehicles=vehicles,
+        capacity=plan_in.vehicle_capacity,
+        objective="distance" if plan_in.optimize_for == "distance" else "time",
+        return_to_depot=plan_in.return_to_start,
+        max_route_minutes=plan_in.max_route_minutes,
+        time_budget_ms=plan_in.time_budget_ms,
+    )
+    return plan, departure, start_point
+
+
+def planned_route_data(
+    route: PlannedRoute,
+    departure: datetime,
+    start_point: Optional[Tuple[float, float]],
+    route_name: str,
+) -> Dict:
+    """Route model fields for one planned route, waypoints carrying their ETA"""
+    waypoints = [
+        {
+            **stop.key,
+            "sequence": seq,
+            "distance": round(leg, 2),
+            "eta": (departure + timedelta(minutes=arrival)).isoformat(),
+        }
+        for seq, (stop, leg, arrival) in enumerate(
+            zip(route.stops, route.legs_km, route.arrivals), 1
+        )
+    ]
+    route_data = {
+        "route_name": route_name,
+        "route_date": departure.date(),
+        "waypoints": waypoints,
+        "total_distance_km": round(route.distance_km, 2),
+        "estimated_duration_minutes": int(math.ceil(route.duration_minutes)),
+        "total_stops": len(waypoints),
+        "total_deliveries": len(waypoints),
+        "scheduled_start_time": departure,
+        "scheduled_end_time": departure + timedelta(minutes=route.duration_minutes),
+        "is_optimized": True,
+        "optimization_algorithm": OPTIMIZER_ALGORITHM,
+    }
+    if start_point:
+        route_data["start_latitude"], route_data["start_longitude"] = start_point
+    return route_data
+
+
+def create_routes(db: Session, organization_id: int, routes_data: List[Dict]) -> List[RouteModel]:
+    """Create routes with generated route numbers in one transaction"""
+    routes = []
+    for route_data in routes_data:
+        last_route = db.query(RouteModel).order_by(RouteModel.id.desc()).first()
+        next_number = 1 if not last_route else last_route.id + 1
+        route = RouteModel(
+            **route_data,
+            organization_id=organization_id,
+            route_number=f"ROUTE-{datetime.now().strftime('%Y%m%d')}-{next_number:04d}",
+        )
+        db.add(route)
+        db.flush()
+        routes.append(route)
+    db.commit()
+    for route in routes:
+        db.refresh(route)
+    return routes
+
+
 router = APIRouter()
 
 
@@ -167,42 +273,15 @@ def create_route(
     delivery_ids = route_in.delivery_ids or []
 
     if delivery_ids:
-        # Fetch deliveries and create waypoints from them
-        deliveries = db.query(Delivery).filter(
-            Delivery.id.in_(delivery_ids),
-            Delivery.organization_id == current_org.id,
-        ).all()
-
-        if len(deliveries) != len(delivery_ids):
-            found_ids = {d.id for d in deliveries}
-            missing = [did for did in delivery_ids if did not in found_ids]
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Deliveries not found: {missing}",
-            )
+        deliveries = _fetch_deliveries(db, current_org.id, delivery_ids)
 
         # Create waypoints from deliveries
-        for delivery in deliveries:
-            # Parse coordinates from delivery address if available
-            # For now, use placeholder coordinates (should be geocoded in production)
-            waypoint = {
-                "delivery_id": delivery.id,
-                "tracking_number": delivery.tracking_number,
-                "address": delivery.delivery_address,
-                "latitude": 24.7136 + (delivery.id % 100) * 0.001,  # Placeholder - Riyadh area
-                "longitude": 46.6753 + (delivery.id % 100) * 0.001,  # Placeholder
-                "type": "delivery",
-            }
-            waypoints.append(waypoint)
-
-    # Determine start point for optimization
+        waypoints.extend(delivery_waypoints(db, deliveries))
+
+    # Determine start point for optimization (geocoded start address)
     start_point = None
     if route_in.start_location:
-        # If start_location has coordinates in waypoints format
-        start_point = (
-            float(route_in.waypoints[0].get("latitude", 24.7136)) if route_in.waypoints else 24.7136,
-            float(route_in.waypoints[0].get("longitude", 46.6753)) if route_in.waypoints else 46.6753,
-        )
+        start_point = geocoding_service.geocode(db, route_in.start_location)
 
     # Optimize waypoint order if requested
     if route_in.optimize and waypoints:
@@ -214,19 +293,16 @@ def create_route(
     # Create route with calculated values
     route_data = route_in.model_dump(exclude={"delivery_ids", "optimize"})
     route_data["waypoints"] = waypoints
-    route_data["total_distance"] = total_distance
-    route_data["estimated_time"] = total_duration
+    route_data["total_distance_km"] = total_distance
+    route_data["estimated_duration_minutes"] = total_duration
     route_data["total_stops"] = len(waypoints)
     route_data["total_deliveries"] = len(delivery_ids)
     route_data["is_optimized"] = route_in.optimize
-    route_data["optimization_algorithm"] = "nearest_neighbor" if route_in.optimize else None
-
-    # Generate route number
-    last_route = db.query(RouteModel).order_by(RouteModel.id.desc()).first()
-    next_number = 1 if not last_route else last_route.id + 1
-    route_data["route_number"] = f"ROUTE-{datetime.now().strftime('%Y%m%d')}-{next_number:04d}"
+    route_data["optimization_algorithm"] = OPTIMIZER_ALGORITHM if route_in.optimize else None
+    if start_point:
+        route_data["start_latitude"], route_data["start_longitude"] = start_point
 
-    route = route_service.create(db, obj_in=route_data, organization_id=current_org.id)
+    route = create_routes(db, current_org.id, [route_data])[0]
 
     # Update deliveries with route assignment (link delivery_ids to route)
     if delivery_ids:
@@ -270,102 +346,126 @@ def delete_route(
     return None
 
 
-@router.post("/optimize", response_model=RouteResponse)
-def optimize_route(
-    optimize_in: RouteOptimize,
-    db: Session = Depends(get_db),
-    current_user=Depends(get_current_user),
-    current_org: Organization = Depends(get_current_organization),
-):
-    """Optimize route for multiple deliveries
-
-    Business Logic:
-    - Uses optimization algorithm (time/distance/priority)
-    - Calculates optimal waypoint order
-    - Considers traffic patterns and delivery windows
-    - Returns optimized route with estimated metrics
-    """
-    delivery_ids = optimize_in.delivery_ids
-    optimize_for = optimize_in.optimize_for
-
-    # Fetch deliveries
+def _fetch_deliveries(db: Session, organization_id: int, delivery_ids: List[int]) -> List[Delivery]:
     deliveries = db.query(Delivery).filter(
         Delivery.id.in_(delivery_ids),
-        Delivery.organization_id == current_org.id,
+        Delivery.organization_id == organization_id,
     ).all()
 
-    if len(deliveries) != len(delivery_ids):
+    if len(deliveries) != len(set(delivery_ids)):
         found_ids = {d.id for d in deliveries}
         missing = [did for did in delivery_ids if did not in found_ids]
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Deliveries not found: {missing}",
         )
+    return deliveries
 
-    # Build waypoints from deliveries
-    waypoints = []
-    for delivery in deliveries:
-        waypoint = {
-            "delivery_id": delivery.id,
-            "tracking_number": delivery.tracking_number,
-            "address": delivery.delivery_address,
-            "latitude": 24.7136 + (delivery.id % 100) * 0.001,  # Placeholder - should use geocoding
-            "longitude": 46.6753 + (delivery.id % 100) * 0.001,  # Placeholder
-            "type": "delivery",
-        }
-        waypoints.append(waypoint)
 
-    # Get start point if provided
-    start_point = None
-    if optimize_in.start_location:
-        start_point = (
-            optimize_in.start_location.get("latitude", 24.7136),
-            optimize_in.start_location.get("longitude", 46.6753),
-        )
+@router.post("/optimize", response_model=RouteResponse)
+def optimize_route(
+    optimize_in: RouteOptimize,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """Optimize route for multiple deliveries
 
-    # Apply optimization algorithm based on optimize_for parameter
-    if optimize_for == "priority":
+    Business Logic:
+    - Optimizes for travel time or distance (or keeps priority order)
+    - Builds the order by cheapest insertion, then improves it with
+      2-opt/Or-opt local search within the time budget
+    - Respects per-delivery time windows, vehicle capacity and maximum
+      route duration; fails if one vehicle cannot serve every delivery
+    - Returns optimized route with ETAs and estimated metrics
+    """
+    deliveries = _fetch_deliveries(db, current_org.id, optimize_in.delivery_ids)
+
+    if optimize_in.optimize_for == "priority":
         # Sort by delivery priority/urgency (using id as proxy for now)
-        waypoints.sort(key=lambda x: x.get("delivery_id", 0))
-        # Still calculate distances between consecutive points
-        prev_lat, prev_lon = start_point if start_point else (None, None)
+        waypoints = delivery_waypoints(db, sorted(deliveries, key=lambda d: d.id))
+        prev_lat, prev_lon = (
+            (optimize_in.start_location.get("latitude", 24.7136),
+             optimize_in.start_location.get("longitude", 46.6753))
+            if optimize_in.start_location else (None, None)
+        )
         for seq, wp in enumerate(waypoints, 1):
             wp["sequence"] = seq
-            wp_lat = wp.get("latitude", 0)
-            wp_lon = wp.get("longitude", 0)
             if prev_lat is not None and prev_lon is not None:
-                wp["distance"] = round(haversine_distance(prev_lat, prev_lon, wp_lat, wp_lon), 2)
+                wp["distance"] = round(
+                    haversine_distance(prev_lat, prev_lon, wp["latitude"], wp["longitude"]), 2
+                )
             else:
                 wp["distance"] = 0
-            prev_lat, prev_lon = wp_lat, wp_lon
-    else:
-        # Use nearest neighbor for time/distance optimization (greedy TSP)
-        waypoints = optimize_waypoint_order(waypoints, start_point)
+            prev_lat, prev_lon = wp["latitude"], wp["longitude"]
+
+        total_distance, total_duration = calculate_route_totals(waypoints)
+        route_data = {
+            "route_name": f"Optimized Route - {len(waypoints)} stops",
+            "route_date": datetime.now().date(),
+            "waypoints": waypoints,
+            "total_distance_km": total_distance,
+            "estimated_duration_minutes": total_duration,
+            "total_stops": len(waypoints),
+            "total_deliveries": len(waypoints),
+            "is_optimized": True,
+            "optimization_algorithm": "priority_based",
+        }
+        return create_routes(db, current_org.id, [route_data])[0]
 
-    # Calculate totals
-    total_distance, total_duration = calculate_route_totals(waypoints)
+    plan, departure, start_point = plan_delivery_routes(db, deliveries, optimize_in, vehicles=1)
+    if plan.unassigned:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=(
+                "Deliveries cannot be served by one vehicle within their time windows, "
+                f"capacity or route duration: {[stop.key['delivery_id'] for stop in plan.unassigned]}"
+            ),
+        )
 
-    # Create optimized route
-    route_data = {
-        "route_name": f"Optimized Route - {len(waypoints)} stops",
-        "route_date": datetime.now().date(),
-        "waypoints": waypoints,
-        "total_distance": total_distance,
-        "estimated_time": total_duration,
-        "total_stops": len(waypoints),
-        "total_deliveries": len(delivery_ids),
-        "is_optimized": True,
-        "optimization_algorithm": "nearest_neighbor" if optimize_for != "priority" else "priority_based",
-        "optimization_score": 85.0,  # Placeholder score
-    }
+    route_data = planned_route_data(
+        plan.routes[0], departure, start_point, f"Optimized Route - {len(deliveries)} stops"
+    )
+    return create_routes(db, current_org.id, [route_data])[0]
 
-    # Generate route number
-    last_route = db.query(RouteModel).order_by(RouteModel.id.desc()).first()
-    next_number = 1 if not last_route else last_route.id + 1
-    route_data["route_number"] = f"ROUTE-{datetime.now().strftime('%Y%m%d')}-{next_number:04d}"
 
-    route = route_service.create(db, obj_in=route_data, organization_id=current_org.id)
-    return route
+@router.post("/plan", response_model=RoutePlanResponse)
+def plan_routes(
+    plan_in: RoutePlanRequest,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """Split deliveries into optimized routes for several vehicles
+
+    Business Logic:
+    - Uses up to max_vehicles routes, opening a new one only when the
+      deliveries no longer fit the current routes
+    - Respects per-delivery time windows, vehicle capacity and maximum
+      route duration
+    - Relocates deliveries between routes when that lowers the total
+    - Creates one route per vehicle used; deliveries no vehicle can serve
+      are returned as unassigned
+    """
+    deliveries = _fetch_deliveries(db, current_org.id, plan_in.delivery_ids)
+    plan, departure, start_point = plan_delivery_routes(
+        db, deliveries, plan_in, vehicles=plan_in.max_vehicles
+    )
+
+    routes_data = [
+        planned_route_data(
+            route,
+            departure,
+            start_point,
+            f"Planned Route {index}/{len(plan.routes)} - {len(route.stops)} stops",
+        )
+        for index, route in enumerate(plan.routes, 1)
+    ]
+    routes = create_routes(db, current_org.id, routes_data) if routes_data else []
+    return RoutePlanResponse(
+        routes=[RouteResponse.model_validate(route) for route in routes],
+        unassigned_delivery_ids=[stop.key["delivery_id"] for stop in plan.unassigned],
+    )
 
 
 @router.post("/{route_id}/assign", response_model=RouteResponse)
@@ -11,8 +11,15 @@ from app.core.database import get_db
 from app.core.dependencies import get_current_organization, get_current_user
 from app.models.tenant.organization import Organization
 from app.models.operations.delivery import Delivery, DeliveryStatus
-from app.services.operations import zone_service
-from app.schemas.operations.zone import ZoneCreate, ZoneMetrics, ZoneResponse, ZoneUpdate
+from app.services.operations import zone_index_service, zone_service
+from app.schemas.operations.zone import (
+    ZoneCreate,
+    ZoneLocateRequest,
+    ZoneLocateResponse,
+    ZoneMetrics,
+    ZoneResponse,
+    ZoneUpdate,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -265,6 +272,27 @@ def list_zones_at_capacity(
     return zones
 
 
+@router.post("/locate", response_model=ZoneLocateResponse)
+def locate_zones(
+    locate_in: ZoneLocateRequest,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
+):
+    """Resolve points to the zones containing them
+
+    Business Logic:
+    - Uses the organization's compiled zone index (no per-zone loop)
+    - Returns one zone id per point, in request order
+    - Points outside every active zone resolve to null
+    - Overlapping zones resolve to the smallest one
+    """
+    zone_ids = zone_index_service.locate_many(
+        db, current_org.id, [(p.latitude, p.longitude) for p in locate_in.points]
+    )
+    return ZoneLocateResponse(zone_ids=zone_ids)
+
+
 @router.get("/{zone_id}", response_model=ZoneResponse)
 def get_zone(
     zone_id: int,
@@ -322,19 +350,14 @@ def create_zone(
     if zone_in.boundaries:
         validate_geojson_boundaries(zone_in.boundaries)
 
-    # Create zone
-    zone = zone_service.create(db, obj_in=zone_in, organization_id=current_org.id)
+        # Calculate coverage area from boundaries if not manually set
+        if not zone_in.coverage_area_km2:
+            coverage_area = calculate_coverage_area(zone_in.boundaries)
+            if coverage_area > 0:
+                zone_in.coverage_area_km2 = coverage_area
 
-    # Calculate coverage area from boundaries if provided and not manually set
-    if zone_in.boundaries and not zone_in.coverage_area_km2:
-        coverage_area = calculate_coverage_area(zone_in.boundaries)
-        if coverage_area > 0:
-            zone.coverage_area_km2 = coverage_area
-            db.add(zone)
-            db.commit()
-            db.refresh(zone)
-
-    return zone
+    # Create zone (also adds it to the zone index)
+    return zone_service.create(db, obj_in=zone_in, organization_id=current_org.id)
 
 
 @router.put("/{zone_id}", response_model=ZoneResponse)
@@ -349,6 +372,14 @@ def update_zone(
     zone = zone_service.get(db, id=zone_id)
     if not zone or zone.organization_id != current_org.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Zone not found")
+
+    if zone_in.boundaries:
+        validate_geojson_boundaries(zone_in.boundaries)
+        if not zone_in.coverage_area_km2:
+            coverage_area = calculate_coverage_area(zone_in.boundaries)
+            if coverage_area > 0:
+                zone_in.coverage_area_km2 = coverage_area
+
     zone = zone_service.update(db, db_obj=zone, obj_in=zone_in)
     return zone
 
@@ -378,7 +409,7 @@ def delete_zone(
             detail="Cannot delete zone with active couriers",
         )
 
-    zone_service.remove(db, id=zone_id)
+    zone_service.delete(db, id=zone_id)
     return None
 
 
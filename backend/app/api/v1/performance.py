@@ -9,13 +9,16 @@ from typing import Any, Dict, Optional
 
 import psutil
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 
 from app.core.cache import cache_manager
 from app.core.database import get_db
+from app.core.password_hashing import password_hashing
 from app.core.performance_config import performance_config
-from app.middleware.performance import performance_metrics
-from app.core.query_optimizer import n1_detector, query_analyzer
+from app.middleware.performance import performance_metrics, render_prometheus
+from app.core.query_optimizer import query_profiler
+from app.services.api_key_service import api_key_service
 
 logger = logging.getLogger(__name__)
 
@@ -55,8 +58,10 @@ def get_performance_metrics():
                     "hit_rate_min": performance_config.thresholds.cache_hit_ratio_min,
                 },
             },
+            "password_hashing": password_hashing.get_metrics(),
+            "api_keys": api_key_service.get_stats(),
             "database": {
-                "queries": query_analyzer.get_stats(),
+                "queries": query_profiler.get_stats(),
                 "thresholds": {
                     "avg_query_ms": performance_config.thresholds.db_query_avg,
                     "p95_query_ms": performance_config.thresholds.db_query_p95,
@@ -86,6 +91,26 @@ def get_performance_metrics():
         return {"error": str(e), "timestamp": datetime.utcnow().isoformat()}
 
 
+@router.get(
+    "/metrics/prometheus",
+    summary="Request metrics in Prometheus text format",
+    response_class=PlainTextResponse,
+)
+def get_prometheus_metrics():
+    """
+    Per-route request metrics for Prometheus scraping
+
+    Includes latency and response size histograms, status counts, in-flight
+    requests and db/cache/external time. Aggregated across workers when
+    PROMETHEUS_MULTIPROC_DIR is set. Password hashing latency and queue
+    depth are per worker.
+    """
+    return PlainTextResponse(
+        render_prometheus(performance_metrics.collect()) + password_hashing.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 @router.get("/health", summary="System health check")
 def health_check(db: Session = Depends(get_db)):
     """
@@ -172,22 +197,36 @@ def get_slow_queries(limit: int = Query(10, ge=1, le=100)):
         limit: Maximum number of queries to return (1-100)
 
     Returns:
-        List of slow queries with execution time
+        Slowest statements (bounded top-K) with the endpoint that ran them,
+        and the fingerprints with the most total time
     """
     try:
-        slow_queries = query_analyzer.get_slow_queries(limit=limit)
+        slow_queries = query_profiler.get_slow_queries(limit=limit)
 
         return {
-            "total_slow_queries": len(slow_queries),
-            "threshold_ms": performance_config.monitoring.slow_query_threshold * 1000,
+            "total_slow_queries": query_profiler.get_stats()["slow_queries"],
+            "threshold_ms": query_profiler.slow_threshold * 1000,
             "queries": [
                 {
                     "statement": query["statement"],
+                    "fingerprint": query["fingerprint"],
+                    "endpoint": query["endpoint"],
                     "duration_ms": query["duration"] * 1000,
                     "timestamp": datetime.fromtimestamp(query["timestamp"]).isoformat(),
                 }
                 for query in slow_queries
             ],
+            "fingerprints": [
+                {
+                    "fingerprint": entry["fingerprint"][:500],
+                    "count": entry["count"],
+                    "total_ms": entry["total_time"] * 1000,
+                    "avg_ms": entry["avg_time"] * 1000,
+                    "max_ms": entry["max_time"] * 1000,
+                    "histogram_ms": entry["histogram_ms"],
+                }
+                for entry in query_profiler.get_fingerprints(limit=limit)
+            ],
         }
     except Exception as e:
         logger.error(f"Error getting slow queries: {e}")
@@ -247,7 +286,7 @@ def reset_query_analyzer():
     Useful for starting fresh performance measurements
     """
     try:
-        query_analyzer.reset_stats()
+        query_profiler.reset()
         performance_metrics.reset()
 
         return {
@@ -317,29 +356,27 @@ def get_n1_query_patterns():
     Get detected N+1 query patterns
 
     Returns:
-        Query patterns that may indicate N+1 problems
+        Query fingerprints repeated at least `threshold` times within a single
+        request, grouped by endpoint
     """
     try:
-        patterns = n1_detector.get_patterns()
-
-        # Filter patterns that exceed threshold
-        suspicious_patterns = {
-            pattern: count for pattern, count in patterns.items() if count >= n1_detector.threshold
-        }
+        patterns = query_profiler.get_n1_patterns()
+        threshold = query_profiler.n1_threshold
 
         return {
-            "threshold": n1_detector.threshold,
+            "threshold": threshold,
             "total_patterns": len(patterns),
-            "suspicious_patterns": len(suspicious_patterns),
+            "endpoints": len({p["endpoint"] for p in patterns}),
             "patterns": [
                 {
-                    "pattern": pattern[:200],  # Truncate long patterns
-                    "count": count,
-                    "severity": "high" if count >= n1_detector.threshold * 2 else "medium",
+                    "endpoint": p["endpoint"],
+                    "pattern": p["fingerprint"][:200],  # Truncate long patterns
+                    "requests": p["requests"],
+                    "executions": p["executions"],
+                    "max_per_request": p["max_per_request"],
+                    "severity": "high" if p["max_per_request"] >= threshold * 2 else "medium",
                 }
-                for pattern, count in sorted(
-                    suspicious_patterns.items(), key=lambda x: x[1], reverse=True
-                )
+                for p in patterns
             ],
         }
     except Exception as e:
@@ -5,8 +5,9 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
-from app.core.dependencies import get_current_user, get_db
+from app.core.dependencies import get_current_organization, get_current_user, get_db
 from app.models.support import EscalationLevel, TicketCategory, TicketPriority, TicketStatus
+from app.models.tenant.organization import Organization
 from app.models.user import User
 from app.schemas.support import (
     CannedResponseCreate,
@@ -95,9 +96,10 @@ def create_ticket(
 def get_ticket_statistics(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    current_org: Organization = Depends(get_current_organization),
 ):
     """Get ticket statistics"""
-    return ticket_service.get_statistics(db)
+    return ticket_service.get_statistics(db, organization_id=current_org.id)
 
 
 @router.get("/open", response_model=List[TicketList])
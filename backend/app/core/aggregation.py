@@ -0,0 +1,180 @@
+"""
+SQL Aggregation Builder
+
+Computes a metrics endpoint with one aggregate query instead of one COUNT per
+status plus Python loops over loaded rows. Each metric is a named aggregate
+with an optional ``FILTER (WHERE ...)`` clause, so counts per status,
+averages and percentiles over the same rows come back as a single row:
+
+    metrics = (
+        Aggregation(db, PriorityQueueEntry, PriorityQueueEntry.organization_id == org_id)
+        .count("total")
+        .count("queued", PriorityQueueEntry.status == QueueStatus.QUEUED)
+        .count_each("by_priority", PriorityQueueEntry.priority, QueuePriority)
+        .avg("avg_wait", PriorityQueueEntry.time_in_queue_minutes)
+        .percentile("p90_wait", PriorityQueueEntry.time_in_queue_minutes, 0.9)
+        .execute()
+    )
+
+Percentiles use ``percentile_cont`` on PostgreSQL (ordered-set aggregates take
+no FILTER clause, so conditions null out non-matching rows inside WITHIN
+GROUP); other dialects (SQLite in tests) read the filtered column sorted and
+interpolate the same way.
+
+``cached_metrics`` memoizes a computed result per (organization, period) for
+``CacheConfig.metrics_ttl`` seconds.
+"""
+
+import enum
+import logging
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache_manager
+from app.core.performance_config import performance_config
+
+logger = logging.getLogger(__name__)
+
+
+def _number(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def _interpolate(values: List[float], fraction: float) -> Optional[float]:
+    """Continuous percentile of sorted values (matches percentile_cont)"""
+    if not values:
+        return None
+    position = fraction * (len(values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+class Aggregation:
+    """Named aggregates over one filtered table, evaluated in a single query"""
+
+    def __init__(self, db: Session, model: Any, *filters: Any):
+        self.db = db
+        self.model = model
+        self.filters = list(filters)
+        self.dialect = db.get_bind().dialect.name
+        self._joins: List[Tuple[Any, Any]] = []
+        self._metrics: List[Tuple[str, Any, Callable[[Any], Any]]] = []
+        self._groups: Dict[str, List[Tuple[str, str]]] = {}
+        self._percentiles: List[Tuple[str, Any, float, Tuple[Any, ...]]] = []
+
+    def join(self, target: Any, onclause: Any) -> "Aggregation":
+        self._joins.append((target, onclause))
+        return self
+
+    def where(self, *filters: Any) -> "Aggregation":
+        self.filters.extend(filters)
+        return self
+
+    @staticmethod
+    def _filtered(aggregate: Any, conditions: Tuple[Any, ...]) -> Any:
+        return aggregate.filter(and_(*conditions)) if conditions else aggregate
+
+    def count(self, name: str, *conditions: Any) -> "Aggregation":
+        """Number of rows matching ``conditions``"""
+        self._metrics.append((name, self._filtered(func.count(), conditions), lambda v: int(v or 0)))
+        return self
+
+    def count_each(
+        self, name: str, column: Any, values: Iterable[Any], *conditions: Any
+    ) -> "Aggregation":
+        """Row count per value of ``column``, returned as {value: count}
+
+        One FILTER aggregate per value, so every value appears (with 0) and
+        the result stays a single row.
+        """
+        labels = []
+        for value in values:
+            key = value.value if isinstance(value, enum.Enum) else str(value)
+            label = f"{name}.{key}"
+            self.count(label, column == value, *conditions)
+            labels.append((key, label))
+        self._groups[name] = labels
+        return self
+
+    def sum(self, name: str, expression: Any, *conditions: Any) -> "Aggregation":
+        self._metrics.append((name, self._filtered(func.sum(expression), conditions), _number))
+        return self
+
+    def avg(self, name: str, expression: Any, *conditions: Any) -> "Aggregation":
+        self._metrics.append((name, self._filtered(func.avg(expression), conditions), _number))
+        return self
+
+    def percentile(
+        self, name: str, expression: Any, fraction: float, *conditions: Any
+    ) -> "Aggregation":
+        """Continuous percentile (0 < fraction < 1) of non-null ``expression``"""
+        if self.dialect == "postgresql":
+            if conditions:
+                expression = case((and_(*conditions), expression))
+            aggregate = func.percentile_cont(fraction).within_group(expression)
+            self._metrics.append((name, aggregate, _number))
+        else:
+            self._percentiles.append((name, expression, fraction, conditions))
+        return self
+
+    def seconds_between(self, end: Any, start: Any) -> Any:
+        """SQL expression for ``end - start`` in seconds"""
+        if self.dialect == "sqlite":
+            return (func.julianday(end) - func.julianday(start)) * 86400.0
+        return func.extract("epoch", end - start)
+
+    def _query(self, *columns: Any):
+        query = self.db.query(*columns).select_from(self.model)
+        for target, onclause in self._joins:
+            query = query.join(target, onclause)
+        return query.filter(*self.filters)
+
+    def _metrics_query(self):
+        return self._query(
+            *(aggregate.label(f"m{i}") for i, (_, aggregate, _) in enumerate(self._metrics))
+        )
+
+    def execute(self) -> Dict[str, Any]:
+        """Run the aggregate query and return {name: value}"""
+        result: Dict[str, Any] = {}
+        if self._metrics:
+            row = self._metrics_query().one()
+            for (name, _, convert), value in zip(self._metrics, row):
+                result[name] = convert(value)
+
+        for name, expression, fraction, conditions in self._percentiles:
+            values = [
+                float(value)
+                for (value,) in self._query(expression)
+                .filter(*conditions, expression.isnot(None))
+                .order_by(expression)
+            ]
+            result[name] = _interpolate(values, fraction)
+
+        for name, labels in self._groups.items():
+            result[name] = {key: result.pop(label) for key, label in labels}
+        return result
+
+
+def cached_metrics(
+    namespace: str,
+    organization_id: Optional[int],
+    period: str,
+    compute: Callable[[], Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Return ``compute()`` cached per (organization, period)
+
+    ``compute`` must return a JSON-serializable dict.
+    """
+    key = f"{organization_id or 'all'}:{period}"
+    value = cache_manager.get(namespace, key)
+    if value is None:
+        value = compute()
+        cache_manager.set(namespace, key, value, ttl=performance_config.cache.metrics_ttl)
+    return value
@@ -13,6 +13,7 @@ import aiofiles
 import httpx
 
 from app.core.performance_config import performance_config
+from app.core.request_timing import timed
 
 logger = logging.getLogger(__name__)
 
@@ -96,7 +97,8 @@ class AsyncHTTPClient:
             await self.start()
 
         try:
-            response = await self._client.get(url, **kwargs)
+            with timed("external"):
+                response = await self._client.get(url, **kwargs)
             response.raise_for_status()
             return response
         except httpx.HTTPError as e:
@@ -109,7 +111,8 @@ class AsyncHTTPClient:
             await self.start()
 
         try:
-            response = await self._client.post(url, **kwargs)
+            with timed("external"):
+                response = await self._client.post(url, **kwargs)
             response.raise_for_status()
             return response
         except httpx.HTTPError as e:
@@ -122,7 +125,8 @@ class AsyncHTTPClient:
             await self.start()
 
         try:
-            response = await self._client.put(url, **kwargs)
+            with timed("external"):
+                response = await self._client.put(url, **kwargs)
             response.raise_for_status()
             return response
         except httpx.HTTPError as e:
@@ -135,7 +139,8 @@ class AsyncHTTPClient:
             await self.start()
 
         try:
-            response = await self._client.delete(url, **kwargs)
+            with timed("external"):
+                response = await self._client.delete(url, **kwargs)
             response.raise_for_status()
             return response
         except httpx.HTTPError as e:
@@ -0,0 +1,239 @@
+"""
+Brute Force Attempt Tracking
+
+Sliding-window failed-login counters shared by every worker:
+- Bucketed counters in Redis (one small HASH per identifier), so recording
+  an attempt is a single pipelined round trip regardless of attempt volume
+- Lockouts as Redis keys that expire on their own
+- A bounded per-process LRU mirror of the last state seen, which answers
+  only while Redis is unavailable (Redis stays authoritative, so a clear()
+  on any worker unlocks the identifier everywhere)
+
+Used by BruteForceProtector for account lockout and by
+SecurityMonitor.detect_brute_force for alerting.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+import redis
+
+from app.core.security_config import BruteForceProtection, security_config
+
+logger = logging.getLogger(__name__)
+
+# Redis layout:
+#   brute_force:attempts:{identifier}   HASH bucket index -> failed attempts (TTL = window)
+#   brute_force:lockout:{identifier}    lockout marker (TTL = lockout duration)
+ATTEMPTS_KEY = "brute_force:attempts:{}"
+LOCKOUT_KEY = "brute_force:lockout:{}"
+
+
+@dataclass
+class _Entry:
+    """Local mirror of one identifier's buckets and lockout"""
+
+    buckets: Dict[int, int] = field(default_factory=dict)
+    locked_until: float = 0.0
+
+
+class BruteForceTracker:
+    """
+    Sliding-window failed attempt counter with lockouts
+
+    The window (lockout_duration_minutes) is split into window_buckets
+    buckets; an attempt increments the current bucket and the count is the
+    sum of the buckets still inside the window. Memory per identifier is
+    bounded by the bucket count, and identifiers that stop failing expire
+    from Redis with the window and are evicted from the mirror by LRU.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        config: Optional[BruteForceProtection] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Initialize tracker
+
+        Args:
+            redis_client: Optional Redis client (created from REDIS_URL if not provided)
+            config: Brute force settings (defaults to security_config.brute_force)
+            clock: Epoch seconds source
+        """
+        self.config = config or security_config.brute_force
+        self.clock = clock
+        self.redis = redis_client
+        if not self.redis:
+            try:
+                from app.config.settings import settings
+
+                redis_url = security_config.rate_limit.storage_uri or getattr(
+                    settings, "REDIS_URL", None
+                )
+                if redis_url:
+                    self.redis = redis.from_url(
+                        redis_url, decode_responses=True, socket_connect_timeout=5, socket_timeout=5
+                    )
+            except Exception:
+                self.redis = None
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def window_seconds(self) -> int:
+        return self.config.lockout_duration_minutes * 60
+
+    @property
+    def bucket_seconds(self) -> int:
+        return max(1, self.window_seconds // max(1, self.config.window_buckets))
+
+    def _bucket(self, now: float) -> int:
+        return int(now // self.bucket_seconds)
+
+    def _oldest_bucket(self, now: float) -> int:
+        """First bucket index still inside the window"""
+        return self._bucket(now) - self.window_seconds // self.bucket_seconds + 1
+
+    def _entry(self, identifier: str, create: bool = True) -> Optional[_Entry]:
+        """Mirror entry, marked most recently used (caller holds the lock)"""
+        entry = self._entries.get(identifier)
+        if entry is None:
+            if not create:
+                return None
+            entry = self._entries[identifier] = _Entry()
+            while len(self._entries) > self.config.max_tracked_identifiers:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(identifier)
+        return entry
+
+    def _mirror(self, identifier: str, buckets: Dict[int, int], now: float) -> int:
+        """Replace the mirrored buckets, dropping expired ones; returns the count"""
+        oldest = self._oldest_bucket(now)
+        live = {bucket: n for bucket, n in buckets.items() if bucket >= oldest}
+        with self._lock:
+            self._entry(identifier).buckets = live
+        return sum(live.values())
+
+    def _lock_out(self, identifier: str, now: float) -> None:
+        with self._lock:
+            self._entry(identifier).locked_until = now + self.window_seconds
+
+    def record_failure(self, identifier: str) -> int:
+        """
+        Record a failed attempt
+
+        Args:
+            identifier: User identifier (email, IP, etc.)
+
+        Returns:
+            Failed attempts inside the window, including this one
+        """
+        now = self.clock()
+        bucket = self._bucket(now)
+
+        if self.redis:
+            key = ATTEMPTS_KEY.format(identifier)
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.hincrby(key, bucket, 1)
+                pipe.expire(key, self.window_seconds + self.bucket_seconds)
+                pipe.hgetall(key)
+                raw = pipe.execute()[2]
+                buckets = {int(b): int(n) for b, n in raw.items()}
+                stale = [b for b in buckets if b < self._oldest_bucket(now)]
+                if stale:
+                    self.redis.hdel(key, *stale)
+                count = self._mirror(identifier, buckets, now)
+                if count >= self.config.max_attempts:
+                    self.redis.set(LOCKOUT_KEY.format(identifier), 1, ex=self.window_seconds)
+                    self._lock_out(identifier, now)
+                return count
+            except redis.RedisError as e:
+                logger.warning(f"Brute force tracking falling back to local counters: {e}")
+
+        with self._lock:
+            buckets = dict(self._entry(identifier).buckets)
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+        count = self._mirror(identifier, buckets, now)
+        if count >= self.config.max_attempts:
+            self._lock_out(identifier, now)
+        return count
+
+    def failed_attempts(self, identifier: str) -> int:
+        """Failed attempts for identifier inside the window"""
+        now = self.clock()
+        if self.redis:
+            try:
+                raw = self.redis.hgetall(ATTEMPTS_KEY.format(identifier))
+                return self._mirror(identifier, {int(b): int(n) for b, n in raw.items()}, now)
+            except redis.RedisError as e:
+                logger.warning(f"Brute force tracking falling back to local counters: {e}")
+
+        oldest = self._oldest_bucket(now)
+        with self._lock:
+            entry = self._entry(identifier, create=False)
+            if entry is None:
+                return 0
+            return sum(n for bucket, n in entry.buckets.items() if bucket >= oldest)
+
+    def is_locked_out(self, identifier: str) -> bool:
+        """Whether identifier is locked out (the local mirror answers only without Redis)"""
+        now = self.clock()
+        if self.redis:
+            try:
+                ttl_ms = self.redis.pttl(LOCKOUT_KEY.format(identifier))
+            except redis.RedisError as e:
+                logger.warning(f"Brute force tracking falling back to local counters: {e}")
+            else:
+                locked = bool(ttl_ms and ttl_ms > 0)
+                with self._lock:
+                    entry = self._entry(identifier, create=locked)
+                    if entry is not None:
+                        entry.locked_until = now + ttl_ms / 1000 if locked else 0.0
+                return locked
+
+        with self._lock:
+            entry = self._entry(identifier, create=False)
+            return entry is not None and entry.locked_until > now
+
+    def clear(self, identifier: str) -> None:
+        """Forget attempts and lockout for identifier (e.g. after a successful login)"""
+        with self._lock:
+            self._entries.pop(identifier, None)
+        if self.redis:
+            try:
+                self.redis.delete(ATTEMPTS_KEY.format(identifier), LOCKOUT_KEY.format(identifier))
+            except redis.RedisError as e:
+                logger.warning(f"Failed to clear brute force state for {identifier}: {e}")
+
+    @property
+    def tracked_identifiers(self) -> int:
+        """Identifiers currently held in the local mirror"""
+        return len(self._entries)
+
+
+# Global tracker instance
+_brute_force_tracker: Optional[BruteForceTracker] = None
+
+
+def get_brute_force_tracker() -> BruteForceTracker:
+    """
+    Get global brute force tracker instance
+
+    Returns:
+        BruteForceTracker instance
+    """
+    global _brute_force_tracker
+
+    if _brute_force_tracker is None:
+        _brute_force_tracker = BruteForceTracker()
+
+    return _brute_force_tracker
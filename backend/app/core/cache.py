@@ -24,6 +24,7 @@ except ImportError:
     ConnectionPool = None  # type: ignore
 
 from app.core.performance_config import performance_config
+from app.core.request_timing import timed
 
 logger = logging.getLogger(__name__)
 
@@ -162,7 +163,8 @@ class RedisCache:
             return None
 
         try:
-            return self.client.get(key)
+            with timed("cache"):
+                return self.client.get(key)
         except Exception as e:
             logger.error(f"Redis GET error for key {key}: {e}")
             return None
@@ -173,10 +175,11 @@ class RedisCache:
             return False
 
         try:
-            if ttl:
-                return bool(self.client.setex(key, ttl, value))
-            else:
-                return bool(self.client.set(key, value))
+            with timed("cache"):
+                if ttl:
+                    return bool(self.client.setex(key, ttl, value))
+                else:
+                    return bool(self.client.set(key, value))
         except Exception as e:
             logger.error(f"Redis SET error for key {key}: {e}")
             return False
@@ -187,7 +190,8 @@ class RedisCache:
             return False
 
         try:
-            return bool(self.client.delete(key))
+            with timed("cache"):
+                return bool(self.client.delete(key))
         except Exception as e:
             logger.error(f"Redis DELETE error for key {key}: {e}")
             return False
@@ -198,7 +202,8 @@ class RedisCache:
             return False
 
         try:
-            return bool(self.client.exists(key))
+            with timed("cache"):
+                return bool(self.client.exists(key))
         except Exception as e:
             logger.error(f"Redis EXISTS error for key {key}: {e}")
             return False
@@ -209,7 +214,8 @@ class RedisCache:
             return False
 
         try:
-            return bool(self.client.expire(key, ttl))
+            with timed("cache"):
+                return bool(self.client.expire(key, ttl))
         except Exception as e:
             logger.error(f"Redis EXPIRE error for key {key}: {e}")
             return False
@@ -220,10 +226,11 @@ class RedisCache:
             return 0
 
         try:
-            keys = self.client.keys(pattern)
-            if keys:
-                return self.client.delete(*keys)
-            return 0
+            with timed("cache"):
+                keys = self.client.keys(pattern)
+                if keys:
+                    return self.client.delete(*keys)
+                return 0
         except Exception as e:
             logger.error(f"Redis DELETE pattern error for {pattern}: {e}")
             return 0
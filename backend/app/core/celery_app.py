@@ -227,6 +227,30 @@ def clean_old_audit_logs():
         return {"status": "error", "message": str(e)}
 
 
+@celery_app.task(name="maintain_audit_log_partitions")
+def maintain_audit_log_partitions():
+    """
+    Daily task to pre-create upcoming monthly audit log partitions
+    Runs every day at 1 AM so a missed run never leaves inserts without a partition
+    """
+    from app.core.database import db_manager
+    from app.services.audit_log_service import audit_log_service
+
+    try:
+        db = db_manager.create_session()
+        try:
+            created = audit_log_service.ensure_partitions(db)
+        finally:
+            db.close()
+
+        logger.info(f"Audit log partitions created: {created}")
+        return {"status": "success", "created": created}
+
+    except Exception as e:
+        logger.error(f"Failed to maintain audit log partitions: {str(e)}")
+        return {"status": "error", "message": str(e)}
+
+
 @celery_app.task(name="generate_monthly_reports")
 def generate_monthly_reports():
     """
@@ -353,6 +377,13 @@ def setup_periodic_tasks(sender, **kwargs):
         crontab(day_of_month=1, hour=2, minute=0), clean_old_audit_logs.s(), name="clean-audit-logs"
     )
 
+    # Pre-create audit log partitions daily at 1 AM
+    sender.add_periodic_task(
+        crontab(hour=1, minute=0),
+        maintain_audit_log_partitions.s(),
+        name="audit-log-partitions",
+    )
+
     # Generate monthly reports on 1st at 8 AM
     sender.add_periodic_task(
         crontab(day_of_month=1, hour=8, minute=0),
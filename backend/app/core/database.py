@@ -15,6 +15,7 @@ from sqlalchemy.pool import NullPool, QueuePool
 
 from app.config.settings import settings
 from app.core.performance_config import performance_config
+from app.core.query_optimizer import setup_query_monitoring
 
 logger = logging.getLogger(__name__)
 
@@ -113,6 +114,9 @@ class DatabaseManager:
     def _setup_engine_events(self, engine: Engine, is_read_replica: bool):
         """Setup SQLAlchemy event listeners for monitoring"""
 
+        if performance_config.monitoring.enable_query_profiling:
+            setup_query_monitoring(engine)
+
         if performance_config.monitoring.log_queries:
 
             @event.listens_for(engine, "before_cursor_execute")
@@ -470,6 +474,8 @@ def _get_async_engine():
             pool_pre_ping=performance_config.database.pool_pre_ping,
             echo=performance_config.database.echo_queries,
         )
+        if performance_config.monitoring.enable_query_profiling:
+            setup_query_monitoring(_async_engine.sync_engine)
         logger.info("Created async database engine")
     return _async_engine
 
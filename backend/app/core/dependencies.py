@@ -12,6 +12,7 @@ Exports:
     - get_current_superuser: Get authenticated superuser
     - get_current_organization: Get current organization from JWT token
     - get_tenant_db_session: Get tenant-scoped database session with RLS
+    - get_current_api_key: Verify the X-API-Key header of an integration call
 """
 
 from typing import Generator, Optional
@@ -28,6 +29,7 @@ from app.core.token_blacklist import is_token_blacklisted
 from app.models.tenant.organization import Organization
 from app.models.user import User
 from app.schemas.token import TokenPayload
+from app.services.api_key_service import ApiKeyIdentity, api_key_service
 from app.services.user_service import user_service
 
 # Re-export get_db for convenience
@@ -38,6 +40,7 @@ __all__ = [
     "get_current_superuser",
     "get_current_organization",
     "get_tenant_db_session",
+    "get_current_api_key",
     "oauth2_scheme",
 ]
 
@@ -133,6 +136,34 @@ def get_current_superuser(current_user: User = Depends(get_current_user)) -> Use
     return current_user
 
 
+def get_current_api_key(request: Request) -> ApiKeyIdentity:
+    """
+    Verify the API key of an integration call.
+
+    Served from the per-process key cache without a database session; usage
+    is counted in memory and written by the api_key_service flusher.
+
+    Not used by any route yet: the integration routes still authenticate
+    users with JWTs. Routes called by API key clients should depend on it
+    instead of get_current_user.
+
+    Args:
+        request: Incoming request carrying the X-API-Key header
+
+    Returns:
+        ApiKeyIdentity: The verified key
+
+    Raises:
+        UnauthorizedException: 401 if the key is missing, unknown, revoked or expired
+        ForbiddenException: 403 if the client IP is not whitelisted
+        RateLimitExceededException: 429 if a per-key limit is exhausted
+    """
+    client_ip = request.client.host if request.client else None
+    identity = api_key_service.authenticate(request.headers.get("X-API-Key"), client_ip)
+    request.state.api_key = identity
+    return identity
+
+
 # ============================================================================
 # Multi-Tenancy Dependencies
 # ============================================================================
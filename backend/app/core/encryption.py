@@ -6,6 +6,8 @@ This module provides encryption utilities for sensitive data including:
 - Data masking for PII display
 - Key derivation and management
 - Encrypted field utilities
+- Blind indexes (keyed HMAC) for equality lookups on encrypted fields
+- Lazily decrypted model attributes and bulk decryption for exports
 - Integration with environment-based key management
 
 Author: BARQ Security Team
@@ -13,15 +15,24 @@ Last Updated: 2025-12-02
 """
 
 import base64
+import binascii
 import hashlib
+import hmac
+import multiprocessing
 import os
+import re
 import secrets
-from typing import Any, Optional, Union
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from sqlalchemy import Text
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.types import TypeDecorator
 
 from app.core.security_config import security_config
 
@@ -41,12 +52,18 @@ class FieldEncryptor:
     - Unique nonce for each encryption
     - Key derivation from master key
     - Base64 encoding for storage
+    - One cipher object per key, shared by all instances using that key
     """
 
     ALGORITHM = "AES-256-GCM"
     KEY_SIZE = 32  # 256 bits
     NONCE_SIZE = 12  # 96 bits (recommended for GCM)
 
+    # Derived keys and ciphers are reused across instances: PBKDF2 costs
+    # 100k iterations and AESGCM validates its key on construction
+    _derived_keys: Dict[Tuple[bytes, bytes], bytes] = {}
+    _ciphers: Dict[bytes, AESGCM] = {}
+
     def __init__(self, master_key: Optional[bytes] = None):
         """
         Initialize field encryptor
@@ -65,6 +82,16 @@ class FieldEncryptor:
             # Derive encryption key from secret key
             self._master_key = self._derive_key(key_str.encode())
 
+        self._cipher = self._cipher_for(self._master_key)
+
+    @classmethod
+    def _cipher_for(cls, key: bytes) -> AESGCM:
+        fingerprint = hashlib.sha256(key).digest()
+        cipher = cls._ciphers.get(fingerprint)
+        if cipher is None:
+            cipher = cls._ciphers[fingerprint] = AESGCM(key)
+        return cipher
+
     def _derive_key(self, password: bytes, salt: Optional[bytes] = None) -> bytes:
         """
         Derive encryption key from password using PBKDF2
@@ -81,15 +108,18 @@ class FieldEncryptor:
             # In production, consider using per-organization salts stored securely
             salt = b"barq_encryption_salt_v1_do_not_change"
 
-        kdf = PBKDF2(
-            algorithm=hashes.SHA256(),
-            length=self.KEY_SIZE,
-            salt=salt,
-            iterations=100000,
-            backend=default_backend(),
-        )
+        derived = self._derived_keys.get((password, salt))
+        if derived is None:
+            kdf = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=self.KEY_SIZE,
+                salt=salt,
+                iterations=100000,
+                backend=default_backend(),
+            )
+            derived = self._derived_keys[(password, salt)] = kdf.derive(password)
 
-        return kdf.derive(password)
+        return derived
 
     def encrypt(self, plaintext: str) -> str:
         """
@@ -111,11 +141,8 @@ class FieldEncryptor:
             # Generate random nonce
             nonce = secrets.token_bytes(self.NONCE_SIZE)
 
-            # Create cipher
-            cipher = AESGCM(self._master_key)
-
             # Encrypt (returns ciphertext + authentication tag)
-            ciphertext = cipher.encrypt(
+            ciphertext = self._cipher.encrypt(
                 nonce, plaintext.encode("utf-8"), None  # No additional authenticated data
             )
 
@@ -152,17 +179,67 @@ class FieldEncryptor:
             nonce = encrypted_bytes[: self.NONCE_SIZE]
             ciphertext = encrypted_bytes[self.NONCE_SIZE :]
 
-            # Create cipher
-            cipher = AESGCM(self._master_key)
-
             # Decrypt (automatically verifies authentication tag)
-            plaintext_bytes = cipher.decrypt(nonce, ciphertext, None)
+            plaintext_bytes = self._cipher.decrypt(nonce, ciphertext, None)
 
             return plaintext_bytes.decode("utf-8")
 
         except Exception as e:
             raise EncryptionError(f"Decryption failed: {str(e)}")
 
+    def decrypt_stored(self, value: Optional[str]) -> Optional[str]:
+        """
+        Decrypt a value read from an encrypted column
+
+        Legacy plaintext (written before the column was encrypted) is
+        returned as-is; ciphertext that fails to decrypt is returned as an
+        ``[ENCRYPTED: ...]`` marker instead of raising.
+        """
+        if value is None:
+            return None
+
+        try:
+            return self.decrypt(value)
+        except EncryptionError:
+            if not looks_encrypted(value):
+                return value
+            # Return encrypted value if decryption fails (for debugging)
+            return f"[ENCRYPTED: {value[:20]}...]"
+
+    def decrypt_many(
+        self, values: Sequence[Optional[str]], workers: Optional[int] = None
+    ) -> List[Optional[str]]:
+        """
+        Decrypt stored values in bulk for exports
+
+        Large batches are split into chunks and decrypted in a process pool
+        when workers > 1 (defaults to BULK_DECRYPT_WORKERS). Processes that
+        cannot fork workers (Celery prefork children are daemonic) and
+        batches below the parallel threshold decrypt in the calling thread.
+
+        Args:
+            values: Stored values, as read from encrypted columns
+            workers: Optional worker process count
+
+        Returns:
+            Plaintext values in the same order (see decrypt_stored)
+        """
+        config = security_config.encryption
+        workers = config.bulk_decrypt_workers if workers is None else workers
+        if (
+            workers <= 1
+            or len(values) < config.bulk_decrypt_min_parallel
+            or multiprocessing.current_process().daemon
+        ):
+            return [self.decrypt_stored(value) for value in values]
+
+        size = config.bulk_decrypt_chunk_size
+        chunks = [values[i : i + size] for i in range(0, len(values), size)]
+        results: List[Optional[str]] = []
+        for chunk in _decrypt_pool(self._master_key, workers).map(_decrypt_chunk, chunks):
+            results.extend(chunk)
+        return results
+
     def encrypt_dict(self, data: dict, fields_to_encrypt: list) -> dict:
         """
         Encrypt specific fields in a dictionary
@@ -368,8 +445,6 @@ class HashUtility:
         Returns:
             Hex-encoded HMAC
         """
-        import hmac
-
         if isinstance(data, str):
             data = data.encode("utf-8")
         if isinstance(key, str):
@@ -378,35 +453,275 @@ class HashUtility:
         return hmac.new(key, data, hashlib.sha256).hexdigest()
 
 
-class EncryptedField:
+def looks_encrypted(value: str) -> bool:
+    """
+    Check whether a stored value has the shape of FieldEncryptor output
+
+    Used to tell ciphertext that fails to decrypt apart from legacy plaintext
+    written before a column was encrypted.
+    """
+    try:
+        raw = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        return False
+    # nonce + at least one byte + 16 byte GCM tag
+    return len(raw) > FieldEncryptor.NONCE_SIZE + 16
+
+
+class EncryptedField(TypeDecorator):
     """
     SQLAlchemy custom type for encrypted fields
 
+    Values are stored as base64 AES-256-GCM ciphertext. Rows written before
+    the column was encrypted are returned as-is until the blind index
+    backfill re-encrypts them. Ciphertext cannot be compared in SQL; pair
+    the column with a blind index (see BlindIndexMixin) for lookups.
+
     Usage:
         class User(Base):
             national_id = Column(EncryptedField)
     """
 
-    def __init__(self):
-        self.encryptor = FieldEncryptor()
+    impl = Text
+    cache_ok = True
+
+    @property
+    def encryptor(self) -> FieldEncryptor:
+        return get_encryptor()
 
     def process_bind_param(self, value: Any, dialect) -> Optional[str]:
         """Encrypt value before storing in database"""
         if value is None:
             return None
+        if not security_config.encryption.enable_field_encryption:
+            return str(value)
 
         return self.encryptor.encrypt(str(value))
 
     def process_result_value(self, value: Any, dialect) -> Optional[str]:
         """Decrypt value when retrieving from database"""
+        return self.encryptor.decrypt_stored(value)
+
+
+def encrypted_attribute(column_attr: str) -> hybrid_property:
+    """
+    Plaintext view of a column holding ciphertext, decrypted on first access
+
+    Unlike EncryptedField, loading a row does not decrypt anything: the
+    mapped column keeps the stored value and this attribute decrypts it
+    when read, caching the result on the instance until the stored value
+    changes. Assigning plaintext encrypts it. In SQL expressions the
+    attribute refers to the stored column (useful for IS NULL checks).
+
+    Usage:
+        class Courier(Base):
+            _national_id = Column("national_id", Text)
+            national_id = encrypted_attribute("_national_id")
+    """
+
+    def fget(self):
+        stored = getattr(self, column_attr)
+        if stored is None:
+            return None
+        cache = self.__dict__.setdefault("_decrypted_values", {})
+        cached = cache.get(column_attr)
+        if cached is not None and cached[0] == stored:
+            return cached[1]
+        value = get_encryptor().decrypt_stored(stored)
+        cache[column_attr] = (stored, value)
+        return value
+
+    def fset(self, value):
+        if value is None:
+            setattr(self, column_attr, None)
+            return
+        value = str(value)
+        if security_config.encryption.enable_field_encryption:
+            stored = get_encryptor().encrypt(value)
+        else:
+            stored = value
+        setattr(self, column_attr, stored)
+        self.__dict__.setdefault("_decrypted_values", {})[column_attr] = (stored, value)
+
+    def expr(cls):
+        return getattr(cls, column_attr)
+
+    prop = hybrid_property(fget, fset, expr=expr)
+    prop.column_attr = column_attr
+    return prop
+
+
+def decrypt_attributes(
+    objects: Iterable[Any], *fields: str, workers: Optional[int] = None
+) -> None:
+    """
+    Decrypt encrypted_attribute fields of many objects in one batch
+
+    For exports that read the same fields from every row: the stored values
+    go through FieldEncryptor.decrypt_many (optionally in a worker pool) and
+    the results are cached on each object, so the attribute reads that
+    follow do no crypto.
+
+    Args:
+        objects: Model instances of one class
+        fields: Names of encrypted_attribute properties to decrypt
+        workers: Optional worker process count (see decrypt_many)
+    """
+    objects = list(objects)
+    if not objects:
+        return
+
+    model = type(objects[0])
+    column_attrs = [model.__dict__[field].column_attr for field in fields]
+    stored = [getattr(obj, attr) for attr in column_attrs for obj in objects]
+    decrypted = iter(get_encryptor().decrypt_many(stored, workers=workers))
+    for attr in column_attrs:
+        for obj in objects:
+            value = next(decrypted)
+            stored_value = getattr(obj, attr)
+            if stored_value is not None:
+                obj.__dict__.setdefault("_decrypted_values", {})[attr] = (stored_value, value)
+
+
+def normalize_identifier(value: str) -> str:
+    """Document numbers and IBANs: drop spaces and dashes, compare case-insensitively"""
+    return re.sub(r"[\s\-]", "", value).upper()
+
+
+def normalize_phone(value: str) -> str:
+    """Saudi phone numbers in international form: 0501234567 -> 966501234567"""
+    digits = re.sub(r"\D", "", value)
+    if digits.startswith("00"):
+        digits = digits[2:]
+    if digits.startswith("0"):
+        digits = "966" + digits[1:]
+    elif len(digits) == 9 and digits.startswith("5"):
+        digits = "966" + digits
+    return digits
+
+
+def normalize_text(value: str) -> str:
+    """Free text: trimmed and case-folded"""
+    return value.strip().casefold()
+
+
+class BlindIndexer:
+    """
+    Deterministic keyed HMAC-SHA256 digests for equality search on encrypted fields
+
+    The same normalized value always produces the same digest, so a B-tree
+    index on the digest column supports exact-match lookups without
+    decrypting rows. Digests are keyed per field (the same IBAN gives
+    different digests in different columns) and prefixed with the key
+    version, e.g. ``v2$9f86d0...``.
+
+    Keys come from BLIND_INDEX_KEYS as ``version:secret`` pairs, newest
+    first (``v2:...,v1:...``). New digests use the first key; lookups match
+    digests under every listed key, so the previous key stays listed until
+    the backfill job has rewritten all rows. Without BLIND_INDEX_KEYS a
+    single ``v1`` key is derived from ENCRYPTION_KEY / SECRET_KEY with a
+    salt separate from the encryption key.
+    """
+
+    SEPARATOR = "$"
+    DIGEST_LENGTH = 64  # hex characters
+    NORMALIZERS: Dict[str, Callable[[str], str]] = {
+        "identifier": normalize_identifier,
+        "phone": normalize_phone,
+        "text": normalize_text,
+    }
+
+    def __init__(self, keys: Optional[List[Tuple[str, bytes]]] = None):
+        """
+        Initialize blind indexer
+
+        Args:
+            keys: Optional (version, key) pairs, newest first (defaults to environment)
+        """
+        keys = keys or self._load_keys()
+        if not keys:
+            raise EncryptionError("BLIND_INDEX_KEYS, ENCRYPTION_KEY or SECRET_KEY must be set")
+
+        versions = [version for version, _ in keys]
+        if len(set(versions)) != len(versions) or any(
+            not version or self.SEPARATOR in version for version in versions
+        ):
+            raise EncryptionError(f"Invalid blind index key versions: {versions}")
+
+        self._keys: Dict[str, bytes] = dict(keys)
+        self.current_version = versions[0]
+        self.versions = versions
+
+    @staticmethod
+    def _load_keys() -> List[Tuple[str, bytes]]:
+        configured = os.getenv("BLIND_INDEX_KEYS", "").strip()
+        if configured:
+            keys = []
+            for entry in configured.split(","):
+                version, _, secret = entry.strip().partition(":")
+                if not secret:
+                    raise EncryptionError("BLIND_INDEX_KEYS entries must be version:secret")
+                keys.append((version.strip(), secret.encode()))
+            return keys
+
+        key_str = os.getenv("ENCRYPTION_KEY") or os.getenv("SECRET_KEY")
+        if not key_str:
+            return []
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=b"barq_blind_index_salt_v1_do_not_change",
+            iterations=100000,
+            backend=default_backend(),
+        )
+        return [("v1", kdf.derive(key_str.encode()))]
+
+    def normalize(self, value: Any, kind: str = "identifier") -> str:
+        """Normalize a value before hashing so formatting differences still match"""
+        return self.NORMALIZERS[kind](str(value))
+
+    def _digest(self, version: str, field: str, normalized: str) -> str:
+        message = f"{field}\x00{normalized}".encode("utf-8")
+        mac = hmac.new(self._keys[version], message, hashlib.sha256)
+        return f"{version}{self.SEPARATOR}{mac.hexdigest()}"
+
+    def compute(self, field: str, value: Any, kind: str = "identifier") -> Optional[str]:
+        """
+        Blind index of a value under the current key
+
+        Args:
+            field: Field name the value belongs to (part of the HMAC input)
+            value: Plaintext value
+            kind: Normalizer name (identifier, phone, text)
+
+        Returns:
+            Versioned digest, or None for empty values
+        """
         if value is None:
             return None
+        normalized = self.normalize(value, kind)
+        if not normalized:
+            return None
+        return self._digest(self.current_version, field, normalized)
 
-        try:
-            return self.encryptor.decrypt(value)
-        except EncryptionError:
-            # Return encrypted value if decryption fails (for debugging)
-            return f"[ENCRYPTED: {value[:20]}...]"
+    def candidates(self, field: str, value: Any, kind: str = "identifier") -> List[str]:
+        """Digests of a value under every active key, for lookups during key rotation"""
+        if value is None:
+            return []
+        normalized = self.normalize(value, kind)
+        if not normalized:
+            return []
+        return [self._digest(version, field, normalized) for version in self.versions]
+
+    def version_of(self, digest: str) -> Optional[str]:
+        """Key version a stored digest was computed with"""
+        if not digest or self.SEPARATOR not in digest:
+            return None
+        return digest.split(self.SEPARATOR, 1)[0]
+
+    def is_current(self, digest: Optional[str]) -> bool:
+        """Whether a stored digest uses the current key"""
+        return digest is not None and self.version_of(digest) == self.current_version
 
 
 class SecureTokenGenerator:
@@ -453,8 +768,34 @@ class SecureTokenGenerator:
         return "".join([str(secrets.randbelow(10)) for _ in range(length)])
 
 
-# Global encryptor instance
+# Global encryptor instances
 _default_encryptor: Optional[FieldEncryptor] = None
+_default_blind_indexer: Optional[BlindIndexer] = None
+
+# Bulk decryption worker pools, one per key; each worker holds its own encryptor
+_decrypt_pools: Dict[Tuple[bytes, int], ProcessPoolExecutor] = {}
+_decrypt_pools_lock = threading.Lock()
+_worker_encryptor: Optional[FieldEncryptor] = None
+
+
+def _init_decrypt_worker(master_key: bytes) -> None:
+    global _worker_encryptor
+    _worker_encryptor = FieldEncryptor(master_key=master_key)
+
+
+def _decrypt_chunk(values: Sequence[Optional[str]]) -> List[Optional[str]]:
+    return [_worker_encryptor.decrypt_stored(value) for value in values]
+
+
+def _decrypt_pool(master_key: bytes, workers: int) -> ProcessPoolExecutor:
+    pool_key = (hashlib.sha256(master_key).digest(), workers)
+    with _decrypt_pools_lock:
+        pool = _decrypt_pools.get(pool_key)
+        if pool is None:
+            pool = _decrypt_pools[pool_key] = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_decrypt_worker, initargs=(master_key,)
+            )
+        return pool
 
 
 def get_encryptor() -> FieldEncryptor:
@@ -472,6 +813,21 @@ def get_encryptor() -> FieldEncryptor:
     return _default_encryptor
 
 
+def get_blind_indexer() -> BlindIndexer:
+    """
+    Get global blind indexer instance
+
+    Returns:
+        BlindIndexer instance
+    """
+    global _default_blind_indexer
+
+    if _default_blind_indexer is None:
+        _default_blind_indexer = BlindIndexer()
+
+    return _default_blind_indexer
+
+
 def encrypt_field(plaintext: str) -> str:
     """Convenience function to encrypt a field"""
     return get_encryptor().encrypt(plaintext)
@@ -0,0 +1,304 @@
+"""
+Password Hashing Executor
+
+Runs argon2/bcrypt work in a bounded process pool so that a login storm
+cannot occupy every request thread:
+- Admission control: at most max_in_flight hashes queued or running, the
+  rest are shed at once with 503 and Retry-After
+- Opportunistic rehash of outdated hashes after successful logins, hashed
+  and written by a dedicated rehash thread rather than the request (or the
+  pool's result-handling thread, which must stay free to complete futures)
+- Latency histograms per operation and a queue depth gauge for Prometheus
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import update
+
+from app.core.exceptions import ServiceUnavailableException
+from app.core.performance_config import PasswordHashingConfig, performance_config
+from app.core.security import PasswordHasher
+
+logger = logging.getLogger(__name__)
+
+# Histogram upper bounds in seconds (argon2 at 64 MB takes tens of ms)
+HASH_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+OPERATIONS = ("verify", "hash", "rehash")
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return PasswordHasher.verify_password(plain_password, hashed_password)
+
+
+def _hash(password: str) -> str:
+    return PasswordHasher.hash_password(password)
+
+
+class PasswordHashingExecutor:
+    """
+    Bounded executor for password hashing and verification
+
+    Counts every submitted hash from submission until it finishes. When
+    max_in_flight are outstanding, new calls raise
+    ServiceUnavailableException instead of waiting, so callers are shed
+    in microseconds and request threads stay free for other endpoints.
+    """
+
+    def __init__(self, config: Optional[PasswordHashingConfig] = None):
+        self.config = config or performance_config.password_hashing
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self._stats = {
+            operation: {
+                "count": 0,
+                "duration_sum": 0.0,
+                "buckets": [0] * (len(HASH_LATENCY_BUCKETS) + 1),
+            }
+            for operation in OPERATIONS
+        }
+        self._rejected = 0
+        self._timeouts = 0
+        self._rehashed = 0
+        self._rehash_queue: "queue.Queue[Optional[Tuple[int, str, str]]]" = queue.Queue()
+        self._rehash_thread: Optional[threading.Thread] = None
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        """Process pool, or None to hash in the calling thread"""
+        if self.config.workers <= 0 or multiprocessing.current_process().daemon:
+            return None
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.config.workers)
+            return self._pool
+
+    def _admit(self, limit: int) -> bool:
+        with self._lock:
+            if self._in_flight >= limit:
+                return False
+            self._in_flight += 1
+            return True
+
+    def _finished(self, operation: str, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        bucket = bisect_left(HASH_LATENCY_BUCKETS, elapsed)
+        with self._lock:
+            self._in_flight -= 1
+            stats = self._stats[operation]
+            stats["count"] += 1
+            stats["duration_sum"] += elapsed
+            stats["buckets"][bucket] += 1
+
+    def _submit(self, operation: str, fn: Callable, *args: Any) -> Future:
+        """Admit and start one hash; raises ServiceUnavailableException when saturated"""
+        if not self._admit(self.config.max_in_flight):
+            with self._lock:
+                self._rejected += 1
+            raise ServiceUnavailableException(
+                detail="Too many sign-in attempts in progress. Please try again shortly.",
+                retry_after=self.config.retry_after_seconds,
+            )
+        return self._start(operation, fn, *args)
+
+    def _start(self, operation: str, fn: Callable, *args: Any) -> Future:
+        """Run an admitted hash in the pool (or inline without workers)"""
+        started = time.perf_counter()
+        executor = self._executor()
+        if executor is None:
+            future: Future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            self._finished(operation, started)
+            return future
+
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            self._finished(operation, started)
+            raise
+        future.add_done_callback(lambda _: self._finished(operation, started))
+        return future
+
+    def _result(self, future: Future) -> Any:
+        try:
+            return future.result(timeout=self.config.timeout_seconds)
+        except FutureTimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            raise ServiceUnavailableException(
+                detail="Sign-in is taking longer than usual. Please try again shortly.",
+                retry_after=self.config.retry_after_seconds,
+            )
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify a password in the pool
+
+        Raises:
+            ServiceUnavailableException: When saturated or the hash times out
+        """
+        if not hashed_password:
+            return False
+        return self._result(self._submit("verify", _verify, plain_password, hashed_password))
+
+    def hash(self, password: str) -> str:
+        """Hash a password in the pool (same admission control as verify)"""
+        return self._result(self._submit("hash", _hash, password))
+
+    def rehash_if_needed(self, user_id: int, plain_password: str, hashed_password: str) -> bool:
+        """
+        Upgrade an outdated hash after a successful login, off the request path
+
+        Skipped while more than half of max_in_flight is in use, so rehashes
+        never shed logins. The hash and the database write happen on the
+        rehash thread (also without workers), and the new hash is stored only
+        if the stored hash has not changed in the meantime.
+
+        Returns:
+            True if a rehash was queued
+        """
+        if not self.config.rehash_on_login or not PasswordHasher.needs_rehash(hashed_password):
+            return False
+        if not self._admit(self.config.max_in_flight // 2):
+            return False
+        self._rehash_jobs().put((user_id, plain_password, hashed_password))
+        return True
+
+    def _rehash_jobs(self) -> "queue.Queue[Optional[Tuple[int, str, str]]]":
+        """Queue of the running rehash thread, starting one if needed"""
+        with self._lock:
+            if self._rehash_thread is None or not self._rehash_thread.is_alive():
+                self._rehash_queue = queue.Queue()
+                self._rehash_thread = threading.Thread(
+                    target=self._rehash_worker,
+                    args=(self._rehash_queue,),
+                    name="password-rehash",
+                    daemon=True,
+                )
+                self._rehash_thread.start()
+            return self._rehash_queue
+
+    def _rehash_worker(self, jobs: "queue.Queue[Optional[Tuple[int, str, str]]]") -> None:
+        """Hash and store queued rehashes one at a time until a None sentinel"""
+        while True:
+            job = jobs.get()
+            try:
+                if job is None:
+                    return
+                user_id, plain_password, old_hash = job
+                try:
+                    future = self._start("rehash", _hash, plain_password)
+                    new_hash = future.result(timeout=self.config.timeout_seconds)
+                except Exception as e:
+                    logger.warning(f"Password rehash failed for user {user_id}: {e!r}")
+                    continue
+                self._store_rehash(user_id, old_hash, new_hash)
+            finally:
+                jobs.task_done()
+
+    def _store_rehash(self, user_id: int, old_hash: str, new_hash: str) -> None:
+        from app.core.database import db_manager
+        from app.models.user import User
+
+        try:
+            with db_manager.session_scope() as session:
+                result = session.execute(
+                    update(User)
+                    .where(User.id == user_id, User.hashed_password == old_hash)
+                    .values(hashed_password=new_hash)
+                )
+            if result.rowcount:
+                with self._lock:
+                    self._rehashed += 1
+        except Exception as e:
+            logger.warning(f"Failed to store rehashed password for user {user_id}: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, shed and timed-out calls, and latency per operation"""
+        with self._lock:
+            bounds = [str(b) for b in HASH_LATENCY_BUCKETS] + ["+Inf"]
+            return {
+                "workers": self.config.workers,
+                "in_flight": self._in_flight,
+                "max_in_flight": self.config.max_in_flight,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "rehashed": self._rehashed,
+                "operations": {
+                    operation: {
+                        "count": stats["count"],
+                        "avg_time": stats["duration_sum"] / stats["count"] if stats["count"] else 0,
+                        "histogram_seconds": dict(zip(bounds, stats["buckets"])),
+                    }
+                    for operation, stats in self._stats.items()
+                },
+            }
+
+    def render_prometheus(self) -> str:
+        """Executor metrics in the Prometheus text format (0.0.4)"""
+        with self._lock:
+            stats = {
+                operation: dict(entry, buckets=list(entry["buckets"]))
+                for operation, entry in self._stats.items()
+            }
+            in_flight, rejected, timeouts = self._in_flight, self._rejected, self._timeouts
+
+        name = "barq_password_hash_duration_seconds"
+        lines = [
+            f"# HELP {name} Password hash latency including queue wait",
+            f"# TYPE {name} histogram",
+        ]
+        for operation, entry in stats.items():
+            labels = f'operation="{operation}"'
+            cumulative = 0
+            for bound, count in zip(HASH_LATENCY_BUCKETS, entry["buckets"]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {entry["count"]}')
+            lines.append(f"{name}_sum{{{labels}}} {entry['duration_sum']}")
+            lines.append(f"{name}_count{{{labels}}} {entry['count']}")
+        lines += [
+            "# HELP barq_password_hash_in_flight Password hashes queued or running",
+            "# TYPE barq_password_hash_in_flight gauge",
+            f"barq_password_hash_in_flight {in_flight}",
+            "# HELP barq_password_hash_max_in_flight Admission limit for password hashes",
+            "# TYPE barq_password_hash_max_in_flight gauge",
+            f"barq_password_hash_max_in_flight {self.config.max_in_flight}",
+            "# HELP barq_password_hash_rejected_total Password hashes shed with 503",
+            "# TYPE barq_password_hash_rejected_total counter",
+            f"barq_password_hash_rejected_total {rejected}",
+            "# HELP barq_password_hash_timeouts_total Password hashes that exceeded the timeout",
+            "# TYPE barq_password_hash_timeouts_total counter",
+            f"barq_password_hash_timeouts_total {timeouts}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def shutdown(self) -> None:
+        """Stop the worker processes and rehash thread (both restart on next use)"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            thread, self._rehash_thread = self._rehash_thread, None
+            jobs = self._rehash_queue
+        if thread is not None:
+            jobs.put(None)
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Global executor instance
+password_hashing = PasswordHashingExecutor()
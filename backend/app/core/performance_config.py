@@ -53,6 +53,7 @@ class CacheConfig:
     user_ttl: int = int(os.getenv("CACHE_USER_TTL", "600"))  # 10 minutes
     organization_ttl: int = int(os.getenv("CACHE_ORG_TTL", "1800"))  # 30 minutes
     static_data_ttl: int = int(os.getenv("CACHE_STATIC_TTL", "3600"))  # 1 hour
+    metrics_ttl: int = int(os.getenv("CACHE_METRICS_TTL", "60"))  # admin metric endpoints
 
     # Multi-level caching
     enable_memory_cache: bool = True
@@ -143,6 +144,227 @@ class FileHandlingConfig:
     cdn_secret_key: Optional[str] = os.getenv("CDN_SECRET_KEY")
 
 
+@dataclass
+class AuditLogConfig:
+    """Audit log write pipeline configuration"""
+
+    # Write-behind queue (per worker process)
+    async_writes: bool = os.getenv("AUDIT_LOG_ASYNC", "true").lower() == "true"
+    queue_size: int = int(os.getenv("AUDIT_LOG_QUEUE_SIZE", "10000"))
+    batch_size: int = int(os.getenv("AUDIT_LOG_BATCH_SIZE", "500"))
+    flush_interval_ms: int = int(os.getenv("AUDIT_LOG_FLUSH_INTERVAL_MS", "250"))
+
+    # Spill-to-disk fallback when the database is slow or unavailable
+    spill_dir: str = os.getenv("AUDIT_LOG_SPILL_DIR", "/tmp/barq-audit-spill")
+    slow_flush_threshold_ms: int = int(os.getenv("AUDIT_LOG_SLOW_FLUSH_MS", "2000"))
+
+    # Monthly range partitions on audit_logs.created_at
+    partitions_ahead: int = int(os.getenv("AUDIT_LOG_PARTITIONS_AHEAD", "3"))
+    retention_days: int = int(os.getenv("AUDIT_LOG_RETENTION_DAYS", "365"))
+
+
+@dataclass
+class DashboardRollupConfig:
+    """Dashboard aggregate (rollup) maintenance configuration"""
+
+    # Celery beat interval for draining dirty buckets
+    refresh_interval_seconds: int = int(os.getenv("DASHBOARD_ROLLUP_INTERVAL", "60"))
+
+    # Trailing days recomputed on every refresh (catches late writes)
+    window_days: int = int(os.getenv("DASHBOARD_ROLLUP_WINDOW_DAYS", "2"))
+
+    # History built the first time an organization is rolled up
+    backfill_days: int = int(os.getenv("DASHBOARD_ROLLUP_BACKFILL_DAYS", "190"))
+
+    # Hourly buckets are only kept for recent history
+    hourly_retention_days: int = int(os.getenv("DASHBOARD_ROLLUP_HOURLY_DAYS", "7"))
+
+    # Organizations are re-rolled at least this often even without writes,
+    # so time-relative counts (expiring documents, "this week") stay current
+    max_staleness_seconds: int = int(os.getenv("DASHBOARD_ROLLUP_MAX_STALENESS", "900"))
+
+
+@dataclass
+class PriorityQueueConfig:
+    """Delivery priority queue engine configuration"""
+
+    # Mirror the in-process queue index in Redis sorted sets so every
+    # worker reads the same order
+    use_redis: bool = os.getenv("PRIORITY_QUEUE_USE_REDIS", "true").lower() == "true"
+
+    # The Redis mirror is rebuilt from the database at least this often
+    resync_interval_seconds: int = int(os.getenv("PRIORITY_QUEUE_RESYNC_SECONDS", "3600"))
+
+    # Without Redis, how long an in-process index is trusted before the
+    # database is asked whether another worker changed the queue
+    local_check_interval_seconds: float = float(
+        os.getenv("PRIORITY_QUEUE_LOCAL_CHECK_SECONDS", "2")
+    )
+
+    # Wait estimates: dequeues measured over this trailing window
+    throughput_window_seconds: int = int(os.getenv("PRIORITY_QUEUE_THROUGHPUT_WINDOW", "3600"))
+    min_throughput_samples: int = int(os.getenv("PRIORITY_QUEUE_MIN_SAMPLES", "5"))
+
+    # Used until enough dequeues have been measured
+    default_minutes_per_entry: float = float(os.getenv("PRIORITY_QUEUE_DEFAULT_MINUTES", "15"))
+
+    # Scoring policy for organizations without settings["priority_scoring"]
+    default_scoring_policy: str = os.getenv("PRIORITY_QUEUE_SCORING_POLICY", "linear")
+
+
+@dataclass
+class SLAMonitorConfig:
+    """SLA deadline scheduler configuration"""
+
+    # Keep pending deadlines in a Redis sorted set shared by all workers;
+    # without Redis the poller falls back to indexed database scans
+    use_redis: bool = os.getenv("SLA_MONITOR_USE_REDIS", "true").lower() == "true"
+
+    # Poller cadence; breaches are detected within one interval
+    poll_interval_seconds: float = float(os.getenv("SLA_MONITOR_POLL_SECONDS", "10"))
+
+    # Due deadlines handled per batch, and batches per poller run
+    batch_size: int = int(os.getenv("SLA_MONITOR_BATCH_SIZE", "500"))
+    max_batches_per_tick: int = int(os.getenv("SLA_MONITOR_MAX_BATCHES", "20"))
+
+    # Pending deadlines are re-added from the database at least this often
+    resync_interval_seconds: int = int(os.getenv("SLA_MONITOR_RESYNC_SECONDS", "3600"))
+
+
+@dataclass
+class FeedbackRollupConfig:
+    """Customer feedback rollup maintenance configuration"""
+
+    # Celery beat interval for rebuilding days touched by feedback writes
+    refresh_interval_seconds: int = int(os.getenv("FEEDBACK_ROLLUP_INTERVAL", "60"))
+
+    # Trailing days recomputed on every refresh (catches missed writes)
+    window_days: int = int(os.getenv("FEEDBACK_ROLLUP_WINDOW_DAYS", "2"))
+
+    # Organizations are re-rolled at least this often even without writes
+    max_staleness_seconds: int = int(os.getenv("FEEDBACK_ROLLUP_MAX_STALENESS", "900"))
+
+
+@dataclass
+class ZoneIndexConfig:
+    """Zone polygon index configuration"""
+
+    # Seconds between checks that a worker's cached index still matches the zones table
+    revalidate_seconds: float = float(os.getenv("ZONE_INDEX_REVALIDATE", "30"))
+
+    # Grid cells across a typical (median-sized) zone
+    cells_per_zone: int = int(os.getenv("ZONE_INDEX_CELLS_PER_ZONE", "8"))
+
+    # Upper bound on cells along the longest side of any one zone
+    max_grid_dim: int = int(os.getenv("ZONE_INDEX_MAX_GRID_DIM", "512"))
+
+
+@dataclass
+class GeocodingConfig:
+    """Address geocoding configuration"""
+
+    # Geocoder backend: "offline" (coordinates in the address only) or "nominatim"
+    backend: str = os.getenv("GEOCODER_BACKEND", "offline")
+
+    # Nominatim-compatible search endpoint and optional country restriction
+    nominatim_url: str = os.getenv("GEOCODER_NOMINATIM_URL", "https://nominatim.openstreetmap.org")
+    country_codes: str = os.getenv("GEOCODER_COUNTRY_CODES", "sa")
+    timeout_seconds: float = float(os.getenv("GEOCODER_TIMEOUT", "10"))
+
+    # Addresses sent to the backend per call
+    batch_size: int = int(os.getenv("GEOCODER_BATCH_SIZE", "100"))
+
+    # In-process LRU of normalized address -> coordinates in front of the cache table
+    lru_size: int = int(os.getenv("GEOCODER_LRU_SIZE", "50000"))
+
+    # Hours before an address the backend could not resolve is sent again
+    miss_retry_hours: int = int(os.getenv("GEOCODER_MISS_RETRY_HOURS", "24"))
+
+
+@dataclass
+class RouteOptimizerConfig:
+    """Route optimization engine configuration"""
+
+    # Average city driving speed for haversine travel times
+    average_speed_kmh: float = float(os.getenv("ROUTE_OPTIMIZER_SPEED_KMH", "30"))
+
+    # Time spent at each stop unless the stop sets its own
+    service_minutes: float = float(os.getenv("ROUTE_OPTIMIZER_SERVICE_MINUTES", "5"))
+
+    # Wall-clock budget for local search per optimization call
+    time_budget_ms: int = int(os.getenv("ROUTE_OPTIMIZER_TIME_BUDGET_MS", "1000"))
+
+    # Longest segment moved as a block by Or-opt
+    or_opt_max_segment: int = 3
+
+
+@dataclass
+class CODLedgerConfig:
+    """COD ledger reconciliation configuration"""
+
+    # Celery beat interval for verifying courier balances against COD rows
+    reconcile_interval_seconds: int = int(os.getenv("COD_LEDGER_RECONCILE_INTERVAL", "3600"))
+
+    # Rewrite drifted balances (with adjustment entries) instead of only reporting them
+    repair: bool = os.getenv("COD_LEDGER_REPAIR", "false").lower() == "true"
+
+
+@dataclass
+class FMSLocationConfig:
+    """FMS live-location ingest and snapshot configuration"""
+
+    # Asset pages are fetched concurrently in one pass
+    page_size: int = int(os.getenv("FMS_PAGE_SIZE", "100"))
+    max_pages: int = int(os.getenv("FMS_MAX_PAGES", "50"))
+    fetch_concurrency: int = int(os.getenv("FMS_FETCH_CONCURRENCY", "8"))
+
+    # Snapshots older than this are refreshed when read
+    max_age_seconds: float = float(os.getenv("FMS_LOCATION_MAX_AGE", "30"))
+
+    # Celery beat interval keeping the snapshot warm
+    refresh_interval_seconds: int = int(os.getenv("FMS_LOCATION_REFRESH_INTERVAL", "15"))
+
+    # How long the last snapshot stays in Redis (served, stale, during FMS outages)
+    redis_ttl_seconds: int = int(os.getenv("FMS_LOCATION_REDIS_TTL", "600"))
+
+
+@dataclass
+class PasswordHashingConfig:
+    """Password hashing executor configuration"""
+
+    # Worker processes running argon2/bcrypt (0 = hash in the calling thread)
+    workers: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(os.cpu_count() or 1, 4))))
+
+    # Hashes queued or running before new ones are shed with 503; keep it
+    # below the request threadpool size (40) so logins cannot occupy it all
+    max_in_flight: int = int(os.getenv("PASSWORD_HASH_MAX_IN_FLIGHT", "16"))
+
+    # Longest a request waits for its hash before giving up with 503
+    timeout_seconds: float = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+    # Retry-After sent with shed requests
+    retry_after_seconds: int = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "2"))
+
+    # Upgrade outdated hashes after successful logins, while under half load
+    rehash_on_login: bool = os.getenv("PASSWORD_REHASH_ON_LOGIN", "true").lower() == "true"
+
+
+@dataclass
+class ApiKeyUsageConfig:
+    """API key verification cache and usage write-behind configuration"""
+
+    # Hashed-key lookups cached per process (revocations propagate within the TTL)
+    cache_ttl_seconds: float = float(os.getenv("API_KEY_CACHE_TTL", "30"))
+    negative_cache_ttl_seconds: float = float(os.getenv("API_KEY_NEGATIVE_CACHE_TTL", "5"))
+    cache_max_entries: int = int(os.getenv("API_KEY_CACHE_MAX_ENTRIES", "10000"))
+
+    # Usage counters and last-used timestamps are written at most once per key per interval
+    flush_interval_seconds: float = float(os.getenv("API_KEY_USAGE_FLUSH_INTERVAL", "5"))
+
+    # Enforce each key's rate_limit_per_minute/hour/day from the usage counters
+    enforce_rate_limits: bool = os.getenv("API_KEY_RATE_LIMITS", "true").lower() == "true"
+
+
 @dataclass
 class MonitoringConfig:
     """Monitoring and profiling configuration"""
@@ -156,6 +378,13 @@ class MonitoringConfig:
     log_queries: bool = os.getenv("LOG_QUERIES", "false").lower() == "true"
     log_slow_queries_only: bool = True
 
+    # Request-scoped query profiling
+    enable_query_profiling: bool = os.getenv("QUERY_PROFILING_ENABLED", "true").lower() == "true"
+    n1_query_threshold: int = int(os.getenv("N1_QUERY_THRESHOLD", "5"))
+    slow_query_top_k: int = int(os.getenv("SLOW_QUERY_TOP_K", "100"))
+    max_query_fingerprints: int = int(os.getenv("MAX_QUERY_FINGERPRINTS", "500"))
+    enable_server_timing: bool = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+
     # Memory profiling
     enable_memory_profiling: bool = os.getenv("MEMORY_PROFILING_ENABLED", "false").lower() == "true"
     memory_profiling_interval: int = 300  # seconds
@@ -163,6 +392,9 @@ class MonitoringConfig:
     # Performance metrics
     enable_metrics: bool = True
     metrics_port: int = int(os.getenv("METRICS_PORT", "9090"))
+    # Directory shared by worker processes for aggregated request metrics
+    metrics_multiproc_dir: str = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+    metrics_flush_interval: float = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
 
     # Health checks
     health_check_interval: int = 30  # seconds
@@ -228,6 +460,18 @@ class PerformanceConfig:
         self.file_handling = FileHandlingConfig()
         self.monitoring = MonitoringConfig()
         self.memory = MemoryConfig()
+        self.audit_log = AuditLogConfig()
+        self.dashboard_rollup = DashboardRollupConfig()
+        self.priority_queue = PriorityQueueConfig()
+        self.sla_monitor = SLAMonitorConfig()
+        self.feedback_rollup = FeedbackRollupConfig()
+        self.zone_index = ZoneIndexConfig()
+        self.geocoding = GeocodingConfig()
+        self.route_optimizer = RouteOptimizerConfig()
+        self.cod_ledger = CODLedgerConfig()
+        self.fms_location = FMSLocationConfig()
+        self.password_hashing = PasswordHashingConfig()
+        self.api_key_usage = ApiKeyUsageConfig()
         self.thresholds = PerformanceThresholds()
 
         # Environment
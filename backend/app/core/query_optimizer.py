@@ -4,23 +4,28 @@ Provides helpers for optimizing database queries, preventing N+1 issues, and imp
 
 This module consolidates query optimization functionality:
 - QueryOptimizer: Static methods for eager loading, pagination, and batch operations
-- QueryAnalyzer: Query profiling and slow query detection
-- N1QueryDetector: Detection of N+1 query patterns
+- QueryProfiler: Request-scoped query profiling, slow query and N+1 detection
 - EagerLoadMixin: Mixin for service classes
 - Convenience functions for common relationship loading patterns
 """
 
+import heapq
 import logging
 import re
+import threading
 import time
+from bisect import bisect_left
 from contextlib import contextmanager
-from functools import wraps
+from contextvars import ContextVar, Token
+from functools import lru_cache, wraps
 from typing import Any, Callable, Dict, List, Optional, Type, TypeVar
 
 from sqlalchemy import event, func
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Query, Session, joinedload, selectinload, subqueryload
 
+from app.core.performance_config import performance_config
+
 logger = logging.getLogger(__name__)
 
 # Generic type for SQLAlchemy models
@@ -329,162 +334,320 @@ def optimize_statistics_query(session: Session, model: Type, group_by_field: str
     return query.group_by(getattr(model, group_by_field)).all()
 
 
-class QueryAnalyzer:
+# Upper bounds (ms) of the fingerprint latency histogram buckets; the last
+# bucket is unbounded.
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Fingerprint used once max_fingerprints distinct statements have been seen
+OTHER_FINGERPRINT = "<other>"
+
+_LITERALS = re.compile(
+    r"'(?:[^']|'')*'"  # string literals
+    r"|%\(\w+\)s"  # pyformat bind parameters
+    r"|(?<![:\w]):\w+"  # named bind parameters (not ::casts)
+    r"|\$\d+"  # numeric bind parameters
+    r"|\b\d+(?:\.\d+)?\b"  # numbers
+)
+_PLACEHOLDER_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint_statement(statement: str) -> str:
     """
-    Analyze database queries for performance issues.
+    Normalize a SQL statement to its shape.
 
-    Features:
-    - Slow query logging
-    - Query execution statistics
+    Literals and bind parameters become ``?``, expanded IN lists collapse to
+    a single ``?`` and whitespace is squeezed, so the same query issued with
+    different values shares one fingerprint. SQLAlchemy emits a small set of
+    distinct statement strings, so results are cached.
     """
+    pattern = _LITERALS.sub("?", statement)
+    pattern = _PLACEHOLDER_LISTS.sub("?", pattern)
+    return _WHITESPACE.sub(" ", pattern).strip()
 
-    def __init__(self, slow_threshold: float = 0.1):
-        """
-        Initialize query analyzer.
 
-        Args:
-            slow_threshold: Threshold in seconds for slow query warnings
-        """
-        self.slow_threshold = slow_threshold
-        self._query_count = 0
-        self._slow_query_count = 0
-        self._total_query_time = 0.0
-        self._queries: List[dict] = []
-
-    def reset_stats(self):
-        """Reset query statistics."""
-        self._query_count = 0
-        self._slow_query_count = 0
-        self._total_query_time = 0.0
-        self._queries.clear()
+class RequestQueryStats:
+    """Queries issued while handling one request (or one track_queries block)."""
 
-    def get_stats(self) -> dict:
-        """Get query statistics."""
-        avg_query_time = self._total_query_time / self._query_count if self._query_count > 0 else 0
-        return {
-            "total_queries": self._query_count,
-            "slow_queries": self._slow_query_count,
-            "total_time": self._total_query_time,
-            "avg_time": avg_query_time,
-            "slow_threshold": self.slow_threshold,
-        }
+    __slots__ = ("endpoint", "query_count", "db_time", "fingerprints")
 
-    def record_query(self, statement: str, duration: float, params: Optional[dict] = None):
-        """Record query execution."""
-        self._query_count += 1
-        self._total_query_time += duration
-
-        if duration >= self.slow_threshold:
-            self._slow_query_count += 1
-            query_info = {
-                "statement": statement[:500],
-                "duration": duration,
-                "params": params,
-                "timestamp": time.time(),
-            }
-            self._queries.append(query_info)
-            logger.warning(f"Slow query detected ({duration:.3f}s): {statement[:200]}...")
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.query_count = 0
+        self.db_time = 0.0
+        self.fingerprints: Dict[str, int] = {}
 
-    def get_slow_queries(self, limit: int = 10) -> List[dict]:
-        """Get slowest queries."""
-        sorted_queries = sorted(self._queries, key=lambda q: q["duration"], reverse=True)
-        return sorted_queries[:limit]
+    def record(self, fingerprint: str, duration: float):
+        self.query_count += 1
+        self.db_time += duration
+        self.fingerprints[fingerprint] = self.fingerprints.get(fingerprint, 0) + 1
 
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Fingerprints executed at least ``threshold`` times"""
+        return {fp: count for fp, count in self.fingerprints.items() if count >= threshold}
 
-class N1QueryDetector:
-    """
-    Detect N+1 query problems.
+    def server_timing(self) -> str:
+        """Server-Timing header value for the database share of the request"""
+        return f'db;dur={self.db_time * 1000:.1f};desc="{self.query_count} queries"'
+
+
+_request_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar(
+    "request_query_stats", default=None
+)
 
-    Features:
-    - Track query patterns
-    - Detect repeated similar queries
+
+def current_query_stats() -> Optional[RequestQueryStats]:
+    """Query stats of the request being handled in this context, if any"""
+    return _request_stats.get()
+
+
+class QueryProfiler:
+    """
+    Request-scoped query profiling.
+
+    Each request gets its own RequestQueryStats through a context variable,
+    so concurrent requests never share counters. Process-wide aggregates are
+    bounded:
+    - Top-K slowest statements (min-heap)
+    - Per-fingerprint count, total/max time and latency histogram, capped
+      at max_fingerprints distinct shapes
+    - N+1 patterns per endpoint, folded in when a request finishes
     """
 
-    def __init__(self, threshold: int = 5):
+    def __init__(
+        self,
+        slow_threshold: float = 0.1,
+        n1_threshold: int = 5,
+        top_k: int = 100,
+        max_fingerprints: int = 500,
+    ):
         """
-        Initialize N+1 detector.
+        Initialize query profiler.
 
         Args:
-            threshold: Number of similar queries to trigger warning
+            slow_threshold: Threshold in seconds for slow query warnings
+            n1_threshold: Executions of one fingerprint per request that flag N+1
+            top_k: Number of slowest statements kept
+            max_fingerprints: Distinct fingerprints tracked before folding into "<other>"
         """
-        self.threshold = threshold
-        self._query_patterns: dict[str, int] = {}
-        self._active = False
-
-    def start_tracking(self):
-        """Start tracking queries."""
-        self._active = True
-        self._query_patterns.clear()
-
-    def stop_tracking(self):
-        """Stop tracking queries."""
-        self._active = False
-
-    def record_query(self, statement: str):
-        """Record query for N+1 detection."""
-        if not self._active:
-            return
-
-        pattern = self._extract_pattern(statement)
-        if pattern in self._query_patterns:
-            self._query_patterns[pattern] += 1
-            if self._query_patterns[pattern] == self.threshold:
+        self.slow_threshold = slow_threshold
+        self.n1_threshold = n1_threshold
+        self.top_k = top_k
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset aggregated statistics."""
+        with self._lock:
+            self._query_count = 0
+            self._slow_query_count = 0
+            self._total_query_time = 0.0
+            self._slow_heap: List[tuple] = []
+            self._sequence = 0
+            self._fingerprints: Dict[str, dict] = {}
+            self._n1_patterns: Dict[tuple, dict] = {}
+
+    # Request scope
+
+    def start_request(self, endpoint: str) -> Token:
+        """Open a request scope; pass the token to finish_request"""
+        return _request_stats.set(RequestQueryStats(endpoint))
+
+    def finish_request(self, token: Token, endpoint: Optional[str] = None) -> RequestQueryStats:
+        """
+        Close a request scope and fold its repeated fingerprints into the
+        per-endpoint N+1 patterns.
+
+        Args:
+            token: Token returned by start_request
+            endpoint: Endpoint label resolved after routing (e.g. the route template)
+        """
+        stats = _request_stats.get()
+        _request_stats.reset(token)
+        if stats is None:
+            return RequestQueryStats(endpoint or "")
+        if endpoint:
+            stats.endpoint = endpoint
+
+        repeated = stats.repeated(self.n1_threshold)
+        if repeated:
+            with self._lock:
+                for fingerprint, count in repeated.items():
+                    key = (stats.endpoint, fingerprint)
+                    pattern = self._n1_patterns.get(key)
+                    if pattern is None:
+                        if len(self._n1_patterns) >= self.max_fingerprints:
+                            continue
+                        pattern = self._n1_patterns[key] = {
+                            "requests": 0,
+                            "executions": 0,
+                            "max_per_request": 0,
+                        }
+                    pattern["requests"] += 1
+                    pattern["executions"] += count
+                    pattern["max_per_request"] = max(pattern["max_per_request"], count)
+            for fingerprint, count in repeated.items():
                 logger.warning(
-                    f"Potential N+1 query detected: {pattern[:200]}... "
-                    f"(executed {self.threshold} times). "
+                    f"Potential N+1 query on {stats.endpoint}: {fingerprint[:200]}... "
+                    f"(executed {count} times). "
                     "Consider using eager loading (joinedload/selectinload)"
                 )
-        else:
-            self._query_patterns[pattern] = 1
+        return stats
+
+    # Recording
+
+    def record_query(self, statement: str, duration: float, params: Any = None):
+        """Record one statement execution."""
+        fingerprint = fingerprint_statement(statement)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.record(fingerprint, duration)
+
+        duration_ms = duration * 1000
+        bucket = bisect_left(LATENCY_BUCKETS_MS, duration_ms)
+        is_slow = duration >= self.slow_threshold
+
+        with self._lock:
+            self._query_count += 1
+            self._total_query_time += duration
+
+            entry = self._fingerprints.get(fingerprint)
+            if entry is None:
+                if len(self._fingerprints) >= self.max_fingerprints:
+                    fingerprint = OTHER_FINGERPRINT
+                entry = self._fingerprints.setdefault(
+                    fingerprint,
+                    {
+                        "count": 0,
+                        "total_time": 0.0,
+                        "max_time": 0.0,
+                        "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                    },
+                )
+            entry["count"] += 1
+            entry["total_time"] += duration
+            entry["max_time"] = max(entry["max_time"], duration)
+            entry["buckets"][bucket] += 1
+
+            if is_slow:
+                self._slow_query_count += 1
+                self._sequence += 1
+                item = (
+                    duration,
+                    self._sequence,
+                    {
+                        "statement": statement[:500],
+                        "fingerprint": fingerprint,
+                        "endpoint": stats.endpoint if stats else None,
+                        "duration": duration,
+                        "timestamp": time.time(),
+                    },
+                )
+                if len(self._slow_heap) < self.top_k:
+                    heapq.heappush(self._slow_heap, item)
+                elif item[0] > self._slow_heap[0][0]:
+                    heapq.heapreplace(self._slow_heap, item)
 
-    @staticmethod
-    def _extract_pattern(statement: str) -> str:
-        """Extract query pattern by removing specific values."""
-        pattern = re.sub(r"'[^']*'", "'?'", statement)
-        pattern = re.sub(r"\b\d+\b", "?", pattern)
-        pattern = re.sub(
-            r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}",
-            "?",
-            pattern,
-            flags=re.IGNORECASE,
-        )
-        return pattern
+        if is_slow:
+            logger.warning(f"Slow query detected ({duration:.3f}s): {statement[:200]}...")
 
-    def get_patterns(self) -> dict[str, int]:
-        """Get detected query patterns."""
-        return self._query_patterns.copy()
+    # Reporting
 
+    def get_stats(self) -> dict:
+        """Get query statistics."""
+        with self._lock:
+            count, total = self._query_count, self._total_query_time
+            return {
+                "total_queries": count,
+                "slow_queries": self._slow_query_count,
+                "total_time": total,
+                "avg_time": total / count if count > 0 else 0,
+                "slow_threshold": self.slow_threshold,
+                "fingerprints": len(self._fingerprints),
+            }
 
-# Global instances
-query_analyzer = QueryAnalyzer()
-n1_detector = N1QueryDetector()
+    def get_slow_queries(self, limit: int = 10) -> List[dict]:
+        """Get slowest queries."""
+        with self._lock:
+            slowest = heapq.nlargest(limit, self._slow_heap)
+        return [entry for _, _, entry in slowest]
+
+    def get_fingerprints(self, limit: int = 20) -> List[dict]:
+        """Get fingerprints by total time, with their latency histograms."""
+        with self._lock:
+            items = sorted(
+                self._fingerprints.items(), key=lambda item: item[1]["total_time"], reverse=True
+            )[:limit]
+            items = [(fp, dict(entry, buckets=list(entry["buckets"]))) for fp, entry in items]
+
+        bounds = [str(b) for b in LATENCY_BUCKETS_MS] + ["+Inf"]
+        return [
+            {
+                "fingerprint": fingerprint,
+                "count": entry["count"],
+                "total_time": entry["total_time"],
+                "avg_time": entry["total_time"] / entry["count"],
+                "max_time": entry["max_time"],
+                "histogram_ms": dict(zip(bounds, entry["buckets"])),
+            }
+            for fingerprint, entry in items
+        ]
+
+    def get_n1_patterns(self) -> List[dict]:
+        """Get N+1 patterns per endpoint, most executions first."""
+        with self._lock:
+            patterns = [
+                dict(pattern, endpoint=endpoint, fingerprint=fingerprint)
+                for (endpoint, fingerprint), pattern in self._n1_patterns.items()
+            ]
+        return sorted(patterns, key=lambda p: p["executions"], reverse=True)
+
+
+# Global instance
+query_profiler = QueryProfiler(
+    slow_threshold=performance_config.monitoring.slow_query_threshold,
+    n1_threshold=performance_config.monitoring.n1_query_threshold,
+    top_k=performance_config.monitoring.slow_query_top_k,
+    max_fingerprints=performance_config.monitoring.max_query_fingerprints,
+)
 
 
 @contextmanager
-def track_queries(session: Session):
+def track_queries(session: Optional[Session] = None, label: str = "track_queries"):
     """
     Context manager to track queries within a block.
 
+    Opens its own request scope, so it works outside HTTP requests too.
+
     Usage:
-        with track_queries(session):
+        with track_queries(session) as stats:
             users = session.query(User).all()
             for user in users:
                 user.organization  # This might cause N+1
+        print(stats.query_count)
     """
-    n1_detector.start_tracking()
+    token = query_profiler.start_request(label)
+    stats = current_query_stats()
     try:
-        yield
+        yield stats
     finally:
-        n1_detector.stop_tracking()
-        patterns = n1_detector.get_patterns()
-        if patterns:
-            logger.info(f"Query tracking summary: {len(patterns)} unique patterns")
+        query_profiler.finish_request(token)
+        if stats.fingerprints:
+            logger.info(
+                f"Query tracking summary: {stats.query_count} queries, "
+                f"{len(stats.fingerprints)} unique patterns, {stats.db_time * 1000:.1f}ms"
+            )
 
 
 def profile_query(func: Callable[..., T]) -> Callable[..., T]:
     """
     Decorator to profile query performance.
 
+    Logs the call when it exceeds the slow query threshold; the statements it
+    runs are recorded by the engine listeners.
+
     Usage:
         @profile_query
         def get_users(session):
@@ -492,39 +655,43 @@ def profile_query(func: Callable[..., T]) -> Callable[..., T]:
     """
     @wraps(func)
     def wrapper(*args, **kwargs) -> T:
-        start_time = time.time()
+        start_time = time.perf_counter()
         try:
             result = func(*args, **kwargs)
-            duration = time.time() - start_time
-            query_analyzer.record_query(statement=func.__name__, duration=duration)
-            if duration >= query_analyzer.slow_threshold:
+            duration = time.perf_counter() - start_time
+            if duration >= query_profiler.slow_threshold:
                 logger.warning(f"Slow function {func.__name__} took {duration:.3f}s")
             return result
         except Exception as e:
-            duration = time.time() - start_time
+            duration = time.perf_counter() - start_time
             logger.error(f"Function {func.__name__} failed after {duration:.3f}s: {e}")
             raise
     return wrapper
 
 
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_start_time")
+    if started:
+        query_profiler.record_query(statement, time.perf_counter() - started.pop(), parameters)
+
+
 def setup_query_monitoring(engine: Engine):
     """
     Setup SQLAlchemy event listeners for query monitoring.
 
+    Safe to call more than once for the same engine.
+
     Args:
         engine: SQLAlchemy engine
     """
-    @event.listens_for(engine, "before_cursor_execute")
-    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
-        conn.info.setdefault("query_start_time", []).append(time.time())
-
-    @event.listens_for(engine, "after_cursor_execute")
-    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
-        if "query_start_time" in conn.info and conn.info["query_start_time"]:
-            duration = time.time() - conn.info["query_start_time"].pop()
-            query_analyzer.record_query(statement, duration, parameters)
-            n1_detector.record_query(statement)
-
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
     logger.info("Query monitoring enabled")
 
 
@@ -532,12 +699,12 @@ __all__ = [
     # Optimizer classes
     "QueryOptimizer",
     "EagerLoadMixin",
-    # Monitoring classes
-    "QueryAnalyzer",
-    "N1QueryDetector",
-    # Global instances
-    "query_analyzer",
-    "n1_detector",
+    # Monitoring
+    "QueryProfiler",
+    "RequestQueryStats",
+    "query_profiler",
+    "current_query_stats",
+    "fingerprint_statement",
     # Decorators and context managers
     "track_queries",
     "profile_query",
@@ -0,0 +1,76 @@
+"""
+Request Timing
+Tracks where a request spends its time outside the application code.
+
+Time spent in dependencies (Redis cache, external HTTP APIs) is accumulated
+per request in a context variable, so PerformanceMiddleware can split the
+response time into components. Database time comes from the query profiler.
+
+Usage:
+    from app.core.request_timing import timed
+
+    with timed("external"):
+        response = client.get(url)
+"""
+
+import time
+from contextvars import ContextVar, Token
+from typing import Dict, Optional
+
+_component_times: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_component_times", default=None
+)
+
+
+def start_request_timing() -> Token:
+    """Open a request scope; pass the token to finish_request_timing"""
+    return _component_times.set({})
+
+
+def finish_request_timing(token: Token) -> Dict[str, float]:
+    """Close a request scope and return seconds spent per component"""
+    times = _component_times.get()
+    _component_times.reset(token)
+    return times or {}
+
+
+def current_request_timing() -> Optional[Dict[str, float]]:
+    """Seconds per component for the request being handled, if any"""
+    return _component_times.get()
+
+
+def record_time(component: str, seconds: float) -> None:
+    """Add time spent in a component to the current request (no-op outside requests)"""
+    times = _component_times.get()
+    if times is not None:
+        times[component] = times.get(component, 0.0) + seconds
+
+
+class timed:
+    """
+    Context manager adding the time spent in its block to a component.
+
+    Works in sync and async code; outside a request it only costs two clock
+    reads.
+    """
+
+    __slots__ = ("component", "_start")
+
+    def __init__(self, component: str):
+        self.component = component
+
+    def __enter__(self) -> "timed":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        record_time(self.component, time.perf_counter() - self._start)
+
+
+__all__ = [
+    "start_request_timing",
+    "finish_request_timing",
+    "current_request_timing",
+    "record_time",
+    "timed",
+]
@@ -25,6 +25,7 @@ from argon2.exceptions import InvalidHash, VerifyMismatchError
 from jose import JWTError, jwt
 
 from app.config.settings import settings
+from app.core.brute_force import get_brute_force_tracker
 from app.core.security_config import security_config
 
 # Initialize Argon2 password hasher with secure defaults
@@ -35,6 +36,7 @@ ph = PasswordHasher(
     hash_len=32,  # Length of the hash in bytes
     salt_len=16,  # Length of random salt in bytes
 )
+BCRYPT_ROUNDS = 12
 
 
 class PasswordValidator:
@@ -167,7 +169,7 @@ class PasswordHasher:
             hashed = ph.hash(password)
             return f"argon2${hashed}"
         elif algo == "bcrypt":
-            salt = bcrypt.gensalt(rounds=12)
+            salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
             hashed = bcrypt.hashpw(password.encode("utf-8"), salt)
             return f"bcrypt${hashed.decode('utf-8')}"
         else:
@@ -235,6 +237,11 @@ class PasswordHasher:
             except:
                 return True
 
+        # For BCrypt, check the cost factor ($2b$<rounds>$...)
+        if algo == "bcrypt":
+            parts = hash_value.split("$")
+            return len(parts) < 3 or parts[2] != str(BCRYPT_ROUNDS)
+
         return False
 
 
@@ -422,15 +429,11 @@ class BruteForceProtector:
     """
     Brute force attack protection
 
-    Tracks failed authentication attempts and implements account lockout
-
-    Note: In production, use Redis for distributed tracking across multiple servers
+    Tracks failed authentication attempts and implements account lockout.
+    Counts and lockouts live in the shared BruteForceTracker (Redis-backed
+    sliding window), so every worker sees the same state.
     """
 
-    # In-memory storage (replace with Redis in production)
-    _failed_attempts: Dict[str, list] = {}
-    _lockouts: Dict[str, datetime] = {}
-
     @classmethod
     def record_failed_attempt(cls, identifier: str) -> bool:
         """
@@ -445,29 +448,8 @@ class BruteForceProtector:
         if not security_config.brute_force.enabled:
             return False
 
-        now = datetime.utcnow()
-
-        # Initialize tracking for this identifier
-        if identifier not in cls._failed_attempts:
-            cls._failed_attempts[identifier] = []
-
-        # Add this attempt
-        cls._failed_attempts[identifier].append(now)
-
-        # Clean old attempts (outside lockout window)
-        window_start = now - timedelta(minutes=security_config.brute_force.lockout_duration_minutes)
-        cls._failed_attempts[identifier] = [
-            attempt for attempt in cls._failed_attempts[identifier] if attempt > window_start
-        ]
-
-        # Check if lockout threshold exceeded
-        if len(cls._failed_attempts[identifier]) >= security_config.brute_force.max_attempts:
-            cls._lockouts[identifier] = now + timedelta(
-                minutes=security_config.brute_force.lockout_duration_minutes
-            )
-            return True
-
-        return False
+        attempts = get_brute_force_tracker().record_failure(identifier)
+        return attempts >= security_config.brute_force.max_attempts
 
     @classmethod
     def is_locked_out(cls, identifier: str) -> bool:
@@ -483,17 +465,7 @@ class BruteForceProtector:
         if not security_config.brute_force.enabled:
             return False
 
-        if identifier not in cls._lockouts:
-            return False
-
-        # Check if lockout has expired
-        if datetime.utcnow() > cls._lockouts[identifier]:
-            del cls._lockouts[identifier]
-            if identifier in cls._failed_attempts:
-                del cls._failed_attempts[identifier]
-            return False
-
-        return True
+        return get_brute_force_tracker().is_locked_out(identifier)
 
     @classmethod
     def clear_attempts(cls, identifier: str):
@@ -503,10 +475,7 @@ class BruteForceProtector:
         Args:
             identifier: User identifier to clear
         """
-        if identifier in cls._failed_attempts:
-            del cls._failed_attempts[identifier]
-        if identifier in cls._lockouts:
-            del cls._lockouts[identifier]
+        get_brute_force_tracker().clear(identifier)
 
     @classmethod
     def get_remaining_attempts(cls, identifier: str) -> int:
@@ -525,7 +494,7 @@ class BruteForceProtector:
         if cls.is_locked_out(identifier):
             return 0
 
-        attempts = len(cls._failed_attempts.get(identifier, []))
+        attempts = get_brute_force_tracker().failed_attempts(identifier)
         return max(0, security_config.brute_force.max_attempts - attempts)
 
 
@@ -95,6 +95,8 @@ class BruteForceProtection:
     track_by_ip: bool = True
     track_by_user: bool = True
     notification_threshold: int = 3  # Send alert after N failed attempts
+    window_buckets: int = 10  # sliding window resolution (buckets per lockout window)
+    max_tracked_identifiers: int = 10000  # bound on the per-process mirror
 
 
 @dataclass
@@ -105,6 +107,10 @@ class EncryptionConfig:
     key_rotation_days: int = 90
     enable_field_encryption: bool = True
     encrypted_fields: List[str] = None
+    blind_index_batch_size: int = 500  # rows per commit in the blind index backfill
+    bulk_decrypt_workers: int = 0  # processes for bulk decryption (0 = in the calling thread)
+    bulk_decrypt_chunk_size: int = 5000  # values sent to a worker at a time
+    bulk_decrypt_min_parallel: int = 20000  # smaller batches are decrypted inline
 
     def __post_init__(self):
         if self.encrypted_fields is None:
@@ -208,12 +214,15 @@ class SecurityConfig:
             enabled=os.getenv("BRUTE_FORCE_PROTECTION", "true").lower() == "true",
             max_attempts=int(os.getenv("MAX_LOGIN_ATTEMPTS", "5")),
             lockout_duration_minutes=int(os.getenv("LOCKOUT_DURATION_MINUTES", "30")),
+            max_tracked_identifiers=int(os.getenv("BRUTE_FORCE_MAX_TRACKED", "10000")),
         )
 
         # Encryption
         self.encryption = EncryptionConfig(
             enable_field_encryption=os.getenv("ENABLE_FIELD_ENCRYPTION", "true").lower() == "true",
             key_rotation_days=int(os.getenv("KEY_ROTATION_DAYS", "90")),
+            blind_index_batch_size=int(os.getenv("BLIND_INDEX_BATCH_SIZE", "500")),
+            bulk_decrypt_workers=int(os.getenv("BULK_DECRYPT_WORKERS", "0")),
         )
 
         # Audit Logging
@@ -13,6 +13,7 @@ Author: BARQ Security Team
 Last Updated: 2025-12-02
 """
 
+import itertools
 import json
 from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
@@ -21,8 +22,31 @@ from typing import Any, Dict, List, Optional
 
 import redis
 
+from app.core.brute_force import get_brute_force_tracker
 from app.core.security_config import security_config
 
+# Alert retention (documents and indexes); day counters are kept a day longer
+ALERT_TTL_SECONDS = 30 * 24 * 60 * 60
+ALERT_COUNTS_TTL_SECONDS = ALERT_TTL_SECONDS + 24 * 60 * 60
+
+# Redis layout:
+#   security_alert:{id}                 JSON document (TTL)
+#   security_alerts:idx:all             ZSET alert_id -> epoch timestamp
+#   security_alerts:idx:level:{level}   ZSET per threat level
+#   security_alerts:idx:type:{type}     ZSET per alert type
+#   security_alerts:idx:unacked         ZSET of unacknowledged alerts
+#   security_alerts:counts:{YYYYMMDD}   HASH of per-day counters
+#
+# Alerts stored before the indexes existed are added to them (and counted) by
+# SecurityMonitor.backfill_alert_indexes, run once via
+# backfill_security_alert_indexes_task.
+ALERT_KEY = "security_alert:{}"
+ALERT_INDEX_ALL = "security_alerts:idx:all"
+ALERT_INDEX_LEVEL = "security_alerts:idx:level:{}"
+ALERT_INDEX_TYPE = "security_alerts:idx:type:{}"
+ALERT_INDEX_UNACKED = "security_alerts:idx:unacked"
+ALERT_COUNTS = "security_alerts:counts:{}"
+
 
 class ThreatLevel(str, Enum):
     """Threat severity levels"""
@@ -108,20 +132,28 @@ class SecurityMonitor:
             self._memory_alerts: List[SecurityAlert] = []
 
     def detect_brute_force(
-        self, identifier: str, failed_attempts: int, time_window_minutes: int = 15
+        self,
+        identifier: str,
+        failed_attempts: Optional[int] = None,
+        time_window_minutes: Optional[int] = None,
     ) -> Optional[SecurityAlert]:
         """
         Detect brute force attack
 
         Args:
             identifier: User identifier (email, IP, etc.)
-            failed_attempts: Number of failed attempts
-            time_window_minutes: Time window to check
+            failed_attempts: Number of failed attempts (read from the shared
+                brute force tracker when omitted)
+            time_window_minutes: Time window the attempts were counted in
 
         Returns:
             SecurityAlert if brute force detected, None otherwise
         """
         threshold = security_config.brute_force.max_attempts
+        if time_window_minutes is None:
+            time_window_minutes = security_config.brute_force.lockout_duration_minutes
+        if failed_attempts is None:
+            failed_attempts = get_brute_force_tracker().failed_attempts(identifier)
 
         if failed_attempts >= threshold:
             alert = self._create_alert(
@@ -318,31 +350,64 @@ class SecurityMonitor:
         threat_level: Optional[ThreatLevel] = None,
         alert_type: Optional[AlertType] = None,
         unacknowledged_only: bool = False,
+        since: Optional[datetime] = None,
     ) -> List[SecurityAlert]:
         """
-        Get security alerts
+        Get security alerts, newest first
+
+        With Redis, the most selective secondary index is range-read newest
+        first and the alert documents are fetched with one pipelined MGET per
+        page; no KEYS scan is involved.
 
         Args:
             limit: Maximum number of alerts to return
             threat_level: Filter by threat level
             alert_type: Filter by alert type
             unacknowledged_only: Only return unacknowledged alerts
+            since: Only return alerts raised after this time
 
         Returns:
             List of SecurityAlert objects
         """
         if self.redis:
-            # Get alerts from Redis
-            keys = self.redis.keys("security_alert:*")
-            alerts = []
+            if unacknowledged_only:
+                index_key = ALERT_INDEX_UNACKED
+            elif threat_level:
+                index_key = ALERT_INDEX_LEVEL.format(ThreatLevel(threat_level).value)
+            elif alert_type:
+                index_key = ALERT_INDEX_TYPE.format(AlertType(alert_type).value)
+            else:
+                index_key = ALERT_INDEX_ALL
+
+            # Prune aged-out entries up front; removing members while paging
+            # by offset would shift later pages past unread alerts
+            self.redis.zremrangebyscore(
+                index_key, "-inf", datetime.utcnow().timestamp() - ALERT_TTL_SECONDS
+            )
+
+            min_score = since.timestamp() if since else "-inf"
+            page_size = max(limit, 50)
+            offset = 0
+            alerts: List[SecurityAlert] = []
+            expired: List[str] = []
 
-            for key in keys[:limit]:
-                data = self.redis.get(key)
-                if data:
-                    alert_dict = json.loads(data)
-                    alert = SecurityAlert(**alert_dict)
+            while len(alerts) < limit:
+                alert_ids = self.redis.zrevrangebyscore(
+                    index_key, "+inf", min_score, start=offset, num=page_size
+                )
+                if not alert_ids:
+                    break
+                offset += len(alert_ids)
+
+                documents = self.redis.mget([ALERT_KEY.format(a) for a in alert_ids])
+                for alert_id, data in zip(alert_ids, documents):
+                    if data is None:
+                        expired.append(alert_id)
+                        continue
+
+                    alert = SecurityAlert(**json.loads(data))
 
-                    # Apply filters
+                    # Residual filters not covered by the chosen index
                     if threat_level and alert.threat_level != threat_level:
                         continue
                     if alert_type and alert.alert_type != alert_type:
@@ -351,10 +416,16 @@ class SecurityMonitor:
                         continue
 
                     alerts.append(alert)
+                    if len(alerts) >= limit:
+                        break
 
-            # Sort by timestamp (newest first)
-            alerts.sort(key=lambda a: a.timestamp, reverse=True)
-            return alerts[:limit]
+                if len(alert_ids) < page_size:
+                    break
+
+            # Documents deleted before their TTL, dropped once paging is done
+            if expired:
+                self.redis.zrem(index_key, *expired)
+            return alerts
         else:
             # In-memory alerts
             alerts = self._memory_alerts.copy()
@@ -366,6 +437,8 @@ class SecurityMonitor:
                 alerts = [a for a in alerts if a.alert_type == alert_type]
             if unacknowledged_only:
                 alerts = [a for a in alerts if not a.acknowledged]
+            if since:
+                alerts = [a for a in alerts if datetime.fromisoformat(a.timestamp) > since]
 
             return alerts[:limit]
 
@@ -380,7 +453,7 @@ class SecurityMonitor:
         Returns:
             True if acknowledged successfully
         """
-        key = f"security_alert:{alert_id}"
+        key = ALERT_KEY.format(alert_id)
 
         if self.redis:
             data = self.redis.get(key)
@@ -388,11 +461,21 @@ class SecurityMonitor:
                 return False
 
             alert_dict = json.loads(data)
+            already_acknowledged = alert_dict.get("acknowledged", False)
             alert_dict["acknowledged"] = True
             alert_dict["acknowledged_by"] = acknowledged_by
             alert_dict["acknowledged_at"] = datetime.utcnow().isoformat()
 
-            self.redis.set(key, json.dumps(alert_dict))
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.set(key, json.dumps(alert_dict), keepttl=True)
+            pipe.zrem(ALERT_INDEX_UNACKED, alert_id)
+            if not already_acknowledged:
+                day = datetime.fromisoformat(alert_dict["timestamp"]).strftime("%Y%m%d")
+                counts_key = ALERT_COUNTS.format(day)
+                pipe.hincrby(counts_key, "unacknowledged", -1)
+                # The day's hash may have expired or never existed; never leave it without a TTL
+                pipe.expire(counts_key, ALERT_COUNTS_TTL_SECONDS)
+            pipe.execute()
             return True
         else:
             for alert in self._memory_alerts:
@@ -408,17 +491,47 @@ class SecurityMonitor:
         """
         Get security metrics for dashboard
 
+        With Redis the metrics come from per-day counter hashes that are
+        incremented when alerts are stored and acknowledged, so this is one
+        pipelined HGETALL per day regardless of alert volume.
+
         Args:
             days: Number of days to analyze
 
         Returns:
             Dictionary with security metrics
         """
-        alerts = self.get_alerts(limit=1000)
+        if self.redis:
+            today = datetime.utcnow().date()
+            pipe = self.redis.pipeline(transaction=False)
+            for offset in range(days):
+                day = (today - timedelta(days=offset)).strftime("%Y%m%d")
+                pipe.hgetall(ALERT_COUNTS.format(day))
+
+            counts: Dict[str, int] = {}
+            for day_counts in pipe.execute():
+                for field_name, value in day_counts.items():
+                    counts[field_name] = counts.get(field_name, 0) + int(value)
+
+            by_type = {
+                alert_type.value: counts[f"type:{alert_type.value}"]
+                for alert_type in AlertType
+                if counts.get(f"type:{alert_type.value}", 0) > 0
+            }
+
+            return {
+                "total_alerts": counts.get("total", 0),
+                "critical_alerts": counts.get(f"level:{ThreatLevel.CRITICAL.value}", 0),
+                "high_alerts": counts.get(f"level:{ThreatLevel.HIGH.value}", 0),
+                "medium_alerts": counts.get(f"level:{ThreatLevel.MEDIUM.value}", 0),
+                "low_alerts": counts.get(f"level:{ThreatLevel.LOW.value}", 0),
+                "unacknowledged": max(counts.get("unacknowledged", 0), 0),
+                "by_type": by_type,
+                "days_analyzed": days,
+            }
 
-        # Filter by time range
         cutoff = datetime.utcnow() - timedelta(days=days)
-        recent_alerts = [a for a in alerts if datetime.fromisoformat(a.timestamp) > cutoff]
+        recent_alerts = self.get_alerts(limit=1000, since=cutoff)
 
         # Calculate metrics
         metrics = {
@@ -474,15 +587,14 @@ class SecurityMonitor:
         )
 
     def _store_alert(self, alert: SecurityAlert):
-        """Store alert in Redis/memory"""
-        key = f"security_alert:{alert.alert_id}"
-        data = json.dumps(alert.to_dict())
-
-        # Store for 30 days
-        ttl = 30 * 24 * 60 * 60
-
+        """Store alert in Redis/memory and update its indexes and counters"""
         if self.redis:
-            self.redis.setex(key, ttl, data)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.setex(
+                ALERT_KEY.format(alert.alert_id), ALERT_TTL_SECONDS, json.dumps(alert.to_dict())
+            )
+            self._index_alert(pipe, alert)
+            pipe.execute()
         else:
             self._memory_alerts.append(alert)
 
@@ -490,6 +602,70 @@ class SecurityMonitor:
             if len(self._memory_alerts) > 1000:
                 self._memory_alerts = self._memory_alerts[-1000:]
 
+    def _index_alert(self, pipe: Any, alert: SecurityAlert) -> None:
+        """Queue the index entries and day counters of one alert on a pipeline"""
+        created = datetime.fromisoformat(alert.timestamp)
+        score = created.timestamp()
+        level = ThreatLevel(alert.threat_level).value
+        alert_type = AlertType(alert.alert_type).value
+        index_keys = [
+            ALERT_INDEX_ALL,
+            ALERT_INDEX_LEVEL.format(level),
+            ALERT_INDEX_TYPE.format(alert_type),
+        ]
+        if not alert.acknowledged:
+            index_keys.append(ALERT_INDEX_UNACKED)
+        counts_key = ALERT_COUNTS.format(created.strftime("%Y%m%d"))
+        retention_cutoff = datetime.utcnow().timestamp() - ALERT_TTL_SECONDS
+
+        for index_key in index_keys:
+            pipe.zadd(index_key, {alert.alert_id: score})
+            # Drop index entries whose documents have expired
+            pipe.zremrangebyscore(index_key, "-inf", retention_cutoff)
+            pipe.expire(index_key, ALERT_TTL_SECONDS)
+        pipe.hincrby(counts_key, "total", 1)
+        pipe.hincrby(counts_key, f"level:{level}", 1)
+        pipe.hincrby(counts_key, f"type:{alert_type}", 1)
+        if not alert.acknowledged:
+            pipe.hincrby(counts_key, "unacknowledged", 1)
+        pipe.expire(counts_key, ALERT_COUNTS_TTL_SECONDS)
+
+    def backfill_alert_indexes(self, batch_size: int = 500) -> int:
+        """
+        Index and count alert documents that are missing from the indexes
+
+        Alerts stored before the indexes and day counters existed are
+        invisible to get_alerts and get_security_metrics until this runs.
+        Alerts already in the all-alerts index are skipped, so it is safe to
+        rerun and to run while new alerts arrive.
+
+        Returns:
+            Number of alerts indexed
+        """
+        if not self.redis:
+            return 0
+
+        indexed = 0
+        keys = self.redis.scan_iter(match=ALERT_KEY.format("*"), count=batch_size)
+        while True:
+            batch = list(itertools.islice(keys, batch_size))
+            if not batch:
+                return indexed
+
+            documents = self.redis.mget(batch)
+            pipe = self.redis.pipeline(transaction=False)
+            alerts = [SecurityAlert(**json.loads(data)) for data in documents if data]
+            for alert in alerts:
+                pipe.zscore(ALERT_INDEX_ALL, alert.alert_id)
+            scores = pipe.execute()
+
+            pipe = self.redis.pipeline(transaction=False)
+            for alert, score in zip(alerts, scores):
+                if score is None:
+                    self._index_alert(pipe, alert)
+                    indexed += 1
+            pipe.execute()
+
     def _get_user_ip_history(self, user_id: int) -> set:
         """Get user's IP history"""
         key = f"user_ip_history:{user_id}"
@@ -530,7 +706,9 @@ def get_security_monitor() -> SecurityMonitor:
 
 
 # Convenience functions
-def detect_brute_force(identifier: str, failed_attempts: int) -> Optional[SecurityAlert]:
+def detect_brute_force(
+    identifier: str, failed_attempts: Optional[int] = None
+) -> Optional[SecurityAlert]:
     """Convenience function for brute force detection"""
     return get_security_monitor().detect_brute_force(identifier, failed_attempts)
 
@@ -9,12 +9,26 @@ This module provides enterprise-grade session management:
 - Device tracking and management
 - Automatic session cleanup
 
+Storage layout (Redis):
+- session:v2:{session_id}      hash of session fields, native TTL (EXPIREAT)
+- user_sessions:v2:{user_id}   sorted set of session ids scored by expiry epoch
+- session_expiry               sorted set of "{user_id}:{session_id}" scored by
+                               expiry epoch; cleanup is a range query on it
+
+Sessions written by the previous layout (JSON string at session:{id}, plain
+set at user_sessions:{user_id}) are moved to the new keys the first time they
+are read, so existing logins survive the upgrade; the rest expire on their own.
+
+Reads of a user's sessions are pipelined (one round trip for the index, one
+for all hashes), so cost does not grow with round trips per session.
+
 Author: BARQ Security Team
 Last Updated: 2025-12-02
 """
 
 import hashlib
 import json
+import time
 from dataclasses import asdict, dataclass
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
@@ -24,6 +38,14 @@ import redis
 from app.config.settings import settings
 from app.core.security_config import security_config
 
+SESSION_KEY = "session:v2:{}"
+USER_SESSIONS_KEY = "user_sessions:v2:{}"
+EXPIRY_INDEX_KEY = "session_expiry"
+
+# Previous layout, migrated on read
+LEGACY_SESSION_KEY = "session:{}"
+LEGACY_USER_SESSIONS_KEY = "user_sessions:{}"
+
 
 @dataclass
 class Session:
@@ -50,6 +72,28 @@ class Session:
         """Create from dictionary"""
         return cls(**data)
 
+    def to_hash(self) -> Dict[str, str]:
+        """Flatten to Redis hash fields (all values are strings)"""
+        data = self.to_dict()
+        data["user_id"] = str(self.user_id)
+        data["organization_id"] = "" if self.organization_id is None else str(self.organization_id)
+        data["metadata"] = json.dumps(self.metadata or {})
+        return data
+
+    @classmethod
+    def from_hash(cls, data: Dict[str, str]) -> "Session":
+        """Create from Redis hash fields"""
+        data = dict(data)
+        data["user_id"] = int(data["user_id"])
+        data["organization_id"] = int(data["organization_id"]) if data.get("organization_id") else None
+        data["metadata"] = json.loads(data.get("metadata") or "{}")
+        return cls(**data)
+
+
+def _epoch(iso_timestamp: str) -> float:
+    """Naive-UTC ISO timestamp to epoch seconds"""
+    return (datetime.fromisoformat(iso_timestamp) - datetime(1970, 1, 1)).total_seconds()
+
 
 class SessionManager:
     """
@@ -69,7 +113,7 @@ class SessionManager:
         Initialize session manager
 
         Args:
-            redis_client: Optional Redis client
+            redis_client: Optional Redis client (must use decode_responses=True)
         """
         if redis_client:
             self.redis = redis_client
@@ -82,7 +126,10 @@ class SessionManager:
             else:
                 # Fall back to in-memory (development only)
                 self.redis = None
-                self._memory_storage: Dict[str, str] = {}
+
+        # In-memory fallback: session id -> Session, user id -> {session id: expiry}
+        self._memory_sessions: Dict[str, Session] = {}
+        self._memory_user_sessions: Dict[int, Dict[str, float]] = {}
 
     def create_session(
         self,
@@ -137,12 +184,9 @@ class SessionManager:
             metadata=metadata or {},
         )
 
-        # Store session
+        # Store session and index it in one round trip
         self._store_session(session)
 
-        # Track user sessions
-        self._add_to_user_sessions(user_id, session_id)
-
         return session
 
     def get_session(self, session_id: str) -> Optional[Session]:
@@ -155,21 +199,17 @@ class SessionManager:
         Returns:
             Session object or None if not found/expired
         """
-        key = f"session:{session_id}"
-
         if self.redis:
-            data = self.redis.get(key)
-            if not data:
+            data = self.redis.hgetall(SESSION_KEY.format(session_id))
+            session = Session.from_hash(data) if data else self._migrate_legacy(session_id)
+            if not session:
                 return None
         else:
-            data = self._memory_storage.get(key)
-            if not data:
+            session = self._memory_sessions.get(session_id)
+            if not session:
                 return None
 
-        session_dict = json.loads(data)
-        session = Session.from_dict(session_dict)
-
-        # Check expiration
+        # Redis expires the hash natively; this guards clock skew and the memory store
         if datetime.fromisoformat(session.expires_at) < datetime.utcnow():
             self.destroy_session(session_id)
             return None
@@ -208,40 +248,68 @@ class SessionManager:
                 self.destroy_session(session_id)
                 return None
 
-        # Update last activity
-        self.update_activity(session_id)
+        # Update last activity (reuses the session we just read)
+        self.update_activity(session_id, session=session)
 
         return session
 
-    def update_activity(self, session_id: str) -> bool:
+    def update_activity(self, session_id: str, session: Optional[Session] = None) -> bool:
         """
-        Update session last activity timestamp
+        Update session last activity timestamp, renewing it near expiry
+
+        Issues a single pipelined write. If the hash expired between the read
+        and the write, HSET reports newly created fields and the partial hash
+        is removed again.
 
         Args:
             session_id: Session ID
+            session: Already-loaded session (skips the read)
 
         Returns:
             True if updated successfully
         """
-        session = self.get_session(session_id)
-        if not session:
+        if session is None:
+            session = self.get_session(session_id)
+            if not session:
+                return False
+
+        now = datetime.utcnow()
+        if datetime.fromisoformat(session.expires_at) <= now:
+            self.destroy_session(session_id)
             return False
 
-        session.last_activity = datetime.utcnow().isoformat()
+        session.last_activity = now.isoformat()
+        fields = {"last_activity": session.last_activity}
 
         # Check if renewal is needed
-        last_activity = datetime.fromisoformat(session.last_activity)
         expires_at = datetime.fromisoformat(session.expires_at)
         threshold = timedelta(minutes=security_config.session.session_renewal_threshold_minutes)
-
-        if expires_at - datetime.utcnow() < threshold:
-            # Renew session
-            new_expires = datetime.utcnow() + timedelta(
-                hours=security_config.session.session_lifetime_hours
-            )
-            session.expires_at = new_expires.isoformat()
-
-        self._store_session(session)
+        renewed = expires_at - now < threshold
+        if renewed:
+            expires_at = now + timedelta(hours=security_config.session.session_lifetime_hours)
+            session.expires_at = expires_at.isoformat()
+            fields["expires_at"] = session.expires_at
+
+        if not self.redis:
+            self._memory_sessions[session_id] = session
+            if renewed:
+                self._memory_user_sessions.setdefault(session.user_id, {})[session_id] = _epoch(
+                    session.expires_at
+                )
+            return True
+
+        expiry = _epoch(session.expires_at)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(SESSION_KEY.format(session_id), mapping=fields)
+        pipe.expireat(SESSION_KEY.format(session_id), int(expiry))
+        if renewed:
+            self._index(pipe, session.user_id, session_id, expiry)
+        created_fields = pipe.execute()[0]
+
+        if created_fields:
+            # Existing sessions always have these fields; the hash was gone
+            self.redis.delete(SESSION_KEY.format(session_id))
+            return False
         return True
 
     def destroy_session(self, session_id: str) -> bool:
@@ -254,21 +322,26 @@ class SessionManager:
         Returns:
             True if destroyed successfully
         """
-        session = self.get_session(session_id)
-        if not session:
-            return False
-
-        # Remove session data
-        key = f"session:{session_id}"
-        if self.redis:
-            self.redis.delete(key)
-        else:
-            self._memory_storage.pop(key, None)
-
-        # Remove from user sessions
-        self._remove_from_user_sessions(session.user_id, session_id)
-
-        return True
+        if not self.redis:
+            session = self._memory_sessions.pop(session_id, None)
+            if not session:
+                return False
+            self._memory_user_sessions.get(session.user_id, {}).pop(session_id, None)
+            return True
+
+        user_id = self.redis.hget(SESSION_KEY.format(session_id), "user_id")
+        if user_id is None:
+            legacy = self._migrate_legacy(session_id)
+            if not legacy:
+                return False
+            user_id = legacy.user_id
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(SESSION_KEY.format(session_id))
+        pipe.zrem(USER_SESSIONS_KEY.format(user_id), session_id)
+        pipe.zrem(EXPIRY_INDEX_KEY, f"{user_id}:{session_id}")
+        deleted = pipe.execute()[0]
+        return bool(deleted)
 
     def destroy_user_sessions(self, user_id: int) -> int:
         """
@@ -280,14 +353,26 @@ class SessionManager:
         Returns:
             Number of sessions destroyed
         """
-        sessions = self.get_user_sessions(user_id)
-        count = 0
+        if not self.redis:
+            count = 0
+            for session_id in list(self._memory_user_sessions.pop(user_id, {})):
+                if self._memory_sessions.pop(session_id, None):
+                    count += 1
+            return count
 
-        for session in sessions:
-            if self.destroy_session(session.session_id):
-                count += 1
+        self._migrate_legacy_user(user_id)
+        user_key = USER_SESSIONS_KEY.format(user_id)
+        session_ids = self.redis.zrange(user_key, 0, -1)
+        if not session_ids:
+            return 0
 
-        return count
+        pipe = self.redis.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.delete(SESSION_KEY.format(session_id))
+        pipe.zrem(EXPIRY_INDEX_KEY, *[f"{user_id}:{sid}" for sid in session_ids])
+        pipe.delete(user_key)
+        results = pipe.execute()
+        return sum(results[: len(session_ids)])
 
     def get_user_sessions(self, user_id: int) -> List[Session]:
         """
@@ -299,22 +384,50 @@ class SessionManager:
         Returns:
             List of Session objects
         """
-        key = f"user_sessions:{user_id}"
-
-        if self.redis:
-            session_ids = self.redis.smembers(key)
-        else:
-            session_ids_str = self._memory_storage.get(key, "[]")
-            session_ids = json.loads(session_ids_str)
+        now = time.time()
+
+        if not self.redis:
+            index = self._memory_user_sessions.get(user_id, {})
+            for session_id, expiry in list(index.items()):
+                if expiry <= now:
+                    index.pop(session_id, None)
+                    self._memory_sessions.pop(session_id, None)
+            return [self._memory_sessions[sid] for sid in index if sid in self._memory_sessions]
+
+        user_key = USER_SESSIONS_KEY.format(user_id)
+
+        # Round trip 1: drop expired ids from the index and read the rest
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zremrangebyscore(user_key, "-inf", now)
+        pipe.zrange(user_key, 0, -1)
+        pipe.smembers(LEGACY_USER_SESSIONS_KEY.format(user_id))
+        _, session_ids, legacy_ids = pipe.execute()
+        if legacy_ids:
+            self._migrate_legacy_user(user_id, legacy_ids)
+            session_ids = self.redis.zrange(user_key, 0, -1)
+        if not session_ids:
+            return []
+
+        # Round trip 2: all session hashes
+        pipe = self.redis.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipe.hgetall(SESSION_KEY.format(session_id))
+        results = pipe.execute()
 
         sessions = []
-        for session_id in session_ids:
-            session = self.get_session(session_id)
-            if session:
-                sessions.append(session)
+        stale = []
+        for session_id, data in zip(session_ids, results):
+            if data:
+                sessions.append(Session.from_hash(data))
             else:
-                # Clean up expired session reference
-                self._remove_from_user_sessions(user_id, session_id)
+                stale.append(session_id)
+
+        if stale:
+            # Clean up references to sessions whose hash already expired
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zrem(user_key, *stale)
+            pipe.zrem(EXPIRY_INDEX_KEY, *[f"{user_id}:{sid}" for sid in stale])
+            pipe.execute()
 
         return sessions
 
@@ -342,35 +455,47 @@ class SessionManager:
             "is_current": False,  # Set by caller
         }
 
-    def cleanup_expired_sessions(self) -> int:
+    def cleanup_expired_sessions(self, batch_size: int = 1000) -> int:
         """
         Clean up expired sessions (should be run periodically)
 
+        Session hashes expire on their own; this removes their index entries
+        by range-querying the expiry index in batches.
+
+        Args:
+            batch_size: Index entries removed per round trip
+
         Returns:
             Number of sessions cleaned up
         """
-        # This is a simplified version
-        # In production, implement with Redis SCAN to avoid blocking
+        now = time.time()
         count = 0
 
-        if self.redis:
-            # Get all session keys
-            pattern = "session:*"
-            for key in self.redis.scan_iter(match=pattern):
-                try:
-                    data = self.redis.get(key)
-                    if data:
-                        session_dict = json.loads(data)
-                        expires_at = datetime.fromisoformat(session_dict["expires_at"])
-
-                        if expires_at < datetime.utcnow():
-                            session_id = key.split(":", 1)[1]
-                            self.destroy_session(session_id)
-                            count += 1
-                except:
-                    # Invalid session data, remove it
-                    self.redis.delete(key)
-                    count += 1
+        if not self.redis:
+            for user_id in list(self._memory_user_sessions):
+                before = len(self._memory_user_sessions[user_id])
+                remaining = len(self.get_user_sessions(user_id))
+                count += before - remaining
+            return count
+
+        while True:
+            members = self.redis.zrangebyscore(
+                EXPIRY_INDEX_KEY, "-inf", now, start=0, num=batch_size
+            )
+            if not members:
+                break
+
+            pipe = self.redis.pipeline(transaction=False)
+            for member in members:
+                user_id, _, session_id = member.partition(":")
+                pipe.zrem(USER_SESSIONS_KEY.format(user_id), session_id)
+                pipe.delete(SESSION_KEY.format(session_id))
+            pipe.zrem(EXPIRY_INDEX_KEY, *members)
+            pipe.execute()
+
+            count += len(members)
+            if len(members) < batch_size:
+                break
 
         return count
 
@@ -395,46 +520,67 @@ class SessionManager:
         return hashlib.sha256(fingerprint_data.encode()).hexdigest()
 
     def _store_session(self, session: Session):
-        """Store session in Redis/memory"""
-        key = f"session:{session.session_id}"
-        data = json.dumps(session.to_dict())
-
-        # Calculate TTL
-        expires_at = datetime.fromisoformat(session.expires_at)
-        ttl = int((expires_at - datetime.utcnow()).total_seconds())
-
-        if self.redis:
-            self.redis.setex(key, ttl, data)
-        else:
-            self._memory_storage[key] = data
+        """Store session hash with native TTL and index it, in one round trip"""
+        expiry = _epoch(session.expires_at)
+
+        if not self.redis:
+            self._memory_sessions[session.session_id] = session
+            self._memory_user_sessions.setdefault(session.user_id, {})[session.session_id] = expiry
+            return
+
+        key = SESSION_KEY.format(session.session_id)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(key, mapping=session.to_hash())
+        pipe.expireat(key, int(expiry))
+        self._index(pipe, session.user_id, session.session_id, expiry)
+        pipe.execute()
+
+    def _migrate_legacy(self, session_id: str) -> Optional[Session]:
+        """Move a session stored by the previous layout to the current keys"""
+        key = LEGACY_SESSION_KEY.format(session_id)
+        try:
+            data = self.redis.get(key)
+        except redis.ResponseError:
+            return None  # Not a legacy session string
+        if not data:
+            return None
 
-    def _add_to_user_sessions(self, user_id: int, session_id: str):
-        """Add session to user's session set"""
-        key = f"user_sessions:{user_id}"
+        try:
+            session = Session.from_dict(json.loads(data))
+        except (ValueError, TypeError):
+            self.redis.delete(key)
+            return None
 
-        if self.redis:
-            self.redis.sadd(key, session_id)
-            # Set expiration on user sessions set
-            self.redis.expire(key, security_config.session.session_lifetime_hours * 3600)
-        else:
-            sessions_str = self._memory_storage.get(key, "[]")
-            sessions = json.loads(sessions_str)
-            if session_id not in sessions:
-                sessions.append(session_id)
-            self._memory_storage[key] = json.dumps(sessions)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(key)
+        pipe.srem(LEGACY_USER_SESSIONS_KEY.format(session.user_id), session_id)
+        pipe.execute()
 
-    def _remove_from_user_sessions(self, user_id: int, session_id: str):
-        """Remove session from user's session set"""
-        key = f"user_sessions:{user_id}"
+        if datetime.fromisoformat(session.expires_at) <= datetime.utcnow():
+            return None
+        self._store_session(session)
+        return session
 
-        if self.redis:
-            self.redis.srem(key, session_id)
-        else:
-            sessions_str = self._memory_storage.get(key, "[]")
-            sessions = json.loads(sessions_str)
-            if session_id in sessions:
-                sessions.remove(session_id)
-            self._memory_storage[key] = json.dumps(sessions)
+    def _migrate_legacy_user(self, user_id: int, session_ids: Optional[Any] = None) -> None:
+        """Move all of a user's previous-layout sessions to the current keys"""
+        legacy_key = LEGACY_USER_SESSIONS_KEY.format(user_id)
+        if session_ids is None:
+            try:
+                session_ids = self.redis.smembers(legacy_key)
+            except redis.ResponseError:
+                session_ids = None
+        for session_id in session_ids or ():
+            self._migrate_legacy(session_id)
+        self.redis.delete(legacy_key)
+
+    def _index(self, pipe: Any, user_id: int, session_id: str, expiry: float) -> None:
+        """Queue index updates for a session's (new) expiry on a pipeline"""
+        user_key = USER_SESSIONS_KEY.format(user_id)
+        pipe.zadd(user_key, {session_id: expiry})
+        # Every new or renewed session expires within one lifetime from now,
+        # so this keeps the user index alive as long as its longest session
+        pipe.expire(user_key, security_config.session.session_lifetime_hours * 3600)
+        pipe.zadd(EXPIRY_INDEX_KEY, {f"{user_id}:{session_id}": expiry})
 
 
 # Global session manager instance
@@ -25,6 +25,10 @@ from app.config.settings import settings
 from app.core.security_config import security_config
 from app.core.upstash_redis import upstash_redis
 
+# Expiry-scored indexes backing get_blacklist_stats (member -> expiry epoch)
+TOKEN_INDEX_KEY = "blacklist:index:tokens"
+USER_INDEX_KEY = "blacklist:index:users"
+
 
 class TokenBlacklist:
     """
@@ -124,7 +128,10 @@ class TokenBlacklist:
                 # Use Upstash Redis
                 self._run_async(upstash_redis.set(key, json.dumps(data), ex=ttl))
             elif self.redis:
-                self.redis.setex(key, ttl, json.dumps(data))
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.setex(key, ttl, json.dumps(data))
+                pipe.zadd(TOKEN_INDEX_KEY, {jti: int(datetime.utcnow().timestamp()) + ttl})
+                pipe.execute()
             else:
                 # In-memory storage (development)
                 self._memory_storage.add(jti)
@@ -201,7 +208,10 @@ class TokenBlacklist:
             if self.use_upstash:
                 self._run_async(upstash_redis.set(key, json.dumps(data), ex=ttl))
             elif self.redis:
-                self.redis.setex(key, ttl, json.dumps(data))
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.setex(key, ttl, json.dumps(data))
+                pipe.zadd(USER_INDEX_KEY, {str(user_id): int(datetime.utcnow().timestamp()) + ttl})
+                pipe.execute()
             else:
                 self._memory_storage.add(f"user:{user_id}")
 
@@ -250,7 +260,10 @@ class TokenBlacklist:
             if self.use_upstash:
                 self._run_async(upstash_redis.delete(key))
             elif self.redis:
-                self.redis.delete(key)
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.delete(key)
+                pipe.zrem(USER_INDEX_KEY, str(user_id))
+                pipe.execute()
             else:
                 self._memory_storage.discard(f"user:{user_id}")
 
@@ -354,13 +367,18 @@ class TokenBlacklist:
                     "status": "active",
                 }
             elif self.redis:
-                # Count blacklisted tokens
-                token_keys = self.redis.keys("blacklist:token:*")
-                user_keys = self.redis.keys("blacklist:user:*")
+                # Trim expired entries from the expiry indexes, then count them
+                now = int(datetime.utcnow().timestamp())
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.zremrangebyscore(TOKEN_INDEX_KEY, "-inf", now)
+                pipe.zremrangebyscore(USER_INDEX_KEY, "-inf", now)
+                pipe.zcard(TOKEN_INDEX_KEY)
+                pipe.zcard(USER_INDEX_KEY)
+                _, _, token_count, user_count = pipe.execute()
 
                 return {
-                    "blacklisted_tokens": len(token_keys),
-                    "blacklisted_users": len(user_keys),
+                    "blacklisted_tokens": token_count,
+                    "blacklisted_users": user_count,
                     "storage": "redis",
                 }
             else:
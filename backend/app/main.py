@@ -87,6 +87,21 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # Shutdown
     logger.info("Shutting down BARQ Fleet Management API")
 
+    # Flush audit records still waiting in this worker's write-behind queue
+    from app.services.audit_log_writer import audit_log_writer
+
+    audit_log_writer.stop()
+
+    # Write API key usage accumulated since the last flush
+    from app.services.api_key_service import api_key_service
+
+    api_key_service.stop()
+
+    # Stop the password hashing worker processes
+    from app.core.password_hashing import password_hashing
+
+    password_hashing.shutdown()
+
 
 def create_app() -> FastAPI:
     """
@@ -6,9 +6,13 @@ Note: Uses pure ASGI middleware instead of BaseHTTPMiddleware to avoid
 Content-Length issues with GZipMiddleware compression.
 """
 
+import json
 import logging
+import os
+import threading
 import time
-from typing import Callable, Any
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from fastapi import FastAPI
 from starlette.middleware.gzip import GZipMiddleware
@@ -16,9 +20,30 @@ from starlette.requests import Request
 from starlette.types import ASGIApp, Receive, Scope, Send, Message
 
 from app.core.performance_config import performance_config
+from app.core.query_optimizer import current_query_stats, query_profiler
+from app.core.request_timing import (
+    current_request_timing,
+    finish_request_timing,
+    start_request_timing,
+)
 
 logger = logging.getLogger(__name__)
 
+# Route label for requests that matched no route (keeps label cardinality bounded)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _server_timing(process_time: float) -> str:
+    """Server-Timing header value: DB, cache and external time, then the total"""
+    parts = []
+    query_stats = current_query_stats()
+    if query_stats is not None:
+        parts.append(query_stats.server_timing())
+    for component, seconds in (current_request_timing() or {}).items():
+        parts.append(f"{component};dur={seconds * 1000:.1f}")
+    parts.append(f"app;dur={process_time * 1000:.1f}")
+    return ", ".join(parts)
+
 
 class PerformanceMiddleware:
     """
@@ -26,9 +51,11 @@ class PerformanceMiddleware:
 
     Features:
     - Request timing
-    - Performance metrics collection
+    - Per-route latency/size histograms, in-flight gauges and
+      DB/cache/external time (see PerformanceMetrics)
     - Slow request logging
-    - Response time headers (added via custom send wrapper)
+    - Request-scoped query profiling (N+1 detection per route)
+    - Response time and Server-Timing headers (added via custom send wrapper)
 
     Note: Uses pure ASGI to avoid BaseHTTPMiddleware buffering issues with GZip.
     """
@@ -37,6 +64,7 @@ class PerformanceMiddleware:
         self.app = app
         self.enable_profiling = enable_profiling
         self.slow_threshold = performance_config.monitoring.slow_query_threshold
+        self.server_timing = performance_config.monitoring.enable_server_timing
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         if scope["type"] != "http":
@@ -50,11 +78,20 @@ class PerformanceMiddleware:
         scope.setdefault("state", {})
         scope["state"]["start_time"] = start_time
 
+        method = scope["method"]
         status_code = 0
+        response_size = 0
         headers_sent = False
+        started = time.perf_counter()
+        query_token = query_profiler.start_request(f"{method} {request.url.path}")
+        timing_token = start_request_timing()
+        performance_metrics.request_started(method)
 
         async def send_wrapper(message: Message) -> None:
-            nonlocal status_code, headers_sent
+            nonlocal status_code, response_size, headers_sent
+
+            if message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
 
             if message["type"] == "http.response.start":
                 status_code = message.get("status", 0)
@@ -63,6 +100,8 @@ class PerformanceMiddleware:
                 # Add performance headers
                 headers = list(message.get("headers", []))
                 headers.append((b"x-process-time", f"{process_time:.3f}".encode()))
+                if self.server_timing:
+                    headers.append((b"server-timing", _server_timing(process_time).encode()))
 
                 request_id = scope.get("state", {}).get("request_id", "unknown")
                 headers.append((b"x-request-id", str(request_id).encode()))
@@ -87,6 +126,21 @@ class PerformanceMiddleware:
             raise
         finally:
             process_time = time.time() - start_time
+            route = scope.get("route")
+            route_path = route.path if route is not None else UNMATCHED_ROUTE
+            query_stats = query_profiler.finish_request(query_token, endpoint=f"{method} {route_path}")
+            component_times = finish_request_timing(timing_token)
+            component_times["db"] = query_stats.db_time
+            performance_metrics.request_finished(method)
+            performance_metrics.record_request(
+                time.perf_counter() - started,
+                status_code or 500,
+                is_slow=process_time >= self.slow_threshold,
+                method=method,
+                route=route_path,
+                response_size=response_size,
+                component_times=component_times,
+            )
 
             # Log slow requests
             if process_time >= self.slow_threshold:
@@ -289,55 +343,364 @@ def setup_performance_middleware(app: FastAPI):
     )
 
 
-# Performance metrics collector
-class PerformanceMetrics:
+# Histogram upper bounds; each histogram has one extra +Inf bucket
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _new_route() -> dict:
+    return {
+        "count": 0,
+        "errors": 0,
+        "slow": 0,
+        "duration_sum": 0.0,
+        "duration_max": 0.0,
+        "duration_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+        "size_sum": 0,
+        "size_buckets": [0] * (len(SIZE_BUCKETS) + 1),
+        "status": {},
+        "components": {},
+    }
+
+
+def _merge_route(target: dict, source: dict) -> None:
+    for key in ("count", "errors", "slow", "duration_sum", "size_sum"):
+        target[key] += source[key]
+    target["duration_max"] = max(target["duration_max"], source["duration_max"])
+    for key in ("duration_buckets", "size_buckets"):
+        target[key] = [a + b for a, b in zip(target[key], source[key])]
+    for key in ("status", "components"):
+        for label, value in source[key].items():
+            target[key][label] = target[key].get(label, 0) + value
+
+
+def _percentile(buckets: List[int], bounds: Tuple[float, ...], maximum: float, q: float) -> float:
+    """Estimate a percentile by interpolating inside the histogram bucket holding it"""
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    for index, count in enumerate(buckets):
+        if count and cumulative + count >= rank:
+            lower = bounds[index - 1] if index > 0 else 0.0
+            upper = bounds[index] if index < len(bounds) else maximum
+            return min(lower + (upper - lower) * (rank - cumulative) / count, maximum)
+        cumulative += count
+    return maximum
+
+
+class MultiprocessCollector:
     """
-    Collect and expose performance metrics
+    Share metrics between worker processes through snapshot files.
+
+    Each worker writes its PerformanceMetrics snapshot to
+    ``<directory>/performance_<pid>.json`` (atomic replace) at most every
+    flush interval and whenever it serves a scrape. ``collect`` merges all
+    snapshots; counters of exited workers are kept so totals never go
+    backwards, their in-flight gauges are dropped. Clear the directory when
+    the server starts.
     """
 
-    def __init__(self):
-        self._request_count = 0
-        self._error_count = 0
-        self._total_response_time = 0.0
-        self._slow_request_count = 0
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"performance_{os.getpid()}.json")
+
+    def write(self, snapshot: dict) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.path)
+
+    def collect(self) -> List[dict]:
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not (name.startswith("performance_") and name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics snapshot {name}: {e}")
+                continue
+            if not _process_alive(snapshot.get("pid")):
+                snapshot["in_flight"] = {}
+            snapshots.append(snapshot)
+        return snapshots
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
 
-    def record_request(self, response_time: float, status_code: int, is_slow: bool = False):
-        """Record request metrics"""
-        self._request_count += 1
-        self._total_response_time += response_time
 
-        if status_code >= 400:
-            self._error_count += 1
+class PerformanceMetrics:
+    """
+    Collect and expose performance metrics
+
+    Per (method, route template):
+    - Request, error, slow request and status code counts
+    - Log-bucket latency and response size histograms
+    - Seconds spent in db/cache/external components
 
-        if is_slow:
-            self._slow_request_count += 1
+    Plus in-flight requests per method. Recording is a lock, a dict lookup
+    and two bisects, so it stays in the low microseconds per request.
+    """
+
+    def __init__(self, collector: Optional[MultiprocessCollector] = None, flush_interval: float = 5.0):
+        self.collector = collector
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._next_flush = 0.0
+        self._in_flight: Dict[str, int] = {}
+        self._routes: Dict[str, dict] = {}
+
+    def request_started(self, method: str):
+        """Increment the in-flight gauge"""
+        with self._lock:
+            self._in_flight[method] = self._in_flight.get(method, 0) + 1
+
+    def request_finished(self, method: str):
+        """Decrement the in-flight gauge"""
+        with self._lock:
+            self._in_flight[method] = self._in_flight.get(method, 0) - 1
+
+    def record_request(
+        self,
+        response_time: float,
+        status_code: int,
+        is_slow: bool = False,
+        method: str = "GET",
+        route: str = "<unmatched>",
+        response_size: int = 0,
+        component_times: Optional[Dict[str, float]] = None,
+    ):
+        """Record request metrics"""
+        duration_bucket = bisect_left(LATENCY_BUCKETS, response_time)
+        size_bucket = bisect_left(SIZE_BUCKETS, response_size)
+        key = f"{method} {route}"
+
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                stats = self._routes[key] = _new_route()
+            stats["count"] += 1
+            stats["duration_sum"] += response_time
+            if response_time > stats["duration_max"]:
+                stats["duration_max"] = response_time
+            stats["duration_buckets"][duration_bucket] += 1
+            stats["size_sum"] += response_size
+            stats["size_buckets"][size_bucket] += 1
+            status = str(status_code)
+            stats["status"][status] = stats["status"].get(status, 0) + 1
+            if status_code >= 400:
+                stats["errors"] += 1
+            if is_slow:
+                stats["slow"] += 1
+            if component_times:
+                components = stats["components"]
+                for component, seconds in component_times.items():
+                    components[component] = components.get(component, 0.0) + seconds
+
+        if self.collector is not None:
+            now = time.monotonic()
+            if now >= self._next_flush:
+                self.flush(now)
+
+    def flush(self, now: Optional[float] = None):
+        """Write this worker's snapshot for the multiprocess collector"""
+        if self.collector is None:
+            return
+        self._next_flush = (now or time.monotonic()) + self.flush_interval
+        try:
+            self.collector.write(self.snapshot())
+        except OSError as e:
+            logger.warning(f"Failed to write metrics snapshot: {e}")
+
+    def snapshot(self) -> dict:
+        """JSON-serializable copy of this process's metrics"""
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "in_flight": dict(self._in_flight),
+                "routes": {
+                    key: dict(
+                        stats,
+                        duration_buckets=list(stats["duration_buckets"]),
+                        size_buckets=list(stats["size_buckets"]),
+                        status=dict(stats["status"]),
+                        components=dict(stats["components"]),
+                    )
+                    for key, stats in self._routes.items()
+                },
+            }
+
+    def collect(self) -> dict:
+        """Metrics of all workers when a collector is configured, else of this process"""
+        if self.collector is None:
+            return self.snapshot()
+        self.flush()
+        merged = {"in_flight": {}, "routes": {}}
+        for snapshot in self.collector.collect():
+            for method, value in snapshot.get("in_flight", {}).items():
+                merged["in_flight"][method] = merged["in_flight"].get(method, 0) + value
+            for key, stats in snapshot.get("routes", {}).items():
+                _merge_route(merged["routes"].setdefault(key, _new_route()), stats)
+        return merged
 
     def get_metrics(self) -> dict:
         """Get current metrics"""
-        avg_response_time = (
-            self._total_response_time / self._request_count if self._request_count > 0 else 0
-        )
+        data = self.collect()
+        total = _new_route()
+        routes = []
+        for key, stats in data["routes"].items():
+            _merge_route(total, stats)
+            method, route = key.split(" ", 1)
+            routes.append(
+                {
+                    "method": method,
+                    "route": route,
+                    "requests": stats["count"],
+                    "error_rate": stats["errors"] / stats["count"],
+                    "avg_response_time": stats["duration_sum"] / stats["count"],
+                    "p95_response_time": _percentile(
+                        stats["duration_buckets"], LATENCY_BUCKETS, stats["duration_max"], 0.95
+                    ),
+                    "p99_response_time": _percentile(
+                        stats["duration_buckets"], LATENCY_BUCKETS, stats["duration_max"], 0.99
+                    ),
+                    "avg_response_size": stats["size_sum"] / stats["count"],
+                    "avg_component_time": {
+                        component: seconds / stats["count"]
+                        for component, seconds in stats["components"].items()
+                    },
+                }
+            )
 
-        error_rate = self._error_count / self._request_count if self._request_count > 0 else 0
+        count = total["count"]
+
+        def percentile(q: float) -> float:
+            return _percentile(total["duration_buckets"], LATENCY_BUCKETS, total["duration_max"], q)
 
         return {
-            "total_requests": self._request_count,
-            "total_errors": self._error_count,
-            "error_rate": error_rate,
-            "avg_response_time": avg_response_time,
-            "slow_requests": self._slow_request_count,
+            "total_requests": count,
+            "total_errors": total["errors"],
+            "error_rate": total["errors"] / count if count > 0 else 0,
+            "avg_response_time": total["duration_sum"] / count if count > 0 else 0,
+            "p50_response_time": percentile(0.5),
+            "p95_response_time": percentile(0.95),
+            "p99_response_time": percentile(0.99),
+            "slow_requests": total["slow"],
+            "in_flight": sum(data["in_flight"].values()),
+            "routes": sorted(
+                routes, key=lambda r: r["avg_response_time"] * r["requests"], reverse=True
+            ),
         }
 
     def reset(self):
-        """Reset metrics"""
-        self._request_count = 0
-        self._error_count = 0
-        self._total_response_time = 0.0
-        self._slow_request_count = 0
+        """Reset metrics (in-flight gauges are kept)"""
+        with self._lock:
+            self._routes = {}
+        self.flush()
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram_lines(name: str, labels: str, buckets: List[int], bounds: tuple, total: float) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(bounds, buckets):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    cumulative += buckets[-1]
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+    lines.append(f"{name}_sum{{{labels}}} {total}")
+    lines.append(f"{name}_count{{{labels}}} {cumulative}")
+    return lines
+
+
+def render_prometheus(data: dict) -> str:
+    """Render PerformanceMetrics.collect() output in the Prometheus text format (0.0.4)"""
+    families = {
+        "barq_http_requests_total": ("counter", "HTTP requests by route and status", []),
+        "barq_http_slow_requests_total": ("counter", "Requests slower than the slow threshold", []),
+        "barq_http_request_duration_seconds": ("histogram", "HTTP request latency", []),
+        "barq_http_response_size_bytes": ("histogram", "HTTP response body size", []),
+        "barq_http_request_component_seconds_total": (
+            "counter",
+            "Time spent in db, cache and external calls",
+            [],
+        ),
+        "barq_http_requests_in_flight": ("gauge", "Requests currently being handled", []),
+    }
+
+    for key in sorted(data["routes"]):
+        stats = data["routes"][key]
+        method, route = key.split(" ", 1)
+        labels = f'method="{_label(method)}",route="{_label(route)}"'
+        for status in sorted(stats["status"]):
+            families["barq_http_requests_total"][2].append(
+                f'barq_http_requests_total{{{labels},status="{status}"}} {stats["status"][status]}'
+            )
+        families["barq_http_slow_requests_total"][2].append(
+            f"barq_http_slow_requests_total{{{labels}}} {stats['slow']}"
+        )
+        families["barq_http_request_duration_seconds"][2].extend(
+            _histogram_lines(
+                "barq_http_request_duration_seconds",
+                labels,
+                stats["duration_buckets"],
+                LATENCY_BUCKETS,
+                stats["duration_sum"],
+            )
+        )
+        families["barq_http_response_size_bytes"][2].extend(
+            _histogram_lines(
+                "barq_http_response_size_bytes",
+                labels,
+                stats["size_buckets"],
+                SIZE_BUCKETS,
+                stats["size_sum"],
+            )
+        )
+        for component in sorted(stats["components"]):
+            families["barq_http_request_component_seconds_total"][2].append(
+                f'barq_http_request_component_seconds_total{{{labels},component="{_label(component)}"}} '
+                f'{stats["components"][component]}'
+            )
+
+    for method in sorted(data["in_flight"]):
+        families["barq_http_requests_in_flight"][2].append(
+            f'barq_http_requests_in_flight{{method="{_label(method)}"}} {data["in_flight"][method]}'
+        )
+
+    lines = []
+    for name, (kind, help_text, samples) in families.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
 
 
 # Global metrics instance
-performance_metrics = PerformanceMetrics()
+performance_metrics = PerformanceMetrics(
+    collector=(
+        MultiprocessCollector(performance_config.monitoring.metrics_multiproc_dir)
+        if performance_config.monitoring.metrics_multiproc_dir
+        else None
+    ),
+    flush_interval=performance_config.monitoring.metrics_flush_interval,
+)
 
 
 __all__ = [
@@ -346,5 +709,8 @@ __all__ = [
     "RequestDeduplicationMiddleware",
     "CompressionMiddleware",
     "setup_performance_middleware",
+    "PerformanceMetrics",
+    "MultiprocessCollector",
+    "render_prometheus",
     "performance_metrics",
 ]
@@ -20,6 +20,7 @@ from app.models.admin.backup import Backup, BackupStatus, BackupStorage, BackupT
 from app.models.admin.integration import Integration, IntegrationStatus, IntegrationType
 from app.models.admin.system_setting import SettingCategory, SettingType, SystemSetting
 from app.models.analytics.dashboard import Dashboard
+from app.models.analytics.dashboard_rollup import DashboardRollup
 from app.models.analytics.kpi import KPI, KPIPeriod, KPITrend
 from app.models.analytics.metric_snapshot import MetricSnapshot
 
@@ -53,6 +54,7 @@ from app.models.hr.bonus import Bonus, BonusType, PaymentStatus
 from app.models.hr.leave import Leave, LeaveStatus, LeaveType
 from app.models.hr.loan import Loan, LoanStatus
 from app.models.hr.salary import Salary
+from app.models.hr.eos_liability_snapshot import EOSLiabilitySnapshot
 
 # ============================================================================
 # Operations Models - Working relationships
@@ -179,6 +181,7 @@ __all__ = [
     "Attendance",
     "AttendanceStatus",
     "Salary",
+    "EOSLiabilitySnapshot",
     "Asset",
     "AssetType",
     "AssetStatus",
@@ -256,6 +259,7 @@ __all__ = [
     "ReportStatus",
     "ReportFormat",
     "Dashboard",
+    "DashboardRollup",
     "KPI",
     "KPIPeriod",
     "KPITrend",
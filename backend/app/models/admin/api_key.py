@@ -99,7 +99,12 @@ class ApiKey(TenantMixin, BaseModel):
         return ip_address in self.ip_whitelist
 
     def increment_usage(self, ip_address: str = None):
-        """Increment usage counter and update last used timestamp"""
+        """
+        Increment usage counter and update last used timestamp
+
+        Request paths should use api_key_service.authenticate instead, which
+        batches these writes (one UPDATE per key per flush interval).
+        """
         self.total_requests += 1
         self.last_used_at = datetime.utcnow()
         if ip_address:
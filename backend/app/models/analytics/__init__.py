@@ -1,6 +1,7 @@
 """Analytics models"""
 
 from app.models.analytics.dashboard import Dashboard
+from app.models.analytics.dashboard_rollup import DashboardRollup
 from app.models.analytics.kpi import KPI, KPIPeriod, KPITrend
 from app.models.analytics.metric_snapshot import MetricSnapshot
 from app.models.analytics.performance import PerformanceData
@@ -12,6 +13,7 @@ __all__ = [
     "MetricSnapshot",
     "Report",
     "Dashboard",
+    "DashboardRollup",
     "KPI",
     # Enums
     "ReportType",
@@ -0,0 +1,47 @@
+"""Dashboard Rollup Model - Pre-aggregated dashboard counts"""
+
+from sqlalchemy import BigInteger, Column, DateTime, Index, Numeric, String, UniqueConstraint
+
+from app.models.base import BaseModel
+from app.models.mixins import TenantMixin
+
+
+class DashboardRollup(TenantMixin, BaseModel):
+    """
+    Pre-aggregated dashboard counts per organization.
+
+    One row per (period, bucket_start, metric, dimension):
+    - period "current": point-in-time state (couriers by status, city, ...),
+      bucket_start is a fixed sentinel
+    - period "day" / "hour": event counts bucketed by time (deliveries by
+      status, couriers onboarded, ...)
+
+    Rows are rebuilt by DashboardRollupService; dashboard endpoints only read
+    them, so dashboard latency does not depend on fleet size.
+    """
+
+    __tablename__ = "dashboard_rollups"
+
+    period = Column(String(10), nullable=False, comment="current, day or hour")
+    bucket_start = Column(DateTime(timezone=True), nullable=False, comment="Bucket start (UTC)")
+    metric = Column(String(50), nullable=False, comment="e.g. courier_status, delivery_status")
+    dimension = Column(
+        String(100), nullable=False, default="", comment="Dimension value ('' when none)"
+    )
+    count = Column(BigInteger, nullable=False, default=0)
+    total = Column(Numeric(20, 4), nullable=False, default=0, comment="Sum for averaged metrics")
+
+    __table_args__ = (
+        UniqueConstraint(
+            "organization_id",
+            "period",
+            "bucket_start",
+            "metric",
+            "dimension",
+            name="uq_dashboard_rollups_bucket",
+        ),
+        Index("ix_dashboard_rollups_org_period_bucket", "organization_id", "period", "bucket_start"),
+    )
+
+    def __repr__(self):
+        return f"<DashboardRollup {self.period}:{self.metric}[{self.dimension}]={self.count}>"
@@ -35,6 +35,10 @@ class AuditLog(BaseModel):
     - Where it happened (ip_address)
     - What changed (old_values, new_values)
     - Additional context (metadata)
+
+    In PostgreSQL the table is range-partitioned by month on created_at
+    (see the partition_audit_logs migration). Rows are normally written in
+    batches by app.services.audit_log_writer rather than one per request.
     """
 
     __tablename__ = "audit_logs"
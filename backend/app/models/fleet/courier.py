@@ -5,8 +5,9 @@ from sqlalchemy import Enum as SQLEnum
 from sqlalchemy import ForeignKey, Integer, Numeric, String, Text
 from sqlalchemy.orm import relationship
 
+from app.core.encryption import encrypted_attribute
 from app.models.base import BaseModel
-from app.models.mixins import TenantMixin
+from app.models.mixins import BlindIndexMixin, TenantMixin
 
 
 class CourierStatus(str, enum.Enum):
@@ -39,10 +40,16 @@ class ProjectType(str, enum.Enum):
     MIXED = "MIXED"
 
 
-class Courier(TenantMixin, BaseModel):
+class Courier(BlindIndexMixin, TenantMixin, BaseModel):
     """Courier/Driver model - Core entity for fleet management"""
 
     __tablename__ = "couriers"
+    __blind_indexes__ = {
+        "national_id": "identifier",
+        "iqama_number": "identifier",
+        "passport_number": "identifier",
+        "iban": "identifier",
+    }
 
     # Basic Information
     barq_id = Column(
@@ -67,12 +74,21 @@ class Courier(TenantMixin, BaseModel):
     last_working_day = Column(Date, nullable=True)
     date_of_birth = Column(Date)
 
-    # Identification Documents
-    national_id = Column(String(50), unique=True)
+    # Identification Documents (encrypted and decrypted on access; uniqueness
+    # and lookups via blind indexes)
+    _national_id = Column("national_id", Text)
+    national_id = encrypted_attribute("_national_id")
+    national_id_bidx = Column(String(80), unique=True, comment="Blind index of national_id")
     nationality = Column(String(100))
-    iqama_number = Column(String(50), unique=True)
+    _iqama_number = Column("iqama_number", Text)
+    iqama_number = encrypted_attribute("_iqama_number")
+    iqama_number_bidx = Column(String(80), unique=True, comment="Blind index of iqama_number")
     iqama_expiry_date = Column(Date)
-    passport_number = Column(String(50), unique=True)
+    _passport_number = Column("passport_number", Text)
+    passport_number = encrypted_attribute("_passport_number")
+    passport_number_bidx = Column(
+        String(80), unique=True, comment="Blind index of passport_number"
+    )
     passport_expiry_date = Column(Date)
 
     # Driver's License
@@ -81,9 +97,12 @@ class Courier(TenantMixin, BaseModel):
     license_type = Column(String(20))  # Motorcycle, Car, etc.
 
     # Banking Information
-    bank_account_number = Column(String(50))
+    _bank_account_number = Column("bank_account_number", Text)
+    bank_account_number = encrypted_attribute("_bank_account_number")
     bank_name = Column(String(100))
-    iban = Column(String(50))
+    _iban = Column("iban", Text)
+    iban = encrypted_attribute("_iban")
+    iban_bidx = Column(String(80), index=True, comment="Blind index of iban")
 
     # Platform IDs (Integration with delivery platforms)
     jahez_driver_id = Column(String(50))
@@ -96,6 +115,13 @@ class Courier(TenantMixin, BaseModel):
     )
     fms_driver_id = Column(Integer, nullable=True, comment="FMS Driver ID")
     fms_last_sync = Column(String(50), nullable=True, comment="Last FMS sync timestamp")
+    current_zone_id = Column(
+        Integer,
+        ForeignKey("zones.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+        comment="Zone of the last FMS GPS position",
+    )
 
     # Assignment
     current_vehicle_id = Column(
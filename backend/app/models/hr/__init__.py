@@ -3,6 +3,7 @@ from app.models.hr.attendance import Attendance, AttendanceStatus
 from app.models.hr.leave import Leave, LeaveStatus, LeaveType
 from app.models.hr.loan import Loan, LoanStatus
 from app.models.hr.salary import Salary
+from app.models.hr.eos_liability_snapshot import EOSLiabilitySnapshot
 from app.models.hr.penalty import Penalty, PenaltyType, PenaltyStatus
 from app.models.hr.payroll_category import (
     PayrollCategory,
@@ -20,6 +21,7 @@ __all__ = [
     "Attendance",
     "AttendanceStatus",
     "Salary",
+    "EOSLiabilitySnapshot",
     "Asset",
     "AssetType",
     "AssetStatus",
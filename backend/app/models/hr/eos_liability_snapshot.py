@@ -0,0 +1,37 @@
+"""EOS Liability Snapshot Model - Monthly End of Service liability totals"""
+
+from sqlalchemy import JSON, Column, Date, DateTime, Index, Integer, Numeric, UniqueConstraint
+
+from app.models.base import BaseModel
+from app.models.mixins import TenantMixin
+
+
+class EOSLiabilitySnapshot(TenantMixin, BaseModel):
+    """
+    Organization-wide End of Service liability for one month.
+
+    One row per (organization, month), computed by EOSLiabilityService for all
+    couriers not yet terminated as if their service ended on ``as_of_date``
+    (employer termination, full entitlement). Finance dashboards read these
+    rows instead of recomputing EOS for the whole fleet.
+    """
+
+    __tablename__ = "eos_liability_snapshots"
+
+    month = Column(Date, nullable=False, comment="First day of the snapshot month")
+    as_of_date = Column(Date, nullable=False, comment="Service end date used for the calculation")
+    courier_count = Column(Integer, nullable=False, default=0)
+    total_liability = Column(Numeric(16, 2), nullable=False, default=0, comment="SAR")
+    defaulted_salary_count = Column(
+        Integer, nullable=False, default=0, comment="Couriers without a salary record"
+    )
+    breakdown = Column(JSON, nullable=False, default=dict, comment="By status and service band")
+    computed_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("organization_id", "month", name="uq_eos_liability_snapshots_month"),
+        Index("ix_eos_liability_snapshots_org_month", "organization_id", "month"),
+    )
+
+    def __repr__(self):
+        return f"<EOSLiabilitySnapshot {self.month}: {self.total_liability}>"
@@ -3,10 +3,26 @@ Multi-Tenancy Mixins for BARQ Fleet Management
 Provides tenant isolation through organization_id on all tenant-aware models
 """
 
-from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Text,
+    and_,
+    event,
+    inspect,
+    or_,
+    type_coerce,
+)
 from sqlalchemy.orm import declared_attr, relationship
 from sqlalchemy.sql import func
 
+from app.core.encryption import get_blind_indexer
+
 
 class TenantMixin:
     """
@@ -92,8 +108,93 @@ class AuditMixin:
         )
 
 
+class BlindIndexMixin:
+    """
+    Mixin maintaining HMAC blind indexes next to encrypted columns.
+
+    ``__blind_indexes__`` maps each searchable encrypted field to its
+    normalizer (see BlindIndexer.NORMALIZERS); the model declares a matching
+    indexed ``<field>_bidx`` column. Digests are computed from the plaintext
+    attribute on ORM insert, and on update only for fields whose value
+    changed. Bulk ``query.update()`` bypasses this; run the blind index
+    backfill afterwards.
+
+    Rows written before the column was indexed keep a NULL digest and their
+    plaintext until the backfill rewrites them; ``blind_index_match`` also
+    matches those rows on the stored value.
+
+    Usage:
+        class Courier(BlindIndexMixin, TenantMixin, BaseModel):
+            __blind_indexes__ = {"iqama_number": "identifier"}
+            iqama_number = Column(EncryptedField)
+            iqama_number_bidx = Column(String(80), unique=True)
+
+        db.query(Courier).filter(Courier.blind_index_match("iqama_number", value))
+    """
+
+    __blind_indexes__: Dict[str, str] = {}
+
+    @classmethod
+    def blind_index_column(cls, field: str):
+        if field not in cls.__blind_indexes__:
+            raise ValueError(f"{cls.__name__}.{field} has no blind index")
+        return getattr(cls, f"{field}_bidx")
+
+    @classmethod
+    def blind_index_match(cls, field: str, value: Any):
+        """
+        Equality filter on an encrypted field via its blind index
+
+        Matches digests under every active index key, so lookups keep
+        working while a key rotation is being backfilled, and legacy rows
+        (NULL digest, plaintext stored) by their stored value.
+        """
+        column = cls.blind_index_column(field)
+        candidates = get_blind_indexer().candidates(field, value, cls.__blind_indexes__[field])
+        if not candidates:
+            return column.is_(None)
+        if len(candidates) == 1:
+            match = column == candidates[0]
+        else:
+            match = column.in_(candidates)
+        # Compare the raw stored value (an EncryptedField would encrypt the bind)
+        stored = type_coerce(getattr(cls, cls.blind_index_source(field)), Text)
+        return or_(match, and_(column.is_(None), stored == str(value)))
+
+    @classmethod
+    def blind_index_source(cls, field: str) -> str:
+        """Mapped attribute holding the stored value of ``field``"""
+        descriptor = inspect(cls).all_orm_descriptors[field]
+        return getattr(descriptor, "column_attr", field)
+
+    def refresh_blind_indexes(self, fields: Optional[Iterable[str]] = None) -> None:
+        """Recompute blind index columns from the current plaintext values"""
+        indexer = get_blind_indexer()
+        for field in fields or self.__blind_indexes__:
+            kind = self.__blind_indexes__[field]
+            setattr(self, f"{field}_bidx", indexer.compute(field, getattr(self, field), kind))
+
+
+@event.listens_for(BlindIndexMixin, "before_insert", propagate=True)
+def _compute_blind_indexes(mapper, connection, target):
+    target.refresh_blind_indexes()
+
+
+@event.listens_for(BlindIndexMixin, "before_update", propagate=True)
+def _refresh_changed_blind_indexes(mapper, connection, target):
+    attrs = inspect(target).attrs
+    changed = [
+        field
+        for field in target.__blind_indexes__
+        if attrs[target.blind_index_source(field)].history.has_changes()
+    ]
+    if changed:
+        target.refresh_blind_indexes(changed)
+
+
 __all__ = [
     "TenantMixin",
     "SoftDeleteMixin",
     "AuditMixin",
+    "BlindIndexMixin",
 ]
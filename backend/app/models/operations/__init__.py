@@ -3,6 +3,7 @@ Operations Models
 """
 
 from app.models.operations.cod import COD, CODStatus
+from app.models.operations.cod_ledger import CODLedgerEntry, CourierCODBalance
 from app.models.operations.delivery import Delivery, DeliveryStatus
 from app.models.operations.dispatch import DispatchAssignment, DispatchPriority, DispatchStatus
 from app.models.operations.document import DocumentCategory, OperationsDocument
@@ -13,6 +14,8 @@ from app.models.operations.feedback import (
     FeedbackTemplate,
     FeedbackType,
 )
+from app.models.operations.feedback_rollup import FeedbackDailyRollup
+from app.models.operations.geocode_cache import GeocodeCacheEntry
 from app.models.operations.handover import Handover, HandoverStatus, HandoverType
 from app.models.operations.incident import Incident, IncidentStatus, IncidentType
 from app.models.operations.priority_queue import PriorityQueueEntry, QueuePriority, QueueStatus
@@ -37,9 +40,12 @@ __all__ = [
     # COD
     "COD",
     "CODStatus",
+    "CODLedgerEntry",
+    "CourierCODBalance",
     # Delivery
     "Delivery",
     "DeliveryStatus",
+    "GeocodeCacheEntry",
     # Route
     "Route",
     "RouteStatus",
@@ -79,6 +85,7 @@ __all__ = [
     "FeedbackType",
     "FeedbackStatus",
     "FeedbackSentiment",
+    "FeedbackDailyRollup",
     # Settings
     "OperationsSettings",
     "DispatchRule",
@@ -0,0 +1,79 @@
+"""COD Ledger Models - Append-only COD movements and running courier balances"""
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    UniqueConstraint,
+)
+
+from app.models.base import BaseModel
+from app.models.mixins import TenantMixin
+
+
+class CODLedgerEntry(TenantMixin, BaseModel):
+    """
+    One movement of COD money between status buckets.
+
+    A COD row entering the ledger has ``from_status`` NULL, one leaving it
+    (deleted, or moved to another courier or amount) has ``to_status`` NULL.
+    For any courier and status, the amounts moved in minus the amounts moved
+    out equal the sum of that courier's COD rows in that status. Rows are
+    never updated or deleted.
+    """
+
+    __tablename__ = "cod_ledger_entries"
+
+    # Plain column (no foreign key): entries outlive deleted COD rows
+    cod_id = Column(Integer, nullable=True, comment="NULL for reconciliation adjustments")
+    courier_id = Column(Integer, nullable=False, default=0, comment="0 when no courier")
+    from_status = Column(String(20), nullable=True)
+    to_status = Column(String(20), nullable=True)
+    amount = Column(Numeric(12, 2), nullable=False)
+    reason = Column(String(30), nullable=False)
+    reference_number = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_cod_ledger_entries_org_courier", "organization_id", "courier_id"),
+        Index("ix_cod_ledger_entries_cod_id", "cod_id"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<CODLedgerEntry cod={self.cod_id} courier={self.courier_id} "
+            f"{self.from_status}->{self.to_status}: {self.amount}>"
+        )
+
+
+class CourierCODBalance(TenantMixin, BaseModel):
+    """
+    Running COD totals per courier, kept in step with the ledger.
+
+    ``outstanding_amount`` is pending plus collected money still held by the
+    courier; deposited money awaits reconciliation. Reconciled COD leaves the
+    balance. Updated in the same transaction as the COD rows and ledger
+    entries, and verified periodically by CODLedgerService.reconcile.
+    """
+
+    __tablename__ = "courier_cod_balances"
+
+    courier_id = Column(Integer, nullable=False, comment="0 when no courier")
+    pending_amount = Column(Numeric(12, 2), nullable=False, default=0)
+    pending_count = Column(Integer, nullable=False, default=0)
+    collected_amount = Column(Numeric(12, 2), nullable=False, default=0)
+    collected_count = Column(Integer, nullable=False, default=0)
+    deposited_amount = Column(Numeric(12, 2), nullable=False, default=0)
+    deposited_count = Column(Integer, nullable=False, default=0)
+    outstanding_amount = Column(Numeric(12, 2), nullable=False, default=0)
+    reconciled_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("organization_id", "courier_id", name="uq_courier_cod_balances_courier"),
+        Index("ix_courier_cod_balances_org_outstanding", "organization_id", "outstanding_amount"),
+    )
+
+    def __repr__(self):
+        return f"<CourierCODBalance courier={self.courier_id}: {self.outstanding_amount}>"
@@ -31,4 +31,32 @@ class Delivery(TenantMixin, BaseModel):
     cod_amount = Column(Numeric(10, 2), default=0)
     notes = Column(Text)
 
+    # Coordinates geocoded from the addresses at ingest (null when not geocodable)
+    pickup_latitude = Column(Numeric(10, 8))
+    pickup_longitude = Column(Numeric(11, 8))
+    delivery_latitude = Column(Numeric(10, 8))
+    delivery_longitude = Column(Numeric(11, 8))
+
+    zone_id = Column(
+        Integer,
+        ForeignKey("zones.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+        comment="Zone containing the drop-off point, tagged at ingest",
+    )
+
     courier = relationship("Courier", back_populates="deliveries")
+
+    @property
+    def pickup_point(self):
+        """(latitude, longitude) of the pickup address, or None if not geocoded"""
+        if self.pickup_latitude is None or self.pickup_longitude is None:
+            return None
+        return float(self.pickup_latitude), float(self.pickup_longitude)
+
+    @property
+    def delivery_point(self):
+        """(latitude, longitude) of the drop-off address, or None if not geocoded"""
+        if self.delivery_latitude is None or self.delivery_longitude is None:
+            return None
+        return float(self.delivery_latitude), float(self.delivery_longitude)
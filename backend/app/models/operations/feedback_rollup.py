@@ -0,0 +1,73 @@
+"""Feedback Rollup Model - Pre-aggregated customer feedback per courier and day"""
+
+from sqlalchemy import Column, Date, Index, Integer, Numeric, String, UniqueConstraint
+
+from app.models.base import BaseModel
+from app.models.mixins import TenantMixin
+
+
+class FeedbackDailyRollup(TenantMixin, BaseModel):
+    """
+    Customer feedback counts and rating sums per (day, courier, category).
+
+    Every column is additive, so any period or courier summary is a SUM over
+    rollup rows. Averages are ``*_sum / *_count``. ``courier_id`` is 0 for
+    feedback without a courier and ``category`` is '' when uncategorized.
+
+    Rows are rebuilt by FeedbackRollupService for the days touched by
+    feedback writes; the feedback metrics endpoints only read them.
+    """
+
+    __tablename__ = "feedback_daily_rollups"
+
+    day = Column(Date, nullable=False, comment="Submission day (UTC)")
+    courier_id = Column(Integer, nullable=False, default=0, comment="0 when no courier")
+    category = Column(String(100), nullable=False, default="", comment="'' when uncategorized")
+
+    feedback_count = Column(Integer, nullable=False, default=0)
+
+    # Rating sums and non-null counts
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    delivery_speed_sum = Column(Integer, nullable=False, default=0)
+    delivery_speed_count = Column(Integer, nullable=False, default=0)
+    courier_behavior_sum = Column(Integer, nullable=False, default=0)
+    courier_behavior_count = Column(Integer, nullable=False, default=0)
+    package_condition_sum = Column(Integer, nullable=False, default=0)
+    package_condition_count = Column(Integer, nullable=False, default=0)
+    communication_sum = Column(Integer, nullable=False, default=0)
+    communication_count = Column(Integer, nullable=False, default=0)
+
+    # Overall rating distribution
+    rating_1_count = Column(Integer, nullable=False, default=0)
+    rating_2_count = Column(Integer, nullable=False, default=0)
+    rating_3_count = Column(Integer, nullable=False, default=0)
+    rating_4_count = Column(Integer, nullable=False, default=0)
+    rating_5_count = Column(Integer, nullable=False, default=0)
+
+    # Sentiment and flags
+    positive_count = Column(Integer, nullable=False, default=0)
+    neutral_count = Column(Integer, nullable=False, default=0)
+    negative_count = Column(Integer, nullable=False, default=0)
+    complaint_count = Column(Integer, nullable=False, default=0)
+    compliment_count = Column(Integer, nullable=False, default=0)
+    escalated_count = Column(Integer, nullable=False, default=0)
+
+    # Response and resolution
+    responded_count = Column(Integer, nullable=False, default=0)
+    response_hours_sum = Column(Numeric(14, 2), nullable=False, default=0)
+    response_hours_count = Column(Integer, nullable=False, default=0)
+    resolved_count = Column(Integer, nullable=False, default=0)
+    satisfaction_sum = Column(Integer, nullable=False, default=0)
+    satisfaction_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "organization_id", "day", "courier_id", "category", name="uq_feedback_daily_rollups_bucket"
+        ),
+        Index("ix_feedback_daily_rollups_org_day", "organization_id", "day"),
+        Index("ix_feedback_daily_rollups_org_courier", "organization_id", "courier_id"),
+    )
+
+    def __repr__(self):
+        return f"<FeedbackDailyRollup {self.day} courier={self.courier_id}: {self.feedback_count}>"
@@ -0,0 +1,27 @@
+"""Geocode Cache Model - Normalized address to coordinate lookups"""
+
+from sqlalchemy import Column, Float, String, Text
+
+from app.models.base import BaseModel
+
+
+class GeocodeCacheEntry(BaseModel):
+    """
+    Geocoder result for one normalized address.
+
+    Shared by all organizations: the same address always resolves to the
+    same point. Rows with null coordinates record addresses the geocoder
+    could not resolve, so they are not sent again until they are retried
+    (see GeocodingConfig.miss_retry_hours).
+    """
+
+    __tablename__ = "geocode_cache"
+
+    address_hash = Column(
+        String(64), nullable=False, unique=True, index=True,
+        comment="SHA-256 of the normalized address",
+    )
+    normalized_address = Column(Text, nullable=False)
+    latitude = Column(Float, nullable=True, comment="Null when the address was not found")
+    longitude = Column(Float, nullable=True, comment="Null when the address was not found")
+    provider = Column(String(50), nullable=False, comment="Geocoder backend that resolved it")
@@ -1,8 +1,8 @@
 import enum
 
-from sqlalchemy import Boolean, Column, DateTime
+from sqlalchemy import Boolean, Column, DateTime, Float
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import ForeignKey, Integer, Numeric, String, Text
+from sqlalchemy import ForeignKey, Index, Integer, Numeric, String, Text, text
 from sqlalchemy.orm import relationship
 
 from app.models.base import BaseModel
@@ -34,6 +34,17 @@ class PriorityQueueEntry(TenantMixin, BaseModel):
     """Priority queue for delivery scheduling and assignment"""
 
     __tablename__ = "priority_queue_entries"
+    __table_args__ = (
+        # Claim order for queued entries (FOR UPDATE SKIP LOCKED scans)
+        Index(
+            "ix_priority_queue_entries_claim",
+            "organization_id",
+            text("priority_sort_key DESC"),
+            "queued_at",
+            "id",
+            postgresql_where=text("status = 'QUEUED'"),
+        ),
+    )
 
     # Queue Entry Details
     queue_number = Column(String(50), unique=True, nullable=False, index=True)
@@ -57,6 +68,9 @@ class PriorityQueueEntry(TenantMixin, BaseModel):
     total_priority_score = Column(
         Integer, nullable=False, index=True, comment="Composite priority score"
     )
+    priority_sort_key = Column(
+        Float, comment="Time-invariant queue order key from the org scoring policy"
+    )
 
     # SLA Requirements
     sla_deadline = Column(
@@ -77,7 +91,7 @@ class PriorityQueueEntry(TenantMixin, BaseModel):
     completed_at = Column(DateTime)
     expired_at = Column(DateTime)
 
-    # Queue Position
+    # Queue Position (computed on read by the queue engine)
     queue_position = Column(Integer, index=True, comment="Position in queue (1=first)")
     estimated_wait_time_minutes = Column(Integer, comment="Estimated time until assignment")
 
@@ -135,6 +135,7 @@ class CourierResponse(CourierBase):
     last_working_day: Optional[date] = None
     performance_score: Optional[Decimal] = Field(default=Decimal("0"))
     total_deliveries: Optional[int] = Field(default=0, ge=0)  # Made Optional to handle NULL values
+    current_zone_id: Optional[int] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
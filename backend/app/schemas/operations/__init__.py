@@ -2,7 +2,16 @@
 Operations Schemas
 """
 
-from app.schemas.operations.cod import CODBase, CODCreate, CODResponse, CODStatus, CODUpdate
+from app.schemas.operations.cod import (
+    CODBase,
+    CODCreate,
+    CODLedgerEntryResponse,
+    CODResponse,
+    CODSettlement,
+    CODStatus,
+    CODUpdate,
+    CourierCODBalanceResponse,
+)
 from app.schemas.operations.delivery import (
     DeliveryBase,
     DeliveryCreate,
@@ -36,6 +45,8 @@ from app.schemas.operations.feedback import (
     CustomerFeedbackUpdate,
     FeedbackEscalateSchema,
     FeedbackFollowupSchema,
+    FeedbackKeywordResponse,
+    FeedbackKeywordSettings,
     FeedbackMetrics,
     FeedbackResolveSchema,
     FeedbackRespondSchema,
@@ -77,6 +88,8 @@ from app.schemas.operations.priority_queue import (
     QueuePosition,
     QueuePriority,
     QueueStatus,
+    ScoringPolicyResponse,
+    ScoringPolicySettings,
 )
 from app.schemas.operations.quality import (
     InspectionStatus,
@@ -98,8 +111,11 @@ from app.schemas.operations.route import (
     RouteCreate,
     RouteMetrics,
     RouteOptimize,
+    RoutePlanRequest,
+    RoutePlanResponse,
     RouteResponse,
     RouteStatus,
+    RouteStopConstraint,
     RouteUpdate,
 )
 from app.schemas.operations.settings import (
@@ -144,7 +160,10 @@ from app.schemas.operations.sla import (
 from app.schemas.operations.zone import (
     ZoneBase,
     ZoneCreate,
+    ZoneLocateRequest,
+    ZoneLocateResponse,
     ZoneMetrics,
+    ZonePoint,
     ZoneResponse,
     ZoneStatus,
     ZoneUpdate,
@@ -157,6 +176,9 @@ __all__ = [
     "CODCreate",
     "CODUpdate",
     "CODResponse",
+    "CODLedgerEntryResponse",
+    "CODSettlement",
+    "CourierCODBalanceResponse",
     # Delivery
     "DeliveryStatus",
     "DeliveryBase",
@@ -170,6 +192,9 @@ __all__ = [
     "RouteUpdate",
     "RouteResponse",
     "RouteOptimize",
+    "RouteStopConstraint",
+    "RoutePlanRequest",
+    "RoutePlanResponse",
     "RouteAssign",
     "RouteMetrics",
     # Incident
@@ -186,6 +211,9 @@ __all__ = [
     "ZoneUpdate",
     "ZoneResponse",
     "ZoneMetrics",
+    "ZonePoint",
+    "ZoneLocateRequest",
+    "ZoneLocateResponse",
     # Handover
     "HandoverStatus",
     "HandoverType",
@@ -246,6 +274,8 @@ __all__ = [
     "PriorityQueueEntryEscalate",
     "QueueMetrics",
     "QueuePosition",
+    "ScoringPolicySettings",
+    "ScoringPolicyResponse",
     # Feedback
     "FeedbackType",
     "FeedbackStatus",
@@ -263,6 +293,8 @@ __all__ = [
     "FeedbackTemplateUpdate",
     "FeedbackTemplateResponse",
     "FeedbackMetrics",
+    "FeedbackKeywordSettings",
+    "FeedbackKeywordResponse",
     "FeedbackSummary",
     # Settings
     "OperationsSettingsBase",
@@ -1,7 +1,7 @@
 from datetime import date, datetime
 from decimal import Decimal
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -42,3 +42,44 @@ class CODResponse(CODBase):
     updated_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class CourierCODBalanceResponse(BaseModel):
+    """Running COD balance of one courier"""
+
+    courier_id: int
+    pending_amount: Decimal
+    pending_count: int
+    collected_amount: Decimal
+    collected_count: int
+    deposited_amount: Decimal
+    deposited_count: int
+    outstanding_amount: Decimal = Field(..., description="Pending + collected, held by the courier")
+    reconciled_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CODLedgerEntryResponse(BaseModel):
+    """One COD ledger movement"""
+
+    id: int
+    cod_id: Optional[int] = None
+    courier_id: int
+    from_status: Optional[CODStatus] = None
+    to_status: Optional[CODStatus] = None
+    amount: Decimal
+    reason: str
+    reference_number: Optional[str] = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CODSettlement(BaseModel):
+    """Settle pending and collected COD for several couriers"""
+
+    courier_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    deposit_date: Optional[date] = None
+    reference_number: Optional[str] = None
@@ -24,7 +24,11 @@ class DeliveryBase(BaseModel):
 
 
 class DeliveryCreate(DeliveryBase):
-    pass
+    # Optional known coordinates; missing ones are geocoded from the addresses
+    pickup_latitude: Optional[float] = Field(None, ge=-90, le=90)
+    pickup_longitude: Optional[float] = Field(None, ge=-180, le=180)
+    delivery_latitude: Optional[float] = Field(None, ge=-90, le=90)
+    delivery_longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 
 class DeliveryUpdate(BaseModel):
@@ -48,6 +52,11 @@ class DeliveryResponse(BaseModel):
     customer_phone: Optional[str] = None
     notes: Optional[str] = None
     status: DeliveryStatus
+    pickup_latitude: Optional[float] = None
+    pickup_longitude: Optional[float] = None
+    delivery_latitude: Optional[float] = None
+    delivery_longitude: Optional[float] = None
+    zone_id: Optional[int] = None
     delivered_at: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
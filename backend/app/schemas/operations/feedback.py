@@ -222,3 +222,26 @@ class FeedbackSummary(BaseModel):
     recent_feedbacks: List[CustomerFeedbackResponse]
 
     model_config = ConfigDict(from_attributes=True)
+
+
+# Text Analysis Schemas
+class FeedbackKeywordSettings(BaseModel):
+    """Organization keyword tables for sentiment and categorization
+
+    Omitted tables keep the defaults.
+    """
+
+    positive: Optional[List[str]] = None
+    negative: Optional[List[str]] = None
+    categories: Optional[Dict[str, List[str]]] = Field(
+        None, description="Category name to keywords; earlier categories win ties"
+    )
+
+
+class FeedbackKeywordResponse(BaseModel):
+    """Keyword tables in effect"""
+
+    positive: List[str]
+    negative: List[str]
+    categories: Dict[str, List[str]]
+    reclassify_task_id: Optional[str] = None
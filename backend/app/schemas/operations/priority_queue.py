@@ -1,7 +1,7 @@
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -81,6 +81,7 @@ class PriorityQueueEntryResponse(PriorityQueueEntryBase):
     expired_at: Optional[datetime] = None
     queue_position: Optional[int] = None
     estimated_wait_time_minutes: Optional[int] = None
+    effective_priority_score: Optional[float] = None
     excluded_courier_ids: Optional[str] = None
     min_courier_rating: Optional[Decimal] = None
     max_assignment_attempts: int
@@ -108,6 +109,8 @@ class QueueMetrics(BaseModel):
     completed_entries: int
     expired_entries: int
     avg_wait_time_minutes: float
+    p50_wait_time_minutes: Optional[float] = None
+    p90_wait_time_minutes: Optional[float] = None
     avg_processing_time_minutes: float
     sla_compliance_rate: float
     escalation_rate: float
@@ -124,3 +127,17 @@ class QueuePosition(BaseModel):
     estimated_wait_minutes: int
     priority: QueuePriority
     is_at_risk: bool
+
+
+class ScoringPolicySettings(BaseModel):
+    """Organization priority scoring policy"""
+
+    policy: str = Field(..., description="Registered policy name, e.g. static, linear, exponential")
+    params: Dict[str, float] = Field(default_factory=dict)
+
+
+class ScoringPolicyResponse(ScoringPolicySettings):
+    """Active scoring policy"""
+
+    available_policies: List[str]
+    rescored_entries: Optional[int] = None
@@ -46,12 +46,36 @@ class RouteUpdate(BaseModel):
     notes: Optional[str] = None
 
 
+class RouteStopConstraint(BaseModel):
+    """Delivery window, size and handling time of one stop"""
+
+    delivery_id: int
+    earliest_arrival: Optional[datetime] = None
+    latest_arrival: Optional[datetime] = None
+    demand: float = Field(1, ge=0, description="Capacity units the delivery takes")
+    service_minutes: Optional[float] = Field(None, ge=0, description="Time spent at the stop")
+
+
 class RouteOptimize(BaseModel):
     """Schema for route optimization request"""
 
     delivery_ids: List[int] = Field(..., min_items=1)
     start_location: Optional[Dict[str, float]] = Field(None, description="Starting lat/lng")
     optimize_for: str = Field("time", pattern="^(time|distance|priority)$")
+    departure_time: Optional[datetime] = Field(None, description="Defaults to now")
+    stops: List[RouteStopConstraint] = Field(
+        default_factory=list, description="Per-delivery time windows, demand and service time"
+    )
+    vehicle_capacity: Optional[float] = Field(None, gt=0, description="Capacity units per vehicle")
+    max_route_minutes: Optional[int] = Field(None, gt=0, description="Longest allowed route")
+    return_to_start: bool = Field(False, description="Routes end back at start_location")
+    time_budget_ms: Optional[int] = Field(None, ge=10, le=10000)
+
+
+class RoutePlanRequest(RouteOptimize):
+    """Schema for splitting deliveries into routes for several vehicles"""
+
+    max_vehicles: int = Field(1, ge=1, le=100)
 
 
 class RouteAssign(BaseModel):
@@ -82,6 +106,15 @@ class RouteResponse(RouteBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class RoutePlanResponse(BaseModel):
+    """Routes created by a multi-vehicle plan"""
+
+    routes: List[RouteResponse]
+    unassigned_delivery_ids: List[int] = Field(
+        default_factory=list, description="Deliveries no vehicle could serve within constraints"
+    )
+
+
 class RouteMetrics(BaseModel):
     """Route performance metrics"""
 
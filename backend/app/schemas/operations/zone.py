@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -71,6 +71,23 @@ class ZoneResponse(ZoneBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ZonePoint(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+
+
+class ZoneLocateRequest(BaseModel):
+    """Points to resolve to zones in one call"""
+
+    points: List[ZonePoint] = Field(..., min_length=1, max_length=10000)
+
+
+class ZoneLocateResponse(BaseModel):
+    """Zone id per requested point, in request order (null outside every zone)"""
+
+    zone_ids: List[Optional[int]]
+
+
 class ZoneMetrics(BaseModel):
     """Zone performance metrics"""
 
@@ -1,5 +1,9 @@
 """Analytics services"""
 
+from app.services.analytics.dashboard_rollup_service import (
+    DashboardRollupService,
+    dashboard_rollup_service,
+)
 from app.services.analytics.fleet_analytics_service import (
     FleetAnalyticsService,
     fleet_analytics_service,
@@ -12,8 +16,10 @@ __all__ = [
     "performance_service",
     "fleet_analytics_service",
     "hr_analytics_service",
+    "dashboard_rollup_service",
     # Service classes (for customization if needed)
     "PerformanceService",
     "FleetAnalyticsService",
     "HRAnalyticsService",
+    "DashboardRollupService",
 ]
@@ -0,0 +1,657 @@
+"""
+Dashboard Rollup Service
+
+Maintains per-organization pre-aggregated dashboard counts in the
+``dashboard_rollups`` table and serves them to the dashboard endpoints.
+
+Maintenance is incremental:
+- session events record which (organization, day) buckets a commit touched for
+  Courier, Vehicle, Delivery and CourierVehicleAssignment rows and push them
+  to a Redis set
+- ``refresh_dashboard_rollups_task`` drains that set every minute and rebuilds
+  only the touched day/hour buckets plus the current-state rows of the
+  affected organizations
+- organizations not refreshed within ``max_staleness_seconds`` are re-rolled
+  even without writes, so time-relative counts (expiring documents, "this
+  week") stay current and missed events heal
+- organizations that were never rolled up are backfilled by the same task;
+  reads never write
+
+Reads are a single indexed query per endpoint (see ``RollupView``), so the
+dashboard no longer scans Courier/Vehicle/Delivery on every cache miss.
+"""
+
+import itertools
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, delete, event, func, insert, or_
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache_manager
+from app.core.performance_config import DashboardRollupConfig, performance_config
+from app.models.analytics.dashboard_rollup import DashboardRollup
+from app.models.fleet.assignment import CourierVehicleAssignment
+from app.models.fleet.courier import Courier, CourierStatus
+from app.models.fleet.vehicle import Vehicle
+from app.models.operations.delivery import Delivery
+from app.models.tenant.organization import Organization
+
+logger = logging.getLogger(__name__)
+
+PERIOD_CURRENT = "current"
+PERIOD_DAY = "day"
+PERIOD_HOUR = "hour"
+
+# bucket_start for current-state rows (part of the unique key, so not NULL)
+CURRENT_BUCKET = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Current-state metrics
+COURIER_STATUS = "courier_status"
+COURIER_SPONSORSHIP = "courier_sponsorship"
+COURIER_PROJECT = "courier_project"
+COURIER_CITY = "courier_city"
+COURIER_FLAGS = "courier_flags"
+COURIER_PERFORMANCE = "courier_performance"  # active couriers, total = sum(score)
+COURIER_DELIVERIES = "courier_deliveries"  # active couriers, total = sum(deliveries)
+VEHICLE_STATUS = "vehicle_status"
+VEHICLE_ASSIGNED = "vehicle_assigned"  # by status, vehicles with a courier
+ASSIGNMENT_TOTAL = "assignment_total"
+REFRESHED = "refreshed"  # total = epoch seconds of the last refresh
+
+# Time-bucketed metrics
+COURIER_CREATED = "courier_created"
+COURIER_TERMINATED = "courier_terminated"
+ASSIGNMENT_CREATED = "assignment_created"
+DELIVERY_STATUS = "delivery_status"
+
+# Document expiry window used by the dashboard alerts
+DOCUMENT_WARNING_DAYS = 30
+
+DIRTY_SET_KEY = "dashboard:rollups:dirty"
+_SESSION_DIRTY_KEY = "dashboard_rollup_dirty"
+_DIRTY_POP_BATCH = 1000
+
+TRACKED_MODELS = (Courier, Vehicle, Delivery, CourierVehicleAssignment)
+
+
+def _dimension(value: Any) -> str:
+    """Normalize a dimension value (enum, None, str) to its stored form"""
+    if value is None:
+        return ""
+    return str(getattr(value, "value", value))[:100]
+
+
+def _day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def _naive_utc(value: Any) -> datetime:
+    """Normalize a bucket value from any dialect to a naive UTC datetime"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _merge_days(days: Iterable[date]) -> List[Tuple[date, date]]:
+    """Merge a set of days into inclusive (start, end) runs of consecutive days"""
+    ranges: List[Tuple[date, date]] = []
+    for day in sorted(set(days)):
+        if ranges and day - ranges[-1][1] <= timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+class RollupView:
+    """
+    In-memory view over the rollup rows loaded for one organization
+
+    Usage:
+        view = dashboard_rollup_service.load(db, org_id, since=week_start)
+        view.count(COURIER_STATUS, "active")
+        view.daily(DELIVERY_STATUS)[date(2026, 10, 18)]["delivered"]
+    """
+
+    def __init__(self, rows: Iterable[Any]):
+        self._current: Dict[str, Dict[str, Tuple[int, float]]] = defaultdict(dict)
+        self._series: Dict[Tuple[str, str], Dict[Any, Dict[str, int]]] = defaultdict(
+            lambda: defaultdict(dict)
+        )
+        self.refreshed_at: Optional[datetime] = None
+
+        for period, bucket_start, metric, dimension, count, total in rows:
+            if period == PERIOD_CURRENT:
+                if metric == REFRESHED:
+                    self.refreshed_at = datetime.utcfromtimestamp(float(total))
+                    continue
+                self._current[metric][dimension] = (int(count), float(total or 0))
+            else:
+                bucket = _naive_utc(bucket_start)
+                key = bucket.date() if period == PERIOD_DAY else bucket
+                self._series[(period, metric)][key][dimension] = int(count)
+
+    @property
+    def pending(self) -> bool:
+        """True until the organization's first rollup has been built"""
+        return self.refreshed_at is None
+
+    def count(self, metric: str, dimension: Optional[str] = None) -> int:
+        """Current count for one dimension value, or summed over all values"""
+        values = self._current.get(metric, {})
+        if dimension is None:
+            return sum(count for count, _ in values.values())
+        return values.get(dimension, (0, 0.0))[0]
+
+    def breakdown(self, metric: str) -> Dict[str, int]:
+        """Current counts keyed by dimension value"""
+        return {dim: count for dim, (count, _) in self._current.get(metric, {}).items()}
+
+    def average(self, metric: str, dimension: str = "") -> float:
+        """total / count for an averaged metric"""
+        count, total = self._current.get(metric, {}).get(dimension, (0, 0.0))
+        return total / count if count else 0.0
+
+    def daily(self, metric: str) -> Dict[date, Dict[str, int]]:
+        """Day buckets: {day: {dimension: count}}"""
+        return self._series.get((PERIOD_DAY, metric), {})
+
+    def hourly(self, metric: str) -> Dict[datetime, Dict[str, int]]:
+        """Hour buckets: {hour (naive UTC): {dimension: count}}"""
+        return self._series.get((PERIOD_HOUR, metric), {})
+
+    def sum_days(self, metric: str, start: date, end: date) -> int:
+        """Sum of a daily metric over [start, end] inclusive, all dimensions"""
+        return sum(
+            sum(values.values())
+            for day, values in self.daily(metric).items()
+            if start <= day <= end
+        )
+
+
+class DashboardRollupService:
+    """Builds and reads the dashboard_rollups aggregate table"""
+
+    def __init__(self, config: Optional[DashboardRollupConfig] = None):
+        self.config = config or performance_config.dashboard_rollup
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def load(
+        self,
+        db: Session,
+        org_id: int,
+        since: Optional[date] = None,
+        hourly_since: Optional[datetime] = None,
+    ) -> RollupView:
+        """
+        Load current-state rows and, optionally, time buckets in one query
+
+        Reads never build rollups: an organization that has never been
+        rolled up gets an empty, ``pending`` view until
+        ``refresh_dashboard_rollups_task`` backfills it on its next run.
+
+        Args:
+            db: Database session
+            org_id: Organization ID
+            since: Include day buckets from this day onwards
+            hourly_since: Include hour buckets from this time onwards
+
+        Returns:
+            RollupView over the loaded rows
+        """
+        return RollupView(self._query(db, org_id, since, hourly_since))
+
+    def _query(
+        self,
+        db: Session,
+        org_id: int,
+        since: Optional[date],
+        hourly_since: Optional[datetime],
+    ) -> List[Any]:
+        periods = [DashboardRollup.period == PERIOD_CURRENT]
+        if since is not None:
+            periods.append(
+                and_(
+                    DashboardRollup.period == PERIOD_DAY,
+                    DashboardRollup.bucket_start >= _day_start(since),
+                )
+            )
+        if hourly_since is not None:
+            periods.append(
+                and_(
+                    DashboardRollup.period == PERIOD_HOUR,
+                    DashboardRollup.bucket_start >= hourly_since,
+                )
+            )
+
+        return (
+            db.query(
+                DashboardRollup.period,
+                DashboardRollup.bucket_start,
+                DashboardRollup.metric,
+                DashboardRollup.dimension,
+                DashboardRollup.count,
+                DashboardRollup.total,
+            )
+            .filter(DashboardRollup.organization_id == org_id, or_(*periods))
+            .all()
+        )
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+
+    def refresh_organization(
+        self,
+        db: Session,
+        org_id: int,
+        days: Optional[Iterable[date]] = None,
+        full: bool = False,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, int]:
+        """
+        Rebuild current-state rows and the given day buckets for one organization
+
+        The caller owns the transaction (commit/rollback).
+
+        Args:
+            db: Database session
+            org_id: Organization ID
+            days: Days touched by writes; the trailing window_days are always added
+            full: Rebuild the whole backfill_days history instead
+            now: Reference time (defaults to utcnow)
+
+        Returns:
+            Number of rows written and day ranges rebuilt
+        """
+        now = now or datetime.utcnow()
+        today = now.date()
+
+        if full:
+            ranges = [(today - timedelta(days=self.config.backfill_days - 1), today)]
+        else:
+            touched = set(days or ())
+            touched.update(today - timedelta(days=i) for i in range(self.config.window_days))
+            ranges = _merge_days(d for d in touched if d <= today)
+
+        hourly_floor = today - timedelta(days=self.config.hourly_retention_days - 1)
+
+        written = 0
+        for start, end in ranges:
+            written += self._rebuild_buckets(db, org_id, PERIOD_DAY, start, end)
+            if end >= hourly_floor:
+                written += self._rebuild_buckets(
+                    db, org_id, PERIOD_HOUR, max(start, hourly_floor), end
+                )
+
+        db.execute(
+            delete(DashboardRollup).where(
+                DashboardRollup.organization_id == org_id,
+                DashboardRollup.period == PERIOD_HOUR,
+                DashboardRollup.bucket_start < _day_start(hourly_floor),
+            )
+        )
+
+        current = self._current_rows(db, org_id, now)
+        db.execute(
+            delete(DashboardRollup).where(
+                DashboardRollup.organization_id == org_id,
+                DashboardRollup.period == PERIOD_CURRENT,
+            )
+        )
+        db.execute(insert(DashboardRollup), current)
+        written += len(current)
+
+        return {"rows": written, "ranges": len(ranges)}
+
+    def refresh_pending(self, db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Refresh organizations with pending writes or stale rollups
+
+        Commits per organization so one failure does not discard the others.
+
+        Returns:
+            Counts of refreshed and failed organizations
+        """
+        now = now or datetime.utcnow()
+        dirty = self.pop_dirty()
+        last_refresh = self._last_refresh(db)
+
+        cutoff = (now - timedelta(seconds=self.config.max_staleness_seconds)).replace(
+            tzinfo=timezone.utc
+        ).timestamp()
+        stale = {
+            org_id
+            for org_id, refreshed in last_refresh.items()
+            if refreshed is None or refreshed < cutoff
+        }
+
+        refreshed = failed = 0
+        for org_id in sorted(set(dirty) | stale):
+            try:
+                self.refresh_organization(
+                    db,
+                    org_id,
+                    days=dirty.get(org_id),
+                    full=last_refresh.get(org_id) is None,
+                    now=now,
+                )
+                db.commit()
+                cache_manager.delete_pattern("dashboard", f"org_{org_id}:*")
+                refreshed += 1
+            except Exception as e:
+                db.rollback()
+                failed += 1
+                logger.error(f"Dashboard rollup refresh failed for org {org_id}: {e}")
+                # Put the work back so the next run retries it
+                self.mark_dirty((org_id, day) for day in dirty.get(org_id, ()))
+
+        return {"refreshed": refreshed, "failed": failed, "dirty": len(dirty)}
+
+    def _last_refresh(self, db: Session) -> Dict[int, Optional[float]]:
+        """Last refresh epoch per active organization (None if never rolled up)"""
+        rows = (
+            db.query(Organization.id, DashboardRollup.total)
+            .outerjoin(
+                DashboardRollup,
+                and_(
+                    DashboardRollup.organization_id == Organization.id,
+                    DashboardRollup.period == PERIOD_CURRENT,
+                    DashboardRollup.metric == REFRESHED,
+                ),
+            )
+            .filter(Organization.is_active.is_(True))
+            .all()
+        )
+        return {org_id: float(total) if total is not None else None for org_id, total in rows}
+
+    def _rebuild_buckets(
+        self, db: Session, org_id: int, period: str, start: date, end: date
+    ) -> int:
+        """Replace the period's buckets in [start, end] with freshly grouped counts"""
+        lo = _day_start(start)
+        hi = _day_start(end + timedelta(days=1))
+
+        db.execute(
+            delete(DashboardRollup).where(
+                DashboardRollup.organization_id == org_id,
+                DashboardRollup.period == period,
+                DashboardRollup.bucket_start >= lo,
+                DashboardRollup.bucket_start < hi,
+            )
+        )
+
+        sources = [
+            (COURIER_CREATED, Courier, Courier.created_at, None, []),
+            (
+                COURIER_TERMINATED,
+                Courier,
+                Courier.updated_at,
+                None,
+                [Courier.status == CourierStatus.TERMINATED],
+            ),
+            (
+                ASSIGNMENT_CREATED,
+                CourierVehicleAssignment,
+                CourierVehicleAssignment.created_at,
+                None,
+                [],
+            ),
+            (DELIVERY_STATUS, Delivery, Delivery.created_at, Delivery.status, []),
+        ]
+
+        rows = []
+        for metric, model, time_column, dim_column, filters in sources:
+            bucket = self._bucket_expr(db, time_column, period).label("bucket")
+            columns = [bucket, func.count(model.id)]
+            group_by = [bucket]
+            if dim_column is not None:
+                columns.insert(1, dim_column)
+                group_by.append(dim_column)
+
+            results = (
+                db.query(*columns)
+                .filter(
+                    model.organization_id == org_id,
+                    time_column >= lo,
+                    time_column < hi,
+                    *filters,
+                )
+                .group_by(*group_by)
+                .all()
+            )
+            for result in results:
+                dimension = _dimension(result[1]) if dim_column is not None else ""
+                rows.append(
+                    {
+                        "organization_id": org_id,
+                        "period": period,
+                        "bucket_start": _naive_utc(result[0]).replace(tzinfo=timezone.utc),
+                        "metric": metric,
+                        "dimension": dimension,
+                        "count": result[-1],
+                        "total": 0,
+                    }
+                )
+
+        if rows:
+            db.execute(insert(DashboardRollup), rows)
+        return len(rows)
+
+    @staticmethod
+    def _bucket_expr(db: Session, column: Any, period: str) -> Any:
+        if db.get_bind().dialect.name == "postgresql":
+            return func.date_trunc(period, column)
+        fmt = "%Y-%m-%d 00:00:00" if period == PERIOD_DAY else "%Y-%m-%d %H:00:00"
+        return func.strftime(fmt, column)
+
+    def _current_rows(self, db: Session, org_id: int, now: datetime) -> List[Dict[str, Any]]:
+        """Current-state counts from three grouped queries"""
+        today = now.date()
+        warning = today + timedelta(days=DOCUMENT_WARNING_DAYS)
+        active = Courier.status == CourierStatus.ACTIVE
+        has_vehicle = Courier.current_vehicle_id.isnot(None)
+
+        def flag(condition):
+            return func.sum(case((condition, 1), else_=0))
+
+        def expired(column):
+            return and_(active, column.isnot(None), column <= today)
+
+        def expiring(column):
+            return and_(active, column.isnot(None), column > today, column <= warning)
+
+        flag_columns = {
+            "with_vehicle": has_vehicle,
+            "active_with_vehicle": and_(active, has_vehicle),
+            "active_valid_documents": and_(
+                active,
+                or_(Courier.iqama_expiry_date.is_(None), Courier.iqama_expiry_date > today),
+                or_(Courier.license_expiry_date.is_(None), Courier.license_expiry_date > today),
+            ),
+            "iqama_expired": expired(Courier.iqama_expiry_date),
+            "iqama_expiring": expiring(Courier.iqama_expiry_date),
+            "license_expired": expired(Courier.license_expiry_date),
+            "license_expiring": expiring(Courier.license_expiry_date),
+        }
+
+        courier_groups = (
+            db.query(
+                Courier.status,
+                Courier.sponsorship_status,
+                Courier.project_type,
+                Courier.city,
+                func.count(Courier.id),
+                func.sum(case((active, Courier.performance_score), else_=None)),
+                func.count(case((active, Courier.performance_score), else_=None)),
+                func.sum(case((active, Courier.total_deliveries), else_=None)),
+                func.count(case((active, Courier.total_deliveries), else_=None)),
+                *[flag(condition).label(name) for name, condition in flag_columns.items()],
+            )
+            .filter(Courier.organization_id == org_id)
+            .group_by(Courier.status, Courier.sponsorship_status, Courier.project_type, Courier.city)
+            .all()
+        )
+
+        counts: Dict[Tuple[str, str], List[float]] = defaultdict(lambda: [0, 0.0])
+
+        def add(metric: str, dimension: str, count: int, total: float = 0.0) -> None:
+            entry = counts[(metric, dimension)]
+            entry[0] += count or 0
+            entry[1] += float(total or 0)
+
+        for row in courier_groups:
+            status, sponsorship, project, city, count = row[:5]
+            add(COURIER_STATUS, _dimension(status), count)
+            add(COURIER_SPONSORSHIP, _dimension(sponsorship), count)
+            add(COURIER_PROJECT, _dimension(project), count)
+            add(COURIER_CITY, _dimension(city), count)
+            add(COURIER_PERFORMANCE, "", row[6], row[5])
+            add(COURIER_DELIVERIES, "", row[8], row[7])
+            for name, value in zip(flag_columns, row[9:]):
+                add(COURIER_FLAGS, name, value)
+
+        vehicle_groups = (
+            db.query(
+                Vehicle.status,
+                func.count(Vehicle.id),
+                flag(Vehicle.assigned_couriers.any()),
+            )
+            .filter(Vehicle.organization_id == org_id)
+            .group_by(Vehicle.status)
+            .all()
+        )
+        for status, count, assigned in vehicle_groups:
+            add(VEHICLE_STATUS, _dimension(status), count)
+            add(VEHICLE_ASSIGNED, _dimension(status), assigned)
+
+        assignments = (
+            db.query(func.count(CourierVehicleAssignment.id))
+            .filter(CourierVehicleAssignment.organization_id == org_id)
+            .scalar()
+        )
+        add(ASSIGNMENT_TOTAL, "", assignments)
+
+        rows = [
+            {
+                "organization_id": org_id,
+                "period": PERIOD_CURRENT,
+                "bucket_start": CURRENT_BUCKET,
+                "metric": metric,
+                "dimension": dimension,
+                "count": int(count),
+                "total": total,
+            }
+            for (metric, dimension), (count, total) in counts.items()
+            if count
+        ]
+        rows.append(
+            {
+                "organization_id": org_id,
+                "period": PERIOD_CURRENT,
+                "bucket_start": CURRENT_BUCKET,
+                "metric": REFRESHED,
+                "dimension": "",
+                "count": 1,
+                "total": now.replace(tzinfo=timezone.utc).timestamp(),
+            }
+        )
+        return rows
+
+    # ------------------------------------------------------------------
+    # Dirty bucket tracking
+    # ------------------------------------------------------------------
+
+    def mark_dirty(self, entries: Iterable[Tuple[int, date]]) -> None:
+        """Record (organization, day) buckets that need rebuilding"""
+        members = [f"{org_id}:{day.isoformat()}" for org_id, day in entries]
+        if not members:
+            return
+        client = cache_manager.redis_cache.client
+        if client is None:
+            return  # The staleness sweep picks the organizations up
+        try:
+            client.sadd(DIRTY_SET_KEY, *members)
+        except Exception as e:
+            logger.debug(f"Failed to mark dashboard rollups dirty: {e}")
+
+    def pop_dirty(self) -> Dict[int, Set[date]]:
+        """Atomically take all pending (organization, day) buckets"""
+        client = cache_manager.redis_cache.client
+        dirty: Dict[int, Set[date]] = defaultdict(set)
+        if client is None:
+            return dirty
+
+        try:
+            while True:
+                members = client.spop(DIRTY_SET_KEY, _DIRTY_POP_BATCH)
+                if not members:
+                    break
+                for member in members:
+                    if isinstance(member, bytes):
+                        member = member.decode()
+                    org_id, _, day = member.partition(":")
+                    dirty[int(org_id)].add(date.fromisoformat(day))
+        except Exception as e:
+            logger.warning(f"Failed to read dirty dashboard rollups: {e}")
+
+        return dirty
+
+
+def _track_changes(session: Session, flush_context: Any) -> None:
+    """after_flush: remember which rollup buckets this transaction touched"""
+    touched: Optional[Set[Tuple[int, date]]] = None
+    today = datetime.utcnow().date()
+
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, TRACKED_MODELS):
+            continue
+        # Read loaded state only; attribute access could emit SQL mid-flush
+        state = obj.__dict__
+        org_id = state.get("organization_id")
+        if org_id is None:
+            continue
+        if touched is None:
+            touched = session.info.setdefault(_SESSION_DIRTY_KEY, set())
+        created_at = state.get("created_at")
+        if isinstance(created_at, datetime):
+            touched.add((org_id, _naive_utc(created_at).date()))
+        # Status changes (e.g. terminations) are bucketed by updated_at
+        touched.add((org_id, today))
+
+
+def _publish_changes(session: Session) -> None:
+    """after_commit: hand touched buckets to the refresh job"""
+    touched = session.info.pop(_SESSION_DIRTY_KEY, None)
+    if touched:
+        dashboard_rollup_service.mark_dirty(touched)
+
+
+def _discard_changes(session: Session) -> None:
+    session.info.pop(_SESSION_DIRTY_KEY, None)
+
+
+def register_rollup_events() -> None:
+    """Install the session listeners that feed incremental refreshes (idempotent)"""
+    for name, listener in (
+        ("after_flush", _track_changes),
+        ("after_commit", _publish_changes),
+        ("after_rollback", _discard_changes),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+# Singleton instance
+dashboard_rollup_service = DashboardRollupService()
+register_rollup_events()
@@ -10,11 +10,18 @@ Provides analytics and insights for fleet operations:
 
 from datetime import date, datetime, timedelta
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from sqlalchemy import and_, case, extract, func, or_
 from sqlalchemy.orm import Session
 
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 from app.models.fleet.assignment import CourierVehicleAssignment as Assignment
 from app.models.fleet.courier import Courier, CourierStatus
 from app.models.fleet.maintenance import VehicleMaintenance as Maintenance
@@ -34,105 +41,106 @@ class FleetAnalyticsService:
     """
 
     def get_vehicle_utilization(
-        self, db: Session, start_date: date, end_date: date, vehicle_id: Optional[int] = None
+        self,
+        db: Session,
+        organization_id: int,
+        start_date: date,
+        end_date: date,
+        vehicle_id: Optional[int] = None,
+        granularity: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         Calculate vehicle utilization rate
 
         Utilization = (Days with assignments / Total days) * 100
 
+        Overlapping assignments count each day once. Only the assignment
+        date columns are loaded; the per-vehicle day counts come from
+        merge_assignment_days.
+
         Args:
             db: Database session
+            organization_id: Organization whose vehicles and assignments are counted
             start_date: Start date for analysis
             end_date: End date for analysis
             vehicle_id: Optional specific vehicle ID
+            granularity: Optional "daily" or "weekly" utilization trend
 
         Returns:
             Dictionary with utilization metrics
         """
-        total_days = (end_date - start_date).days + 1
+        total_days = max((end_date - start_date).days + 1, 0)
+        period = {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "total_days": total_days,
+        }
 
-        # Query assignments
-        query = db.query(Assignment)
-        query = query.filter(
+        query = db.query(Assignment.vehicle_id, Assignment.start_date, Assignment.end_date).filter(
             and_(
+                Assignment.organization_id == organization_id,
                 Assignment.start_date <= end_date,
                 or_(Assignment.end_date >= start_date, Assignment.end_date.is_(None)),
             )
         )
-
         if vehicle_id:
             query = query.filter(Assignment.vehicle_id == vehicle_id)
-
-        assignments = query.all()
+        rows = query.all()
+
+        assigned, daily = merge_assignment_days(
+            [r.vehicle_id for r in rows],
+            [r.start_date for r in rows],
+            [r.end_date for r in rows],
+            start_date,
+            end_date,
+        )
 
         if vehicle_id:
             # Single vehicle analysis
-            assigned_days = set()
-            for assignment in assignments:
-                end = assignment.end_date or end_date
-                current = max(start_date, assignment.start_date)
-                while current <= min(end, end_date):
-                    assigned_days.add(current)
-                    current += timedelta(days=1)
-
-            utilization_rate = (len(assigned_days) / total_days) * 100
-
-            return {
+            assigned_days = assigned.get(vehicle_id, 0)
+            result = {
                 "vehicle_id": vehicle_id,
-                "period": {
-                    "start_date": start_date.isoformat(),
-                    "end_date": end_date.isoformat(),
-                    "total_days": total_days,
-                },
-                "assigned_days": len(assigned_days),
-                "idle_days": total_days - len(assigned_days),
-                "utilization_rate": round(utilization_rate, 2),
-                "total_assignments": len(assignments),
+                "period": period,
+                "assigned_days": assigned_days,
+                "idle_days": total_days - assigned_days,
+                "utilization_rate": _rate(assigned_days, total_days),
+                "total_assignments": len(rows),
             }
-
-        else:
-            # Fleet-wide analysis
-            total_vehicles = db.query(func.count(Vehicle.id)).scalar()
-            vehicle_utilization = {}
-
-            for vehicle in db.query(Vehicle).all():
-                vehicle_assignments = [a for a in assignments if a.vehicle_id == vehicle.id]
-                assigned_days = set()
-
-                for assignment in vehicle_assignments:
-                    end = assignment.end_date or end_date
-                    current = max(start_date, assignment.start_date)
-                    while current <= min(end, end_date):
-                        assigned_days.add(current)
-                        current += timedelta(days=1)
-
-                utilization = (len(assigned_days) / total_days) * 100
-                vehicle_utilization[vehicle.id] = {
-                    "vehicle_id": vehicle.id,
-                    "license_plate": vehicle.license_plate,
-                    "assigned_days": len(assigned_days),
-                    "utilization_rate": round(utilization, 2),
-                }
-
-            avg_utilization = (
-                sum(v["utilization_rate"] for v in vehicle_utilization.values()) / total_vehicles
-                if total_vehicles > 0
-                else 0
-            )
-
-            return {
-                "fleet_summary": {
-                    "total_vehicles": total_vehicles,
-                    "period": {
-                        "start_date": start_date.isoformat(),
-                        "end_date": end_date.isoformat(),
-                        "total_days": total_days,
-                    },
-                    "average_utilization_rate": round(avg_utilization, 2),
-                },
-                "vehicles": list(vehicle_utilization.values()),
+            if granularity:
+                result["trend"] = utilization_trend(daily, start_date, 1, granularity)
+            return result
+
+        # Fleet-wide analysis
+        vehicles = (
+            db.query(Vehicle.id, Vehicle.plate_number, Vehicle.status)
+            .filter(Vehicle.organization_id == organization_id)
+            .order_by(Vehicle.id)
+            .all()
+        )
+        total_vehicles = len(vehicles)
+        vehicle_utilization = [
+            {
+                "vehicle_id": vehicle.id,
+                "license_plate": vehicle.plate_number,
+                "status": vehicle.status.value if vehicle.status else None,
+                "assigned_days": assigned.get(vehicle.id, 0),
+                "utilization_rate": _rate(assigned.get(vehicle.id, 0), total_days),
             }
+            for vehicle in vehicles
+        ]
+
+        fleet_days = sum(assigned.get(vehicle.id, 0) for vehicle in vehicles)
+        result = {
+            "fleet_summary": {
+                "total_vehicles": total_vehicles,
+                "period": period,
+                "average_utilization_rate": _rate(fleet_days, total_vehicles * total_days),
+            },
+            "vehicles": vehicle_utilization,
+        }
+        if granularity:
+            result["trend"] = utilization_trend(daily, start_date, total_vehicles, granularity)
+        return result
 
     def get_maintenance_costs(
         self, db: Session, start_date: date, end_date: date, vehicle_id: Optional[int] = None
@@ -293,5 +301,137 @@ class FleetAnalyticsService:
         }
 
 
+def merge_assignment_days(
+    vehicle_ids: Sequence[int],
+    starts: Sequence[date],
+    ends: Sequence[Optional[date]],
+    start_date: date,
+    end_date: date,
+) -> Tuple[Dict[int, int], List[int]]:
+    """
+    Merge assignment intervals into assigned days per vehicle.
+
+    Intervals are clipped to [start_date, end_date] (open-ended assignments
+    run to end_date), sorted by (vehicle, start) and swept once: each
+    interval only contributes the days past the furthest end already seen
+    for its vehicle, so overlaps are counted once. O(A log A) in the number
+    of assignments and independent of the period length.
+
+    Returns:
+        (assigned days by vehicle id, vehicles assigned on each day of the period)
+    """
+    total_days = (end_date - start_date).days + 1
+    if total_days <= 0:
+        return {}, []
+    if not vehicle_ids:
+        return {}, [0] * total_days
+    if NUMPY_AVAILABLE:
+        return _merge_numpy(vehicle_ids, starts, ends, start_date, end_date, total_days)
+
+    origin = start_date.toordinal()
+    intervals = sorted(
+        (
+            vid,
+            min(max(s.toordinal() - origin, 0), total_days),
+            min(max((e or end_date).toordinal() - origin + 1, 0), total_days),
+        )
+        for vid, s, e in zip(vehicle_ids, starts, ends)
+    )
+    assigned: Dict[int, int] = {}
+    diff = [0] * (total_days + 1)
+    current, reach = None, 0
+    for vid, lo, hi in intervals:
+        if vid != current:
+            current, reach = vid, 0
+            assigned[vid] = 0
+        lo = max(lo, reach)
+        if hi > lo:
+            assigned[vid] += hi - lo
+            diff[lo] += 1
+            diff[hi] -= 1
+            reach = hi
+    daily, running = [], 0
+    for delta in diff[:total_days]:
+        running += delta
+        daily.append(running)
+    return assigned, daily
+
+
+def _merge_numpy(vehicle_ids, starts, ends, start_date, end_date, total_days):
+    origin = start_date.toordinal()
+    n = len(vehicle_ids)
+    vid = np.asarray(vehicle_ids, dtype=np.int64)
+    lo = np.fromiter((s.toordinal() for s in starts), dtype=np.int64, count=n) - origin
+    hi = np.fromiter(((e or end_date).toordinal() for e in ends), dtype=np.int64, count=n)
+    hi = hi - origin + 1
+    np.clip(lo, 0, total_days, out=lo)
+    np.clip(hi, 0, total_days, out=hi)
+
+    order = np.lexsort((lo, vid))
+    vid, lo, hi = vid[order], lo[order], hi[order]
+    first = np.empty(n, dtype=bool)
+    first[0] = True
+    first[1:] = vid[1:] != vid[:-1]
+
+    # Running max of interval ends within each vehicle: offsetting every
+    # vehicle's ends above the previous vehicle's lets one global
+    # maximum.accumulate do the per-group scan.
+    offset = (np.cumsum(first) - 1) * (total_days + 1)
+    reach = np.maximum.accumulate(hi + offset) - offset
+    before = np.empty(n, dtype=np.int64)
+    before[0] = 0
+    before[1:] = reach[:-1]
+    before[first] = 0
+
+    lo = np.maximum(lo, before)
+    covered = np.maximum(hi - lo, 0)
+    starts_at = np.flatnonzero(first)
+    assigned = dict(
+        zip(vid[starts_at].tolist(), np.add.reduceat(covered, starts_at).tolist())
+    )
+
+    used = covered > 0
+    diff = np.bincount(lo[used], minlength=total_days + 1) - np.bincount(
+        hi[used], minlength=total_days + 1
+    )
+    return assigned, np.cumsum(diff[:total_days]).tolist()
+
+
+def utilization_trend(
+    daily: Sequence[int], start_date: date, fleet_size: int, granularity: str = "daily"
+) -> List[Dict[str, Any]]:
+    """
+    Bucket per-day assigned vehicle counts into a daily or weekly series.
+
+    Weekly buckets start on Monday; the first and last buckets may be
+    partial weeks.
+    """
+    if granularity not in ("daily", "weekly"):
+        raise ValueError(f"Unsupported granularity: {granularity}")
+
+    trend = []
+    index = 0
+    while index < len(daily):
+        bucket_start = start_date + timedelta(days=index)
+        width = 1 if granularity == "daily" else 7 - bucket_start.weekday()
+        counts = daily[index : index + width]
+        vehicle_days = sum(counts)
+        trend.append(
+            {
+                "period_start": bucket_start.isoformat(),
+                "days": len(counts),
+                "vehicle_days": vehicle_days,
+                "peak_assigned_vehicles": max(counts),
+                "utilization_rate": _rate(vehicle_days, fleet_size * len(counts)),
+            }
+        )
+        index += width
+    return trend
+
+
+def _rate(days: int, total: int) -> float:
+    return round(days / total * 100, 2) if total > 0 else 0.0
+
+
 # Singleton instance
 fleet_analytics_service = FleetAnalyticsService()
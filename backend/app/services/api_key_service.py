@@ -0,0 +1,462 @@
+"""API Key Service
+
+Verification and usage tracking for integration API keys.
+
+Keys are looked up by SHA-256 hash through a per-process cache with a short
+TTL (unknown hashes are cached too, briefly), so a verified call normally
+touches neither the database nor Redis. Each call bumps in-memory counters; a
+background flusher writes the accumulated request count, last-used timestamp
+and IP to api_keys with one UPDATE per key every ``flush_interval_seconds``.
+
+The same counters enforce each key's rate_limit_per_minute/hour/day. When
+Redis is configured the flusher also adds each interval's counts to shared
+window counters and reads the totals back, so limits hold across workers with
+at most one flush interval of lag.
+"""
+
+import atexit
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import redis
+from sqlalchemy import bindparam, case, func, or_, update
+from sqlalchemy.orm import Session
+
+from app.core.exceptions import (
+    ErrorCode,
+    ForbiddenException,
+    InsufficientPermissionsException,
+    RateLimitExceededException,
+    UnauthorizedException,
+)
+from app.core.performance_config import ApiKeyUsageConfig, performance_config
+from app.models.admin.api_key import ApiKey, ApiKeyStatus
+
+logger = logging.getLogger(__name__)
+
+# Rate limit windows: period -> (seconds, ApiKey limit column)
+RATE_LIMIT_WINDOWS = {
+    "minute": (60, "rate_limit_per_minute"),
+    "hour": (3600, "rate_limit_per_hour"),
+    "day": (86400, "rate_limit_per_day"),
+}
+
+# Shared window counters: api_key_usage:{key_id}:{period}:{window} (TTL = 2 windows)
+USAGE_WINDOW_KEY = "api_key_usage:{}:{}:{}"
+
+
+def hash_api_key(key: str) -> str:
+    """Hash API key for secure storage"""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class ApiKeyIdentity:
+    """Immutable snapshot of the ApiKey columns needed to authorize a call"""
+
+    id: int
+    organization_id: int
+    user_id: int
+    name: str
+    key_prefix: str
+    status: str
+    expires_at: Optional[datetime]
+    scopes: Tuple[str, ...]
+    ip_whitelist: Tuple[str, ...]
+    rate_limit_per_minute: int
+    rate_limit_per_hour: int
+    rate_limit_per_day: int
+
+    @classmethod
+    def from_model(cls, api_key: ApiKey) -> "ApiKeyIdentity":
+        return cls(
+            id=api_key.id,
+            organization_id=api_key.organization_id,
+            user_id=api_key.user_id,
+            name=api_key.name,
+            key_prefix=api_key.key_prefix,
+            status=api_key.status,
+            expires_at=api_key.expires_at,
+            scopes=tuple(api_key.scopes or ()),
+            ip_whitelist=tuple(api_key.ip_whitelist or ()),
+            rate_limit_per_minute=api_key.rate_limit_per_minute,
+            rate_limit_per_hour=api_key.rate_limit_per_hour,
+            rate_limit_per_day=api_key.rate_limit_per_day,
+        )
+
+    def is_active(self) -> bool:
+        """Check if API key is currently active"""
+        if self.status != ApiKeyStatus.ACTIVE.value:
+            return False
+        if self.expires_at and self.expires_at < datetime.utcnow():
+            return False
+        return True
+
+    def has_scope(self, scope: str) -> bool:
+        """Check if API key has a specific scope"""
+        return scope in self.scopes
+
+    def is_ip_allowed(self, ip_address: str) -> bool:
+        """Check if IP address is allowed (empty whitelist = any)"""
+        return not self.ip_whitelist or ip_address in self.ip_whitelist
+
+
+@dataclass
+class _Usage:
+    """Per-key counters accumulated between flushes"""
+
+    pending: int = 0
+    last_used_at: Optional[datetime] = None
+    last_ip: Optional[str] = None
+    # period -> [window index, count already flushed (all workers), count not yet flushed]
+    windows: Dict[str, List[int]] = field(default_factory=dict)
+
+
+class ApiKeyService:
+    """
+    Cached API key verification with coalesced usage writes
+
+    Usage:
+        identity = api_key_service.authenticate(request.headers.get("X-API-Key"), client_ip)
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        redis_client: Optional[redis.Redis] = None,
+        config: Optional[ApiKeyUsageConfig] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Initialize the service
+
+        Args:
+            session_factory: Callable returning a new Session (defaults to db_manager)
+            redis_client: Optional Redis client for cluster-wide rate limit windows
+            config: Cache and flush configuration (defaults to performance_config.api_key_usage)
+            clock: Epoch seconds source
+        """
+        self.config = config or performance_config.api_key_usage
+        self.clock = clock
+        self._session_factory = session_factory
+        self.redis = redis_client
+        if not self.redis:
+            try:
+                from app.config.settings import settings
+                from app.core.security_config import security_config
+
+                redis_url = security_config.rate_limit.storage_uri or getattr(
+                    settings, "REDIS_URL", None
+                )
+                if redis_url:
+                    self.redis = redis.from_url(
+                        redis_url, decode_responses=True, socket_connect_timeout=5, socket_timeout=5
+                    )
+            except Exception:
+                self.redis = None
+
+        self._cache: "OrderedDict[str, Tuple[float, Optional[ApiKeyIdentity]]]" = OrderedDict()
+        self._usage: Dict[int, _Usage] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._start_lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._stats = {
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "rate_limited": 0,
+            "flushes": 0,
+            "rows_written": 0,
+            "failed_flushes": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Verification
+    # ------------------------------------------------------------------
+
+    def authenticate(
+        self, raw_key: Optional[str], ip_address: Optional[str] = None, scope: Optional[str] = None
+    ) -> ApiKeyIdentity:
+        """
+        Verify an API key and count the call against its usage and limits
+
+        Args:
+            raw_key: Key as sent by the client (X-API-Key)
+            ip_address: Client IP checked against the key's whitelist
+            scope: Scope the call requires
+
+        Returns:
+            ApiKeyIdentity of the verified key
+
+        Raises:
+            UnauthorizedException: Missing, unknown, revoked or expired key
+            ForbiddenException: IP not whitelisted or scope missing
+            RateLimitExceededException: A per-key limit is exhausted
+        """
+        if not raw_key:
+            raise UnauthorizedException(detail="API key required")
+
+        identity = self.get_identity(hash_api_key(raw_key))
+        if identity is None or not identity.is_active():
+            raise UnauthorizedException(
+                detail="Invalid or expired API key", code=ErrorCode.TOKEN_INVALID
+            )
+        if ip_address and not identity.is_ip_allowed(ip_address):
+            raise ForbiddenException(detail="API key is not allowed from this IP address")
+        if scope and not identity.has_scope(scope):
+            raise InsufficientPermissionsException(required_permission=scope)
+
+        self.record_usage(identity, ip_address)
+        return identity
+
+    def get_identity(self, key_hash: str) -> Optional[ApiKeyIdentity]:
+        """Cached lookup by key hash (None for unknown keys)"""
+        now = self.clock()
+        with self._lock:
+            entry = self._cache.get(key_hash)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(key_hash)
+                self._stats["cache_hits"] += 1
+                return entry[1]
+            self._stats["cache_misses"] += 1
+
+        identity = self._load(key_hash)
+        ttl = self.config.cache_ttl_seconds if identity else self.config.negative_cache_ttl_seconds
+        with self._lock:
+            self._cache[key_hash] = (now + ttl, identity)
+            self._cache.move_to_end(key_hash)
+            while len(self._cache) > self.config.cache_max_entries:
+                self._cache.popitem(last=False)
+        return identity
+
+    def invalidate(self, key_hash: Optional[str] = None) -> None:
+        """
+        Drop cached lookups in this process (other workers expire within the TTL)
+
+        Args:
+            key_hash: Hash to drop, or None to clear the whole cache
+        """
+        with self._lock:
+            if key_hash is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key_hash, None)
+
+    def _load(self, key_hash: str) -> Optional[ApiKeyIdentity]:
+        session = self._create_session()
+        try:
+            api_key = session.query(ApiKey).filter(ApiKey.key_hash == key_hash).first()
+            return ApiKeyIdentity.from_model(api_key) if api_key else None
+        finally:
+            session.close()
+
+    # ------------------------------------------------------------------
+    # Usage and rate limits
+    # ------------------------------------------------------------------
+
+    def record_usage(self, identity: ApiKeyIdentity, ip_address: Optional[str] = None) -> None:
+        """
+        Count one call for the key; nothing is written until the next flush
+
+        Raises:
+            RateLimitExceededException: A per-key limit is exhausted (the call is not counted)
+        """
+        now = self.clock()
+        self._ensure_started()
+        with self._lock:
+            usage = self._usage.setdefault(identity.id, _Usage())
+            windows = []
+            for period, (seconds, limit_column) in RATE_LIMIT_WINDOWS.items():
+                window = int(now // seconds)
+                counts = usage.windows.get(period)
+                if counts is None or counts[0] != window:
+                    counts = usage.windows[period] = [window, 0, 0]
+                limit = getattr(identity, limit_column)
+                if self.config.enforce_rate_limits and limit and counts[1] + counts[2] >= limit:
+                    self._stats["rate_limited"] += 1
+                    raise RateLimitExceededException(
+                        detail=f"API key rate limit exceeded ({limit}/{period})",
+                        retry_after=max(1, int((window + 1) * seconds - now)),
+                    )
+                windows.append(counts)
+
+            for counts in windows:
+                counts[2] += 1
+            usage.pending += 1
+            usage.last_used_at = datetime.utcfromtimestamp(now)
+            if ip_address:
+                usage.last_ip = ip_address
+
+    def flush(self) -> int:
+        """
+        Write accumulated usage: one UPDATE per key used since the last flush
+
+        Returns:
+            Number of api_keys rows updated
+        """
+        now = self.clock()
+        rows: List[Dict[str, Any]] = []
+        increments: List[Tuple[int, str, int, int]] = []
+        with self._lock:
+            for key_id, usage in list(self._usage.items()):
+                if usage.pending:
+                    rows.append(
+                        {
+                            "key_id": key_id,
+                            "requests": usage.pending,
+                            "used_at": usage.last_used_at,
+                            "ip": usage.last_ip,
+                        }
+                    )
+                    usage.pending = 0
+                    usage.last_ip = None
+                for period, counts in usage.windows.items():
+                    if counts[2]:
+                        increments.append((key_id, period, counts[0], counts[2]))
+                        counts[1] += counts[2]
+                        counts[2] = 0
+                # Forget keys not used in the current day window (counts were taken above)
+                day = usage.windows.get("day")
+                if day is None or day[0] < int(now // 86400):
+                    del self._usage[key_id]
+
+        if rows:
+            self._write(rows)
+        if increments and self.redis:
+            self._share_windows(increments)
+        return len(rows)
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        table = ApiKey.__table__
+        used_at = bindparam("used_at")
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("key_id"))
+            .values(
+                total_requests=table.c.total_requests + bindparam("requests"),
+                last_used_at=case(
+                    (or_(table.c.last_used_at.is_(None), table.c.last_used_at < used_at), used_at),
+                    else_=table.c.last_used_at,
+                ),
+                last_request_ip=func.coalesce(bindparam("ip"), table.c.last_request_ip),
+                # Usage is not an edit of the key
+                updated_at=table.c.updated_at,
+            )
+        )
+        session = self._create_session()
+        try:
+            session.execute(stmt, rows)
+            session.commit()
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["rows_written"] += len(rows)
+        except Exception as e:
+            session.rollback()
+            with self._lock:
+                self._stats["failed_flushes"] += 1
+            logger.error(f"API key usage flush failed ({len(rows)} keys), retrying next flush: {e}")
+            self._requeue(rows)
+        finally:
+            session.close()
+
+    def _requeue(self, rows: List[Dict[str, Any]]) -> None:
+        """Merge unwritten counts back so the next flush carries them"""
+        with self._lock:
+            for row in rows:
+                usage = self._usage.setdefault(row["key_id"], _Usage())
+                usage.pending += row["requests"]
+                if usage.last_used_at is None or usage.last_used_at < row["used_at"]:
+                    usage.last_used_at = row["used_at"]
+                usage.last_ip = usage.last_ip or row["ip"]
+
+    def _share_windows(self, increments: List[Tuple[int, str, int, int]]) -> None:
+        """Add this worker's window counts in Redis and adopt the cluster-wide totals"""
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key_id, period, window, count in increments:
+                key = USAGE_WINDOW_KEY.format(key_id, period, window)
+                pipe.incrby(key, count)
+                pipe.expire(key, RATE_LIMIT_WINDOWS[period][0] * 2)
+            totals = pipe.execute()[::2]
+        except redis.RedisError as e:
+            logger.warning(f"API key rate limit windows not shared this flush: {e}")
+            return
+
+        with self._lock:
+            for (key_id, period, window, _), total in zip(increments, totals):
+                usage = self._usage.get(key_id)
+                counts = usage.windows.get(period) if usage else None
+                if counts is not None and counts[0] == window:
+                    counts[1] = max(counts[1], int(total))
+
+    def _create_session(self) -> Session:
+        if self._session_factory is not None:
+            return self._session_factory()
+
+        from app.core.database import db_manager
+
+        return db_manager.create_session()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background flusher for the current process"""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Forked child: the parent's counters are flushed by the parent
+                with self._lock:
+                    self._usage.clear()
+            self._pid = os.getpid()
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="api-key-usage-flusher", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the flusher and write everything accumulated"""
+        self._stop_event.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache and flush counters"""
+        with self._lock:
+            pending = sum(1 for usage in self._usage.values() if usage.pending)
+            return {
+                **self._stats,
+                "cached_keys": len(self._cache),
+                "tracked_keys": len(self._usage),
+                "keys_pending_flush": pending,
+                "running": self._thread is not None and self._thread.is_alive(),
+            }
+
+    def _ensure_started(self) -> None:
+        if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            self.start()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.config.flush_interval_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"API key usage flush error: {e}")
+
+
+# Singleton instance (one flusher per worker process)
+api_key_service = ApiKeyService()
+atexit.register(api_key_service.stop)
@@ -4,16 +4,33 @@ Service for creating and querying audit logs.
 Provides comprehensive audit trail for compliance and security.
 """
 
-from datetime import datetime, timedelta
+import logging
+import re
+from datetime import date, datetime, timedelta
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import and_, desc, func, or_
+from sqlalchemy import and_, desc, func, or_, text
 from sqlalchemy.orm import Session
 
+from app.core.performance_config import performance_config
 from app.models.audit_log import AuditAction, AuditLog
 from app.schemas.audit_log import AuditLogCreate, AuditLogFilter
+from app.services.audit_log_writer import audit_log_writer
 from app.services.base import CRUDBase
 
+logger = logging.getLogger(__name__)
+
+# Monthly partitions are named audit_logs_pYYYYMM and cover [month start, next month start)
+PARTITION_NAME_RE = re.compile(r"^audit_logs_p(\d{4})(\d{2})$")
+
+
+def _month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
 
 class AuditLogService(CRUDBase[AuditLog, AuditLogCreate, AuditLogCreate]):
     """
@@ -43,10 +60,15 @@ class AuditLogService(CRUDBase[AuditLog, AuditLogCreate, AuditLogCreate]):
         http_method: Optional[str] = None,
         metadata: Optional[Dict] = None,
         description: Optional[str] = None,
-    ) -> AuditLog:
+        immediate: bool = False,
+    ) -> Optional[AuditLog]:
         """
         Create a new audit log entry
 
+        By default the entry is handed to the batched background writer and
+        the request does not pay for an extra INSERT/commit. Pass
+        ``immediate=True`` when the caller needs the persisted row back.
+
         Args:
             db: Database session
             user_id: ID of user who performed the action
@@ -62,9 +84,10 @@ class AuditLogService(CRUDBase[AuditLog, AuditLogCreate, AuditLogCreate]):
             http_method: HTTP method used
             metadata: Additional context
             description: Human-readable description
+            immediate: Write synchronously in the caller's session
 
         Returns:
-            Created AuditLog instance
+            Created AuditLog instance when written immediately, otherwise None
         """
         log_data = AuditLogCreate(
             user_id=user_id,
@@ -81,8 +104,18 @@ class AuditLogService(CRUDBase[AuditLog, AuditLogCreate, AuditLogCreate]):
             metadata=metadata,
             description=description,
         )
+        record = log_data.model_dump()
+        record["extra_metadata"] = record.pop("metadata")
 
-        return self.create(db, obj_in=log_data)
+        if immediate or not performance_config.audit_log.async_writes:
+            db_obj = self.model(**record)
+            db.add(db_obj)
+            db.commit()
+            db.refresh(db_obj)
+            return db_obj
+
+        audit_log_writer.submit(record)
+        return None
 
     def get_by_filter(
         self, db: Session, *, filter_params: AuditLogFilter, skip: int = 0, limit: int = 100
@@ -195,6 +228,9 @@ class AuditLogService(CRUDBase[AuditLog, AuditLogCreate, AuditLogCreate]):
         """
         Get audit log summary statistics
 
+        Every query is bounded by created_at, so on the partitioned table
+        PostgreSQL prunes to the monthly partitions inside the window.
+
         Args:
             db: Database session
             days: Number of days to include in summary
@@ -272,6 +308,11 @@ class AuditLogService(CRUDBase[AuditLog, AuditLogCreate, AuditLogCreate]):
         """
         Clean up old audit logs (for maintenance)
 
+        On the partitioned table, monthly partitions that lie entirely before
+        the cutoff are detached and dropped (no row-by-row DELETE); only the
+        partition straddling the cutoff is trimmed with a pruned DELETE.
+        Dropped partitions contribute their planner row estimate to the count.
+
         Args:
             db: Database session
             days_to_keep: Number of days of logs to keep
@@ -281,11 +322,103 @@ class AuditLogService(CRUDBase[AuditLog, AuditLogCreate, AuditLogCreate]):
         """
         cutoff_date = datetime.utcnow() - timedelta(days=days_to_keep)
 
-        deleted_count = db.query(self.model).filter(self.model.created_at < cutoff_date).delete()
-
+        if not self._is_partitioned(db):
+            deleted_count = (
+                db.query(self.model).filter(self.model.created_at < cutoff_date).delete()
+            )
+            db.commit()
+            return deleted_count
+
+        deleted_count = 0
+        for name, (lower, upper) in self._list_partitions(db).items():
+            if upper > cutoff_date.date():
+                continue
+            estimate = db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE relname = :name"),
+                {"name": name},
+            ).scalar()
+            db.execute(text(f'ALTER TABLE audit_logs DETACH PARTITION "{name}"'))
+            db.execute(text(f'DROP TABLE "{name}"'))
+            deleted_count += max(int(estimate or 0), 0)
+            logger.info(f"Dropped audit log partition {name} ({lower} - {upper})")
+
+        deleted_count += (
+            db.query(self.model).filter(self.model.created_at < cutoff_date).delete()
+        )
         db.commit()
         return deleted_count
 
+    def ensure_partitions(self, db: Session, *, months_ahead: Optional[int] = None) -> List[str]:
+        """
+        Create monthly partitions from the current month up to ``months_ahead``
+
+        Args:
+            db: Database session
+            months_ahead: Future months to pre-create (defaults to config)
+
+        Returns:
+            Names of partitions that were created
+        """
+        if not self._is_partitioned(db):
+            return []
+
+        if months_ahead is None:
+            months_ahead = performance_config.audit_log.partitions_ahead
+
+        existing = self._list_partitions(db)
+        created = []
+        month = _month_start(datetime.utcnow().date())
+        for _ in range(months_ahead + 1):
+            name = f"audit_logs_p{month.year:04d}{month.month:02d}"
+            if name not in existing:
+                db.execute(
+                    text(
+                        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF audit_logs '
+                        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+                    )
+                )
+                created.append(name)
+            month = _next_month(month)
+
+        db.commit()
+        if created:
+            logger.info(f"Created audit log partitions: {', '.join(created)}")
+        return created
+
+    def _is_partitioned(self, db: Session) -> bool:
+        """Check whether audit_logs is a range-partitioned PostgreSQL table"""
+        if db.get_bind().dialect.name != "postgresql":
+            return False
+        return bool(
+            db.execute(
+                text(
+                    "SELECT 1 FROM pg_partitioned_table pt "
+                    "JOIN pg_class c ON c.oid = pt.partrelid "
+                    "WHERE c.relname = 'audit_logs'"
+                )
+            ).scalar()
+        )
+
+    def _list_partitions(self, db: Session) -> Dict[str, tuple]:
+        """Map monthly partition names to their [lower, upper) date bounds"""
+        rows = db.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits i "
+                "JOIN pg_class parent ON parent.oid = i.inhparent "
+                "JOIN pg_class child ON child.oid = i.inhrelid "
+                "WHERE parent.relname = 'audit_logs'"
+            )
+        ).all()
+
+        partitions = {}
+        for (name,) in rows:
+            match = PARTITION_NAME_RE.match(name)
+            if not match:
+                continue  # e.g. the default partition
+            lower = date(int(match.group(1)), int(match.group(2)), 1)
+            partitions[name] = (lower, _next_month(lower))
+        return partitions
+
 
 # Singleton instance
 audit_log_service = AuditLogService(AuditLog)
@@ -0,0 +1,424 @@
+"""Audit Log Writer
+
+Write-behind pipeline for audit log entries.
+
+Requests hand finished audit records to an in-process bounded queue and return
+immediately. A background flusher thread drains the queue and bulk-inserts the
+records in batches (one multi-row INSERT per batch) every ``flush_interval_ms``
+or as soon as ``batch_size`` records are waiting, whichever comes first.
+
+When the database is slow or unavailable the pipeline degrades to a durable
+spill file instead of blocking requests or dropping records:
+- if the queue is full, the producer appends the record to the spill file
+- if a batch insert fails, the whole batch is appended to the spill file
+Spilled records are replayed automatically after the next successful flush.
+Values JSON cannot represent (Decimal, date, ...) are spilled as strings; a
+record that still cannot be serialized is written to a quarantine file on
+its own, so it never costs the rest of its batch or the flusher thread.
+Each process only appends to and rotates its own spill file; files left by
+dead processes are adopted. Replay records its byte offset after every
+committed batch, so a replay that fails halfway resumes instead of inserting
+the same rows again.
+
+Each worker process gets its own queue and flusher; the writer restarts itself
+lazily after a fork so Gunicorn/Uvicorn workers never share a thread.
+"""
+
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.performance_config import AuditLogConfig, performance_config
+from app.models.audit_log import AuditAction, AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLogWriter:
+    """
+    Batched, non-blocking audit log writer
+
+    Usage:
+        audit_log_writer.submit({"action": AuditAction.UPDATE, "resource_type": "courier", ...})
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        config: Optional[AuditLogConfig] = None,
+    ):
+        """
+        Initialize the writer
+
+        Args:
+            session_factory: Callable returning a new Session (defaults to db_manager)
+            config: Pipeline configuration (defaults to performance_config.audit_log)
+        """
+        self.config = config or performance_config.audit_log
+        self._session_factory = session_factory
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=self.config.queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._start_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._stats = {
+            "submitted": 0,
+            "written": 0,
+            "batches": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "failed_batches": 0,
+            "slow_batches": 0,
+            "quarantined": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    def submit(self, record: Dict[str, Any]) -> None:
+        """
+        Queue an audit record for writing; never blocks on the database
+
+        Args:
+            record: Column values for audit_logs (created_at is stamped here
+                so the row reflects when the action happened, not when it
+                was flushed)
+        """
+        self._ensure_started()
+        record.setdefault("created_at", datetime.utcnow())
+        self._count("submitted")
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self._spill([record])
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background flusher for the current process"""
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Forked child: the parent's queue contents belong to the parent
+                self._queue = queue.Queue(maxsize=self.config.queue_size)
+            self._pid = os.getpid()
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="audit-log-flusher", daemon=True
+            )
+            self._thread.start()
+            logger.info(
+                f"Audit log writer started: batch_size={self.config.batch_size}, "
+                f"flush_interval_ms={self.config.flush_interval_ms}"
+            )
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the flusher and write everything still queued"""
+        self._stop_event.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+        self.flush()
+
+    def flush(self) -> int:
+        """
+        Synchronously drain the queue in the calling thread
+
+        Returns:
+            Number of records written to the database
+        """
+        written = 0
+        while True:
+            batch = self._take_batch(block=False)
+            if not batch:
+                break
+            written += self._write_or_spill(batch)
+        return written
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pipeline counters and current queue depth"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {
+            **stats,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self.config.queue_size,
+            "running": self._thread is not None and self._thread.is_alive(),
+        }
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def _ensure_started(self) -> None:
+        if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+            self.start()
+
+    # ------------------------------------------------------------------
+    # Flusher
+    # ------------------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            batch = self._take_batch(block=True)
+            if not batch:
+                continue
+            try:
+                self._write_or_spill(batch)
+            except Exception as e:
+                # Keep the flusher alive whatever a batch does
+                logger.error(f"Audit log flusher error ({len(batch)} records): {e}")
+
+    def _take_batch(self, block: bool) -> List[Dict[str, Any]]:
+        """Collect up to batch_size records, waiting at most flush_interval_ms"""
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.config.flush_interval_ms / 1000.0
+
+        while len(batch) < self.config.batch_size:
+            try:
+                if block:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _write_or_spill(self, batch: List[Dict[str, Any]]) -> int:
+        started = time.monotonic()
+        try:
+            self._write_batch(batch)
+        except Exception as e:
+            self._count("failed_batches")
+            logger.error(f"Audit log batch insert failed ({len(batch)} records), spilling: {e}")
+            self._spill(batch)
+            return 0
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        self._count("batches")
+        self._count("written", len(batch))
+        if elapsed_ms > self.config.slow_flush_threshold_ms:
+            self._count("slow_batches")
+            logger.warning(f"Slow audit log flush: {len(batch)} records in {elapsed_ms:.0f}ms")
+
+        self._replay_spill()
+        return len(batch)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Insert a batch with a single executemany (multi-row INSERT)"""
+        session = self._create_session()
+        try:
+            session.execute(insert(AuditLog), batch)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _create_session(self) -> Session:
+        if self._session_factory is not None:
+            return self._session_factory()
+
+        from app.core.database import db_manager
+
+        return db_manager.create_session()
+
+    # ------------------------------------------------------------------
+    # Spill to disk
+    # ------------------------------------------------------------------
+
+    @property
+    def _spill_path(self) -> str:
+        return os.path.join(self.config.spill_dir, f"audit-{os.getpid()}.jsonl")
+
+    @property
+    def _quarantine_path(self) -> str:
+        # Outside the audit-*.jsonl pattern, so replay never picks it up
+        return os.path.join(self.config.spill_dir, f"quarantine-audit-{os.getpid()}.log")
+
+    def _spill(self, records: List[Dict[str, Any]]) -> None:
+        """Append records to this process's spill file and fsync"""
+        lines = []
+        for record in records:
+            try:
+                lines.append(json.dumps(_to_spill(record), default=str) + "\n")
+            except Exception as e:
+                self._quarantine(record, e)
+        if not lines:
+            return
+        try:
+            os.makedirs(self.config.spill_dir, exist_ok=True)
+            with self._spill_lock:
+                with open(self._spill_path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._count("spilled", len(lines))
+        except OSError as e:
+            logger.error(f"Failed to spill {len(lines)} audit log records: {e}")
+
+    def _quarantine(self, record: Dict[str, Any], error: Exception) -> None:
+        """Set aside a record that cannot be spilled, keeping its repr for inspection"""
+        self._count("quarantined")
+        logger.error(f"Audit log record cannot be serialized, quarantined: {error}")
+        try:
+            os.makedirs(self.config.spill_dir, exist_ok=True)
+            with self._spill_lock:
+                with open(self._quarantine_path, "a", encoding="utf-8") as f:
+                    f.write(f"{datetime.utcnow().isoformat()} {error!r} {record!r}\n")
+        except Exception as e:
+            logger.error(f"Failed to quarantine audit log record: {e}")
+
+    def _replay_spill(self) -> int:
+        """Re-insert spilled records once the database is healthy"""
+        self._claim_spill_files()
+
+        replayed = 0
+        for path in sorted(glob.glob(os.path.join(self.config.spill_dir, "audit-*.replay"))):
+            try:
+                replayed += self._replay_file(path)
+            except Exception as e:
+                logger.error(f"Audit log spill replay failed for {path}, will resume: {e}")
+                break
+
+        if replayed:
+            self._count("replayed", replayed)
+            logger.info(f"Replayed {replayed} spilled audit log records")
+        return replayed
+
+    def _claim_spill_files(self) -> None:
+        """
+        Rotate spill files into replay files
+
+        This process's own file is rotated under the spill lock, so no append
+        can land in it afterwards. Files of other processes are only taken
+        over once their process has exited, because a live process may still
+        be appending to them.
+        """
+        for path in glob.glob(os.path.join(self.config.spill_dir, "audit-*.jsonl")):
+            try:
+                pid = int(os.path.basename(path)[len("audit-") : -len(".jsonl")])
+            except ValueError:
+                continue
+            if pid != os.getpid() and _process_alive(pid):
+                continue
+            claimed = f"{path[: -len('.jsonl')]}.{time.time_ns()}.replay"
+            try:
+                with self._spill_lock:
+                    os.rename(path, claimed)
+            except OSError:
+                continue  # Another process adopted it first
+
+    def _replay_file(self, path: str) -> int:
+        """
+        Insert a replay file's records from its recorded offset onwards
+
+        An exclusive flock keeps other processes off the file meanwhile; the
+        offset is persisted after every committed batch.
+        """
+        offset_path = f"{path}.offset"
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return 0  # Finished by another process
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return 0  # Being replayed by another process
+            if not os.path.exists(path):
+                return 0
+
+            offset = _read_offset(offset_path)
+            f.seek(offset)
+            replayed = 0
+            batch: List[Dict[str, Any]] = []
+            for line in f:
+                offset += len(line)
+                if line.strip():
+                    batch.append(_from_spill(json.loads(line)))
+                if len(batch) >= self.config.batch_size:
+                    self._write_batch(batch)
+                    _write_offset(offset_path, offset)
+                    replayed += len(batch)
+                    batch = []
+            if batch:
+                self._write_batch(batch)
+                replayed += len(batch)
+
+            os.remove(path)
+            if os.path.exists(offset_path):
+                os.remove(offset_path)
+        return replayed
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_offset(path: str) -> int:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _write_offset(path: str, offset: int) -> None:
+    """Persist a replay offset atomically"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(str(offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _to_spill(record: Dict[str, Any]) -> Dict[str, Any]:
+    data = dict(record)
+    if isinstance(data.get("action"), AuditAction):
+        data["action"] = data["action"].value
+    if isinstance(data.get("created_at"), datetime):
+        data["created_at"] = data["created_at"].isoformat()
+    return data
+
+
+def _from_spill(data: Dict[str, Any]) -> Dict[str, Any]:
+    if data.get("action") is not None:
+        data["action"] = AuditAction(data["action"])
+    if data.get("created_at"):
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+    return data
+
+
+# Singleton instance (one flusher per worker process)
+audit_log_writer = AuditLogWriter()
+atexit.register(audit_log_writer.stop)
@@ -0,0 +1,138 @@
+"""Blind Index Service
+
+Backfills encrypted fields and their blind indexes:
+- Encrypts legacy plaintext values written before a column was encrypted
+- Computes missing blind index digests
+- Rewrites digests computed with a retired index key after key rotation
+"""
+
+import logging
+from typing import Any, Dict, List, Optional, Type
+
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+from app.core.encryption import BlindIndexer, get_blind_indexer
+from app.core.security_config import security_config
+from app.models.mixins import BlindIndexMixin
+
+logger = logging.getLogger(__name__)
+
+
+class BlindIndexService:
+    """
+    Service for keeping blind indexes complete and on the current key
+
+    Rotating the index key: put the new key first in BLIND_INDEX_KEYS and
+    keep the old one listed, run the backfill until nothing is pending,
+    then remove the old key. Rows are processed in primary key order and
+    committed per batch, so the job can be interrupted and rerun.
+    """
+
+    def models(self) -> List[Type[BlindIndexMixin]]:
+        """Mapped models that maintain blind indexes"""
+        return sorted(
+            (
+                mapper.class_
+                for mapper in Base.registry.mappers
+                if issubclass(mapper.class_, BlindIndexMixin) and mapper.class_.__blind_indexes__
+            ),
+            key=lambda model: model.__tablename__,
+        )
+
+    def _pending_filter(self, model: Type[BlindIndexMixin]):
+        """Rows with a missing, stale or orphaned digest"""
+        current = f"{get_blind_indexer().current_version}{BlindIndexer.SEPARATOR}"
+        conditions = []
+        for field in model.__blind_indexes__:
+            value, digest = getattr(model, field), model.blind_index_column(field)
+            stale = or_(digest.is_(None), ~digest.startswith(current, autoescape=True))
+            conditions.append(
+                or_(and_(value.isnot(None), stale), and_(value.is_(None), digest.isnot(None)))
+            )
+        return or_(*conditions)
+
+    def pending_count(self, db: Session, model: Type[BlindIndexMixin]) -> int:
+        """Rows the backfill still has to rewrite"""
+        return db.query(model).filter(self._pending_filter(model)).count()
+
+    def _rewrite(self, row: BlindIndexMixin) -> None:
+        # Re-assigning the plaintext encrypts legacy values; the digests are
+        # then recomputed under the current key
+        for field in row.__blind_indexes__:
+            value = getattr(row, field)
+            if value is not None:
+                setattr(row, field, value)
+        row.refresh_blind_indexes()
+
+    def backfill(
+        self, db: Session, model: Type[BlindIndexMixin], *, batch_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Rewrite every pending row of a model, committing after each batch
+
+        Rows whose digest collides with another row's unique blind index
+        (values that differ only in formatting) are skipped and reported.
+
+        Returns:
+            Dictionary with updated, conflicts and remaining counts
+        """
+        batch_size = batch_size or security_config.encryption.blind_index_batch_size
+        pending = self._pending_filter(model)
+        updated, conflicts, last_id = 0, [], 0
+
+        while True:
+            rows = (
+                db.query(model)
+                .filter(model.id > last_id, pending)
+                .order_by(model.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            for row in rows:
+                self._rewrite(row)
+            try:
+                db.commit()
+                updated += len(rows)
+                continue
+            except IntegrityError:
+                db.rollback()
+
+            # Retry the batch row by row to isolate the conflicting rows
+            for row_id in [row.id for row in rows]:
+                row = db.get(model, row_id)
+                try:
+                    with db.begin_nested():
+                        self._rewrite(row)
+                    updated += 1
+                except IntegrityError:
+                    db.expire(row)
+                    conflicts.append(row_id)
+            db.commit()
+
+        if conflicts:
+            logger.warning(
+                f"Blind index backfill of {model.__tablename__} skipped duplicate rows: {conflicts}"
+            )
+        return {
+            "table": model.__tablename__,
+            "updated": updated,
+            "conflicts": conflicts,
+            "remaining": self.pending_count(db, model),
+            "key_version": get_blind_indexer().current_version,
+        }
+
+    def backfill_all(
+        self, db: Session, *, batch_size: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Backfill every model with blind indexes"""
+        return [self.backfill(db, model, batch_size=batch_size) for model in self.models()]
+
+
+blind_index_service = BlindIndexService()
@@ -3,7 +3,7 @@ Optimized Dashboard Service with Caching and N+1 Query Prevention
 
 This service provides performance-optimized dashboard data:
 - Multi-layer caching (memory + Redis)
-- Minimized database queries
+- Stats read from pre-aggregated rollups (one query, independent of fleet size)
 - Batch query optimization
 - Query result caching
 
@@ -16,21 +16,24 @@ Performance targets:
 from datetime import datetime, timedelta, date
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import and_, case, func, or_
-from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm import Session
 
-from app.core.cache import cache_manager, cached
-from app.models.fleet.assignment import CourierVehicleAssignment
+from app.core.cache import cache_manager
 from app.models.fleet.courier import Courier, CourierStatus, ProjectType, SponsorshipStatus
-from app.models.fleet.vehicle import Vehicle, VehicleStatus
-
-# Try importing optional models
-try:
-    from app.models.operations.delivery import Delivery, DeliveryStatus
-
-    HAS_DELIVERY = True
-except ImportError:
-    HAS_DELIVERY = False
+from app.models.fleet.vehicle import VehicleStatus
+from app.services.analytics.dashboard_rollup_service import (
+    ASSIGNMENT_CREATED,
+    ASSIGNMENT_TOTAL,
+    COURIER_CREATED,
+    COURIER_FLAGS,
+    COURIER_PROJECT,
+    COURIER_SPONSORSHIP,
+    COURIER_STATUS,
+    VEHICLE_ASSIGNED,
+    VEHICLE_STATUS,
+    RollupView,
+    dashboard_rollup_service,
+)
 
 
 class DashboardPerformanceService:
@@ -71,124 +74,41 @@ class DashboardPerformanceService:
         return stats
 
     def _calculate_dashboard_stats(self, db: Session, org_id: int) -> Dict[str, Any]:
-        """Calculate dashboard statistics (called when cache misses)"""
-
-        # OPTIMIZATION: Single query with aggregations instead of multiple count queries
-        courier_stats = (
-            db.query(
-                func.count(Courier.id).label("total"),
-                func.sum(
-                    case((Courier.status == CourierStatus.ACTIVE, 1), else_=0)
-                ).label("active"),
-                func.sum(
-                    case((Courier.status == CourierStatus.INACTIVE, 1), else_=0)
-                ).label("inactive"),
-                func.sum(
-                    case((Courier.status == CourierStatus.ON_LEAVE, 1), else_=0)
-                ).label("on_leave"),
-                func.sum(
-                    case((Courier.status == CourierStatus.ONBOARDING, 1), else_=0)
-                ).label("onboarding"),
-                func.sum(
-                    case((Courier.status == CourierStatus.SUSPENDED, 1), else_=0)
-                ).label("suspended"),
-                func.sum(
-                    case((Courier.current_vehicle_id.isnot(None), 1), else_=0)
-                ).label("with_vehicle"),
-                # Sponsorship breakdown
-                func.sum(
-                    case((Courier.sponsorship_status == SponsorshipStatus.AJEER, 1), else_=0)
-                ).label("ajeer"),
-                func.sum(
-                    case((Courier.sponsorship_status == SponsorshipStatus.INHOUSE, 1), else_=0)
-                ).label("inhouse"),
-                func.sum(
-                    case((Courier.sponsorship_status == SponsorshipStatus.FREELANCER, 1), else_=0)
-                ).label("freelancer"),
-                # Project breakdown
-                func.sum(
-                    case((Courier.project_type == ProjectType.ECOMMERCE, 1), else_=0)
-                ).label("ecommerce"),
-                func.sum(case((Courier.project_type == ProjectType.FOOD, 1), else_=0)).label(
-                    "food"
-                ),
-                func.sum(
-                    case((Courier.project_type == ProjectType.WAREHOUSE, 1), else_=0)
-                ).label("warehouse"),
-                func.sum(case((Courier.project_type == ProjectType.BARQ, 1), else_=0)).label(
-                    "barq"
-                ),
-            )
-            .filter(Courier.organization_id == org_id)
-            .one()
-        )
-
-        # Vehicle stats - single query with aggregations
-        # Using VehicleStatus enum: ACTIVE, MAINTENANCE, INACTIVE, RETIRED, REPAIR
-        vehicle_stats = (
-            db.query(
-                func.count(Vehicle.id).label("total"),
-                func.sum(case((Vehicle.status == VehicleStatus.ACTIVE, 1), else_=0)).label("active"),
-                func.sum(case((Vehicle.status == VehicleStatus.MAINTENANCE, 1), else_=0)).label("maintenance"),
-                func.sum(case((Vehicle.status.in_([VehicleStatus.INACTIVE, VehicleStatus.RETIRED, VehicleStatus.REPAIR]), 1), else_=0)).label(
-                    "out_of_service"
-                ),
-            )
-            .filter(Vehicle.organization_id == org_id)
-            .one()
-        )
-
-        # Assignment count
-        total_assignments = (
-            db.query(func.count(CourierVehicleAssignment.id))
-            .filter(CourierVehicleAssignment.organization_id == org_id)
-            .scalar()
-        )
+        """Calculate dashboard statistics from the rollup table (called when cache misses)"""
+        today = datetime.utcnow().date()
+        view = dashboard_rollup_service.load(db, org_id, since=today - timedelta(days=29))
+        return self.build_dashboard_stats(view, today)
 
-        # Recent activity - single query
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        month_ago = datetime.utcnow() - timedelta(days=30)
+    @staticmethod
+    def build_dashboard_stats(view: RollupView, today: date) -> Dict[str, Any]:
+        """
+        Build the dashboard stats payload from loaded rollups
 
-        new_couriers_this_week = (
-            db.query(func.count(Courier.id))
-            .filter(Courier.organization_id == org_id, Courier.created_at >= week_ago)
-            .scalar()
-        )
+        Args:
+            view: Rollups with at least the last 30 day buckets
+            today: Reference day for the weekly/monthly windows
 
-        new_couriers_this_month = (
-            db.query(func.count(Courier.id))
-            .filter(Courier.organization_id == org_id, Courier.created_at >= month_ago)
-            .scalar()
-        )
+        Returns:
+            Dashboard statistics dict
+        """
+        status = view.breakdown(COURIER_STATUS)
+        sponsorship = view.breakdown(COURIER_SPONSORSHIP)
+        projects = view.breakdown(COURIER_PROJECT)
+        vehicles = view.breakdown(VEHICLE_STATUS)
 
-        new_assignments_this_week = (
-            db.query(func.count(CourierVehicleAssignment.id))
-            .filter(
-                CourierVehicleAssignment.organization_id == org_id,
-                CourierVehicleAssignment.created_at >= week_ago,
-            )
-            .scalar()
-        )
+        total_couriers = view.count(COURIER_STATUS)
+        active_couriers = status.get(CourierStatus.ACTIVE.value, 0)
+        with_vehicle = view.count(COURIER_FLAGS, "with_vehicle")
 
-        # Calculate metrics
-        total_couriers = courier_stats.total or 0
-        active_couriers = courier_stats.active or 0
-        total_vehicles = vehicle_stats.total or 0
-        # Active vehicles count (we don't have a separate "assigned" status in the enum)
-        vehicles_active = vehicle_stats.active or 0
+        total_vehicles = view.count(VEHICLE_STATUS)
+        vehicles_active = vehicles.get(VehicleStatus.ACTIVE.value, 0)
         # Available = active vehicles that aren't assigned to any courier
-        # For simplicity, we'll need to query assigned vehicles separately
-        vehicles_with_assigned_couriers = (
-            db.query(func.count(Vehicle.id))
-            .filter(
-                Vehicle.organization_id == org_id,
-                Vehicle.status == VehicleStatus.ACTIVE,
-                Vehicle.assigned_couriers.any()
-            )
-            .scalar() or 0
+        vehicles_assigned = view.count(VEHICLE_ASSIGNED, VehicleStatus.ACTIVE.value)
+        vehicles_available = vehicles_active - vehicles_assigned
+        vehicles_out_of_service = sum(
+            vehicles.get(s.value, 0)
+            for s in (VehicleStatus.INACTIVE, VehicleStatus.RETIRED, VehicleStatus.REPAIR)
         )
-        vehicles_available = vehicles_active - vehicles_with_assigned_couriers
-        vehicles_assigned = vehicles_with_assigned_couriers
 
         courier_utilization = (
             round((active_couriers / total_couriers * 100), 1) if total_couriers > 0 else 0
@@ -197,19 +117,19 @@ class DashboardPerformanceService:
             round((vehicles_assigned / total_vehicles * 100), 1) if total_vehicles > 0 else 0
         )
 
-        # Growth rate calculation
-        two_weeks_ago = datetime.utcnow() - timedelta(days=14)
-        couriers_two_weeks = (
-            db.query(func.count(Courier.id))
-            .filter(
-                Courier.organization_id == org_id,
-                and_(Courier.created_at >= two_weeks_ago, Courier.created_at < week_ago),
-            )
-            .scalar()
+        # Day windows ending today: this week = last 7 days, previous week = the 7 before
+        week_start = today - timedelta(days=6)
+        new_couriers_this_week = view.sum_days(COURIER_CREATED, week_start, today)
+        new_couriers_this_month = view.sum_days(
+            COURIER_CREATED, today - timedelta(days=29), today
+        )
+        new_assignments_this_week = view.sum_days(ASSIGNMENT_CREATED, week_start, today)
+        couriers_two_weeks = view.sum_days(
+            COURIER_CREATED, week_start - timedelta(days=7), week_start - timedelta(days=1)
         )
 
         growth_rate = 0
-        if couriers_two_weeks and couriers_two_weeks > 0:
+        if couriers_two_weeks > 0:
             growth_rate = round(
                 ((new_couriers_this_week - couriers_two_weeks) / couriers_two_weeks) * 100, 1
             )
@@ -220,39 +140,39 @@ class DashboardPerformanceService:
             "total_users": 0,  # Placeholder
             "total_vehicles": total_vehicles,
             "total_couriers": total_couriers,
-            "total_assignments": total_assignments or 0,
+            "total_assignments": view.count(ASSIGNMENT_TOTAL),
             # Courier status
             "active_couriers": active_couriers,
-            "inactive_couriers": courier_stats.inactive or 0,
-            "on_leave_couriers": courier_stats.on_leave or 0,
-            "onboarding_couriers": courier_stats.onboarding or 0,
-            "suspended_couriers": courier_stats.suspended or 0,
+            "inactive_couriers": status.get(CourierStatus.INACTIVE.value, 0),
+            "on_leave_couriers": status.get(CourierStatus.ON_LEAVE.value, 0),
+            "onboarding_couriers": status.get(CourierStatus.ONBOARDING.value, 0),
+            "suspended_couriers": status.get(CourierStatus.SUSPENDED.value, 0),
             # Vehicle status
             "vehicles_available": vehicles_available,
             "vehicles_assigned": vehicles_assigned,
-            "vehicles_maintenance": vehicle_stats.maintenance or 0,
-            "vehicles_out_of_service": vehicle_stats.out_of_service or 0,
+            "vehicles_maintenance": vehicles.get(VehicleStatus.MAINTENANCE.value, 0),
+            "vehicles_out_of_service": vehicles_out_of_service,
             # Trends
-            "new_couriers_this_week": new_couriers_this_week or 0,
-            "new_couriers_this_month": new_couriers_this_month or 0,
-            "new_assignments_this_week": new_assignments_this_week or 0,
+            "new_couriers_this_week": new_couriers_this_week,
+            "new_couriers_this_month": new_couriers_this_month,
+            "new_assignments_this_week": new_assignments_this_week,
             "courier_growth_rate": growth_rate,
             # Utilization
             "courier_utilization": courier_utilization,
             "vehicle_utilization": vehicle_utilization,
-            "couriers_with_vehicle": courier_stats.with_vehicle or 0,
+            "couriers_with_vehicle": with_vehicle,
             # Sponsorship breakdown
             "sponsorship_breakdown": {
-                "ajeer": courier_stats.ajeer or 0,
-                "inhouse": courier_stats.inhouse or 0,
-                "freelancer": courier_stats.freelancer or 0,
+                "ajeer": sponsorship.get(SponsorshipStatus.AJEER.value, 0),
+                "inhouse": sponsorship.get(SponsorshipStatus.INHOUSE.value, 0),
+                "freelancer": sponsorship.get(SponsorshipStatus.FREELANCER.value, 0),
             },
             # Project breakdown
             "project_breakdown": {
-                "ecommerce": courier_stats.ecommerce or 0,
-                "food": courier_stats.food or 0,
-                "warehouse": courier_stats.warehouse or 0,
-                "barq": courier_stats.barq or 0,
+                "ecommerce": projects.get(ProjectType.ECOMMERCE.value, 0),
+                "food": projects.get(ProjectType.FOOD.value, 0),
+                "warehouse": projects.get(ProjectType.WAREHOUSE.value, 0),
+                "barq": projects.get(ProjectType.BARQ.value, 0),
             },
             # Summary insights
             "insights": {
@@ -265,9 +185,7 @@ class DashboardPerformanceService:
                 "growth_trend": (
                     "growing" if growth_rate > 0 else "stable" if growth_rate == 0 else "declining"
                 ),
-                "vehicle_coverage": (
-                    "full" if courier_stats.with_vehicle >= active_couriers else "partial"
-                ),
+                "vehicle_coverage": "full" if with_vehicle >= active_couriers else "partial",
             },
         }
 
@@ -9,6 +9,7 @@ from typing import Optional
 import httpx
 
 from app.config.settings import settings
+from app.core.request_timing import timed
 from app.services.dispatch.geo import haversine_km
 from app.services.dispatch.routing import (
     DistanceMatrixResult,
@@ -150,7 +151,8 @@ class GoogleRoutingProvider(RoutingProvider):
             }
 
             async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(self.DISTANCE_MATRIX_URL, params=params)
+                with timed("external"):
+                    response = await client.get(self.DISTANCE_MATRIX_URL, params=params)
                 response.raise_for_status()
                 data = response.json()
 
@@ -261,7 +263,8 @@ class GoogleRoutingProvider(RoutingProvider):
                 params["waypoints"] = waypoint_str
 
             async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(self.DIRECTIONS_URL, params=params)
+                with timed("external"):
+                    response = await client.get(self.DIRECTIONS_URL, params=params)
                 response.raise_for_status()
                 data = response.json()
 
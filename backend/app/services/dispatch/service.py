@@ -7,9 +7,9 @@ Integrates with database SLA definitions for dynamic deadline calculation.
 import logging
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Optional
+from typing import Optional, Tuple
 
-from sqlalchemy import and_, select, text
+from sqlalchemy import and_, or_, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -28,6 +28,7 @@ from app.services.dispatch.types import (
     OrderStatus,
     Point,
 )
+from app.services.operations.geocoding_service import parse_coordinates
 
 logger = logging.getLogger(__name__)
 
@@ -239,19 +240,16 @@ class DispatchService:
 
         Fetches SLA from database for deadline calculation.
         """
-        # Parse coordinates from addresses (simplified - in production you'd geocode)
-        # For now, we'll use default coordinates or stored lat/lng if available
-
-        # Try to parse pickup coordinates
-        pickup = self._parse_location(delivery.pickup_address)
+        # Coordinates are geocoded at ingest; addresses that are literal
+        # "lat,lng" pairs still work for deliveries created before that
+        pickup = self._delivery_location(delivery.pickup_point, delivery.pickup_address)
         if not pickup:
-            logger.warning(f"Could not parse pickup address for delivery {delivery.id}")
+            logger.warning(f"No pickup coordinates for delivery {delivery.id}")
             return None
 
-        # Try to parse dropoff coordinates
-        dropoff = self._parse_location(delivery.delivery_address)
+        dropoff = self._delivery_location(delivery.delivery_point, delivery.delivery_address)
         if not dropoff:
-            logger.warning(f"Could not parse dropoff address for delivery {delivery.id}")
+            logger.warning(f"No dropoff coordinates for delivery {delivery.id}")
             return None
 
         created_at = delivery.created_at or datetime.utcnow()
@@ -259,7 +257,7 @@ class DispatchService:
         # Get SLA hours from database (with fallback to config)
         sla_hours = await self._get_sla_hours(
             organization_id=delivery.organization_id,
-            zone_id=None,  # Could add zone resolution here
+            zone_id=delivery.zone_id,  # Tagged from the zone index at ingest
             service_type=None  # Could add service type from delivery
         )
         deadline_at = created_at + timedelta(hours=sla_hours)
@@ -271,32 +269,23 @@ class DispatchService:
             created_at=created_at,
             deadline_at=deadline_at,
             status=OrderStatus.UNASSIGNED,
-            zone_id=None,  # Would need zone resolution
+            zone_id=str(delivery.zone_id) if delivery.zone_id else None,
         )
 
-    def _parse_location(self, address: str) -> Optional[Point]:
+    def _delivery_location(
+        self, point: Optional[Tuple[float, float]], address: str
+    ) -> Optional[Point]:
         """
-        Parse a location from an address string.
+        Location of a delivery address.
 
-        In production, this would use geocoding. For now, we check if
-        the address contains coordinates or use a default.
+        Uses the coordinates geocoded at ingest, falling back to addresses
+        that are themselves "lat,lng" pairs. Returns None rather than a
+        made-up location when neither is available.
         """
-        if not address:
+        point = point or parse_coordinates(address)
+        if point is None:
             return None
-
-        # Check if address contains lat,lng format
-        parts = address.split(",")
-        if len(parts) >= 2:
-            try:
-                lat = float(parts[0].strip())
-                lng = float(parts[1].strip())
-                if -90 <= lat <= 90 and -180 <= lng <= 180:
-                    return Point(lat=lat, lng=lng)
-            except ValueError:
-                pass
-
-        # Default to Riyadh center for demo (would use geocoding in production)
-        return Point(lat=24.7136, lng=46.6753)
+        return Point(lat=point[0], lng=point[1])
 
     async def _load_available_couriers(
         self,
@@ -309,6 +298,11 @@ class DispatchService:
             select(Courier)
             .where(text("couriers.status = 'ACTIVE'"))
         )
+        if zone_id:
+            # Couriers last seen in the zone, or without a GPS position yet
+            query = query.where(
+                or_(Courier.current_zone_id == zone_id, Courier.current_zone_id.is_(None))
+            )
 
         result = await self.db.execute(query)
         db_couriers = result.scalars().all()
@@ -330,6 +324,7 @@ class DispatchService:
 
             # Default location (would come from GPS/FMS in production)
             location = Point(lat=24.7136, lng=46.6753)
+            courier_zone = c.current_zone_id or zone_id
 
             courier = DispatchCourier(
                 id=str(c.id),
@@ -338,7 +333,7 @@ class DispatchService:
                 shift_end_at=shift_end,
                 completed_orders_today=c.total_deliveries or 0,
                 assigned_open_order_ids=[str(d.id) for d in open_deliveries],
-                zone_id=str(zone_id) if zone_id else None,
+                zone_id=str(courier_zone) if courier_zone else None,
             )
             couriers.append(courier)
 
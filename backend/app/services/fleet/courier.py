@@ -1,7 +1,7 @@
 from datetime import date, timedelta
 from typing import Any, Dict, List, Optional
 
-from sqlalchemy import and_, func, or_
+from sqlalchemy import and_, func, inspect, or_
 from sqlalchemy.orm import Session
 
 from app.models.fleet import Courier, CourierStatus, SponsorshipStatus, ProjectType
@@ -12,6 +12,32 @@ from app.services.base import CRUDBase
 class CourierService(CRUDBase[Courier, CourierCreate, CourierUpdate]):
     """Service for Courier operations with business logic"""
 
+    def update(
+        self, db: Session, *, db_obj: Courier, obj_in: CourierUpdate | Dict[str, Any]
+    ) -> Courier:
+        """
+        Update a courier, including its encrypted fields
+
+        national_id, iqama_number, ... are mapped as ``_<field>`` columns behind
+        encrypted_attribute properties, so CRUDBase.update (which walks the
+        instance's loaded columns) would skip them. Every field the model maps
+        is assigned by name here; the encrypted ones go through their
+        properties, which encrypt them and refresh their blind indexes.
+        """
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+        descriptors = inspect(Courier).all_orm_descriptors
+        for field, value in update_data.items():
+            if field in descriptors:
+                setattr(db_obj, field, value)
+
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
     def get_by_barq_id(self, db: Session, barq_id: str) -> Optional[Courier]:
         """Get courier by BARQ ID"""
         return db.query(Courier).filter(Courier.barq_id == barq_id).first()
@@ -3,15 +3,19 @@ FMS Client - Integration with machinettalk Fleet Management System
 Handles authentication, caching, and API calls to the FMS backend.
 """
 
+import asyncio
 import logging
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
 import httpx
 
+from app.core.request_timing import timed
+
 logger = logging.getLogger(__name__)
 
 
@@ -124,16 +128,17 @@ class FMSClient:
         headers = self._get_auth_headers()
 
         try:
-            if method.upper() == "GET":
-                response = self._client.get(url, headers=headers, params=params)
-            elif method.upper() == "POST":
-                response = self._client.post(url, headers=headers, params=params, json=json_data)
-            elif method.upper() == "PUT":
-                response = self._client.put(url, headers=headers, params=params, json=json_data)
-            elif method.upper() == "DELETE":
-                response = self._client.delete(url, headers=headers, params=params)
-            else:
+            if method.upper() not in ("GET", "POST", "PUT", "DELETE"):
                 return {"error": True, "message": f"Unsupported method: {method}"}
+            with timed("external"):
+                if method.upper() == "GET":
+                    response = self._client.get(url, headers=headers, params=params)
+                elif method.upper() == "POST":
+                    response = self._client.post(url, headers=headers, params=params, json=json_data)
+                elif method.upper() == "PUT":
+                    response = self._client.put(url, headers=headers, params=params, json=json_data)
+                else:
+                    response = self._client.delete(url, headers=headers, params=params)
 
             if response.status_code == 401:
                 # Token expired, retry once
@@ -172,6 +177,81 @@ class FMSClient:
         }
         return self._make_request("GET", "/api/v1/assets", params=params)
 
+    def get_all_assets(
+        self, page_size: int = 100, max_pages: int = 10, concurrency: int = 8
+    ) -> Dict[str, Any]:
+        """
+        Get every asset page in one pass.
+
+        Page 1 gives the total count; the remaining pages are requested
+        concurrently over one pooled async client (at most ``concurrency``
+        connections). Pages that fail are logged and skipped.
+
+        Returns:
+            {"result": [...assets], "totalCount": n} or an error dict
+        """
+        if not self._ensure_token():
+            return {"error": True, "message": "Authentication failed"}
+        coro = self._get_all_assets(page_size, max_pages, concurrency)
+        with timed("external"):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(coro)
+            # Called from inside an event loop: run the pass on a helper thread
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                return executor.submit(asyncio.run, coro).result()
+
+    async def _get_all_assets(
+        self, page_size: int, max_pages: int, concurrency: int
+    ) -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            first = await self._get_assets_page(client, page_size, 1)
+            if first.get("error"):
+                return first
+
+            assets = list(first.get("result") or [])
+            total = first.get("totalCount") or len(assets)
+            pages = min(max_pages, -(-total // page_size))
+            if assets and pages > 1:
+                semaphore = asyncio.Semaphore(concurrency)
+
+                async def fetch(page: int) -> Dict[str, Any]:
+                    async with semaphore:
+                        return await self._get_assets_page(client, page_size, page)
+
+                results = await asyncio.gather(*(fetch(page) for page in range(2, pages + 1)))
+                for page, result in enumerate(results, start=2):
+                    if result.get("error"):
+                        logger.error(f"FMS fetch error on page {page}: {result.get('message')}")
+                        continue
+                    assets.extend(result.get("result") or [])
+
+        return {"result": assets, "totalCount": total}
+
+    async def _get_assets_page(
+        self, client: httpx.AsyncClient, page_size: int, page_index: int
+    ) -> Dict[str, Any]:
+        """One asset page through the async client (the token is refreshed beforehand)."""
+        url = f"{self.base_url}/api/v1/assets"
+        params = {"pageSize": page_size, "pageIndex": page_index}
+        try:
+            response = await client.get(url, headers=self._get_auth_headers(), params=params)
+            if response.status_code >= 400:
+                return {
+                    "error": True,
+                    "message": f"FMS API error: {response.status_code}",
+                    "details": response.text,
+                }
+            return response.json()
+        except httpx.TimeoutException:
+            logger.error(f"FMS request timeout: assets page {page_index}")
+            return {"error": True, "message": "Request timeout"}
+        except Exception as e:
+            logger.error(f"FMS request error: {e}")
+            return {"error": True, "message": str(e)}
+
     def get_asset_by_id(self, asset_id: int) -> Dict[str, Any]:
         """Get asset details by ID."""
         return self._make_request("GET", f"/api/v1/assets/{asset_id}")
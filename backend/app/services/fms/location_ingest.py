@@ -0,0 +1,237 @@
+"""
+FMS Location Ingest
+Keeps a shared snapshot of the latest FMS positions for map and dispatch reads.
+
+One refresh fetches every asset page concurrently (FMSClient.get_all_assets)
+instead of one FMS round trip per courier. The snapshot is held per process
+and in Redis, so workers reuse each other's refreshes, and only one worker
+refreshes at a time. Snapshots older than ``max_age_seconds`` are refreshed on
+read; a Celery beat task keeps them warm. If FMS is down, the last snapshot
+keeps being served with its timestamp so callers can judge staleness.
+"""
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import redis
+
+from app.core.performance_config import FMSLocationConfig, performance_config
+from app.services.fms.client import FMSClient, get_fms_client
+
+logger = logging.getLogger(__name__)
+
+# Redis layout:
+#   fms:locations:snapshot       JSON {"fetched_at": epoch, "positions": [...]} (TTL)
+#   fms:locations:refresh_lock   held by the worker currently refreshing
+SNAPSHOT_KEY = "fms:locations:snapshot"
+REFRESH_LOCK_KEY = "fms:locations:refresh_lock"
+
+
+def position_from_asset(asset: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten an FMS asset into the position record kept in the snapshot."""
+    tracking = asset.get("Trackingunit") or {}
+    device_log = tracking.get("DeviceLog") or {}
+    driver = tracking.get("Driver") or {}
+
+    return {
+        "fms_asset_id": asset.get("Id"),
+        "barq_id": asset.get("PlateNumber"),
+        "asset_name": asset.get("AssetName"),
+        "asset_type": asset.get("AssetType"),
+        "latitude": float(device_log.get("Latitude", 0) or 0),
+        "longitude": float(device_log.get("Longitude", 0) or 0),
+        "altitude": float(device_log.get("Altitude", 0) or 0),
+        "direction": int(device_log.get("Direction", 0) or 0),
+        "speed_kmh": float(device_log.get("Speed", 0) or 0),
+        "mileage_km": float(device_log.get("Mileage", 0) or 0),
+        "signal_strength": int(device_log.get("SignalStrength", 0) or 0),
+        "gps_timestamp": device_log.get("GPSDate"),
+        "driver": {
+            "name": driver.get("DriverName"),
+            "mobile": driver.get("MobileNumber"),
+            "badge": driver.get("BadgeNumber"),
+        },
+    }
+
+
+@dataclass
+class LocationSnapshot:
+    """Latest position per FMS asset and when it was fetched."""
+
+    fetched_at: float = 0.0
+    positions: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+    def age(self, now: float) -> float:
+        return now - self.fetched_at
+
+    @property
+    def fetched_at_iso(self) -> Optional[str]:
+        if not self.fetched_at:
+            return None
+        return datetime.utcfromtimestamp(self.fetched_at).isoformat()
+
+    def get(self, fms_asset_id: Optional[int]) -> Optional[Dict[str, Any]]:
+        return self.positions.get(fms_asset_id) if fms_asset_id is not None else None
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"fetched_at": self.fetched_at, "positions": list(self.positions.values())}
+        )
+
+    @classmethod
+    def from_json(cls, data: str) -> "LocationSnapshot":
+        payload = json.loads(data)
+        return cls(
+            fetched_at=payload["fetched_at"],
+            positions={p["fms_asset_id"]: p for p in payload["positions"]},
+        )
+
+
+class LocationIngestService:
+    """Fetches FMS positions in one concurrent pass and serves them from a snapshot."""
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        config: Optional[FMSLocationConfig] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.config = config or performance_config.fms_location
+        self.clock = clock
+        self.redis = redis_client
+        if not self.redis:
+            try:
+                from app.config.settings import settings
+                from app.core.security_config import security_config
+
+                redis_url = security_config.rate_limit.storage_uri or getattr(
+                    settings, "REDIS_URL", None
+                )
+                if redis_url:
+                    self.redis = redis.from_url(
+                        redis_url, decode_responses=True, socket_connect_timeout=5, socket_timeout=5
+                    )
+            except Exception:
+                self.redis = None
+
+        self._snapshot = LocationSnapshot()
+        self._refresh_lock = threading.Lock()
+        self._stats = {"refreshes": 0, "failed_refreshes": 0, "redis_hits": 0}
+
+    def refresh(self, client: Optional[FMSClient] = None) -> Optional[LocationSnapshot]:
+        """Fetch all assets from FMS and publish them; None if FMS failed."""
+        client = client or get_fms_client()
+        result = client.get_all_assets(
+            page_size=self.config.page_size,
+            max_pages=self.config.max_pages,
+            concurrency=self.config.fetch_concurrency,
+        )
+        if result.get("error"):
+            self._stats["failed_refreshes"] += 1
+            logger.error(f"FMS location refresh failed: {result.get('message')}")
+            return None
+        return self.store(result.get("result") or [])
+
+    def store(self, assets: List[Dict[str, Any]]) -> LocationSnapshot:
+        """Publish positions from a full asset listing to this process and Redis."""
+        positions = {}
+        for asset in assets:
+            position = position_from_asset(asset)
+            positions[position["fms_asset_id"]] = position
+        snapshot = LocationSnapshot(fetched_at=self.clock(), positions=positions)
+        self._snapshot = snapshot
+        self._stats["refreshes"] += 1
+
+        if self.redis:
+            try:
+                self.redis.set(SNAPSHOT_KEY, snapshot.to_json(), ex=self.config.redis_ttl_seconds)
+            except redis.RedisError as e:
+                logger.warning(f"FMS location snapshot not shared: {e}")
+        return snapshot
+
+    def get_snapshot(
+        self, client: Optional[FMSClient] = None, max_age: Optional[float] = None
+    ) -> LocationSnapshot:
+        """
+        Latest snapshot, refreshed first if older than max_age.
+
+        While another thread or worker is refreshing, the current (stale)
+        snapshot is returned instead of starting a second FMS pass.
+        """
+        max_age = self.config.max_age_seconds if max_age is None else max_age
+        now = self.clock()
+        if self._snapshot.fetched_at and self._snapshot.age(now) <= max_age:
+            return self._snapshot
+
+        shared = self._load_shared()
+        if shared is not None and shared.fetched_at > self._snapshot.fetched_at:
+            self._snapshot = shared
+            self._stats["redis_hits"] += 1
+            if shared.age(now) <= max_age:
+                return shared
+
+        # With nothing to serve, wait for the refresh in progress
+        if not self._refresh_lock.acquire(blocking=not self._snapshot.fetched_at):
+            return self._snapshot
+        try:
+            if self._snapshot.fetched_at and self._snapshot.age(self.clock()) <= max_age:
+                return self._snapshot
+            if not self._acquire_shared_lock():
+                return self._snapshot
+            try:
+                return self.refresh(client) or self._snapshot
+            finally:
+                self._release_shared_lock()
+        finally:
+            self._refresh_lock.release()
+
+    def get_position(
+        self, fms_asset_id: int, client: Optional[FMSClient] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Latest position of one asset from the snapshot."""
+        return self.get_snapshot(client).get(fms_asset_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "assets": len(self._snapshot.positions),
+            "fetched_at": self._snapshot.fetched_at_iso,
+            "age_seconds": (
+                round(self._snapshot.age(self.clock()), 1) if self._snapshot.fetched_at else None
+            ),
+        }
+
+    def _load_shared(self) -> Optional[LocationSnapshot]:
+        if not self.redis:
+            return None
+        try:
+            data = self.redis.get(SNAPSHOT_KEY)
+            return LocationSnapshot.from_json(data) if data else None
+        except (redis.RedisError, ValueError, KeyError) as e:
+            logger.warning(f"FMS location snapshot unreadable: {e}")
+            return None
+
+    def _acquire_shared_lock(self) -> bool:
+        if not self.redis:
+            return True
+        try:
+            return bool(self.redis.set(REFRESH_LOCK_KEY, 1, nx=True, ex=60))
+        except redis.RedisError:
+            return True
+
+    def _release_shared_lock(self) -> None:
+        if not self.redis:
+            return
+        try:
+            self.redis.delete(REFRESH_LOCK_KEY)
+        except redis.RedisError:
+            pass
+
+
+# Global ingest service instance (one snapshot per worker process)
+location_ingest_service = LocationIngestService()
@@ -2,64 +2,159 @@
 FMS Sync Service
 Synchronizes FMS asset data with BARQ couriers and vehicles.
 Matches by barq_id (FMS PlateNumber) or iqama_number (FMS IDNumber).
+Live locations are served from the shared snapshot kept by location_ingest.
 """
 
 import logging
+from collections import defaultdict
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
+from app.core.encryption import get_blind_indexer
+from app.core.performance_config import performance_config
 from app.models.fleet.courier import Courier
 from app.models.fleet.vehicle import Vehicle
 from app.services.fms.client import get_fms_client
+from app.services.fms.location_ingest import location_ingest_service, position_from_asset
+from app.services.operations.zone_index import zone_index_service
 
 logger = logging.getLogger(__name__)
 
+# Values per IN (...) list when prefetching matches
+MATCH_CHUNK_SIZE = 1000
 
-class FMSSyncService:
-    """Service for syncing FMS data with BARQ database."""
 
-    def __init__(self, db: Session):
+def _driver(asset: Dict[str, Any]) -> Dict[str, Any]:
+    return (asset.get("Trackingunit") or {}).get("Driver") or {}
+
+
+class AssetMatcher:
+    """
+    Courier and vehicle matches for a batch of FMS assets.
+
+    Prefetched with a few IN queries per batch instead of one query per
+    asset: couriers by BARQ ID, then by iqama blind index for the rest, and
+    vehicles by exact plate, then by plate substring for the rest.
+    """
+
+    def __init__(self, db: Session, assets: List[Dict[str, Any]]):
         self.db = db
-        self.fms_client = get_fms_client()
 
-    def get_all_fms_assets(self, max_pages: int = 10) -> List[Dict[str, Any]]:
-        """Fetch all FMS assets with pagination."""
-        all_assets = []
-        page = 1
+        barq_ids = {asset.get("PlateNumber") for asset in assets} - {None, ""}
+        self.couriers_by_barq_id = {
+            courier.barq_id: courier
+            for courier in self._fetch(Courier, Courier.barq_id, barq_ids)
+        }
+
+        iqamas = {
+            _driver(asset).get("IDNumber")
+            for asset in assets
+            if asset.get("PlateNumber") not in self.couriers_by_barq_id
+        } - {None, ""}
+        indexer = get_blind_indexer()
+        kind = Courier.__blind_indexes__["iqama_number"]
+        iqama_by_digest = {
+            digest: iqama
+            for iqama in iqamas
+            for digest in indexer.candidates("iqama_number", iqama, kind)
+        }
+        self.couriers_by_iqama = {
+            iqama_by_digest[courier.iqama_number_bidx]: courier
+            for courier in self._fetch(
+                Courier, Courier.blind_index_column("iqama_number"), iqama_by_digest
+            )
+        }
 
-        while page <= max_pages:
-            result = self.fms_client.get_assets(page_size=100, page_index=page)
+        plates = {asset.get("AssetName") for asset in assets} - {None, ""}
+        self.vehicles_by_plate = {
+            vehicle.plate_number: vehicle
+            for vehicle in self._fetch(Vehicle, Vehicle.plate_number, plates)
+        }
+        self.vehicles_by_partial_plate = self._match_partial_plates(
+            plates - self.vehicles_by_plate.keys()
+        )
 
-            if result.get("error"):
-                logger.error(f"FMS fetch error on page {page}: {result.get('message')}")
-                break
+    def _fetch(self, model, column, values: Iterable[Any]) -> List[Any]:
+        values = list(values)
+        rows = []
+        for i in range(0, len(values), MATCH_CHUNK_SIZE):
+            chunk = values[i : i + MATCH_CHUNK_SIZE]
+            rows.extend(self.db.query(model).filter(column.in_(chunk)).order_by(model.id))
+        return rows
+
+    def _match_partial_plates(self, plates: Iterable[str]) -> Dict[str, Vehicle]:
+        """Plates with a different format (case-insensitive substring, like ILIKE %plate%)"""
+        plates = list(plates)
+        if not plates:
+            return {}
+        known = (
+            self.db.query(Vehicle.id, Vehicle.plate_number)
+            .filter(Vehicle.plate_number.isnot(None))
+            .order_by(Vehicle.id)
+            .all()
+        )
+        matched = {}
+        for plate in plates:
+            needle = plate.lower()
+            for vehicle_id, plate_number in known:
+                if needle in plate_number.lower():
+                    matched[plate] = vehicle_id
+                    break
+        vehicles = {v.id: v for v in self._fetch(Vehicle, Vehicle.id, set(matched.values()))}
+        return {plate: vehicles[vehicle_id] for plate, vehicle_id in matched.items()}
+
+    def courier_for(self, asset: Dict[str, Any]) -> Optional[Courier]:
+        """Courier by BARQ ID (FMS PlateNumber), then by iqama (FMS IDNumber)."""
+        courier = self.couriers_by_barq_id.get(asset.get("PlateNumber"))
+        if courier is None:
+            courier = self.couriers_by_iqama.get(_driver(asset).get("IDNumber"))
+        return courier
+
+    def vehicle_for(self, asset: Dict[str, Any]) -> Optional[Vehicle]:
+        """Vehicle by plate number (FMS AssetName), exact match first."""
+        plate = asset.get("AssetName")
+        return self.vehicles_by_plate.get(plate) or self.vehicles_by_partial_plate.get(plate)
 
-            assets = result.get("result") or []
-            if not assets:
-                break
 
-            all_assets.extend(assets)
-            page += 1
+class FMSSyncService:
+    """Service for syncing FMS data with BARQ database."""
 
-            # Check if we've fetched all
-            total_count = result.get("totalCount", 0)
-            if len(all_assets) >= total_count:
-                break
+    def __init__(self, db: Session):
+        self.db = db
+        self.fms_client = get_fms_client()
 
-        logger.info(f"Fetched {len(all_assets)} FMS assets")
-        return all_assets
+    def get_all_fms_assets(self, max_pages: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Fetch all FMS assets, requesting the pages concurrently."""
+        config = performance_config.fms_location
+        result = self.fms_client.get_all_assets(
+            page_size=config.page_size,
+            max_pages=max_pages or config.max_pages,
+            concurrency=config.fetch_concurrency,
+        )
+
+        if result.get("error"):
+            logger.error(f"FMS fetch error: {result.get('message')}")
+            return []
+
+        assets = result.get("result") or []
+        logger.info(f"Fetched {len(assets)} FMS assets")
+        return assets
 
     def match_courier_by_barq_id(self, barq_id: str) -> Optional[Courier]:
         """Find courier by BARQ ID (FMS PlateNumber)."""
         return self.db.query(Courier).filter(Courier.barq_id == barq_id).first()
 
     def match_courier_by_iqama(self, iqama_number: str) -> Optional[Courier]:
-        """Find courier by iqama number (FMS IDNumber)."""
+        """Find courier by iqama number (FMS IDNumber) through its blind index."""
         if not iqama_number:
             return None
-        return self.db.query(Courier).filter(Courier.iqama_number == iqama_number).first()
+        return (
+            self.db.query(Courier)
+            .filter(Courier.blind_index_match("iqama_number", iqama_number))
+            .first()
+        )
 
     def match_vehicle_by_plate(self, plate_number: str) -> Optional[Vehicle]:
         """Find vehicle by plate number (FMS AssetName)."""
@@ -74,7 +169,9 @@ class FMSSyncService:
             self.db.query(Vehicle).filter(Vehicle.plate_number.ilike(f"%{plate_number}%")).first()
         )
 
-    def sync_single_asset(self, asset: Dict[str, Any]) -> Dict[str, Any]:
+    def sync_single_asset(
+        self, asset: Dict[str, Any], matcher: Optional[AssetMatcher] = None
+    ) -> Dict[str, Any]:
         """
         Sync a single FMS asset to BARQ database.
 
@@ -82,7 +179,10 @@ class FMSSyncService:
         - FMS PlateNumber -> Courier.barq_id
         - FMS IDNumber -> Courier.iqama_number
         - FMS AssetName -> Vehicle.plate_number
+
+        Pass the batch's AssetMatcher when syncing many assets.
         """
+        matcher = matcher or AssetMatcher(self.db, [asset])
         result = {
             "fms_asset_id": asset.get("Id"),
             "asset_name": asset.get("AssetName"),
@@ -94,32 +194,36 @@ class FMSSyncService:
         }
 
         fms_asset_id = asset.get("Id")
-        fms_plate_number = asset.get("PlateNumber")  # This is BARQ ID
-        fms_asset_name = asset.get("AssetName")  # This is vehicle plate
 
         tracking_unit = asset.get("Trackingunit", {})
         driver = tracking_unit.get("Driver", {})
-        fms_id_number = driver.get("IDNumber")  # This is iqama
+        device_log = tracking_unit.get("DeviceLog", {})
         fms_driver_id = driver.get("Id")
 
-        # Try to match courier by BARQ ID first, then by iqama
-        courier = self.match_courier_by_barq_id(fms_plate_number)
-        if not courier and fms_id_number:
-            courier = self.match_courier_by_iqama(fms_id_number)
+        # Match courier by BARQ ID first, then by iqama
+        courier = matcher.courier_for(asset)
 
         if courier:
             # Update courier with FMS data
             courier.fms_asset_id = fms_asset_id
             courier.fms_driver_id = fms_driver_id
             courier.fms_last_sync = datetime.utcnow().isoformat()
+
+            # Tag the courier with the zone of its last GPS position
+            lat, lon = device_log.get("Latitude"), device_log.get("Longitude")
+            if lat and lon and courier.organization_id:
+                courier.current_zone_id = zone_index_service.locate(
+                    self.db, courier.organization_id, float(lat), float(lon)
+                )
+                result["zone_id"] = courier.current_zone_id
+
             result["courier_matched"] = True
             result["courier_id"] = courier.id
             result["courier_name"] = courier.full_name
 
-        # Try to match vehicle by plate number (AssetName)
-        vehicle = self.match_vehicle_by_plate(fms_asset_name)
+        # Match vehicle by plate number (AssetName)
+        vehicle = matcher.vehicle_for(asset)
         if vehicle:
-            device_log = tracking_unit.get("DeviceLog", {})
             vehicle.fms_asset_id = fms_asset_id
             vehicle.fms_tracking_unit_id = tracking_unit.get("Id")
             vehicle.fms_last_sync = datetime.utcnow().isoformat()
@@ -145,6 +249,10 @@ class FMSSyncService:
     def sync_all_assets(self) -> Dict[str, Any]:
         """Sync all FMS assets with BARQ database."""
         assets = self.get_all_fms_assets()
+        if assets:
+            # The listing carries every position: publish it to the live-location snapshot
+            location_ingest_service.store(assets)
+        matcher = AssetMatcher(self.db, assets)
 
         stats = {
             "total_fms_assets": len(assets),
@@ -155,7 +263,7 @@ class FMSSyncService:
         }
 
         for asset in assets:
-            result = self.sync_single_asset(asset)
+            result = self.sync_single_asset(asset, matcher)
 
             if result["courier_matched"]:
                 stats["couriers_matched"] += 1
@@ -182,93 +290,124 @@ class FMSSyncService:
         return stats
 
     def get_courier_live_location(self, courier_id: int) -> Optional[Dict[str, Any]]:
-        """Get real-time location for a courier from FMS."""
+        """Get the latest location for a courier from the live-location snapshot."""
         courier = self.db.query(Courier).filter(Courier.id == courier_id).first()
         if not courier or not courier.fms_asset_id:
             return None
 
+        snapshot = location_ingest_service.get_snapshot(self.fms_client)
+        position = snapshot.get(courier.fms_asset_id)
+        if position:
+            location = self._courier_location(courier, position, snapshot.fetched_at_iso)
+        else:
+            # Asset missing from the last listing: ask FMS for it directly
+            location = self._fetch_courier_location(courier)
+        if location:
+            self._tag_courier_zones([(courier, location)])
+        return location
+
+    def _fetch_courier_location(self, courier: Courier) -> Optional[Dict[str, Any]]:
+        """Fetch a linked courier's FMS position."""
         result = self.fms_client.get_asset_by_id(courier.fms_asset_id)
         if result.get("error"):
             return None
+        return self._courier_location(
+            courier, position_from_asset(result), datetime.utcnow().isoformat()
+        )
 
-        tracking = result.get("Trackingunit", {})
-        device_log = tracking.get("DeviceLog", {})
-        driver = tracking.get("Driver", {})
-
+    @staticmethod
+    def _courier_location(
+        courier: Courier, position: Dict[str, Any], fetched_at: Optional[str]
+    ) -> Dict[str, Any]:
         return {
             "courier_id": courier.id,
             "courier_name": courier.full_name,
             "barq_id": courier.barq_id,
             "fms_asset_id": courier.fms_asset_id,
             "position": {
-                "latitude": float(device_log.get("Latitude", 0) or 0),
-                "longitude": float(device_log.get("Longitude", 0) or 0),
-                "altitude": float(device_log.get("Altitude", 0) or 0),
-                "direction": int(device_log.get("Direction", 0) or 0),
+                "latitude": position["latitude"],
+                "longitude": position["longitude"],
+                "altitude": position["altitude"],
+                "direction": position["direction"],
             },
-            "speed_kmh": float(device_log.get("Speed", 0) or 0),
-            "mileage_km": float(device_log.get("Mileage", 0) or 0),
-            "signal_strength": int(device_log.get("SignalStrength", 0) or 0),
-            "gps_timestamp": device_log.get("GPSDate"),
+            "speed_kmh": position["speed_kmh"],
+            "mileage_km": position["mileage_km"],
+            "signal_strength": position["signal_strength"],
+            "gps_timestamp": position["gps_timestamp"],
+            "fetched_at": fetched_at,
             "vehicle": {
-                "asset_name": result.get("AssetName"),
-                "asset_type": result.get("AssetType"),
-            },
-            "driver_info": {
-                "name": driver.get("DriverName"),
-                "mobile": driver.get("MobileNumber"),
-                "badge": driver.get("BadgeNumber"),
+                "asset_name": position["asset_name"],
+                "asset_type": position["asset_type"],
             },
+            "driver_info": dict(position["driver"]),
         }
 
     def get_all_couriers_live_locations(self) -> List[Dict[str, Any]]:
-        """Get real-time locations for all couriers with FMS links."""
-        # Get all couriers with FMS asset IDs
+        """Get the latest locations for all couriers with FMS links."""
         couriers = self.db.query(Courier).filter(Courier.fms_asset_id.isnot(None)).all()
+        snapshot = location_ingest_service.get_snapshot(self.fms_client)
 
         if not couriers:
-            # If no couriers linked, fetch all FMS assets and return their locations
-            assets = self.get_all_fms_assets()
-            locations = []
-
-            for asset in assets:
-                tracking = asset.get("Trackingunit", {})
-                device_log = tracking.get("DeviceLog", {})
-                driver = tracking.get("Driver", {})
-
-                lat = device_log.get("Latitude")
-                lon = device_log.get("Longitude")
-                if not lat or not lon:
-                    continue
-
-                locations.append(
-                    {
-                        "fms_asset_id": asset.get("Id"),
-                        "barq_id": asset.get("PlateNumber"),
-                        "asset_name": asset.get("AssetName"),
-                        "driver_name": driver.get("DriverName"),
-                        "position": {
-                            "latitude": float(lat),
-                            "longitude": float(lon),
-                        },
-                        "speed_kmh": float(device_log.get("Speed", 0) or 0),
-                        "gps_timestamp": device_log.get("GPSDate"),
-                        "status": (
-                            "active" if float(device_log.get("Speed", 0) or 0) > 0 else "idle"
-                        ),
-                    }
-                )
-
-            return locations
-
-        # Fetch live data for linked couriers
-        locations = []
+            # If no couriers linked, return every FMS asset's location
+            return [
+                {
+                    "fms_asset_id": position["fms_asset_id"],
+                    "barq_id": position["barq_id"],
+                    "asset_name": position["asset_name"],
+                    "driver_name": position["driver"]["name"],
+                    "position": {
+                        "latitude": position["latitude"],
+                        "longitude": position["longitude"],
+                    },
+                    "speed_kmh": position["speed_kmh"],
+                    "gps_timestamp": position["gps_timestamp"],
+                    "fetched_at": snapshot.fetched_at_iso,
+                    "status": "active" if position["speed_kmh"] > 0 else "idle",
+                }
+                for position in snapshot.positions.values()
+                if position["latitude"] and position["longitude"]
+            ]
+
+        located = []
         for courier in couriers:
-            location = self.get_courier_live_location(courier.id)
-            if location:
-                locations.append(location)
+            position = snapshot.get(courier.fms_asset_id)
+            if position:
+                location = self._courier_location(courier, position, snapshot.fetched_at_iso)
+                located.append((courier, location))
+        self._tag_courier_zones(located)
+        return [location for _, location in located]
+
+    def _tag_courier_zones(self, located: List[Tuple[Courier, Dict[str, Any]]]) -> None:
+        """
+        Resolve courier GPS positions to zones and store them on the couriers.
 
-        return locations
+        Positions are looked up in one zone index call per organization; the
+        zone is added to each location as ``zone_id``.
+        """
+        by_org = defaultdict(list)
+        for courier, location in located:
+            position = location["position"]
+            if courier.organization_id and (position["latitude"] or position["longitude"]):
+                by_org[courier.organization_id].append((courier, location))
+
+        changed = False
+        for organization_id, items in by_org.items():
+            zone_ids = zone_index_service.locate_many(
+                self.db,
+                organization_id,
+                [
+                    (location["position"]["latitude"], location["position"]["longitude"])
+                    for _, location in items
+                ],
+            )
+            for (courier, location), zone_id in zip(items, zone_ids):
+                location["zone_id"] = zone_id
+                if courier.current_zone_id != zone_id:
+                    courier.current_zone_id = zone_id
+                    changed = True
+
+        if changed:
+            self.db.commit()
 
 
 def get_sync_service(db: Session) -> FMSSyncService:
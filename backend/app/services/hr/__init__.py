@@ -4,6 +4,7 @@ from app.services.hr.asset_service import AssetService, asset_service
 from app.services.hr.attendance_service import AttendanceService, attendance_service
 from app.services.hr.bonus_service import BonusService, bonus_service
 from app.services.hr.eos_calculator_service import EOSCalculatorService, eos_calculator_service
+from app.services.hr.eos_liability_service import EOSLiabilityService, eos_liability_service
 from app.services.hr.gosi_calculator_service import GOSICalculatorService, gosi_calculator_service
 from app.services.hr.leave_service import LeaveService, leave_service
 from app.services.hr.loan_service import LoanService, loan_service
@@ -20,6 +21,7 @@ __all__ = [
     "BonusService",
     "GOSICalculatorService",
     "EOSCalculatorService",
+    "EOSLiabilityService",
     "PayrollEngineService",
     # Service instances
     "leave_service",
@@ -30,5 +32,6 @@ __all__ = [
     "bonus_service",
     "gosi_calculator_service",
     "eos_calculator_service",
+    "eos_liability_service",
     "payroll_engine_service",
 ]
@@ -0,0 +1,449 @@
+"""End of Service (EOS) Liability Service
+
+Bulk EOS calculation for exports and finance reporting.
+
+- Latest basic salary for a batch of couriers comes from one window-function
+  query (``row_number() over (partition by courier_id ...)``) instead of one
+  Salary query per courier.
+- ``calculate_eos_batch`` applies the Saudi Labor Law formula to a whole batch
+  at once (vectorized with numpy when available) and returns the same fields
+  as ``calculate_eos_benefit``.
+- Couriers are read in keyset-paginated batches, so exports stream at flat
+  memory.
+- ``refresh_snapshot`` stores the organization-wide liability per month in
+  ``eos_liability_snapshots`` (run daily by ``snapshot_eos_liability_task``);
+  finance reads the stored row with ``find_snapshot`` instead of recomputing
+  EOS for every active courier.
+"""
+
+import calendar
+import logging
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.fleet.courier import Courier, CourierStatus
+from app.models.hr.eos_liability_snapshot import EOSLiabilitySnapshot
+from app.models.hr.salary import Salary
+from app.utils.export import iter_keyset_batches
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Basic salary assumed for couriers without any salary record (SAR)
+DEFAULT_BASIC_SALARY = Decimal("3000")
+
+# Service bands used in the liability breakdown: (label, lower years, upper years)
+SERVICE_BANDS: Tuple[Tuple[str, float, float], ...] = (
+    ("under_2_years", 0, 2),
+    ("2_to_5_years", 2, 5),
+    ("5_to_10_years", 5, 10),
+    ("over_10_years", 10, float("inf")),
+)
+
+
+def calculate_eos_benefit(
+    joining_date: date,
+    termination_date: date,
+    basic_salary: Decimal,
+    is_resignation: bool = False,
+) -> dict:
+    """
+    Calculate End of Service benefits according to Saudi Labor Law.
+
+    Per Saudi Labor Law Article 84-85:
+    - First 5 years: 15 days salary per year (1/2 month)
+    - After 5 years: 30 days salary per year (1 month)
+
+    Resignation rules (Article 85):
+    - Less than 2 years: No EOS
+    - 2-5 years: 1/3 of total EOS
+    - 5-10 years: 2/3 of total EOS
+    - More than 10 years: Full EOS
+
+    Termination by employer: Full EOS
+    """
+    # Calculate service period
+    service_days = (termination_date - joining_date).days
+    service_years = service_days / 365.25
+    service_months = int(service_days / 30.4375)
+
+    # Daily wage (salary / 30)
+    daily_wage = basic_salary / Decimal("30")
+
+    # Calculate full EOS first
+    full_years = int(service_years)
+    remaining_fraction = Decimal(str(service_years - full_years))
+
+    # First 5 years: 15 days per year
+    years_in_first_tier = min(full_years, 5)
+    first_tier_eos = years_in_first_tier * daily_wage * Decimal("15")
+
+    # Years after 5: 30 days per year
+    years_in_second_tier = max(0, full_years - 5)
+    second_tier_eos = years_in_second_tier * daily_wage * Decimal("30")
+
+    # Fractional year calculation
+    if full_years < 5:
+        fractional_eos = remaining_fraction * daily_wage * Decimal("15")
+    else:
+        fractional_eos = remaining_fraction * daily_wage * Decimal("30")
+
+    full_eos = first_tier_eos + second_tier_eos + fractional_eos
+
+    # Apply resignation discount if applicable
+    calculation_type = "full"
+    if is_resignation:
+        if service_years < 2:
+            final_eos = Decimal("0")
+            calculation_type = "resignation_no_entitlement"
+        elif service_years < 5:
+            final_eos = full_eos / Decimal("3")
+            calculation_type = "resignation_one_third"
+        elif service_years < 10:
+            final_eos = full_eos * Decimal("2") / Decimal("3")
+            calculation_type = "resignation_two_thirds"
+        else:
+            final_eos = full_eos
+            calculation_type = "resignation_full"
+    else:
+        final_eos = full_eos
+
+    return {
+        "years_of_service": round(service_years, 2),
+        "months_of_service": service_months,
+        "days_of_service": service_days,
+        "daily_wage": float(daily_wage),
+        "first_tier_years": years_in_first_tier,
+        "first_tier_amount": float(first_tier_eos),
+        "second_tier_years": years_in_second_tier,
+        "second_tier_amount": float(second_tier_eos),
+        "fractional_amount": float(fractional_eos),
+        "full_eos": float(full_eos),
+        "final_eos": float(round(final_eos, 2)),
+        "calculation_type": calculation_type,
+    }
+
+
+def _resignation_terms(service_years: float) -> Tuple[float, str]:
+    """Share of full EOS kept on resignation and its calculation type"""
+    if service_years < 2:
+        return 0.0, "resignation_no_entitlement"
+    if service_years < 5:
+        return 1 / 3, "resignation_one_third"
+    if service_years < 10:
+        return 2 / 3, "resignation_two_thirds"
+    return 1.0, "resignation_full"
+
+
+def calculate_eos_batch(
+    joining_dates: Sequence[date],
+    termination_dates: Sequence[date],
+    basic_salaries: Sequence[Decimal],
+    is_resignation: bool = False,
+) -> List[dict]:
+    """
+    Calculate EOS benefits for many employees at once
+
+    Same formula and result fields as ``calculate_eos_benefit``; amounts are
+    computed in float64 arrays, so they match the per-employee Decimal
+    calculation to the halala.
+
+    Args:
+        joining_dates: Joining date per employee
+        termination_dates: Service end date per employee
+        basic_salaries: Last basic salary per employee
+        is_resignation: Apply the Article 85 resignation shares
+
+    Returns:
+        One result dict per employee, in input order
+    """
+    if not NUMPY_AVAILABLE:
+        return [
+            calculate_eos_benefit(joined, ended, Decimal(str(salary)), is_resignation)
+            for joined, ended, salary in zip(joining_dates, termination_dates, basic_salaries)
+        ]
+    if not joining_dates:
+        return []
+
+    days = np.array(
+        [(ended - joined).days for joined, ended in zip(joining_dates, termination_dates)],
+        dtype=np.int64,
+    )
+    salary = np.array([float(value) for value in basic_salaries], dtype=np.float64)
+
+    years = days / 365.25
+    full_years = np.trunc(years)
+    fraction = years - full_years
+    daily_wage = salary / 30.0
+
+    first_tier_years = np.minimum(full_years, 5)
+    second_tier_years = np.maximum(full_years - 5, 0)
+    first_tier = first_tier_years * daily_wage * 15
+    second_tier = second_tier_years * daily_wage * 30
+    fractional = fraction * daily_wage * np.where(full_years < 5, 15, 30)
+    full_eos = first_tier + second_tier + fractional
+    months = np.trunc(days / 30.4375).astype(np.int64)
+
+    results = []
+    for i in range(len(days)):
+        service_years = float(years[i])
+        if is_resignation:
+            share, calculation_type = _resignation_terms(service_years)
+        else:
+            share, calculation_type = 1.0, "full"
+        results.append(
+            {
+                "years_of_service": round(service_years, 2),
+                "months_of_service": int(months[i]),
+                "days_of_service": int(days[i]),
+                "daily_wage": float(daily_wage[i]),
+                "first_tier_years": int(first_tier_years[i]),
+                "first_tier_amount": float(first_tier[i]),
+                "second_tier_years": int(second_tier_years[i]),
+                "second_tier_amount": float(second_tier[i]),
+                "fractional_amount": float(fractional[i]),
+                "full_eos": float(full_eos[i]),
+                "final_eos": round(float(full_eos[i]) * share, 2),
+                "calculation_type": calculation_type,
+            }
+        )
+    return results
+
+
+def _month_bounds(month: date) -> Tuple[date, date]:
+    first = month.replace(day=1)
+    last = first.replace(day=calendar.monthrange(first.year, first.month)[1])
+    return first, last
+
+
+def _service_band(years: float) -> str:
+    for label, lower, upper in SERVICE_BANDS:
+        if lower <= years < upper:
+            return label
+    return SERVICE_BANDS[-1][0]
+
+
+class EOSLiabilityService:
+    """Bulk EOS calculation and monthly liability snapshots"""
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size
+
+    def latest_salaries(self, db: Session, courier_ids: Sequence[int]) -> Dict[int, Decimal]:
+        """
+        Latest basic salary per courier, in one query
+
+        Couriers without a salary record are absent from the result.
+        """
+        if not courier_ids:
+            return {}
+        rank = (
+            func.row_number()
+            .over(
+                partition_by=Salary.courier_id,
+                order_by=(Salary.year.desc(), Salary.month.desc()),
+            )
+            .label("rank")
+        )
+        ranked = (
+            select(Salary.courier_id, Salary.base_salary, rank)
+            .where(Salary.courier_id.in_(list(courier_ids)))
+            .subquery()
+        )
+        rows = db.execute(
+            select(ranked.c.courier_id, ranked.c.base_salary).where(ranked.c.rank == 1)
+        )
+        return {courier_id: Decimal(str(base_salary)) for courier_id, base_salary in rows}
+
+    def iter_batches(
+        self,
+        db: Session,
+        organization_id: int,
+        statuses: Sequence[CourierStatus],
+        as_of: date,
+        is_resignation: bool = False,
+        batch_size: Optional[int] = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield EOS rows for an organization's couriers, one batch at a time
+
+        Service ends on the courier's last working day, or ``as_of`` when it
+        is unset or later. Each batch costs two queries (couriers, salaries)
+        regardless of its size.
+
+        Yields:
+            Lists of dicts with courier fields, ``basic_salary``,
+            ``salary_defaulted``, ``termination_date`` and the EOS result
+        """
+        statement = select(
+            Courier.id,
+            Courier.employee_id,
+            Courier.barq_id,
+            Courier.full_name,
+            Courier.status,
+            Courier.joining_date,
+            Courier.last_working_day,
+        ).where(
+            Courier.organization_id == organization_id,
+            Courier.status.in_(list(statuses)),
+            Courier.joining_date.isnot(None),
+            Courier.joining_date <= as_of,
+        )
+
+        for couriers in iter_keyset_batches(
+            db, statement, Courier.id, batch_size or self.batch_size
+        ):
+            salaries = self.latest_salaries(db, [row["id"] for row in couriers])
+            termination_dates = [
+                min(row["last_working_day"] or as_of, as_of) for row in couriers
+            ]
+            basic_salaries = [salaries.get(row["id"], DEFAULT_BASIC_SALARY) for row in couriers]
+            results = calculate_eos_batch(
+                [row["joining_date"] for row in couriers],
+                termination_dates,
+                basic_salaries,
+                is_resignation,
+            )
+
+            batch = []
+            for row, ended, salary, eos in zip(
+                couriers, termination_dates, basic_salaries, results
+            ):
+                batch.append(
+                    {
+                        **row,
+                        **eos,
+                        "termination_date": ended,
+                        "basic_salary": float(salary),
+                        "salary_defaulted": row["id"] not in salaries,
+                    }
+                )
+            yield batch
+
+    def compute_liability(self, db: Session, organization_id: int, as_of: date) -> Dict[str, Any]:
+        """
+        Full EOS owed to every courier not yet terminated, as of ``as_of``
+
+        Assumes employer termination (full entitlement), the figure finance
+        provisions for.
+        """
+        statuses = [status for status in CourierStatus if status != CourierStatus.TERMINATED]
+        by_status: Dict[str, Dict[str, Any]] = {}
+        by_band: Dict[str, Dict[str, Any]] = {
+            label: {"count": 0, "liability": 0.0} for label, _, _ in SERVICE_BANDS
+        }
+        total = Decimal("0")
+        count = 0
+        defaulted = 0
+
+        for batch in self.iter_batches(db, organization_id, statuses, as_of):
+            for row in batch:
+                amount = Decimal(str(row["final_eos"]))
+                total += amount
+                count += 1
+                defaulted += row["salary_defaulted"]
+
+                status = row["status"].value
+                bucket = by_status.setdefault(status, {"count": 0, "liability": 0.0})
+                bucket["count"] += 1
+                bucket["liability"] += float(amount)
+
+                band = by_band[_service_band(row["years_of_service"])]
+                band["count"] += 1
+                band["liability"] += float(amount)
+
+        for bucket in (*by_status.values(), *by_band.values()):
+            bucket["liability"] = round(bucket["liability"], 2)
+
+        return {
+            "courier_count": count,
+            "total_liability": total,
+            "defaulted_salary_count": defaulted,
+            "breakdown": {"by_status": by_status, "by_service_band": by_band},
+        }
+
+    def find_snapshot(
+        self, db: Session, organization_id: int, month: date
+    ) -> Optional[EOSLiabilitySnapshot]:
+        """Stored EOS liability for a month, or None; never computes"""
+        first, _ = _month_bounds(month)
+        return (
+            db.query(EOSLiabilitySnapshot)
+            .filter(
+                EOSLiabilitySnapshot.organization_id == organization_id,
+                EOSLiabilitySnapshot.month == first,
+            )
+            .first()
+        )
+
+    def refresh_snapshot(
+        self,
+        db: Session,
+        organization_id: int,
+        month: date,
+        today: Optional[date] = None,
+    ) -> EOSLiabilitySnapshot:
+        """
+        Compute and store the EOS liability for a month
+
+        Past months are computed as of their last day, the current month as of
+        today. Commits.
+        """
+        first, last = _month_bounds(month)
+        as_of = min(last, today or date.today())
+
+        liability = self.compute_liability(db, organization_id, as_of)
+        snapshot = self.find_snapshot(db, organization_id, first)
+        if snapshot is None:
+            snapshot = EOSLiabilitySnapshot(organization_id=organization_id, month=first)
+            db.add(snapshot)
+        snapshot.as_of_date = as_of
+        snapshot.courier_count = liability["courier_count"]
+        snapshot.total_liability = liability["total_liability"]
+        snapshot.defaulted_salary_count = liability["defaulted_salary_count"]
+        snapshot.breakdown = liability["breakdown"]
+        snapshot.computed_at = datetime.now(timezone.utc)
+        db.commit()
+        db.refresh(snapshot)
+
+        logger.info(
+            f"EOS liability for organization {organization_id} ({first:%Y-%m}): "
+            f"{snapshot.total_liability} SAR across {snapshot.courier_count} couriers"
+        )
+        return snapshot
+
+    def get_snapshot(
+        self,
+        db: Session,
+        organization_id: int,
+        month: date,
+        refresh: bool = False,
+        today: Optional[date] = None,
+    ) -> EOSLiabilitySnapshot:
+        """
+        Stored EOS liability for a month, computing it when missing or stale
+
+        Past months are computed once as of their last day. The current month
+        is computed as of today and recomputed when the stored row is from an
+        earlier day.
+        """
+        _, last = _month_bounds(month)
+        as_of = min(last, today or date.today())
+
+        snapshot = self.find_snapshot(db, organization_id, month)
+        if snapshot is not None and not refresh and snapshot.as_of_date >= as_of:
+            return snapshot
+        return self.refresh_snapshot(db, organization_id, month, today=today)
+
+
+eos_liability_service = EOSLiabilityService()
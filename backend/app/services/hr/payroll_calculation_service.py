@@ -15,6 +15,7 @@ from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.encryption import decrypt_attributes
 from app.models.fleet.courier import Courier
 from app.models.hr.payroll_category import (
     CourierTarget,
@@ -642,6 +643,7 @@ class PayrollCalculationService:
 
         result = await self.db.execute(query)
         couriers = result.scalars().all()
+        decrypt_attributes(couriers, "iban", "national_id")
 
         # Fetch performance data from BigQuery for all couriers in this batch
         performance_data_map: Dict[str, Dict] = {}
@@ -1,5 +1,6 @@
 """Operations Services"""
 
+from app.services.operations.cod_ledger_service import cod_ledger_service
 from app.services.operations.cod_service import cod_service
 from app.services.operations.delivery_service import delivery_service
 from app.services.operations.dispatch_assignment_service import dispatch_assignment_service
@@ -7,6 +8,8 @@ from app.services.operations.feedback_service import (
     customer_feedback_service,
     feedback_template_service,
 )
+from app.services.operations.feedback_rollup_service import feedback_rollup_service
+from app.services.operations.geocoding_service import geocoding_service
 from app.services.operations.handover_service import handover_service
 from app.services.operations.incident_service import incident_service
 from app.services.operations.operations_document_service import operations_document_service
@@ -14,6 +17,7 @@ from app.services.operations.quality_service import (
     quality_inspection_service,
     quality_metric_service,
 )
+from app.services.operations.route_optimizer import route_optimizer
 from app.services.operations.route_service import route_service
 from app.services.operations.settings_service import (
     dispatch_rule_service,
@@ -22,7 +26,9 @@ from app.services.operations.settings_service import (
     sla_threshold_service,
     zone_default_service,
 )
+from app.services.operations.sla_deadline_scheduler import sla_deadline_scheduler
 from app.services.operations.sla_service import sla_definition_service, sla_tracking_service
+from app.services.operations.zone_index import zone_index_service
 from app.services.operations.zone_service import zone_service
 from app.services.operations.priority_queue_service import priority_queue_service
 
@@ -30,7 +36,9 @@ __all__ = [
     # Core operations
     "delivery_service",
     "route_service",
+    "route_optimizer",
     "cod_service",
+    "cod_ledger_service",
     "incident_service",
     # Dispatch
     "dispatch_assignment_service",
@@ -38,15 +46,19 @@ __all__ = [
     "handover_service",
     # Zone
     "zone_service",
+    "zone_index_service",
+    "geocoding_service",
     # SLA
     "sla_definition_service",
     "sla_tracking_service",
+    "sla_deadline_scheduler",
     # Quality
     "quality_metric_service",
     "quality_inspection_service",
     # Feedback
     "customer_feedback_service",
     "feedback_template_service",
+    "feedback_rollup_service",
     # Settings
     "operations_settings_service",
     "dispatch_rule_service",
@@ -0,0 +1,459 @@
+"""
+COD Ledger Service
+
+Keeps running courier COD balances so balance reads never sum COD rows.
+
+- every change to a COD row (create, status change, amount or courier
+  change, delete) appends movements to ``cod_ledger_entries`` and applies the
+  same deltas to the courier's ``courier_cod_balances`` row, inside the
+  caller's transaction
+- deltas are applied as ``column = column + delta`` updates (one statement
+  per organization, however many couriers a settlement touches), so
+  concurrent writers never overwrite each other's changes
+- ``reconcile`` recomputes per-courier totals from the COD rows and the
+  ledger, reports drift and optionally repairs it: balances are rewritten and
+  the ledger gets adjustment entries. The organization's balance rows are
+  locked (``FOR UPDATE``) before the totals are read, so a concurrent writer
+  either commits first or applies its delta on top of the repaired value.
+  Celery beat runs it periodically; repair is off unless ``COD_LEDGER_REPAIR``
+  enables it.
+
+Balance lookups and all-courier listings are indexed reads of
+``courier_cod_balances``.
+"""
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.performance_config import CODLedgerConfig, performance_config
+from app.models.operations.cod import COD, CODStatus
+from app.models.operations.cod_ledger import CODLedgerEntry, CourierCODBalance
+from app.models.tenant.organization import Organization
+
+logger = logging.getLogger(__name__)
+
+NO_COURIER = 0
+
+# Statuses with amount/count columns on the balance row; reconciled COD leaves the balance
+TRACKED_STATUSES = (CODStatus.PENDING.value, CODStatus.COLLECTED.value, CODStatus.DEPOSITED.value)
+# Money still held by the courier
+OUTSTANDING_STATUSES = (CODStatus.PENDING.value, CODStatus.COLLECTED.value)
+
+BALANCE_COLUMNS = [
+    f"{status}_{kind}" for status in TRACKED_STATUSES for kind in ("amount", "count")
+] + ["outstanding_amount"]
+
+_CENT = Decimal("0.01")
+
+
+def _money(value: Any) -> Decimal:
+    return Decimal(str(value or 0)).quantize(_CENT)
+
+
+def _status_value(status: Any) -> str:
+    return CODStatus(status or CODStatus.PENDING).value
+
+
+@dataclass(frozen=True)
+class CODState:
+    """The fields of a COD row that the ledger tracks"""
+
+    organization_id: int
+    courier_id: int
+    status: str
+    amount: Decimal
+
+    @classmethod
+    def of(cls, cod: Any) -> "CODState":
+        """State of a COD model instance or a row with the same attributes"""
+        return cls(
+            organization_id=cod.organization_id,
+            courier_id=cod.courier_id or NO_COURIER,
+            status=_status_value(cod.status),
+            amount=_money(cod.amount),
+        )
+
+    def with_status(self, status: CODStatus) -> "CODState":
+        return replace(self, status=status.value)
+
+
+Change = Tuple[Optional[int], Optional[CODState], Optional[CODState]]
+
+
+def _movements(
+    cod_id: Optional[int],
+    before: Optional[CODState],
+    after: Optional[CODState],
+    reason: str,
+    reference_number: Optional[str],
+) -> List[Dict[str, Any]]:
+    """Ledger rows taking one COD row from ``before`` to ``after``"""
+    if before == after:
+        return []
+
+    def entry(state: CODState, from_status: Optional[str], to_status: Optional[str]):
+        return {
+            "organization_id": state.organization_id,
+            "cod_id": cod_id,
+            "courier_id": state.courier_id,
+            "from_status": from_status,
+            "to_status": to_status,
+            "amount": state.amount,
+            "reason": reason,
+            "reference_number": reference_number,
+        }
+
+    if before and after and (before.organization_id, before.courier_id, before.amount) == (
+        after.organization_id,
+        after.courier_id,
+        after.amount,
+    ):
+        return [entry(after, before.status, after.status)]
+
+    # Courier or amount changed: move the old state out and the new state in
+    entries = []
+    if before:
+        entries.append(entry(before, before.status, None))
+    if after:
+        entries.append(entry(after, None, after.status))
+    return entries
+
+
+def _balance_deltas(entries: Iterable[Dict[str, Any]]) -> Dict[Tuple[int, int], Dict[str, Any]]:
+    """(organization, courier) -> column deltas for ledger rows"""
+    deltas: Dict[Tuple[int, int], Dict[str, Any]] = defaultdict(lambda: defaultdict(int))
+    for row in entries:
+        bucket = deltas[(row["organization_id"], row["courier_id"])]
+        for status, sign in ((row["from_status"], -1), (row["to_status"], 1)):
+            if status not in TRACKED_STATUSES:
+                continue
+            bucket[f"{status}_amount"] += sign * row["amount"]
+            bucket[f"{status}_count"] += sign
+            if status in OUTSTANDING_STATUSES:
+                bucket["outstanding_amount"] += sign * row["amount"]
+    return deltas
+
+
+class CODLedgerService:
+    """Maintains and reads the COD ledger and courier balances"""
+
+    def __init__(self, config: Optional[CODLedgerConfig] = None):
+        self.config = config or performance_config.cod_ledger
+
+    # ------------------------------------------------------------------
+    # Writes (caller commits)
+    # ------------------------------------------------------------------
+
+    def record(
+        self,
+        db: Session,
+        cod_id: Optional[int],
+        before: Optional[CODState],
+        after: Optional[CODState],
+        *,
+        reason: Optional[str] = None,
+        reference_number: Optional[str] = None,
+    ) -> None:
+        """Record one COD row changing from ``before`` to ``after`` (None = absent)"""
+        self.record_many(
+            db, [(cod_id, before, after)], reason=reason, reference_number=reference_number
+        )
+
+    def record_many(
+        self,
+        db: Session,
+        changes: Iterable[Change],
+        *,
+        reason: Optional[str] = None,
+        reference_number: Optional[str] = None,
+    ) -> int:
+        """
+        Record COD row changes with one ledger insert and one balance update
+        per organization.
+
+        Args:
+            db: Database session
+            changes: (cod_id, before, after) per COD row
+            reason: Ledger reason; derived from the change when None
+            reference_number: Optional deposit or settlement reference
+
+        Returns:
+            Number of ledger entries written
+        """
+        entries = []
+        for cod_id, before, after in changes:
+            entry_reason = reason
+            if entry_reason is None:
+                if before is None:
+                    entry_reason = "created"
+                elif after is None:
+                    entry_reason = "deleted"
+                elif before.status != after.status:
+                    entry_reason = after.status
+                else:
+                    entry_reason = "amended"
+            entries.extend(_movements(cod_id, before, after, entry_reason, reference_number))
+
+        if not entries:
+            return 0
+        db.execute(insert(CODLedgerEntry), entries)
+        self._apply(db, _balance_deltas(entries))
+        return len(entries)
+
+    def _apply(self, db: Session, deltas: Dict[Tuple[int, int], Dict[str, Any]]) -> None:
+        """Add column deltas to balance rows, one UPDATE per organization"""
+        by_org: Dict[int, Dict[int, Dict[str, Any]]] = defaultdict(dict)
+        for (org_id, courier_id), columns in deltas.items():
+            if any(columns.values()):
+                by_org[org_id][courier_id] = columns
+
+        for org_id, couriers in by_org.items():
+            self._ensure_balances(db, org_id, couriers)
+            names = {name for columns in couriers.values() for name in columns}
+            values = {}
+            for name in names:
+                column = getattr(CourierCODBalance, name)
+                if len(couriers) == 1:
+                    values[name] = column + next(iter(couriers.values())).get(name, 0)
+                else:
+                    values[name] = column + case(
+                        {cid: columns.get(name, 0) for cid, columns in couriers.items()},
+                        value=CourierCODBalance.courier_id,
+                        else_=0,
+                    )
+            db.query(CourierCODBalance).filter(
+                CourierCODBalance.organization_id == org_id,
+                CourierCODBalance.courier_id.in_(list(couriers)),
+            ).update(values, synchronize_session=False)
+
+    def _ensure_balances(self, db: Session, org_id: int, courier_ids: Iterable[int]) -> None:
+        """Create missing zero balance rows"""
+        courier_ids = set(courier_ids)
+        existing = {
+            cid
+            for (cid,) in db.query(CourierCODBalance.courier_id).filter(
+                CourierCODBalance.organization_id == org_id,
+                CourierCODBalance.courier_id.in_(courier_ids),
+            )
+        }
+        for courier_id in sorted(courier_ids - existing):
+            try:
+                with db.begin_nested():
+                    db.add(CourierCODBalance(organization_id=org_id, courier_id=courier_id))
+            except IntegrityError:
+                # Created by a concurrent transaction; the update applies to theirs
+                pass
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get_balance(
+        self, db: Session, courier_id: int, organization_id: Optional[int] = None
+    ) -> Optional[CourierCODBalance]:
+        """A courier's balance row, or None if the courier never had COD"""
+        query = db.query(CourierCODBalance).filter(CourierCODBalance.courier_id == courier_id)
+        if organization_id is not None:
+            query = query.filter(CourierCODBalance.organization_id == organization_id)
+        return query.first()
+
+    def list_balances(
+        self,
+        db: Session,
+        organization_id: int,
+        *,
+        min_outstanding: Optional[Decimal] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> List[CourierCODBalance]:
+        """Courier balances of an organization, largest outstanding first"""
+        query = db.query(CourierCODBalance).filter(
+            CourierCODBalance.organization_id == organization_id
+        )
+        if min_outstanding is not None:
+            query = query.filter(CourierCODBalance.outstanding_amount >= min_outstanding)
+        return (
+            query.order_by(
+                CourierCODBalance.outstanding_amount.desc(), CourierCODBalance.courier_id
+            )
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_entries(
+        self,
+        db: Session,
+        organization_id: int,
+        *,
+        courier_id: Optional[int] = None,
+        cod_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> List[CODLedgerEntry]:
+        """Ledger entries of an organization, newest first"""
+        query = db.query(CODLedgerEntry).filter(CODLedgerEntry.organization_id == organization_id)
+        if courier_id is not None:
+            query = query.filter(CODLedgerEntry.courier_id == courier_id)
+        if cod_id is not None:
+            query = query.filter(CODLedgerEntry.cod_id == cod_id)
+        return query.order_by(CODLedgerEntry.id.desc()).offset(skip).limit(limit).all()
+
+    # ------------------------------------------------------------------
+    # Reconciliation
+    # ------------------------------------------------------------------
+
+    def _actual_totals(self, db: Session, org_id: int) -> Dict[int, Dict[str, Any]]:
+        """Balance columns per courier computed from the COD rows"""
+        rows = (
+            db.query(COD.courier_id, COD.status, func.sum(COD.amount), func.count(COD.id))
+            .filter(COD.organization_id == org_id)
+            .group_by(COD.courier_id, COD.status)
+            .all()
+        )
+        totals: Dict[int, Dict[str, Any]] = defaultdict(lambda: dict.fromkeys(BALANCE_COLUMNS, 0))
+        for courier_id, status, amount, count in rows:
+            status = _status_value(status)
+            if status not in TRACKED_STATUSES:
+                continue
+            columns = totals[courier_id or NO_COURIER]
+            columns[f"{status}_amount"] += _money(amount)
+            columns[f"{status}_count"] += count
+            if status in OUTSTANDING_STATUSES:
+                columns["outstanding_amount"] += _money(amount)
+        return totals
+
+    def _ledger_totals(self, db: Session, org_id: int) -> Dict[Tuple[int, str], Decimal]:
+        """Amount per (courier, status) implied by the ledger"""
+        totals: Dict[Tuple[int, str], Decimal] = defaultdict(Decimal)
+        signed_columns = ((CODLedgerEntry.to_status, 1), (CODLedgerEntry.from_status, -1))
+        for status_column, sign in signed_columns:
+            rows = (
+                db.query(CODLedgerEntry.courier_id, status_column, func.sum(CODLedgerEntry.amount))
+                .filter(CODLedgerEntry.organization_id == org_id, status_column.isnot(None))
+                .group_by(CODLedgerEntry.courier_id, status_column)
+                .all()
+            )
+            for courier_id, status, amount in rows:
+                totals[(courier_id, status)] += sign * _money(amount)
+        return totals
+
+    def reconcile(
+        self, db: Session, org_id: int, *, repair: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Verify an organization's balances and ledger against its COD rows
+
+        Args:
+            db: Database session (caller commits)
+            org_id: Organization ID
+            repair: Rewrite drifted balances and add ledger adjustments
+                (config default when None)
+
+        Returns:
+            Couriers checked and the courier IDs whose balance or ledger drifted
+        """
+        repair = self.config.repair if repair is None else repair
+        if repair:
+            # Every courier with tracked COD gets a row now, so all of them are locked below
+            couriers = db.query(COD.courier_id).filter(
+                COD.organization_id == org_id,
+                COD.status.in_([CODStatus(status) for status in TRACKED_STATUSES]),
+            )
+            self._ensure_balances(
+                db, org_id, {courier_id or NO_COURIER for (courier_id,) in couriers.distinct()}
+            )
+        # Lock before reading the totals: writers update these rows in the same
+        # transaction as their COD change, so none can commit half-counted
+        balances = {
+            balance.courier_id: balance
+            for balance in db.query(CourierCODBalance)
+            .filter(CourierCODBalance.organization_id == org_id)
+            .order_by(CourierCODBalance.courier_id)
+            .with_for_update()
+        }
+        actual = self._actual_totals(db, org_id)
+        ledger = self._ledger_totals(db, org_id)
+
+        balance_drift = []
+        for courier_id in sorted(set(actual) | set(balances)):
+            expected = actual.get(courier_id) or dict.fromkeys(BALANCE_COLUMNS, 0)
+            balance = balances.get(courier_id)
+            stored = {
+                name: (getattr(balance, name) or 0) if balance else 0 for name in BALANCE_COLUMNS
+            }
+            if any(_money(stored[name]) != _money(expected[name]) for name in BALANCE_COLUMNS):
+                balance_drift.append(courier_id)
+                # A courier without a locked row got its first COD after the
+                # rows were created; its writer maintains it, the next run checks it
+                if repair and balance is not None:
+                    for name, value in expected.items():
+                        setattr(balance, name, value)
+
+        adjustments = []
+        keys = {(courier_id, status) for courier_id in actual for status in TRACKED_STATUSES}
+        keys |= {key for key in ledger if key[1] in TRACKED_STATUSES}
+        for courier_id, status in sorted(keys):
+            expected_amount = _money(actual.get(courier_id, {}).get(f"{status}_amount", 0))
+            difference = expected_amount - ledger.get((courier_id, status), Decimal(0))
+            if difference:
+                adjustments.append({
+                    "organization_id": org_id,
+                    "cod_id": None,
+                    "courier_id": courier_id,
+                    "from_status": None if difference > 0 else status,
+                    "to_status": status if difference > 0 else None,
+                    "amount": abs(difference),
+                    "reason": "adjustment",
+                    "reference_number": None,
+                })
+        ledger_drift = sorted({row["courier_id"] for row in adjustments})
+        if repair and adjustments:
+            # Balances were rewritten above, so these entries are not applied to them
+            db.execute(insert(CODLedgerEntry), adjustments)
+
+        db.query(CourierCODBalance).filter(CourierCODBalance.organization_id == org_id).update(
+            {"reconciled_at": datetime.now(timezone.utc)}, synchronize_session=False
+        )
+
+        if balance_drift or ledger_drift:
+            logger.warning(
+                f"COD ledger drift in organization {org_id}: balances {balance_drift}, "
+                f"ledger {ledger_drift} ({'repaired' if repair else 'not repaired'})"
+            )
+        return {
+            "organization_id": org_id,
+            "couriers_checked": len(set(actual) | set(balances)),
+            "balance_drift": balance_drift,
+            "ledger_drift": ledger_drift,
+            "repaired": bool(repair and (balance_drift or ledger_drift)),
+        }
+
+    def reconcile_all(self, db: Session, *, repair: Optional[bool] = None) -> Dict[str, Any]:
+        """Reconcile every active organization, committing after each"""
+        active = db.query(Organization.id).filter(Organization.is_active.is_(True))
+        org_ids = [org_id for (org_id,) in active]
+        drifted, failed = [], []
+        for org_id in org_ids:
+            try:
+                result = self.reconcile(db, org_id, repair=repair)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"COD ledger reconciliation failed for organization {org_id}: {e}")
+                failed.append(org_id)
+                continue
+            if result["balance_drift"] or result["ledger_drift"]:
+                drifted.append(org_id)
+        return {"organizations": len(org_ids), "drifted": drifted, "failed": failed}
+
+
+cod_ledger_service = CODLedgerService()
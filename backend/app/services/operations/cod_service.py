@@ -1,8 +1,9 @@
 """COD Service"""
 
+from collections import defaultdict
 from datetime import date
 from decimal import Decimal
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 from sqlalchemy import and_, func
 from sqlalchemy.orm import Session
@@ -10,10 +11,68 @@ from sqlalchemy.orm import Session
 from app.models.operations.cod import COD, CODStatus
 from app.schemas.operations.cod import CODCreate, CODUpdate
 from app.services.base import CRUDBase
+from app.services.operations.cod_ledger_service import CODState, cod_ledger_service
+
+SETTLEABLE_STATUSES = [CODStatus.PENDING, CODStatus.COLLECTED]
 
 
 class CODService(CRUDBase[COD, CODCreate, CODUpdate]):
-    """Service for COD (Cash On Delivery) management operations"""
+    """
+    Service for COD (Cash On Delivery) management operations
+
+    Every write goes through the COD ledger in the same transaction, so
+    courier balances stay current without re-summing COD rows.
+    """
+
+    def create(
+        self, db: Session, *, obj_in: CODCreate, organization_id: Optional[int] = None
+    ) -> COD:
+        """Create a COD transaction and its opening ledger entry"""
+        obj_in_data = obj_in.model_dump()
+        if organization_id is not None:
+            obj_in_data["organization_id"] = organization_id
+        cod = self.model(**obj_in_data)
+        db.add(cod)
+        db.flush()
+        cod_ledger_service.record(db, cod.id, None, CODState.of(cod))
+        db.commit()
+        db.refresh(cod)
+        return cod
+
+    def update(self, db: Session, *, db_obj: COD, obj_in: CODUpdate | Dict[str, Any]) -> COD:
+        """Update a COD transaction, recording status, amount and courier changes"""
+        # Lock the row so concurrent updates record consecutive movements
+        db.refresh(db_obj, with_for_update=True)
+        before = CODState.of(db_obj)
+
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+        for field, value in update_data.items():
+            if hasattr(db_obj, field):
+                setattr(db_obj, field, value)
+
+        db.flush()
+        cod_ledger_service.record(
+            db,
+            db_obj.id,
+            before,
+            CODState.of(db_obj),
+            reference_number=update_data.get("reference_number"),
+        )
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def delete(self, db: Session, *, id: int) -> Optional[COD]:
+        """Delete a COD transaction, moving its amount out of the courier balance"""
+        cod = db.query(self.model).filter(self.model.id == id).with_for_update().first()
+        if cod:
+            cod_ledger_service.record(db, cod.id, CODState.of(cod), None)
+            db.delete(cod)
+            db.commit()
+        return cod
 
     def get_by_courier(
         self, db: Session, *, courier_id: int, skip: int = 0, limit: int = 100
@@ -231,12 +290,63 @@ class CODService(CRUDBase[COD, CODCreate, CODUpdate]):
         Returns:
             Number of records updated
         """
-        update_data = {"status": CODStatus.DEPOSITED, "deposit_date": deposit_date or date.today()}
+        rows = self._deposit_where(
+            db,
+            self.model.id.in_(cod_ids),
+            deposit_date=deposit_date,
+            reference_number=reference_number,
+            reason=None,
+        )
+        return len(rows)
+
+    def _deposit_where(
+        self,
+        db: Session,
+        *criteria: Any,
+        deposit_date: Optional[date],
+        reference_number: Optional[str],
+        reason: Optional[str],
+    ) -> List[Any]:
+        """
+        Mark matching COD rows deposited with one UPDATE and record the
+        movements in the ledger, in one transaction
 
+        Returns:
+            The matched rows as they were before the update
+        """
+        rows = (
+            db.query(
+                self.model.id,
+                self.model.organization_id,
+                self.model.courier_id,
+                self.model.status,
+                self.model.amount,
+            )
+            .filter(*criteria)
+            .with_for_update()
+            .all()
+        )
+        if not rows:
+            return rows
+
+        update_data = {"status": CODStatus.DEPOSITED, "deposit_date": deposit_date or date.today()}
         if reference_number:
             update_data["reference_number"] = reference_number
 
-        return self.bulk_update(db, ids=cod_ids, update_data=update_data)
+        db.query(self.model).filter(self.model.id.in_([row.id for row in rows])).update(
+            update_data, synchronize_session=False
+        )
+        cod_ledger_service.record_many(
+            db,
+            (
+                (row.id, CODState.of(row), CODState.of(row).with_status(CODStatus.DEPOSITED))
+                for row in rows
+            ),
+            reason=reason,
+            reference_number=reference_number,
+        )
+        db.commit()
+        return rows
 
     def get_statistics(
         self,
@@ -297,41 +407,102 @@ class CODService(CRUDBase[COD, CODCreate, CODUpdate]):
             ),
         }
 
-    def get_courier_balance(self, db: Session, *, courier_id: int) -> Dict:
+    def get_courier_balance(
+        self, db: Session, *, courier_id: int, organization_id: Optional[int] = None
+    ) -> Dict:
         """
         Get courier's COD balance (pending + collected amounts)
 
+        Reads the courier's running balance row instead of summing COD rows.
+
         Args:
             db: Database session
             courier_id: ID of the courier
+            organization_id: Optional organization ID to scope the lookup
 
         Returns:
             Dictionary with balance information
         """
-        pending_cods = (
-            db.query(self.model)
-            .filter(
-                and_(
-                    self.model.courier_id == courier_id,
-                    self.model.status.in_([CODStatus.PENDING, CODStatus.COLLECTED]),
-                )
-            )
-            .all()
-        )
+        balance = cod_ledger_service.get_balance(db, courier_id, organization_id)
+        if balance is None:
+            return {
+                "courier_id": courier_id,
+                "pending_amount": 0.0,
+                "collected_amount": 0.0,
+                "total_balance": 0.0,
+                "transaction_count": 0,
+            }
+
+        return {
+            "courier_id": courier_id,
+            "pending_amount": float(balance.pending_amount),
+            "collected_amount": float(balance.collected_amount),
+            "total_balance": float(balance.outstanding_amount),
+            "transaction_count": balance.pending_count + balance.collected_count,
+        }
 
-        pending_amount = sum(cod.amount for cod in pending_cods if cod.status == CODStatus.PENDING)
-        collected_amount = sum(
-            cod.amount for cod in pending_cods if cod.status == CODStatus.COLLECTED
+    def settle_couriers(
+        self,
+        db: Session,
+        *,
+        courier_ids: List[int],
+        organization_id: Optional[int] = None,
+        deposit_date: Optional[date] = None,
+        reference_number: Optional[str] = None,
+    ) -> Dict:
+        """
+        Settle all pending and collected COD for many couriers at once
+
+        One UPDATE marks every matching COD row deposited; the ledger entries
+        and balance changes for all couriers are written in the same
+        transaction.
+
+        Args:
+            db: Database session
+            courier_ids: IDs of the couriers to settle
+            organization_id: Optional organization ID to scope the settlement
+            deposit_date: Date of deposit (defaults to today)
+            reference_number: Optional reference number
+
+        Returns:
+            Dictionary with totals and a per-courier breakdown
+        """
+        criteria = [
+            self.model.courier_id.in_(courier_ids),
+            self.model.status.in_(SETTLEABLE_STATUSES),
+        ]
+        if organization_id is not None:
+            criteria.append(self.model.organization_id == organization_id)
+
+        rows = self._deposit_where(
+            db,
+            *criteria,
+            deposit_date=deposit_date,
+            reference_number=reference_number,
+            reason="settled",
         )
 
-        total_balance = pending_amount + collected_amount
+        per_courier: Dict[int, Dict] = defaultdict(
+            lambda: {"transactions_settled": 0, "total_amount": Decimal(0)}
+        )
+        for row in rows:
+            per_courier[row.courier_id]["transactions_settled"] += 1
+            per_courier[row.courier_id]["total_amount"] += row.amount
 
         return {
-            "courier_id": courier_id,
-            "pending_amount": float(pending_amount),
-            "collected_amount": float(collected_amount),
-            "total_balance": float(total_balance),
-            "transaction_count": len(pending_cods),
+            "couriers_settled": len(per_courier),
+            "transactions_settled": len(rows),
+            "total_amount": float(sum((row.amount for row in rows), Decimal(0))),
+            "deposit_date": (deposit_date or date.today()).isoformat(),
+            "reference_number": reference_number,
+            "couriers": [
+                {
+                    "courier_id": courier_id,
+                    "transactions_settled": totals["transactions_settled"],
+                    "total_amount": float(totals["total_amount"]),
+                }
+                for courier_id, totals in sorted(per_courier.items())
+            ],
         }
 
     def settle_courier_cod(
@@ -339,6 +510,7 @@ class CODService(CRUDBase[COD, CODCreate, CODUpdate]):
         db: Session,
         *,
         courier_id: int,
+        organization_id: Optional[int] = None,
         deposit_date: Optional[date] = None,
         reference_number: Optional[str] = None,
     ) -> Dict:
@@ -348,25 +520,22 @@ class CODService(CRUDBase[COD, CODCreate, CODUpdate]):
         Args:
             db: Database session
             courier_id: ID of the courier
+            organization_id: Optional organization ID to scope the settlement
             deposit_date: Date of deposit (defaults to today)
             reference_number: Optional reference number
 
         Returns:
             Dictionary with settlement information
         """
-        # Get all pending and collected COD for courier
-        cods = (
-            db.query(self.model)
-            .filter(
-                and_(
-                    self.model.courier_id == courier_id,
-                    self.model.status.in_([CODStatus.PENDING, CODStatus.COLLECTED]),
-                )
-            )
-            .all()
+        result = self.settle_couriers(
+            db,
+            courier_ids=[courier_id],
+            organization_id=organization_id,
+            deposit_date=deposit_date,
+            reference_number=reference_number,
         )
 
-        if not cods:
+        if not result["transactions_settled"]:
             return {
                 "courier_id": courier_id,
                 "transactions_settled": 0,
@@ -374,19 +543,11 @@ class CODService(CRUDBase[COD, CODCreate, CODUpdate]):
                 "message": "No pending or collected COD transactions found",
             }
 
-        cod_ids = [cod.id for cod in cods]
-        total_amount = sum(cod.amount for cod in cods)
-
-        # Mark all as deposited
-        updated_count = self.bulk_deposit(
-            db, cod_ids=cod_ids, deposit_date=deposit_date, reference_number=reference_number
-        )
-
         return {
             "courier_id": courier_id,
-            "transactions_settled": updated_count,
-            "total_amount": float(total_amount),
-            "deposit_date": (deposit_date or date.today()).isoformat(),
+            "transactions_settled": result["transactions_settled"],
+            "total_amount": result["total_amount"],
+            "deposit_date": result["deposit_date"],
             "reference_number": reference_number,
         }
 
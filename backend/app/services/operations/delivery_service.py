@@ -1,7 +1,7 @@
 """Delivery Service"""
 
 from datetime import date, datetime
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 from sqlalchemy import and_, extract, func
 from sqlalchemy.orm import Session
@@ -9,11 +9,52 @@ from sqlalchemy.orm import Session
 from app.models.operations.delivery import Delivery, DeliveryStatus
 from app.schemas.operations.delivery import DeliveryCreate, DeliveryUpdate
 from app.services.base import CRUDBase
+from app.services.operations.geocoding_service import geocoding_service
+
+# Address field -> coordinate columns derived from it
+ADDRESS_COORDINATES = {
+    "pickup_address": ("pickup_latitude", "pickup_longitude"),
+    "delivery_address": ("delivery_latitude", "delivery_longitude"),
+}
 
 
 class DeliveryService(CRUDBase[Delivery, DeliveryCreate, DeliveryUpdate]):
     """Service for delivery management operations"""
 
+    def create(
+        self, db: Session, *, obj_in: DeliveryCreate, organization_id: Optional[int] = None
+    ) -> Delivery:
+        """Create a delivery and geocode its addresses"""
+        delivery = super().create(db, obj_in=obj_in, organization_id=organization_id)
+        if geocoding_service.locate_deliveries(db, [delivery]):
+            db.commit()
+            db.refresh(delivery)
+        return delivery
+
+    def update(
+        self, db: Session, *, db_obj: Delivery, obj_in: DeliveryUpdate | Dict[str, Any]
+    ) -> Delivery:
+        """Update a delivery, re-geocoding addresses that changed"""
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump(exclude_unset=True)
+        moved = [
+            field
+            for field in ADDRESS_COORDINATES
+            if field in update_data and update_data[field] != getattr(db_obj, field)
+        ]
+        if moved:
+            update_data = dict(update_data)
+            for field in moved:
+                for column in ADDRESS_COORDINATES[field]:
+                    update_data.setdefault(column, None)
+            if "delivery_address" in moved:
+                update_data.setdefault("zone_id", None)
+
+        delivery = super().update(db, db_obj=db_obj, obj_in=update_data)
+        if moved and geocoding_service.locate_deliveries(db, [delivery]):
+            db.commit()
+            db.refresh(delivery)
+        return delivery
+
     def get_by_courier(
         self, db: Session, *, courier_id: int, skip: int = 0, limit: int = 100
     ) -> List[Delivery]:
@@ -0,0 +1,375 @@
+"""
+Feedback Text Analysis
+
+Keyword-based sentiment and category classification for customer feedback.
+
+All keywords of an organization's tables (positive, negative and every
+category) are compiled into one regular expression shaped like a trie, so a
+text is scanned once however many keywords there are, instead of one
+substring search per keyword. Matching keeps substring semantics ("frustrat"
+matches "frustrated") and counts each distinct keyword once.
+
+Keyword tables default to ``DEFAULT_KEYWORDS`` and can be overridden per
+organization with
+``Organization.settings["feedback_keywords"] = {"positive": [...], "negative": [...],
+"categories": {name: [...]}}``; omitted keys keep their defaults. Compiled
+analyzers are cached by table content, so a settings change takes effect on
+the next classification in every process without a restart.
+"""
+
+import json
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models.operations.feedback import CustomerFeedback, FeedbackSentiment, FeedbackType
+from app.models.tenant.organization import Organization
+from app.services.operations.feedback_rollup_service import feedback_rollup_service
+from app.utils.export import iter_keyset_batches
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_KEY = "feedback_keywords"
+
+DEFAULT_KEYWORDS: Dict[str, Any] = {
+    "positive": [
+        "excellent", "amazing", "great", "fantastic", "wonderful", "perfect",
+        "best", "love", "thank", "thanks", "appreciate", "happy", "satisfied",
+        "quick", "fast", "professional", "friendly", "helpful", "awesome",
+        "outstanding", "exceptional", "recommend", "impressed", "pleasant",
+    ],
+    "negative": [
+        "terrible", "horrible", "awful", "bad", "worst", "hate", "angry",
+        "disappointed", "frustrat", "poor", "slow", "late", "damaged",
+        "broken", "rude", "unprofessional", "missing", "lost", "never",
+        "wrong", "complaint", "refund", "unacceptable", "disgusting",
+    ],
+    "categories": {
+        "delivery_speed": [
+            "fast", "slow", "late", "delay", "time", "quick", "wait", "early", "on time",
+        ],
+        "courier_behavior": [
+            "rude", "friendly", "polite", "professional", "helpful", "attitude", "behavior",
+            "manner",
+        ],
+        "package_handling": [
+            "damaged", "broken", "condition", "package", "item", "handling", "careful", "intact",
+        ],
+        "communication": [
+            "call", "message", "notify", "update", "inform", "contact", "respond", "communication",
+        ],
+        "pricing": ["price", "cost", "expensive", "cheap", "fee", "charge", "value", "money"],
+        "app_experience": [
+            "app", "website", "interface", "tracking", "order", "easy", "difficult", "navigation",
+        ],
+        "customer_service": [
+            "support", "help", "service", "issue", "problem", "resolve", "complaint", "assistance",
+        ],
+    },
+}
+
+# Category used when no keyword matches
+TYPE_DEFAULT_CATEGORIES = {
+    FeedbackType.DELIVERY.value: "delivery_speed",
+    FeedbackType.COURIER.value: "courier_behavior",
+    FeedbackType.SERVICE.value: "customer_service",
+    FeedbackType.APP.value: "app_experience",
+    FeedbackType.SUPPORT.value: "customer_service",
+    FeedbackType.GENERAL.value: "general",
+}
+
+_POSITIVE = "sentiment:positive"
+_NEGATIVE = "sentiment:negative"
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """Regex alternation of ``keywords`` factored into a trie
+
+    Optional suffixes are greedy, so the longest keyword starting at a
+    position wins.
+    """
+    trie: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Finds every keyword occurring in a text with one compiled regex"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = sorted({keyword.lower() for keyword in keywords if keyword})
+        # A zero-width lookahead tries every position, so overlapping
+        # keywords are found; the longest match per position is reported and
+        # the keywords that are its prefixes are implied.
+        self._pattern = (
+            re.compile(f"(?=({_trie_pattern(self.keywords)}))") if self.keywords else None
+        )
+        self._prefixes = {
+            keyword: frozenset(other for other in self.keywords if keyword.startswith(other))
+            for keyword in self.keywords
+        }
+
+    def find(self, text: str) -> Set[str]:
+        """Distinct keywords occurring in ``text`` (case-insensitive)"""
+        if self._pattern is None or not text:
+            return set()
+        found: Set[str] = set()
+        for match in self._pattern.finditer(text.lower()):
+            found |= self._prefixes[match.group(1)]
+        return found
+
+
+@dataclass(frozen=True)
+class FeedbackClassification:
+    """Result of classifying one feedback text"""
+
+    sentiment: FeedbackSentiment
+    category: str
+    is_complaint: bool
+    is_compliment: bool
+
+
+def _keyword_list(value: Any, name: str) -> List[str]:
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"'{name}' must be a list of strings")
+    keywords = []
+    for item in value:
+        keyword = item.strip().lower()
+        if keyword and keyword not in keywords:
+            keywords.append(keyword)
+    return keywords
+
+
+def normalize_keywords(settings: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Keyword tables with defaults filled in, lowercased and de-duplicated
+
+    Raises:
+        ValueError: Malformed tables
+    """
+    settings = settings or {}
+    if not isinstance(settings, dict):
+        raise ValueError("Keyword settings must be an object")
+    unknown = set(settings) - set(DEFAULT_KEYWORDS)
+    if unknown:
+        raise ValueError(f"Unknown keyword tables: {', '.join(sorted(unknown))}")
+
+    categories = settings.get("categories", DEFAULT_KEYWORDS["categories"])
+    if not isinstance(categories, dict):
+        raise ValueError("'categories' must map category names to keyword lists")
+
+    return {
+        "positive": _keyword_list(
+            settings.get("positive", DEFAULT_KEYWORDS["positive"]), "positive"
+        ),
+        "negative": _keyword_list(
+            settings.get("negative", DEFAULT_KEYWORDS["negative"]), "negative"
+        ),
+        "categories": {
+            str(name): _keyword_list(keywords, f"categories.{name}")
+            for name, keywords in categories.items()
+        },
+    }
+
+
+class FeedbackAnalyzer:
+    """Sentiment and category classifier for one set of keyword tables"""
+
+    def __init__(self, keywords: Optional[Dict[str, Any]] = None):
+        self.keywords = normalize_keywords(keywords)
+
+        # keyword -> labels it counts towards (sentiment side or category)
+        self._labels: Dict[str, List[str]] = {}
+        for keyword in self.keywords["positive"]:
+            self._labels.setdefault(keyword, []).append(_POSITIVE)
+        for keyword in self.keywords["negative"]:
+            self._labels.setdefault(keyword, []).append(_NEGATIVE)
+        for category, keywords in self.keywords["categories"].items():
+            for keyword in keywords:
+                self._labels.setdefault(keyword, []).append(category)
+
+        self.matcher = KeywordMatcher(self._labels)
+
+    def _counts(self, text: str) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for keyword in self.matcher.find(text):
+            for label in self._labels[keyword]:
+                counts[label] = counts.get(label, 0) + 1
+        return counts
+
+    @staticmethod
+    def _sentiment(counts: Dict[str, int], rating: int) -> FeedbackSentiment:
+        positive = counts.get(_POSITIVE, 0)
+        negative = counts.get(_NEGATIVE, 0)
+
+        # Rating: 1-2 = negative, 3 = neutral, 4-5 = positive
+        rating_sentiment = 0 if rating <= 2 else (1 if rating == 3 else 2)
+        if negative > positive:
+            text_sentiment = 0
+        elif positive > negative:
+            text_sentiment = 2
+        else:
+            text_sentiment = 1
+
+        combined_score = (rating_sentiment + text_sentiment) / 2
+        if combined_score < 0.8:
+            return FeedbackSentiment.NEGATIVE
+        if combined_score > 1.2:
+            return FeedbackSentiment.POSITIVE
+        return FeedbackSentiment.NEUTRAL
+
+    def _category(self, counts: Dict[str, int], feedback_type: Any) -> str:
+        # First category in table order wins ties
+        best, best_score = None, 0
+        for category in self.keywords["categories"]:
+            score = counts.get(category, 0)
+            if score > best_score:
+                best, best_score = category, score
+        if best is not None:
+            return best
+        type_value = getattr(feedback_type, "value", feedback_type)
+        return TYPE_DEFAULT_CATEGORIES.get(type_value, "general")
+
+    def sentiment(self, text: str, rating: int) -> FeedbackSentiment:
+        """Sentiment from keyword counts combined with the 1-5 rating"""
+        return self._sentiment(self._counts(text), rating)
+
+    def category(self, text: str, feedback_type: Any) -> str:
+        """Best-matching category, or the feedback type's default"""
+        return self._category(self._counts(text), feedback_type)
+
+    def classify(
+        self,
+        text: str,
+        rating: int,
+        feedback_type: Any,
+        category: Optional[str] = None,
+    ) -> FeedbackClassification:
+        """Classify one feedback text with a single scan
+
+        ``category`` keeps a category chosen by the customer.
+        """
+        counts = self._counts(text)
+        sentiment = self._sentiment(counts, rating)
+        return FeedbackClassification(
+            sentiment=sentiment,
+            category=category or self._category(counts, feedback_type),
+            is_complaint=sentiment == FeedbackSentiment.NEGATIVE or rating <= 2,
+            is_compliment=sentiment == FeedbackSentiment.POSITIVE and rating >= 4,
+        )
+
+    def classify_batch(
+        self, items: Iterable[Tuple[str, int, Any]]
+    ) -> List[FeedbackClassification]:
+        """Classify many ``(text, rating, feedback_type)`` tuples"""
+        return [self.classify(text, rating, feedback_type) for text, rating, feedback_type in items]
+
+
+@lru_cache(maxsize=64)
+def _compiled(tables_json: str) -> FeedbackAnalyzer:
+    return FeedbackAnalyzer(json.loads(tables_json))
+
+
+def analyzer_for_keywords(settings: Optional[Dict[str, Any]]) -> FeedbackAnalyzer:
+    """Compiled analyzer for keyword settings, shared by identical tables"""
+    return _compiled(json.dumps(normalize_keywords(settings)))
+
+
+def analyzer_for_organization(db: Session, organization_id: Optional[int]) -> FeedbackAnalyzer:
+    """Analyzer for an organization's keyword tables (defaults if unset or invalid)"""
+    org = db.get(Organization, organization_id) if organization_id else None
+    settings = ((org.settings or {}) if org else {}).get(SETTINGS_KEY)
+    try:
+        return analyzer_for_keywords(settings)
+    except ValueError as e:
+        logger.warning(f"Invalid feedback keyword settings for org {organization_id}: {e}")
+        return analyzer_for_keywords(None)
+
+
+def reclassify_feedback(
+    db: Session,
+    organization_id: Optional[int] = None,
+    recategorize: bool = False,
+    batch_size: int = 1000,
+) -> Dict[str, int]:
+    """
+    Re-run classification over stored feedback
+
+    Sentiment and the complaint/compliment flags are always recomputed.
+    Categories are only filled in where missing unless ``recategorize`` is
+    set, since they may have been chosen by the customer. Each batch is one
+    bulk UPDATE and is committed on its own. Bulk UPDATEs bypass the rollup
+    session events, so the (organization, day) buckets of each batch are
+    marked dirty for the feedback rollups explicitly after its commit.
+
+    Args:
+        db: Database session
+        organization_id: Limit to one organization (all when None)
+        recategorize: Overwrite existing categories too
+        batch_size: Rows per batch
+
+    Returns:
+        Counts of processed rows and changed sentiments
+    """
+    statement = select(
+        CustomerFeedback.id,
+        CustomerFeedback.organization_id,
+        CustomerFeedback.feedback_text,
+        CustomerFeedback.overall_rating,
+        CustomerFeedback.feedback_type,
+        CustomerFeedback.category,
+        CustomerFeedback.sentiment,
+        CustomerFeedback.submitted_at,
+    )
+    if organization_id is not None:
+        statement = statement.where(CustomerFeedback.organization_id == organization_id)
+
+    analyzers: Dict[Optional[int], FeedbackAnalyzer] = {}
+    processed = changed = 0
+    for rows in iter_keyset_batches(db, statement, CustomerFeedback.id, batch_size):
+        updates = []
+        for row in rows:
+            org_id = row["organization_id"]
+            if org_id not in analyzers:
+                analyzers[org_id] = analyzer_for_organization(db, org_id)
+            result = analyzers[org_id].classify(
+                row["feedback_text"],
+                row["overall_rating"],
+                row["feedback_type"],
+                category=None if recategorize else row["category"],
+            )
+            changed += result.sentiment != row["sentiment"]
+            updates.append(
+                {
+                    "id": row["id"],
+                    "sentiment": result.sentiment,
+                    "category": result.category,
+                    "is_complaint": result.is_complaint,
+                    "is_compliment": result.is_compliment,
+                }
+            )
+        db.execute(update(CustomerFeedback), updates)
+        db.commit()
+        feedback_rollup_service.mark_submissions_dirty(
+            (row["organization_id"], row["submitted_at"]) for row in rows
+        )
+        processed += len(updates)
+
+    logger.info(f"Reclassified {processed} feedback entries ({changed} sentiment changes)")
+    return {"processed": processed, "sentiment_changed": changed}
@@ -0,0 +1,499 @@
+"""
+Feedback Rollup Service
+
+Maintains per-organization customer feedback aggregates in the
+``feedback_daily_rollups`` table (one row per day, courier and category) and
+serves the feedback metrics and courier summary endpoints from them.
+
+Maintenance is incremental, like the dashboard rollups:
+- session events record which (organization, day) buckets a commit touched
+  for CustomerFeedback rows and push them to a Redis set; bulk UPDATEs that
+  bypass the ORM (feedback reclassification) call ``mark_submissions_dirty``
+- ``refresh_feedback_rollups_task`` drains that set every minute and rebuilds
+  only those days with one grouped query (COUNT ... FILTER, SUM) per day range
+- organizations not refreshed within ``max_staleness_seconds`` have their
+  trailing ``window_days`` rebuilt even without writes, so missed events heal
+- organizations that were never rolled up are backfilled by the same task;
+  reads never write
+
+Reads are a single SUM over the rollup rows of the period or courier, so
+their cost does not depend on how many feedback rows exist.
+"""
+
+import itertools
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, delete, event, func, inspect, insert
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache_manager
+from app.core.performance_config import FeedbackRollupConfig, performance_config
+from app.models.operations.feedback import CustomerFeedback, FeedbackSentiment, FeedbackStatus
+from app.models.operations.feedback_rollup import FeedbackDailyRollup
+from app.models.tenant.organization import Organization
+
+logger = logging.getLogger(__name__)
+
+# Marker row recording when an organization was last rolled up
+MARKER_DAY = date(1970, 1, 1)
+NO_COURIER = 0
+
+DIRTY_SET_KEY = "feedback:rollups:dirty"
+_SESSION_DIRTY_KEY = "feedback_rollup_dirty"
+_DIRTY_POP_BATCH = 1000
+
+# Rollup prefix -> rating column averaged over non-null values
+RATING_COLUMNS = {
+    "rating": CustomerFeedback.overall_rating,
+    "delivery_speed": CustomerFeedback.delivery_speed_rating,
+    "courier_behavior": CustomerFeedback.courier_behavior_rating,
+    "package_condition": CustomerFeedback.package_condition_rating,
+    "communication": CustomerFeedback.communication_rating,
+}
+
+SUM_COLUMNS = [
+    column.name
+    for column in FeedbackDailyRollup.__table__.columns
+    if column.name.endswith(("_count", "_sum"))
+]
+
+
+def _as_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _merge_days(days: Iterable[date]) -> List[Tuple[date, date]]:
+    """Collapse days into contiguous [start, end] ranges"""
+    ranges: List[Tuple[date, date]] = []
+    for day in sorted(set(days)):
+        if ranges and day == ranges[-1][1] + timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+def _ratio(numerator: float, denominator: float, scale: float = 1.0) -> float:
+    return round(numerator / denominator * scale, 2) if denominator else 0.0
+
+
+class FeedbackRollupService:
+    """Builds and reads the feedback_daily_rollups aggregate table"""
+
+    def __init__(self, config: Optional[FeedbackRollupConfig] = None):
+        self.config = config or performance_config.feedback_rollup
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _totals(self, db: Session, org_id: int, *filters: Any) -> Dict[str, float]:
+        """Summed rollup columns for the matching rows, in one query"""
+        row = (
+            db.query(
+                *(
+                    func.coalesce(func.sum(getattr(FeedbackDailyRollup, name)), 0).label(name)
+                    for name in SUM_COLUMNS
+                )
+            )
+            .filter(
+                FeedbackDailyRollup.organization_id == org_id,
+                FeedbackDailyRollup.day > MARKER_DAY,
+                *filters,
+            )
+            .one()
+        )
+        return {name: float(value) for name, value in zip(SUM_COLUMNS, row)}
+
+    def get_metrics(self, db: Session, org_id: int, since: date) -> Dict[str, Any]:
+        """
+        Feedback metrics for feedback submitted on or after ``since``
+
+        An organization that has never been rolled up reads as empty until
+        ``refresh_feedback_rollups_task`` backfills it on its next run.
+
+        Returns:
+            FeedbackMetrics fields except ``period``
+        """
+        totals = self._totals(db, org_id, FeedbackDailyRollup.day >= since)
+        total = totals["feedback_count"]
+
+        categories = (
+            db.query(FeedbackDailyRollup.category, func.sum(FeedbackDailyRollup.feedback_count))
+            .filter(
+                FeedbackDailyRollup.organization_id == org_id,
+                FeedbackDailyRollup.day >= since,
+                FeedbackDailyRollup.category != "",
+            )
+            .group_by(FeedbackDailyRollup.category)
+            .order_by(
+                func.sum(FeedbackDailyRollup.feedback_count).desc(), FeedbackDailyRollup.category
+            )
+            .limit(10)
+            .all()
+        )
+
+        return {
+            "total_feedbacks": int(total),
+            "avg_overall_rating": _ratio(totals["rating_sum"], totals["rating_count"]),
+            "avg_delivery_speed_rating": _ratio(
+                totals["delivery_speed_sum"], totals["delivery_speed_count"]
+            ),
+            "avg_courier_behavior_rating": _ratio(
+                totals["courier_behavior_sum"], totals["courier_behavior_count"]
+            ),
+            "avg_package_condition_rating": _ratio(
+                totals["package_condition_sum"], totals["package_condition_count"]
+            ),
+            "avg_communication_rating": _ratio(
+                totals["communication_sum"], totals["communication_count"]
+            ),
+            "complaints_count": int(totals["complaint_count"]),
+            "compliments_count": int(totals["compliment_count"]),
+            "response_rate": _ratio(totals["responded_count"], total, 100),
+            "avg_response_time_hours": _ratio(
+                totals["response_hours_sum"], totals["response_hours_count"]
+            ),
+            "resolution_rate": _ratio(totals["resolved_count"], total, 100),
+            "avg_resolution_satisfaction": _ratio(
+                totals["satisfaction_sum"], totals["satisfaction_count"]
+            ),
+            "escalation_rate": _ratio(totals["escalated_count"], total, 100),
+            "sentiment_distribution": {
+                "positive": int(totals["positive_count"]),
+                "neutral": int(totals["neutral_count"]),
+                "negative": int(totals["negative_count"]),
+            },
+            "rating_distribution": {
+                str(rating): int(totals[f"rating_{rating}_count"]) for rating in range(1, 6)
+            },
+            "top_categories": [
+                {"category": category, "count": int(count)} for category, count in categories
+            ],
+        }
+
+    def get_courier_summary(self, db: Session, org_id: int, courier_id: int) -> Dict[str, Any]:
+        """
+        All-time feedback counts for a courier
+
+        Positive/neutral/negative follow the overall rating (4-5, 3, 1-2).
+        """
+        totals = self._totals(db, org_id, FeedbackDailyRollup.courier_id == courier_id)
+        return {
+            "total_feedbacks": int(totals["feedback_count"]),
+            "avg_rating": (
+                totals["rating_sum"] / totals["rating_count"] if totals["rating_count"] else 0.0
+            ),
+            "positive_count": int(totals["rating_4_count"] + totals["rating_5_count"]),
+            "neutral_count": int(totals["rating_3_count"]),
+            "negative_count": int(totals["rating_1_count"] + totals["rating_2_count"]),
+            "complaints_count": int(totals["complaint_count"]),
+        }
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+
+    def refresh_organization(
+        self,
+        db: Session,
+        org_id: int,
+        days: Optional[Iterable[date]] = None,
+        full: bool = False,
+        now: Optional[datetime] = None,
+    ) -> Dict[str, int]:
+        """
+        Rebuild the given days (or all history) for one organization
+
+        The caller owns the transaction (commit/rollback).
+
+        Args:
+            db: Database session
+            org_id: Organization ID
+            days: Days touched by writes; the trailing window_days are always added
+            full: Rebuild every day instead
+            now: Reference time (defaults to utcnow)
+
+        Returns:
+            Number of rows written and day ranges rebuilt
+        """
+        now = now or datetime.utcnow()
+        today = now.date()
+
+        if full:
+            db.execute(
+                delete(FeedbackDailyRollup).where(FeedbackDailyRollup.organization_id == org_id)
+            )
+            written = self._insert_buckets(db, org_id)
+            ranges = 1
+        else:
+            touched = set(days or ())
+            touched.update(today - timedelta(days=i) for i in range(self.config.window_days))
+            written = 0
+            merged = _merge_days(touched)
+            for start, end in merged:
+                db.execute(
+                    delete(FeedbackDailyRollup).where(
+                        FeedbackDailyRollup.organization_id == org_id,
+                        FeedbackDailyRollup.day >= start,
+                        FeedbackDailyRollup.day <= end,
+                    )
+                )
+                written += self._insert_buckets(
+                    db,
+                    org_id,
+                    CustomerFeedback.submitted_at >= _day_start(start),
+                    CustomerFeedback.submitted_at < _day_start(end + timedelta(days=1)),
+                )
+            ranges = len(merged)
+            db.execute(
+                delete(FeedbackDailyRollup).where(
+                    FeedbackDailyRollup.organization_id == org_id,
+                    FeedbackDailyRollup.day == MARKER_DAY,
+                )
+            )
+
+        db.execute(
+            insert(FeedbackDailyRollup),
+            [
+                {
+                    "organization_id": org_id,
+                    "day": MARKER_DAY,
+                    "courier_id": NO_COURIER,
+                    "category": "",
+                    "created_at": now.replace(tzinfo=timezone.utc),
+                }
+            ],
+        )
+        return {"rows": written, "ranges": ranges}
+
+    def _insert_buckets(self, db: Session, org_id: int, *filters: Any) -> int:
+        """Group matching feedback by day, courier and category and insert the rows"""
+        feedback = CustomerFeedback
+        responded = feedback.responded_at.isnot(None)
+        resolved = feedback.status.in_([FeedbackStatus.RESOLVED, FeedbackStatus.CLOSED])
+
+        def when(condition: Any) -> Any:
+            return func.count().filter(condition)
+
+        aggregates: Dict[str, Any] = {"feedback_count": func.count()}
+        for prefix, column in RATING_COLUMNS.items():
+            aggregates[f"{prefix}_sum"] = func.sum(column)
+            aggregates[f"{prefix}_count"] = func.count(column)
+        for rating in range(1, 6):
+            aggregates[f"rating_{rating}_count"] = when(feedback.overall_rating == rating)
+        aggregates.update(
+            positive_count=when(feedback.sentiment == FeedbackSentiment.POSITIVE),
+            neutral_count=when(feedback.sentiment == FeedbackSentiment.NEUTRAL),
+            negative_count=when(feedback.sentiment == FeedbackSentiment.NEGATIVE),
+            complaint_count=when(feedback.is_complaint.is_(True)),
+            compliment_count=when(feedback.is_compliment.is_(True)),
+            escalated_count=when(feedback.is_escalated.is_(True)),
+            responded_count=when(responded),
+            response_hours_sum=func.sum(feedback.response_time_hours).filter(responded),
+            response_hours_count=func.count(feedback.response_time_hours).filter(responded),
+            resolved_count=when(resolved),
+            satisfaction_sum=func.sum(feedback.resolution_satisfaction).filter(resolved),
+            satisfaction_count=func.count(feedback.resolution_satisfaction).filter(resolved),
+        )
+
+        day = func.date(feedback.submitted_at)
+        courier = func.coalesce(feedback.courier_id, NO_COURIER)
+        category = func.coalesce(feedback.category, "")
+        results = (
+            db.query(day, courier, category, *aggregates.values())
+            .filter(feedback.organization_id == org_id, *filters)
+            .group_by(day, courier, category)
+            .all()
+        )
+
+        rows = []
+        for result in results:
+            row = {
+                "organization_id": org_id,
+                "day": _as_date(result[0]),
+                "courier_id": result[1],
+                "category": result[2],
+            }
+            for name, value in zip(aggregates, result[3:]):
+                row[name] = value or 0
+            rows.append(row)
+
+        if rows:
+            db.execute(insert(FeedbackDailyRollup), rows)
+        return len(rows)
+
+    def refresh_pending(self, db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Refresh organizations with pending writes or stale rollups
+
+        Commits per organization so one failure does not discard the others.
+
+        Returns:
+            Counts of refreshed and failed organizations
+        """
+        now = now or datetime.utcnow()
+        dirty = self.pop_dirty()
+        last_refresh = self._last_refresh(db)
+
+        cutoff = now - timedelta(seconds=self.config.max_staleness_seconds)
+        stale = {
+            org_id
+            for org_id, refreshed in last_refresh.items()
+            if refreshed is None or refreshed < cutoff
+        }
+
+        refreshed = failed = 0
+        for org_id in sorted(set(dirty) | stale):
+            try:
+                self.refresh_organization(
+                    db,
+                    org_id,
+                    days=dirty.get(org_id),
+                    full=last_refresh.get(org_id) is None,
+                    now=now,
+                )
+                db.commit()
+                refreshed += 1
+            except Exception as e:
+                db.rollback()
+                failed += 1
+                logger.error(f"Feedback rollup refresh failed for org {org_id}: {e}")
+                # Put the work back so the next run retries it
+                self.mark_dirty((org_id, day) for day in dirty.get(org_id, ()))
+
+        return {"refreshed": refreshed, "failed": failed, "dirty": len(dirty)}
+
+    def _last_refresh(self, db: Session) -> Dict[int, Optional[datetime]]:
+        """Last refresh time per active organization (None if never rolled up)"""
+        rows = (
+            db.query(Organization.id, FeedbackDailyRollup.created_at)
+            .outerjoin(
+                FeedbackDailyRollup,
+                and_(
+                    FeedbackDailyRollup.organization_id == Organization.id,
+                    FeedbackDailyRollup.day == MARKER_DAY,
+                ),
+            )
+            .filter(Organization.is_active.is_(True))
+            .all()
+        )
+        return {
+            org_id: _naive_utc(created_at) if created_at is not None else None
+            for org_id, created_at in rows
+        }
+
+    # ------------------------------------------------------------------
+    # Dirty bucket tracking
+    # ------------------------------------------------------------------
+
+    def mark_dirty(self, entries: Iterable[Tuple[int, date]]) -> None:
+        """Record (organization, day) buckets that need rebuilding"""
+        members = [f"{org_id}:{day.isoformat()}" for org_id, day in entries]
+        if not members:
+            return
+        client = cache_manager.redis_cache.client
+        if client is None:
+            return  # The staleness sweep picks the organizations up
+        try:
+            client.sadd(DIRTY_SET_KEY, *members)
+        except Exception as e:
+            logger.debug(f"Failed to mark feedback rollups dirty: {e}")
+
+    def mark_submissions_dirty(self, entries: Iterable[Tuple[int, Any]]) -> None:
+        """Mark the days of (organization, submitted_at) pairs written outside the ORM"""
+        self.mark_dirty(
+            {
+                (org_id, _naive_utc(submitted_at).date())
+                for org_id, submitted_at in entries
+                if isinstance(submitted_at, datetime)
+            }
+        )
+
+    def pop_dirty(self) -> Dict[int, Set[date]]:
+        """Atomically take all pending (organization, day) buckets"""
+        client = cache_manager.redis_cache.client
+        dirty: Dict[int, Set[date]] = defaultdict(set)
+        if client is None:
+            return dirty
+
+        try:
+            while True:
+                members = client.spop(DIRTY_SET_KEY, _DIRTY_POP_BATCH)
+                if not members:
+                    break
+                for member in members:
+                    if isinstance(member, bytes):
+                        member = member.decode()
+                    org_id, _, day = member.partition(":")
+                    dirty[int(org_id)].add(date.fromisoformat(day))
+        except Exception as e:
+            logger.warning(f"Failed to read dirty feedback rollups: {e}")
+
+        return dirty
+
+
+def _track_changes(session: Session, flush_context: Any) -> None:
+    """after_flush: remember which rollup days this transaction touched"""
+    touched: Optional[Set[Tuple[int, date]]] = None
+
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, CustomerFeedback):
+            continue
+        # Read loaded state only; attribute access could emit SQL mid-flush
+        state = obj.__dict__
+        org_id = state.get("organization_id")
+        if org_id is None:
+            continue
+        if touched is None:
+            touched = session.info.setdefault(_SESSION_DIRTY_KEY, set())
+
+        # Current and, if it moved, previous submission day
+        history = inspect(obj).attrs.submitted_at.history
+        for submitted_at in itertools.chain([state.get("submitted_at")], history.deleted or ()):
+            if isinstance(submitted_at, datetime):
+                touched.add((org_id, _naive_utc(submitted_at).date()))
+
+
+def _publish_changes(session: Session) -> None:
+    """after_commit: hand touched days to the refresh job"""
+    touched = session.info.pop(_SESSION_DIRTY_KEY, None)
+    if touched:
+        feedback_rollup_service.mark_dirty(touched)
+
+
+def _discard_changes(session: Session) -> None:
+    session.info.pop(_SESSION_DIRTY_KEY, None)
+
+
+def register_rollup_events() -> None:
+    """Install the session listeners that feed incremental refreshes (idempotent)"""
+    for name, listener in (
+        ("after_flush", _track_changes),
+        ("after_commit", _publish_changes),
+        ("after_rollback", _discard_changes),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+# Singleton instance
+feedback_rollup_service = FeedbackRollupService()
+register_rollup_events()
@@ -0,0 +1,378 @@
+"""
+Geocoding Service
+
+Resolves free-text delivery addresses to coordinates once, at ingest, so
+dispatch, routes and zones read stored points instead of geocoding (or
+guessing) per request.
+
+Lookups go through three layers, each only asked for what the previous one
+did not have:
+- an in-process LRU of normalized address -> coordinates
+- the shared ``geocode_cache`` table, one row per normalized address; misses
+  are stored too so unresolvable addresses are not resent on every sync
+- the configured geocoder backend, called in batches
+
+Backends are pluggable (``GEOCODER_BACKEND``): ``offline`` only understands
+addresses that already are "lat,lng" pairs and never touches the network,
+``nominatim`` queries a Nominatim-compatible search API.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.performance_config import GeocodingConfig, performance_config
+from app.models.operations.delivery import Delivery
+from app.models.operations.geocode_cache import GeocodeCacheEntry
+from app.services.operations.zone_index import zone_index_service
+
+logger = logging.getLogger(__name__)
+
+Coordinates = Tuple[float, float]
+
+# Hashes per IN (...) list when reading the cache table
+_QUERY_CHUNK = 1000
+
+_SEPARATORS = re.compile(r"\s*[,;،]\s*")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class GeocoderUnavailable(Exception):
+    """The geocoder backend could not be reached; results must not be cached"""
+
+
+def normalize_address(address: Optional[str]) -> str:
+    """
+    Cache key for an address.
+
+    Unicode-normalized, case-folded, with whitespace collapsed and separators
+    (including the Arabic comma) unified, so trivially different spellings of
+    the same address share one cache entry.
+    """
+    text = unicodedata.normalize("NFKC", address or "").casefold()
+    text = _SEPARATORS.sub(", ", text)
+    text = _WHITESPACE.sub(" ", text)
+    return text.strip(" ,.")
+
+
+def parse_coordinates(address: Optional[str]) -> Optional[Coordinates]:
+    """(latitude, longitude) when an address starts with a "lat,lng" pair"""
+    if not address:
+        return None
+    parts = address.split(",")
+    if len(parts) < 2:
+        return None
+    try:
+        lat = float(parts[0].strip())
+        lng = float(parts[1].strip())
+    except ValueError:
+        return None
+    if -90 <= lat <= 90 and -180 <= lng <= 180:
+        return lat, lng
+    return None
+
+
+def _address_hash(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class Geocoder(ABC):
+    """Geocoder backend: resolves a batch of addresses to coordinates"""
+
+    name: str = "base"
+
+    @abstractmethod
+    def geocode_batch(self, addresses: Sequence[str]) -> List[Optional[Coordinates]]:
+        """
+        Coordinates per address, in order (None when not found).
+
+        Raises GeocoderUnavailable when the backend cannot answer at all.
+        """
+
+
+class OfflineGeocoder(Geocoder):
+    """Resolves only literal "lat,lng" addresses; no network access"""
+
+    name = "offline"
+
+    def geocode_batch(self, addresses: Sequence[str]) -> List[Optional[Coordinates]]:
+        return [parse_coordinates(address) for address in addresses]
+
+
+class NominatimGeocoder(Geocoder):
+    """Geocoder backed by a Nominatim-compatible ``/search`` endpoint"""
+
+    name = "nominatim"
+
+    def __init__(self, base_url: str, country_codes: str = "", timeout: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.country_codes = country_codes
+        self._client = httpx.Client(
+            timeout=timeout, headers={"User-Agent": "barq-fleet-management"}
+        )
+
+    def geocode_batch(self, addresses: Sequence[str]) -> List[Optional[Coordinates]]:
+        # Nominatim has no batch endpoint; literal coordinates skip the request
+        return [parse_coordinates(address) or self._search(address) for address in addresses]
+
+    def _search(self, address: str) -> Optional[Coordinates]:
+        params = {"q": address, "format": "jsonv2", "limit": 1}
+        if self.country_codes:
+            params["countrycodes"] = self.country_codes
+        try:
+            response = self._client.get(f"{self.base_url}/search", params=params)
+            response.raise_for_status()
+            results = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            raise GeocoderUnavailable(f"Nominatim search failed: {e}") from e
+        if not results:
+            return None
+        return float(results[0]["lat"]), float(results[0]["lon"])
+
+
+def get_geocoder(config: Optional[GeocodingConfig] = None) -> Geocoder:
+    """Geocoder backend selected by ``GeocodingConfig.backend``"""
+    config = config or performance_config.geocoding
+    backend = config.backend.lower()
+    if backend == "nominatim":
+        return NominatimGeocoder(config.nominatim_url, config.country_codes, config.timeout_seconds)
+    if backend != "offline":
+        logger.warning(f"Unknown geocoder backend '{config.backend}', using offline geocoder")
+    return OfflineGeocoder()
+
+
+class GeocodingService:
+    """Cached, batched address geocoding and delivery coordinate tagging"""
+
+    def __init__(
+        self, geocoder: Optional[Geocoder] = None, config: Optional[GeocodingConfig] = None
+    ):
+        self.config = config or performance_config.geocoding
+        self._geocoder = geocoder
+        self._lru: "OrderedDict[str, Optional[Coordinates]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def geocoder(self) -> Geocoder:
+        if self._geocoder is None:
+            self._geocoder = get_geocoder(self.config)
+        return self._geocoder
+
+    def geocode(self, db: Session, address: str) -> Optional[Coordinates]:
+        """Coordinates of one address, or None"""
+        return self.geocode_many(db, [address]).get(address)
+
+    def geocode_many(
+        self, db: Session, addresses: Iterable[str]
+    ) -> Dict[str, Optional[Coordinates]]:
+        """
+        Coordinates for many addresses in one pass.
+
+        Returns a dict keyed by the addresses as given. New results are added
+        to the cache table in the caller's transaction (flushed, not committed).
+        """
+        by_key: Dict[str, List[str]] = defaultdict(list)
+        for address in addresses:
+            key = normalize_address(address)
+            if key:
+                by_key[key].append(address)
+        if not by_key:
+            return {}
+
+        found = self._from_lru(by_key)
+        missing = [key for key in by_key if key not in found]
+        stale: set = set()
+        if missing:
+            cached, stale = self._from_table(db, missing)
+            found.update(cached)
+            self._remember(cached)
+            missing = [key for key in missing if key not in cached]
+        if missing:
+            resolved = self._from_backend(missing)
+            self._store(db, resolved, stale)
+            found.update(resolved)
+            self._remember(resolved)
+
+        return {
+            address: found.get(key) for key, originals in by_key.items() for address in originals
+        }
+
+    def locate_deliveries(self, db: Session, deliveries: Sequence[Delivery]) -> int:
+        """
+        Fill in missing coordinates and drop-off zones of deliveries.
+
+        Addresses of all deliveries are geocoded in one batch, then drop-off
+        points are resolved to zones with one zone index call per
+        organization. Coordinates already set (e.g. supplied by a platform)
+        are kept. Changes are not committed. Returns the number of deliveries
+        that changed.
+        """
+        changed = set()
+
+        addresses = []
+        for delivery in deliveries:
+            if delivery.pickup_point is None:
+                addresses.append(delivery.pickup_address)
+            if delivery.delivery_point is None:
+                addresses.append(delivery.delivery_address)
+        if addresses:
+            points = self.geocode_many(db, addresses)
+            for delivery in deliveries:
+                if delivery.pickup_point is None:
+                    point = points.get(delivery.pickup_address)
+                    if point:
+                        delivery.pickup_latitude, delivery.pickup_longitude = point
+                        changed.add(id(delivery))
+                if delivery.delivery_point is None:
+                    point = points.get(delivery.delivery_address)
+                    if point:
+                        delivery.delivery_latitude, delivery.delivery_longitude = point
+                        changed.add(id(delivery))
+
+        by_org: Dict[int, List[Delivery]] = defaultdict(list)
+        for delivery in deliveries:
+            if (
+                delivery.zone_id is None
+                and delivery.organization_id
+                and delivery.delivery_point is not None
+            ):
+                by_org[delivery.organization_id].append(delivery)
+        for organization_id, items in by_org.items():
+            zone_ids = zone_index_service.locate_many(
+                db, organization_id, [delivery.delivery_point for delivery in items]
+            )
+            for delivery, zone_id in zip(items, zone_ids):
+                if zone_id is not None:
+                    delivery.zone_id = zone_id
+                    changed.add(id(delivery))
+
+        return len(changed)
+
+    def clear_cache(self) -> None:
+        """Drop the in-process LRU (the cache table is kept)"""
+        with self._lock:
+            self._lru.clear()
+
+    def _from_lru(self, keys: Iterable[str]) -> Dict[str, Optional[Coordinates]]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+        return found
+
+    def _remember(self, results: Dict[str, Optional[Coordinates]]) -> None:
+        with self._lock:
+            for key, point in results.items():
+                self._lru[key] = point
+                self._lru.move_to_end(key)
+            while len(self._lru) > self.config.lru_size:
+                self._lru.popitem(last=False)
+
+    def _from_table(
+        self, db: Session, keys: List[str]
+    ) -> Tuple[Dict[str, Optional[Coordinates]], set]:
+        """Cached results, and keys whose stored miss is due for a retry"""
+        hashes = {_address_hash(key): key for key in keys}
+        retry_before = datetime.utcnow() - timedelta(hours=self.config.miss_retry_hours)
+        checked_at = func.coalesce(GeocodeCacheEntry.updated_at, GeocodeCacheEntry.created_at)
+
+        cached: Dict[str, Optional[Coordinates]] = {}
+        stale = set()
+        chunks = list(hashes)
+        for start in range(0, len(chunks), _QUERY_CHUNK):
+            rows = db.query(
+                GeocodeCacheEntry.address_hash,
+                GeocodeCacheEntry.latitude,
+                GeocodeCacheEntry.longitude,
+                or_(GeocodeCacheEntry.latitude.isnot(None), checked_at >= retry_before),
+            ).filter(GeocodeCacheEntry.address_hash.in_(chunks[start : start + _QUERY_CHUNK]))
+            for address_hash, lat, lng, fresh in rows:
+                key = hashes[address_hash]
+                if not fresh:
+                    stale.add(key)
+                elif lat is not None and lng is not None:
+                    cached[key] = (lat, lng)
+                else:
+                    cached[key] = None
+        return cached, stale
+
+    def _from_backend(self, keys: List[str]) -> Dict[str, Optional[Coordinates]]:
+        """Results for keys the backend answered; unanswered keys are left out"""
+        resolved: Dict[str, Optional[Coordinates]] = {}
+        batch_size = max(1, self.config.batch_size)
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start : start + batch_size]
+            try:
+                points = self.geocoder.geocode_batch(batch)
+            except GeocoderUnavailable as e:
+                logger.warning(f"Geocoding skipped for {len(keys) - start} addresses: {e}")
+                break
+            resolved.update(zip(batch, points))
+        if resolved:
+            logger.debug(
+                f"Geocoded {len(resolved)} addresses with {self.geocoder.name}: "
+                f"{sum(point is not None for point in resolved.values())} found"
+            )
+        return resolved
+
+    def _store(
+        self, db: Session, resolved: Dict[str, Optional[Coordinates]], stale: set
+    ) -> None:
+        """Write backend results to the cache table"""
+        provider = self.geocoder.name
+        new_entries = []
+        for key, point in resolved.items():
+            lat, lng = point if point else (None, None)
+            if key in stale:
+                db.query(GeocodeCacheEntry).filter(
+                    GeocodeCacheEntry.address_hash == _address_hash(key)
+                ).update(
+                    {"latitude": lat, "longitude": lng, "provider": provider},
+                    synchronize_session=False,
+                )
+            else:
+                new_entries.append(
+                    GeocodeCacheEntry(
+                        address_hash=_address_hash(key),
+                        normalized_address=key,
+                        latitude=lat,
+                        longitude=lng,
+                        provider=provider,
+                    )
+                )
+        if not new_entries:
+            return
+
+        try:
+            with db.begin_nested():
+                db.add_all(new_entries)
+        except IntegrityError:
+            # Another worker cached some of these addresses first; keep theirs
+            for entry in new_entries:
+                try:
+                    with db.begin_nested():
+                        db.add(GeocodeCacheEntry(
+                            address_hash=entry.address_hash,
+                            normalized_address=entry.normalized_address,
+                            latitude=entry.latitude,
+                            longitude=entry.longitude,
+                            provider=entry.provider,
+                        ))
+                except IntegrityError:
+                    pass
+
+
+geocoding_service = GeocodingService()
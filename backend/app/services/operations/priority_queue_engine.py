@@ -0,0 +1,669 @@
+"""
+Priority Queue Engine
+
+Order-statistic index over QUEUED priority queue entries, kept per
+organization and per (organization, zone).
+
+Entries are ordered by ``priority_sort_key`` (highest first, see
+``priority_scoring``), then ``queued_at`` and id (oldest first), the same
+order ``get_queued`` returns.
+Positions and counts are computed on read in O(log n) instead of rewriting
+``queue_position`` on every queued row whenever the queue changes:
+
+- ``IndexedSkipList`` is the in-process index (a skip list with link widths)
+- when Redis is available the index is mirrored in sorted sets so every worker
+  reads the same order: score = -priority_sort_key, member =
+  ``<queued_at ms>:<id>`` zero padded, so equal scores sort oldest first
+- the mirror is rebuilt from the database when its marker key is missing or
+  expires (``resync_interval_seconds``), which also heals writes that failed
+- ``ENTRIES_KEY`` remembers each entry's member and zone, so a rescored or
+  rezoned entry leaves its old sorted-set slots
+- without Redis the in-process index records the database generation it was
+  built from (count, max id and last update of the queued rows). At most every
+  ``local_check_interval_seconds`` a read compares it with the database; when
+  another worker changed the queue, only the rows queued or updated since are
+  re-read and applied, with a full rebuild if the count still disagrees
+
+Wait estimates divide the position by the dequeue rate measured over the
+trailing ``throughput_window_seconds``.
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache_manager
+from app.core.performance_config import PriorityQueueConfig, performance_config
+from app.models.operations.priority_queue import PriorityQueueEntry, QueueStatus
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "priority_queue:{}"
+ZONE_QUEUE_KEY = "priority_queue:{}:zone:{}"
+ZONES_KEY = "priority_queue:{}:zones"  # zone ids that have a zone index
+SYNCED_KEY = "priority_queue:{}:synced"
+ENTRIES_KEY = "priority_queue:{}:entries"  # entry id -> "<member>|<zone id>"
+DEQUEUED_KEY = "priority_queue:{}:dequeued"
+
+# (-priority_sort_key, queued_at epoch ms, entry id)
+QueueKey = Tuple[float, int, int]
+# (queued count, max queued id, last update of a queued entry)
+Generation = Tuple[int, Optional[int], Optional[datetime]]
+
+_MAX_LEVELS = 24  # enough for ~16M entries per index
+_REBUILD_CHUNK = 1000
+_MIN_THROUGHPUT_SPAN_SECONDS = 60
+# Delta reads go back this far before the last seen update, for transactions
+# that committed late with an earlier updated_at
+_DELTA_OVERLAP_SECONDS = 60
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _epoch_ms(value: Optional[datetime]) -> int:
+    if value is None:
+        return 0
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((value - _EPOCH).total_seconds() * 1000)
+
+
+def _negated(sort_key: Optional[float]) -> float:
+    # Entries without a key sort last, as with NULLS LAST in SQL
+    return -sort_key if sort_key is not None else math.inf
+
+
+def queue_key(entry: PriorityQueueEntry) -> QueueKey:
+    """Sort key of an entry (ascending key = served first)"""
+    return (_negated(entry.priority_sort_key), _epoch_ms(entry.queued_at), entry.id)
+
+
+def _member(key: QueueKey) -> str:
+    return f"{key[1]:015d}:{key[2]:012d}"
+
+
+def _slot(member: str, zone_id: Optional[int]) -> str:
+    return f"{member}|{'' if zone_id is None else zone_id}"
+
+
+def _parse_slot(value: Optional[str]) -> Tuple[Optional[str], Optional[int]]:
+    if not value:
+        return None, None
+    member, _, zone = value.partition("|")
+    return member, int(zone) if zone else None
+
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, levels: int):
+        self.key = key
+        self.next: List[Optional["_Node"]] = [None] * levels
+        self.width: List[int] = [1] * levels
+
+
+class IndexedSkipList:
+    """Sorted set of unique keys with O(log n) insert, remove and rank"""
+
+    def __init__(self, seed: Optional[int] = None):
+        self._head = _Node(None, _MAX_LEVELS)
+        self._size = 0
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator:
+        node = self._head.next[0]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+    def __contains__(self, key) -> bool:
+        return self.rank(key) is not None
+
+    def _random_level(self) -> int:
+        level = 1
+        while level < _MAX_LEVELS and self._random.random() < 0.5:
+            level += 1
+        return level
+
+    def insert(self, key) -> None:
+        """Insert a key (keys must be unique)"""
+        chain: List[_Node] = [self._head] * _MAX_LEVELS
+        steps_at_level = [0] * _MAX_LEVELS
+        node = self._head
+        for level in reversed(range(_MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        levels = self._random_level()
+        new = _Node(key, levels)
+        steps = 0
+        for level in range(levels):
+            prev = chain[level]
+            new.next[level] = prev.next[level]
+            prev.next[level] = new
+            new.width[level] = prev.width[level] - steps
+            prev.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(levels, _MAX_LEVELS):
+            chain[level].width[level] += 1
+        self._size += 1
+
+    def remove(self, key) -> None:
+        """Remove a key, raising KeyError if it is not present"""
+        chain: List[_Node] = [self._head] * _MAX_LEVELS
+        node = self._head
+        for level in reversed(range(_MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                node = node.next[level]
+            chain[level] = node
+
+        target = chain[0].next[0]
+        if target is None or target.key != key:
+            raise KeyError(key)
+        for level in range(len(target.next)):
+            prev = chain[level]
+            prev.width[level] += target.width[level] - 1
+            prev.next[level] = target.next[level]
+        for level in range(len(target.next), _MAX_LEVELS):
+            chain[level].width[level] -= 1
+        self._size -= 1
+
+    def bisect_left(self, key) -> int:
+        """Number of keys ordered before ``key``"""
+        position = 0
+        node = self._head
+        for level in reversed(range(_MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        return position
+
+    def rank(self, key) -> Optional[int]:
+        """0-based index of ``key``, or None if it is not present"""
+        position = 0
+        node = self._head
+        for level in reversed(range(_MAX_LEVELS)):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+        found = node.next[0]
+        if found is None or found.key != key:
+            return None
+        return position
+
+
+class _LocalQueue:
+    """In-process indexes for one organization"""
+
+    def __init__(self, generation: Optional[Generation] = None):
+        self.generation = generation
+        self.checked_at = time.monotonic()
+        self.all = IndexedSkipList()
+        self.zones: Dict[int, IndexedSkipList] = defaultdict(IndexedSkipList)
+        self.entries: Dict[int, Tuple[QueueKey, Optional[int]]] = {}
+
+    def add(self, key: QueueKey, zone_id: Optional[int]) -> None:
+        self.discard(key[2])
+        self.all.insert(key)
+        if zone_id is not None:
+            self.zones[zone_id].insert(key)
+        self.entries[key[2]] = (key, zone_id)
+
+    def discard(self, entry_id: int) -> None:
+        current = self.entries.pop(entry_id, None)
+        if current is None:
+            return
+        key, zone_id = current
+        self.all.remove(key)
+        if zone_id is not None:
+            self.zones[zone_id].remove(key)
+
+    def index(self, zone_id: Optional[int]) -> IndexedSkipList:
+        if zone_id is None:
+            return self.all
+        return self.zones.get(zone_id) or IndexedSkipList()
+
+
+class PriorityQueueEngine:
+    """Queue positions, counts and wait estimates for priority queue entries"""
+
+    def __init__(self, config: Optional[PriorityQueueConfig] = None, redis_client=None):
+        self.config = config or performance_config.priority_queue
+        self._redis_client = redis_client
+        self._lock = threading.RLock()
+        self._local: Dict[int, _LocalQueue] = {}
+        self._dequeues: Dict[int, Deque[float]] = defaultdict(deque)
+
+    @property
+    def redis(self):
+        if self._redis_client is not None:
+            return self._redis_client
+        if not self.config.use_redis:
+            return None
+        return cache_manager.redis_cache.client
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def sync(self, entry: PriorityQueueEntry) -> None:
+        """Reflect an entry's current status and score in the index
+
+        Call after the change is committed.
+        """
+        key = queue_key(entry)
+        if entry.status == QueueStatus.QUEUED:
+            self._add(entry.organization_id, key, entry.required_zone_id)
+        else:
+            self.remove(entry.organization_id, key, entry.required_zone_id)
+
+    def _add(self, organization_id: int, key: QueueKey, zone_id: Optional[int]) -> None:
+        with self._lock:
+            local = self._local.get(organization_id)
+            if local is not None:
+                local.add(key, zone_id)
+
+        client = self.redis
+        if client is None:
+            return
+        member = _member(key)
+        mapping = {member: key[0]}
+        try:
+            old_member, old_zone = _parse_slot(
+                client.hget(ENTRIES_KEY.format(organization_id), key[2])
+            )
+            pipe = client.pipeline(transaction=True)
+            if old_member is not None and old_member != member:
+                pipe.zrem(QUEUE_KEY.format(organization_id), old_member)
+            if old_zone is not None and (old_zone != zone_id or old_member != member):
+                pipe.zrem(ZONE_QUEUE_KEY.format(organization_id, old_zone), old_member)
+            pipe.zadd(QUEUE_KEY.format(organization_id), mapping)
+            if zone_id is not None:
+                pipe.zadd(ZONE_QUEUE_KEY.format(organization_id, zone_id), mapping)
+                pipe.sadd(ZONES_KEY.format(organization_id), zone_id)
+            pipe.hset(ENTRIES_KEY.format(organization_id), key[2], _slot(member, zone_id))
+            pipe.execute()
+        except Exception as e:
+            self._invalidate(client, organization_id, e)
+
+    def remove(self, organization_id: int, key: QueueKey, zone_id: Optional[int] = None) -> None:
+        """Drop an entry from the organization and zone indexes"""
+        with self._lock:
+            local = self._local.get(organization_id)
+            if local is not None:
+                local.discard(key[2])
+
+        client = self.redis
+        if client is None:
+            return
+        member = _member(key)
+        try:
+            old_member, old_zone = _parse_slot(
+                client.hget(ENTRIES_KEY.format(organization_id), key[2])
+            )
+            pipe = client.pipeline(transaction=True)
+            for zone, zone_member in {(zone_id, member), (old_zone, old_member)}:
+                if zone_member is None:
+                    continue
+                pipe.zrem(QUEUE_KEY.format(organization_id), zone_member)
+                if zone is not None:
+                    pipe.zrem(ZONE_QUEUE_KEY.format(organization_id, zone), zone_member)
+            pipe.hdel(ENTRIES_KEY.format(organization_id), key[2])
+            pipe.execute()
+        except Exception as e:
+            self._invalidate(client, organization_id, e)
+
+    def _invalidate(self, client, organization_id: int, error: Exception) -> None:
+        """Force a rebuild of the Redis mirror after a failed write"""
+        logger.warning(f"Priority queue index write failed for org {organization_id}: {error}")
+        try:
+            client.delete(SYNCED_KEY.format(organization_id))
+        except Exception:
+            pass
+
+    def _queued_keys(
+        self, db: Session, organization_id: int
+    ) -> List[Tuple[QueueKey, Optional[int]]]:
+        rows = (
+            db.query(
+                PriorityQueueEntry.id,
+                PriorityQueueEntry.priority_sort_key,
+                PriorityQueueEntry.queued_at,
+                PriorityQueueEntry.required_zone_id,
+            )
+            .filter(
+                PriorityQueueEntry.organization_id == organization_id,
+                PriorityQueueEntry.status == QueueStatus.QUEUED,
+            )
+            .all()
+        )
+        return [
+            ((_negated(sort_key), _epoch_ms(queued_at), entry_id), zone_id)
+            for entry_id, sort_key, queued_at, zone_id in rows
+        ]
+
+    def _generation(self, db: Session, organization_id: int) -> Generation:
+        """Database generation of an organization's queue
+
+        Changes whenever any worker queues, dequeues or updates a queued entry.
+        """
+        count, max_id, last_update = (
+            db.query(
+                func.count(PriorityQueueEntry.id),
+                func.max(PriorityQueueEntry.id),
+                func.max(PriorityQueueEntry.updated_at),
+            )
+            .filter(
+                PriorityQueueEntry.organization_id == organization_id,
+                PriorityQueueEntry.status == QueueStatus.QUEUED,
+            )
+            .one()
+        )
+        return count, max_id, last_update
+
+    def _build_local(
+        self, db: Session, organization_id: int, generation: Optional[Generation] = None
+    ) -> _LocalQueue:
+        # Read the generation first: a change made while loading the keys
+        # bumps it again and forces another rebuild on the next read
+        if generation is None:
+            generation = self._generation(db, organization_id)
+        local = _LocalQueue(generation)
+        for key, zone_id in self._queued_keys(db, organization_id):
+            local.add(key, zone_id)
+        with self._lock:
+            self._local[organization_id] = local
+        return local
+
+    def rebuild(self, db: Session, organization_id: int) -> int:
+        """Rebuild an organization's index (Redis mirror if available) from the database
+
+        Returns:
+            Number of queued entries indexed
+        """
+        client = self.redis
+        if client is None:
+            return len(self._build_local(db, organization_id).entries)
+
+        keyed = self._queued_keys(db, organization_id)
+        by_zone: Dict[int, Dict[str, float]] = defaultdict(dict)
+        members: Dict[str, float] = {}
+        slots: Dict[int, str] = {}
+        for key, zone_id in keyed:
+            member = _member(key)
+            members[member] = key[0]
+            slots[key[2]] = _slot(member, zone_id)
+            if zone_id is not None:
+                by_zone[zone_id][member] = key[0]
+
+        old_zones = client.smembers(ZONES_KEY.format(organization_id))
+        pipe = client.pipeline(transaction=True)
+        pipe.delete(
+            QUEUE_KEY.format(organization_id),
+            ZONES_KEY.format(organization_id),
+            ENTRIES_KEY.format(organization_id),
+            *[ZONE_QUEUE_KEY.format(organization_id, zone_id) for zone_id in old_zones],
+        )
+        for redis_key, mapping in [(QUEUE_KEY.format(organization_id), members)] + [
+            (ZONE_QUEUE_KEY.format(organization_id, zone_id), mapping)
+            for zone_id, mapping in by_zone.items()
+        ]:
+            items = list(mapping.items())
+            for start in range(0, len(items), _REBUILD_CHUNK):
+                pipe.zadd(redis_key, dict(items[start : start + _REBUILD_CHUNK]))
+        if by_zone:
+            pipe.sadd(ZONES_KEY.format(organization_id), *by_zone.keys())
+        slot_items = list(slots.items())
+        for start in range(0, len(slot_items), _REBUILD_CHUNK):
+            pipe.hset(
+                ENTRIES_KEY.format(organization_id),
+                mapping=dict(slot_items[start : start + _REBUILD_CHUNK]),
+            )
+        pipe.set(
+            SYNCED_KEY.format(organization_id),
+            int(time.time()),
+            ex=self.config.resync_interval_seconds,
+        )
+        pipe.execute()
+        return len(keyed)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _local_queue(self, db: Session, organization_id: int) -> _LocalQueue:
+        """The in-process index, brought up to date if the queue changed since"""
+        now = time.monotonic()
+        with self._lock:
+            local = self._local.get(organization_id)
+        if local is not None and now - local.checked_at < self.config.local_check_interval_seconds:
+            return local
+
+        generation = self._generation(db, organization_id)
+        if local is None or (
+            local.generation != generation
+            and not self._apply_changes(db, organization_id, local, generation)
+        ):
+            local = self._build_local(db, organization_id, generation)
+        local.checked_at = now
+        return local
+
+    def _apply_changes(
+        self, db: Session, organization_id: int, local: _LocalQueue, generation: Generation
+    ) -> bool:
+        """Apply rows queued or updated since the index's generation
+
+        Returns:
+            False when the index cannot be caught up and must be rebuilt
+        """
+        if local.generation is None or local.generation[2] is None:
+            return False
+        _, max_id, last_update = local.generation
+        changed = PriorityQueueEntry.updated_at >= last_update - timedelta(
+            seconds=_DELTA_OVERLAP_SECONDS
+        )
+        if max_id is not None:
+            changed = or_(
+                changed,
+                and_(
+                    PriorityQueueEntry.status == QueueStatus.QUEUED,
+                    PriorityQueueEntry.id > max_id,
+                ),
+            )
+        rows = (
+            db.query(
+                PriorityQueueEntry.id,
+                PriorityQueueEntry.status,
+                PriorityQueueEntry.priority_sort_key,
+                PriorityQueueEntry.queued_at,
+                PriorityQueueEntry.required_zone_id,
+            )
+            .filter(PriorityQueueEntry.organization_id == organization_id, changed)
+            .all()
+        )
+
+        with self._lock:
+            for entry_id, status, sort_key, queued_at, zone_id in rows:
+                if status == QueueStatus.QUEUED:
+                    local.add((_negated(sort_key), _epoch_ms(queued_at), entry_id), zone_id)
+                else:
+                    local.discard(entry_id)
+            # Deleted rows leave no trace to apply
+            if len(local.entries) != generation[0]:
+                return False
+            local.generation = generation
+        return True
+
+    def _read_redis(
+        self, db: Session, client, organization_id: int, commands: Callable
+    ) -> Optional[list]:
+        """Run read commands against the mirror, rebuilding it first if needed"""
+        try:
+            for _ in range(2):
+                pipe = client.pipeline(transaction=False)
+                pipe.exists(SYNCED_KEY.format(organization_id))
+                commands(pipe)
+                synced, *results = pipe.execute()
+                if synced:
+                    return results
+                self.rebuild(db, organization_id)
+            return results
+        except Exception as e:
+            logger.warning(f"Priority queue index read failed for org {organization_id}: {e}")
+            return None
+
+    @staticmethod
+    def _redis_key(organization_id: int, zone_id: Optional[int]) -> str:
+        if zone_id is None:
+            return QUEUE_KEY.format(organization_id)
+        return ZONE_QUEUE_KEY.format(organization_id, zone_id)
+
+    def positions(
+        self,
+        db: Session,
+        organization_id: int,
+        entries: Iterable[PriorityQueueEntry],
+        zone_id: Optional[int] = None,
+    ) -> Dict[int, int]:
+        """1-based queue positions by entry id (entries not queued are omitted)"""
+        keys = [queue_key(entry) for entry in entries if entry.status == QueueStatus.QUEUED]
+        if not keys:
+            return {}
+
+        client = self.redis
+        if client is not None:
+            redis_key = self._redis_key(organization_id, zone_id)
+
+            def commands(pipe):
+                for key in keys:
+                    pipe.zrank(redis_key, _member(key))
+
+            ranks = self._read_redis(db, client, organization_id, commands)
+            if ranks is not None:
+                return {key[2]: rank + 1 for key, rank in zip(keys, ranks) if rank is not None}
+
+        local = self._local_queue(db, organization_id)
+        with self._lock:
+            index = local.index(zone_id)
+            ranks = [index.rank(key) for key in keys]
+        return {key[2]: rank + 1 for key, rank in zip(keys, ranks) if rank is not None}
+
+    def position(
+        self, db: Session, entry: PriorityQueueEntry, zone_id: Optional[int] = None
+    ) -> Optional[int]:
+        """1-based queue position of an entry, or None if it is not queued"""
+        return self.positions(db, entry.organization_id, [entry], zone_id).get(entry.id)
+
+    def count(self, db: Session, organization_id: int, zone_id: Optional[int] = None) -> int:
+        """Number of queued entries for an organization (or one of its zones)"""
+        client = self.redis
+        if client is not None:
+            redis_key = self._redis_key(organization_id, zone_id)
+            results = self._read_redis(
+                db, client, organization_id, lambda pipe: pipe.zcard(redis_key)
+            )
+            if results is not None:
+                return int(results[0])
+
+        local = self._local_queue(db, organization_id)
+        with self._lock:
+            return len(local.index(zone_id))
+
+    # ------------------------------------------------------------------
+    # Throughput and wait estimates
+    # ------------------------------------------------------------------
+
+    def record_dequeue(
+        self, organization_id: int, count: int = 1, now: Optional[float] = None
+    ) -> None:
+        """Record entries leaving the queue for a courier"""
+        if count <= 0:
+            return
+        now = now if now is not None else time.time()
+        window = self.config.throughput_window_seconds
+
+        client = self.redis
+        if client is not None:
+            key = DEQUEUED_KEY.format(organization_id)
+            try:
+                pipe = client.pipeline(transaction=False)
+                pipe.zadd(key, {f"{now:.6f}:{uuid.uuid4().hex}": now for _ in range(count)})
+                pipe.zremrangebyscore(key, "-inf", now - window)
+                pipe.expire(key, window)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Failed to record priority queue dequeue: {e}")
+            return
+
+        with self._lock:
+            samples = self._dequeues[organization_id]
+            samples.extend([now] * count)
+            while samples and samples[0] < now - window:
+                samples.popleft()
+
+    def throughput_per_minute(
+        self, organization_id: int, now: Optional[float] = None
+    ) -> Optional[float]:
+        """Measured dequeues per minute, or None until enough were observed"""
+        now = now if now is not None else time.time()
+        since = now - self.config.throughput_window_seconds
+
+        client = self.redis
+        if client is not None:
+            key = DEQUEUED_KEY.format(organization_id)
+            try:
+                pipe = client.pipeline(transaction=False)
+                pipe.zcount(key, since, "+inf")
+                pipe.zrangebyscore(key, since, "+inf", start=0, num=1, withscores=True)
+                samples, oldest = pipe.execute()
+            except Exception as e:
+                logger.warning(f"Failed to read priority queue throughput: {e}")
+                return None
+            oldest_at = oldest[0][1] if oldest else now
+        else:
+            with self._lock:
+                window = [t for t in self._dequeues.get(organization_id, ()) if t >= since]
+            samples = len(window)
+            oldest_at = window[0] if window else now
+
+        if samples < self.config.min_throughput_samples:
+            return None
+        span = max(now - oldest_at, _MIN_THROUGHPUT_SPAN_SECONDS)
+        return samples / (span / 60)
+
+    def estimate_wait_minutes(
+        self, position: int, throughput_per_minute: Optional[float]
+    ) -> int:
+        """Minutes until an entry at ``position`` is dequeued"""
+        if not throughput_per_minute:
+            return int(round(position * self.config.default_minutes_per_entry))
+        return int(math.ceil(position / throughput_per_minute))
+
+    def estimate_waits(
+        self, organization_id: int, positions: Dict[int, int]
+    ) -> Dict[int, int]:
+        """Wait estimates for a {entry id: position} mapping"""
+        if not positions:
+            return {}
+        rate = self.throughput_per_minute(organization_id)
+        return {
+            entry_id: self.estimate_wait_minutes(position, rate)
+            for entry_id, position in positions.items()
+        }
+
+
+priority_queue_engine = PriorityQueueEngine()
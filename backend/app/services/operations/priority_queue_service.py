@@ -3,12 +3,19 @@ Priority Queue Service
 """
 
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.core.aggregation import Aggregation, cached_metrics
 from app.services.base import CRUDBase
+from app.services.operations.priority_queue_engine import (
+    PriorityQueueEngine,
+    priority_queue_engine,
+    queue_key,
+)
+from app.services.operations.priority_scoring import ScoringPolicy, policy_for_organization
 from app.models.operations.priority_queue import PriorityQueueEntry, QueuePriority, QueueStatus
 from app.schemas.operations.priority_queue import PriorityQueueEntryCreate, PriorityQueueEntryUpdate
 
@@ -16,6 +23,10 @@ from app.schemas.operations.priority_queue import PriorityQueueEntryCreate, Prio
 class PriorityQueueService(
     CRUDBase[PriorityQueueEntry, PriorityQueueEntryCreate, PriorityQueueEntryUpdate]
 ):
+    def __init__(self, model, engine: Optional[PriorityQueueEngine] = None):
+        super().__init__(model)
+        self.queue_engine = engine or priority_queue_engine
+
     def get_multi(
         self, db: Session, *, skip: int = 0, limit: int = 100, organization_id: int = None
     ) -> List[PriorityQueueEntry]:
@@ -52,18 +63,49 @@ class PriorityQueueService(
                 minutes=buffer_minutes
             )
 
-        db_obj = PriorityQueueEntry(
-            **obj_in_data, queue_number=queue_number, queued_at=datetime.utcnow()
+        # Time-invariant order key; the effective score ages without row rewrites
+        queued_at = datetime.utcnow()
+        policy = policy_for_organization(db, organization_id)
+        obj_in_data["priority_sort_key"] = policy.sort_key(
+            total_score, queued_at, obj_in_data["sla_deadline"]
         )
+
+        db_obj = PriorityQueueEntry(**obj_in_data, queue_number=queue_number, queued_at=queued_at)
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
 
-        # Update queue positions
-        self._recalculate_queue_positions(db, organization_id=organization_id)
+        # Index the new entry; other entries' positions are computed on read
+        self.queue_engine.sync(db_obj)
 
         return db_obj
 
+    def update(
+        self, db: Session, *, db_obj: PriorityQueueEntry, obj_in: PriorityQueueEntryUpdate | Dict[str, Any]
+    ) -> PriorityQueueEntry:
+        """Update entry, re-key it if its deadline changed, and re-index it"""
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump(exclude_unset=True)
+        if update_data.get("sla_deadline") or db_obj.priority_sort_key is None:
+            deadline = update_data.get("sla_deadline") or db_obj.sla_deadline
+            policy = policy_for_organization(db, db_obj.organization_id)
+            db_obj.priority_sort_key = policy.sort_key(
+                db_obj.total_priority_score, db_obj.queued_at, deadline
+            )
+            db_obj.warning_threshold = deadline - timedelta(minutes=db_obj.sla_buffer_minutes or 30)
+        entry = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        self.queue_engine.sync(entry)
+        return entry
+
+    def delete(self, db: Session, *, id: int) -> Optional[PriorityQueueEntry]:
+        """Delete entry and drop it from the queue index"""
+        entry = self.get(db, id=id)
+        if entry:
+            organization_id, key, zone_id = entry.organization_id, queue_key(entry), entry.required_zone_id
+            db.delete(entry)
+            db.commit()
+            self.queue_engine.remove(organization_id, key, zone_id)
+        return entry
+
     def get_by_number(
         self, db: Session, *, queue_number: str, organization_id: int = None
     ) -> Optional[PriorityQueueEntry]:
@@ -90,7 +132,7 @@ class PriorityQueueService(
         if organization_id:
             query = query.filter(PriorityQueueEntry.organization_id == organization_id)
         return query.order_by(
-            PriorityQueueEntry.total_priority_score.desc(), PriorityQueueEntry.queued_at.asc()
+            PriorityQueueEntry.priority_sort_key.desc(), PriorityQueueEntry.queued_at.asc()
         ).offset(skip).limit(limit).all()
 
     def get_by_priority(
@@ -103,7 +145,9 @@ class PriorityQueueService(
         )
         if organization_id:
             query = query.filter(PriorityQueueEntry.organization_id == organization_id)
-        return query.order_by(PriorityQueueEntry.total_priority_score.desc()).offset(skip).limit(limit).all()
+        return query.order_by(
+            PriorityQueueEntry.priority_sort_key.desc(), PriorityQueueEntry.queued_at.asc()
+        ).offset(skip).limit(limit).all()
 
     def get_urgent(self, db: Session, organization_id: int = None) -> List[PriorityQueueEntry]:
         """Get urgent and critical entries"""
@@ -113,7 +157,9 @@ class PriorityQueueService(
         )
         if organization_id:
             query = query.filter(PriorityQueueEntry.organization_id == organization_id)
-        return query.order_by(PriorityQueueEntry.total_priority_score.desc()).all()
+        return query.order_by(
+            PriorityQueueEntry.priority_sort_key.desc(), PriorityQueueEntry.queued_at.asc()
+        ).all()
 
     def get_at_risk(self, db: Session, organization_id: int = None) -> List[PriorityQueueEntry]:
         """Get entries at risk of SLA breach"""
@@ -136,7 +182,9 @@ class PriorityQueueService(
         )
         if organization_id:
             query = query.filter(PriorityQueueEntry.organization_id == organization_id)
-        return query.order_by(PriorityQueueEntry.total_priority_score.desc()).offset(skip).limit(limit).all()
+        return query.order_by(
+            PriorityQueueEntry.priority_sort_key.desc(), PriorityQueueEntry.queued_at.asc()
+        ).offset(skip).limit(limit).all()
 
     def get_escalated(self, db: Session, organization_id: int = None) -> List[PriorityQueueEntry]:
         """Get escalated entries"""
@@ -145,22 +193,73 @@ class PriorityQueueService(
             query = query.filter(PriorityQueueEntry.organization_id == organization_id)
         return query.order_by(PriorityQueueEntry.escalated_at.desc()).all()
 
+    def claim_next(
+        self, db: Session, *, organization_id: int, zone_id: int = None, limit: int = 1
+    ) -> List[PriorityQueueEntry]:
+        """Claim the highest-priority queued entries for processing
+
+        Rows locked by another worker are skipped (FOR UPDATE SKIP LOCKED), so
+        concurrent workers never claim the same entry or wait on each other.
+        """
+        query = db.query(PriorityQueueEntry).filter(
+            PriorityQueueEntry.organization_id == organization_id,
+            PriorityQueueEntry.status == QueueStatus.QUEUED,
+        )
+        if zone_id:
+            query = query.filter(PriorityQueueEntry.required_zone_id == zone_id)
+        entries = (
+            query.order_by(
+                PriorityQueueEntry.priority_sort_key.desc(),
+                PriorityQueueEntry.queued_at.asc(),
+                PriorityQueueEntry.id.asc(),
+            )
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not entries:
+            return []
+
+        now = datetime.utcnow()
+        for entry in entries:
+            entry.status = QueueStatus.PROCESSING
+            entry.processing_started_at = now
+        db.commit()
+
+        for entry in entries:
+            self.queue_engine.sync(entry)
+        self.queue_engine.record_dequeue(organization_id, count=len(entries))
+        return entries
+
+    def _get_for_update(self, db: Session, entry_id: int) -> Optional[PriorityQueueEntry]:
+        """Get entry with its row locked until commit"""
+        return (
+            db.query(PriorityQueueEntry)
+            .filter(PriorityQueueEntry.id == entry_id)
+            .with_for_update()
+            .first()
+        )
+
     def mark_as_processing(self, db: Session, *, entry_id: int) -> Optional[PriorityQueueEntry]:
         """Mark entry as being processed"""
-        entry = self.get(db, id=entry_id)
+        entry = self._get_for_update(db, entry_id)
         if entry and entry.status == QueueStatus.QUEUED:
             entry.status = QueueStatus.PROCESSING
             entry.processing_started_at = datetime.utcnow()
             db.add(entry)
             db.commit()
             db.refresh(entry)
-            self._recalculate_queue_positions(db)
+            self.queue_engine.sync(entry)
+            self.queue_engine.record_dequeue(entry.organization_id)
+        elif entry:
+            db.rollback()
         return entry
 
     def mark_as_assigned(self, db: Session, *, entry_id: int) -> Optional[PriorityQueueEntry]:
         """Mark entry as assigned to courier"""
-        entry = self.get(db, id=entry_id)
+        entry = self._get_for_update(db, entry_id)
         if entry and entry.status in [QueueStatus.QUEUED, QueueStatus.PROCESSING]:
+            was_queued = entry.status == QueueStatus.QUEUED
             entry.status = QueueStatus.ASSIGNED
             entry.assigned_at = datetime.utcnow()
             # Calculate time in queue
@@ -170,7 +269,11 @@ class PriorityQueueService(
             db.add(entry)
             db.commit()
             db.refresh(entry)
-            self._recalculate_queue_positions(db)
+            self.queue_engine.sync(entry)
+            if was_queued:
+                self.queue_engine.record_dequeue(entry.organization_id)
+        elif entry:
+            db.rollback()
         return entry
 
     def mark_as_completed(
@@ -189,12 +292,12 @@ class PriorityQueueService(
             db.add(entry)
             db.commit()
             db.refresh(entry)
-            self._recalculate_queue_positions(db)
+            self.queue_engine.sync(entry)
         return entry
 
     def mark_as_expired(self, db: Session, *, entry_id: int) -> Optional[PriorityQueueEntry]:
         """Mark entry as expired (missed SLA deadline while in queue)"""
-        entry = self.get(db, id=entry_id)
+        entry = self._get_for_update(db, entry_id)
         if entry and entry.status == QueueStatus.QUEUED:
             entry.status = QueueStatus.EXPIRED
             entry.expired_at = datetime.utcnow()
@@ -205,7 +308,9 @@ class PriorityQueueService(
             db.add(entry)
             db.commit()
             db.refresh(entry)
-            self._recalculate_queue_positions(db)
+            self.queue_engine.sync(entry)
+        elif entry:
+            db.rollback()
         return entry
 
     def escalate(
@@ -236,38 +341,152 @@ class PriorityQueueService(
         return entry
 
     def get_metrics(self, db: Session, organization_id: int = None) -> dict:
-        """Get queue metrics"""
-        query = db.query(PriorityQueueEntry)
+        """Queue metrics for an organization, computed in one aggregate query
+
+        Cached per organization for ``CacheConfig.metrics_ttl`` seconds.
+        """
+        return cached_metrics(
+            "priority_queue_metrics",
+            organization_id,
+            "all",
+            lambda: self._compute_metrics(db, organization_id),
+        )
+
+    def _compute_metrics(self, db: Session, organization_id: Optional[int]) -> dict:
+        entry = PriorityQueueEntry
+        agg = Aggregation(db, entry)
         if organization_id:
-            query = query.filter(PriorityQueueEntry.organization_id == organization_id)
+            agg.where(entry.organization_id == organization_id)
+        completed = entry.status == QueueStatus.COMPLETED
+        processing_seconds = agg.seconds_between(entry.assigned_at, entry.processing_started_at)
+        metrics = (
+            agg.count("total_entries")
+            .count_each("by_status", entry.status, QueueStatus)
+            .count_each("entries_by_priority", entry.priority, QueuePriority)
+            .avg("avg_wait", entry.time_in_queue_minutes)
+            .percentile("p50_wait", entry.time_in_queue_minutes, 0.5)
+            .percentile("p90_wait", entry.time_in_queue_minutes, 0.9)
+            .avg(
+                "avg_processing_seconds",
+                processing_seconds,
+                entry.processing_started_at.isnot(None),
+                entry.assigned_at.isnot(None),
+            )
+            .count("sla_measured", completed, entry.was_sla_met.isnot(None))
+            .count("sla_met", completed, entry.was_sla_met.is_(True))
+            .count("escalated", entry.is_escalated.is_(True))
+            .execute()
+        )
+
+        total = metrics["total_entries"]
+        by_status = metrics["by_status"]
 
-        total = query.count()
-        queued = query.filter(PriorityQueueEntry.status == QueueStatus.QUEUED).count()
-        processing = query.filter(PriorityQueueEntry.status == QueueStatus.PROCESSING).count()
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return round(value, 2) if value is not None else None
 
         return {
             "total_entries": total,
-            "queued": queued,
-            "processing": processing,
-            "urgent": len(self.get_urgent(db, organization_id)),
-            "at_risk": len(self.get_at_risk(db, organization_id)),
+            "queued_entries": by_status[QueueStatus.QUEUED.value],
+            "processing_entries": by_status[QueueStatus.PROCESSING.value],
+            "assigned_entries": by_status[QueueStatus.ASSIGNED.value],
+            "completed_entries": by_status[QueueStatus.COMPLETED.value],
+            "expired_entries": by_status[QueueStatus.EXPIRED.value],
+            "avg_wait_time_minutes": rounded(metrics["avg_wait"] or 0.0),
+            "p50_wait_time_minutes": rounded(metrics["p50_wait"]),
+            "p90_wait_time_minutes": rounded(metrics["p90_wait"]),
+            "avg_processing_time_minutes": rounded((metrics["avg_processing_seconds"] or 0.0) / 60),
+            "sla_compliance_rate": rounded(
+                metrics["sla_met"] / metrics["sla_measured"] * 100 if metrics["sla_measured"] else 0.0
+            ),
+            "escalation_rate": rounded(metrics["escalated"] / total * 100 if total else 0.0),
+            "entries_by_priority": {
+                priority: count for priority, count in metrics["entries_by_priority"].items() if count
+            },
         }
 
-    def _recalculate_queue_positions(self, db: Session, organization_id: int = None):
-        """Recalculate queue positions for all queued entries"""
-        query = db.query(PriorityQueueEntry).filter(PriorityQueueEntry.status == QueueStatus.QUEUED)
-        if organization_id:
-            query = query.filter(PriorityQueueEntry.organization_id == organization_id)
-        queued_entries = query.order_by(
-            PriorityQueueEntry.total_priority_score.desc(), PriorityQueueEntry.queued_at.asc()
-        ).all()
-
-        for position, entry in enumerate(queued_entries, start=1):
-            entry.queue_position = position
-            # Rough estimate of wait time based on position
-            entry.estimated_wait_time_minutes = position * 15  # 15 minutes per position
+    def get_queue_position(self, db: Session, *, entry: PriorityQueueEntry) -> dict:
+        """Current position, queue length and wait estimate for an entry"""
+        engine = self.queue_engine
+        position = engine.position(db, entry)
+        total = engine.count(db, entry.organization_id)
+        wait = 0
+        if position:
+            rate = engine.throughput_per_minute(entry.organization_id)
+            wait = engine.estimate_wait_minutes(position, rate)
+        return {
+            "current_position": position or 0,
+            "total_in_queue": total,
+            "estimated_wait_minutes": wait,
+        }
 
+    def rescore_organization(
+        self, db: Session, organization_id: int, policy: Optional[ScoringPolicy] = None
+    ) -> int:
+        """Recompute sort keys of an organization's queued entries in one batch
+
+        Needed only when the scoring policy changes; keys do not drift with time.
+
+        Returns:
+            Number of entries re-keyed
+        """
+        policy = policy or policy_for_organization(db, organization_id)
+        rows = (
+            db.query(
+                PriorityQueueEntry.id,
+                PriorityQueueEntry.total_priority_score,
+                PriorityQueueEntry.queued_at,
+                PriorityQueueEntry.sla_deadline,
+            )
+            .filter(
+                PriorityQueueEntry.organization_id == organization_id,
+                PriorityQueueEntry.status == QueueStatus.QUEUED,
+            )
+            .all()
+        )
+        if rows:
+            ids, statics, queued_ats, deadlines = zip(*rows)
+            keys = policy.sort_keys(statics, queued_ats, deadlines)
+            db.bulk_update_mappings(
+                PriorityQueueEntry,
+                [{"id": entry_id, "priority_sort_key": key} for entry_id, key in zip(ids, keys)],
+            )
         db.commit()
+        self.queue_engine.rebuild(db, organization_id)
+        return len(rows)
+
+    def current_scores(
+        self, db: Session, entries: List[PriorityQueueEntry], organization_id: int, now: datetime = None
+    ) -> Dict[int, float]:
+        """Effective (time-decayed) priority scores of queued entries, computed in batch"""
+        queued = [entry for entry in entries if entry.status == QueueStatus.QUEUED]
+        if not queued:
+            return {}
+        policy = policy_for_organization(db, organization_id)
+        scores = policy.scores(
+            [entry.total_priority_score for entry in queued],
+            [entry.queued_at for entry in queued],
+            [entry.sla_deadline for entry in queued],
+            now or datetime.utcnow(),
+        )
+        return {entry.id: round(score, 2) for entry, score in zip(queued, scores)}
+
+    def annotate_positions(
+        self, db: Session, entries: List[PriorityQueueEntry], organization_id: int
+    ) -> List[PriorityQueueEntry]:
+        """Fill queue position, wait estimate and current score for responses
+
+        Column values are set as committed state, so they are never written back.
+        """
+        if not entries:
+            return entries
+        positions = self.queue_engine.positions(db, organization_id, entries)
+        waits = self.queue_engine.estimate_waits(organization_id, positions)
+        scores = self.current_scores(db, entries, organization_id)
+        for entry in entries:
+            set_committed_value(entry, "queue_position", positions.get(entry.id))
+            set_committed_value(entry, "estimated_wait_time_minutes", waits.get(entry.id))
+            entry.effective_priority_score = scores.get(entry.id)
+        return entries
 
 
 priority_queue_service = PriorityQueueService(PriorityQueueEntry)
@@ -0,0 +1,260 @@
+"""
+Priority Scoring Policies
+
+Queued deliveries gain priority as they age and as their SLA deadline
+approaches. Rewriting every queued row as time passes would be O(n) per tick,
+so each policy is written as a monotone transform of a time-invariant key:
+
+    score(entry, now) = f(sort_key(entry), now)   with f increasing in the key
+
+Sorting by ``sort_key`` therefore gives the correct order at every instant.
+The key is stored once per row (``PriorityQueueEntry.priority_sort_key``) and
+only recomputed when the entry's inputs or the organization's policy change.
+Current scores are evaluated lazily, in batch, when they are displayed.
+
+Policies are pluggable: register a ``ScoringPolicy`` subclass with
+``register_scoring_policy`` and select it per organization with
+``Organization.settings["priority_scoring"] = {"policy": name, "params": {...}}``.
+"""
+
+import logging
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from sqlalchemy.orm import Session
+
+from app.core.performance_config import performance_config
+from app.models.tenant.organization import Organization
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_KEY = "priority_scoring"
+
+# Keeps exponential scores finite far past the deadline
+_MAX_EXPONENT = 1000.0
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _hours(value: datetime) -> float:
+    """Hours since the epoch (naive datetimes are UTC)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH).total_seconds() / 3600
+
+
+class _ScalarMath:
+    """Scalar stand-ins for the numpy functions the policies use"""
+
+    log2 = staticmethod(math.log2)
+    maximum = staticmethod(max)
+    minimum = staticmethod(min)
+
+    @staticmethod
+    def exp2(value: float) -> float:
+        return 2.0**value
+
+
+class ScoringPolicy:
+    """Priority as a function of static score, age and time to deadline
+
+    Subclasses implement ``_sort_key`` and ``_score`` once, using the array
+    namespace ``xp`` (numpy or scalar math) so the same formula serves single
+    entries and vectorized batches.
+    """
+
+    name: str = ""
+
+    def _sort_key(self, xp, static, queued_h, deadline_h):
+        raise NotImplementedError
+
+    def _score(self, xp, static, queued_h, deadline_h, now_h):
+        raise NotImplementedError
+
+    def params(self) -> Dict[str, float]:
+        return {}
+
+    def sort_key(self, static: float, queued_at: datetime, deadline: datetime) -> float:
+        """Time-invariant ordering key (higher = served first)"""
+        return float(self._sort_key(_ScalarMath, float(static), _hours(queued_at), _hours(deadline)))
+
+    def score_at(
+        self, static: float, queued_at: datetime, deadline: datetime, now: datetime
+    ) -> float:
+        """Effective priority score at ``now``"""
+        return float(
+            self._score(_ScalarMath, float(static), _hours(queued_at), _hours(deadline), _hours(now))
+        )
+
+    def sort_keys(
+        self, statics: Sequence[float], queued_ats: Sequence[datetime], deadlines: Sequence[datetime]
+    ) -> List[float]:
+        """Vectorized ``sort_key``"""
+        if not NUMPY_AVAILABLE:
+            return [self.sort_key(*args) for args in zip(statics, queued_ats, deadlines)]
+        keys = self._sort_key(
+            np,
+            np.asarray(statics, dtype=float),
+            np.fromiter((_hours(v) for v in queued_ats), dtype=float, count=len(queued_ats)),
+            np.fromiter((_hours(v) for v in deadlines), dtype=float, count=len(deadlines)),
+        )
+        return np.broadcast_to(keys, (len(statics),)).tolist()
+
+    def scores(
+        self,
+        statics: Sequence[float],
+        queued_ats: Sequence[datetime],
+        deadlines: Sequence[datetime],
+        now: datetime,
+    ) -> List[float]:
+        """Vectorized ``score_at``"""
+        if not NUMPY_AVAILABLE:
+            return [self.score_at(*args, now) for args in zip(statics, queued_ats, deadlines)]
+        scores = self._score(
+            np,
+            np.asarray(statics, dtype=float),
+            np.fromiter((_hours(v) for v in queued_ats), dtype=float, count=len(queued_ats)),
+            np.fromiter((_hours(v) for v in deadlines), dtype=float, count=len(deadlines)),
+            _hours(now),
+        )
+        return np.broadcast_to(scores, (len(statics),)).tolist()
+
+
+SCORING_POLICIES: Dict[str, Type[ScoringPolicy]] = {}
+
+
+def register_scoring_policy(cls: Type[ScoringPolicy]) -> Type[ScoringPolicy]:
+    """Class decorator making a policy selectable by name"""
+    SCORING_POLICIES[cls.name] = cls
+    return cls
+
+
+@register_scoring_policy
+class StaticPolicy(ScoringPolicy):
+    """Score fixed at enqueue time (no aging)"""
+
+    name = "static"
+
+    def _sort_key(self, xp, static, queued_h, deadline_h):
+        return static
+
+    def _score(self, xp, static, queued_h, deadline_h, now_h):
+        return static
+
+
+@register_scoring_policy
+class LinearAgingPolicy(ScoringPolicy):
+    """Score grows linearly with age and as the deadline approaches
+
+    score = static + age_weight * age_hours
+            + urgency_weight * (horizon_hours - hours_to_deadline)
+    """
+
+    name = "linear"
+
+    def __init__(
+        self,
+        age_weight_per_hour: float = 10.0,
+        urgency_weight_per_hour: float = 10.0,
+        horizon_hours: float = 24.0,
+    ):
+        if age_weight_per_hour < 0 or urgency_weight_per_hour < 0:
+            raise ValueError("Weights must not be negative")
+        self.age_weight = float(age_weight_per_hour)
+        self.urgency_weight = float(urgency_weight_per_hour)
+        self.horizon_hours = float(horizon_hours)
+
+    def params(self) -> Dict[str, float]:
+        return {
+            "age_weight_per_hour": self.age_weight,
+            "urgency_weight_per_hour": self.urgency_weight,
+            "horizon_hours": self.horizon_hours,
+        }
+
+    def _sort_key(self, xp, static, queued_h, deadline_h):
+        # score - (age_weight + urgency_weight) * now_hours, minus constants
+        return static - self.age_weight * queued_h - self.urgency_weight * deadline_h
+
+    def _score(self, xp, static, queued_h, deadline_h, now_h):
+        return (
+            static
+            + self.age_weight * (now_h - queued_h)
+            + self.urgency_weight * (self.horizon_hours - (deadline_h - now_h))
+        )
+
+
+@register_scoring_policy
+class ExponentialUrgencyPolicy(ScoringPolicy):
+    """Score doubles every half-life as the deadline nears and as the entry ages
+
+    score = static * 2 ** ((now - deadline) / deadline_half_life
+                           + age / age_half_life)
+    """
+
+    name = "exponential"
+
+    def __init__(self, deadline_half_life_minutes: float = 60.0, age_half_life_minutes: float = 240.0):
+        if deadline_half_life_minutes <= 0 or age_half_life_minutes <= 0:
+            raise ValueError("Half-lives must be positive")
+        self.deadline_half_life_h = float(deadline_half_life_minutes) / 60
+        self.age_half_life_h = float(age_half_life_minutes) / 60
+
+    def params(self) -> Dict[str, float]:
+        return {
+            "deadline_half_life_minutes": self.deadline_half_life_h * 60,
+            "age_half_life_minutes": self.age_half_life_h * 60,
+        }
+
+    def _sort_key(self, xp, static, queued_h, deadline_h):
+        # log2(score) - now_hours * (1/deadline_half_life + 1/age_half_life)
+        return (
+            xp.log2(xp.maximum(static, 1.0))
+            - deadline_h / self.deadline_half_life_h
+            - queued_h / self.age_half_life_h
+        )
+
+    def _score(self, xp, static, queued_h, deadline_h, now_h):
+        exponent = (now_h - deadline_h) / self.deadline_half_life_h + (
+            now_h - queued_h
+        ) / self.age_half_life_h
+        return xp.maximum(static, 1.0) * xp.exp2(xp.minimum(exponent, _MAX_EXPONENT))
+
+
+def build_policy(name: str, params: Optional[Dict[str, Any]] = None) -> ScoringPolicy:
+    """Instantiate a registered policy
+
+    Raises:
+        ValueError: Unknown policy or invalid parameters
+    """
+    cls = SCORING_POLICIES.get(name)
+    if cls is None:
+        raise ValueError(f"Unknown scoring policy '{name}'")
+    try:
+        return cls(**(params or {}))
+    except TypeError as e:
+        raise ValueError(f"Invalid parameters for scoring policy '{name}': {e}")
+
+
+def default_policy() -> ScoringPolicy:
+    return build_policy(performance_config.priority_queue.default_scoring_policy)
+
+
+def policy_for_organization(db: Session, organization_id: Optional[int]) -> ScoringPolicy:
+    """Scoring policy configured for an organization (default if unset or invalid)"""
+    org = db.get(Organization, organization_id) if organization_id else None
+    settings = ((org.settings or {}) if org else {}).get(SETTINGS_KEY)
+    if not settings:
+        return default_policy()
+    try:
+        return build_policy(settings.get("policy", ""), settings.get("params"))
+    except ValueError as e:
+        logger.warning(f"Invalid priority scoring settings for org {organization_id}: {e}")
+        return default_policy()
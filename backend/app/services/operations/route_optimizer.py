@@ -0,0 +1,559 @@
+"""
+Route Optimizer
+
+Vehicle routing with time windows and capacities (VRPTW) for delivery routes.
+
+- travel times and distances come from a ``TravelMatrix`` computed once per
+  call: great-circle distances at ``average_speed_kmh`` (``haversine_matrix``)
+  or a ``RoutingProvider`` distance matrix (``provider_matrix``)
+- routes are built by sequential cheapest insertion, then improved by local
+  search (2-opt and Or-opt within a route, relocate between routes) until no
+  move improves or ``time_budget_ms`` runs out
+- time windows, vehicle capacity and the maximum route duration are hard
+  constraints; stops no vehicle can serve are returned as unassigned rather
+  than scheduled late
+
+Insertion feasibility is checked in O(1) from each route's earliest and
+latest feasible service start times, and move costs from prefix sums, so a
+full schedule is only recomputed for moves that already lower the cost.
+
+Times are minutes after departure. Node 0 of a matrix is the depot. Without
+a start point routes begin at their first stop (travel from the depot is
+free), and unless ``return_to_depot`` is set they end at their last stop.
+"""
+
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from app.core.performance_config import RouteOptimizerConfig, performance_config
+from app.services.dispatch.geo import EARTH_RADIUS_KM
+from app.services.dispatch.routing import RoutingProvider
+from app.services.dispatch.types import Point
+
+logger = logging.getLogger(__name__)
+
+_EPS = 1e-9
+
+OBJECTIVES = ("time", "distance")
+
+
+@dataclass
+class RouteStop:
+    """A stop to visit. ``earliest``/``latest`` bound the service start time."""
+
+    key: Any
+    latitude: float
+    longitude: float
+    demand: float = 0.0
+    service_minutes: Optional[float] = None  # RouteOptimizerConfig.service_minutes when None
+    earliest: float = 0.0
+    latest: float = math.inf
+
+
+@dataclass
+class TravelMatrix:
+    """Travel between the depot (index 0) and the stops (1..n), as [from][to]"""
+
+    distances_km: List[List[float]]
+    durations_minutes: List[List[float]]
+
+
+@dataclass
+class PlannedRoute:
+    """One vehicle's stops in visiting order with their schedule"""
+
+    stops: List[RouteStop]
+    arrivals: List[float]  # service start per stop, minutes after departure
+    legs_km: List[float]  # distance from the previous stop (the depot for the first)
+    distance_km: float
+    duration_minutes: float  # departure until the last stop is done (or back at the depot)
+    load: float
+
+
+@dataclass
+class RoutePlan:
+    """Result of an optimization call"""
+
+    routes: List[PlannedRoute] = field(default_factory=list)
+    unassigned: List[RouteStop] = field(default_factory=list)
+    initial_cost: float = 0.0  # objective after construction
+    cost: float = 0.0  # objective after local search
+    moves: int = 0  # improving local search moves applied
+    elapsed_ms: float = 0.0
+
+    @property
+    def distance_km(self) -> float:
+        return sum(route.distance_km for route in self.routes)
+
+    @property
+    def duration_minutes(self) -> float:
+        return sum(route.duration_minutes for route in self.routes)
+
+
+def haversine_matrix(
+    points: Sequence[Tuple[float, float]], average_speed_kmh: float
+) -> TravelMatrix:
+    """Great-circle distances between (latitude, longitude) points and drive times"""
+    lats = [math.radians(lat) for lat, _ in points]
+    lngs = [math.radians(lng) for _, lng in points]
+    cos_lats = [math.cos(lat) for lat in lats]
+    size = len(points)
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+
+    distances = [[0.0] * size for _ in range(size)]
+    for i in range(size):
+        lat_i, lng_i, cos_i = lats[i], lngs[i], cos_lats[i]
+        row = distances[i]
+        for j in range(i + 1, size):
+            h = (
+                sin((lats[j] - lat_i) / 2) ** 2
+                + cos_i * cos_lats[j] * sin((lngs[j] - lng_i) / 2) ** 2
+            )
+            d = 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(h)))
+            row[j] = d
+            distances[j][i] = d
+
+    minutes_per_km = 60.0 / average_speed_kmh if average_speed_kmh > 0 else 0.0
+    durations = [[d * minutes_per_km for d in row] for row in distances]
+    return TravelMatrix(distances, durations)
+
+
+async def provider_matrix(
+    provider: RoutingProvider,
+    points: Sequence[Tuple[float, float]],
+    departure_time: datetime,
+) -> TravelMatrix:
+    """Road distances and traffic-aware durations between points from a routing provider"""
+    locations = [Point(lat=lat, lng=lng) for lat, lng in points]
+    result = await provider.get_travel_times(locations, locations, departure_time)
+    return TravelMatrix(result.distances_km, result.durations_minutes)
+
+
+class _Route:
+    """A route under construction: node sequence with its schedule and prefix costs"""
+
+    __slots__ = ("problem", "nodes", "starts", "latest", "load", "fwd", "bwd")
+
+    def __init__(self, problem: "_Problem", nodes: List[int], starts: List[float]):
+        self.problem = problem
+        self.set(nodes, starts)
+
+    def set(self, nodes: List[int], starts: List[float]) -> None:
+        problem = self.problem
+        cost = problem.C
+        self.nodes = nodes
+        self.starts = starts
+        self.latest = problem.latest_starts(nodes)
+        self.load = sum(problem.q[node] for node in nodes)
+        # fwd[k] / bwd[k]: cost of nodes[0..k] travelled forwards / backwards
+        fwd = [0.0]
+        bwd = [0.0]
+        for a, b in zip(nodes, nodes[1:]):
+            fwd.append(fwd[-1] + cost[a][b])
+            bwd.append(bwd[-1] + cost[b][a])
+        self.fwd = fwd
+        self.bwd = bwd
+
+    def cost(self) -> float:
+        if not self.nodes:
+            return 0.0
+        cost = self.problem.C
+        return cost[0][self.nodes[0]] + self.fwd[-1] + cost[self.nodes[-1]][0]
+
+
+class _Problem:
+    """Index-based VRPTW instance shared by construction and local search"""
+
+    def __init__(
+        self,
+        stops: Sequence[RouteStop],
+        matrix: TravelMatrix,
+        *,
+        open_start: bool,
+        return_to_depot: bool,
+        capacity: Optional[float],
+        max_route_minutes: Optional[float],
+        objective: str,
+        service_minutes: float,
+    ):
+        size = len(stops) + 1
+        self.stops = list(stops)
+        self.D = [list(row) for row in matrix.durations_minutes]
+        self.K = [list(row) for row in matrix.distances_km]
+        if open_start:
+            self.D[0] = [0.0] * size
+            self.K[0] = [0.0] * size
+        if not return_to_depot:
+            for i in range(size):
+                self.D[i][0] = 0.0
+                self.K[i][0] = 0.0
+        self.C = self.D if objective == "time" else self.K
+
+        self.horizon = max_route_minutes if max_route_minutes is not None else math.inf
+        self.capacity = capacity if capacity is not None else math.inf
+        self.early = [0.0] + [stop.earliest for stop in stops]
+        self.late = [self.horizon] + [stop.latest for stop in stops]
+        self.S = [0.0] + [
+            stop.service_minutes if stop.service_minutes is not None else service_minutes
+            for stop in stops
+        ]
+        self.q = [0.0] + [stop.demand for stop in stops]
+
+    # Scheduling
+
+    def schedule(self, nodes: List[int]) -> Optional[List[float]]:
+        """Service start times along a route, or None when it breaks a constraint"""
+        D, S, early, late = self.D, self.S, self.early, self.late
+        t = 0.0
+        prev = 0
+        starts = []
+        for node in nodes:
+            t += S[prev] + D[prev][node]
+            if t < early[node]:
+                t = early[node]
+            if t > late[node] + _EPS:
+                return None
+            starts.append(t)
+            prev = node
+        if t + S[prev] + D[prev][0] > self.horizon + _EPS:
+            return None
+        if sum(self.q[node] for node in nodes) > self.capacity + _EPS:
+            return None
+        return starts
+
+    def latest_starts(self, nodes: List[int]) -> List[float]:
+        """Latest service start per position that keeps the rest of the route feasible"""
+        D, S, late = self.D, self.S, self.late
+        latest = [0.0] * len(nodes)
+        next_latest = self.horizon
+        next_node = 0
+        for k in range(len(nodes) - 1, -1, -1):
+            node = nodes[k]
+            bound = next_latest - S[node] - D[node][next_node]
+            latest[k] = late[node] if late[node] < bound else bound
+            next_latest = latest[k]
+            next_node = node
+        return latest
+
+    def insertion_cost(self, route: _Route, u: int, k: int) -> Optional[float]:
+        """Cost of inserting ``u`` before position ``k`` of a route, or None if infeasible"""
+        D, S, early = self.D, self.S, self.early
+        nodes = route.nodes
+        if k:
+            prev = nodes[k - 1]
+            t = route.starts[k - 1] + S[prev] + D[prev][u]
+        else:
+            prev = 0
+            t = D[0][u]
+        if t < early[u]:
+            t = early[u]
+        if t > self.late[u] + _EPS:
+            return None
+        if k < len(nodes):
+            nxt = nodes[k]
+            t = t + S[u] + D[u][nxt]
+            if t < early[nxt]:
+                t = early[nxt]
+            if t > route.latest[k] + _EPS:
+                return None
+        else:
+            nxt = 0
+            if t + S[u] + D[u][0] > self.horizon + _EPS:
+                return None
+        C = self.C
+        return C[prev][u] + C[u][nxt] - C[prev][nxt]
+
+    # Construction
+
+    def construct(self, vehicles: Optional[int]) -> Tuple[List[_Route], List[int]]:
+        """Sequential cheapest insertion; opens a new route when nothing else fits"""
+        unassigned = []
+        unrouted = set()
+        for u in range(1, len(self.stops) + 1):
+            if self.schedule([u]) is None:
+                unassigned.append(u)
+            else:
+                unrouted.add(u)
+
+        routes: List[_Route] = []
+        limit = vehicles if vehicles is not None else len(unrouted)
+        q, capacity = self.q, self.capacity
+        while unrouted and len(routes) < limit:
+            # Seed with the most urgent stop, farthest first among equals
+            seed = min(unrouted, key=lambda u: (self.late[u], -self.C[0][u], u))
+            unrouted.discard(seed)
+            route = _Route(self, [seed], self.schedule([seed]))
+
+            while unrouted:
+                best = None
+                best_cost = math.inf
+                for u in unrouted:
+                    if route.load + q[u] > capacity + _EPS:
+                        continue
+                    for k in range(len(route.nodes) + 1):
+                        cost = self.insertion_cost(route, u, k)
+                        if cost is not None and cost < best_cost:
+                            best, best_cost = (u, k), cost
+                if best is None:
+                    break
+                u, k = best
+                unrouted.discard(u)
+                nodes = route.nodes[:k] + [u] + route.nodes[k:]
+                route.set(nodes, self.schedule(nodes))
+            routes.append(route)
+
+        return routes, sorted(unassigned + list(unrouted))
+
+    def insert_unassigned(self, routes: List[_Route], unassigned: List[int]) -> List[int]:
+        """Cheapest feasible insertion of leftover stops into existing routes"""
+        remaining = []
+        for u in unassigned:
+            best = None
+            best_cost = math.inf
+            for route in routes:
+                if route.load + self.q[u] > self.capacity + _EPS:
+                    continue
+                for k in range(len(route.nodes) + 1):
+                    cost = self.insertion_cost(route, u, k)
+                    if cost is not None and cost < best_cost:
+                        best, best_cost = (route, k), cost
+            if best is None:
+                remaining.append(u)
+                continue
+            route, k = best
+            nodes = route.nodes[:k] + [u] + route.nodes[k:]
+            route.set(nodes, self.schedule(nodes))
+        return remaining
+
+    # Local search
+
+    def improve(self, routes: List[_Route], deadline: float, max_segment: int) -> int:
+        """Apply improving moves until none is left or the deadline passes"""
+        moves = 0
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            for route in routes:
+                applied = self._two_opt(route, deadline) + self._or_opt(
+                    route, deadline, max_segment
+                )
+                if applied:
+                    moves += applied
+                    improved = True
+            if len(routes) > 1:
+                applied = self._relocate(routes, deadline)
+                if applied:
+                    moves += applied
+                    improved = True
+        return moves
+
+    def _two_opt(self, route: _Route, deadline: float) -> int:
+        """Reverse segments of a route"""
+        C = self.C
+        applied = 0
+        nodes = route.nodes
+        size = len(nodes)
+        for i in range(size - 1):
+            if time.perf_counter() > deadline:
+                break
+            for j in range(i + 1, size):
+                nodes, fwd, bwd = route.nodes, route.fwd, route.bwd
+                a = nodes[i - 1] if i else 0
+                b = nodes[j + 1] if j + 1 < size else 0
+                first, last = nodes[i], nodes[j]
+                delta = (
+                    C[a][last] + (bwd[j] - bwd[i]) + C[first][b]
+                    - C[a][first] - (fwd[j] - fwd[i]) - C[last][b]
+                )
+                if delta < -_EPS:
+                    candidate = nodes[:i] + nodes[i : j + 1][::-1] + nodes[j + 1 :]
+                    starts = self.schedule(candidate)
+                    if starts is not None:
+                        route.set(candidate, starts)
+                        applied += 1
+        return applied
+
+    def _or_opt(self, route: _Route, deadline: float, max_segment: int) -> int:
+        """Move blocks of up to ``max_segment`` consecutive stops within a route"""
+        C = self.C
+        applied = 0
+        for length in range(1, max_segment + 1):
+            i = 0
+            while i + length <= len(route.nodes):
+                if time.perf_counter() > deadline:
+                    return applied
+                nodes = route.nodes
+                segment = nodes[i : i + length]
+                head, tail = segment[0], segment[-1]
+                p = nodes[i - 1] if i else 0
+                n = nodes[i + length] if i + length < len(nodes) else 0
+                gain = C[p][head] + C[tail][n] - C[p][n]
+                rest = nodes[:i] + nodes[i + length :]
+
+                moved = False
+                for k in range(len(rest) + 1):
+                    if k == i:
+                        continue
+                    x = rest[k - 1] if k else 0
+                    y = rest[k] if k < len(rest) else 0
+                    if C[x][head] + C[tail][y] - C[x][y] - gain < -_EPS:
+                        candidate = rest[:k] + segment + rest[k:]
+                        starts = self.schedule(candidate)
+                        if starts is not None:
+                            route.set(candidate, starts)
+                            applied += 1
+                            moved = True
+                            break
+                if not moved:
+                    i += 1
+        return applied
+
+    def _relocate(self, routes: List[_Route], deadline: float) -> int:
+        """Move single stops to another route"""
+        C = self.C
+        applied = 0
+        for source in routes:
+            i = 0
+            while i < len(source.nodes):
+                if time.perf_counter() > deadline:
+                    return applied
+                nodes = source.nodes
+                u = nodes[i]
+                p = nodes[i - 1] if i else 0
+                n = nodes[i + 1] if i + 1 < len(nodes) else 0
+                gain = C[p][u] + C[u][n] - C[p][n]
+
+                best = None
+                best_delta = -_EPS
+                for target in routes:
+                    if target is source or target.load + self.q[u] > self.capacity + _EPS:
+                        continue
+                    for k in range(len(target.nodes) + 1):
+                        cost = self.insertion_cost(target, u, k)
+                        if cost is not None and cost - gain < best_delta:
+                            best, best_delta = (target, k), cost - gain
+
+                if best is not None:
+                    remaining = nodes[:i] + nodes[i + 1 :]
+                    starts = self.schedule(remaining)
+                    if starts is not None:
+                        target, k = best
+                        candidate = target.nodes[:k] + [u] + target.nodes[k:]
+                        target.set(candidate, self.schedule(candidate))
+                        source.set(remaining, starts)
+                        applied += 1
+                        continue
+                i += 1
+        return applied
+
+    # Output
+
+    def planned(self, route: _Route) -> PlannedRoute:
+        nodes = route.nodes
+        legs = []
+        prev = 0
+        for node in nodes:
+            legs.append(self.K[prev][node])
+            prev = node
+        last = nodes[-1]
+        return PlannedRoute(
+            stops=[self.stops[node - 1] for node in nodes],
+            arrivals=list(route.starts),
+            legs_km=legs,
+            distance_km=sum(legs) + self.K[last][0],
+            duration_minutes=route.starts[-1] + self.S[last] + self.D[last][0],
+            load=route.load,
+        )
+
+
+class RouteOptimizer:
+    """Builds delivery routes for one or more vehicles"""
+
+    def __init__(self, config: Optional[RouteOptimizerConfig] = None):
+        self.config = config or performance_config.route_optimizer
+
+    def solve(
+        self,
+        stops: Sequence[RouteStop],
+        start: Optional[Tuple[float, float]] = None,
+        *,
+        vehicles: Optional[int] = 1,
+        capacity: Optional[float] = None,
+        matrix: Optional[TravelMatrix] = None,
+        objective: str = "time",
+        return_to_depot: bool = False,
+        max_route_minutes: Optional[float] = None,
+        time_budget_ms: Optional[int] = None,
+    ) -> RoutePlan:
+        """
+        Route stops from ``start`` (latitude, longitude).
+
+        Args:
+            stops: Stops to visit
+            start: Depot; routes start at their first stop when None
+            vehicles: Maximum number of routes (None for as many as needed)
+            capacity: Maximum summed ``demand`` per route (None for unlimited)
+            matrix: Precomputed travel matrix (depot first, then ``stops``);
+                haversine at ``average_speed_kmh`` when None
+            objective: "time" (travel minutes) or "distance" (kilometers)
+            return_to_depot: Whether routes end back at ``start``
+            max_route_minutes: Latest time a route may end
+            time_budget_ms: Local search budget (config default when None)
+
+        Returns:
+            RoutePlan with the routes and any stops that could not be served
+        """
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective '{objective}', expected one of {OBJECTIVES}")
+        started = time.perf_counter()
+        if not stops:
+            return RoutePlan()
+
+        if matrix is None:
+            depot = start or (stops[0].latitude, stops[0].longitude)
+            points = [depot] + [(stop.latitude, stop.longitude) for stop in stops]
+            matrix = haversine_matrix(points, self.config.average_speed_kmh)
+        elif len(matrix.durations_minutes) != len(stops) + 1:
+            raise ValueError("Travel matrix must have one row for the depot and one per stop")
+
+        problem = _Problem(
+            stops,
+            matrix,
+            open_start=start is None,
+            return_to_depot=return_to_depot and start is not None,
+            capacity=capacity,
+            max_route_minutes=max_route_minutes,
+            objective=objective,
+            service_minutes=self.config.service_minutes,
+        )
+        budget_ms = time_budget_ms if time_budget_ms is not None else self.config.time_budget_ms
+        deadline = started + budget_ms / 1000.0
+
+        routes, unassigned = problem.construct(vehicles)
+        initial_cost = sum(route.cost() for route in routes)
+        moves = problem.improve(routes, deadline, self.config.or_opt_max_segment)
+        if unassigned and routes:
+            unassigned = problem.insert_unassigned(routes, unassigned)
+
+        routes = [route for route in routes if route.nodes]
+        plan = RoutePlan(
+            routes=[problem.planned(route) for route in routes],
+            unassigned=[stops[node - 1] for node in unassigned],
+            initial_cost=initial_cost,
+            cost=sum(route.cost() for route in routes),
+            moves=moves,
+            elapsed_ms=(time.perf_counter() - started) * 1000,
+        )
+        logger.debug(
+            f"Route optimizer: {len(stops)} stops, {len(plan.routes)} routes, "
+            f"{len(plan.unassigned)} unassigned, cost {initial_cost:.2f} -> {plan.cost:.2f} "
+            f"in {moves} moves, {plan.elapsed_ms:.0f}ms"
+        )
+        return plan
+
+
+route_optimizer = RouteOptimizer()
@@ -0,0 +1,452 @@
+"""
+SLA Deadline Scheduler
+
+Detects SLA breaches as their deadlines pass instead of scanning every table
+for overdue rows. Pending deadlines live in one Redis sorted set scored by
+epoch seconds, fed from the ORM on commit:
+
+    sla:deadlines   member "<kind>:<id>"   score = deadline
+
+A short-interval poller pops only the members that are due
+(``ZRANGEBYSCORE -inf now LIMIT``, O(log n + k)), claims them with ``ZREM`` so
+concurrent pollers never process the same deadline, re-checks the rows in the
+database and marks the breaches with one bulk UPDATE per kind. Notifications
+are grouped into one email per recipient per poll.
+
+Without Redis the poller reads the same due rows straight from the indexed
+deadline columns.
+"""
+
+import itertools
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache_manager
+from app.core.performance_config import SLAMonitorConfig, performance_config
+from app.models.fleet.courier import Courier
+from app.models.operations.priority_queue import PriorityQueueEntry, QueueStatus
+from app.models.operations.sla import SLAStatus, SLATracking
+from app.models.support.ticket import Ticket, TicketStatus
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+DEADLINES_KEY = "sla:deadlines"
+SYNCED_KEY = "sla:deadlines:synced"
+
+_SESSION_CHANGES_KEY = "sla_deadline_changes"
+_RESYNC_CHUNK = 1000
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _timestamp(value: datetime) -> float:
+    """Epoch seconds (naive datetimes are UTC)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH).total_seconds()
+
+
+class DeadlineKind:
+    """A model whose rows carry an SLA deadline
+
+    Subclasses name the deadline column, the statuses in which the deadline
+    still applies, the flag set once it has been breached, and how a breach is
+    recorded and reported.
+    """
+
+    name: str = ""
+    model: Any = None
+    deadline_attr: str = ""
+    status_attr: str = "status"
+    pending_statuses: Tuple[Any, ...] = ()
+    breached_attr: str = ""
+
+    @property
+    def deadline_column(self):
+        return getattr(self.model, self.deadline_attr)
+
+    def member(self, row_id: int) -> str:
+        return f"{self.name}:{row_id}"
+
+    def pending_filter(self):
+        return (
+            getattr(self.model, self.status_attr).in_(self.pending_statuses),
+            getattr(self.model, self.breached_attr).isnot(True),
+        )
+
+    def schedule_entry(self, state: Dict[str, Any]) -> Optional[Tuple[str, Optional[float]]]:
+        """(member, score) for a flushed row, score None to unschedule
+
+        ``state`` is the instance ``__dict__``; returns None when the relevant
+        attributes are not loaded and the row's schedule cannot be decided.
+        """
+        row_id = state.get("id")
+        if row_id is None:
+            return None
+        attrs = (self.deadline_attr, self.status_attr, self.breached_attr)
+        if any(attr not in state for attr in attrs):
+            return None
+        deadline = state[self.deadline_attr]
+        pending = state[self.status_attr] in self.pending_statuses and not state[self.breached_attr]
+        if not pending or deadline is None:
+            return self.member(row_id), None
+        return self.member(row_id), _timestamp(deadline)
+
+    def breach_values(self, now: datetime) -> Dict[str, Any]:
+        return {self.breached_attr: True}
+
+    def notifications(self, db: Session, ids: List[int]) -> List[Tuple[str, str]]:
+        """(recipient email, summary line) for each breached row with a recipient"""
+        return []
+
+
+class TicketDeadline(DeadlineKind):
+    """Support ticket resolution SLA (``Ticket.sla_due_at``)"""
+
+    name = "ticket"
+    model = Ticket
+    deadline_attr = "sla_due_at"
+    pending_statuses = (TicketStatus.OPEN, TicketStatus.IN_PROGRESS)
+    breached_attr = "sla_breached"
+
+    def notifications(self, db: Session, ids: List[int]) -> List[Tuple[str, str]]:
+        rows = (
+            db.query(User.email, Ticket.ticket_id, Ticket.subject, Ticket.sla_due_at)
+            .join(User, User.id == Ticket.assigned_to)
+            .filter(Ticket.id.in_(ids))
+            .all()
+        )
+        return [
+            (email, f"Ticket {ticket_id} ({subject}) was due {due_at}")
+            for email, ticket_id, subject, due_at in rows
+            if email
+        ]
+
+
+class DeliverySLADeadline(DeadlineKind):
+    """Delivery SLA target (``SLATracking.target_completion_time``)"""
+
+    name = "delivery_sla"
+    model = SLATracking
+    deadline_attr = "target_completion_time"
+    pending_statuses = (SLAStatus.ACTIVE, SLAStatus.AT_RISK)
+    breached_attr = "is_breached"
+
+    def breach_values(self, now: datetime) -> Dict[str, Any]:
+        return {
+            "status": SLAStatus.BREACHED,
+            "is_breached": True,
+            "breach_time": now,
+            "breach_reason": "Target completion time passed",
+        }
+
+    def notifications(self, db: Session, ids: List[int]) -> List[Tuple[str, str]]:
+        rows = (
+            db.query(Courier.email, SLATracking.tracking_number, SLATracking.target_completion_time)
+            .join(Courier, Courier.id == SLATracking.courier_id)
+            .filter(SLATracking.id.in_(ids))
+            .all()
+        )
+        return [
+            (email, f"Delivery {tracking_number} was due {target}")
+            for email, tracking_number, target in rows
+            if email
+        ]
+
+
+class QueueDeadline(DeadlineKind):
+    """Priority queue SLA deadline (``PriorityQueueEntry.sla_deadline``)
+
+    Entries still waiting or being dispatched at their deadline are escalated.
+    """
+
+    name = "queue"
+    model = PriorityQueueEntry
+    deadline_attr = "sla_deadline"
+    pending_statuses = (QueueStatus.QUEUED, QueueStatus.PROCESSING)
+    breached_attr = "is_escalated"
+
+    def breach_values(self, now: datetime) -> Dict[str, Any]:
+        return {
+            "is_escalated": True,
+            "escalated_at": now,
+            "escalation_reason": "SLA deadline passed while queued",
+        }
+
+
+DEADLINE_KINDS: Dict[str, DeadlineKind] = {
+    kind.name: kind for kind in (TicketDeadline(), DeliverySLADeadline(), QueueDeadline())
+}
+_KIND_BY_MODEL = {kind.model: kind for kind in DEADLINE_KINDS.values()}
+
+
+class SLADeadlineScheduler:
+    """Deadline index and breach poller for SLA-bearing rows"""
+
+    def __init__(self, config: Optional[SLAMonitorConfig] = None, redis_client=None):
+        self.config = config or performance_config.sla_monitor
+        self._redis_client = redis_client
+
+    @property
+    def redis(self):
+        if self._redis_client is not None:
+            return self._redis_client
+        if not self.config.use_redis:
+            return None
+        return cache_manager.redis_cache.client
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    def schedule(self, changes: Dict[str, Optional[float]]) -> None:
+        """Add (score) or remove (None) deadline members"""
+        client = self.redis
+        if client is None or not changes:
+            return
+        adds = {member: score for member, score in changes.items() if score is not None}
+        removes = [member for member, score in changes.items() if score is None]
+        try:
+            pipe = client.pipeline(transaction=False)
+            if adds:
+                pipe.zadd(DEADLINES_KEY, adds)
+            if removes:
+                pipe.zrem(DEADLINES_KEY, *removes)
+            pipe.execute()
+        except Exception as e:
+            # The periodic resync re-adds anything missed here
+            logger.warning(f"Failed to update SLA deadline index: {e}")
+
+    def resync(self, db: Session) -> int:
+        """Add every pending deadline from the database to the index
+
+        Additive, so deadlines scheduled concurrently are never lost; stale
+        members are dropped by the poller's database re-check.
+        """
+        client = self.redis
+        if client is None:
+            return 0
+        total = 0
+        for kind in DEADLINE_KINDS.values():
+            rows = iter(
+                db.query(kind.model.id, kind.deadline_column)
+                .filter(*kind.pending_filter(), kind.deadline_column.isnot(None))
+                .yield_per(_RESYNC_CHUNK)
+            )
+            while True:
+                chunk = list(itertools.islice(rows, _RESYNC_CHUNK))
+                if not chunk:
+                    break
+                client.zadd(
+                    DEADLINES_KEY,
+                    {kind.member(row_id): _timestamp(deadline) for row_id, deadline in chunk},
+                )
+                total += len(chunk)
+        client.set(SYNCED_KEY, str(time.time()), ex=self.config.resync_interval_seconds)
+        logger.info(f"SLA deadline index resynced: {total} pending deadlines")
+        return total
+
+    # ------------------------------------------------------------------
+    # Polling
+    # ------------------------------------------------------------------
+
+    def poll(self, db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Mark every deadline that has passed as breached and notify
+
+        Returns per-kind breach counts, emails sent and detection latency
+        (seconds between deadline and detection).
+        """
+        now = now or datetime.utcnow()
+        client = self.redis
+        if client is not None and not client.exists(SYNCED_KEY):
+            self.resync(db)
+
+        breached: Dict[str, int] = defaultdict(int)
+        latencies: List[float] = []
+        digests: Dict[str, List[str]] = defaultdict(list)
+        try:
+            for _ in range(self.config.max_batches_per_tick):
+                due = self._claim_due(db, now)
+                if not due:
+                    break
+                try:
+                    marked = self._mark_breached(db, due, now)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    self._release(due)
+                    raise
+
+                for kind_name, rows in marked.items():
+                    breached[kind_name] += len(rows)
+                    latencies.extend(_timestamp(now) - deadline for deadline in rows.values())
+                    for email, line in DEADLINE_KINDS[kind_name].notifications(db, list(rows)):
+                        digests[email].append(line)
+                if sum(len(rows) for rows in due.values()) < self.config.batch_size:
+                    break
+        finally:
+            # Committed breaches are reported even if a later batch fails
+            emails = self._notify(digests)
+
+        if latencies:
+            logger.warning(
+                f"SLA breaches detected: {dict(breached)}, "
+                f"max detection latency {max(latencies):.1f}s"
+            )
+        return {
+            "breached": dict(breached),
+            "notifications_sent": emails,
+            "max_latency_seconds": round(max(latencies), 3) if latencies else 0.0,
+            "avg_latency_seconds": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        }
+
+    def _claim_due(self, db: Session, now: datetime) -> Dict[str, Dict[int, float]]:
+        """Take up to batch_size due deadlines: {kind: {id: deadline}}"""
+        limit = self.config.batch_size
+        due: Dict[str, Dict[int, float]] = defaultdict(dict)
+        client = self.redis
+
+        if client is None:
+            for kind in DEADLINE_KINDS.values():
+                rows = (
+                    db.query(kind.model.id, kind.deadline_column)
+                    .filter(*kind.pending_filter(), kind.deadline_column <= now)
+                    .order_by(kind.deadline_column)
+                    .limit(limit)
+                    .all()
+                )
+                due[kind.name].update((row_id, _timestamp(d)) for row_id, d in rows)
+            return {name: rows for name, rows in due.items() if rows}
+
+        members = client.zrangebyscore(
+            DEADLINES_KEY, "-inf", _timestamp(now), start=0, num=limit, withscores=True
+        )
+        if not members:
+            return {}
+        # ZREM decides ownership: only the poller that removed a member handles it
+        pipe = client.pipeline(transaction=False)
+        for member, _ in members:
+            pipe.zrem(DEADLINES_KEY, member)
+        for (member, score), removed in zip(members, pipe.execute()):
+            kind_name, _, row_id = member.partition(":")
+            if removed and kind_name in DEADLINE_KINDS:
+                due[kind_name][int(row_id)] = score
+        return dict(due)
+
+    def _release(self, due: Dict[str, Dict[int, float]]) -> None:
+        """Return claimed deadlines to the index after a failed poll"""
+        self.schedule(
+            {
+                DEADLINE_KINDS[name].member(row_id): score
+                for name, rows in due.items()
+                for row_id, score in rows.items()
+            }
+        )
+
+    def _mark_breached(
+        self, db: Session, due: Dict[str, Dict[int, float]], now: datetime
+    ) -> Dict[str, Dict[int, float]]:
+        """Bulk-mark rows still pending and past due; reschedule moved deadlines"""
+        now_ts = _timestamp(now)
+        marked: Dict[str, Dict[int, float]] = {}
+        moved: Dict[str, Optional[float]] = {}
+        for name, rows in due.items():
+            kind = DEADLINE_KINDS[name]
+            current = (
+                db.query(kind.model.id, kind.deadline_column)
+                .filter(kind.model.id.in_(list(rows)), *kind.pending_filter())
+                .with_for_update()
+                .all()
+            )
+            breached_ids = []
+            for row_id, deadline in current:
+                if deadline is None:
+                    continue
+                if _timestamp(deadline) <= now_ts:
+                    breached_ids.append(row_id)
+                else:
+                    moved[kind.member(row_id)] = _timestamp(deadline)
+            if not breached_ids:
+                continue
+            db.query(kind.model).filter(kind.model.id.in_(breached_ids)).update(
+                kind.breach_values(now), synchronize_session=False
+            )
+            marked[name] = {row_id: rows[row_id] for row_id in breached_ids}
+        self.schedule(moved)
+        return marked
+
+    def _notify(self, digests: Dict[str, List[str]]) -> int:
+        """Send one digest email per recipient"""
+        if not digests:
+            return 0
+
+        from app.workers.tasks import send_email_task
+
+        for email, lines in digests.items():
+            send_email_task.delay(
+                recipient=email,
+                subject=f"SLA breach: {len(lines)} item(s) past deadline",
+                body="The following items have breached their SLA:\n\n"
+                + "\n".join(f"- {line}" for line in sorted(lines)),
+            )
+        return len(digests)
+
+
+# ----------------------------------------------------------------------
+# Session events: keep the index in step with committed rows
+# ----------------------------------------------------------------------
+
+
+def _track_deadlines(session: Session, flush_context: Any) -> None:
+    """after_flush: remember deadline changes made in this transaction"""
+    changes: Optional[Dict[str, Optional[float]]] = None
+    for deleted, objects in ((False, session.new), (False, session.dirty), (True, session.deleted)):
+        for obj in objects:
+            kind = _KIND_BY_MODEL.get(type(obj))
+            if kind is None:
+                continue
+            # Read loaded state only; attribute access could emit SQL mid-flush
+            state = obj.__dict__
+            if deleted:
+                entry = (kind.member(state["id"]), None) if state.get("id") is not None else None
+            else:
+                entry = kind.schedule_entry(state)
+            if entry is None:
+                continue
+            if changes is None:
+                changes = session.info.setdefault(_SESSION_CHANGES_KEY, {})
+            changes[entry[0]] = entry[1]
+
+
+def _publish_deadlines(session: Session) -> None:
+    """after_commit: apply the transaction's deadline changes to the index"""
+    changes = session.info.pop(_SESSION_CHANGES_KEY, None)
+    if changes:
+        sla_deadline_scheduler.schedule(changes)
+
+
+def _discard_deadlines(session: Session) -> None:
+    session.info.pop(_SESSION_CHANGES_KEY, None)
+
+
+def register_deadline_events() -> None:
+    """Install the session listeners that feed the deadline index (idempotent)"""
+    for name, listener in (
+        ("after_flush", _track_deadlines),
+        ("after_commit", _publish_deadlines),
+        ("after_rollback", _discard_deadlines),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+# Singleton instance
+sla_deadline_scheduler = SLADeadlineScheduler()
+register_deadline_events()
@@ -6,6 +6,7 @@ from typing import Any, Dict, List, Optional
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from app.core.aggregation import Aggregation, cached_metrics
 from app.models.operations.sla import SLADefinition, SLAStatus, SLATracking, SLAType
 from app.schemas.operations.sla import (
     SLADefinitionCreate,
@@ -253,6 +254,80 @@ class SLATrackingService(CRUDBase[SLATracking, SLATrackingCreate, SLATrackingUpd
             db.refresh(tracking)
         return tracking
 
+    def get_compliance_report(
+        self,
+        db: Session,
+        *,
+        organization_id: int,
+        start_date: datetime,
+        period: str,
+        sla_type: Optional[SLAType] = None,
+    ) -> Dict[str, Any]:
+        """Compliance counts, variance and penalties since ``start_date``
+
+        One aggregate query plus one grouped query for breach reasons; cached
+        per (organization, period, SLA type).
+        """
+        return cached_metrics(
+            "sla_compliance_report",
+            organization_id,
+            f"{period}:{sla_type.value if sla_type else 'all'}",
+            lambda: self._compute_compliance_report(db, organization_id, start_date, sla_type),
+        )
+
+    def _compute_compliance_report(
+        self,
+        db: Session,
+        organization_id: int,
+        start_date: datetime,
+        sla_type: Optional[SLAType],
+    ) -> Dict[str, Any]:
+        tracking = SLATracking
+        scope = [tracking.organization_id == organization_id, tracking.start_time >= start_date]
+        if sla_type:
+            scope.append(SLADefinition.sla_type == sla_type)
+
+        agg = Aggregation(db, tracking, *scope)
+        if sla_type:
+            agg.join(SLADefinition, SLADefinition.id == tracking.sla_definition_id)
+        met = tracking.status == SLAStatus.MET
+        variance = (tracking.actual_value - tracking.target_value) * 100.0 / tracking.target_value
+        metrics = (
+            agg.count("total_tracked")
+            .count("total_met", met)
+            .count("total_breached", tracking.is_breached.is_(True))
+            .count("total_at_risk", tracking.status == SLAStatus.AT_RISK)
+            .avg("avg_variance", variance, met, tracking.actual_value != 0, tracking.target_value != 0)
+            .sum("total_penalties", tracking.penalty_applied)
+            .execute()
+        )
+
+        reasons_query = db.query(tracking.breach_reason, func.count(tracking.id)).filter(
+            *scope, tracking.is_breached.is_(True), tracking.breach_reason.isnot(None)
+        )
+        if sla_type:
+            reasons_query = reasons_query.join(
+                SLADefinition, SLADefinition.id == tracking.sla_definition_id
+            )
+        reasons = (
+            reasons_query.group_by(tracking.breach_reason)
+            .order_by(func.count(tracking.id).desc())
+            .limit(5)
+            .all()
+        )
+
+        total = metrics["total_tracked"]
+        return {
+            "total_tracked": total,
+            "total_met": metrics["total_met"],
+            "total_breached": metrics["total_breached"],
+            "total_at_risk": metrics["total_at_risk"],
+            "compliance_rate": metrics["total_met"] / total * 100 if total else 0.0,
+            "avg_variance_percentage": metrics["avg_variance"] or 0.0,
+            "total_penalties": metrics["total_penalties"] or 0.0,
+            "top_breach_reasons": [{"reason": reason, "count": count} for reason, count in reasons],
+        }
+
 
 sla_definition_service = SLADefinitionService(SLADefinition)
 sla_tracking_service = SLATrackingService(SLATracking)
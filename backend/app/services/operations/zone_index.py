@@ -0,0 +1,461 @@
+"""
+Zone Index
+
+Answers "which zone is this point in" for an organization's delivery zones
+without looping over the zones for every point.
+
+Zone ``boundaries`` (GeoJSON Polygon, MultiPolygon, Feature or
+FeatureCollection with ``[longitude, latitude]`` positions) are compiled once
+per organization into a uniform grid:
+- each cell lists the zones overlapping it, marked either as covering the
+  whole cell or as having an edge inside it
+- each zone keeps its edges bucketed by grid row, so the exact
+  point-in-polygon test (even-odd ray casting, holes and multi-polygons
+  included) only looks at the few edges in the point's row
+
+A lookup is one cell hash, plus a ray cast over a handful of edges when the
+point falls in a border cell. Overlapping zones resolve to the smallest one.
+Inactive zones and zones without boundaries are not indexed.
+
+Indexes are cached per process. Zone writes through ZoneService refresh the
+local index right away; other workers compare their zones against the table
+every ``revalidate_seconds`` and recompile only zones that changed.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.performance_config import ZoneIndexConfig, performance_config
+from app.models.operations.zone import Zone, ZoneStatus
+
+logger = logging.getLogger(__name__)
+
+Ring = List[Tuple[float, float]]
+
+# Cells are counted from (-180, -90) so cell coordinates of valid points are never negative
+_LNG_OFFSET = 180.0
+_LAT_OFFSET = 90.0
+
+
+def boundary_polygons(boundaries: Optional[Dict[str, Any]]) -> List[List[Ring]]:
+    """
+    Polygons of a GeoJSON zone boundary as lists of (lng, lat) rings.
+
+    The first ring of each polygon is its exterior, the others are holes.
+    Types that cannot enclose a point are ignored.
+    """
+    if not boundaries:
+        return []
+
+    geojson_type = boundaries.get("type")
+    if geojson_type == "Feature":
+        return boundary_polygons(boundaries.get("geometry"))
+    if geojson_type == "FeatureCollection":
+        return [
+            polygon
+            for feature in boundaries.get("features", [])
+            for polygon in boundary_polygons(feature)
+        ]
+
+    coordinates = boundaries.get("coordinates") or []
+    if geojson_type == "Polygon":
+        polygons = [coordinates]
+    elif geojson_type == "MultiPolygon":
+        polygons = coordinates
+    else:
+        return []
+
+    result = []
+    for polygon in polygons:
+        rings = [
+            [(float(position[0]), float(position[1])) for position in ring]
+            for ring in polygon
+            if len(ring) >= 3
+        ]
+        if rings:
+            result.append(rings)
+    return result
+
+
+def _ring_area(ring: Ring) -> float:
+    """Planar shoelace area of a ring in square degrees"""
+    total = 0.0
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        total += x1 * y2 - x2 * y1
+    return abs(total) / 2.0
+
+
+class CompiledZone:
+    """A zone's boundary prepared for point-in-polygon tests"""
+
+    __slots__ = ("zone_id", "boundaries", "area", "bbox", "segments", "bands", "cells")
+
+    def __init__(self, zone_id: int, boundaries: Dict[str, Any], polygons: List[List[Ring]]):
+        self.zone_id = zone_id
+        self.boundaries = boundaries
+        self.segments: List[Tuple[float, float, float, float]] = []
+
+        area = 0.0
+        xs: List[float] = []
+        ys: List[float] = []
+        for rings in polygons:
+            for i, ring in enumerate(rings):
+                ring_area = _ring_area(ring)
+                area += ring_area if i == 0 else -ring_area
+                for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+                    if (x1, y1) != (x2, y2):
+                        self.segments.append((x1, y1, x2, y2))
+                xs.extend(x for x, _ in ring)
+                ys.extend(y for _, y in ring)
+
+        self.area = area
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+        # Grid row -> (y1, y2, x1, dx/dy) of the non-horizontal edges spanning it
+        self.bands: Dict[int, Tuple[Tuple[float, float, float, float], ...]] = {}
+        # Grid cells this zone was inserted into
+        self.cells: List[Tuple[int, int]] = []
+
+    @property
+    def size(self) -> float:
+        """Longest side of the bounding box in degrees"""
+        return max(self.bbox[2] - self.bbox[0], self.bbox[3] - self.bbox[1])
+
+    def copy(self) -> "CompiledZone":
+        """Shallow copy sharing the parsed geometry, to be re-banded for another grid"""
+        clone = CompiledZone.__new__(CompiledZone)
+        for name in self.__slots__:
+            setattr(clone, name, getattr(self, name))
+        return clone
+
+    def contains(self, lng: float, lat: float, row: int) -> bool:
+        """Even-odd ray cast against the edges in the point's grid row"""
+        inside = False
+        for y1, y2, x1, slope in self.bands.get(row, ()):
+            if (y1 > lat) != (y2 > lat) and lng < x1 + (lat - y1) * slope:
+                inside = not inside
+        return inside
+
+
+def compile_zone(zone_id: int, boundaries: Optional[Dict[str, Any]]) -> Optional[CompiledZone]:
+    """Compile a zone's boundaries, or None when they enclose nothing"""
+    try:
+        polygons = boundary_polygons(boundaries)
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError) as e:
+        logger.warning(f"Zone {zone_id} has malformed boundaries, not indexed: {e}")
+        return None
+    if not polygons:
+        return None
+    return CompiledZone(zone_id, boundaries, polygons)
+
+
+def _precedence(entry: Tuple[CompiledZone, bool]) -> Tuple[float, int]:
+    return entry[0].area, entry[0].zone_id
+
+
+class ZoneGeometryIndex:
+    """
+    Grid index over one organization's compiled zones.
+
+    The cell size is picked at build time from the median zone size. Zones
+    added later are inserted into the existing grid unless they would span
+    more than ``max_grid_dim`` cells, which triggers a rebuild.
+    """
+
+    def __init__(
+        self, zones: Iterable[CompiledZone] = (), config: Optional[ZoneIndexConfig] = None
+    ):
+        self.config = config or performance_config.zone_index
+        self._zones: Dict[int, CompiledZone] = {zone.zone_id: zone for zone in zones}
+        # (1 / cell size, cell -> zones) swapped as one tuple so concurrent
+        # lookups never pair a new cell size with old cells
+        self._grid: Tuple[float, Dict[Tuple[int, int], List[Tuple[CompiledZone, bool]]]]
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self._zones)
+
+    def __contains__(self, zone_id: int) -> bool:
+        return zone_id in self._zones
+
+    @property
+    def cell_size(self) -> float:
+        """Grid cell side in degrees"""
+        return 1.0 / self._grid[0]
+
+    def get(self, zone_id: int) -> Optional[CompiledZone]:
+        return self._zones.get(zone_id)
+
+    def _build(self) -> None:
+        sizes = sorted(zone.size for zone in self._zones.values())
+        if sizes:
+            cell = max(
+                sizes[len(sizes) // 2] / self.config.cells_per_zone,
+                sizes[-1] / self.config.max_grid_dim,
+                1e-9,
+            )
+        else:
+            cell = 1.0
+        inv = 1.0 / cell
+
+        # Band copies of the zones for the new grid: lookups still running on
+        # the old grid keep reading the old zones' bands, and the new bands
+        # become visible together with the new cells in the one swap below
+        zones = {zone_id: zone.copy() for zone_id, zone in self._zones.items()}
+        cells: Dict[Tuple[int, int], List[Tuple[CompiledZone, bool]]] = {}
+        for zone in zones.values():
+            self._insert(zone, cells, inv, sort=False)
+        for entries in cells.values():
+            entries.sort(key=_precedence)
+        self._zones = zones
+        self._grid = (inv, cells)
+
+    def upsert(self, zone: CompiledZone) -> None:
+        """Add a zone, replacing any previous geometry with the same id"""
+        self.remove(zone.zone_id)
+        self._zones[zone.zone_id] = zone
+        inv, cells = self._grid
+        if zone.size * inv > self.config.max_grid_dim:
+            self._build()
+        else:
+            self._insert(zone, cells, inv, sort=True)
+
+    def remove(self, zone_id: int) -> None:
+        """Drop a zone from the index (no-op when it is not indexed)"""
+        zone = self._zones.pop(zone_id, None)
+        if zone is None:
+            return
+        cells = self._grid[1]
+        for key in zone.cells:
+            entries = [entry for entry in cells.get(key, ()) if entry[0] is not zone]
+            if entries:
+                cells[key] = entries
+            else:
+                cells.pop(key, None)
+        zone.cells = []
+
+    def _insert(
+        self,
+        zone: CompiledZone,
+        grid_cells: Dict[Tuple[int, int], List[Tuple[CompiledZone, bool]]],
+        inv: float,
+        sort: bool,
+    ) -> None:
+        eps = 1e-6 / inv
+
+        bands: Dict[int, list] = {}
+        border = set()
+        for x1, y1, x2, y2 in zone.segments:
+            if y1 != y2:
+                entry = (y1, y2, x1, (x2 - x1) / (y2 - y1))
+                first_row = int((min(y1, y2) + _LAT_OFFSET) * inv)
+                last_row = int((max(y1, y2) + _LAT_OFFSET) * inv)
+                for row in range(first_row, last_row + 1):
+                    bands.setdefault(row, []).append(entry)
+
+            # Split the edge into pieces shorter than a cell and mark the cells
+            # around each piece, so no cell the edge passes through is missed
+            steps = int(max(abs(x2 - x1), abs(y2 - y1)) * inv) + 1
+            for i in range(steps):
+                ax, ay = x1 + (x2 - x1) * i / steps, y1 + (y2 - y1) * i / steps
+                bx, by = x1 + (x2 - x1) * (i + 1) / steps, y1 + (y2 - y1) * (i + 1) / steps
+                for col in range(
+                    int((min(ax, bx) - eps + _LNG_OFFSET) * inv),
+                    int((max(ax, bx) + eps + _LNG_OFFSET) * inv) + 1,
+                ):
+                    for row in range(
+                        int((min(ay, by) - eps + _LAT_OFFSET) * inv),
+                        int((max(ay, by) + eps + _LAT_OFFSET) * inv) + 1,
+                    ):
+                        border.add((col, row))
+        zone.bands = {row: tuple(edges) for row, edges in bands.items()}
+
+        # Cells without an edge are entirely inside or outside the zone, and
+        # keep the state of their left neighbour until a border cell is crossed
+        min_x, min_y, max_x, max_y = zone.bbox
+        cells = []
+        cell = 1.0 / inv
+        first_col = int((min_x + _LNG_OFFSET) * inv)
+        last_col = int((max_x + _LNG_OFFSET) * inv)
+        for row in range(int((min_y + _LAT_OFFSET) * inv), int((max_y + _LAT_OFFSET) * inv) + 1):
+            center_y = (row + 0.5) * cell - _LAT_OFFSET
+            inside = None
+            for col in range(first_col, last_col + 1):
+                key = (col, row)
+                if key in border:
+                    cells.append((key, True))
+                    inside = None
+                    continue
+                if inside is None:
+                    inside = zone.contains((col + 0.5) * cell - _LNG_OFFSET, center_y, row)
+                if inside:
+                    cells.append((key, False))
+        # Border cells outside the bounding box rows/cols (from the eps margin)
+        seen = {key for key, _ in cells}
+        cells.extend((key, True) for key in border if key not in seen)
+
+        zone.cells = [key for key, _ in cells]
+        for key, exact in cells:
+            # Copy on write: lookups in other threads may be iterating the old list
+            entries = grid_cells.get(key, []) + [(zone, exact)]
+            if sort:
+                entries.sort(key=_precedence)
+            grid_cells[key] = entries
+
+    def locate(self, latitude: float, longitude: float) -> Optional[int]:
+        """Id of the zone containing a point, or None"""
+        inv, cells = self._grid
+        row = int((latitude + _LAT_OFFSET) * inv)
+        entries = cells.get((int((longitude + _LNG_OFFSET) * inv), row))
+        if entries:
+            for zone, exact in entries:
+                if not exact or zone.contains(longitude, latitude, row):
+                    return zone.zone_id
+        return None
+
+    def locate_many(self, points: Iterable[Tuple[float, float]]) -> List[Optional[int]]:
+        """Zone ids for (latitude, longitude) points, in order"""
+        inv, cells = self._grid
+        cells_get = cells.get
+        result: List[Optional[int]] = []
+        append = result.append
+        for latitude, longitude in points:
+            row = int((latitude + _LAT_OFFSET) * inv)
+            entries = cells_get((int((longitude + _LNG_OFFSET) * inv), row))
+            zone_id = None
+            if entries:
+                for zone, exact in entries:
+                    if not exact or zone.contains(longitude, latitude, row):
+                        zone_id = zone.zone_id
+                        break
+            append(zone_id)
+        return result
+
+
+@dataclass
+class _CachedIndex:
+    index: ZoneGeometryIndex
+    # zone id -> updated_at (or created_at) the compiled geometry was read at
+    stamps: Dict[int, Optional[datetime]] = field(default_factory=dict)
+    checked_at: float = 0.0
+
+
+class ZoneIndexService:
+    """Per-organization zone indexes kept in sync with the zones table"""
+
+    def __init__(self, config: Optional[ZoneIndexConfig] = None):
+        self.config = config or performance_config.zone_index
+        self._indexes: Dict[int, _CachedIndex] = {}
+        self._lock = threading.Lock()
+
+    def get_index(self, db: Session, organization_id: int) -> ZoneGeometryIndex:
+        """The organization's index, revalidated if it was last checked too long ago"""
+        cached = self._indexes.get(organization_id)
+        if (
+            cached is not None
+            and time.monotonic() - cached.checked_at < self.config.revalidate_seconds
+        ):
+            return cached.index
+        return self._sync(db, organization_id).index
+
+    def locate(
+        self, db: Session, organization_id: int, latitude: float, longitude: float
+    ) -> Optional[int]:
+        """Id of the organization's zone containing a point, or None"""
+        return self.get_index(db, organization_id).locate(latitude, longitude)
+
+    def locate_many(
+        self, db: Session, organization_id: int, points: Sequence[Tuple[float, float]]
+    ) -> List[Optional[int]]:
+        """Zone ids for many (latitude, longitude) points in one call"""
+        if not points:
+            return []
+        return self.get_index(db, organization_id).locate_many(points)
+
+    def refresh(
+        self, db: Session, organization_id: Optional[int], zone_id: Optional[int] = None
+    ) -> None:
+        """
+        Pick up zone writes in this process right away.
+
+        Called by ZoneService after create, update and delete; ``zone_id`` is
+        recompiled even if its timestamp did not move. Organizations without a
+        cached index are left alone and built on first lookup.
+        """
+        if organization_id is not None and organization_id in self._indexes:
+            self._sync(db, organization_id, zone_id)
+
+    def invalidate(self, organization_id: Optional[int] = None) -> None:
+        """Drop cached indexes (all organizations when no id is given)"""
+        with self._lock:
+            if organization_id is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(organization_id, None)
+
+    def _sync(
+        self, db: Session, organization_id: int, written_zone_id: Optional[int] = None
+    ) -> _CachedIndex:
+        stamps = {
+            zone_id: stamp
+            for zone_id, stamp in db.query(
+                Zone.id, func.coalesce(Zone.updated_at, Zone.created_at)
+            ).filter(
+                Zone.organization_id == organization_id,
+                Zone.status != ZoneStatus.INACTIVE,
+            )
+        }
+
+        with self._lock:
+            cached = self._indexes.get(organization_id)
+            known = cached.stamps if cached else {}
+            changed = [
+                zone_id
+                for zone_id, stamp in stamps.items()
+                if zone_id not in known or known[zone_id] != stamp or zone_id == written_zone_id
+            ]
+            compiled = {}
+            if changed:
+                for zone_id, boundaries in db.query(Zone.id, Zone.boundaries).filter(
+                    Zone.id.in_(changed)
+                ):
+                    current = cached.index.get(zone_id) if cached else None
+                    if current is not None and current.boundaries == boundaries:
+                        compiled[zone_id] = current
+                    else:
+                        compiled[zone_id] = compile_zone(zone_id, boundaries)
+
+            if cached is None:
+                cached = _CachedIndex(
+                    ZoneGeometryIndex(
+                        [zone for zone in compiled.values() if zone is not None], self.config
+                    )
+                )
+                self._indexes[organization_id] = cached
+            else:
+                index = cached.index
+                for zone_id in set(known) - set(stamps):
+                    index.remove(zone_id)
+                for zone_id, zone in compiled.items():
+                    if zone is None:
+                        index.remove(zone_id)
+                    elif index.get(zone_id) is not zone:
+                        index.upsert(zone)
+
+            cached.stamps = stamps
+            cached.checked_at = time.monotonic()
+            if changed:
+                logger.debug(
+                    f"Zone index for organization {organization_id}: "
+                    f"{len(changed)} zones recompiled, {len(cached.index)} indexed"
+                )
+            return cached
+
+
+zone_index_service = ZoneIndexService()
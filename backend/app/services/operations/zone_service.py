@@ -1,6 +1,6 @@
 """Zone Service"""
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from sqlalchemy import func
 from sqlalchemy.orm import Session
@@ -8,11 +8,35 @@ from sqlalchemy.orm import Session
 from app.models.operations.zone import Zone, ZoneStatus
 from app.schemas.operations.zone import ZoneCreate, ZoneUpdate
 from app.services.base import CRUDBase
+from app.services.operations.zone_index import zone_index_service
 
 
 class ZoneService(CRUDBase[Zone, ZoneCreate, ZoneUpdate]):
     """Service for zone management operations"""
 
+    def create(
+        self, db: Session, *, obj_in: ZoneCreate, organization_id: Optional[int] = None
+    ) -> Zone:
+        """Create a zone and add its boundaries to the zone index"""
+        zone = super().create(db, obj_in=obj_in, organization_id=organization_id)
+        zone_index_service.refresh(db, zone.organization_id, zone.id)
+        return zone
+
+    def update(
+        self, db: Session, *, db_obj: Zone, obj_in: ZoneUpdate | Dict[str, Any]
+    ) -> Zone:
+        """Update a zone and recompile its boundaries in the zone index"""
+        zone = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        zone_index_service.refresh(db, zone.organization_id, zone.id)
+        return zone
+
+    def delete(self, db: Session, *, id: int) -> Optional[Zone]:
+        """Delete a zone and drop it from the zone index"""
+        zone = super().delete(db, id=id)
+        if zone:
+            zone_index_service.refresh(db, zone.organization_id, zone.id)
+        return zone
+
     def get_by_code(
         self, db: Session, *, zone_code: str, organization_id: int = None
     ) -> Optional[Zone]:
@@ -14,6 +14,8 @@ from typing import Any, Dict, List, Optional
 import httpx
 from pydantic import BaseModel, Field
 
+from app.core.request_timing import timed
+
 logger = logging.getLogger(__name__)
 
 
@@ -191,16 +193,17 @@ class BasePlatformClient(ABC):
         self.last_request_time = datetime.utcnow()
 
         try:
-            if method.upper() == "GET":
-                response = self._client.get(url, headers=headers, params=params)
-            elif method.upper() == "POST":
-                response = self._client.post(url, headers=headers, params=params, json=json_data)
-            elif method.upper() == "PUT":
-                response = self._client.put(url, headers=headers, params=params, json=json_data)
-            elif method.upper() == "DELETE":
-                response = self._client.delete(url, headers=headers, params=params)
-            else:
+            if method.upper() not in ("GET", "POST", "PUT", "DELETE"):
                 return {"error": True, "message": f"Unsupported method: {method}"}
+            with timed("external"):
+                if method.upper() == "GET":
+                    response = self._client.get(url, headers=headers, params=params)
+                elif method.upper() == "POST":
+                    response = self._client.post(url, headers=headers, params=params, json=json_data)
+                elif method.upper() == "PUT":
+                    response = self._client.put(url, headers=headers, params=params, json=json_data)
+                else:
+                    response = self._client.delete(url, headers=headers, params=params)
 
             if response.status_code == 401:
                 # Token expired, retry once
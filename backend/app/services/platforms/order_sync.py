@@ -11,6 +11,7 @@ from sqlalchemy.orm import Session
 
 from app.models.fleet.courier import Courier, CourierStatus
 from app.models.operations.delivery import Delivery, DeliveryStatus
+from app.services.operations.geocoding_service import geocoding_service
 from app.services.platforms.base import OrderStatus, PlatformOrder, PlatformType
 from app.services.platforms.barq_client import BarqClient, get_barq_client
 from app.services.platforms.jahez_client import JahezClient, get_jahez_client, get_saned_client
@@ -243,11 +244,14 @@ class OrderSyncService:
             Dict with counts of created, updated, skipped orders
         """
         stats = {"created": 0, "updated": 0, "skipped": 0}
+        # Geocoded and zone-tagged in one batch below
+        synced: List[Delivery] = []
 
         for order in orders:
             try:
-                # Generate unique tracking number
-                tracking_number = f"{order.platform.value.upper()}-{order.platform_order_id}"
+                # Generate unique tracking number (PlatformOrder stores enum values)
+                platform = PlatformType(order.platform).value.upper()
+                tracking_number = f"{platform}-{order.platform_order_id}"
 
                 # Check if order exists
                 existing = db.query(Delivery).filter(
@@ -265,6 +269,8 @@ class OrderSyncService:
                         existing.cod_amount = order.cod_amount
                     if order.notes:
                         existing.notes = order.notes
+                    self._apply_platform_coordinates(existing, order)
+                    synced.append(existing)
                     stats["updated"] += 1
                 else:
                     # Create new delivery record
@@ -277,11 +283,13 @@ class OrderSyncService:
                         pickup_time=order.picked_up_at,
                         delivery_time=order.delivered_at,
                         cod_amount=order.cod_amount,
-                        notes=f"[{order.platform.value.upper()}] {order.notes or ''}".strip(),
+                        notes=f"[{platform}] {order.notes or ''}".strip(),
                     )
                     if organization_id:
                         delivery.organization_id = organization_id
+                    self._apply_platform_coordinates(delivery, order)
                     db.add(delivery)
+                    synced.append(delivery)
                     stats["created"] += 1
 
             except Exception as e:
@@ -289,10 +297,31 @@ class OrderSyncService:
                 stats["skipped"] += 1
                 continue
 
+        # Geocode addresses the platform sent without coordinates and tag zones
+        if synced:
+            geocoding_service.locate_deliveries(db, synced)
+
         db.commit()
         logger.info(f"Sync complete: {stats}")
         return stats
 
+    @staticmethod
+    def _apply_platform_coordinates(delivery: Delivery, order: PlatformOrder) -> None:
+        """Use coordinates supplied by the platform for points not yet geocoded"""
+        if (
+            delivery.pickup_point is None
+            and order.pickup_lat is not None
+            and order.pickup_lng is not None
+        ):
+            delivery.pickup_latitude, delivery.pickup_longitude = order.pickup_lat, order.pickup_lng
+        if (
+            delivery.delivery_point is None
+            and order.delivery_lat is not None
+            and order.delivery_lng is not None
+        ):
+            delivery.delivery_latitude = order.delivery_lat
+            delivery.delivery_longitude = order.delivery_lng
+
     def full_sync(
         self,
         db: Session,
@@ -16,6 +16,7 @@ from typing import Any, Dict, List, Optional
 from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
 
+from app.core.aggregation import Aggregation, cached_metrics
 from app.models.support import (
     CannedResponse,
     EscalationLevel,
@@ -270,144 +271,74 @@ class TicketService(CRUDBase[Ticket, TicketCreate, TicketUpdate]):
         db.refresh(ticket)
         return ticket
 
-    def get_statistics(self, db: Session) -> Dict:
+    def get_statistics(self, db: Session, organization_id: Optional[int] = None) -> Dict:
         """
         Get ticket statistics
 
+        Computed in one aggregate query and cached per organization for
+        ``CacheConfig.metrics_ttl`` seconds.
+
         Returns:
             Dictionary with various ticket statistics
         """
-        total = db.query(func.count(self.model.id)).scalar() or 0
-
-        # Count by status
-        open_count = (
-            db.query(func.count(self.model.id))
-            .filter(self.model.status == TicketStatus.OPEN)
-            .scalar()
-            or 0
-        )
-
-        in_progress_count = (
-            db.query(func.count(self.model.id))
-            .filter(self.model.status == TicketStatus.IN_PROGRESS)
-            .scalar()
-            or 0
-        )
-
-        pending_count = (
-            db.query(func.count(self.model.id))
-            .filter(self.model.status == TicketStatus.PENDING)
-            .scalar()
-            or 0
-        )
-
-        resolved_count = (
-            db.query(func.count(self.model.id))
-            .filter(self.model.status == TicketStatus.RESOLVED)
-            .scalar()
-            or 0
-        )
-
-        closed_count = (
-            db.query(func.count(self.model.id))
-            .filter(self.model.status == TicketStatus.CLOSED)
-            .scalar()
-            or 0
+        return cached_metrics(
+            "ticket_statistics",
+            organization_id,
+            "all",
+            lambda: self._compute_statistics(db, organization_id),
         )
 
-        # Count by category
-        by_category = {}
-        for category in TicketCategory:
-            count = (
-                db.query(func.count(self.model.id)).filter(self.model.category == category).scalar()
-                or 0
+    def _compute_statistics(self, db: Session, organization_id: Optional[int]) -> Dict:
+        model = self.model
+        agg = Aggregation(db, model)
+        if organization_id:
+            agg.where(model.organization_id == organization_id)
+        has_sla = model.sla_due_at.isnot(None)
+        metrics = (
+            agg.count("total")
+            .count_each("by_status", model.status, TicketStatus)
+            .count_each("by_category", model.category, TicketCategory)
+            .count_each("by_priority", model.priority, TicketPriority)
+            .count_each("by_escalation", model.escalation_level, EscalationLevel)
+            .count("merged_count", model.is_merged.is_(True))
+            .avg(
+                "resolution_seconds",
+                agg.seconds_between(model.resolved_at, model.created_at),
+                model.status == TicketStatus.RESOLVED,
+                model.resolved_at.isnot(None),
             )
-            by_category[category.value] = count
-
-        # Count by priority
-        by_priority = {}
-        for priority in TicketPriority:
-            count = (
-                db.query(func.count(self.model.id)).filter(self.model.priority == priority).scalar()
-                or 0
-            )
-            by_priority[priority.value] = count
-
-        # Calculate average resolution time
-        resolved_tickets = (
-            db.query(self.model)
-            .filter(
-                and_(self.model.status == TicketStatus.RESOLVED, self.model.resolved_at.isnot(None))
-            )
-            .all()
-        )
-
-        avg_resolution_time = 0.0
-        if resolved_tickets:
-            total_hours = 0
-            for ticket in resolved_tickets:
-                delta = ticket.resolved_at - ticket.created_at
-                total_hours += delta.total_seconds() / 3600
-            avg_resolution_time = total_hours / len(resolved_tickets)
-
-        # Count by escalation
-        by_escalation = {}
-        for level in EscalationLevel:
-            count = (
-                db.query(func.count(self.model.id))
-                .filter(self.model.escalation_level == level)
-                .scalar()
-                or 0
+            .avg(
+                "first_response_seconds",
+                agg.seconds_between(model.first_response_at, model.created_at),
+                model.first_response_at.isnot(None),
             )
-            by_escalation[level.value] = count
-
-        escalated_count = (
-            db.query(func.count(self.model.id))
-            .filter(self.model.escalation_level != EscalationLevel.NONE)
-            .scalar()
-            or 0
-        )
-
-        merged_count = (
-            db.query(func.count(self.model.id)).filter(self.model.is_merged == True).scalar() or 0
+            .count("with_sla", has_sla)
+            .count("sla_compliant", has_sla, model.sla_breached.isnot(True))
+            .execute()
         )
 
-        # Calculate average first response time
-        tickets_with_response = (
-            db.query(self.model).filter(self.model.first_response_at.isnot(None)).all()
-        )
-
-        avg_first_response_minutes = 0.0
-        if tickets_with_response:
-            total_minutes = 0
-            for ticket in tickets_with_response:
-                delta = ticket.first_response_at - ticket.created_at
-                total_minutes += delta.total_seconds() / 60
-            avg_first_response_minutes = total_minutes / len(tickets_with_response)
-
-        # Calculate SLA compliance rate
-        tickets_with_sla = db.query(self.model).filter(self.model.sla_due_at.isnot(None)).all()
-
-        sla_compliance_rate = 0.0
-        if tickets_with_sla:
-            compliant_count = sum(1 for t in tickets_with_sla if not t.sla_breached)
-            sla_compliance_rate = (compliant_count / len(tickets_with_sla)) * 100
-
+        by_status = metrics["by_status"]
+        by_escalation = metrics["by_escalation"]
+        with_sla = metrics["with_sla"]
         return {
-            "total": total,
-            "open": open_count,
-            "in_progress": in_progress_count,
-            "waiting": pending_count,
-            "resolved": resolved_count,
-            "closed": closed_count,
-            "by_category": by_category,
-            "by_priority": by_priority,
+            "total": metrics["total"],
+            "open": by_status[TicketStatus.OPEN.value],
+            "in_progress": by_status[TicketStatus.IN_PROGRESS.value],
+            "waiting": by_status[TicketStatus.PENDING.value],
+            "resolved": by_status[TicketStatus.RESOLVED.value],
+            "closed": by_status[TicketStatus.CLOSED.value],
+            "by_category": metrics["by_category"],
+            "by_priority": metrics["by_priority"],
             "by_escalation": by_escalation,
-            "avg_resolution_time_hours": round(avg_resolution_time, 2),
-            "avg_first_response_minutes": round(avg_first_response_minutes, 2),
-            "sla_compliance_rate": round(sla_compliance_rate, 2),
-            "escalated_count": escalated_count,
-            "merged_count": merged_count,
+            "avg_resolution_time_hours": round((metrics["resolution_seconds"] or 0.0) / 3600, 2),
+            "avg_first_response_minutes": round(
+                (metrics["first_response_seconds"] or 0.0) / 60, 2
+            ),
+            "sla_compliance_rate": round(
+                metrics["sla_compliant"] / with_sla * 100 if with_sla else 0.0, 2
+            ),
+            "escalated_count": metrics["total"] - by_escalation[EscalationLevel.NONE.value],
+            "merged_count": metrics["merged_count"],
         }
 
     # SLA Management
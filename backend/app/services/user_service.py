@@ -8,7 +8,8 @@ from typing import List, Optional
 
 from sqlalchemy.orm import Session
 
-from app.core.security import get_password_hash, verify_password
+from app.core.password_hashing import password_hashing
+from app.core.security import get_password_hash
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.services.base import CRUDBase
@@ -102,8 +103,10 @@ class UserService(CRUDBase[User, UserCreate, UserUpdate]):
         user = self.get_by_email(db, email=email)
         if not user or not user.hashed_password:
             return None
-        if not verify_password(password, user.hashed_password):
+        # Hashing runs in the bounded password pool; raises 503 when saturated
+        if not password_hashing.verify(password, user.hashed_password):
             return None
+        password_hashing.rehash_if_needed(user.id, password, user.hashed_password)
         return user
 
     def is_active(self, user: User) -> bool:
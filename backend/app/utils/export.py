@@ -4,10 +4,19 @@ Helper functions for exporting data to various formats (CSV, Excel, PDF).
 """
 
 import csv
+import enum
 import io
-from datetime import datetime
+import json
+import re
+import zipfile
+import zlib
+from datetime import date, datetime
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from xml.sax.saxutils import escape as xml_escape
+
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement, Select
 
 
 def prepare_export_data(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -390,3 +399,435 @@ def calculate_export_size(data: List[Dict[str, Any]]) -> Dict[str, Any]:
         "estimated_bytes": total_size,
         "estimated_mb": round(total_size / (1024 * 1024), 2),
     }
+
+
+# ---------------------------------------------------------------------------
+# Streaming export
+#
+# The helpers below never hold more than one batch of rows in memory. Rows are
+# read with keyset pagination (``WHERE key > :last ORDER BY key LIMIT n``) so
+# each batch is a short index range scan. A session keeps its connection until
+# its transaction ends, so with ``release_connection=True`` the transaction is
+# ended after every batch and no connection is pinned while a slow client
+# drains the response; otherwise the session (e.g. a request's get_db session)
+# holds one connection for the whole export. Encoders turn each batch into
+# bytes as soon as it arrives, so time to first byte and peak memory do not
+# depend on the size of the export.
+# ---------------------------------------------------------------------------
+
+
+def clean_export_value(value: Any) -> Any:
+    """
+    Convert a single database value into a CSV/JSON friendly scalar
+
+    Args:
+        value: Raw column value
+
+    Returns:
+        Value that csv and json can serialize without extra hooks
+    """
+    if value is None:
+        return ""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (dict, list)):
+        return str(value)
+    return value
+
+
+def iter_keyset_batches(
+    session: Session,
+    statement: Select,
+    key_column: ColumnElement,
+    batch_size: int = 1000,
+    release_connection: bool = False,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Iterate a SELECT in keyset-paginated batches
+
+    Args:
+        session: Database session used for every batch
+        statement: SELECT statement (filters applied, no ORDER BY/LIMIT)
+        key_column: Unique, indexed column to paginate on (usually the PK);
+            it must be part of the selected columns
+        batch_size: Rows per batch
+        release_connection: Roll the session back after each batch so its
+            connection returns to the pool while the batch is consumed; only
+            for read-only sessions
+
+    Yields:
+        Lists of row dictionaries, at most ``batch_size`` long
+    """
+    key_name = key_column.key
+    last_key = None
+
+    while True:
+        stmt = statement
+        if last_key is not None:
+            stmt = stmt.where(key_column > last_key)
+        rows = session.execute(stmt.order_by(key_column).limit(batch_size)).mappings().all()
+        if release_connection:
+            session.rollback()
+        if not rows:
+            break
+
+        yield [dict(row) for row in rows]
+
+        if len(rows) < batch_size:
+            break
+        last_key = rows[-1][key_name]
+
+
+def stream_csv(
+    batches: Iterable[List[Dict[str, Any]]],
+    columns: Sequence[str],
+    header: Optional[Sequence[str]] = None,
+) -> Iterator[bytes]:
+    """
+    Encode row batches as CSV, one chunk per batch
+
+    Args:
+        batches: Iterable of row batches
+        columns: Column order
+        header: Header row labels (defaults to ``columns``)
+
+    Yields:
+        UTF-8 encoded CSV chunks
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(header or columns)
+    yield buffer.getvalue().encode("utf-8")
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerows([clean_export_value(row.get(col)) for col in columns] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_jsonl(
+    batches: Iterable[List[Dict[str, Any]]], columns: Sequence[str]
+) -> Iterator[bytes]:
+    """
+    Encode row batches as JSON Lines (one object per line)
+
+    Args:
+        batches: Iterable of row batches
+        columns: Keys to emit for each row
+
+    Yields:
+        UTF-8 encoded JSON Lines chunks
+    """
+    for batch in batches:
+        lines = [
+            json.dumps({col: clean_export_value(row.get(col)) for col in columns})
+            for row in batch
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def stream_json_array(
+    batches: Iterable[List[Dict[str, Any]]], columns: Sequence[str]
+) -> Iterator[bytes]:
+    """
+    Encode row batches as a single ``{"data": [...]}`` JSON document
+
+    Args:
+        batches: Iterable of row batches
+        columns: Keys to emit for each row
+
+    Yields:
+        UTF-8 encoded JSON chunks
+    """
+    yield b'{"data": ['
+    first = True
+    for batch in batches:
+        parts = [
+            json.dumps({col: clean_export_value(row.get(col)) for col in columns})
+            for row in batch
+        ]
+        if not parts:
+            continue
+        prefix = "" if first else ","
+        first = False
+        yield (prefix + ",".join(parts)).encode("utf-8")
+    yield b"]}"
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Parquet footers record absolute offsets, so report the total written
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_type(python_type: Optional[type]):
+    """Arrow type for values of python_type after clean_export_value"""
+    import pyarrow as pa
+
+    if python_type is bool:
+        return pa.bool_()
+    if python_type is int:
+        return pa.int64()
+    if python_type in (float, Decimal):
+        return pa.float64()
+    # Strings, enums, dates (ISO strings) and anything else
+    return pa.string()
+
+
+def column_python_types(statement: Select) -> Dict[str, Optional[type]]:
+    """
+    Python type of every selected column, for encoders that need a schema
+
+    Args:
+        statement: SELECT statement
+
+    Returns:
+        Column name -> python type (None when the SQL type does not declare one)
+    """
+    types = {}
+    for column in statement.selected_columns:
+        try:
+            types[column.key] = column.type.python_type
+        except NotImplementedError:
+            types[column.key] = None
+    return types
+
+
+def stream_parquet(
+    batches: Iterable[List[Dict[str, Any]]],
+    columns: Sequence[str],
+    types: Optional[Dict[str, Optional[type]]] = None,
+) -> Iterator[bytes]:
+    """
+    Encode row batches as Parquet, one row group per batch
+
+    Requires pyarrow. The schema is fixed before the first row group:
+    columns listed in ``types`` use their declared type, the rest are
+    inferred from the first batch (strings if entirely empty there). Values
+    for string columns are converted with str(), so a later batch can never
+    disagree with the schema.
+
+    Args:
+        batches: Iterable of row batches
+        columns: Column order
+        types: Python type per column (see column_python_types)
+
+    Yields:
+        Parquet file bytes, flushed after every row group
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = types or {}
+    sink = _ChunkSink()
+    writer = None
+    schema = None
+
+    try:
+        for batch in batches:
+            data = {
+                col: [
+                    None if row.get(col) is None else clean_export_value(row.get(col))
+                    for row in batch
+                ]
+                for col in columns
+            }
+            if schema is None:
+                fields = []
+                for col in columns:
+                    if col in types:
+                        arrow_type = _arrow_type(types[col])
+                    else:
+                        arrow_type = pa.array(data[col]).type
+                        if pa.types.is_null(arrow_type):
+                            arrow_type = pa.string()
+                    fields.append(pa.field(col, arrow_type))
+                schema = pa.schema(fields)
+                writer = pq.ParquetWriter(sink, schema)
+
+            for field in schema:
+                if pa.types.is_string(field.type):
+                    data[field.name] = [
+                        value if value is None or isinstance(value, str) else str(value)
+                        for value in data[field.name]
+                    ]
+            writer.write_table(pa.table(data, schema=schema))
+            yield sink.drain()
+
+        if writer is None:
+            schema = pa.schema([pa.field(col, _arrow_type(types.get(col))) for col in columns])
+            writer = pq.ParquetWriter(sink, schema)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    yield sink.drain()
+
+
+_XLSX_STATIC_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" '
+        'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/'
+        '2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/'
+        '2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        "</Relationships>"
+    ),
+}
+
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    "</workbook>"
+)
+
+# Characters XML 1.0 cannot carry, even escaped
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _xlsx_cell(value: Any) -> str:
+    value = clean_export_value(value)
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f"<c><v>{value}</v></c>"
+    text = xml_escape(_XML_INVALID.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values: Iterable[Any]) -> str:
+    return "<row>" + "".join(_xlsx_cell(value) for value in values) + "</row>"
+
+
+def stream_xlsx(
+    batches: Iterable[List[Dict[str, Any]]],
+    columns: Sequence[str],
+    header: Optional[Sequence[str]] = None,
+    sheet_name: str = "Sheet1",
+) -> Iterator[bytes]:
+    """
+    Encode row batches as a single-sheet XLSX workbook
+
+    Rows are written as inline strings and numbers straight into the zip
+    stream, so memory stays flat regardless of row count and bytes are
+    flushed after every batch.
+
+    Args:
+        batches: Iterable of row batches
+        columns: Column order
+        header: Header row labels (defaults to ``columns``)
+        sheet_name: Worksheet name
+
+    Yields:
+        XLSX (zip) file bytes
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        archive.writestr(
+            "xl/workbook.xml", _XLSX_WORKBOOK.format(name=xml_escape(sheet_name[:31]))
+        )
+        yield sink.drain()
+
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                (
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                    "<sheetData>" + _xlsx_row(header or columns)
+                ).encode("utf-8")
+            )
+            for batch in batches:
+                sheet.write(
+                    "".join(_xlsx_row(row.get(col) for col in columns) for row in batch).encode(
+                        "utf-8"
+                    )
+                )
+                yield sink.drain()
+            sheet.write(b"</sheetData></worksheet>")
+
+    yield sink.drain()
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Gzip-compress a byte stream on the fly
+
+    Args:
+        chunks: Uncompressed byte chunks
+        level: zlib compression level (1-9)
+
+    Yields:
+        Gzip member bytes; empty intermediate outputs are skipped
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+STREAM_FORMATS: Dict[str, Dict[str, Any]] = {
+    "csv": {"encoder": stream_csv, "media_type": "text/csv", "extension": "csv"},
+    "json": {"encoder": stream_json_array, "media_type": "application/json", "extension": "json"},
+    "jsonl": {
+        "encoder": stream_jsonl,
+        "media_type": "application/x-ndjson",
+        "extension": "jsonl",
+    },
+    "parquet": {
+        "encoder": stream_parquet,
+        "media_type": "application/vnd.apache.parquet",
+        "extension": "parquet",
+    },
+}
@@ -65,16 +65,41 @@ celery_app.conf.update(
             "task": "app.workers.tasks.aggregate_metrics_task",
             "schedule": crontab(minute="*/5"),
         },
-        # Check SLA compliance every 15 minutes
+        # Refresh dashboard rollups for recently written organizations
+        "refresh-dashboard-rollups": {
+            "task": "app.workers.tasks.refresh_dashboard_rollups_task",
+            "schedule": performance_config.dashboard_rollup.refresh_interval_seconds,
+        },
+        # Rebuild feedback rollup days touched by recent writes
+        "refresh-feedback-rollups": {
+            "task": "app.workers.tasks.refresh_feedback_rollups_task",
+            "schedule": performance_config.feedback_rollup.refresh_interval_seconds,
+        },
+        # Verify courier COD balances against the COD rows
+        "reconcile-cod-ledger": {
+            "task": "app.workers.tasks.reconcile_cod_ledger_task",
+            "schedule": performance_config.cod_ledger.reconcile_interval_seconds,
+        },
+        # Mark SLA breaches as their deadlines pass
         "check-sla-compliance": {
             "task": "app.workers.tasks.check_sla_compliance_task",
-            "schedule": crontab(minute="*/15"),
+            "schedule": performance_config.sla_monitor.poll_interval_seconds,
+        },
+        # Keep the FMS live-location snapshot warm for map and dispatch reads
+        "refresh-fms-locations": {
+            "task": "app.workers.tasks.refresh_fms_locations_task",
+            "schedule": performance_config.fms_location.refresh_interval_seconds,
         },
         # Cleanup old data daily at 2 AM
         "cleanup-old-data": {
             "task": "app.workers.tasks.cleanup_old_data_task",
             "schedule": crontab(hour=2, minute=0),
         },
+        # Refresh the current month's EOS liability (and close the previous one) daily at 1 AM
+        "snapshot-eos-liability": {
+            "task": "app.workers.tasks.snapshot_eos_liability_task",
+            "schedule": crontab(hour=1, minute=0),
+        },
         # Generate daily reports at 6 AM
         "daily-reports": {
             "task": "app.workers.tasks.generate_daily_reports_task",
@@ -382,85 +382,293 @@ def aggregate_metrics_task(self):
         raise
 
 
+@celery_app.task(bind=True, base=DatabaseTask)
+def refresh_dashboard_rollups_task(self, org_id: Optional[int] = None, full: bool = False):
+    """
+    Refresh dashboard rollups for organizations with pending writes
+
+    Runs every minute via Celery Beat. Pass org_id (optionally with full=True)
+    to rebuild a single organization on demand.
+    """
+    try:
+        from app.services.analytics.dashboard_rollup_service import dashboard_rollup_service
+
+        if org_id is not None:
+            result = dashboard_rollup_service.refresh_organization(
+                self.db_session, org_id, full=full
+            )
+            self.db_session.commit()
+            return result
+
+        result = dashboard_rollup_service.refresh_pending(self.db_session)
+        if result["refreshed"] or result["failed"]:
+            logger.info(
+                f"Dashboard rollups refreshed: {result['refreshed']} organizations, "
+                f"{result['failed']} failed"
+            )
+        return result
+
+    except Exception as e:
+        logger.error(f"Failed to refresh dashboard rollups: {e}")
+        self.db_session.rollback()
+        raise
+
+
+@celery_app.task(bind=True, base=DatabaseTask)
+def rescore_priority_queue_task(self, org_id: Optional[int] = None):
+    """
+    Recompute priority queue sort keys from the scoring policy
+
+    Run after changing PRIORITY_QUEUE_SCORING_POLICY or the policy defaults.
+    Without org_id, every organization with queued entries is re-keyed.
+    """
+    try:
+        from app.models.operations.priority_queue import PriorityQueueEntry, QueueStatus
+        from app.services.operations.priority_queue_service import priority_queue_service
+
+        if org_id is not None:
+            org_ids = [org_id]
+        else:
+            org_ids = [
+                row[0]
+                for row in self.db_session.query(PriorityQueueEntry.organization_id)
+                .filter(PriorityQueueEntry.status == QueueStatus.QUEUED)
+                .distinct()
+                .all()
+            ]
+
+        rescored = {
+            oid: priority_queue_service.rescore_organization(self.db_session, oid)
+            for oid in org_ids
+        }
+        logger.info(f"Priority queue re-keyed: {sum(rescored.values())} entries")
+        return rescored
+
+    except Exception as e:
+        logger.error(f"Failed to rescore priority queue: {e}")
+        self.db_session.rollback()
+        raise
+
+
 # SLA Monitoring Tasks
 @celery_app.task(bind=True, base=DatabaseTask)
 def check_sla_compliance_task(self):
     """
-    Check SLA compliance for active tickets and deliveries
+    Mark tickets, delivery SLAs and queue entries whose deadline has passed
 
-    Runs every 15 minutes via Celery Beat
+    Pops only the due deadlines from the SLA deadline index, so each run costs
+    the same however many rows are pending. Runs every
+    SLA_MONITOR_POLL_SECONDS via Celery Beat.
     """
-    logger.info("Checking SLA compliance")
+    try:
+        from app.services.operations.sla_deadline_scheduler import sla_deadline_scheduler
+
+        result = sla_deadline_scheduler.poll(self.db_session)
+        if result["breached"]:
+            logger.info(f"SLA check completed: {result}")
+        return result
+
+    except Exception as e:
+        logger.error(f"Failed to check SLA compliance: {e}")
+        self.db_session.rollback()
+        raise
+
 
+# Feedback Tasks
+@celery_app.task(bind=True, base=DatabaseTask)
+def reclassify_feedback_task(self, org_id: Optional[int] = None, recategorize: bool = False):
+    """
+    Re-run sentiment analysis and categorization over stored feedback
+
+    Queued after an organization changes its feedback keyword tables. Without
+    org_id, every organization's feedback is reclassified.
+    """
     try:
-        from datetime import datetime
+        from app.services.operations.feedback_analysis import reclassify_feedback
 
-        from app.models.operations import Delivery
-        from app.models.support import Ticket
+        return reclassify_feedback(self.db_session, organization_id=org_id, recategorize=recategorize)
+
+    except Exception as e:
+        logger.error(f"Failed to reclassify feedback: {e}")
+        self.db_session.rollback()
+        raise
 
-        now = datetime.utcnow()
 
-        # Check ticket SLAs
-        overdue_tickets = (
-            self.db_session.query(Ticket)
-            .filter(
-                Ticket.status.in_(["open", "in_progress"]),
-                Ticket.sla_due_at < now,
-                Ticket.sla_breached == False,
+@celery_app.task(bind=True, base=DatabaseTask)
+def refresh_feedback_rollups_task(self, org_id: Optional[int] = None, full: bool = False):
+    """
+    Refresh feedback rollups for organizations with pending feedback writes
+
+    Runs every minute via Celery Beat. Pass org_id (optionally with full=True)
+    to rebuild a single organization on demand.
+    """
+    try:
+        from app.services.operations.feedback_rollup_service import feedback_rollup_service
+
+        if org_id is not None:
+            result = feedback_rollup_service.refresh_organization(
+                self.db_session, org_id, full=full
             )
-            .all()
-        )
+            self.db_session.commit()
+            return result
+
+        result = feedback_rollup_service.refresh_pending(self.db_session)
+        if result["refreshed"] or result["failed"]:
+            logger.info(
+                f"Feedback rollups refreshed: {result['refreshed']} organizations, "
+                f"{result['failed']} failed"
+            )
+        return result
+
+    except Exception as e:
+        logger.error(f"Failed to refresh feedback rollups: {e}")
+        self.db_session.rollback()
+        raise
 
-        for ticket in overdue_tickets:
-            ticket.sla_breached = True
-            logger.warning(f"Ticket {ticket.id} breached SLA")
 
-            # Send SLA breach notification
-            send_email_task.delay(
-                recipient=ticket.assigned_to_email,
-                subject=f"SLA Breach: Ticket {ticket.number}",
-                body=f"Ticket {ticket.number} has breached its SLA.",
+@celery_app.task(bind=True, base=DatabaseTask)
+def reconcile_cod_ledger_task(self, org_id: Optional[int] = None, repair: Optional[bool] = None):
+    """
+    Verify courier COD balances and the COD ledger against the COD rows
+
+    Runs hourly via Celery Beat. Drift is logged and, when COD_LEDGER_REPAIR
+    is on (or repair=True is passed), repaired. Pass org_id to check one
+    organization.
+    """
+    try:
+        from app.services.operations.cod_ledger_service import cod_ledger_service
+
+        if org_id is not None:
+            result = cod_ledger_service.reconcile(self.db_session, org_id, repair=repair)
+            self.db_session.commit()
+            return result
+
+        result = cod_ledger_service.reconcile_all(self.db_session, repair=repair)
+        if result["drifted"] or result["failed"]:
+            logger.warning(
+                f"COD ledger reconciled: drift in {result['drifted']}, failed {result['failed']}"
             )
+        return result
+
+    except Exception as e:
+        logger.error(f"Failed to reconcile COD ledger: {e}")
+        self.db_session.rollback()
+        raise
+
+
+# Tracking Tasks
+@celery_app.task(bind=True, base=DatabaseTask, ignore_result=True)
+def refresh_fms_locations_task(self):
+    """
+    Refresh the shared FMS live-location snapshot
+
+    One concurrent pass over all FMS asset pages, published to Redis so API
+    workers serve map and dispatch reads without calling FMS. Runs every
+    FMS_LOCATION_REFRESH_INTERVAL seconds via Celery Beat.
+    """
+    try:
+        from app.services.fms.location_ingest import location_ingest_service
 
-        # Check delivery SLAs
-        overdue_deliveries = (
-            self.db_session.query(Delivery)
-            .filter(
-                Delivery.status.in_(["pending", "in_transit"]), Delivery.expected_delivery_at < now
+        # max_age=0: refresh unless another worker is already doing it
+        snapshot = location_ingest_service.get_snapshot(max_age=0)
+        return {"assets": len(snapshot.positions), "fetched_at": snapshot.fetched_at_iso}
+
+    except Exception as e:
+        logger.error(f"Failed to refresh FMS locations: {e}")
+        raise
+
+
+# Security Tasks
+@celery_app.task(bind=True, base=DatabaseTask)
+def backfill_blind_indexes_task(self, batch_size: Optional[int] = None):
+    """
+    Encrypt legacy PII values and bring blind indexes onto the current key
+
+    Run after enabling encryption on a column or after putting a new key
+    first in BLIND_INDEX_KEYS. Commits per batch, so it is safe to rerun.
+    """
+    try:
+        from app.services.blind_index_service import blind_index_service
+
+        results = blind_index_service.backfill_all(self.db_session, batch_size=batch_size)
+        for result in results:
+            logger.info(
+                f"Blind index backfill of {result['table']}: {result['updated']} updated, "
+                f"{len(result['conflicts'])} conflicts, {result['remaining']} remaining"
             )
-            .all()
+        return results
+
+    except Exception as e:
+        logger.error(f"Failed to backfill blind indexes: {e}")
+        self.db_session.rollback()
+        raise
+
+
+@celery_app.task(bind=True, base=DatabaseTask)
+def backfill_security_alert_indexes_task(self):
+    """
+    Add security alerts stored before the alert indexes existed to them
+
+    Run once after deploying the indexed alert store so older alerts show up
+    in alert listings and dashboard counters. Safe to rerun.
+    """
+    try:
+        from app.core.security_monitor import get_security_monitor
+
+        indexed = get_security_monitor().backfill_alert_indexes()
+        logger.info(f"Indexed {indexed} security alerts")
+        return {"indexed": indexed}
+
+    except Exception as e:
+        logger.error(f"Failed to backfill security alert indexes: {e}")
+        raise
+
+
+# HR Tasks
+@celery_app.task(bind=True, base=DatabaseTask)
+def snapshot_eos_liability_task(self, month: Optional[str] = None):
+    """
+    Store the End of Service liability snapshots for every organization
+
+    Runs daily via Celery Beat: recomputes the current month as of today and
+    closes the previous month (computed once as of its last day). Pass month
+    as YYYY-MM to recompute a specific month. The liability API only reads
+    these stored rows.
+    """
+    try:
+        from app.models import Organization
+        from app.services.hr.eos_liability_service import eos_liability_service
+
+        today = datetime.utcnow().date()
+        # (month, recompute even if stored)
+        if month:
+            periods = [(datetime.strptime(month, "%Y-%m").date(), True)]
+        else:
+            current = today.replace(day=1)
+            periods = [((current - timedelta(days=1)).replace(day=1), False), (current, True)]
+
+        organizations = (
+            self.db_session.query(Organization).filter(Organization.is_active == True).all()
         )
 
-        for delivery in overdue_deliveries:
-            logger.warning(f"Delivery {delivery.id} is overdue")
-
-            # Send delivery SLA breach notification
-            if delivery.courier and delivery.courier.email:
-                send_email_task.delay(
-                    recipient=delivery.courier.email,
-                    subject=f"Delivery Overdue: Order {delivery.tracking_number}",
-                    body=(
-                        f"Delivery {delivery.tracking_number} is overdue.\n"
-                        f"Expected delivery: {delivery.expected_delivery_at}\n"
-                        f"Current status: {delivery.status}\n"
-                        f"Please complete the delivery as soon as possible."
-                    ),
+        totals = {}
+        for org in organizations:
+            for period, refresh in periods:
+                snapshot = eos_liability_service.get_snapshot(
+                    self.db_session, org.id, period, refresh=refresh, today=today
+                )
+                totals.setdefault(period.isoformat(), {})[org.id] = float(
+                    snapshot.total_liability
                 )
-
-        self.db_session.commit()
 
         logger.info(
-            f"SLA check completed: {len(overdue_tickets)} tickets, "
-            f"{len(overdue_deliveries)} deliveries overdue"
+            f"EOS liability snapshots stored for {len(organizations)} organizations "
+            f"({', '.join(f'{period:%Y-%m}' for period, _ in periods)})"
         )
-
-        return {
-            "overdue_tickets": len(overdue_tickets),
-            "overdue_deliveries": len(overdue_deliveries),
-        }
+        return {"months": totals}
 
     except Exception as e:
-        logger.error(f"Failed to check SLA compliance: {e}")
+        logger.error(f"Failed to snapshot EOS liability: {e}")
         self.db_session.rollback()
         raise
 
@@ -18,7 +18,7 @@ from sqlalchemy.orm import Session
 from app.core.database import db_manager, get_db
 from app.core.cache import cache_manager
 from app.utils.batch import bulk_insert, bulk_update, ChunkedProcessor
-from app.core.query_optimizer import track_queries, query_analyzer
+from app.core.query_optimizer import track_queries, query_profiler
 from app.middleware.performance import performance_metrics
 
 
@@ -186,14 +186,14 @@ class PerformanceTester:
         print("-" * 80)
 
         # Reset query analyzer
-        query_analyzer.reset_stats()
+        query_profiler.reset()
 
         # Simulate some queries
         with db_manager.session_scope() as session:
             for _ in range(50):
                 session.execute("SELECT 1")
 
-        stats = query_analyzer.get_stats()
+        stats = query_profiler.get_stats()
 
         self.results["query_optimization"] = {
             "total_queries": stats["total_queries"],
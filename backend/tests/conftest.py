@@ -136,6 +136,67 @@ def test_db(db_session: Session):
     return db_session
 
 
+# Tables that build on SQLite (the full schema uses PostgreSQL-only types)
+SQLITE_TABLES = [
+    "organizations",
+    "users",
+    "vehicles",
+    "zones",
+    "couriers",
+    "courier_vehicle_assignments",
+    "salaries",
+    "deliveries",
+    "geocode_cache",
+    "tickets",
+    "sla_definitions",
+    "sla_tracking",
+    "priority_queue_entries",
+    "customer_feedbacks",
+    "cod_transactions",
+    "cod_ledger_entries",
+    "courier_cod_balances",
+    "dashboard_rollups",
+    "feedback_daily_rollups",
+    "eos_liability_snapshots",
+]
+
+
+@pytest.fixture(scope="function")
+def sqlite_db() -> Generator[Session, None, None]:
+    """
+    In-memory SQLite session for unit tests that don't need PostgreSQL
+
+    Creates the ``SQLITE_TABLES``. Executed SQL is recorded in
+    ``session.info["statements"]`` for query-count assertions.
+    """
+    import app.models  # noqa: F401  (register all mappers)
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(
+        engine, tables=[Base.metadata.tables[name] for name in SQLITE_TABLES]
+    )
+    session = sessionmaker(bind=engine)()
+    session.info["statements"] = statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def db(sqlite_db: Session):
+    """
+    Alias for sqlite_db
+    """
+    return sqlite_db
+
+
 # ==================== FastAPI Client Fixtures ====================
 
 @pytest.fixture(scope="function")
@@ -0,0 +1,107 @@
+"""
+Benchmark for Field Decryption
+
+Decrypts 100k encrypted fields (20k couriers x 5 PII columns) the way an
+export does: one value at a time with a fresh AESGCM object, as
+EncryptedField did on every row load, then with the shared cipher, the
+worker pool and decrypt_attributes. Also times a list view over the same
+couriers that never reads the encrypted columns, which with lazy
+decryption does no crypto at all.
+
+Run with: pytest tests/performance -m performance -s
+"""
+
+import base64
+import os
+import time
+
+import pytest
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from app.core.encryption import FieldEncryptor, decrypt_attributes, encrypted_attribute
+
+COURIERS = 20_000
+FIELDS = ("national_id", "iqama_number", "passport_number", "bank_account_number", "iban")
+
+
+class ExportRow:
+    """Courier-shaped object holding ciphertext for the five PII columns"""
+
+    national_id = encrypted_attribute("_national_id")
+    iqama_number = encrypted_attribute("_iqama_number")
+    passport_number = encrypted_attribute("_passport_number")
+    bank_account_number = encrypted_attribute("_bank_account_number")
+    iban = encrypted_attribute("_iban")
+
+
+@pytest.fixture(scope="module")
+def encryptor():
+    return FieldEncryptor(master_key=os.urandom(32))
+
+
+@pytest.fixture(scope="module")
+def stored(encryptor):
+    values = [
+        f"{n:010d}"[:10] if field != "iban" else f"SA03{n:020d}"
+        for n in range(COURIERS)
+        for field in FIELDS
+    ]
+    return [encryptor.encrypt(value) for value in values]
+
+
+def make_rows(stored):
+    rows = []
+    for n in range(COURIERS):
+        row = ExportRow()
+        for k, field in enumerate(FIELDS):
+            setattr(row, f"_{field}", stored[n * len(FIELDS) + k])
+        rows.append(row)
+    return rows
+
+
+def per_value_cipher(key, value):
+    raw = base64.b64decode(value)
+    return AESGCM(key).decrypt(raw[:12], raw[12:], None).decode()
+
+
+@pytest.mark.slow
+def test_decrypt_100k_fields(encryptor, stored, monkeypatch):
+    monkeypatch.setattr("app.core.encryption.get_encryptor", lambda: encryptor)
+    key = encryptor._master_key
+
+    start = time.perf_counter()
+    baseline = [per_value_cipher(key, value) for value in stored]
+    per_value = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assert encryptor.decrypt_many(stored, workers=0) == baseline
+    shared = time.perf_counter() - start
+
+    workers = min(os.cpu_count() or 1, 8)
+    encryptor.decrypt_many(stored[:1000] * 30, workers=workers)  # start the pool
+    start = time.perf_counter()
+    assert encryptor.decrypt_many(stored, workers=workers) == baseline
+    pooled = time.perf_counter() - start
+
+    rows = make_rows(stored)
+    start = time.perf_counter()
+    decrypt_attributes(rows, *FIELDS, workers=workers)
+    export = [[getattr(row, field) for field in FIELDS] for row in rows]
+    exported = time.perf_counter() - start
+    assert [value for row in export for value in row] == baseline
+
+    rows = make_rows(stored)
+    start = time.perf_counter()
+    listed = [(row._national_id is not None) for row in rows]
+    list_view = time.perf_counter() - start
+
+    print(
+        f"\n{len(stored)} fields: per-value cipher {per_value * 1000:.0f}ms, "
+        f"shared cipher {shared * 1000:.0f}ms, {workers} workers {pooled * 1000:.0f}ms, "
+        f"export via decrypt_attributes {exported * 1000:.0f}ms, "
+        f"list view without PII {list_view * 1000:.1f}ms (eager load decrypted all of them)"
+    )
+    assert all(listed)
+    assert list_view < per_value / 100
+    if workers >= 2:
+        assert pooled < shared
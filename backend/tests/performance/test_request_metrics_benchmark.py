@@ -0,0 +1,46 @@
+"""
+Benchmark for Request Metrics Recording
+
+Measures the per-request cost PerformanceMiddleware adds for metrics:
+in-flight gauge updates, histogram recording and component timing.
+
+Run with: pytest tests/performance -m performance -s
+"""
+
+import time
+
+import pytest
+
+from app.core.request_timing import finish_request_timing, start_request_timing, timed
+from app.middleware.performance import PerformanceMetrics
+
+REQUESTS = 200_000
+ROUTES = [f"/api/v1/resource_{i}/{{item_id}}" for i in range(50)]
+
+
+@pytest.mark.slow
+def test_recording_overhead_per_request():
+    metrics = PerformanceMetrics()
+
+    started = time.perf_counter()
+    for i in range(REQUESTS):
+        token = start_request_timing()
+        metrics.request_started("GET")
+        with timed("cache"):
+            pass
+        components = finish_request_timing(token)
+        components["db"] = 0.002
+        metrics.request_finished("GET")
+        metrics.record_request(
+            0.001 * (i % 300),
+            200 if i % 20 else 500,
+            method="GET",
+            route=ROUTES[i % len(ROUTES)],
+            response_size=i % 50_000,
+            component_times=components,
+        )
+    per_request_us = (time.perf_counter() - started) / REQUESTS * 1e6
+
+    print(f"\nmetrics recording: {per_request_us:.2f}us per request")
+    assert metrics.get_metrics()["total_requests"] == REQUESTS
+    assert per_request_us < 20
@@ -0,0 +1,154 @@
+"""
+Benchmark for the Route Optimizer
+
+Compares routes from the optimizer against the nearest neighbour ordering it
+replaces, on a 120-stop van route around Riyadh and on VRPTW instances in
+Solomon's format. Put Solomon files (R101.txt, C101.txt, ...) in
+SOLOMON_INSTANCES_DIR to run the published instances; otherwise generated
+instances with the same layout (random R1 and clustered C1) are used.
+
+Run with: pytest tests/performance -m performance -s
+"""
+
+import math
+import os
+import random
+import time
+from pathlib import Path
+
+import pytest
+
+from app.core.performance_config import RouteOptimizerConfig
+from app.services.operations.route_optimizer import (
+    RouteOptimizer,
+    RouteStop,
+    TravelMatrix,
+    haversine_matrix,
+)
+
+SOLOMON_DIR = os.getenv("SOLOMON_INSTANCES_DIR")
+
+
+def read_solomon(path):
+    """Parse a Solomon VRPTW file into (vehicles, capacity, customers)"""
+    lines = [line.split() for line in Path(path).read_text().splitlines()]
+    vehicles, capacity = None, None
+    customers = []
+    for parts in lines:
+        if len(parts) == 2 and vehicles is None and all(p.isdigit() for p in parts):
+            vehicles, capacity = int(parts[0]), float(parts[1])
+        elif len(parts) == 7 and parts[0].isdigit():
+            customers.append(tuple(float(p) for p in parts))
+    return vehicles, capacity, customers
+
+
+def generate_solomon(kind, seed, size=100):
+    """Solomon-style instance: 100 customers on a 100x100 grid, depot at the centre"""
+    rng = random.Random(seed)
+    horizon = 230.0
+    customers = [(0, 40.0, 50.0, 0.0, 0.0, horizon, 0.0)]
+    centers = [(rng.uniform(10, 90), rng.uniform(10, 90)) for _ in range(10)]
+    for n in range(1, size + 1):
+        if kind == "C1":
+            cx, cy = centers[n % len(centers)]
+            x, y = cx + rng.gauss(0, 4), cy + rng.gauss(0, 4)
+        else:
+            x, y = rng.uniform(0, 100), rng.uniform(0, 100)
+        earliest = rng.uniform(0, horizon - 40)
+        customers.append((n, x, y, float(rng.randint(1, 30)), earliest, earliest + 30, 10.0))
+    return 25, 200.0, customers
+
+
+def solomon_problem(customers):
+    """Stops and Euclidean matrix (distance = travel time) for a Solomon instance"""
+    depot, rest = customers[0], customers[1:]
+    points = [(c[1], c[2]) for c in customers]
+    distances = [[math.dist(a, b) for b in points] for a in points]
+    stops = [
+        RouteStop(key=int(c[0]), latitude=c[2], longitude=c[1], demand=c[3],
+                  earliest=c[4], latest=c[5], service_minutes=c[6])
+        for c in rest
+    ]
+    return stops, TravelMatrix(distances, distances), depot[5]
+
+
+def solomon_instances():
+    if SOLOMON_DIR and Path(SOLOMON_DIR).is_dir():
+        files = sorted(Path(SOLOMON_DIR).glob("*.txt"))
+        return [(path.stem, read_solomon(path)) for path in files]
+    return [(f"{kind}-generated-{seed}", generate_solomon(kind, seed))
+            for kind in ("R1", "C1") for seed in (1, 2)]
+
+
+def nearest_neighbour(matrix, stops):
+    """Open route from the depot that always drives to the closest unvisited stop"""
+    current, remaining, total = 0, set(range(1, len(stops) + 1)), 0.0
+    while remaining:
+        nxt = min(remaining, key=lambda j: matrix.distances_km[current][j])
+        total += matrix.distances_km[current][nxt]
+        current = nxt
+        remaining.remove(nxt)
+    return total
+
+
+@pytest.mark.slow
+def test_riyadh_van_route():
+    rng = random.Random(2026)
+    depot = (24.7136, 46.6753)
+    stops = [
+        RouteStop(key=n, latitude=depot[0] + rng.uniform(-0.12, 0.12),
+                  longitude=depot[1] + rng.uniform(-0.12, 0.12))
+        for n in range(120)
+    ]
+    optimizer = RouteOptimizer(RouteOptimizerConfig(time_budget_ms=1000))
+
+    matrix = haversine_matrix([depot] + [(s.latitude, s.longitude) for s in stops], 30)
+    baseline = nearest_neighbour(matrix, stops)
+    start = time.perf_counter()
+    plan = optimizer.solve(stops, depot, objective="distance")
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"\nRiyadh 120 stops: nearest neighbour {baseline:.1f} km, "
+        f"insertion {plan.initial_cost:.1f} km, optimized {plan.distance_km:.1f} km "
+        f"({100 * (1 - plan.distance_km / baseline):.1f}% shorter, {plan.moves} moves) "
+        f"in {elapsed * 1000:.0f}ms"
+    )
+    assert not plan.unassigned
+    assert plan.distance_km < baseline
+    assert elapsed < 2.0
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("name,instance", solomon_instances())
+def test_solomon_instances(name, instance):
+    vehicles, capacity, customers = instance
+    stops, matrix, horizon = solomon_problem(customers)
+    optimizer = RouteOptimizer(
+        RouteOptimizerConfig(average_speed_kmh=60, service_minutes=10, time_budget_ms=2000)
+    )
+
+    start = time.perf_counter()
+    plan = optimizer.solve(
+        stops,
+        (customers[0][2], customers[0][1]),
+        vehicles=vehicles,
+        capacity=capacity,
+        matrix=matrix,
+        objective="distance",
+        return_to_depot=True,
+        max_route_minutes=horizon,
+    )
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"\n{name}: {len(plan.routes)} vehicles, distance {plan.initial_cost:.1f} -> "
+        f"{plan.cost:.1f}, {len(plan.unassigned)} unassigned in {elapsed * 1000:.0f}ms"
+    )
+    for route in plan.routes:
+        assert route.load <= capacity
+        assert route.duration_minutes <= horizon + 1e-6
+        for stop, arrival in zip(route.stops, route.arrivals):
+            assert stop.earliest - 1e-6 <= arrival <= stop.latest + 1e-6
+    assert plan.cost <= plan.initial_cost + 1e-9
+    assert elapsed < 5.0
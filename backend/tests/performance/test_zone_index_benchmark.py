@@ -0,0 +1,80 @@
+"""
+Benchmark for Zone Point Lookups
+
+Times bulk point-in-zone lookups through the zone index for a city of 500
+irregular zones, against the per-zone ray cast loop it replaces.
+
+Run with: pytest tests/performance -m performance -s
+"""
+
+import math
+import random
+import time
+
+import pytest
+
+from app.services.operations.zone_index import ZoneGeometryIndex, compile_zone
+
+ZONES = 500
+POINTS = 100_000
+
+
+@pytest.fixture(scope="module")
+def city():
+    rng = random.Random(2026)
+    zones = []
+    for zone_id in range(1, ZONES + 1):
+        center_lng, center_lat = 46.4 + rng.random() * 0.6, 24.5 + rng.random() * 0.5
+        sides = rng.randint(8, 60)
+        ring = []
+        for k in range(sides):
+            radius = 0.01 + rng.random() * 0.02
+            angle = 2 * math.pi * k / sides
+            ring.append(
+                [center_lng + radius * math.cos(angle), center_lat + radius * math.sin(angle)]
+            )
+        zones.append(compile_zone(zone_id, {"type": "Polygon", "coordinates": [ring + [ring[0]]]}))
+    points = [(24.45 + rng.random() * 0.6, 46.35 + rng.random() * 0.7) for _ in range(POINTS)]
+    return zones, points
+
+
+def per_zone_loop(zones, latitude, longitude):
+    best = None
+    for zone in zones:
+        min_x, min_y, max_x, max_y = zone.bbox
+        if not (min_x <= longitude <= max_x and min_y <= latitude <= max_y):
+            continue
+        inside = False
+        for x1, y1, x2, y2 in zone.segments:
+            if (y1 > latitude) != (y2 > latitude) and longitude < x1 + (latitude - y1) * (
+                x2 - x1
+            ) / (y2 - y1):
+                inside = not inside
+        if inside and (best is None or (zone.area, zone.zone_id) < (best.area, best.zone_id)):
+            best = zone
+    return best.zone_id if best else None
+
+
+@pytest.mark.slow
+def test_bulk_lookup_500_zones(city):
+    zones, points = city
+
+    started = time.perf_counter()
+    index = ZoneGeometryIndex(zones)
+    build = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = index.locate_many(points)
+    per_point_us = (time.perf_counter() - started) / POINTS * 1e6
+
+    sample = points[:2000]
+    started = time.perf_counter()
+    expected = [per_zone_loop(zones, lat, lng) for lat, lng in sample]
+    loop_us = (time.perf_counter() - started) / len(sample) * 1e6
+
+    print(
+        f"\nzone index: build {build:.3f}s for {ZONES} zones, "
+        f"{per_point_us:.2f}us per point (per-zone loop: {loop_us:.1f}us)"
+    )
+    assert result[: len(sample)] == expected
+    assert per_point_us < 20
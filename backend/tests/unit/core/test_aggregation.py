@@ -0,0 +1,276 @@
+"""
+Unit Tests for the SQL Aggregation Builder
+
+Tests single-query metrics:
+- FILTER counts, per-value counts, sums and averages in one statement
+- Percentiles and durations
+- Queue metrics, SLA compliance report and ticket statistics
+- Caching per (organization, period)
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.core.aggregation import Aggregation, cached_metrics
+from app.models.operations.priority_queue import PriorityQueueEntry, QueuePriority, QueueStatus
+from app.models.operations.sla import SLADefinition, SLAStatus, SLATracking, SLAType
+from app.models.support.ticket import Ticket, TicketCategory, TicketPriority, TicketStatus
+from app.services.operations.priority_queue_service import priority_queue_service
+from app.services.operations.sla_service import sla_tracking_service
+from app.services.support.ticket_service import ticket_service
+
+ORG = 1
+NOW = datetime(2026, 10, 18, 12, 0, 0)
+
+
+def add_entry(db, number, status, priority=QueuePriority.NORMAL, wait=None, org=ORG, **extra):
+    entry = PriorityQueueEntry(
+        organization_id=org,
+        queue_number=f"Q-{number}",
+        delivery_id=number,
+        priority=priority,
+        status=status,
+        base_priority_score=50,
+        total_priority_score=50,
+        queued_at=NOW,
+        sla_deadline=NOW + timedelta(hours=4),
+        time_in_queue_minutes=wait,
+        **extra,
+    )
+    db.add(entry)
+    return entry
+
+
+def add_ticket(db, number, status=TicketStatus.OPEN, org=ORG, **extra):
+    ticket = Ticket(
+        organization_id=org,
+        ticket_id=f"TKT-{number}",
+        created_by=1,
+        category=TicketCategory.DELIVERY,
+        subject="Late",
+        description="Late parcel",
+        status=status,
+        created_at=NOW,
+        **extra,
+    )
+    db.add(ticket)
+    return ticket
+
+
+class TestAggregation:
+    """Tests for the builder"""
+
+    def test_one_statement_for_all_metrics(self, db):
+        add_entry(db, 1, QueueStatus.QUEUED, wait=10)
+        add_entry(db, 2, QueueStatus.COMPLETED, priority=QueuePriority.URGENT, wait=20)
+        add_entry(db, 3, QueueStatus.COMPLETED, wait=40)
+        add_entry(db, 4, QueueStatus.QUEUED, org=2)
+        db.commit()
+        db.info["statements"].clear()
+
+        result = (
+            Aggregation(db, PriorityQueueEntry, PriorityQueueEntry.organization_id == ORG)
+            .count("total")
+            .count("completed", PriorityQueueEntry.status == QueueStatus.COMPLETED)
+            .count_each("by_priority", PriorityQueueEntry.priority, QueuePriority)
+            .sum("wait_sum", PriorityQueueEntry.time_in_queue_minutes)
+            .avg("wait_avg", PriorityQueueEntry.time_in_queue_minutes)
+            .execute()
+        )
+
+        assert len(db.info["statements"]) == 1
+        assert result["total"] == 3
+        assert result["completed"] == 2
+        assert result["by_priority"]["URGENT"] == 1
+        assert result["by_priority"]["NORMAL"] == 2
+        assert result["by_priority"]["CRITICAL"] == 0
+        assert result["wait_sum"] == 70
+        assert result["wait_avg"] == pytest.approx(70 / 3)
+
+    def test_percentile_and_duration(self, db):
+        for i, wait in enumerate([10, 20, 30, 40, 50]):
+            add_entry(
+                db,
+                i,
+                QueueStatus.ASSIGNED,
+                wait=wait,
+                processing_started_at=NOW,
+                assigned_at=NOW + timedelta(minutes=wait),
+            )
+        db.commit()
+        agg = Aggregation(db, PriorityQueueEntry)
+
+        result = (
+            agg.percentile("p50", PriorityQueueEntry.time_in_queue_minutes, 0.5)
+            .percentile("p90", PriorityQueueEntry.time_in_queue_minutes, 0.9)
+            .avg(
+                "avg_seconds",
+                agg.seconds_between(
+                    PriorityQueueEntry.assigned_at, PriorityQueueEntry.processing_started_at
+                ),
+            )
+            .execute()
+        )
+
+        assert result["p50"] == pytest.approx(30)
+        assert result["p90"] == pytest.approx(46)
+        assert result["avg_seconds"] == pytest.approx(30 * 60, rel=1e-4)
+
+    def test_filtered_percentile_compiles_for_postgresql(self):
+        # Never connects: the statement is only compiled
+        db = Session(bind=create_engine("postgresql+psycopg2://localhost/metrics"))
+        query = (
+            Aggregation(db, PriorityQueueEntry)
+            .count("assigned", PriorityQueueEntry.status == QueueStatus.ASSIGNED)
+            .percentile(
+                "p90",
+                PriorityQueueEntry.time_in_queue_minutes,
+                0.9,
+                PriorityQueueEntry.status == QueueStatus.ASSIGNED,
+            )
+            ._metrics_query()
+        )
+
+        sql = " ".join(str(query.statement.compile(dialect=postgresql.dialect())).split())
+
+        assert "count(*) FILTER (WHERE priority_queue_entries.status = %(status_1)s)" in sql
+        assert (
+            "percentile_cont(%(percentile_cont_1)s) WITHIN GROUP (ORDER BY CASE WHEN "
+            "(priority_queue_entries.status = %(status_2)s) "
+            "THEN priority_queue_entries.time_in_queue_minutes END)"
+        ) in sql
+
+    def test_empty_table(self, db):
+        result = (
+            Aggregation(db, PriorityQueueEntry)
+            .count("total")
+            .avg("wait", PriorityQueueEntry.time_in_queue_minutes)
+            .percentile("p90", PriorityQueueEntry.time_in_queue_minutes, 0.9)
+            .execute()
+        )
+
+        assert result == {"total": 0, "wait": None, "p90": None}
+
+
+class TestEndpointMetrics:
+    """Tests for the services built on the builder"""
+
+    def test_queue_metrics(self, db):
+        add_entry(db, 1, QueueStatus.QUEUED, wait=5)
+        add_entry(db, 2, QueueStatus.COMPLETED, wait=15, was_sla_met=True, is_escalated=True)
+        add_entry(db, 3, QueueStatus.COMPLETED, wait=25, was_sla_met=False)
+        add_entry(db, 4, QueueStatus.EXPIRED, priority=QueuePriority.CRITICAL)
+        db.commit()
+
+        metrics = priority_queue_service._compute_metrics(db, ORG)
+
+        assert metrics["total_entries"] == 4
+        assert metrics["queued_entries"] == 1
+        assert metrics["completed_entries"] == 2
+        assert metrics["expired_entries"] == 1
+        assert metrics["avg_wait_time_minutes"] == 15
+        assert metrics["p50_wait_time_minutes"] == 15
+        assert metrics["sla_compliance_rate"] == 50
+        assert metrics["escalation_rate"] == 25
+        assert metrics["entries_by_priority"] == {"NORMAL": 3, "CRITICAL": 1}
+
+    def test_sla_compliance_report(self, db):
+        definition = SLADefinition(
+            organization_id=ORG,
+            sla_code="DT",
+            sla_name="Delivery time",
+            sla_type=SLAType.DELIVERY_TIME,
+            target_value=60,
+        )
+        db.add(definition)
+        db.flush()
+        rows = [
+            (SLAStatus.MET, 60, 66, False, None),
+            (SLAStatus.MET, 60, 54, False, None),
+            (SLAStatus.BREACHED, 60, None, True, "Traffic"),
+            (SLAStatus.AT_RISK, 60, None, False, None),
+        ]
+        for i, (state, target, actual, breached, reason) in enumerate(rows):
+            db.add(
+                SLATracking(
+                    organization_id=ORG,
+                    sla_definition_id=definition.id,
+                    tracking_number=f"SLA-{i}",
+                    start_time=NOW,
+                    target_completion_time=NOW + timedelta(hours=1),
+                    status=state,
+                    target_value=target,
+                    actual_value=actual,
+                    is_breached=breached,
+                    breach_reason=reason,
+                    penalty_applied=10 if breached else 0,
+                )
+            )
+        db.commit()
+
+        report = sla_tracking_service._compute_compliance_report(
+            db, ORG, NOW - timedelta(days=1), SLAType.DELIVERY_TIME
+        )
+
+        assert report["total_tracked"] == 4
+        assert report["total_met"] == 2
+        assert report["total_breached"] == 1
+        assert report["total_at_risk"] == 1
+        assert report["compliance_rate"] == 50
+        assert report["avg_variance_percentage"] == pytest.approx(0)
+        assert report["total_penalties"] == 10
+        assert report["top_breach_reasons"] == [{"reason": "Traffic", "count": 1}]
+
+    def test_ticket_statistics(self, db):
+        add_ticket(db, 1, priority=TicketPriority.HIGH, sla_due_at=NOW, sla_breached=True)
+        add_ticket(
+            db,
+            2,
+            status=TicketStatus.RESOLVED,
+            resolved_at=NOW + timedelta(hours=4),
+            first_response_at=NOW + timedelta(minutes=30),
+            sla_due_at=NOW,
+        )
+        add_ticket(db, 3, status=TicketStatus.PENDING, is_merged=True)
+        add_ticket(db, 4, org=2)
+        db.commit()
+
+        stats = ticket_service._compute_statistics(db, ORG)
+
+        assert stats["total"] == 3
+        assert stats["open"] == 1
+        assert stats["waiting"] == 1
+        assert stats["resolved"] == 1
+        assert stats["by_category"]["delivery"] == 3
+        assert stats["by_priority"]["high"] == 1
+        assert stats["avg_resolution_time_hours"] == 4
+        assert stats["avg_first_response_minutes"] == 30
+        assert stats["sla_compliance_rate"] == 50
+        assert stats["merged_count"] == 1
+        assert stats["escalated_count"] == 0
+
+
+class TestCachedMetrics:
+    """Tests for per-(organization, period) caching"""
+
+    def test_cached_per_org_and_period(self):
+        namespace = f"test_metrics_{uuid.uuid4().hex}"
+        calls = []
+
+        def compute(value):
+            def run():
+                calls.append(value)
+                return {"value": value}
+
+            return run
+
+        assert cached_metrics(namespace, 1, "week", compute(1)) == {"value": 1}
+        assert cached_metrics(namespace, 1, "week", compute(2)) == {"value": 1}
+        assert cached_metrics(namespace, 2, "week", compute(3)) == {"value": 3}
+        assert cached_metrics(namespace, 1, "month", compute(4)) == {"value": 4}
+        assert calls == [1, 3, 4]
@@ -0,0 +1,182 @@
+"""
+Unit Tests for Brute Force Tracking
+
+Tests:
+- Sliding-window counts, lockout and expiry
+- Bounded local mirror
+- Shared state across trackers through Redis
+- BruteForceProtector and SecurityMonitor.detect_brute_force on the tracker
+"""
+
+import pytest
+
+from app.core import brute_force
+from app.core.brute_force import BruteForceTracker
+from app.core.security import BruteForceProtector
+from app.core.security_config import BruteForceProtection
+from app.core.security_monitor import AlertType, SecurityMonitor
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def config():
+    return BruteForceProtection(max_attempts=3, lockout_duration_minutes=10, window_buckets=10)
+
+
+@pytest.fixture
+def local_tracker(config, clock):
+    tracker = BruteForceTracker(config=config, clock=clock)
+    tracker.redis = None
+    return tracker
+
+
+@pytest.fixture
+def redis_client():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+class TestLocalTracker:
+    """Tests for the in-process fallback"""
+
+    def test_window_slides(self, local_tracker, clock):
+        assert local_tracker.record_failure("a@x.sa") == 1
+        clock.now += 5 * 60
+        assert local_tracker.record_failure("a@x.sa") == 2
+
+        # The first attempt leaves the 10 minute window
+        clock.now += 6 * 60
+        assert local_tracker.failed_attempts("a@x.sa") == 1
+        assert not local_tracker.is_locked_out("a@x.sa")
+
+    def test_lockout_and_expiry(self, local_tracker, clock):
+        for _ in range(3):
+            local_tracker.record_failure("a@x.sa")
+
+        assert local_tracker.is_locked_out("a@x.sa")
+        clock.now += 10 * 60 + 1
+        assert not local_tracker.is_locked_out("a@x.sa")
+
+    def test_clear(self, local_tracker):
+        for _ in range(3):
+            local_tracker.record_failure("a@x.sa")
+
+        local_tracker.clear("a@x.sa")
+
+        assert not local_tracker.is_locked_out("a@x.sa")
+        assert local_tracker.failed_attempts("a@x.sa") == 0
+
+    def test_mirror_is_bounded(self, config, clock):
+        config.max_tracked_identifiers = 100
+        tracker = BruteForceTracker(config=config, clock=clock)
+        tracker.redis = None
+
+        for n in range(1000):
+            tracker.record_failure(f"10.0.{n // 256}.{n % 256}")
+
+        assert tracker.tracked_identifiers == 100
+        assert tracker.failed_attempts("10.0.3.231") == 1
+        assert tracker.failed_attempts("10.0.0.0") == 0
+
+
+class TestRedisTracker:
+    """Tests for state shared through Redis"""
+
+    def test_workers_share_counts_and_lockouts(self, redis_client, config, clock):
+        first = BruteForceTracker(redis_client, config=config, clock=clock)
+        second = BruteForceTracker(redis_client, config=config, clock=clock)
+
+        first.record_failure("a@x.sa")
+        second.record_failure("a@x.sa")
+        assert first.failed_attempts("a@x.sa") == 2
+        assert second.record_failure("a@x.sa") == 3
+
+        assert first.is_locked_out("a@x.sa")
+        assert redis_client.ttl(brute_force.LOCKOUT_KEY.format("a@x.sa")) == 600
+        assert redis_client.ttl(brute_force.ATTEMPTS_KEY.format("a@x.sa")) == 660
+
+        second.clear("a@x.sa")
+        assert not redis_client.exists(brute_force.ATTEMPTS_KEY.format("a@x.sa"))
+
+    def test_clear_on_another_worker_unlocks(self, redis_client, config, clock):
+        first = BruteForceTracker(redis_client, config=config, clock=clock)
+        second = BruteForceTracker(redis_client, config=config, clock=clock)
+        for _ in range(3):
+            first.record_failure("a@x.sa")
+        assert first.is_locked_out("a@x.sa")
+
+        second.clear("a@x.sa")
+
+        assert not first.is_locked_out("a@x.sa")
+
+    def test_mirror_answers_while_redis_is_down(self, redis_client, config, clock, monkeypatch):
+        tracker = BruteForceTracker(redis_client, config=config, clock=clock)
+        for _ in range(3):
+            tracker.record_failure("a@x.sa")
+
+        def down(*args, **kwargs):
+            raise brute_force.redis.ConnectionError("down")
+
+        monkeypatch.setattr(redis_client, "pttl", down)
+        assert tracker.is_locked_out("a@x.sa")
+        clock.now += 10 * 60 + 1
+        assert not tracker.is_locked_out("a@x.sa")
+
+    def test_expired_buckets_are_pruned(self, redis_client, config, clock):
+        tracker = BruteForceTracker(redis_client, config=config, clock=clock)
+
+        tracker.record_failure("a@x.sa")
+        clock.now += 11 * 60
+        assert tracker.record_failure("a@x.sa") == 1
+        assert redis_client.hlen(brute_force.ATTEMPTS_KEY.format("a@x.sa")) == 1
+
+
+class TestConsumers:
+    """Tests for BruteForceProtector and the security monitor"""
+
+    @pytest.fixture(autouse=True)
+    def shared_tracker(self, monkeypatch, local_tracker):
+        monkeypatch.setattr(brute_force, "_brute_force_tracker", local_tracker)
+        return local_tracker
+
+    def test_protector(self, config, monkeypatch):
+        monkeypatch.setattr(brute_force.security_config, "brute_force", config)
+
+        assert not BruteForceProtector.record_failed_attempt("a@x.sa")
+        assert BruteForceProtector.get_remaining_attempts("a@x.sa") == 2
+        BruteForceProtector.record_failed_attempt("a@x.sa")
+        assert BruteForceProtector.record_failed_attempt("a@x.sa")
+        assert BruteForceProtector.is_locked_out("a@x.sa")
+        assert BruteForceProtector.get_remaining_attempts("a@x.sa") == 0
+
+        BruteForceProtector.clear_attempts("a@x.sa")
+        assert BruteForceProtector.get_remaining_attempts("a@x.sa") == 3
+
+    def test_monitor_reads_tracker_counts(self, shared_tracker, config, monkeypatch):
+        monkeypatch.setattr(brute_force.security_config, "brute_force", config)
+        monitor = SecurityMonitor()
+        monitor.redis = None
+        monitor._memory_alerts = []
+
+        shared_tracker.record_failure("a@x.sa")
+        assert monitor.detect_brute_force("a@x.sa") is None
+
+        shared_tracker.record_failure("a@x.sa")
+        shared_tracker.record_failure("a@x.sa")
+        alert = monitor.detect_brute_force("a@x.sa")
+
+        assert alert.alert_type == AlertType.BRUTE_FORCE
+        assert alert.metadata["failed_attempts"] == 3
+        assert alert.metadata["time_window"] == 10
@@ -0,0 +1,158 @@
+"""
+Unit Tests for Field Encryption
+
+Tests:
+- EncryptedField round trips and legacy plaintext reads
+- Shared ciphers, bulk decryption and lazily decrypted attributes
+- Blind index normalization, determinism and key versions
+"""
+
+import pytest
+
+from app.core.encryption import (
+    BlindIndexer,
+    EncryptedField,
+    EncryptionError,
+    FieldEncryptor,
+    decrypt_attributes,
+    encrypted_attribute,
+    get_encryptor,
+    looks_encrypted,
+)
+from app.core.security_config import security_config
+
+
+class Record:
+    """Plain class standing in for a model with an encrypted column"""
+
+    iban = encrypted_attribute("_iban")
+
+    def __init__(self, iban=None):
+        self._iban = None
+        self.iban = iban
+
+
+@pytest.fixture
+def count_decrypts(monkeypatch):
+    calls = []
+    encryptor = get_encryptor()
+    decrypt = encryptor.decrypt
+
+    def counting(value):
+        calls.append(value)
+        return decrypt(value)
+
+    monkeypatch.setattr(encryptor, "decrypt", counting)
+    return calls
+
+
+@pytest.fixture
+def indexer():
+    return BlindIndexer([("v2", b"new-key"), ("v1", b"old-key")])
+
+
+class TestEncryptedField:
+    """Tests for the EncryptedField column type"""
+
+    def test_round_trip_is_randomized(self):
+        field = EncryptedField()
+        first = field.process_bind_param("2123456789", None)
+        second = field.process_bind_param("2123456789", None)
+
+        assert first != second and looks_encrypted(first)
+        assert field.process_result_value(first, None) == "2123456789"
+        assert field.process_bind_param(None, None) is None
+
+    def test_legacy_and_foreign_values(self):
+        field = EncryptedField()
+        foreign = FieldEncryptor(master_key=b"k" * 32).encrypt("2123456789")
+
+        assert field.process_result_value("SA0380000000608010167519", None) == (
+            "SA0380000000608010167519"
+        )
+        assert field.process_result_value(foreign, None).startswith("[ENCRYPTED: ")
+
+
+class TestBulkAndLazyDecryption:
+    """Tests for cipher reuse, decrypt_many and encrypted_attribute"""
+
+    def test_ciphers_are_shared_per_key(self):
+        key = b"s" * 32
+        assert FieldEncryptor(master_key=key)._cipher is FieldEncryptor(master_key=key)._cipher
+        assert FieldEncryptor()._cipher is get_encryptor()._cipher
+
+    def test_decrypt_many(self, monkeypatch):
+        encryptor = get_encryptor()
+        values = [encryptor.encrypt(f"SA03{n:020d}") for n in range(50)] + [None, "legacy"]
+        expected = [f"SA03{n:020d}" for n in range(50)] + [None, "legacy"]
+
+        assert encryptor.decrypt_many(values) == expected
+
+        monkeypatch.setattr(security_config.encryption, "bulk_decrypt_min_parallel", 10)
+        monkeypatch.setattr(security_config.encryption, "bulk_decrypt_chunk_size", 16)
+        assert encryptor.decrypt_many(values, workers=2) == expected
+
+    def test_attributes_decrypt_once_on_access(self, count_decrypts):
+        record = Record("SA0380000000608010167519")
+
+        assert looks_encrypted(record._iban)
+        assert record.iban == "SA0380000000608010167519"
+        assert count_decrypts == []
+
+        # Reloaded value: decrypted on first read only
+        record._iban = get_encryptor().encrypt("SA4420000001234567891234")
+        assert count_decrypts == []
+        assert record.iban == record.iban == "SA4420000001234567891234"
+        assert len(count_decrypts) == 1
+
+        record.iban = None
+        assert record._iban is None and record.iban is None
+
+    def test_decrypt_attributes(self, count_decrypts):
+        records = [Record(f"SA03{n:020d}") for n in range(5)] + [Record()]
+        for record in records[:5]:
+            record._iban = get_encryptor().encrypt(record.iban)
+
+        decrypt_attributes(records, "iban")
+        assert len(count_decrypts) == 5
+
+        assert [record.iban for record in records] == [f"SA03{n:020d}" for n in range(5)] + [None]
+        assert len(count_decrypts) == 5
+
+
+class TestBlindIndexer:
+    """Tests for blind index digests"""
+
+    def test_digests_are_deterministic_normalized_and_per_field(self, indexer):
+        digest = indexer.compute("iqama_number", "2123 456-789")
+
+        assert digest == indexer.compute("iqama_number", "2123456789")
+        assert digest.startswith("v2$") and len(digest) == 3 + BlindIndexer.DIGEST_LENGTH
+        assert digest != indexer.compute("national_id", "2123456789")
+        assert indexer.compute("iban", "sa03 8000") == indexer.compute("iban", "SA038000")
+        assert indexer.compute("iqama_number", None) is None
+        assert indexer.compute("iqama_number", " - ") is None
+
+    def test_phone_numbers(self, indexer):
+        forms = ["0501234567", "+966 50 123 4567", "00966501234567", "501234567"]
+        assert len({indexer.compute("mobile_number", phone, "phone") for phone in forms}) == 1
+
+    def test_key_rotation(self, indexer):
+        old = BlindIndexer([("v1", b"old-key")])
+        stored = old.compute("iqama_number", "2123456789")
+
+        assert stored in indexer.candidates("iqama_number", "2123456789")
+        assert indexer.version_of(stored) == "v1"
+        assert not indexer.is_current(stored)
+        assert indexer.is_current(indexer.compute("iqama_number", "2123456789"))
+
+    def test_keys_from_environment(self, monkeypatch):
+        monkeypatch.setenv("BLIND_INDEX_KEYS", "v3:three, v2:two")
+        assert BlindIndexer().versions == ["v3", "v2"]
+
+        monkeypatch.setenv("BLIND_INDEX_KEYS", "v3")
+        with pytest.raises(EncryptionError):
+            BlindIndexer()
+
+        with pytest.raises(EncryptionError):
+            BlindIndexer([("v1", b"a"), ("v1", b"b")])
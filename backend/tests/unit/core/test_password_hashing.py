@@ -0,0 +1,142 @@
+"""
+Unit Tests for the Password Hashing Executor
+
+Tests:
+- Verify and hash inline and in the process pool
+- Admission control sheds with 503 and Retry-After
+- Opportunistic rehash of outdated hashes
+- Metrics and Prometheus output
+"""
+
+import threading
+
+import bcrypt
+import pytest
+
+from app.core.exceptions import ServiceUnavailableException
+from app.core.password_hashing import PasswordHashingExecutor
+from app.core.performance_config import PasswordHashingConfig
+from app.core.security import BCRYPT_ROUNDS, PasswordHasher
+
+
+@pytest.fixture(scope="module")
+def hashed():
+    return PasswordHasher.hash_password("correct horse")
+
+
+def make_executor(**overrides):
+    config = PasswordHashingConfig(**{"workers": 0, **overrides})
+    return PasswordHashingExecutor(config)
+
+
+class TestVerifyAndHash:
+    """Tests for verify and hash"""
+
+    def test_inline(self, hashed):
+        executor = make_executor()
+
+        assert executor.verify("correct horse", hashed)
+        assert not executor.verify("wrong", hashed)
+        assert not executor.verify("correct horse", "")
+        assert PasswordHasher.verify_password("secret", executor.hash("secret"))
+        assert executor.in_flight == 0
+
+        metrics = executor.get_metrics()
+        assert metrics["operations"]["verify"]["count"] == 2
+        assert metrics["operations"]["hash"]["count"] == 1
+
+    def test_process_pool(self, hashed):
+        executor = make_executor(workers=1)
+        try:
+            assert executor.verify("correct horse", hashed)
+            assert not executor.verify("wrong", hashed)
+        finally:
+            executor.shutdown()
+        assert executor.in_flight == 0
+
+
+class TestAdmissionControl:
+    """Tests for shedding when saturated"""
+
+    def test_saturated_calls_are_shed(self, hashed):
+        executor = make_executor(max_in_flight=0, retry_after_seconds=3)
+
+        with pytest.raises(ServiceUnavailableException) as exc_info:
+            executor.verify("correct horse", hashed)
+
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers["Retry-After"] == "3"
+        assert executor.get_metrics()["rejected"] == 1
+        assert executor.in_flight == 0
+
+
+class TestRehash:
+    """Tests for opportunistic rehash after login"""
+
+    def test_current_hash_is_left_alone(self, hashed, monkeypatch):
+        executor = make_executor()
+        stored = []
+        monkeypatch.setattr(executor, "_store_rehash", lambda *args: stored.append(args))
+
+        assert not executor.rehash_if_needed(1, "correct horse", hashed)
+        assert stored == []
+
+    def test_outdated_bcrypt_cost_is_rehashed(self, monkeypatch):
+        legacy = "bcrypt$" + bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4)).decode()
+        assert BCRYPT_ROUNDS != 4
+        executor = make_executor()
+        stored = []
+
+        def store(*args):
+            stored.append((threading.current_thread().name, *args))
+
+        monkeypatch.setattr(executor, "_store_rehash", store)
+
+        assert executor.rehash_if_needed(7, "secret", legacy)
+        executor._rehash_queue.join()
+
+        # Hashed and written on the rehash thread even without pool workers
+        [(thread, user_id, old_hash, new_hash)] = stored
+        assert thread == "password-rehash"
+        assert (user_id, old_hash) == (7, legacy)
+        assert executor.in_flight == 0
+        assert not PasswordHasher.needs_rehash(new_hash)
+        assert PasswordHasher.verify_password("secret", new_hash)
+
+    def test_rehash_from_pool_is_stored_on_rehash_thread(self, monkeypatch):
+        legacy = "bcrypt$" + bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4)).decode()
+        executor = make_executor(workers=1)
+        threads = []
+        monkeypatch.setattr(
+            executor, "_store_rehash", lambda *args: threads.append(threading.current_thread().name)
+        )
+        try:
+            assert executor.rehash_if_needed(7, "secret", legacy)
+            executor._rehash_queue.join()
+        finally:
+            executor.shutdown()
+
+        assert threads == ["password-rehash"]
+        assert executor.get_metrics()["operations"]["rehash"]["count"] == 1
+
+    def test_rehash_is_skipped_under_load(self, monkeypatch):
+        executor = make_executor(max_in_flight=1)
+        monkeypatch.setattr(executor, "_store_rehash", lambda *args: None)
+
+        assert not executor.rehash_if_needed(7, "secret", "legacy-plain")
+        assert executor.get_metrics()["rejected"] == 0
+
+
+class TestMetrics:
+    """Tests for Prometheus output"""
+
+    def test_render_prometheus(self, hashed):
+        executor = make_executor()
+        executor.verify("correct horse", hashed)
+
+        text = executor.render_prometheus()
+
+        assert 'barq_password_hash_duration_seconds_count{operation="verify"} 1' in text
+        assert 'barq_password_hash_duration_seconds_bucket{operation="verify",le="+Inf"} 1' in text
+        assert "barq_password_hash_in_flight 0" in text
+        assert "barq_password_hash_rejected_total 0" in text
@@ -0,0 +1,160 @@
+"""
+Unit Tests for Request Performance Metrics
+
+Tests PerformanceMiddleware metrics:
+- Per-route latency and size histograms with percentile estimates
+- DB/cache/external time per request through context variables
+- Prometheus text rendering
+- Aggregation across worker processes
+"""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.core.request_timing import current_request_timing, record_time, timed
+from app.middleware import performance
+from app.middleware.performance import (
+    MultiprocessCollector,
+    PerformanceMetrics,
+    PerformanceMiddleware,
+    render_prometheus,
+)
+
+
+@pytest.fixture
+def metrics():
+    metrics = PerformanceMetrics()
+    with patch.object(performance, "performance_metrics", metrics):
+        yield metrics
+
+
+@pytest.fixture
+def client(metrics):
+    app = FastAPI()
+    app.add_middleware(PerformanceMiddleware)
+
+    @app.get("/couriers/{courier_id}")
+    def get_courier(courier_id: int):
+        with timed("cache"):
+            pass
+        record_time("external", 0.25)
+        return {"id": courier_id, "padding": "x" * 2000}
+
+    @app.get("/fail")
+    def fail():
+        raise HTTPException(status_code=404, detail="missing")
+
+    return TestClient(app)
+
+
+class TestPerformanceMetrics:
+    """Tests for the metrics registry"""
+
+    def test_per_route_histograms_and_percentiles(self, metrics):
+        for i in range(100):
+            metrics.record_request(0.002 if i < 90 else 0.4, 200, route="/a", response_size=500)
+        metrics.record_request(0.05, 500, route="/b", method="POST")
+
+        result = metrics.get_metrics()
+
+        assert result["total_requests"] == 101
+        assert result["total_errors"] == 1
+        assert 0.001 <= result["p50_response_time"] <= 0.0025
+        assert 0.25 <= result["p95_response_time"] <= 0.4
+        route_a = next(r for r in result["routes"] if r["route"] == "/a")
+        assert route_a["requests"] == 100
+        assert route_a["avg_response_size"] == 500
+        assert route_a["p99_response_time"] <= 0.4
+
+    def test_in_flight_and_reset(self, metrics):
+        metrics.request_started("GET")
+        metrics.request_started("GET")
+        metrics.request_finished("GET")
+        metrics.record_request(0.01, 200)
+        metrics.reset()
+
+        result = metrics.get_metrics()
+        assert result["in_flight"] == 1
+        assert result["total_requests"] == 0
+
+
+class TestMiddleware:
+    """Tests for recording through PerformanceMiddleware"""
+
+    def test_records_route_template_size_and_components(self, client, metrics):
+        response = client.get("/couriers/7")
+        client.get("/couriers/8")
+        client.get("/nowhere")
+        client.get("/fail")
+
+        routes = metrics.snapshot()["routes"]
+        assert set(routes) == {"GET /couriers/{courier_id}", "GET <unmatched>", "GET /fail"}
+        courier = routes["GET /couriers/{courier_id}"]
+        assert courier["count"] == 2
+        assert courier["size_sum"] == 2 * len(response.content)
+        assert courier["components"]["external"] == 0.5
+        assert set(courier["components"]) == {"db", "cache", "external"}
+        assert routes["GET /fail"]["errors"] == 1
+        assert metrics.snapshot()["in_flight"] == {"GET": 0}
+        assert "external;dur=250.0" in response.headers["server-timing"]
+
+    def test_timing_is_noop_outside_requests(self):
+        with timed("cache"):
+            pass
+
+        assert current_request_timing() is None
+
+
+class TestPrometheus:
+    """Tests for the text exposition"""
+
+    def test_render(self, metrics):
+        metrics.record_request(0.003, 200, route='/a"b', response_size=100,
+                               component_times={"db": 0.001})
+        metrics.record_request(0.2, 201, route='/a"b', response_size=5000)
+        metrics.request_started("GET")
+
+        text = render_prometheus(metrics.collect())
+
+        labels = 'method="GET",route="/a\\"b"'
+        assert "# TYPE barq_http_request_duration_seconds histogram" in text
+        assert f'barq_http_request_duration_seconds_bucket{{{labels},le="0.005"}} 1' in text
+        assert f'barq_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+        assert f"barq_http_request_duration_seconds_count{{{labels}}} 2" in text
+        assert f'barq_http_requests_total{{{labels},status="201"}} 1' in text
+        assert f'barq_http_response_size_bytes_bucket{{{labels},le="256"}} 1' in text
+        assert f'barq_http_request_component_seconds_total{{{labels},component="db"}} 0.001' in text
+        assert 'barq_http_requests_in_flight{method="GET"} 1' in text
+        assert text.endswith("\n")
+
+
+class TestMultiprocessCollector:
+    """Tests for aggregation across workers"""
+
+    def test_merges_worker_snapshots(self, tmp_path):
+        collector = MultiprocessCollector(str(tmp_path))
+        metrics = PerformanceMetrics(collector=collector, flush_interval=60)
+        metrics.record_request(0.01, 200, route="/a")
+        metrics.request_started("GET")
+
+        other = PerformanceMetrics()
+        other.record_request(0.02, 500, route="/a")
+        other.request_started("GET")
+        exited = dict(other.snapshot(), pid=2**22 + 1)
+        with open(os.path.join(tmp_path, "performance_exited.json"), "w") as f:
+            json.dump(exited, f)
+
+        merged = metrics.collect()
+
+        route = merged["routes"]["GET /a"]
+        assert route["count"] == 2
+        assert route["errors"] == 1
+        assert route["status"] == {"200": 1, "500": 1}
+        # The exited worker's requests stay counted, its in-flight gauge does not
+        assert merged["in_flight"] == {"GET": 1}
+        assert metrics.get_metrics()["total_requests"] == 2
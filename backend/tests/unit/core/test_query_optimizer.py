@@ -0,0 +1,187 @@
+"""
+Unit Tests for the Request-Scoped Query Profiler
+
+Tests query monitoring:
+- Statement fingerprints
+- Per-request stats isolated across concurrent requests
+- N+1 patterns per endpoint
+- Bounded top-K slow queries and fingerprint histograms
+- Engine listeners, track_queries and the Server-Timing header
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.core import query_optimizer
+from app.core.query_optimizer import (
+    OTHER_FINGERPRINT,
+    QueryProfiler,
+    current_query_stats,
+    fingerprint_statement,
+    setup_query_monitoring,
+    track_queries,
+)
+from app.middleware import performance
+from app.middleware.performance import PerformanceMiddleware
+
+SELECT_COURIER = "SELECT couriers.id FROM couriers WHERE couriers.id = %(pk_1)s"
+
+
+@pytest.fixture
+def profiler():
+    profiler = QueryProfiler(slow_threshold=0.1, n1_threshold=3, top_k=3, max_fingerprints=4)
+    with patch.object(query_optimizer, "query_profiler", profiler), patch.object(
+        performance, "query_profiler", profiler
+    ):
+        yield profiler
+
+
+@pytest.fixture
+def engine(profiler):
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    setup_query_monitoring(engine)
+    return engine
+
+
+class TestFingerprint:
+    """Tests for statement normalization"""
+
+    def test_values_and_parameters(self):
+        assert fingerprint_statement(
+            "SELECT * FROM t WHERE a = 'x''y' AND b = 42 AND c = %(c_1)s AND d = :d AND e = $1"
+        ) == "SELECT * FROM t WHERE a = ? AND b = ? AND c = ? AND d = ? AND e = ?"
+
+    def test_in_lists_and_whitespace_collapse(self):
+        short = fingerprint_statement("SELECT id FROM t WHERE id IN (%(id_1_1)s, %(id_1_2)s)")
+        long = fingerprint_statement(
+            "SELECT id\n  FROM t WHERE id IN (%(id_1_1)s, %(id_1_2)s, %(id_1_3)s, %(id_1_4)s)"
+        )
+
+        assert short == long == "SELECT id FROM t WHERE id IN (?)"
+
+    def test_keeps_identifiers_and_casts(self):
+        assert (
+            fingerprint_statement("SELECT t.col_1, x::text FROM table_2 t")
+            == "SELECT t.col_1, x::text FROM table_2 t"
+        )
+
+
+class TestRequestScope:
+    """Tests for per-request stats"""
+
+    def test_concurrent_requests_do_not_share_counts(self, profiler):
+        async def handle(endpoint, queries):
+            token = profiler.start_request(endpoint)
+            for _ in range(queries):
+                profiler.record_query(SELECT_COURIER, 0.001)
+                await asyncio.sleep(0)
+            return profiler.finish_request(token)
+
+        async def run():
+            return await asyncio.gather(handle("GET /a", 2), handle("GET /b", 5))
+
+        first, second = asyncio.run(run())
+
+        assert (first.query_count, second.query_count) == (2, 5)
+        assert profiler.get_stats()["total_queries"] == 7
+        assert current_query_stats() is None
+
+    def test_n1_patterns_per_endpoint(self, profiler):
+        for endpoint, count in (("GET /couriers", 4), ("GET /couriers", 6), ("GET /vehicles", 2)):
+            token = profiler.start_request("pending")
+            for _ in range(count):
+                profiler.record_query(SELECT_COURIER, 0.001)
+            profiler.finish_request(token, endpoint=endpoint)
+
+        assert profiler.get_n1_patterns() == [
+            {
+                "endpoint": "GET /couriers",
+                "fingerprint": fingerprint_statement(SELECT_COURIER),
+                "requests": 2,
+                "executions": 10,
+                "max_per_request": 6,
+            }
+        ]
+
+
+class TestAggregates:
+    """Tests for bounded process-wide aggregates"""
+
+    def test_top_k_slow_queries(self, profiler):
+        for i, duration in enumerate((0.5, 0.05, 0.2, 0.9, 0.3, 0.15)):
+            profiler.record_query(f"SELECT {i}", duration)
+
+        slowest = profiler.get_slow_queries(limit=10)
+
+        assert [q["duration"] for q in slowest] == [0.9, 0.5, 0.3]
+        assert profiler.get_stats()["slow_queries"] == 5
+
+    def test_fingerprint_histograms_are_capped(self, profiler):
+        for table in ("a", "b", "c", "d", "e", "f"):
+            profiler.record_query(f"SELECT * FROM {table} WHERE id = 1", 0.003)
+        profiler.record_query("SELECT * FROM a WHERE id = 2", 0.03)
+
+        fingerprints = {f["fingerprint"]: f for f in profiler.get_fingerprints()}
+
+        assert len(fingerprints) == 5
+        assert fingerprints[OTHER_FINGERPRINT]["count"] == 2
+        table_a = fingerprints["SELECT * FROM a WHERE id = ?"]
+        assert table_a["count"] == 2
+        assert table_a["histogram_ms"]["5"] == 1
+        assert table_a["histogram_ms"]["50"] == 1
+        assert table_a["max_time"] == 0.03
+
+    def test_reset(self, profiler):
+        profiler.record_query("SELECT 1", 1.0)
+        profiler.reset()
+
+        assert profiler.get_stats()["total_queries"] == 0
+        assert profiler.get_slow_queries() == []
+
+
+class TestMonitoring:
+    """Tests for engine listeners and the middleware"""
+
+    def test_track_queries(self, engine, profiler):
+        setup_query_monitoring(engine)
+
+        with track_queries() as stats, engine.connect() as conn:
+            for i in range(4):
+                conn.execute(text("SELECT :value"), {"value": i})
+
+        # Listeners are installed once, so each statement is counted once
+        assert stats.query_count == 4
+        assert stats.fingerprints == {"SELECT ?": 4}
+        assert profiler.get_n1_patterns()[0]["endpoint"] == "track_queries"
+
+    def test_middleware_scopes_requests_by_route(self, engine, profiler):
+        app = FastAPI()
+        app.add_middleware(PerformanceMiddleware)
+
+        @app.get("/couriers/{courier_id}")
+        def get_courier(courier_id: int):
+            with engine.connect() as conn:
+                for _ in range(courier_id):
+                    conn.execute(text("SELECT 1"))
+            return {"queries": current_query_stats().query_count}
+
+        client = TestClient(app)
+        response = client.get("/couriers/3")
+        client.get("/couriers/1")
+
+        assert response.json() == {"queries": 3}
+        timing = response.headers["server-timing"]
+        assert timing.startswith('db;dur=') and 'desc="3 queries"' in timing
+        assert "app;dur=" in timing
+        patterns = profiler.get_n1_patterns()
+        assert [(p["endpoint"], p["requests"]) for p in patterns] == [
+            ("GET /couriers/{courier_id}", 1)
+        ]
@@ -0,0 +1,167 @@
+"""
+Unit Tests for Security Monitor Alert Store
+
+Tests the Redis-backed alert indexes:
+- Newest-first range reads per index
+- Filtering by threat level, type and acknowledged state
+- Incrementally maintained dashboard counters
+- Backfill of alerts stored before the indexes
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.security_monitor import (
+    ALERT_COUNTS,
+    ALERT_INDEX_ALL,
+    AlertType,
+    SecurityMonitor,
+    ThreatLevel,
+)
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def monitor():
+    return SecurityMonitor(redis_client=fakeredis.FakeRedis(decode_responses=True))
+
+
+def raise_alert(monitor, alert_type, threat_level, minutes_ago=0):
+    alert = monitor._create_alert(
+        alert_type=alert_type,
+        threat_level=threat_level,
+        title="test",
+        description="test",
+    )
+    alert.timestamp = (datetime.utcnow() - timedelta(minutes=minutes_ago)).isoformat()
+    monitor._store_alert(alert)
+    return alert
+
+
+class TestAlertQueries:
+    """Tests for get_alerts"""
+
+    def test_newest_first(self, monitor):
+        old = raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.HIGH, minutes_ago=30)
+        new = raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.HIGH, minutes_ago=1)
+
+        alerts = monitor.get_alerts()
+
+        assert [a.alert_id for a in alerts] == [new.alert_id, old.alert_id]
+
+    def test_filters_use_indexes(self, monitor):
+        raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.HIGH)
+        critical = raise_alert(monitor, AlertType.DATA_EXFILTRATION, ThreatLevel.CRITICAL)
+        raise_alert(monitor, AlertType.UNUSUAL_LOCATION, ThreatLevel.MEDIUM)
+
+        by_level = monitor.get_alerts(threat_level=ThreatLevel.CRITICAL)
+        by_type = monitor.get_alerts(alert_type=AlertType.DATA_EXFILTRATION)
+
+        assert [a.alert_id for a in by_level] == [critical.alert_id]
+        assert [a.alert_id for a in by_type] == [critical.alert_id]
+
+    def test_combined_filters(self, monitor):
+        raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.HIGH)
+        target = raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.CRITICAL)
+
+        alerts = monitor.get_alerts(
+            threat_level=ThreatLevel.CRITICAL, alert_type=AlertType.BRUTE_FORCE
+        )
+
+        assert [a.alert_id for a in alerts] == [target.alert_id]
+
+    def test_limit(self, monitor):
+        for i in range(5):
+            raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.LOW, minutes_ago=i)
+
+        assert len(monitor.get_alerts(limit=3)) == 3
+
+    def test_acknowledge_removes_from_unacked(self, monitor):
+        first = raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.HIGH)
+        second = raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.HIGH)
+
+        assert monitor.acknowledge_alert(first.alert_id, acknowledged_by=1)
+
+        unacked = monitor.get_alerts(unacknowledged_only=True)
+        assert [a.alert_id for a in unacked] == [second.alert_id]
+        assert monitor.redis.ttl(f"security_alert:{first.alert_id}") > 0
+
+    def test_expired_documents_are_pruned_from_index(self, monitor):
+        alert = raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.HIGH)
+        monitor.redis.delete(f"security_alert:{alert.alert_id}")
+
+        assert monitor.get_alerts() == []
+        assert monitor.redis.zcard(ALERT_INDEX_ALL) == 0
+
+    def test_deleted_documents_do_not_shift_pages(self, monitor):
+        alerts = [
+            raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.HIGH, minutes_ago=i)
+            for i in range(120)
+        ]
+        # The whole first page is gone
+        monitor.redis.delete(*(f"security_alert:{a.alert_id}" for a in alerts[:50]))
+
+        result = monitor.get_alerts(limit=60)
+
+        assert [a.alert_id for a in result] == [a.alert_id for a in alerts[50:110]]
+
+    def test_aged_out_entries_are_pruned_before_reading(self, monitor):
+        alert = raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.HIGH)
+        monitor.redis.zadd(ALERT_INDEX_ALL, {"stale": 1.0})
+
+        assert [a.alert_id for a in monitor.get_alerts()] == [alert.alert_id]
+        assert monitor.redis.zscore(ALERT_INDEX_ALL, "stale") is None
+
+
+class TestSecurityMetrics:
+    """Tests for get_security_metrics"""
+
+    def test_counters(self, monitor):
+        first = raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.HIGH)
+        raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.CRITICAL)
+        raise_alert(monitor, AlertType.UNUSUAL_LOCATION, ThreatLevel.MEDIUM)
+        monitor.acknowledge_alert(first.alert_id, acknowledged_by=1)
+        monitor.acknowledge_alert(first.alert_id, acknowledged_by=1)
+
+        metrics = monitor.get_security_metrics(days=7)
+
+        assert metrics["total_alerts"] == 3
+        assert metrics["critical_alerts"] == 1
+        assert metrics["high_alerts"] == 1
+        assert metrics["medium_alerts"] == 1
+        assert metrics["unacknowledged"] == 2
+        assert metrics["by_type"] == {"brute_force": 2, "unusual_location": 1}
+
+    def test_acknowledge_keeps_counter_ttl(self, monitor):
+        alert = raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.HIGH)
+        counts_key = ALERT_COUNTS.format(datetime.utcnow().strftime("%Y%m%d"))
+        monitor.redis.delete(counts_key)
+
+        monitor.acknowledge_alert(alert.alert_id, acknowledged_by=1)
+
+        assert monitor.redis.ttl(counts_key) > 0
+
+    def test_backfill_indexes_alerts_stored_before_indexes(self, monitor):
+        indexed = raise_alert(monitor, AlertType.BRUTE_FORCE, ThreatLevel.HIGH)
+        legacy = monitor._create_alert(
+            alert_type=AlertType.UNUSUAL_LOCATION,
+            threat_level=ThreatLevel.MEDIUM,
+            title="test",
+            description="test",
+        )
+        monitor.redis.setex(
+            f"security_alert:{legacy.alert_id}", 60, json.dumps(legacy.to_dict())
+        )
+        assert monitor.get_security_metrics()["total_alerts"] == 1
+
+        assert monitor.backfill_alert_indexes(batch_size=1) == 1
+        assert monitor.backfill_alert_indexes() == 0
+
+        metrics = monitor.get_security_metrics()
+        assert metrics["total_alerts"] == 2
+        assert metrics["unacknowledged"] == 2
+        assert metrics["by_type"] == {"brute_force": 1, "unusual_location": 1}
+        assert {a.alert_id for a in monitor.get_alerts()} == {indexed.alert_id, legacy.alert_id}
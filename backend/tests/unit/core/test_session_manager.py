@@ -0,0 +1,220 @@
+"""
+Unit Tests for Session Manager
+
+Tests the Redis session store:
+- Sessions stored as hashes with native TTLs
+- Per-user expiry-scored index and pipelined bulk reads
+- Activity updates and renewal
+- Expiry-index cleanup
+- Migration of sessions stored by the previous layout
+- In-memory fallback
+"""
+
+import json
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.security_config import security_config
+from app.core.session_manager import (
+    EXPIRY_INDEX_KEY,
+    LEGACY_SESSION_KEY,
+    LEGACY_USER_SESSIONS_KEY,
+    SESSION_KEY,
+    USER_SESSIONS_KEY,
+    Session,
+    SessionManager,
+)
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def manager(redis_client):
+    return SessionManager(redis_client=redis_client)
+
+
+def create(manager, user_id=1, ua="agent"):
+    return manager.create_session(user_id, f"user{user_id}", 7, "10.0.0.1", ua, {"device": "ios"})
+
+
+def expire_now(redis_client, manager, session):
+    """Backdate a session's expiry in the indexes and drop its hash"""
+    past = time.time() - 10
+    redis_client.zadd(USER_SESSIONS_KEY.format(session.user_id), {session.session_id: past})
+    redis_client.zadd(EXPIRY_INDEX_KEY, {f"{session.user_id}:{session.session_id}": past})
+    redis_client.delete(SESSION_KEY.format(session.session_id))
+
+
+class TestSessionStorage:
+    """Tests for session hashes and indexes"""
+
+    def test_session_stored_as_hash_with_ttl(self, manager, redis_client):
+        session = create(manager)
+        key = SESSION_KEY.format(session.session_id)
+
+        assert redis_client.type(key) == "hash"
+        assert redis_client.ttl(key) > 0
+        assert redis_client.zscore(USER_SESSIONS_KEY.format(1), session.session_id) is not None
+
+    def test_round_trip(self, manager):
+        session = create(manager)
+
+        loaded = manager.get_session(session.session_id)
+
+        assert loaded == session
+        assert loaded.organization_id == 7
+        assert loaded.metadata == {"device": "ios"}
+
+    def test_get_user_sessions_skips_expired(self, manager, redis_client):
+        first = create(manager)
+        second = create(manager)
+        expire_now(redis_client, manager, first)
+
+        sessions = manager.get_user_sessions(1)
+
+        assert [s.session_id for s in sessions] == [second.session_id]
+        assert redis_client.zscore(USER_SESSIONS_KEY.format(1), first.session_id) is None
+
+    def test_concurrent_session_limit(self, manager):
+        limit = security_config.session.max_concurrent_sessions
+        for _ in range(limit + 2):
+            create(manager)
+
+        assert len(manager.get_user_sessions(1)) == limit
+
+
+class TestActivity:
+    """Tests for update_activity"""
+
+    def test_updates_last_activity(self, manager, redis_client):
+        session = create(manager)
+        redis_client.hset(SESSION_KEY.format(session.session_id), "last_activity", "2000-01-01T00:00:00")
+
+        assert manager.update_activity(session.session_id)
+        assert manager.get_session(session.session_id).last_activity != "2000-01-01T00:00:00"
+
+    def test_renews_near_expiry(self, manager, redis_client):
+        session = create(manager)
+        session.expires_at = (datetime.utcnow() + timedelta(minutes=1)).isoformat()
+
+        manager.update_activity(session.session_id, session=session)
+
+        stored = manager.get_session(session.session_id)
+        assert datetime.fromisoformat(stored.expires_at) > datetime.utcnow() + timedelta(hours=1)
+        score = redis_client.zscore(EXPIRY_INDEX_KEY, f"1:{session.session_id}")
+        assert score > time.time() + 3600
+
+    def test_does_not_resurrect_expired_session(self, manager, redis_client):
+        session = create(manager)
+        session.expires_at = (datetime.utcnow() + timedelta(minutes=1)).isoformat()
+        # Hash expires between the caller's read and the write
+        redis_client.delete(SESSION_KEY.format(session.session_id))
+
+        assert not manager.update_activity(session.session_id, session=session)
+        assert not redis_client.exists(SESSION_KEY.format(session.session_id))
+
+
+class TestDestroyAndCleanup:
+    """Tests for destroy and cleanup"""
+
+    def test_destroy_session(self, manager, redis_client):
+        session = create(manager)
+
+        assert manager.destroy_session(session.session_id)
+        assert manager.get_session(session.session_id) is None
+        assert redis_client.zcard(EXPIRY_INDEX_KEY) == 0
+        assert not manager.destroy_session(session.session_id)
+
+    def test_destroy_user_sessions(self, manager, redis_client):
+        create(manager)
+        create(manager)
+        create(manager, user_id=2)
+
+        assert manager.destroy_user_sessions(1) == 2
+        assert manager.get_user_sessions(1) == []
+        assert len(manager.get_user_sessions(2)) == 1
+        assert redis_client.zcard(EXPIRY_INDEX_KEY) == 1
+
+    def test_cleanup_removes_expired_index_entries(self, manager, redis_client):
+        sessions = [create(manager, user_id=i) for i in range(5)]
+        for session in sessions[:3]:
+            expire_now(redis_client, manager, session)
+
+        assert manager.cleanup_expired_sessions(batch_size=2) == 3
+        assert redis_client.zcard(EXPIRY_INDEX_KEY) == 2
+        assert redis_client.zcard(USER_SESSIONS_KEY.format(0)) == 0
+
+
+def seed_legacy(redis_client, session_id, user_id=1, hours=2):
+    """Write a session the way the previous layout did (JSON string + plain set)"""
+    now = datetime.utcnow()
+    session = Session(
+        session_id=session_id,
+        user_id=user_id,
+        username=f"user{user_id}",
+        organization_id=7,
+        ip_address="10.0.0.1",
+        user_agent="agent",
+        fingerprint="f",
+        created_at=now.isoformat(),
+        last_activity=now.isoformat(),
+        expires_at=(now + timedelta(hours=hours)).isoformat(),
+        metadata={},
+    )
+    redis_client.setex(LEGACY_SESSION_KEY.format(session_id), 3600, json.dumps(session.to_dict()))
+    redis_client.sadd(LEGACY_USER_SESSIONS_KEY.format(user_id), session_id)
+    return session
+
+
+class TestLegacyMigration:
+    """Tests for sessions written before the hash layout"""
+
+    def test_legacy_session_is_migrated_on_read(self, manager, redis_client):
+        legacy = seed_legacy(redis_client, "old-1")
+
+        assert manager.validate_session("old-1", user_agent="agent") is not None
+        assert redis_client.type(SESSION_KEY.format("old-1")) == "hash"
+        assert not redis_client.exists(LEGACY_SESSION_KEY.format("old-1"))
+        assert manager.get_session("old-1").expires_at == legacy.expires_at
+        assert redis_client.zscore(USER_SESSIONS_KEY.format(1), "old-1") is not None
+
+    def test_user_operations_with_legacy_keys(self, manager, redis_client):
+        seed_legacy(redis_client, "old-1")
+        seed_legacy(redis_client, "old-2")
+        seed_legacy(redis_client, "gone", hours=-1)
+
+        new = create(manager)
+        ids = {s.session_id for s in manager.get_user_sessions(1)}
+
+        assert ids == {"old-1", "old-2", new.session_id}
+        assert not redis_client.exists(LEGACY_USER_SESSIONS_KEY.format(1))
+        assert manager.destroy_user_sessions(1) == 3
+        assert manager.get_session("old-1") is None
+
+    def test_destroy_legacy_session(self, manager, redis_client):
+        seed_legacy(redis_client, "old-1")
+
+        assert manager.destroy_session("old-1")
+        assert not redis_client.exists(LEGACY_SESSION_KEY.format("old-1"))
+        assert manager.get_user_sessions(1) == []
+
+
+class TestMemoryFallback:
+    """Tests for the in-memory store used without Redis"""
+
+    def test_lifecycle(self):
+        manager = SessionManager(redis_client=None)
+        manager.redis = None
+        session = create(manager)
+
+        assert manager.validate_session(session.session_id, user_agent="agent") == session
+        assert len(manager.get_user_sessions(1)) == 1
+        assert manager.destroy_user_sessions(1) == 1
+        assert manager.get_session(session.session_id) is None
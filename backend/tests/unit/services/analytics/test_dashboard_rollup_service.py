@@ -0,0 +1,270 @@
+"""
+Unit Tests for Dashboard Rollup Service
+
+Tests the dashboard aggregate layer:
+- Day range merging
+- Current-state and daily rollups built from source tables
+- Incremental refresh of touched days
+- Dirty bucket tracking through session events
+- Stats payload built from rollups
+"""
+
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.core.performance_config import DashboardRollupConfig
+from app.models.analytics.dashboard_rollup import DashboardRollup
+from app.models.fleet.courier import Courier, CourierStatus, ProjectType, SponsorshipStatus
+from app.models.fleet.vehicle import Vehicle, VehicleStatus
+from app.models.operations.delivery import Delivery, DeliveryStatus
+from app.models.tenant.organization import Organization
+from app.services.analytics.dashboard_rollup_service import (
+    COURIER_CITY,
+    COURIER_CREATED,
+    COURIER_FLAGS,
+    COURIER_PERFORMANCE,
+    COURIER_STATUS,
+    DELIVERY_STATUS,
+    VEHICLE_ASSIGNED,
+    DashboardRollupService,
+    _merge_days,
+    dashboard_rollup_service,
+)
+from app.services.dashboard_performance_service import DashboardPerformanceService
+
+NOW = datetime(2026, 10, 18, 12, 0, 0)
+TODAY = NOW.date()
+
+
+@pytest.fixture
+def db(sqlite_db):
+    with patch.object(dashboard_rollup_service, "mark_dirty"):
+        yield sqlite_db
+
+
+@pytest.fixture
+def service():
+    return DashboardRollupService(
+        DashboardRollupConfig(window_days=2, backfill_days=30, hourly_retention_days=2)
+    )
+
+
+def add_org(db, name="Acme") -> Organization:
+    org = Organization(name=name, slug=name.lower())
+    db.add(org)
+    db.flush()
+    return org
+
+
+def add_courier(db, org, n, created_at, **kwargs) -> Courier:
+    courier = Courier(
+        organization_id=org.id,
+        barq_id=f"BRQ-{org.id}-{n}",
+        full_name=f"Courier {n}",
+        mobile_number="0500000000",
+        created_at=created_at,
+        **kwargs,
+    )
+    db.add(courier)
+    return courier
+
+
+def add_delivery(db, org, n, created_at, status) -> Delivery:
+    delivery = Delivery(
+        organization_id=org.id,
+        tracking_number=f"TRK-{org.id}-{n}",
+        pickup_address="A",
+        delivery_address="B",
+        status=status,
+        created_at=created_at,
+    )
+    db.add(delivery)
+    return delivery
+
+
+@pytest.fixture
+def seeded(db):
+    org = add_org(db)
+    other = add_org(db, "Other")
+    vehicle = Vehicle(
+        organization_id=org.id,
+        plate_number="ABC-1",
+        vehicle_type="motorcycle",
+        make="Honda",
+        model="Wave",
+        year=2024,
+        status=VehicleStatus.ACTIVE,
+    )
+    db.add(vehicle)
+    db.flush()
+
+    add_courier(
+        db,
+        org,
+        1,
+        NOW - timedelta(days=1),
+        status=CourierStatus.ACTIVE,
+        city="Riyadh",
+        sponsorship_status=SponsorshipStatus.AJEER,
+        project_type=ProjectType.FOOD,
+        performance_score=80,
+        current_vehicle_id=vehicle.id,
+        iqama_expiry_date=TODAY + timedelta(days=10),
+    )
+    add_courier(
+        db,
+        org,
+        2,
+        NOW - timedelta(days=3),
+        status=CourierStatus.ACTIVE,
+        city="Riyadh",
+        performance_score=60,
+        license_expiry_date=TODAY - timedelta(days=1),
+    )
+    add_courier(db, org, 3, NOW - timedelta(days=20), status=CourierStatus.INACTIVE, city="Jeddah")
+    add_courier(db, other, 4, NOW, status=CourierStatus.ACTIVE, city="Dammam")
+
+    add_delivery(db, org, 1, NOW - timedelta(hours=2), DeliveryStatus.DELIVERED)
+    add_delivery(db, org, 2, NOW - timedelta(hours=3), DeliveryStatus.FAILED)
+    add_delivery(db, org, 3, NOW - timedelta(days=2), DeliveryStatus.DELIVERED)
+    db.commit()
+    return org
+
+
+class TestMergeDays:
+    """Tests for _merge_days"""
+
+    def test_merges_consecutive_days(self):
+        days = [date(2026, 1, 3), date(2026, 1, 1), date(2026, 1, 2), date(2026, 1, 10)]
+        assert _merge_days(days) == [
+            (date(2026, 1, 1), date(2026, 1, 3)),
+            (date(2026, 1, 10), date(2026, 1, 10)),
+        ]
+
+    def test_empty(self):
+        assert _merge_days([]) == []
+
+
+class TestRefreshAndLoad:
+    """Tests for building and reading rollups"""
+
+    def test_full_refresh_builds_current_state(self, db, service, seeded):
+        service.refresh_organization(db, seeded.id, full=True, now=NOW)
+        db.commit()
+
+        view = service.load(db, seeded.id, since=TODAY - timedelta(days=29))
+
+        assert view.refreshed_at is not None
+        assert view.count(COURIER_STATUS) == 3
+        assert view.count(COURIER_STATUS, CourierStatus.ACTIVE.value) == 2
+        assert view.breakdown(COURIER_CITY) == {"Riyadh": 2, "Jeddah": 1}
+        assert view.count(COURIER_FLAGS, "iqama_expiring") == 1
+        assert view.count(COURIER_FLAGS, "license_expired") == 1
+        assert view.count(COURIER_FLAGS, "active_with_vehicle") == 1
+        assert view.count(VEHICLE_ASSIGNED, VehicleStatus.ACTIVE.value) == 1
+        assert view.average(COURIER_PERFORMANCE) == pytest.approx(70.0)
+
+    def test_daily_buckets(self, db, service, seeded):
+        service.refresh_organization(db, seeded.id, full=True, now=NOW)
+        db.commit()
+
+        view = service.load(db, seeded.id, since=TODAY - timedelta(days=29))
+
+        assert view.daily(DELIVERY_STATUS)[TODAY] == {"delivered": 1, "failed": 1}
+        assert view.daily(DELIVERY_STATUS)[TODAY - timedelta(days=2)] == {"delivered": 1}
+        assert view.sum_days(COURIER_CREATED, TODAY - timedelta(days=6), TODAY) == 2
+        assert view.sum_days(COURIER_CREATED, TODAY - timedelta(days=29), TODAY) == 3
+
+    def test_rollups_are_org_scoped(self, db, service, seeded):
+        service.refresh_organization(db, seeded.id, full=True, now=NOW)
+        db.commit()
+
+        assert db.query(DashboardRollup).filter(DashboardRollup.organization_id != seeded.id).count() == 0
+
+    def test_incremental_refresh_only_rebuilds_touched_days(self, db, service, seeded):
+        service.refresh_organization(db, seeded.id, full=True, now=NOW)
+        db.commit()
+
+        # Backdated write outside the trailing window
+        old_day = TODAY - timedelta(days=10)
+        add_delivery(db, seeded, 9, datetime.combine(old_day, datetime.min.time()), "failed")
+        db.commit()
+
+        service.refresh_organization(db, seeded.id, now=NOW)
+        db.commit()
+        view = service.load(db, seeded.id, since=old_day)
+        assert old_day not in view.daily(DELIVERY_STATUS)
+
+        service.refresh_organization(db, seeded.id, days=[old_day], now=NOW)
+        db.commit()
+        view = service.load(db, seeded.id, since=old_day)
+        assert view.daily(DELIVERY_STATUS)[old_day] == {"failed": 1}
+        # Untouched days keep their counts
+        assert view.daily(DELIVERY_STATUS)[TODAY - timedelta(days=2)] == {"delivered": 1}
+
+    def test_missing_rollups_are_pending_until_the_task_builds_them(self, db, service, seeded):
+        view = service.load(db, seeded.id)
+
+        assert view.pending
+        assert view.count(COURIER_STATUS) == 0
+        assert db.query(DashboardRollup).count() == 0
+
+        with patch.object(service, "pop_dirty", return_value={}):
+            assert service.refresh_pending(db, now=NOW)["refreshed"] == 2
+
+        view = service.load(db, seeded.id)
+        assert not view.pending
+        assert view.count(COURIER_STATUS) == 3
+
+
+class TestDirtyTracking:
+    """Tests for session-event dirty bucket tracking"""
+
+    def test_commit_marks_touched_days(self, db):
+        org = add_org(db)
+        db.commit()
+
+        with patch.object(dashboard_rollup_service, "mark_dirty") as mark_dirty:
+            add_delivery(db, org, 1, datetime(2026, 10, 1, 9, 0), "pending")
+            db.commit()
+
+        touched = set(mark_dirty.call_args[0][0])
+        assert (org.id, date(2026, 10, 1)) in touched
+
+    def test_rollback_discards_touched_days(self, db):
+        org = add_org(db)
+        db.commit()
+
+        with patch.object(dashboard_rollup_service, "mark_dirty") as mark_dirty:
+            add_delivery(db, org, 1, NOW, "pending")
+            db.flush()
+            db.rollback()
+            db.commit()
+
+        mark_dirty.assert_not_called()
+
+
+class TestBuildDashboardStats:
+    """Tests for stats payload built from rollups"""
+
+    def test_stats_from_rollups(self, db, service, seeded):
+        service.refresh_organization(db, seeded.id, full=True, now=NOW)
+        db.commit()
+        view = service.load(db, seeded.id, since=TODAY - timedelta(days=29))
+
+        stats = DashboardPerformanceService.build_dashboard_stats(view, TODAY)
+
+        assert stats["total_couriers"] == 3
+        assert stats["active_couriers"] == 2
+        assert stats["inactive_couriers"] == 1
+        assert stats["total_vehicles"] == 1
+        assert stats["vehicles_assigned"] == 1
+        assert stats["vehicles_available"] == 0
+        assert stats["vehicle_utilization"] == 100.0
+        assert stats["new_couriers_this_week"] == 2
+        assert stats["new_couriers_this_month"] == 3
+        assert stats["courier_growth_rate"] == 100
+        assert stats["sponsorship_breakdown"]["ajeer"] == 1
+        assert stats["project_breakdown"]["food"] == 1
@@ -0,0 +1,218 @@
+"""
+Unit Tests for Fleet Vehicle Utilization
+
+Tests the interval sweep behind FleetAnalyticsService.get_vehicle_utilization:
+- Merged day counts match a day-by-day set walk (NumPy and pure Python paths)
+- Overlapping, open-ended and out-of-period assignments
+- Daily and weekly utilization trends
+- Fleet-wide and single vehicle results from the database, per organization
+"""
+
+import importlib
+import random
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.models.fleet.assignment import CourierVehicleAssignment
+from app.models.fleet.vehicle import Vehicle, VehicleStatus, VehicleType
+from app.services.analytics.fleet_analytics_service import (
+    FleetAnalyticsService,
+    merge_assignment_days,
+    utilization_trend,
+)
+
+# The package re-exports the singleton under the module name
+module = importlib.import_module("app.services.analytics.fleet_analytics_service")
+
+ORG = 1
+START = date(2026, 9, 1)
+END = date(2026, 9, 30)
+
+
+def day_walk(vehicle_ids, starts, ends, start_date, end_date):
+    """The per-day set walk used before"""
+    days = {}
+    for vid, s, e in zip(vehicle_ids, starts, ends):
+        current = max(start_date, s)
+        while current <= min(e or end_date, end_date):
+            days.setdefault(vid, set()).add(current)
+            current += timedelta(days=1)
+    return days
+
+
+def random_assignments(rng, count, vehicles=20):
+    ids, starts, ends = [], [], []
+    for _ in range(count):
+        start = START + timedelta(days=rng.randint(-20, 35))
+        ids.append(rng.randint(1, vehicles))
+        starts.append(start)
+        ends.append(None if rng.random() < 0.2 else start + timedelta(days=rng.randint(0, 15)))
+    return ids, starts, ends
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "python"])
+def numpy_mode(request):
+    if request.param and not module.NUMPY_AVAILABLE:
+        pytest.skip("numpy not installed")
+    with patch.object(module, "NUMPY_AVAILABLE", request.param):
+        yield request.param
+
+
+def add_vehicle(db, plate, status=VehicleStatus.ACTIVE, org=ORG):
+    vehicle = Vehicle(
+        organization_id=org,
+        plate_number=plate,
+        vehicle_type=VehicleType.MOTORCYCLE,
+        make="Honda",
+        model="Wave",
+        year=2024,
+        status=status,
+    )
+    db.add(vehicle)
+    db.flush()
+    return vehicle
+
+
+def add_assignment(db, vehicle, start, end=None):
+    db.add(
+        CourierVehicleAssignment(
+            organization_id=vehicle.organization_id,
+            courier_id=1,
+            vehicle_id=vehicle.id,
+            start_date=start,
+            end_date=end,
+        )
+    )
+
+
+class TestMergeAssignmentDays:
+    """Tests for the interval sweep"""
+
+    def test_matches_day_walk(self, numpy_mode):
+        rng = random.Random(11)
+        for _ in range(20):
+            ids, starts, ends = random_assignments(rng, rng.randint(1, 200))
+
+            assigned, daily = merge_assignment_days(ids, starts, ends, START, END)
+
+            expected = day_walk(ids, starts, ends, START, END)
+            assert {vid: n for vid, n in assigned.items() if n} == {
+                vid: len(days) for vid, days in expected.items()
+            }
+            assert daily == [
+                sum(1 for days in expected.values() if START + timedelta(days=i) in days)
+                for i in range(30)
+            ]
+
+    def test_overlaps_and_open_ended(self, numpy_mode):
+        assigned, daily = merge_assignment_days(
+            [1, 1, 1, 2],
+            [date(2026, 8, 20), date(2026, 9, 3), date(2026, 9, 28), date(2026, 9, 29)],
+            [date(2026, 9, 5), date(2026, 9, 4), None, None],
+            START,
+            END,
+        )
+
+        assert assigned == {1: 8, 2: 2}
+        assert daily[:6] == [1, 1, 1, 1, 1, 0]
+        assert daily[-3:] == [1, 2, 2]
+
+    def test_empty_and_inverted_period(self, numpy_mode):
+        assert merge_assignment_days([], [], [], START, END) == ({}, [0] * 30)
+        assert merge_assignment_days([1], [START], [None], END, START) == ({}, [])
+
+
+class TestUtilizationTrend:
+    """Tests for trend buckets"""
+
+    def test_daily(self):
+        trend = utilization_trend([2, 1, 0], START, 4)
+
+        assert [t["utilization_rate"] for t in trend] == [50.0, 25.0, 0.0]
+        assert trend[0]["period_start"] == "2026-09-01"
+
+    def test_weekly_buckets_start_on_monday(self):
+        # 2026-09-01 is a Tuesday
+        trend = utilization_trend([1] * 14, START, 2, "weekly")
+
+        assert [(t["period_start"], t["days"]) for t in trend] == [
+            ("2026-09-01", 6),
+            ("2026-09-07", 7),
+            ("2026-09-14", 1),
+        ]
+        assert all(t["utilization_rate"] == 50.0 for t in trend)
+
+    def test_rejects_unknown_granularity(self):
+        with pytest.raises(ValueError):
+            utilization_trend([1], START, 1, "monthly")
+
+
+class TestGetVehicleUtilization:
+    """Tests for the service method"""
+
+    def test_fleet_wide(self, db):
+        busy = add_vehicle(db, "ABC-1")
+        idle = add_vehicle(db, "ABC-2", status=VehicleStatus.MAINTENANCE)
+        add_assignment(db, busy, date(2026, 8, 1), date(2026, 9, 10))
+        add_assignment(db, busy, date(2026, 9, 5), date(2026, 9, 15))
+        add_assignment(db, idle, date(2026, 10, 5))
+        db.commit()
+
+        result = FleetAnalyticsService().get_vehicle_utilization(
+            db, ORG, START, END, granularity="weekly"
+        )
+
+        assert result["fleet_summary"]["total_vehicles"] == 2
+        assert result["fleet_summary"]["average_utilization_rate"] == 25.0
+        by_id = {v["vehicle_id"]: v for v in result["vehicles"]}
+        assert by_id[busy.id]["assigned_days"] == 15
+        assert by_id[busy.id]["utilization_rate"] == 50.0
+        assert by_id[idle.id] == {
+            "vehicle_id": idle.id,
+            "license_plate": "ABC-2",
+            "status": "MAINTENANCE",
+            "assigned_days": 0,
+            "utilization_rate": 0.0,
+        }
+        assert sum(t["vehicle_days"] for t in result["trend"]) == 15
+
+    def test_single_vehicle(self, db):
+        vehicle = add_vehicle(db, "XYZ-9")
+        add_assignment(db, vehicle, date(2026, 9, 21))
+        add_assignment(db, add_vehicle(db, "XYZ-8"), START)
+        db.commit()
+
+        result = FleetAnalyticsService().get_vehicle_utilization(db, ORG, START, END, vehicle.id)
+
+        assert result["assigned_days"] == 10
+        assert result["idle_days"] == 20
+        assert result["utilization_rate"] == 33.33
+        assert result["total_assignments"] == 1
+        assert "trend" not in result
+
+    def test_other_organizations_are_excluded(self, db):
+        ours = add_vehicle(db, "ORG-1")
+        theirs = add_vehicle(db, "ORG-2", org=2)
+        add_assignment(db, ours, START, date(2026, 9, 10))
+        add_assignment(db, theirs, START)
+        # Assignment rows of another organization pointing at our vehicle
+        db.add(
+            CourierVehicleAssignment(
+                organization_id=2, courier_id=2, vehicle_id=ours.id, start_date=START
+            )
+        )
+        db.commit()
+
+        service = FleetAnalyticsService()
+        fleet = service.get_vehicle_utilization(db, ORG, START, END)
+        single = service.get_vehicle_utilization(db, ORG, START, END, ours.id)
+        other = service.get_vehicle_utilization(db, 2, START, END)
+
+        assert [v["vehicle_id"] for v in fleet["vehicles"]] == [ours.id]
+        assert fleet["vehicles"][0]["assigned_days"] == 10
+        assert fleet["fleet_summary"]["average_utilization_rate"] == 33.33
+        assert (single["assigned_days"], single["total_assignments"]) == (10, 1)
+        assert [v["vehicle_id"] for v in other["vehicles"]] == [theirs.id]
+        assert other["vehicles"][0]["assigned_days"] == 30
@@ -0,0 +1,226 @@
+"""
+Unit Tests for EOS Liability Service
+
+Tests bulk End of Service calculation:
+- Batch calculation matches the per-employee formula
+- Latest salary per courier from one window query
+- Streaming CSV/XLSX export
+- Monthly liability snapshot stored and refreshed
+"""
+
+import io
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.models.fleet.courier import Courier, CourierStatus
+from app.models.hr.eos_liability_snapshot import EOSLiabilitySnapshot
+from app.models.hr.salary import Salary
+from app.services.hr.eos_liability_service import (
+    DEFAULT_BASIC_SALARY,
+    EOSLiabilityService,
+    calculate_eos_batch,
+    calculate_eos_benefit,
+)
+from app.utils.export import stream_csv, stream_xlsx
+
+ORG = 1
+AS_OF = date(2026, 9, 30)
+
+
+def add_courier(db, number, joined, status=CourierStatus.ACTIVE, last_day=None, org=ORG):
+    courier = Courier(
+        organization_id=org,
+        barq_id=f"BRQ-{number}",
+        employee_id=f"EMP-{number}",
+        full_name=f"Courier {number}",
+        mobile_number=f"050{number:04d}",
+        status=status,
+        joining_date=joined,
+        last_working_day=last_day,
+    )
+    db.add(courier)
+    db.flush()
+    return courier
+
+
+def add_salary(db, courier, year, month, base):
+    db.add(
+        Salary(
+            organization_id=courier.organization_id,
+            courier_id=courier.id,
+            year=year,
+            month=month,
+            base_salary=base,
+            gross_salary=base,
+            net_salary=base,
+        )
+    )
+
+
+class TestBatchCalculation:
+    """Tests for the vectorized formula"""
+
+    @pytest.mark.parametrize("is_resignation", [False, True])
+    def test_matches_scalar(self, is_resignation):
+        days = (0, 200, 800, 1900, 3000, 4100, 6000)
+        joined = [date(2026, 1, 1) - timedelta(days=d) for d in days]
+        ended = [date(2026, 1, 1)] * len(joined)
+        salaries = [Decimal("3000"), Decimal("4500.50"), Decimal("3200"), Decimal("7000"),
+                    Decimal("5100.75"), Decimal("3000"), Decimal("12000")]
+
+        batch = calculate_eos_batch(joined, ended, salaries, is_resignation)
+
+        for result, args in zip(batch, zip(joined, ended, salaries)):
+            expected = calculate_eos_benefit(*args, is_resignation=is_resignation)
+            assert result.keys() == expected.keys()
+            for key, value in expected.items():
+                if isinstance(value, float):
+                    assert result[key] == pytest.approx(value, abs=0.01), key
+                else:
+                    assert result[key] == value, key
+
+    def test_empty(self):
+        assert calculate_eos_batch([], [], []) == []
+
+
+class TestLatestSalaries:
+    """Tests for the window-function salary lookup"""
+
+    def test_latest_per_courier_in_one_query(self, db):
+        first = add_courier(db, 1, date(2020, 1, 1))
+        second = add_courier(db, 2, date(2021, 1, 1))
+        add_courier(db, 3, date(2022, 1, 1))
+        add_salary(db, first, 2025, 12, 3500)
+        add_salary(db, first, 2026, 2, 4000)
+        add_salary(db, first, 2026, 1, 3800)
+        add_salary(db, second, 2024, 6, 3100)
+        ids = [first.id, second.id]
+        db.commit()
+        db.info["statements"].clear()
+
+        salaries = EOSLiabilityService().latest_salaries(db, [*ids, 99])
+
+        assert len(db.info["statements"]) == 1
+        assert salaries == {ids[0]: Decimal("4000"), ids[1]: Decimal("3100")}
+
+
+class TestBatches:
+    """Tests for keyset-batched EOS rows"""
+
+    def test_queries_per_batch_not_per_courier(self, db):
+        for i in range(5):
+            courier = add_courier(db, i, date(2019, 1, 1), status=CourierStatus.TERMINATED,
+                                  last_day=date(2025, 6, 30))
+            add_salary(db, courier, 2025, 6, 4000)
+        add_courier(db, 9, date(2019, 1, 1))
+        db.commit()
+        db.info["statements"].clear()
+
+        batches = list(
+            EOSLiabilityService().iter_batches(
+                db, ORG, [CourierStatus.TERMINATED], AS_OF, batch_size=2
+            )
+        )
+
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        # One courier query and one salary query per batch
+        assert len(db.info["statements"]) == 6
+        row = batches[0][0]
+        assert row["termination_date"] == date(2025, 6, 30)
+        assert row["basic_salary"] == 4000
+        assert row["final_eos"] == calculate_eos_benefit(
+            date(2019, 1, 1), date(2025, 6, 30), Decimal("4000")
+        )["final_eos"]
+
+    def test_streams_csv_and_xlsx(self, db):
+        for i in range(3):
+            add_courier(db, i, date(2020, 1, 1), status=CourierStatus.TERMINATED,
+                        last_day=date(2025, 1, 1))
+        db.commit()
+        service = EOSLiabilityService()
+        columns = ["employee_id", "full_name", "final_eos"]
+
+        csv_bytes = b"".join(
+            stream_csv(service.iter_batches(db, ORG, [CourierStatus.TERMINATED], AS_OF),
+                       columns, header=["Employee ID", "Name", "Final EOS"])
+        ).decode()
+        xlsx_bytes = b"".join(
+            stream_xlsx(service.iter_batches(db, ORG, [CourierStatus.TERMINATED], AS_OF), columns)
+        )
+
+        lines = csv_bytes.strip().splitlines()
+        assert lines[0] == "Employee ID,Name,Final EOS"
+        assert len(lines) == 4
+        with zipfile.ZipFile(io.BytesIO(xlsx_bytes)) as archive:
+            assert archive.testzip() is None
+            sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+        assert sheet.count("<row>") == 4
+        assert "EMP-2" in sheet
+
+
+class TestSnapshot:
+    """Tests for the monthly liability snapshot"""
+
+    def test_snapshot_is_stored_and_reused(self, db):
+        veteran = add_courier(db, 1, date(2014, 9, 30))
+        add_salary(db, veteran, 2026, 9, 6000)
+        add_courier(db, 2, date(2025, 9, 30), status=CourierStatus.ON_LEAVE)
+        add_courier(db, 3, date(2015, 1, 1), status=CourierStatus.TERMINATED,
+                    last_day=date(2026, 1, 1))
+        add_courier(db, 4, date(2026, 10, 5))  # joins after the month
+        add_courier(db, 5, date(2015, 1, 1), org=2)
+        db.commit()
+        service = EOSLiabilityService()
+
+        snapshot = service.get_snapshot(db, ORG, date(2026, 9, 15), today=date(2026, 10, 18))
+
+        expected = (
+            calculate_eos_benefit(date(2014, 9, 30), AS_OF, Decimal("6000"))["final_eos"]
+            + calculate_eos_benefit(date(2025, 9, 30), AS_OF, DEFAULT_BASIC_SALARY)["final_eos"]
+        )
+        assert snapshot.month == date(2026, 9, 1)
+        assert snapshot.as_of_date == AS_OF
+        assert snapshot.courier_count == 2
+        assert snapshot.defaulted_salary_count == 1
+        assert float(snapshot.total_liability) == pytest.approx(expected, abs=0.01)
+        assert snapshot.breakdown["by_status"]["ON_LEAVE"]["count"] == 1
+        assert snapshot.breakdown["by_service_band"]["over_10_years"]["count"] == 1
+        assert snapshot.breakdown["by_service_band"]["under_2_years"]["count"] == 1
+
+        add_courier(db, 6, date(2020, 1, 1))
+        db.commit()
+        cached = service.get_snapshot(db, ORG, date(2026, 9, 1), today=date(2026, 10, 19))
+        assert cached.courier_count == 2
+
+        refreshed = service.get_snapshot(db, ORG, date(2026, 9, 1), refresh=True)
+        assert refreshed.courier_count == 3
+        assert db.query(EOSLiabilitySnapshot).count() == 1
+
+    def test_current_month_recomputed_daily(self, db):
+        add_courier(db, 1, date(2020, 1, 1))
+        db.commit()
+        service = EOSLiabilityService()
+
+        first = service.get_snapshot(db, ORG, date(2026, 10, 1), today=date(2026, 10, 17))
+        first_total = float(first.total_liability)
+        assert first.as_of_date == date(2026, 10, 17)
+
+        later = service.get_snapshot(db, ORG, date(2026, 10, 1), today=date(2026, 10, 18))
+        assert later.as_of_date == date(2026, 10, 18)
+        assert float(later.total_liability) > first_total
+
+    def test_find_snapshot_never_computes(self, db):
+        add_courier(db, 1, date(2020, 1, 1))
+        db.commit()
+        service = EOSLiabilityService()
+        db.info["statements"].clear()
+
+        assert service.find_snapshot(db, ORG, date(2026, 10, 1)) is None
+        assert not any("couriers" in sql for sql in db.info["statements"])
+        assert db.query(EOSLiabilitySnapshot).count() == 0
+
+        stored = service.refresh_snapshot(db, ORG, date(2026, 10, 1), today=date(2026, 10, 18))
+        assert service.find_snapshot(db, ORG, date(2026, 10, 20)) is stored
@@ -0,0 +1,212 @@
+"""
+Unit Tests for FMS Location Ingest
+
+Tests the shared live-location snapshot:
+- All asset pages are fetched concurrently in one pass
+- Snapshots are served while fresh, refreshed when stale, kept when FMS fails
+- Workers share snapshots through Redis
+- Asset sync matches couriers and vehicles with prefetched lookups
+"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy import event
+
+import app.core.encryption as encryption
+from app.core.encryption import BlindIndexer
+from app.core.performance_config import FMSLocationConfig
+from app.models.fleet.courier import Courier
+from app.models.fleet.vehicle import Vehicle, VehicleType
+from app.models.tenant.organization import Organization
+from app.services.fms.client import FMSClient
+from app.services.fms.location_ingest import LocationIngestService
+from app.services.fms.sync import AssetMatcher, FMSSyncService
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def asset(asset_id, plate=None, name=None, lat=24.7, lng=46.7, iqama=None):
+    return {
+        "Id": asset_id,
+        "PlateNumber": plate,
+        "AssetName": name,
+        "Trackingunit": {
+            "DeviceLog": {"Latitude": lat, "Longitude": lng, "Speed": 30, "GPSDate": "2026-10-19"},
+            "Driver": {"DriverName": f"Driver {asset_id}", "IDNumber": iqama},
+        },
+    }
+
+
+def fms_client(assets):
+    client = MagicMock()
+    client.get_all_assets.return_value = {"result": assets, "totalCount": len(assets)}
+    return client
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def service(clock):
+    service = LocationIngestService(config=FMSLocationConfig(max_age_seconds=30), clock=clock)
+    service.redis = None
+    return service
+
+
+@pytest.fixture
+def db(sqlite_db, monkeypatch):
+    monkeypatch.setattr(encryption, "_default_blind_indexer", BlindIndexer([("v1", b"key")]))
+    return sqlite_db
+
+
+class TestConcurrentFetch:
+    """Tests for FMSClient.get_all_assets"""
+
+    def test_pages_fetched_concurrently_and_errors_skipped(self):
+        client = FMSClient(base_url="http://fms.example.com", username="u", password="p")
+        running = {"now": 0, "max": 0}
+
+        async def get_page(http, page_size, page_index):
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+            if page_index == 3:
+                return {"error": True, "message": "FMS API error: 500"}
+            start = (page_index - 1) * page_size
+            ids = range(start, min(start + page_size, 45))
+            return {"result": [{"Id": n} for n in ids], "totalCount": 45}
+
+        with patch.object(client, "_ensure_token", return_value=True), \
+                patch.object(client, "_get_assets_page", side_effect=get_page):
+            result = client.get_all_assets(page_size=10, max_pages=10, concurrency=2)
+
+        assert result["totalCount"] == 45
+        assert [a["Id"] for a in result["result"]] == list(range(20)) + list(range(30, 45))
+        assert running["max"] == 2
+
+    def test_authentication_failure(self):
+        client = FMSClient(base_url="http://fms.example.com", username="u", password="p")
+        with patch.object(client, "_ensure_token", return_value=False):
+            assert client.get_all_assets()["error"] is True
+
+
+class TestSnapshot:
+    """Tests for snapshot freshness"""
+
+    def test_fresh_snapshot_is_reused_and_stale_one_refreshed(self, service, clock):
+        client = fms_client([asset(1, "BRQ-1"), asset(2, "BRQ-2", lat=25.0)])
+
+        snapshot = service.get_snapshot(client)
+        assert snapshot.get(2)["latitude"] == 25.0
+        assert snapshot.get(1)["driver"]["name"] == "Driver 1"
+
+        clock.now += 20
+        assert service.get_snapshot(client) is snapshot
+        assert client.get_all_assets.call_count == 1
+
+        clock.now += 20
+        client.get_all_assets.return_value = {"result": [asset(1, lat=26.0)], "totalCount": 1}
+        assert service.get_position(1, client)["latitude"] == 26.0
+        assert client.get_all_assets.call_count == 2
+        assert service.get_stats()["assets"] == 1
+
+    def test_failed_refresh_keeps_last_snapshot(self, service, clock):
+        client = fms_client([asset(1)])
+        snapshot = service.get_snapshot(client)
+
+        clock.now += 60
+        client.get_all_assets.return_value = {"error": True, "message": "timeout"}
+        assert service.get_snapshot(client) is snapshot
+        stats = service.get_stats()
+        assert (stats["refreshes"], stats["failed_refreshes"], stats["age_seconds"]) == (1, 1, 60.0)
+
+    def test_snapshot_shared_through_redis(self, clock):
+        fakeredis = pytest.importorskip("fakeredis")
+        redis_client = fakeredis.FakeRedis(decode_responses=True)
+        config = FMSLocationConfig(max_age_seconds=30)
+        first = LocationIngestService(redis_client, config, clock)
+        second = LocationIngestService(redis_client, config, clock)
+
+        first.get_snapshot(fms_client([asset(7, lat=21.5)]))
+        client = fms_client([])
+        assert second.get_position(7, client)["latitude"] == 21.5
+        client.get_all_assets.assert_not_called()
+        assert second.get_stats()["redis_hits"] == 1
+
+
+class TestAssetSync:
+    """Tests for prefetched courier and vehicle matching"""
+
+    @pytest.fixture
+    def fleet(self, db):
+        org = Organization(name="Acme", slug="acme")
+        db.add(org)
+        db.commit()
+        db.add_all(
+            [
+                Courier(organization_id=org.id, barq_id="BRQ-1", full_name="Courier 1",
+                        mobile_number="0500000001"),
+                Courier(organization_id=org.id, barq_id="BRQ-2", full_name="Courier 2",
+                        mobile_number="0500000002", iqama_number="2123456789"),
+                Vehicle(organization_id=org.id, plate_number="ABC 1234",
+                        vehicle_type=VehicleType.MOTORCYCLE, make="Honda", model="CB", year=2024),
+                Vehicle(organization_id=org.id, plate_number="XYZ-9999",
+                        vehicle_type=VehicleType.CAR, make="Toyota", model="Yaris", year=2024),
+            ]
+        )
+        db.commit()
+
+    def test_matcher(self, db, fleet):
+        assets = [
+            asset(1, "BRQ-1", "ABC 1234"),
+            asset(2, "UNKNOWN", "xyz", iqama="2123456789"),
+            asset(3, "NOPE", "none"),
+        ]
+        matcher = AssetMatcher(db, assets)
+
+        assert [getattr(matcher.courier_for(a), "barq_id", None) for a in assets] == [
+            "BRQ-1", "BRQ-2", None
+        ]
+        assert [getattr(matcher.vehicle_for(a), "plate_number", None) for a in assets] == [
+            "ABC 1234", "XYZ-9999", None
+        ]
+
+    def test_sync_queries_do_not_grow_with_assets(self, db, fleet, service):
+        def count_selects(assets):
+            statements = []
+
+            def before(conn, cursor, statement, *args):
+                if statement.lstrip().upper().startswith("SELECT"):
+                    statements.append(statement)
+
+            event.listen(db.bind, "before_cursor_execute", before)
+            try:
+                with patch("app.services.fms.sync.get_fms_client", return_value=fms_client(assets)), \
+                        patch("app.services.fms.sync.location_ingest_service", service):
+                    stats = FMSSyncService(db).sync_all_assets()
+            finally:
+                event.remove(db.bind, "before_cursor_execute", before)
+            return stats, len(statements)
+
+        few, few_selects = count_selects([asset(1, "BRQ-1", "ABC 1234")])
+        many, many_selects = count_selects(
+            [asset(1, "BRQ-1", "ABC 1234"), asset(2, "BRQ-2", "XYZ-9999")]
+            + [asset(n, f"X-{n}", f"P-{n}") for n in range(10, 60)]
+        )
+
+        assert (few["couriers_matched"], many["couriers_matched"]) == (1, 2)
+        assert many["vehicles_matched"] == 2
+        assert len(many["unmatched_assets"]) == 50
+        assert many_selects <= few_selects + 2
+        assert service.get_snapshot().get(59)["barq_id"] == "X-59"
@@ -14,6 +14,19 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from unittest.mock import MagicMock, patch, PropertyMock
 
+from app.models.fleet.courier import CourierStatus, ProjectType, SponsorshipStatus
+from app.models.fleet.vehicle import VehicleStatus
+from app.services.analytics.dashboard_rollup_service import (
+    COURIER_FLAGS,
+    COURIER_PROJECT,
+    COURIER_SPONSORSHIP,
+    COURIER_STATUS,
+    CURRENT_BUCKET,
+    REFRESHED,
+    VEHICLE_ASSIGNED,
+    VEHICLE_STATUS,
+    RollupView,
+)
 from app.services.dashboard_performance_service import (
     DashboardPerformanceService,
     dashboard_service,
@@ -143,121 +156,105 @@ class TestGetDashboardStats:
 
 # ==================== Calculate Dashboard Stats Tests ====================
 
+def make_rollup_view(courier_stats, vehicle_stats):
+    """Build a RollupView carrying the same counts as the stats fixtures"""
+    current = [
+        (COURIER_STATUS, CourierStatus.ACTIVE.value, courier_stats.active),
+        (COURIER_STATUS, CourierStatus.INACTIVE.value, courier_stats.inactive),
+        (COURIER_STATUS, CourierStatus.ON_LEAVE.value, courier_stats.on_leave),
+        (COURIER_STATUS, CourierStatus.ONBOARDING.value, courier_stats.onboarding),
+        (COURIER_STATUS, CourierStatus.SUSPENDED.value, courier_stats.suspended),
+        (COURIER_FLAGS, "with_vehicle", courier_stats.with_vehicle),
+        (COURIER_SPONSORSHIP, SponsorshipStatus.AJEER.value, courier_stats.ajeer),
+        (COURIER_SPONSORSHIP, SponsorshipStatus.INHOUSE.value, courier_stats.inhouse),
+        (COURIER_SPONSORSHIP, SponsorshipStatus.FREELANCER.value, courier_stats.freelancer),
+        (COURIER_PROJECT, ProjectType.ECOMMERCE.value, courier_stats.ecommerce),
+        (COURIER_PROJECT, ProjectType.FOOD.value, courier_stats.food),
+        (COURIER_PROJECT, ProjectType.WAREHOUSE.value, courier_stats.warehouse),
+        (COURIER_PROJECT, ProjectType.BARQ.value, courier_stats.barq),
+        (VEHICLE_STATUS, VehicleStatus.ACTIVE.value, vehicle_stats.available + vehicle_stats.assigned),
+        (VEHICLE_ASSIGNED, VehicleStatus.ACTIVE.value, vehicle_stats.assigned),
+        (VEHICLE_STATUS, VehicleStatus.MAINTENANCE.value, vehicle_stats.maintenance),
+        (VEHICLE_STATUS, VehicleStatus.INACTIVE.value, vehicle_stats.out_of_service),
+        (REFRESHED, "", 1),
+    ]
+    return RollupView(
+        ("current", CURRENT_BUCKET, metric, dimension, count, 0)
+        for metric, dimension, count in current
+    )
+
+
 class TestCalculateDashboardStats:
     """Tests for _calculate_dashboard_stats method"""
 
-    def test_returns_complete_stats_structure(self, service, mock_db, mock_courier_stats, mock_vehicle_stats):
+    @pytest.fixture
+    def stats(self, service, mock_db, mock_courier_stats, mock_vehicle_stats):
+        view = make_rollup_view(mock_courier_stats, mock_vehicle_stats)
+        with patch(
+            "app.services.dashboard_performance_service.dashboard_rollup_service.load",
+            return_value=view,
+        ):
+            return service._calculate_dashboard_stats(mock_db, org_id=1)
+
+    def test_reads_rollups(self, service, mock_db, mock_courier_stats, mock_vehicle_stats):
+        """Should load the organization's rollups once"""
+        view = make_rollup_view(mock_courier_stats, mock_vehicle_stats)
+        with patch(
+            "app.services.dashboard_performance_service.dashboard_rollup_service.load",
+            return_value=view,
+        ) as mock_load:
+            service._calculate_dashboard_stats(mock_db, org_id=1)
+
+        mock_load.assert_called_once()
+        assert mock_load.call_args[0][:2] == (mock_db, 1)
+
+    def test_returns_complete_stats_structure(self, stats):
         """Should return complete stats structure"""
-        mock_db.query.return_value.filter.return_value.one.side_effect = [
-            mock_courier_stats,
-            mock_vehicle_stats,
-        ]
-        mock_db.query.return_value.filter.return_value.scalar.return_value = 50
-
-        result = service._calculate_dashboard_stats(mock_db, org_id=1)
-
         # Verify required fields
-        assert "total_couriers" in result
-        assert "total_vehicles" in result
-        assert "active_couriers" in result
-        assert "courier_utilization" in result
-        assert "vehicle_utilization" in result
-        assert "sponsorship_breakdown" in result
-        assert "project_breakdown" in result
-        assert "insights" in result
-
-    def test_utilization_calculations(self, service, mock_db, mock_courier_stats, mock_vehicle_stats):
+        assert "total_couriers" in stats
+        assert "total_vehicles" in stats
+        assert "active_couriers" in stats
+        assert "courier_utilization" in stats
+        assert "vehicle_utilization" in stats
+        assert "sponsorship_breakdown" in stats
+        assert "project_breakdown" in stats
+        assert "insights" in stats
+
+    def test_utilization_calculations(self, stats):
         """Should calculate utilization percentages correctly"""
-        mock_db.query.return_value.filter.return_value.one.side_effect = [
-            mock_courier_stats,
-            mock_vehicle_stats,
-        ]
-        mock_db.query.return_value.filter.return_value.scalar.return_value = 50
-
-        result = service._calculate_dashboard_stats(mock_db, org_id=1)
-
         # 75 active / 100 total = 75%
-        assert result["courier_utilization"] == 75.0
+        assert stats["courier_utilization"] == 75.0
         # 50 assigned / 80 total = 62.5%
-        assert result["vehicle_utilization"] == 62.5
+        assert stats["vehicle_utilization"] == 62.5
 
     def test_zero_division_protection(self, service, mock_db):
         """Should handle zero totals without division error"""
-        zero_courier_stats = MagicMock()
-        zero_courier_stats.total = 0
-        zero_courier_stats.active = 0
-        zero_courier_stats.inactive = 0
-        zero_courier_stats.on_leave = 0
-        zero_courier_stats.onboarding = 0
-        zero_courier_stats.suspended = 0
-        zero_courier_stats.with_vehicle = 0
-        zero_courier_stats.ajeer = 0
-        zero_courier_stats.inhouse = 0
-        zero_courier_stats.freelancer = 0
-        zero_courier_stats.ecommerce = 0
-        zero_courier_stats.food = 0
-        zero_courier_stats.warehouse = 0
-        zero_courier_stats.barq = 0
-
-        zero_vehicle_stats = MagicMock()
-        zero_vehicle_stats.total = 0
-        zero_vehicle_stats.available = 0
-        zero_vehicle_stats.assigned = 0
-        zero_vehicle_stats.maintenance = 0
-        zero_vehicle_stats.out_of_service = 0
-
-        mock_db.query.return_value.filter.return_value.one.side_effect = [
-            zero_courier_stats,
-            zero_vehicle_stats,
-        ]
-        mock_db.query.return_value.filter.return_value.scalar.return_value = 0
-
-        result = service._calculate_dashboard_stats(mock_db, org_id=1)
+        with patch(
+            "app.services.dashboard_performance_service.dashboard_rollup_service.load",
+            return_value=RollupView([]),
+        ):
+            result = service._calculate_dashboard_stats(mock_db, org_id=1)
 
         assert result["courier_utilization"] == 0
         assert result["vehicle_utilization"] == 0
 
-    def test_sponsorship_breakdown(self, service, mock_db, mock_courier_stats, mock_vehicle_stats):
+    def test_sponsorship_breakdown(self, stats):
         """Should include correct sponsorship breakdown"""
-        mock_db.query.return_value.filter.return_value.one.side_effect = [
-            mock_courier_stats,
-            mock_vehicle_stats,
-        ]
-        mock_db.query.return_value.filter.return_value.scalar.return_value = 50
-
-        result = service._calculate_dashboard_stats(mock_db, org_id=1)
+        assert stats["sponsorship_breakdown"]["ajeer"] == 30
+        assert stats["sponsorship_breakdown"]["inhouse"] == 50
+        assert stats["sponsorship_breakdown"]["freelancer"] == 20
 
-        assert result["sponsorship_breakdown"]["ajeer"] == 30
-        assert result["sponsorship_breakdown"]["inhouse"] == 50
-        assert result["sponsorship_breakdown"]["freelancer"] == 20
-
-    def test_project_breakdown(self, service, mock_db, mock_courier_stats, mock_vehicle_stats):
+    def test_project_breakdown(self, stats):
         """Should include correct project breakdown"""
-        mock_db.query.return_value.filter.return_value.one.side_effect = [
-            mock_courier_stats,
-            mock_vehicle_stats,
-        ]
-        mock_db.query.return_value.filter.return_value.scalar.return_value = 50
-
-        result = service._calculate_dashboard_stats(mock_db, org_id=1)
-
-        assert result["project_breakdown"]["ecommerce"] == 40
-        assert result["project_breakdown"]["food"] == 30
-        assert result["project_breakdown"]["warehouse"] == 20
-        assert result["project_breakdown"]["barq"] == 10
+        assert stats["project_breakdown"]["ecommerce"] == 40
+        assert stats["project_breakdown"]["food"] == 30
+        assert stats["project_breakdown"]["warehouse"] == 20
+        assert stats["project_breakdown"]["barq"] == 10
 
-    def test_insights_fleet_health(self, service, mock_db, mock_courier_stats, mock_vehicle_stats):
+    def test_insights_fleet_health(self, stats):
         """Should determine fleet health correctly"""
-        mock_db.query.return_value.filter.return_value.one.side_effect = [
-            mock_courier_stats,
-            mock_vehicle_stats,
-        ]
-        mock_db.query.return_value.filter.return_value.scalar.return_value = 50
-
-        result = service._calculate_dashboard_stats(mock_db, org_id=1)
-
         # Vehicle utilization > 50%, so should be "good"
-        assert result["insights"]["fleet_health"] == "good"
+        assert stats["insights"]["fleet_health"] == "good"
 
 
 # ==================== Top Couriers Tests ====================
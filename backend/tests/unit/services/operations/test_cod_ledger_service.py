@@ -0,0 +1,232 @@
+"""
+Unit Tests for COD Ledger Service
+
+Tests running courier COD balances:
+- Ledger entries and balances follow create, status, amount, courier and delete changes
+- Balance reads and all-courier listings come from the balance rows
+- Bulk deposit and multi-courier settlement
+- Reconciliation detects and repairs drift
+"""
+
+from datetime import date
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+
+from app.core.performance_config import CODLedgerConfig
+from app.models.fleet.courier import Courier
+from app.models.operations.cod import COD, CODStatus
+from app.models.operations.cod_ledger import CODLedgerEntry, CourierCODBalance
+from app.models.tenant.organization import Organization
+from app.schemas.operations.cod import CODCreate
+from app.services.operations.cod_ledger_service import CODLedgerService, cod_ledger_service
+from app.services.operations.cod_service import cod_service
+
+
+@pytest.fixture
+def org(db):
+    org = Organization(name="Acme", slug="acme")
+    db.add(org)
+    db.commit()
+    return org
+
+
+@pytest.fixture
+def couriers(db, org):
+    couriers = [
+        Courier(
+            organization_id=org.id,
+            barq_id=f"BRQ-{n}",
+            full_name=f"Courier {n}",
+            mobile_number=f"05000000{n}",
+        )
+        for n in range(3)
+    ]
+    db.add_all(couriers)
+    db.commit()
+    return [courier.id for courier in couriers]
+
+
+def add_cod(db, org, courier_id, amount, status=None):
+    cod = cod_service.create(
+        db,
+        obj_in=CODCreate(courier_id=courier_id, amount=Decimal(amount), collection_date=date(2026, 10, 18)),
+        organization_id=org.id,
+    )
+    if status:
+        cod = cod_service.update(db, db_obj=cod, obj_in={"status": status})
+    return cod
+
+
+def balance(db, org, courier_id):
+    return cod_service.get_courier_balance(db, courier_id=courier_id, organization_id=org.id)
+
+
+def assert_consistent(db, org):
+    result = CODLedgerService(CODLedgerConfig(repair=False)).reconcile(db, org.id)
+    assert result["balance_drift"] == [] and result["ledger_drift"] == []
+
+
+class TestLedgerMovements:
+    """Tests for ledger entries written by COD writes"""
+
+    def test_status_changes_move_money_between_buckets(self, db, org, couriers):
+        cod = add_cod(db, org, couriers[0], "100.00")
+        add_cod(db, org, couriers[0], "50.00", CODStatus.COLLECTED)
+
+        assert balance(db, org, couriers[0]) == {
+            "courier_id": couriers[0],
+            "pending_amount": 100.0,
+            "collected_amount": 50.0,
+            "total_balance": 150.0,
+            "transaction_count": 2,
+        }
+
+        cod_service.mark_as_collected(db, cod_id=cod.id)
+        cod_service.mark_as_deposited(db, cod_id=cod.id, reference_number="DEP-1")
+        row = cod_ledger_service.get_balance(db, couriers[0], org.id)
+        assert (row.collected_amount, row.deposited_amount, row.outstanding_amount) == (
+            Decimal("50.00"), Decimal("100.00"), Decimal("50.00")
+        )
+
+        cod_service.mark_as_reconciled(db, cod_id=cod.id)
+        db.refresh(row)
+        assert (row.deposited_amount, row.deposited_count) == (0, 0)
+
+        entries = cod_ledger_service.get_entries(db, org.id, cod_id=cod.id)
+        assert [(e.reason, e.from_status, e.to_status) for e in reversed(entries)] == [
+            ("created", None, "pending"),
+            ("collected", "pending", "collected"),
+            ("deposited", "collected", "deposited"),
+            ("reconciled", "deposited", "reconciled"),
+        ]
+        assert entries[1].reference_number == "DEP-1"
+        assert_consistent(db, org)
+
+    def test_amount_and_courier_changes_and_deletes(self, db, org, couriers):
+        cod = add_cod(db, org, couriers[0], "100.00")
+
+        cod_service.update(db, db_obj=cod, obj_in={"amount": Decimal("120.00")})
+        assert balance(db, org, couriers[0])["pending_amount"] == 120.0
+
+        cod_service.update(db, db_obj=cod, obj_in={"courier_id": couriers[1], "notes": "Handed over"})
+        assert balance(db, org, couriers[0])["total_balance"] == 0.0
+        assert balance(db, org, couriers[1])["total_balance"] == 120.0
+
+        # Notes alone do not touch the ledger
+        count = db.query(CODLedgerEntry).count()
+        cod_service.update(db, db_obj=cod, obj_in={"notes": "Checked"})
+        assert db.query(CODLedgerEntry).count() == count
+
+        cod_service.delete(db, id=cod.id)
+        assert balance(db, org, couriers[1])["transaction_count"] == 0
+        assert db.query(CODLedgerEntry).filter(CODLedgerEntry.cod_id == cod.id).count() == count + 1
+        assert_consistent(db, org)
+
+
+class TestBulkOperations:
+    """Tests for bulk deposit and settlement"""
+
+    def test_bulk_deposit(self, db, org, couriers):
+        cods = [add_cod(db, org, couriers[n % 2], "10.00") for n in range(4)]
+
+        updated = cod_service.bulk_deposit(
+            db, cod_ids=[cod.id for cod in cods[:3]], deposit_date=date(2026, 10, 19),
+            reference_number="BULK-1",
+        )
+
+        assert updated == 3
+        assert balance(db, org, couriers[0])["total_balance"] == 0.0
+        assert balance(db, org, couriers[1])["total_balance"] == 10.0
+        db.expire_all()
+        assert {cod.status for cod in db.query(COD).filter(COD.id.in_([c.id for c in cods[:3]]))} == {
+            CODStatus.DEPOSITED
+        }
+        assert_consistent(db, org)
+
+    def test_settle_many_couriers(self, db, org, couriers):
+        add_cod(db, org, couriers[0], "100.00")
+        add_cod(db, org, couriers[0], "25.50", CODStatus.COLLECTED)
+        add_cod(db, org, couriers[1], "40.00", CODStatus.COLLECTED)
+        add_cod(db, org, couriers[1], "60.00", CODStatus.RECONCILED)
+        add_cod(db, org, couriers[2], "70.00")
+
+        result = cod_service.settle_couriers(
+            db, courier_ids=couriers[:2], organization_id=org.id, reference_number="SETTLE-1"
+        )
+
+        assert result["couriers_settled"] == 2
+        assert result["transactions_settled"] == 3
+        assert result["total_amount"] == 165.5
+        assert result["couriers"] == [
+            {"courier_id": couriers[0], "transactions_settled": 2, "total_amount": 125.5},
+            {"courier_id": couriers[1], "transactions_settled": 1, "total_amount": 40.0},
+        ]
+        rows = cod_ledger_service.list_balances(db, org.id)
+        assert [(row.courier_id, row.outstanding_amount) for row in rows][0] == (couriers[2], Decimal("70.00"))
+        assert {row.courier_id: row.deposited_amount for row in rows}[couriers[0]] == Decimal("125.50")
+        assert [row.courier_id for row in cod_ledger_service.list_balances(db, org.id, min_outstanding=1)] == [
+            couriers[2]
+        ]
+        assert_consistent(db, org)
+
+    def test_settle_single_courier(self, db, org, couriers):
+        assert cod_service.settle_courier_cod(db, courier_id=couriers[0])["transactions_settled"] == 0
+
+        add_cod(db, org, couriers[0], "30.00")
+        result = cod_service.settle_courier_cod(
+            db, courier_id=couriers[0], organization_id=org.id, deposit_date=date(2026, 10, 20)
+        )
+
+        assert result == {
+            "courier_id": couriers[0],
+            "transactions_settled": 1,
+            "total_amount": 30.0,
+            "deposit_date": "2026-10-20",
+            "reference_number": None,
+        }
+        assert balance(db, org, couriers[0])["total_balance"] == 0.0
+
+
+class TestReconcile:
+    """Tests for drift detection and repair"""
+
+    def test_drift_is_reported_and_repaired(self, db, org, couriers):
+        add_cod(db, org, couriers[0], "100.00")
+        cod = add_cod(db, org, couriers[1], "40.00")
+        # Writes that bypass the service
+        db.query(COD).filter(COD.id == cod.id).update({"amount": Decimal("45.00")})
+        db.add(COD(organization_id=org.id, courier_id=couriers[2], amount=Decimal("5.00"),
+                   collection_date=date(2026, 10, 18), status=CODStatus.PENDING))
+        db.commit()
+
+        report = CODLedgerService(CODLedgerConfig(repair=False)).reconcile(db, org.id)
+        assert report["balance_drift"] == [couriers[1], couriers[2]]
+        assert report["ledger_drift"] == [couriers[1], couriers[2]]
+        assert not report["repaired"]
+
+        repaired = CODLedgerService(CODLedgerConfig(repair=True)).reconcile(db, org.id)
+        db.commit()
+        assert repaired["repaired"]
+        assert balance(db, org, couriers[1])["pending_amount"] == 45.0
+        assert balance(db, org, couriers[2])["pending_amount"] == 5.0
+        assert db.query(CODLedgerEntry).filter(CODLedgerEntry.reason == "adjustment").count() == 2
+        assert_consistent(db, org)
+        assert all(row.reconciled_at for row in db.query(CourierCODBalance))
+
+    def test_courier_without_locked_row_is_left_to_its_writer(self, db, org, couriers):
+        add_cod(db, org, couriers[0], "10.00")
+        # First COD of a courier committed after the balance rows were created
+        db.add(COD(organization_id=org.id, courier_id=couriers[1], amount=Decimal("5.00"),
+                   collection_date=date(2026, 10, 18), status=CODStatus.PENDING))
+        db.commit()
+        service = CODLedgerService(CODLedgerConfig(repair=True))
+
+        with patch.object(service, "_ensure_balances"):
+            result = service.reconcile(db, org.id)
+        db.commit()
+
+        assert result["balance_drift"] == [couriers[1]]
+        assert db.query(CourierCODBalance).filter_by(courier_id=couriers[1]).count() == 0
+        assert balance(db, org, couriers[0])["pending_amount"] == 10.0
@@ -331,28 +331,28 @@ class TestBulkDeposit:
 
     def test_bulk_deposit_success(self, service, mock_db):
         """Should deposit multiple COD records"""
-        with patch.object(service, 'bulk_update', return_value=5) as mock_bulk:
+        with patch.object(service, '_deposit_where', return_value=[MagicMock()] * 5) as mock_deposit:
             result = service.bulk_deposit(mock_db, cod_ids=[1, 2, 3, 4, 5])
 
         assert result == 5
-        mock_bulk.assert_called_once()
+        mock_deposit.assert_called_once()
 
     def test_bulk_deposit_with_date(self, service, mock_db):
         """Should use provided deposit date"""
         deposit_date = date(2025, 1, 20)
-        with patch.object(service, 'bulk_update', return_value=3) as mock_bulk:
+        with patch.object(service, '_deposit_where', return_value=[]) as mock_deposit:
             service.bulk_deposit(mock_db, cod_ids=[1, 2, 3], deposit_date=deposit_date)
 
-        call_args = mock_bulk.call_args[1]
-        assert call_args["update_data"]["deposit_date"] == deposit_date
+        call_args = mock_deposit.call_args[1]
+        assert call_args["deposit_date"] == deposit_date
 
     def test_bulk_deposit_with_reference(self, service, mock_db):
         """Should include reference number"""
-        with patch.object(service, 'bulk_update', return_value=2) as mock_bulk:
+        with patch.object(service, '_deposit_where', return_value=[]) as mock_deposit:
             service.bulk_deposit(mock_db, cod_ids=[1, 2], reference_number="BULK-REF-001")
 
-        call_args = mock_bulk.call_args[1]
-        assert call_args["update_data"]["reference_number"] == "BULK-REF-001"
+        call_args = mock_deposit.call_args[1]
+        assert call_args["reference_number"] == "BULK-REF-001"
 
 
 # ==================== Statistics Tests ====================
@@ -428,19 +428,20 @@ class TestGetCourierBalance:
     """Tests for get_courier_balance method"""
 
     def test_get_courier_balance(self, service, mock_db):
-        """Should return courier balance"""
-        pending_cod = MagicMock(spec=COD)
-        pending_cod.amount = Decimal("300.00")
-        pending_cod.status = CODStatus.PENDING
-
-        collected_cod = MagicMock(spec=COD)
-        collected_cod.amount = Decimal("200.00")
-        collected_cod.status = CODStatus.COLLECTED
-
-        mock_db.query.return_value.filter.return_value.all.return_value = [pending_cod, collected_cod]
-
-        result = service.get_courier_balance(mock_db, courier_id=100)
-
+        """Should return courier balance from the running balance row"""
+        row = MagicMock()
+        row.pending_amount = Decimal("300.00")
+        row.collected_amount = Decimal("200.00")
+        row.outstanding_amount = Decimal("500.00")
+        row.pending_count = 1
+        row.collected_count = 1
+
+        with patch(
+            "app.services.operations.cod_service.cod_ledger_service.get_balance", return_value=row
+        ) as mock_get:
+            result = service.get_courier_balance(mock_db, courier_id=100, organization_id=7)
+
+        mock_get.assert_called_once_with(mock_db, 100, 7)
         assert result["courier_id"] == 100
         assert result["pending_amount"] == 300.0
         assert result["collected_amount"] == 200.0
@@ -448,10 +449,11 @@ class TestGetCourierBalance:
         assert result["transaction_count"] == 2
 
     def test_get_courier_balance_empty(self, service, mock_db):
-        """Should handle no pending/collected COD"""
-        mock_db.query.return_value.filter.return_value.all.return_value = []
-
-        result = service.get_courier_balance(mock_db, courier_id=100)
+        """Should handle couriers without COD"""
+        with patch(
+            "app.services.operations.cod_service.cod_ledger_service.get_balance", return_value=None
+        ):
+            result = service.get_courier_balance(mock_db, courier_id=100)
 
         assert result["pending_amount"] == 0.0
         assert result["collected_amount"] == 0.0
@@ -461,47 +463,36 @@ class TestGetCourierBalance:
 
 # ==================== Settle Courier COD Tests ====================
 
+def settled_row(cod_id, amount, courier_id=100):
+    row = MagicMock()
+    row.id = cod_id
+    row.courier_id = courier_id
+    row.amount = Decimal(amount)
+    return row
+
+
 class TestSettleCourierCod:
     """Tests for settle_courier_cod method"""
 
     def test_settle_courier_cod_success(self, service, mock_db):
         """Should settle all pending/collected COD"""
-        pending_cod = MagicMock(spec=COD)
-        pending_cod.id = 1
-        pending_cod.amount = Decimal("300.00")
-        pending_cod.status = CODStatus.PENDING
-
-        collected_cod = MagicMock(spec=COD)
-        collected_cod.id = 2
-        collected_cod.amount = Decimal("200.00")
-        collected_cod.status = CODStatus.COLLECTED
-
-        mock_db.query.return_value.filter.return_value.all.return_value = [pending_cod, collected_cod]
+        rows = [settled_row(1, "300.00"), settled_row(2, "200.00")]
 
-        with patch.object(service, 'bulk_deposit', return_value=2) as mock_bulk:
+        with patch.object(service, '_deposit_where', return_value=rows) as mock_deposit:
             result = service.settle_courier_cod(mock_db, courier_id=100)
 
         assert result["courier_id"] == 100
         assert result["transactions_settled"] == 2
         assert result["total_amount"] == 500.0
-        mock_bulk.assert_called_once_with(
-            mock_db,
-            cod_ids=[1, 2],
-            deposit_date=date.today(),
-            reference_number=None
-        )
+        call_args = mock_deposit.call_args[1]
+        assert call_args["deposit_date"] is None
+        assert call_args["reason"] == "settled"
 
     def test_settle_courier_cod_with_options(self, service, mock_db):
         """Should use provided deposit date and reference"""
-        pending_cod = MagicMock(spec=COD)
-        pending_cod.id = 1
-        pending_cod.amount = Decimal("100.00")
-        pending_cod.status = CODStatus.PENDING
-
-        mock_db.query.return_value.filter.return_value.all.return_value = [pending_cod]
         deposit_date = date(2025, 1, 25)
 
-        with patch.object(service, 'bulk_deposit', return_value=1) as mock_bulk:
+        with patch.object(service, '_deposit_where', return_value=[settled_row(1, "100.00")]) as mock_deposit:
             result = service.settle_courier_cod(
                 mock_db,
                 courier_id=100,
@@ -511,23 +502,33 @@ class TestSettleCourierCod:
 
         assert result["deposit_date"] == deposit_date.isoformat()
         assert result["reference_number"] == "SETTLE-001"
-        mock_bulk.assert_called_once_with(
-            mock_db,
-            cod_ids=[1],
-            deposit_date=deposit_date,
-            reference_number="SETTLE-001"
-        )
+        call_args = mock_deposit.call_args[1]
+        assert call_args["deposit_date"] == deposit_date
+        assert call_args["reference_number"] == "SETTLE-001"
 
     def test_settle_courier_cod_empty(self, service, mock_db):
         """Should handle no pending/collected COD"""
-        mock_db.query.return_value.filter.return_value.all.return_value = []
-
-        result = service.settle_courier_cod(mock_db, courier_id=100)
+        with patch.object(service, '_deposit_where', return_value=[]):
+            result = service.settle_courier_cod(mock_db, courier_id=100)
 
         assert result["transactions_settled"] == 0
         assert result["total_amount"] == 0.0
         assert "No pending or collected" in result["message"]
 
+    def test_settle_couriers_breakdown(self, service, mock_db):
+        """Should report totals per courier"""
+        rows = [settled_row(1, "10.00", 100), settled_row(2, "5.50", 200), settled_row(3, "4.50", 100)]
+
+        with patch.object(service, '_deposit_where', return_value=rows):
+            result = service.settle_couriers(mock_db, courier_ids=[100, 200, 300])
+
+        assert result["couriers_settled"] == 2
+        assert result["total_amount"] == 20.0
+        assert result["couriers"] == [
+            {"courier_id": 100, "transactions_settled": 2, "total_amount": 14.5},
+            {"courier_id": 200, "transactions_settled": 1, "total_amount": 5.5},
+        ]
+
 
 # ==================== Status Workflow Tests ====================
 
@@ -0,0 +1,203 @@
+"""
+Unit Tests for Feedback Text Analysis
+
+Tests the compiled keyword classifier:
+- Matches the per-keyword substring scan it replaces
+- Overlapping keywords are all counted
+- Per-organization keyword tables and hot reload
+- Bulk reclassification of stored feedback
+"""
+
+import random
+from datetime import datetime
+
+import pytest
+
+from app.models.operations.feedback import CustomerFeedback, FeedbackSentiment, FeedbackType
+from app.models.tenant.organization import Organization
+from app.services.operations.feedback_analysis import (
+    DEFAULT_KEYWORDS,
+    SETTINGS_KEY,
+    FeedbackAnalyzer,
+    KeywordMatcher,
+    analyzer_for_keywords,
+    analyzer_for_organization,
+    normalize_keywords,
+    reclassify_feedback,
+)
+
+
+def make_org(db, org_id, settings=None):
+    org = Organization(id=org_id, name=f"Org {org_id}", slug=f"org-{org_id}", settings=settings)
+    db.add(org)
+    db.commit()
+    return org
+
+
+def make_feedback(db, number, text, rating, org_id=1, **extra):
+    feedback = CustomerFeedback(
+        organization_id=org_id,
+        feedback_number=f"FB-{number}",
+        feedback_type=FeedbackType.DELIVERY,
+        overall_rating=rating,
+        feedback_text=text,
+        submitted_at=datetime(2026, 10, 18),
+        **extra,
+    )
+    db.add(feedback)
+    return feedback
+
+
+def naive_counts(text, keywords):
+    """The per-keyword substring scan used before"""
+    lower = text.lower()
+    return sum(1 for keyword in keywords if keyword in lower)
+
+
+class TestKeywordMatcher:
+    """Tests for the compiled matcher"""
+
+    def test_overlapping_keywords(self):
+        matcher = KeywordMatcher(["thank", "thanks", "time", "on time", "professional",
+                                  "unprofessional", "app"])
+
+        found = matcher.find("Thanks, UNPROFESSIONAL but on time. Happy?")
+
+        assert found == {"thank", "thanks", "time", "on time", "professional", "unprofessional",
+                         "app"}
+
+    def test_matches_substring_scan(self):
+        keywords = sorted(
+            set(DEFAULT_KEYWORDS["positive"])
+            | set(DEFAULT_KEYWORDS["negative"])
+            | {k for values in DEFAULT_KEYWORDS["categories"].values() for k in values}
+        )
+        matcher = KeywordMatcher(keywords)
+        vocabulary = keywords + ["the", "courier", "was", "very", "and", "frustrated", "ontime", "x"]
+        rng = random.Random(7)
+
+        for _ in range(300):
+            text = rng.choice([" ", ""]).join(rng.choice(vocabulary) for _ in range(rng.randint(0, 30)))
+            assert matcher.find(text) == {k for k in keywords if k in text.lower()}
+
+    def test_empty(self):
+        assert KeywordMatcher([]).find("anything") == set()
+
+
+class TestFeedbackAnalyzer:
+    """Tests for sentiment and categorization"""
+
+    @pytest.mark.parametrize(
+        "text,rating",
+        [
+            ("Excellent and fast delivery, thanks!", 5),
+            ("Courier was rude and the package arrived damaged", 1),
+            ("It was ok", 3),
+            ("Late again, never on time, frustrating", 4),
+            ("Great app but the price is too expensive", 2),
+        ],
+    )
+    def test_matches_previous_scoring(self, text, rating):
+        analyzer = FeedbackAnalyzer()
+        positive = naive_counts(text, DEFAULT_KEYWORDS["positive"])
+        negative = naive_counts(text, DEFAULT_KEYWORDS["negative"])
+        text_score = 0 if negative > positive else (2 if positive > negative else 1)
+        rating_score = 0 if rating <= 2 else (1 if rating == 3 else 2)
+        combined = (text_score + rating_score) / 2
+        expected = (
+            FeedbackSentiment.NEGATIVE if combined < 0.8
+            else FeedbackSentiment.POSITIVE if combined > 1.2
+            else FeedbackSentiment.NEUTRAL
+        )
+        scores = {
+            name: naive_counts(text, keywords)
+            for name, keywords in DEFAULT_KEYWORDS["categories"].items()
+        }
+        best = max(scores, key=scores.get)
+
+        assert analyzer.sentiment(text, rating) == expected
+        assert analyzer.category(text, FeedbackType.GENERAL) == (best if scores[best] else "general")
+
+    def test_type_default_and_customer_category(self):
+        analyzer = FeedbackAnalyzer()
+
+        assert analyzer.category("hmm", FeedbackType.COURIER) == "courier_behavior"
+        result = analyzer.classify("terrible", 1, FeedbackType.APP, category="billing")
+        assert result.category == "billing"
+        assert result.is_complaint is True
+        assert result.is_compliment is False
+
+    def test_classify_batch(self):
+        results = FeedbackAnalyzer().classify_batch(
+            [("amazing", 5, "delivery"), ("awful", 1, "delivery")] * 500
+        )
+
+        assert len(results) == 1000
+        assert results[0].is_compliment and results[1].is_complaint
+
+
+class TestKeywordTables:
+    """Tests for per-organization tables"""
+
+    def test_normalize_and_validate(self):
+        tables = normalize_keywords({"positive": [" Shukran ", "shukran"]})
+
+        assert tables["positive"] == ["shukran"]
+        assert tables["negative"] == DEFAULT_KEYWORDS["negative"]
+        with pytest.raises(ValueError):
+            normalize_keywords({"positive": "great"})
+        with pytest.raises(ValueError):
+            normalize_keywords({"neutral": []})
+
+    def test_identical_tables_share_compiled_analyzer(self):
+        assert analyzer_for_keywords(None) is analyzer_for_keywords({})
+
+    def test_settings_change_applies_without_restart(self, db):
+        org = make_org(db, 1)
+        assert analyzer_for_organization(db, 1).sentiment("mumtaz", 3) == FeedbackSentiment.NEUTRAL
+
+        org.settings = {SETTINGS_KEY: {"positive": ["mumtaz"], "categories": {"arabic": ["mumtaz"]}}}
+        db.commit()
+
+        analyzer = analyzer_for_organization(db, 1)
+        assert analyzer.sentiment("mumtaz", 3) == FeedbackSentiment.POSITIVE
+        assert analyzer.category("mumtaz", FeedbackType.GENERAL) == "arabic"
+
+    def test_invalid_settings_fall_back_to_defaults(self, db):
+        make_org(db, 1, settings={SETTINGS_KEY: {"positive": 5}})
+
+        assert analyzer_for_organization(db, 1) is analyzer_for_keywords(None)
+
+
+class TestReclassify:
+    """Tests for the backfill"""
+
+    def test_reclassifies_in_batches(self, db):
+        make_org(db, 1, settings={SETTINGS_KEY: {"negative": ["meh"]}})
+        make_org(db, 2)
+        make_feedback(db, 1, "meh courier", 3, sentiment=FeedbackSentiment.NEUTRAL)
+        make_feedback(db, 2, "great, on time", 5, category="custom")
+        make_feedback(db, 3, "meh", 3, org_id=2)
+        db.commit()
+
+        result = reclassify_feedback(db, batch_size=2)
+
+        rows = {f.feedback_number: f for f in db.query(CustomerFeedback)}
+        assert result == {"processed": 3, "sentiment_changed": 3}
+        assert rows["FB-1"].sentiment == FeedbackSentiment.NEGATIVE
+        assert rows["FB-1"].is_complaint is True
+        assert rows["FB-1"].category == "delivery_speed"
+        assert rows["FB-2"].category == "custom"
+        assert rows["FB-2"].is_compliment is True
+        assert rows["FB-3"].sentiment == FeedbackSentiment.NEUTRAL
+
+    def test_recategorize_and_org_filter(self, db):
+        make_org(db, 1)
+        make_feedback(db, 1, "the price was fine", 3, category="custom")
+        make_feedback(db, 2, "the price was fine", 3, org_id=2, category="custom")
+        db.commit()
+
+        assert reclassify_feedback(db, organization_id=1, recategorize=True)["processed"] == 1
+        rows = {f.feedback_number: f for f in db.query(CustomerFeedback)}
+        assert rows["FB-1"].category == "pricing"
+        assert rows["FB-2"].category == "custom"
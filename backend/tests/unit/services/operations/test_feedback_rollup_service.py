@@ -0,0 +1,246 @@
+"""
+Unit Tests for Feedback Rollup Service
+
+Tests the feedback aggregate layer:
+- Metrics and courier summaries from rollups match the row-by-row values
+- Incremental refresh of touched days only
+- Dirty day tracking through session events
+- Redis-backed refresh of pending organizations
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.core.performance_config import FeedbackRollupConfig
+from app.models.operations.feedback import (
+    CustomerFeedback,
+    FeedbackSentiment,
+    FeedbackStatus,
+    FeedbackType,
+)
+from app.models.operations.feedback_rollup import FeedbackDailyRollup
+from app.models.tenant.organization import Organization
+from app.services.operations.feedback_analysis import reclassify_feedback
+from app.services.operations.feedback_rollup_service import (
+    MARKER_DAY,
+    FeedbackRollupService,
+    feedback_rollup_service,
+)
+
+NOW = datetime(2026, 10, 18, 12, 0, 0)
+TODAY = NOW.date()
+
+
+@pytest.fixture
+def db(sqlite_db):
+    with patch.object(feedback_rollup_service, "mark_dirty"):
+        yield sqlite_db
+
+
+@pytest.fixture
+def service():
+    return FeedbackRollupService(FeedbackRollupConfig(window_days=1, max_staleness_seconds=900))
+
+
+def add_org(db, name="Acme"):
+    org = Organization(name=name, slug=name.lower())
+    db.add(org)
+    db.flush()
+    return org
+
+
+def add_feedback(db, org, n, days_ago=0, rating=5, courier_id=None, **extra):
+    feedback = CustomerFeedback(
+        organization_id=org.id,
+        feedback_number=f"FB-{org.id}-{n}",
+        feedback_type=FeedbackType.DELIVERY,
+        overall_rating=rating,
+        feedback_text="text",
+        submitted_at=NOW - timedelta(days=days_ago, hours=1),
+        courier_id=courier_id,
+        **extra,
+    )
+    db.add(feedback)
+    return feedback
+
+
+@pytest.fixture
+def seeded(db):
+    org = add_org(db)
+    add_feedback(
+        db, org, 1, rating=5, courier_id=7, sentiment=FeedbackSentiment.POSITIVE,
+        category="delivery_speed", is_compliment=True, delivery_speed_rating=5,
+        responded_at=NOW, response_time_hours=2, status=FeedbackStatus.RESOLVED,
+        resolution_satisfaction=4,
+    )
+    add_feedback(
+        db, org, 2, rating=1, courier_id=7, sentiment=FeedbackSentiment.NEGATIVE,
+        category="courier_behavior", is_complaint=True, is_escalated=True,
+        delivery_speed_rating=2, responded_at=NOW, response_time_hours=6,
+    )
+    add_feedback(db, org, 3, days_ago=3, rating=3, sentiment=FeedbackSentiment.NEUTRAL,
+                 category="delivery_speed")
+    add_feedback(db, org, 4, days_ago=40, rating=4, courier_id=7, category="pricing")
+    add_feedback(db, add_org(db, "Other"), 1, rating=1, courier_id=7)
+    db.commit()
+    return org
+
+
+@pytest.fixture
+def rolled_up(db, service, seeded):
+    service.refresh_organization(db, seeded.id, full=True, now=NOW)
+    db.commit()
+    return seeded
+
+
+class TestReads:
+    """Tests for metrics and summaries served from rollups"""
+
+    def test_metrics(self, db, service, rolled_up):
+        metrics = service.get_metrics(db, rolled_up.id, since=TODAY - timedelta(days=30))
+
+        assert metrics["total_feedbacks"] == 3
+        assert metrics["avg_overall_rating"] == 3
+        assert metrics["avg_delivery_speed_rating"] == 3.5
+        assert metrics["avg_communication_rating"] == 0
+        assert metrics["complaints_count"] == 1
+        assert metrics["compliments_count"] == 1
+        assert metrics["response_rate"] == pytest.approx(66.67)
+        assert metrics["avg_response_time_hours"] == 4
+        assert metrics["resolution_rate"] == pytest.approx(33.33)
+        assert metrics["avg_resolution_satisfaction"] == 4
+        assert metrics["escalation_rate"] == pytest.approx(33.33)
+        assert metrics["sentiment_distribution"] == {"positive": 1, "neutral": 1, "negative": 1}
+        assert metrics["rating_distribution"] == {"1": 1, "2": 0, "3": 1, "4": 0, "5": 1}
+        assert metrics["top_categories"] == [
+            {"category": "delivery_speed", "count": 2},
+            {"category": "courier_behavior", "count": 1},
+        ]
+
+    def test_reads_do_not_touch_feedback_rows(self, db, service, rolled_up):
+        db.info["statements"].clear()
+
+        service.get_metrics(db, rolled_up.id, since=TODAY - timedelta(days=365))
+        service.get_courier_summary(db, rolled_up.id, 7)
+
+        assert not any("customer_feedbacks" in sql for sql in db.info["statements"])
+
+    def test_courier_summary(self, db, service, rolled_up):
+        summary = service.get_courier_summary(db, rolled_up.id, 7)
+
+        assert summary == {
+            "total_feedbacks": 3,
+            "avg_rating": pytest.approx(10 / 3),
+            "positive_count": 2,
+            "neutral_count": 0,
+            "negative_count": 1,
+            "complaints_count": 1,
+        }
+
+    def test_organization_is_empty_until_the_task_builds_it(self, db, service, seeded):
+        db.info["statements"].clear()
+
+        metrics = service.get_metrics(db, seeded.id, since=TODAY - timedelta(days=30))
+
+        assert metrics["total_feedbacks"] == 0
+        assert metrics["avg_overall_rating"] == 0
+        assert metrics["top_categories"] == []
+        assert service.get_courier_summary(db, seeded.id, 7)["total_feedbacks"] == 0
+        assert not any(
+            sql.lstrip().upper().startswith(("INSERT", "DELETE")) for sql in db.info["statements"]
+        )
+
+        service.refresh_pending(db, now=NOW)
+
+        assert service.get_metrics(db, seeded.id, since=TODAY - timedelta(days=30))[
+            "total_feedbacks"
+        ] == 3
+        assert db.query(FeedbackDailyRollup).filter_by(day=MARKER_DAY).count() == 2
+
+
+class TestRefresh:
+    """Tests for incremental maintenance"""
+
+    def test_incremental_refresh_only_rebuilds_touched_days(self, db, service, seeded):
+        service.refresh_organization(db, seeded.id, full=True, now=NOW)
+        db.commit()
+        old = db.query(CustomerFeedback).filter_by(feedback_number=f"FB-{seeded.id}-4").one()
+        old.overall_rating = 1
+        add_feedback(db, seeded, 5, days_ago=3, rating=2)
+        db.commit()
+        db.info["statements"].clear()
+
+        service.refresh_organization(
+            db, seeded.id, days=[(NOW - timedelta(days=3)).date()], now=NOW
+        )
+        db.commit()
+
+        # Day 40 was not touched, so it still holds the old rating
+        summary = service.get_courier_summary(db, seeded.id, 7)
+        assert summary["positive_count"] == 2
+        metrics = service.get_metrics(db, seeded.id, since=TODAY - timedelta(days=7))
+        assert metrics["total_feedbacks"] == 4
+        assert metrics["rating_distribution"]["2"] == 1
+
+    def test_commit_marks_touched_days(self, db, seeded):
+        feedback = db.query(CustomerFeedback).filter_by(feedback_number=f"FB-{seeded.id}-3").one()
+        feedback.submitted_at = NOW
+
+        with patch.object(feedback_rollup_service, "mark_dirty") as mark_dirty:
+            db.commit()
+
+        touched = set(mark_dirty.call_args[0][0])
+        assert touched == {(seeded.id, TODAY), (seeded.id, (NOW - timedelta(days=3)).date())}
+
+    def test_rollback_discards_touched_days(self, db, seeded):
+        add_feedback(db, seeded, 9)
+        db.flush()
+
+        with patch.object(feedback_rollup_service, "mark_dirty") as mark_dirty:
+            db.rollback()
+
+        mark_dirty.assert_not_called()
+
+    def test_reclassify_marks_touched_days(self, db, service, seeded):
+        feedback = add_feedback(db, seeded, 7, days_ago=12, rating=3)
+        feedback.feedback_text = "terrible, late"
+        db.commit()
+        service.refresh_organization(db, seeded.id, full=True, now=NOW)
+        db.commit()
+        feedback_rollup_service.mark_dirty.reset_mock()
+
+        reclassify_feedback(db, organization_id=seeded.id)
+
+        touched = set()
+        for call in feedback_rollup_service.mark_dirty.call_args_list:
+            touched.update(call[0][0])
+        old_day = (NOW - timedelta(days=12)).date()
+        assert (seeded.id, old_day) in touched
+
+        # Day 12 is outside the trailing window, so only the marked day rebuilds it
+        service.refresh_organization(db, seeded.id, days=[day for _, day in touched], now=NOW)
+        db.commit()
+        row = db.query(FeedbackDailyRollup).filter_by(organization_id=seeded.id, day=old_day).one()
+        assert row.negative_count == 1
+        assert row.neutral_count == 0
+
+    def test_refresh_pending_drains_dirty_set(self, db, service, seeded):
+        fakeredis = pytest.importorskip("fakeredis")
+        client = fakeredis.FakeRedis(decode_responses=True)
+        service.refresh_organization(db, seeded.id, full=True, now=NOW)
+        db.commit()
+        add_feedback(db, seeded, 6, days_ago=10, rating=1)
+        db.commit()
+
+        with patch("app.core.cache.cache_manager.redis_cache") as redis_cache:
+            redis_cache.client = client
+            service.mark_dirty([(seeded.id, (NOW - timedelta(days=10)).date())])
+            result = service.refresh_pending(db, now=NOW + timedelta(seconds=30))
+
+        # Seeded org was dirty, the other org had never been rolled up
+        assert result == {"refreshed": 2, "failed": 0, "dirty": 1}
+        assert client.scard("feedback:rollups:dirty") == 0
+        metrics = service.get_metrics(db, seeded.id, since=TODAY - timedelta(days=30))
+        assert metrics["rating_distribution"]["1"] == 2
@@ -0,0 +1,221 @@
+"""
+Unit Tests for Geocoding Service
+
+Tests address geocoding at ingest:
+- Address normalization and literal coordinate parsing
+- LRU, cache table and backend layers (each address geocoded once)
+- Stored misses, retries and backend outages
+- Coordinates and zones filled in on deliveries from sync and the API
+"""
+
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from app.core.performance_config import GeocodingConfig, ZoneIndexConfig
+from app.models.operations.delivery import Delivery
+from app.models.operations.geocode_cache import GeocodeCacheEntry
+from app.models.tenant.organization import Organization
+from app.schemas.operations.zone import ZoneCreate
+from app.services.operations import delivery_service, zone_service
+from app.services.operations.geocoding_service import (
+    Geocoder,
+    GeocoderUnavailable,
+    GeocodingService,
+    OfflineGeocoder,
+    normalize_address,
+    parse_coordinates,
+)
+from app.services.operations.zone_index import ZoneIndexService
+from app.services.platforms.base import PlatformOrder, PlatformType
+from app.services.platforms.order_sync import OrderSyncService
+
+KNOWN = {
+    "king fahd road, riyadh": (24.70, 46.20),
+    "olaya street, riyadh": (24.75, 46.25),
+}
+
+
+class FakeGeocoder(Geocoder):
+    """Resolves KNOWN and "lat,lng" addresses and records every batch it is sent"""
+
+    name = "fake"
+
+    def __init__(self):
+        self.batches = []
+        self.down = False
+
+    def geocode_batch(self, addresses):
+        if self.down:
+            raise GeocoderUnavailable("offline")
+        self.batches.append(list(addresses))
+        return [KNOWN.get(address) or parse_coordinates(address) for address in addresses]
+
+    @property
+    def sent(self):
+        return [address for batch in self.batches for address in batch]
+
+
+@pytest.fixture
+def geocoder():
+    return FakeGeocoder()
+
+
+@pytest.fixture
+def service(geocoder):
+    service = GeocodingService(geocoder, GeocodingConfig(batch_size=2, lru_size=100))
+    index = ZoneIndexService(ZoneIndexConfig(revalidate_seconds=3600))
+    with patch("app.services.operations.geocoding_service.geocoding_service", service), patch(
+        "app.services.operations.delivery_service.geocoding_service", service
+    ), patch("app.services.platforms.order_sync.geocoding_service", service), patch(
+        "app.services.operations.geocoding_service.zone_index_service", index
+    ), patch("app.services.operations.zone_service.zone_index_service", index):
+        yield service
+
+
+def add_org(db):
+    org = Organization(name="Acme", slug="acme")
+    db.add(org)
+    db.commit()
+    return org
+
+
+def add_zone(db, org):
+    ring = [[46.0, 24.5], [46.5, 24.5], [46.5, 25.0], [46.0, 25.0], [46.0, 24.5]]
+    zone_in = ZoneCreate(zone_code="Z-A", zone_name="Zone A", city="Riyadh",
+                         boundaries={"type": "Polygon", "coordinates": [ring]})
+    return zone_service.create(db, obj_in=zone_in, organization_id=org.id)
+
+
+class TestAddressParsing:
+    """Tests for normalization and literal coordinates"""
+
+    def test_normalize_address(self):
+        assert normalize_address("  King  Fahd Road ,Riyadh. ") == "king fahd road, riyadh"
+        assert normalize_address("KING FAHD ROAD;  riyadh") == "king fahd road, riyadh"
+        assert normalize_address("طريق الملك فهد، الرياض") == "طريق الملك فهد, الرياض"
+        assert normalize_address(None) == ""
+
+    def test_parse_coordinates(self):
+        assert parse_coordinates("24.7136, 46.6753") == (24.7136, 46.6753)
+        assert parse_coordinates("24.7136,46.6753, Riyadh") == (24.7136, 46.6753)
+        assert parse_coordinates("95.0, 46.0") is None
+        assert parse_coordinates("King Fahd Road, Riyadh") is None
+        assert OfflineGeocoder().geocode_batch(["1.5,2.5", "Olaya"]) == [(1.5, 2.5), None]
+
+
+class TestGeocodeMany:
+    """Tests for the cache layers"""
+
+    def test_each_address_is_geocoded_once(self, db, service, geocoder):
+        result = service.geocode_many(
+            db, ["King Fahd Road, Riyadh", "king fahd road,riyadh", "Olaya Street, Riyadh", "Nowhere"]
+        )
+        db.commit()
+
+        assert result == {
+            "King Fahd Road, Riyadh": (24.70, 46.20),
+            "king fahd road,riyadh": (24.70, 46.20),
+            "Olaya Street, Riyadh": (24.75, 46.25),
+            "Nowhere": None,
+        }
+        assert sorted(geocoder.sent) == ["king fahd road, riyadh", "nowhere", "olaya street, riyadh"]
+        assert [len(batch) for batch in geocoder.batches] == [2, 1]
+        assert db.query(GeocodeCacheEntry).count() == 3
+
+        # LRU hit
+        assert service.geocode(db, "OLAYA STREET, RIYADH") == (24.75, 46.25)
+        # Table hit in a fresh process, misses included
+        service.clear_cache()
+        assert service.geocode_many(db, ["Olaya Street, Riyadh", "Nowhere"]) == {
+            "Olaya Street, Riyadh": (24.75, 46.25),
+            "Nowhere": None,
+        }
+        assert len(geocoder.sent) == 3
+
+    def test_stale_misses_are_retried(self, db, service, geocoder):
+        assert service.geocode(db, "Nowhere") is None
+        db.commit()
+        entry = db.query(GeocodeCacheEntry).one()
+        entry.created_at = entry.updated_at = datetime(2020, 1, 1)
+        db.commit()
+        service.clear_cache()
+
+        KNOWN["nowhere"] = (24.9, 46.4)
+        try:
+            assert service.geocode(db, "Nowhere") == (24.9, 46.4)
+        finally:
+            del KNOWN["nowhere"]
+        db.commit()
+
+        entry = db.query(GeocodeCacheEntry).one()
+        assert (entry.latitude, entry.longitude) == (24.9, 46.4)
+
+    def test_outages_are_not_cached(self, db, service, geocoder):
+        geocoder.down = True
+        assert service.geocode(db, "Olaya Street, Riyadh") is None
+        assert db.query(GeocodeCacheEntry).count() == 0
+
+        geocoder.down = False
+        assert service.geocode(db, "Olaya Street, Riyadh") == (24.75, 46.25)
+
+
+class TestLocateDeliveries:
+    """Tests for coordinates and zones on deliveries"""
+
+    def test_synced_orders_are_geocoded_and_tagged(self, db, service, geocoder):
+        org = add_org(db)
+        zone = add_zone(db, org)
+        orders = [
+            PlatformOrder(
+                platform=PlatformType.JAHEZ,
+                platform_order_id=str(n),
+                pickup_address="Olaya Street, Riyadh",
+                delivery_address=address,
+                delivery_lat=lat,
+                delivery_lng=46.3 if lat else None,
+                created_at=datetime(2026, 10, 18),
+            )
+            for n, (address, lat) in enumerate([
+                ("King Fahd Road, Riyadh", None),
+                ("Somewhere, Riyadh", 24.6),
+                ("Nowhere", None),
+            ])
+        ]
+
+        OrderSyncService().sync_orders_to_db(db, 1, orders, organization_id=org.id)
+
+        rows = {d.tracking_number: d for d in db.query(Delivery)}
+        assert rows["JAHEZ-0"].delivery_point == (24.70, 46.20)
+        assert rows["JAHEZ-0"].pickup_point == (24.75, 46.25)
+        assert rows["JAHEZ-1"].delivery_point == (24.6, 46.3)
+        assert rows["JAHEZ-2"].delivery_point is None
+        assert [rows[f"JAHEZ-{n}"].zone_id for n in range(3)] == [zone.id, zone.id, None]
+        # Platform coordinates are not sent to the geocoder
+        assert "somewhere, riyadh" not in geocoder.sent
+
+    def test_address_changes_are_regeocoded(self, db, service):
+        org = add_org(db)
+        zone = add_zone(db, org)
+        delivery = Delivery(
+            tracking_number="TRK-1",
+            pickup_address="Olaya Street, Riyadh",
+            delivery_address="24.1, 40.0",
+            organization_id=org.id,
+        )
+        db.add(delivery)
+        db.commit()
+        service.locate_deliveries(db, [delivery])
+        db.commit()
+        assert delivery.delivery_point == (24.1, 40.0)
+        assert delivery.zone_id is None
+
+        delivery_service.update(db, db_obj=delivery, obj_in={"notes": "Ring twice"})
+        assert delivery.delivery_point == (24.1, 40.0)
+
+        delivery_service.update(
+            db, db_obj=delivery, obj_in={"delivery_address": "King Fahd Road, Riyadh"}
+        )
+        assert delivery.delivery_point == (24.70, 46.20)
+        assert delivery.zone_id == zone.id
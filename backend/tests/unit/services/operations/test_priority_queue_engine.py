@@ -0,0 +1,280 @@
+"""
+Unit Tests for Priority Queue Engine
+
+Tests the priority queue index:
+- Indexed skip list ordering and ranks
+- Positions and counts from the in-process index
+- Zone moves and rebuilds after changes made by other workers
+- Redis sorted-set mirror and rebuild
+- Claiming in priority order
+- Wait estimates from measured throughput
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.performance_config import PriorityQueueConfig
+from app.models.operations.priority_queue import PriorityQueueEntry, QueueStatus
+from app.schemas.operations.priority_queue import PriorityQueueEntryCreate
+from app.services.operations.priority_queue_engine import (
+    ENTRIES_KEY,
+    QUEUE_KEY,
+    SYNCED_KEY,
+    IndexedSkipList,
+    PriorityQueueEngine,
+)
+from app.services.operations.priority_queue_service import PriorityQueueService
+
+ORG = 1
+ZONE = 7
+
+
+@pytest.fixture
+def local_engine():
+    return PriorityQueueEngine(
+        PriorityQueueConfig(
+            use_redis=False, min_throughput_samples=3, local_check_interval_seconds=0
+        )
+    )
+
+
+@pytest.fixture
+def redis_engine():
+    fakeredis = pytest.importorskip("fakeredis")
+    return PriorityQueueEngine(
+        PriorityQueueConfig(min_throughput_samples=3),
+        redis_client=fakeredis.FakeRedis(decode_responses=True),
+    )
+
+
+def enqueue(service, db, delivery_id, score, zone_id=None, org=ORG):
+    entry_in = PriorityQueueEntryCreate(
+        delivery_id=delivery_id,
+        priority="NORMAL",
+        sla_deadline=datetime.utcnow() + timedelta(hours=4),
+        base_priority_score=score,
+        required_zone_id=zone_id,
+    )
+    return service.create_with_number(db, obj_in=entry_in, organization_id=org)
+
+
+class TestIndexedSkipList:
+    """Tests for the order-statistic skip list"""
+
+    def test_matches_sorted_list(self):
+        rng = random.Random(42)
+        index = IndexedSkipList(seed=1)
+        expected = []
+        for _ in range(2000):
+            key = rng.randint(0, 500)
+            if key in expected:
+                index.remove(key)
+                expected.remove(key)
+            else:
+                index.insert(key)
+                expected.append(key)
+            expected.sort()
+
+        assert list(index) == expected
+        assert len(index) == len(expected)
+        for i, key in enumerate(expected):
+            assert index.rank(key) == i
+        assert index.bisect_left(expected[10] + 0.5) == 11
+
+    def test_missing_key(self):
+        index = IndexedSkipList()
+        index.insert(5)
+
+        assert index.rank(4) is None
+        with pytest.raises(KeyError):
+            index.remove(4)
+
+
+@pytest.mark.parametrize("engine_fixture", ["local_engine", "redis_engine"])
+class TestPositions:
+    """Tests for positions and counts computed on read"""
+
+    def test_positions_follow_priority_then_age(self, db, engine_fixture, request):
+        engine = request.getfixturevalue(engine_fixture)
+        service = PriorityQueueService(PriorityQueueEntry, engine=engine)
+        low = enqueue(service, db, 1, 10)
+        high = enqueue(service, db, 2, 90, zone_id=ZONE)
+        tied = enqueue(service, db, 3, 10, zone_id=ZONE)
+
+        positions = service.queue_engine.positions(db, ORG, [low, high, tied])
+
+        assert positions == {high.id: 1, low.id: 2, tied.id: 3}
+        assert service.queue_engine.count(db, ORG) == 3
+        assert service.queue_engine.count(db, ORG, zone_id=ZONE) == 2
+        assert service.queue_engine.position(db, tied, zone_id=ZONE) == 2
+
+    def test_status_changes_and_delete_leave_queue(self, db, engine_fixture, request):
+        engine = request.getfixturevalue(engine_fixture)
+        service = PriorityQueueService(PriorityQueueEntry, engine=engine)
+        first = enqueue(service, db, 1, 90)
+        second = enqueue(service, db, 2, 50)
+        third = enqueue(service, db, 3, 10)
+
+        service.mark_as_processing(db, entry_id=first.id)
+        service.delete(db, id=second.id)
+
+        assert service.queue_engine.count(db, ORG) == 1
+        assert service.queue_engine.position(db, third) == 1
+        assert service.queue_engine.position(db, first) is None
+
+    def test_zone_move_leaves_old_zone(self, db, engine_fixture, request):
+        engine = request.getfixturevalue(engine_fixture)
+        service = PriorityQueueService(PriorityQueueEntry, engine=engine)
+        moved = enqueue(service, db, 1, 90, zone_id=ZONE)
+        stayed = enqueue(service, db, 2, 50, zone_id=ZONE)
+
+        service.update(db, db_obj=moved, obj_in={"required_zone_id": ZONE + 1})
+
+        assert service.queue_engine.count(db, ORG, zone_id=ZONE) == 1
+        assert service.queue_engine.position(db, stayed, zone_id=ZONE) == 1
+        assert service.queue_engine.position(db, moved, zone_id=ZONE) is None
+        assert service.queue_engine.position(db, moved, zone_id=ZONE + 1) == 1
+
+        service.mark_as_processing(db, entry_id=moved.id)
+        assert service.queue_engine.count(db, ORG, zone_id=ZONE + 1) == 0
+        assert service.queue_engine.count(db, ORG) == 1
+
+    def test_annotate_does_not_write_back(self, db, engine_fixture, request):
+        engine = request.getfixturevalue(engine_fixture)
+        service = PriorityQueueService(PriorityQueueEntry, engine=engine)
+        entry = enqueue(service, db, 1, 50)
+
+        service.annotate_positions(db, [entry], ORG)
+
+        assert entry.queue_position == 1
+        assert entry.estimated_wait_time_minutes == 15
+        assert entry not in db.dirty
+        db.expire(entry)
+        assert entry.queue_position is None
+
+
+class TestLocalIndex:
+    """Tests for the in-process index without Redis"""
+
+    def test_rebuilt_after_another_worker_changes_the_queue(self, db, local_engine):
+        other_worker = PriorityQueueEngine(PriorityQueueConfig(use_redis=False))
+        service = PriorityQueueService(PriorityQueueEntry, engine=other_worker)
+        first = enqueue(service, db, 1, 50)
+
+        assert local_engine.count(db, ORG) == 1
+
+        second = enqueue(service, db, 2, 90)
+        service.mark_as_processing(db, entry_id=first.id)
+
+        assert local_engine.count(db, ORG) == 1
+        assert local_engine.position(db, second) == 1
+        assert local_engine.position(db, first) is None
+
+    def test_other_workers_changes_are_applied_as_deltas(self, db, local_engine, monkeypatch):
+        other_worker = PriorityQueueEngine(PriorityQueueConfig(use_redis=False))
+        service = PriorityQueueService(PriorityQueueEntry, engine=other_worker)
+        first = enqueue(service, db, 1, 50)
+        service.update(db, db_obj=first, obj_in={"base_priority_score": 60})
+        assert local_engine.count(db, ORG) == 1
+
+        def no_rebuild(*args, **kwargs):
+            raise AssertionError("index was rebuilt")
+
+        monkeypatch.setattr(local_engine, "_build_local", no_rebuild)
+        second = enqueue(service, db, 2, 90)
+        service.mark_as_processing(db, entry_id=first.id)
+
+        assert local_engine.count(db, ORG) == 1
+        assert local_engine.position(db, second) == 1
+        assert local_engine.position(db, first) is None
+
+    def test_generation_is_checked_at_most_once_per_interval(self, db):
+        engine = PriorityQueueEngine(
+            PriorityQueueConfig(use_redis=False, local_check_interval_seconds=60)
+        )
+        service = PriorityQueueService(PriorityQueueEntry, engine=engine)
+        entry = enqueue(service, db, 1, 50)
+        assert engine.count(db, ORG) == 1
+        db.info["statements"].clear()
+
+        assert engine.position(db, entry) == 1
+        assert engine.count(db, ORG) == 1
+        assert db.info["statements"] == []
+
+
+class TestRedisMirror:
+    """Tests for the Redis sorted-set mirror"""
+
+    def test_rebuilds_when_marker_missing(self, db, redis_engine):
+        service = PriorityQueueService(PriorityQueueEntry, engine=redis_engine)
+        entries = [enqueue(service, db, i, score) for i, score in enumerate([30, 60, 45], start=1)]
+        client = redis_engine.redis
+        client.delete(QUEUE_KEY.format(ORG), SYNCED_KEY.format(ORG))
+
+        positions = redis_engine.positions(db, ORG, entries)
+
+        assert positions == {entries[1].id: 1, entries[2].id: 2, entries[0].id: 3}
+        assert client.zcard(QUEUE_KEY.format(ORG)) == 3
+        assert client.ttl(SYNCED_KEY.format(ORG)) > 0
+
+    def test_rebuild_records_entry_zones(self, db, redis_engine):
+        service = PriorityQueueService(PriorityQueueEntry, engine=redis_engine)
+        entry = enqueue(service, db, 1, 50, zone_id=ZONE)
+        redis_engine.rebuild(db, ORG)
+
+        service.update(db, db_obj=entry, obj_in={"required_zone_id": ZONE + 1})
+
+        assert redis_engine.count(db, ORG, zone_id=ZONE) == 0
+        assert redis_engine.redis.hlen(ENTRIES_KEY.format(ORG)) == 1
+
+    def test_organizations_are_isolated(self, db, redis_engine):
+        service = PriorityQueueService(PriorityQueueEntry, engine=redis_engine)
+        enqueue(service, db, 1, 50)
+        enqueue(service, db, 2, 50, org=2)
+
+        assert redis_engine.count(db, ORG) == 1
+        assert redis_engine.count(db, 2) == 1
+
+
+class TestClaim:
+    """Tests for claim_next"""
+
+    def test_claims_in_priority_order(self, db, local_engine):
+        service = PriorityQueueService(PriorityQueueEntry, engine=local_engine)
+        low = enqueue(service, db, 1, 10)
+        high = enqueue(service, db, 2, 90)
+        zoned = enqueue(service, db, 3, 50, zone_id=ZONE)
+
+        claimed = service.claim_next(db, organization_id=ORG, limit=2)
+
+        assert [e.id for e in claimed] == [high.id, zoned.id]
+        assert all(e.status == QueueStatus.PROCESSING for e in claimed)
+        assert local_engine.count(db, ORG) == 1
+        assert local_engine.position(db, low) == 1
+        assert service.claim_next(db, organization_id=ORG, zone_id=ZONE) == []
+
+
+class TestWaitEstimates:
+    """Tests for throughput-based wait estimates"""
+
+    def test_default_until_enough_samples(self, local_engine):
+        local_engine.record_dequeue(ORG, count=2, now=1000.0)
+
+        assert local_engine.throughput_per_minute(ORG, now=1000.0) is None
+        assert local_engine.estimate_wait_minutes(4, None) == 60
+
+    @pytest.mark.parametrize("engine_fixture", ["local_engine", "redis_engine"])
+    def test_rate_from_recent_dequeues(self, engine_fixture, request):
+        engine = request.getfixturevalue(engine_fixture)
+        now = 100_000.0
+        # 20 dequeues over the last 10 minutes, plus one outside the window
+        engine.record_dequeue(ORG, now=now - 7200)
+        for i in range(20):
+            engine.record_dequeue(ORG, now=now - 600 + i * 30)
+
+        rate = engine.throughput_per_minute(ORG, now=now)
+
+        assert rate == pytest.approx(2.0)
+        assert engine.estimate_wait_minutes(5, rate) == 3
@@ -0,0 +1,146 @@
+"""
+Unit Tests for Priority Scoring Policies
+
+Tests time-decaying priority:
+- Sort keys order entries the same way as current scores, at any time
+- Vectorized and scalar evaluation agree
+- Aged entries overtake newer high-score entries
+- Per-organization policy selection
+- Batch re-keying when the policy changes
+"""
+
+import random
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.core.performance_config import PriorityQueueConfig
+from app.models.operations.priority_queue import PriorityQueueEntry
+from app.models.tenant.organization import Organization
+from app.schemas.operations.priority_queue import PriorityQueueEntryCreate
+from app.services.operations import priority_scoring
+from app.services.operations.priority_queue_engine import PriorityQueueEngine
+from app.services.operations.priority_queue_service import PriorityQueueService
+from app.services.operations.priority_scoring import (
+    ExponentialUrgencyPolicy,
+    LinearAgingPolicy,
+    StaticPolicy,
+    build_policy,
+    policy_for_organization,
+)
+
+NOW = datetime(2026, 10, 18, 12, 0, 0)
+POLICIES = [LinearAgingPolicy(), ExponentialUrgencyPolicy(), StaticPolicy()]
+
+
+def random_entries(n=50, seed=3):
+    rng = random.Random(seed)
+    statics, queued, deadlines = [], [], []
+    for _ in range(n):
+        queued_at = NOW - timedelta(minutes=rng.randint(0, 600))
+        statics.append(rng.randint(1, 200))
+        queued.append(queued_at)
+        deadlines.append(queued_at + timedelta(minutes=rng.randint(30, 720)))
+    return statics, queued, deadlines
+
+
+class TestPolicies:
+    """Tests for the scoring policies"""
+
+    @pytest.mark.parametrize("policy", POLICIES, ids=lambda p: p.name)
+    def test_key_order_matches_score_order_over_time(self, policy):
+        statics, queued, deadlines = random_entries()
+        keys = policy.sort_keys(statics, queued, deadlines)
+        by_key = sorted(range(len(keys)), key=lambda i: -keys[i])
+
+        for hours in (0, 3, 12, 48):
+            scores = policy.scores(statics, queued, deadlines, NOW + timedelta(hours=hours))
+            assert all(
+                scores[a] >= scores[b] - 1e-6 * abs(scores[b]) for a, b in zip(by_key, by_key[1:])
+            )
+
+    @pytest.mark.parametrize("policy", POLICIES, ids=lambda p: p.name)
+    def test_vectorized_matches_scalar(self, policy):
+        statics, queued, deadlines = random_entries(n=10)
+
+        batch = policy.scores(statics, queued, deadlines, NOW)
+        with patch.object(priority_scoring, "NUMPY_AVAILABLE", False):
+            fallback = policy.scores(statics, queued, deadlines, NOW)
+        single = [policy.score_at(*args, NOW) for args in zip(statics, queued, deadlines)]
+
+        assert batch == pytest.approx(single)
+        assert fallback == pytest.approx(single)
+        assert policy.sort_keys(statics, queued, deadlines) == pytest.approx(
+            [policy.sort_key(*args) for args in zip(statics, queued, deadlines)]
+        )
+
+    @pytest.mark.parametrize("policy", [LinearAgingPolicy(), ExponentialUrgencyPolicy()], ids=lambda p: p.name)
+    def test_old_entry_overtakes_new_high_score(self, policy):
+        old = (40, NOW - timedelta(hours=6), NOW + timedelta(minutes=30))
+        new = (90, NOW, NOW + timedelta(hours=8))
+
+        assert policy.sort_key(*old) > policy.sort_key(*new)
+        assert policy.score_at(*old, NOW) > policy.score_at(*new, NOW)
+
+    def test_build_policy_validation(self):
+        assert build_policy("linear", {"age_weight_per_hour": 2}).params()["age_weight_per_hour"] == 2
+        with pytest.raises(ValueError):
+            build_policy("nope")
+        with pytest.raises(ValueError):
+            build_policy("linear", {"bogus": 1})
+        with pytest.raises(ValueError):
+            build_policy("exponential", {"deadline_half_life_minutes": 0})
+
+
+class TestOrganizationPolicy:
+    """Tests for per-organization policy selection and re-keying"""
+
+    def test_policy_from_settings(self, db):
+        org = Organization(
+            name="Acme",
+            slug="acme",
+            settings={"priority_scoring": {"policy": "exponential", "params": {"age_half_life_minutes": 120}}},
+        )
+        broken = Organization(name="Broken", slug="broken", settings={"priority_scoring": {"policy": "nope"}})
+        db.add_all([org, broken])
+        db.commit()
+
+        policy = policy_for_organization(db, org.id)
+
+        assert isinstance(policy, ExponentialUrgencyPolicy)
+        assert policy.params()["age_half_life_minutes"] == 120
+        assert policy_for_organization(db, broken.id).name == "linear"
+
+    def test_rescore_changes_queue_order(self, db):
+        org = Organization(name="Acme", slug="acme", settings={"priority_scoring": {"policy": "static"}})
+        db.add(org)
+        db.commit()
+        service = PriorityQueueService(
+            PriorityQueueEntry, engine=PriorityQueueEngine(PriorityQueueConfig(use_redis=False))
+        )
+
+        def enqueue(delivery_id, score, deadline):
+            return service.create_with_number(
+                db,
+                obj_in=PriorityQueueEntryCreate(
+                    delivery_id=delivery_id,
+                    priority="NORMAL",
+                    sla_deadline=deadline,
+                    base_priority_score=score,
+                ),
+                organization_id=org.id,
+            )
+
+        urgent = enqueue(1, 20, datetime.utcnow() + timedelta(minutes=20))
+        relaxed = enqueue(2, 60, datetime.utcnow() + timedelta(hours=12))
+        assert service.get_queued(db, organization_id=org.id) == [relaxed, urgent]
+
+        org.settings = {"priority_scoring": {"policy": "linear"}}
+        db.commit()
+        assert service.rescore_organization(db, org.id) == 2
+
+        assert service.get_queued(db, organization_id=org.id) == [urgent, relaxed]
+        assert service.queue_engine.position(db, urgent) == 1
+        scores = service.current_scores(db, [urgent, relaxed], org.id)
+        assert scores[urgent.id] > scores[relaxed.id]
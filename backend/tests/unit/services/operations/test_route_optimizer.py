@@ -0,0 +1,164 @@
+"""
+Unit Tests for Route Optimizer
+
+Tests delivery routing with time windows and capacities:
+- Every stop is routed once or reported unassigned
+- Time windows, capacity and route duration are never violated
+- Local search never ends worse than construction or nearest neighbour
+- Open routes, return to depot and multi-vehicle splits
+"""
+
+import math
+import random
+
+import pytest
+
+from app.core.performance_config import RouteOptimizerConfig
+from app.services.operations.route_optimizer import (
+    RouteOptimizer,
+    RouteStop,
+    TravelMatrix,
+    haversine_matrix,
+)
+
+DEPOT = (24.7136, 46.6753)
+
+
+@pytest.fixture
+def optimizer():
+    return RouteOptimizer(RouteOptimizerConfig(average_speed_kmh=30, service_minutes=5, time_budget_ms=500))
+
+
+def random_stops(count, seed=7, **kwargs):
+    rng = random.Random(seed)
+    return [
+        RouteStop(
+            key=n,
+            latitude=DEPOT[0] + rng.uniform(-0.08, 0.08),
+            longitude=DEPOT[1] + rng.uniform(-0.08, 0.08),
+            **kwargs,
+        )
+        for n in range(count)
+    ]
+
+
+def nearest_neighbour_km(stops, start):
+    matrix = haversine_matrix([start] + [(s.latitude, s.longitude) for s in stops], 30)
+    current, remaining, total = 0, set(range(1, len(stops) + 1)), 0.0
+    while remaining:
+        nxt = min(remaining, key=lambda j: matrix.distances_km[current][j])
+        total += matrix.distances_km[current][nxt]
+        current = nxt
+        remaining.remove(nxt)
+    return total
+
+
+def assert_feasible(plan, stops, capacity=None, max_route_minutes=None):
+    keys = [stop.key for route in plan.routes for stop in route.stops]
+    keys += [stop.key for stop in plan.unassigned]
+    assert sorted(keys, key=str) == sorted((stop.key for stop in stops), key=str)
+    for route in plan.routes:
+        for stop, arrival in zip(route.stops, route.arrivals):
+            assert stop.earliest - 1e-6 <= arrival <= stop.latest + 1e-6
+        assert route.arrivals == sorted(route.arrivals)
+        if capacity is not None:
+            assert route.load <= capacity
+        if max_route_minutes is not None:
+            assert route.duration_minutes <= max_route_minutes + 1e-6
+
+
+class TestSingleRoute:
+    """Tests for one vehicle without time windows"""
+
+    def test_beats_nearest_neighbour(self, optimizer):
+        stops = random_stops(60)
+        plan = optimizer.solve(stops, DEPOT, objective="distance")
+
+        assert_feasible(plan, stops)
+        assert len(plan.routes) == 1 and not plan.unassigned
+        assert plan.cost <= plan.initial_cost + 1e-9
+        assert plan.distance_km <= nearest_neighbour_km(stops, DEPOT) + 1e-6
+        assert math.isclose(plan.routes[0].distance_km, sum(plan.routes[0].legs_km))
+
+    def test_collinear_stops_are_visited_in_order(self, optimizer):
+        stops = [RouteStop(key=n, latitude=24.70 + 0.01 * n, longitude=46.70) for n in (3, 1, 4, 0, 2)]
+        plan = optimizer.solve(stops, (24.69, 46.70), objective="distance")
+        assert [stop.key for stop in plan.routes[0].stops] == [0, 1, 2, 3, 4]
+
+    def test_return_to_depot_adds_the_way_back(self, optimizer):
+        stops = random_stops(10)
+        open_plan = optimizer.solve(stops, DEPOT, objective="distance")
+        closed_plan = optimizer.solve(stops, DEPOT, objective="distance", return_to_depot=True)
+
+        route = closed_plan.routes[0]
+        last = route.stops[-1]
+        back = haversine_matrix([(last.latitude, last.longitude), DEPOT], 30).distances_km[0][1]
+        assert math.isclose(route.distance_km, sum(route.legs_km) + back)
+        assert closed_plan.distance_km >= open_plan.distance_km
+
+    def test_open_start_has_no_first_leg(self, optimizer):
+        plan = optimizer.solve(random_stops(5), objective="distance")
+        assert plan.routes[0].legs_km[0] == 0
+        assert plan.routes[0].arrivals[0] == 0
+
+    def test_invalid_arguments(self, optimizer):
+        stops = random_stops(3)
+        with pytest.raises(ValueError):
+            optimizer.solve(stops, DEPOT, objective="priority")
+        with pytest.raises(ValueError):
+            optimizer.solve(stops, DEPOT, matrix=TravelMatrix([[0.0]], [[0.0]]))
+        assert optimizer.solve([], DEPOT).routes == []
+
+
+class TestConstraints:
+    """Tests for time windows, capacity and route duration"""
+
+    def test_time_windows_are_respected(self, optimizer):
+        rng = random.Random(3)
+        stops = []
+        for stop in random_stops(40, seed=3):
+            stop.earliest = rng.uniform(0, 240)
+            stop.latest = stop.earliest + 60
+            stops.append(stop)
+
+        plan = optimizer.solve(stops, DEPOT, vehicles=None)
+
+        assert_feasible(plan, stops)
+        assert not plan.unassigned
+
+    def test_waits_for_window_to_open(self, optimizer):
+        stop = RouteStop(key="late", latitude=DEPOT[0] + 0.01, longitude=DEPOT[1], earliest=120, latest=150)
+        plan = optimizer.solve([stop], DEPOT)
+        assert plan.routes[0].arrivals == [120]
+        assert plan.routes[0].duration_minutes == 125
+
+    def test_unreachable_stop_is_unassigned(self, optimizer):
+        stops = random_stops(5)
+        far = RouteStop(key="far", latitude=26.0, longitude=50.0, latest=30)
+        plan = optimizer.solve(stops + [far], DEPOT)
+
+        assert [stop.key for stop in plan.unassigned] == ["far"]
+        assert_feasible(plan, stops + [far])
+
+    def test_capacity_opens_new_routes(self, optimizer):
+        stops = random_stops(30, demand=4)
+        plan = optimizer.solve(stops, DEPOT, vehicles=None, capacity=20)
+
+        assert_feasible(plan, stops, capacity=20)
+        assert len(plan.routes) == 6
+        assert not plan.unassigned
+
+    def test_vehicle_limit_leaves_stops_unassigned(self, optimizer):
+        stops = random_stops(30, demand=4)
+        plan = optimizer.solve(stops, DEPOT, vehicles=2, capacity=20)
+
+        assert len(plan.routes) == 2
+        assert len(plan.unassigned) == 20
+        assert_feasible(plan, stops, capacity=20)
+
+    def test_max_route_minutes(self, optimizer):
+        stops = random_stops(30)
+        plan = optimizer.solve(stops, DEPOT, vehicles=None, max_route_minutes=60, return_to_depot=True)
+
+        assert_feasible(plan, stops, max_route_minutes=60)
+        assert len(plan.routes) > 1
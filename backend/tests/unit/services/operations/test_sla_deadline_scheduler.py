@@ -0,0 +1,223 @@
+"""
+Unit Tests for SLA Deadline Scheduler
+
+Tests event-driven breach detection:
+- Deadlines indexed on commit and unscheduled when resolved
+- Poller marks only due rows, in bulk, per kind
+- Claimed deadlines are processed once
+- One digest email per recipient
+- Moved deadlines are rescheduled
+- Resync and database fallback
+"""
+
+import importlib
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.core.performance_config import SLAMonitorConfig
+from app.models.fleet.courier import Courier
+from app.models.operations.priority_queue import PriorityQueueEntry
+from app.models.operations.sla import SLAStatus, SLATracking
+from app.models.support.ticket import Ticket, TicketCategory, TicketStatus
+from app.models.user import User
+from app.services.operations.sla_deadline_scheduler import (
+    DEADLINES_KEY,
+    SYNCED_KEY,
+    SLADeadlineScheduler,
+)
+
+fakeredis = pytest.importorskip("fakeredis")
+
+# The package re-exports the singleton under the module's name
+scheduler_module = importlib.import_module("app.services.operations.sla_deadline_scheduler")
+
+NOW = datetime(2026, 10, 18, 12, 0, 0)
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def scheduler(redis_client):
+    scheduler = SLADeadlineScheduler(SLAMonitorConfig(batch_size=2), redis_client=redis_client)
+    with patch.object(scheduler_module, "sla_deadline_scheduler", scheduler):
+        yield scheduler
+
+
+@pytest.fixture
+def sent():
+    with patch("app.workers.tasks.send_email_task.delay") as delay:
+        yield delay
+
+
+def make_ticket(db, number, due_at, assignee=None, status=TicketStatus.OPEN):
+    ticket = Ticket(
+        organization_id=1,
+        ticket_id=f"TKT-{number}",
+        created_by=1,
+        category=TicketCategory.DELIVERY,
+        subject=f"Issue {number}",
+        description="Late parcel",
+        status=status,
+        sla_due_at=due_at,
+        assigned_to=assignee.id if assignee else None,
+    )
+    db.add(ticket)
+    db.commit()
+    return ticket
+
+
+def make_tracking(db, number, target, courier=None):
+    tracking = SLATracking(
+        organization_id=1,
+        sla_definition_id=1,
+        tracking_number=f"SLA-{number}",
+        start_time=target - timedelta(hours=2),
+        target_completion_time=target,
+        target_value=120,
+        courier_id=courier.id if courier else None,
+    )
+    db.add(tracking)
+    db.commit()
+    return tracking
+
+
+class TestIndexing:
+    """Tests for the commit-fed deadline index"""
+
+    def test_commit_schedules_and_resolution_unschedules(self, db, scheduler, redis_client):
+        ticket = make_ticket(db, 1, NOW + timedelta(hours=1))
+        member = f"ticket:{ticket.id}"
+
+        assert redis_client.zscore(DEADLINES_KEY, member) == pytest.approx(
+            (NOW + timedelta(hours=1) - datetime(1970, 1, 1)).total_seconds()
+        )
+
+        ticket.status = TicketStatus.RESOLVED
+        db.commit()
+
+        assert redis_client.zscore(DEADLINES_KEY, member) is None
+
+    def test_rollback_discards_changes(self, db, scheduler, redis_client):
+        ticket = Ticket(
+            organization_id=1,
+            ticket_id="TKT-X",
+            created_by=1,
+            category=TicketCategory.BILLING,
+            subject="x",
+            description="x",
+            sla_due_at=NOW,
+        )
+        db.add(ticket)
+        db.flush()
+        db.rollback()
+
+        assert redis_client.zcard(DEADLINES_KEY) == 0
+
+
+class TestPolling:
+    """Tests for breach detection"""
+
+    def test_marks_only_due_rows(self, db, scheduler, redis_client, sent):
+        redis_client.set(SYNCED_KEY, "1")
+        overdue = make_ticket(db, 1, NOW - timedelta(seconds=5))
+        upcoming = make_ticket(db, 2, NOW + timedelta(minutes=5))
+        late_sla = make_tracking(db, 1, NOW - timedelta(seconds=30))
+
+        result = scheduler.poll(db, now=NOW)
+
+        db.expire_all()
+        assert overdue.sla_breached is True
+        assert upcoming.sla_breached is False
+        assert late_sla.is_breached is True
+        assert late_sla.status == SLAStatus.BREACHED
+        assert result["breached"] == {"ticket": 1, "delivery_sla": 1}
+        assert result["max_latency_seconds"] == pytest.approx(30)
+        assert redis_client.zrange(DEADLINES_KEY, 0, -1) == [f"ticket:{upcoming.id}"]
+
+    def test_processes_each_deadline_once(self, db, scheduler, redis_client, sent):
+        redis_client.set(SYNCED_KEY, "1")
+        make_ticket(db, 1, NOW - timedelta(minutes=1))
+
+        assert scheduler.poll(db, now=NOW)["breached"] == {"ticket": 1}
+        assert scheduler.poll(db, now=NOW + timedelta(seconds=10))["breached"] == {}
+
+    def test_one_digest_per_recipient(self, db, scheduler, redis_client, sent):
+        redis_client.set(SYNCED_KEY, "1")
+        agent = User(email="agent@barq.test")
+        courier = Courier(
+            organization_id=1, barq_id="BRQ-1", full_name="Ali", mobile_number="0500", email="ali@barq.test"
+        )
+        db.add_all([agent, courier])
+        db.commit()
+        for i in range(3):
+            make_ticket(db, i, NOW - timedelta(minutes=i + 1), assignee=agent)
+        make_tracking(db, 1, NOW - timedelta(minutes=1), courier=courier)
+
+        result = scheduler.poll(db, now=NOW)
+
+        assert result["notifications_sent"] == 2
+        recipients = sorted(call.kwargs["recipient"] for call in sent.call_args_list)
+        assert recipients == ["agent@barq.test", "ali@barq.test"]
+        agent_mail = next(c for c in sent.call_args_list if c.kwargs["recipient"] == "agent@barq.test")
+        assert agent_mail.kwargs["body"].count("Ticket TKT-") == 3
+
+    def test_moved_deadline_is_rescheduled(self, db, scheduler, redis_client, sent):
+        redis_client.set(SYNCED_KEY, "1")
+        ticket = make_ticket(db, 1, NOW + timedelta(hours=2))
+        # Index holds a stale earlier deadline
+        redis_client.zadd(DEADLINES_KEY, {f"ticket:{ticket.id}": 0})
+
+        assert scheduler.poll(db, now=NOW)["breached"] == {}
+        assert redis_client.zscore(DEADLINES_KEY, f"ticket:{ticket.id}") > 0
+
+    def test_queue_entries_are_escalated(self, db, scheduler, redis_client, sent):
+        redis_client.set(SYNCED_KEY, "1")
+        entry = PriorityQueueEntry(
+            organization_id=1,
+            queue_number="Q-1",
+            delivery_id=1,
+            priority="NORMAL",
+            base_priority_score=50,
+            total_priority_score=50,
+            queued_at=NOW - timedelta(hours=1),
+            sla_deadline=NOW - timedelta(minutes=1),
+        )
+        db.add(entry)
+        db.commit()
+
+        scheduler.poll(db, now=NOW)
+
+        db.expire_all()
+        assert entry.is_escalated is True
+        assert entry.escalated_at == NOW
+
+
+class TestResyncAndFallback:
+    """Tests for rebuilding the index and polling without Redis"""
+
+    def test_poll_resyncs_missing_index(self, db, scheduler, redis_client, sent):
+        ticket = make_ticket(db, 1, NOW - timedelta(minutes=1))
+        make_ticket(db, 2, NOW + timedelta(hours=1))
+        redis_client.delete(DEADLINES_KEY)
+
+        result = scheduler.poll(db, now=NOW)
+
+        assert result["breached"] == {"ticket": 1}
+        db.expire_all()
+        assert ticket.sla_breached is True
+        assert redis_client.zcard(DEADLINES_KEY) == 1
+        assert redis_client.ttl(SYNCED_KEY) > 0
+
+    def test_database_fallback(self, db, sent):
+        fallback = SLADeadlineScheduler(SLAMonitorConfig(use_redis=False, batch_size=2))
+        for i in range(5):
+            make_ticket(db, i, NOW - timedelta(minutes=i + 1))
+        make_ticket(db, 9, NOW + timedelta(hours=1))
+
+        assert fallback.poll(db, now=NOW)["breached"] == {"ticket": 5}
+        assert db.query(Ticket).filter(Ticket.sla_breached.is_(True)).count() == 5
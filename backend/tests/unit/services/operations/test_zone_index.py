@@ -0,0 +1,290 @@
+"""
+Unit Tests for the Zone Polygon Index
+
+Tests point-in-zone lookup:
+- GeoJSON boundary parsing (Feature, FeatureCollection, MultiPolygon, holes)
+- Grid lookups agree with a plain ray cast over every zone
+- Incremental upsert/remove and rebuilds for oversized zones
+- Per-organization caching kept in sync with zone writes
+- Zone tagging of synced deliveries and courier GPS positions
+"""
+
+import math
+import random
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core.performance_config import ZoneIndexConfig
+from app.models.fleet.courier import Courier
+from app.models.operations.delivery import Delivery
+from app.models.operations.zone import ZoneStatus
+from app.models.tenant.organization import Organization
+from app.schemas.operations.zone import ZoneCreate
+from app.services.fms.location_ingest import LocationIngestService
+from app.services.fms.sync import FMSSyncService
+from app.services.operations import zone_service
+from app.services.operations.zone_index import (
+    ZoneGeometryIndex,
+    ZoneIndexService,
+    boundary_polygons,
+    compile_zone,
+)
+from app.services.platforms.base import PlatformOrder, PlatformType
+from app.services.platforms.order_sync import OrderSyncService
+
+
+def square(lng, lat, size):
+    """GeoJSON ring of a square with its south-west corner at (lng, lat)"""
+    return [
+        [lng, lat],
+        [lng + size, lat],
+        [lng + size, lat + size],
+        [lng, lat + size],
+        [lng, lat],
+    ]
+
+
+def polygon(*rings):
+    return {"type": "Polygon", "coordinates": list(rings)}
+
+
+def ray_cast(boundaries, lat, lng):
+    inside = False
+    for rings in boundary_polygons(boundaries):
+        for ring in rings:
+            for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+                if (y1 > lat) != (y2 > lat) and lng < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+                    inside = not inside
+    return inside
+
+
+@pytest.fixture
+def index_service():
+    service = ZoneIndexService(ZoneIndexConfig(revalidate_seconds=3600))
+    with patch("app.services.operations.zone_service.zone_index_service", service), patch(
+        "app.services.operations.geocoding_service.zone_index_service", service
+    ), patch("app.services.fms.sync.zone_index_service", service):
+        yield service
+
+
+def add_org(db, name="Acme"):
+    org = Organization(name=name, slug=name.lower())
+    db.add(org)
+    db.commit()
+    return org
+
+
+def create_zone(db, org, code, boundaries, **extra):
+    zone_in = ZoneCreate(zone_code=f"Z-{code}", zone_name=f"Zone {code}", city="Riyadh",
+                         boundaries=boundaries, **extra)
+    return zone_service.create(db, obj_in=zone_in, organization_id=org.id)
+
+
+class TestBoundaryPolygons:
+    """Tests for GeoJSON parsing"""
+
+    def test_geojson_types(self):
+        ring = square(46.0, 24.0, 1.0)
+
+        assert len(boundary_polygons(polygon(ring))) == 1
+        assert len(boundary_polygons({"type": "Feature", "geometry": polygon(ring)})) == 1
+        assert len(boundary_polygons({
+            "type": "FeatureCollection",
+            "features": [{"type": "Feature", "geometry": polygon(ring)}] * 2,
+        })) == 2
+        multi = {"type": "MultiPolygon", "coordinates": [[ring], [ring]]}
+        assert len(boundary_polygons(multi)) == 2
+        assert boundary_polygons({"type": "Point", "coordinates": [46.0, 24.0]}) == []
+        assert boundary_polygons(None) == []
+
+    def test_malformed_boundaries_are_skipped(self):
+        assert compile_zone(1, {"type": "Polygon", "coordinates": [[["x", 1]] * 4]}) is None
+        assert compile_zone(2, {}) is None
+
+
+class TestZoneGeometryIndex:
+    """Tests for grid lookups"""
+
+    def test_holes_overlaps_and_outside(self):
+        outer = compile_zone(1, polygon(square(46.0, 24.0, 1.0), square(46.4, 24.4, 0.2)))
+        small = compile_zone(2, polygon(square(46.8, 24.8, 0.4)))
+        index = ZoneGeometryIndex([outer, small])
+
+        assert index.locate(24.1, 46.1) == 1
+        assert index.locate(24.5, 46.5) is None  # inside the hole
+        assert index.locate(24.9, 46.9) == 2  # overlap resolves to the smaller zone
+        assert index.locate(25.1, 47.1) == 2
+        assert index.locate(23.9, 46.1) is None
+        assert index.locate_many([(24.1, 46.1), (24.5, 46.5), (0.0, 0.0)]) == [1, None, None]
+
+    def test_matches_ray_cast_over_every_zone(self):
+        rng = random.Random(41)
+        zones = {}
+        for zone_id in range(1, 61):
+            center_lng, center_lat = 46.5 + rng.random() * 0.5, 24.5 + rng.random() * 0.5
+            sides = rng.randint(3, 30)
+            ring = []
+            for k in range(sides):
+                radius = 0.01 + rng.random() * 0.04
+                angle = 2 * math.pi * k / sides
+                ring.append([center_lng + radius * math.cos(angle),
+                             center_lat + radius * math.sin(angle)])
+            zones[zone_id] = polygon(ring + [ring[0]])
+        compiled = {zone_id: compile_zone(zone_id, b) for zone_id, b in zones.items()}
+        index = ZoneGeometryIndex(compiled.values())
+
+        points = [(24.45 + rng.random() * 0.6, 46.45 + rng.random() * 0.6) for _ in range(3000)]
+        result = index.locate_many(points)
+
+        for (lat, lng), zone_id in zip(points, result):
+            containing = [z for z in zones if ray_cast(zones[z], lat, lng)]
+            expected = min(
+                containing, key=lambda z: (compiled[z].area, z), default=None
+            )
+            assert zone_id == expected
+        assert sum(zone_id is not None for zone_id in result) > 500
+
+    def test_upsert_and_remove(self):
+        index = ZoneGeometryIndex([compile_zone(1, polygon(square(46.0, 24.0, 0.1)))])
+        cell_size = index.cell_size
+
+        index.upsert(compile_zone(2, polygon(square(46.2, 24.0, 0.1))))
+        index.upsert(compile_zone(1, polygon(square(46.0, 24.2, 0.1))))
+
+        assert index.cell_size == cell_size
+        assert index.locate(24.05, 46.25) == 2
+        assert index.locate(24.05, 46.05) is None
+        assert index.locate(24.25, 46.05) == 1
+
+        index.remove(2)
+        assert index.locate(24.05, 46.25) is None
+        assert len(index) == 1
+
+    def test_oversized_zone_rebuilds_grid(self):
+        config = ZoneIndexConfig(cells_per_zone=8, max_grid_dim=32)
+        index = ZoneGeometryIndex([compile_zone(1, polygon(square(46.0, 24.0, 0.1)))], config)
+
+        index.upsert(compile_zone(2, polygon(square(40.0, 20.0, 10.0))))
+
+        assert index.cell_size >= 10.0 / 32
+        assert index.locate(24.05, 46.05) == 1
+        assert index.locate(21.0, 41.0) == 2
+
+    def test_rebuild_leaves_published_grid_intact(self):
+        config = ZoneIndexConfig(cells_per_zone=8, max_grid_dim=32)
+        index = ZoneGeometryIndex([compile_zone(1, polygon(square(46.0, 24.0, 0.1)))], config)
+        old_grid, old_zone = index._grid, index.get(1)
+        old_bands = old_zone.bands
+
+        index.upsert(compile_zone(2, polygon(square(40.0, 20.0, 10.0))))
+
+        # Lookups still holding the old grid keep the bands built for it
+        assert old_zone.bands is old_bands
+        assert index.get(1) is not old_zone
+        assert index._grid is not old_grid
+        assert index.locate(24.05, 46.05) == 1
+
+
+class TestZoneIndexService:
+    """Tests for per-organization caching"""
+
+    def test_zone_writes_refresh_the_index(self, db, index_service):
+        acme, other = add_org(db), add_org(db, "Other")
+        north = create_zone(db, acme, "N", polygon(square(46.0, 24.5, 0.5)))
+        create_zone(db, other, "O", polygon(square(46.0, 24.0, 1.0)))
+
+        assert index_service.locate(db, acme.id, 24.7, 46.2) == north.id
+        assert index_service.locate(db, acme.id, 24.2, 46.2) is None
+
+        south = create_zone(db, acme, "S", polygon(square(46.0, 24.0, 0.5)))
+        assert index_service.locate(db, acme.id, 24.2, 46.2) == south.id
+
+        north = zone_service.get(db, id=north.id)
+        moved = {"boundaries": polygon(square(47.0, 24.5, 0.5))}
+        zone_service.update(db, db_obj=north, obj_in=moved)
+        assert index_service.locate_many(db, acme.id, [(24.7, 46.2), (24.7, 47.2)]) == [
+            None, north.id
+        ]
+
+        south = zone_service.get(db, id=south.id)
+        zone_service.update(db, db_obj=south, obj_in={"status": ZoneStatus.INACTIVE})
+        zone_service.delete(db, id=north.id)
+        assert index_service.locate_many(db, acme.id, [(24.2, 46.2), (24.7, 47.2)]) == [None, None]
+        assert index_service.locate(db, other.id, 24.2, 46.2) is not None
+
+    def test_other_workers_revalidate(self, db, index_service):
+        org = add_org(db)
+        zone = create_zone(db, org, "A", polygon(square(46.0, 24.0, 0.5)))
+        worker = ZoneIndexService(ZoneIndexConfig(revalidate_seconds=0))
+        assert worker.locate(db, org.id, 24.2, 46.2) == zone.id
+        compiled = worker.get_index(db, org.id).get(zone.id)
+
+        zone_service.update(db, db_obj=zone, obj_in={"zone_name": "Renamed"})
+        assert worker.get_index(db, org.id).get(zone.id) is compiled  # geometry unchanged
+
+        zone.boundaries = polygon(square(47.0, 24.0, 0.5))
+        zone.updated_at = datetime(2030, 1, 1)
+        db.commit()
+        assert worker.locate(db, org.id, 24.2, 46.2) is None
+        assert worker.locate(db, org.id, 24.2, 47.2) == zone.id
+
+
+class TestIngestTagging:
+    """Tests for zone tags on deliveries and courier positions"""
+
+    def test_synced_deliveries_are_tagged(self, db, index_service):
+        org = add_org(db)
+        zone = create_zone(db, org, "A", polygon(square(46.0, 24.0, 0.5)))
+        orders = [
+            PlatformOrder(
+                platform=PlatformType.JAHEZ,
+                platform_order_id=str(n),
+                pickup_address="Store",
+                delivery_address="Home",
+                delivery_lat=lat,
+                delivery_lng=46.2 if lat else None,
+                created_at=datetime(2026, 10, 18),
+            )
+            for n, lat in enumerate([24.2, 24.9, None])
+        ]
+
+        stats = OrderSyncService().sync_orders_to_db(db, 1, orders, organization_id=org.id)
+
+        assert stats["created"] == 3
+        tags = dict(db.query(Delivery.tracking_number, Delivery.zone_id))
+        assert tags == {"JAHEZ-0": zone.id, "JAHEZ-1": None, "JAHEZ-2": None}
+
+    def test_courier_positions_are_tagged(self, db, index_service):
+        org = add_org(db)
+        zone = create_zone(db, org, "A", polygon(square(46.0, 24.0, 0.5)))
+        couriers = [
+            Courier(barq_id=f"B{n}", full_name=f"Courier {n}", mobile_number="0500000000",
+                    fms_asset_id=n, organization_id=org.id)
+            for n in (1, 2)
+        ]
+        db.add_all(couriers)
+        db.commit()
+        positions = {1: (24.2, 46.2), 2: (26.0, 50.0)}
+        client = MagicMock()
+        client.get_all_assets.return_value = {
+            "result": [
+                {"Id": asset_id, "Trackingunit": {"DeviceLog": {
+                    "Latitude": lat, "Longitude": lng,
+                }}}
+                for asset_id, (lat, lng) in positions.items()
+            ],
+            "totalCount": 2,
+        }
+        ingest = LocationIngestService()
+        ingest.redis = None
+
+        with patch("app.services.fms.sync.get_fms_client", return_value=client), \
+                patch("app.services.fms.sync.location_ingest_service", ingest):
+            locations = FMSSyncService(db).get_all_couriers_live_locations()
+
+        assert [location["zone_id"] for location in locations] == [zone.id, None]
+        db.expire_all()
+        tags = [c.current_zone_id for c in db.query(Courier).order_by(Courier.id)]
+        assert tags == [zone.id, None]
@@ -0,0 +1,216 @@
+"""
+Unit Tests for API Key Service
+
+Tests cached verification and coalesced usage tracking:
+- Hashed-key lookups served from the cache, including unknown keys
+- Rejection of revoked, expired, non-whitelisted and out-of-scope keys
+- One UPDATE per key per flush, carrying all counts since the last flush
+- Per-key rate limits from the usage counters
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import app.models  # noqa: F401  (register all mappers)
+from app.core.database import Base
+from app.core.exceptions import (
+    ForbiddenException,
+    RateLimitExceededException,
+    UnauthorizedException,
+)
+from app.core.performance_config import ApiKeyUsageConfig
+from app.models.admin.api_key import ApiKey, ApiKeyStatus
+from app.models.tenant.organization import Organization
+from app.models.user import User
+from app.services.api_key_service import ApiKeyService, hash_api_key
+
+TABLES = ["organizations", "users", "api_keys"]
+
+RAW_KEY = "barq_integration-test-key"
+
+
+class Clock:
+    def __init__(self, now=1_800_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[name] for name in TABLES])
+    return engine
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def api_key(session_factory):
+    with session_factory() as db:
+        org = Organization(name="Acme", slug="acme")
+        user = User(email="ops@acme.sa", hashed_password="x", full_name="Ops")
+        db.add_all([org, user])
+        db.flush()
+        key = ApiKey(
+            organization_id=org.id,
+            user_id=user.id,
+            name="Jahez webhook",
+            key_prefix=RAW_KEY[:8],
+            key_hash=hash_api_key(RAW_KEY),
+            scopes=["webhooks:write"],
+            ip_whitelist=[],
+            rate_limit_per_minute=3,
+        )
+        db.add(key)
+        db.commit()
+        return key.id
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def service(session_factory, clock):
+    service = ApiKeyService(
+        session_factory=session_factory,
+        config=ApiKeyUsageConfig(flush_interval_seconds=3600),
+        clock=clock,
+    )
+    service.redis = None
+    yield service
+    service.stop(timeout=1)
+
+
+def update_key(session_factory, key_id, **values):
+    with session_factory() as db:
+        db.query(ApiKey).filter(ApiKey.id == key_id).update(values)
+        db.commit()
+
+
+def load_key(session_factory, key_id):
+    with session_factory() as db:
+        return db.get(ApiKey, key_id)
+
+
+class TestVerification:
+    """Tests for cached key verification"""
+
+    def test_lookups_are_cached(self, service, api_key, engine):
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        for _ in range(3):
+            identity = service.authenticate(RAW_KEY, "10.0.0.1", scope="webhooks:write")
+        with pytest.raises(UnauthorizedException):
+            service.authenticate("barq_unknown")
+        with pytest.raises(UnauthorizedException):
+            service.authenticate("barq_unknown")
+
+        assert identity.id == api_key
+        assert len(statements) == 2
+        stats = service.get_stats()
+        assert (stats["cache_hits"], stats["cache_misses"]) == (3, 2)
+
+    def test_revocation_applies_after_invalidate_or_ttl(
+        self, service, api_key, session_factory, clock
+    ):
+        service.authenticate(RAW_KEY)
+        update_key(session_factory, api_key, status=ApiKeyStatus.REVOKED.value)
+
+        service.authenticate(RAW_KEY)  # still cached
+        clock.now += service.config.cache_ttl_seconds + 1
+        with pytest.raises(UnauthorizedException):
+            service.authenticate(RAW_KEY)
+
+        update_key(session_factory, api_key, status=ApiKeyStatus.ACTIVE.value)
+        service.invalidate(hash_api_key(RAW_KEY))
+        assert service.authenticate(RAW_KEY).id == api_key
+
+    def test_rejections(self, service, api_key, session_factory):
+        with pytest.raises(UnauthorizedException):
+            service.authenticate(None)
+        with pytest.raises(ForbiddenException):
+            service.authenticate(RAW_KEY, scope="payroll:read")
+
+        update_key(session_factory, api_key, ip_whitelist=["10.0.0.1"])
+        service.invalidate()
+        service.authenticate(RAW_KEY, "10.0.0.1")
+        with pytest.raises(ForbiddenException):
+            service.authenticate(RAW_KEY, "10.0.0.2")
+
+        update_key(session_factory, api_key, expires_at=datetime.utcnow() - timedelta(days=1))
+        service.invalidate()
+        with pytest.raises(UnauthorizedException):
+            service.authenticate(RAW_KEY, "10.0.0.1")
+
+
+class TestUsageFlush:
+    """Tests for coalesced usage writes"""
+
+    def test_one_update_per_key_per_flush(self, service, api_key, session_factory, engine, clock):
+        service.authenticate(RAW_KEY, "10.0.0.1")
+        clock.now += 1
+        service.authenticate(RAW_KEY, "10.0.0.2")
+        updates = []
+        event.listen(
+            engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args: updates.append(statement)
+            if statement.startswith("UPDATE")
+            else None,
+        )
+
+        assert service.flush() == 1
+        assert service.flush() == 0
+
+        assert len(updates) == 1
+        key = load_key(session_factory, api_key)
+        assert key.total_requests == 2
+        assert key.last_used_at == datetime.utcfromtimestamp(clock.now)
+        assert key.last_request_ip == "10.0.0.2"
+        assert key.updated_at is None
+
+    def test_failed_flush_is_retried(self, service, api_key, session_factory, monkeypatch):
+        service.authenticate(RAW_KEY)
+        # A database without the api_keys table makes the UPDATE fail
+        empty_db = sessionmaker(bind=create_engine("sqlite://"))
+        monkeypatch.setattr(service, "_session_factory", empty_db)
+        service.flush()
+        service.authenticate(RAW_KEY)
+
+        monkeypatch.setattr(service, "_session_factory", session_factory)
+        assert service.flush() == 1
+
+        assert load_key(session_factory, api_key).total_requests == 2
+        assert service.get_stats()["failed_flushes"] == 1
+
+
+class TestRateLimits:
+    """Tests for per-key limits fed by the usage counters"""
+
+    def test_minute_limit(self, service, api_key, clock):
+        clock.now = 1_800_000_000.0 - 1_800_000_000.0 % 60
+        for _ in range(3):
+            service.authenticate(RAW_KEY)
+        service.flush()
+
+        with pytest.raises(RateLimitExceededException) as exc_info:
+            service.authenticate(RAW_KEY)
+        assert exc_info.value.headers["Retry-After"] == "60"
+
+        clock.now += 60
+        service.authenticate(RAW_KEY)
+        assert service.get_stats()["rate_limited"] == 1
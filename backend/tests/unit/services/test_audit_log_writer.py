@@ -0,0 +1,206 @@
+"""
+Unit Tests for Audit Log Writer
+
+Tests the write-behind audit pipeline:
+- Batched inserts
+- Spill to disk when the database fails or the queue is full
+- Quarantine of records that cannot be serialized
+- Replay of spilled records, resumable and limited to files no live process appends to
+"""
+
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.performance_config import AuditLogConfig
+from app.models.audit_log import AuditAction, AuditLog
+from app.services.audit_log_writer import AuditLogWriter, _to_spill
+
+
+def make_record(i: int) -> dict:
+    return {
+        "user_id": None,
+        "username": f"user{i}",
+        "action": AuditAction.UPDATE,
+        "resource_type": "courier",
+        "resource_id": i,
+        "extra_metadata": {"i": i},
+    }
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    AuditLog.__table__.create(engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def config(tmp_path):
+    return AuditLogConfig(
+        async_writes=True,
+        queue_size=5,
+        batch_size=3,
+        flush_interval_ms=20,
+        spill_dir=str(tmp_path / "spill"),
+    )
+
+
+def write_spill_file(config, pid: int, records) -> str:
+    os.makedirs(config.spill_dir, exist_ok=True)
+    path = os.path.join(config.spill_dir, f"audit-{pid}.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(_to_spill(record)) + "\n" for record in records)
+    return path
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def count_rows(session_factory) -> int:
+    with session_factory() as session:
+        return session.execute(select(func.count(AuditLog.id))).scalar()
+
+
+class TestAuditLogWriter:
+    """Tests for AuditLogWriter"""
+
+    def test_flush_writes_in_batches(self, session_factory, config):
+        writer = AuditLogWriter(session_factory=session_factory, config=config)
+        writer._ensure_started = lambda: None  # Drive the flusher manually
+
+        for i in range(5):
+            writer.submit(make_record(i))
+
+        assert writer.flush() == 5
+        assert count_rows(session_factory) == 5
+        assert writer.get_stats()["batches"] == 2
+
+    def test_created_at_is_stamped_on_submit(self, session_factory, config):
+        writer = AuditLogWriter(session_factory=session_factory, config=config)
+        writer._ensure_started = lambda: None
+        before = datetime.utcnow()
+
+        writer.submit(make_record(1))
+        writer.flush()
+
+        with session_factory() as session:
+            created_at = session.execute(select(AuditLog.created_at)).scalar()
+        assert created_at >= before.replace(microsecond=0)
+
+    def test_queue_full_spills_to_disk(self, session_factory, config):
+        writer = AuditLogWriter(session_factory=session_factory, config=config)
+        writer._ensure_started = lambda: None
+
+        for i in range(7):
+            writer.submit(make_record(i))
+
+        assert writer.get_stats()["spilled"] == 2
+        assert os.listdir(config.spill_dir)
+
+        # Draining the queue replays the spill file too
+        writer.flush()
+        assert count_rows(session_factory) == 7
+        assert writer.get_stats()["replayed"] == 2
+        assert os.listdir(config.spill_dir) == []
+
+    def test_failed_batch_is_spilled_and_replayed(self, session_factory, config):
+        calls = {"n": 0}
+
+        def flaky_factory():
+            calls["n"] += 1
+            if calls["n"] == 1:
+                raise RuntimeError("database unavailable")
+            return session_factory()
+
+        writer = AuditLogWriter(session_factory=flaky_factory, config=config)
+        writer._ensure_started = lambda: None
+
+        for i in range(3):
+            writer.submit(make_record(i))
+        assert writer.flush() == 0
+        assert writer.get_stats()["failed_batches"] == 1
+
+        writer.submit(make_record(3))
+        writer.flush()
+
+        assert count_rows(session_factory) == 4
+
+    def test_unserializable_record_is_quarantined_alone(self, session_factory, config):
+        writer = AuditLogWriter(session_factory=session_factory, config=config)
+        writer._ensure_started = lambda: None
+        decimal_record = dict(make_record(1), new_values={"amount": Decimal("12.50")})
+        bad_record = dict(make_record(2), new_values={(1, 2): "tuple keys"})
+
+        # Neither value serializes, so the batch insert fails and is spilled
+        for record in (make_record(0), decimal_record, bad_record):
+            writer.submit(record)
+        assert writer.flush() == 0
+        stats = writer.get_stats()
+        assert (stats["spilled"], stats["quarantined"]) == (2, 1)
+
+        writer.submit(make_record(3))
+        writer.flush()
+
+        assert count_rows(session_factory) == 3
+        with session_factory() as session:
+            values = session.execute(
+                select(AuditLog.new_values).where(AuditLog.resource_id == 1)
+            ).scalar()
+        assert values == {"amount": "12.50"}
+        files = os.listdir(config.spill_dir)
+        assert len([name for name in files if name.startswith("quarantine")]) == 1
+
+    def test_background_flusher(self, session_factory, config):
+        writer = AuditLogWriter(session_factory=session_factory, config=config)
+
+        for i in range(4):
+            writer.submit(make_record(i))
+        writer.stop()
+
+        assert count_rows(session_factory) == 4
+
+    def test_failed_replay_resumes_from_offset(self, session_factory, config):
+        write_spill_file(config, os.getpid(), [make_record(i) for i in range(7)])
+        writer = AuditLogWriter(session_factory=session_factory, config=config)
+        write_batch = writer._write_batch
+        calls = {"n": 0}
+
+        def fail_second_batch(batch):
+            calls["n"] += 1
+            if calls["n"] == 2:
+                raise RuntimeError("database unavailable")
+            write_batch(batch)
+
+        writer._write_batch = fail_second_batch
+        assert writer._replay_spill() == 0
+        assert count_rows(session_factory) == 3
+
+        assert writer._replay_spill() == 4
+        assert count_rows(session_factory) == 7
+        with session_factory() as session:
+            assert sorted(session.execute(select(AuditLog.resource_id)).scalars()) == list(range(7))
+        assert os.listdir(config.spill_dir) == []
+        assert writer.get_stats()["replayed"] == 4
+
+    def test_only_files_of_exited_processes_are_adopted(self, session_factory, config):
+        live = write_spill_file(config, os.getppid(), [make_record(1)])
+        write_spill_file(config, dead_pid(), [make_record(2), make_record(3)])
+        writer = AuditLogWriter(session_factory=session_factory, config=config)
+
+        assert writer._replay_spill() == 2
+        assert count_rows(session_factory) == 2
+        assert os.listdir(config.spill_dir) == [os.path.basename(live)]
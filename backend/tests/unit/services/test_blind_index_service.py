@@ -0,0 +1,177 @@
+"""
+Unit Tests for Blind Index Service
+
+Tests encrypted courier identifiers:
+- Values are stored encrypted with digests maintained on insert and update
+- Equality lookups go through the blind index, and find legacy rows by their stored value
+- Updates only recompute digests of changed fields
+- CourierService.update writes the encrypted fields
+- Backfill encrypts legacy plaintext and rewrites digests after key rotation
+"""
+
+import pytest
+from sqlalchemy import text
+
+import app.core.encryption as encryption
+from app.core.encryption import BlindIndexer, looks_encrypted
+from app.models.fleet.courier import Courier
+from app.models.tenant.organization import Organization
+from app.schemas.fleet import CourierUpdate
+from app.services.blind_index_service import blind_index_service
+from app.services.fleet.courier import courier_service
+from app.services.fms.sync import FMSSyncService
+
+
+@pytest.fixture(autouse=True)
+def indexer(monkeypatch):
+    indexer = BlindIndexer([("v1", b"first-key")])
+    monkeypatch.setattr(encryption, "_default_blind_indexer", indexer)
+    return indexer
+
+
+@pytest.fixture
+def couriers(db):
+    org = Organization(name="Acme", slug="acme")
+    db.add(org)
+    db.commit()
+    couriers = [
+        Courier(
+            organization_id=org.id,
+            barq_id=f"BRQ-{n}",
+            full_name=f"Courier {n}",
+            mobile_number=f"05000000{n}",
+            iqama_number=f"212345678{n}",
+            iban=f"SA03 8000 0000 6080 1016 751{n}",
+        )
+        for n in range(3)
+    ]
+    db.add_all(couriers)
+    db.commit()
+    return couriers
+
+
+def store_plaintext(db, courier_id, iqama_number):
+    """Write a value the way rows looked before the column was encrypted"""
+    db.execute(
+        text("UPDATE couriers SET iqama_number = :value, iqama_number_bidx = NULL WHERE id = :id"),
+        {"value": iqama_number, "id": courier_id},
+    )
+    db.commit()
+
+
+def stored(db, courier_id, column):
+    return db.execute(
+        text(f"SELECT {column} FROM couriers WHERE id = :id"), {"id": courier_id}
+    ).scalar()
+
+
+def find(db, field, value):
+    return db.query(Courier).filter(Courier.blind_index_match(field, value)).all()
+
+
+class TestBlindIndexedColumns:
+    """Tests for encrypted columns with blind indexes"""
+
+    def test_values_are_encrypted_and_indexed(self, db, couriers):
+        courier = couriers[1]
+
+        assert looks_encrypted(stored(db, courier.id, "iqama_number"))
+        assert stored(db, courier.id, "iqama_number_bidx").startswith("v1$")
+        db.expire_all()
+        assert courier.iqama_number == "2123456781"
+
+        assert find(db, "iqama_number", "2123456781") == [courier]
+        assert find(db, "iban", "sa0380000000608010167511") == [courier]
+        assert find(db, "iqama_number", "0000000000") == []
+
+        courier.iqama_number = "2999999999"
+        courier.iban = None
+        db.commit()
+        assert find(db, "iqama_number", "2123456781") == []
+        assert find(db, "iqama_number", "2999999999") == [courier]
+        assert stored(db, courier.id, "iban_bidx") is None
+
+    def test_updates_only_hash_changed_fields(self, db, couriers, indexer, monkeypatch):
+        store_plaintext(db, couriers[0].id, "2123456780")
+        db.expire_all()
+        computed = []
+        compute = indexer.compute
+        monkeypatch.setattr(
+            indexer, "compute", lambda field, *args: computed.append(field) or compute(field, *args)
+        )
+
+        couriers[0].full_name = "Renamed"
+        couriers[1].iban = "SA44 2000 0001 2345 6789 1234"
+        db.commit()
+
+        assert computed == ["iban"]
+        assert stored(db, couriers[0].id, "iqama_number_bidx") is None
+        assert find(db, "iban", "sa4420000001234567891234") == [couriers[1]]
+        assert find(db, "iqama_number", "2123456781") == [couriers[1]]
+
+    def test_service_update_writes_encrypted_fields(self, db, couriers):
+        courier = couriers[0]
+
+        courier_service.update(
+            db,
+            db_obj=courier,
+            obj_in=CourierUpdate(iqama_number="2999999990", iban=None, full_name="Bob"),
+        )
+
+        db.expire_all()
+        assert (courier.full_name, courier.iqama_number, courier.iban) == (
+            "Bob", "2999999990", None
+        )
+        assert looks_encrypted(stored(db, courier.id, "iqama_number"))
+        assert find(db, "iqama_number", "2999999990") == [courier]
+        assert find(db, "iqama_number", "2123456780") == []
+        assert stored(db, courier.id, "iban_bidx") is None
+
+    def test_fms_match_by_iqama(self, db, couriers, monkeypatch):
+        monkeypatch.setattr("app.services.fms.sync.get_fms_client", lambda: None)
+        assert FMSSyncService(db).match_courier_by_iqama("2123456782") == couriers[2]
+        assert FMSSyncService(db).match_courier_by_iqama("") is None
+
+
+class TestBackfill:
+    """Tests for the backfill and key rotation"""
+
+    def test_legacy_plaintext_is_encrypted_and_indexed(self, db, couriers):
+        store_plaintext(db, couriers[0].id, "2123456780")
+        db.expire_all()
+        assert couriers[0].iqama_number == "2123456780"
+        # Found by its stored plaintext until the backfill indexes it
+        assert find(db, "iqama_number", "2123456780") == [couriers[0]]
+        assert blind_index_service.pending_count(db, Courier) == 1
+
+        result = blind_index_service.backfill(db, Courier, batch_size=2)
+
+        assert (result["updated"], result["remaining"], result["conflicts"]) == (1, 0, [])
+        assert looks_encrypted(stored(db, couriers[0].id, "iqama_number"))
+        assert find(db, "iqama_number", "2123456780") == [couriers[0]]
+
+    def test_key_rotation(self, db, couriers, monkeypatch):
+        rotated = BlindIndexer([("v2", b"second-key"), ("v1", b"first-key")])
+        monkeypatch.setattr(encryption, "_default_blind_indexer", rotated)
+
+        # Old digests still match while the rotation is pending
+        assert find(db, "iqama_number", "2123456781") == [couriers[1]]
+        assert blind_index_service.pending_count(db, Courier) == 3
+
+        results = blind_index_service.backfill_all(db, batch_size=2)
+
+        assert [(r["table"], r["updated"], r["remaining"]) for r in results] == [("couriers", 3, 0)]
+        assert stored(db, couriers[1].id, "iqama_number_bidx").startswith("v2$")
+
+        # Retiring the old key keeps every row findable
+        retired = BlindIndexer([("v2", b"second-key")])
+        monkeypatch.setattr(encryption, "_default_blind_indexer", retired)
+        assert find(db, "iqama_number", "2123456781") == [couriers[1]]
+
+    def test_duplicates_are_reported(self, db, couriers):
+        store_plaintext(db, couriers[0].id, "2123-456-781")
+
+        result = blind_index_service.backfill(db, Courier)
+
+        assert result["conflicts"] == [couriers[0].id]
+        assert result["remaining"] == 1
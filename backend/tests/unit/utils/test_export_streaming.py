@@ -0,0 +1,162 @@
+"""
+Unit Tests for Streaming Export Utilities
+
+Tests the keyset batch reader and the incremental encoders:
+- Keyset pagination over a SELECT
+- CSV / JSON / JSON Lines encoding per batch
+- Parquet row-group streaming
+- On-the-fly gzip
+"""
+
+import csv
+import gzip
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select
+from sqlalchemy.orm import Session
+
+from app.models.operations.delivery import DeliveryStatus
+from app.utils.export import (
+    clean_export_value,
+    column_python_types,
+    gzip_stream,
+    iter_keyset_batches,
+    stream_csv,
+    stream_json_array,
+    stream_jsonl,
+    stream_parquet,
+)
+
+
+COLUMNS = ["id", "name", "amount"]
+
+
+def make_batches():
+    return [
+        [{"id": 1, "name": "a", "amount": Decimal("1.50")}, {"id": 2, "name": "b,c", "amount": None}],
+        [{"id": 3, "name": "d", "amount": Decimal("3")}],
+    ]
+
+
+@pytest.fixture
+def items_session():
+    engine = create_engine("sqlite://")
+    metadata = MetaData()
+    items = Table(
+        "items", metadata, Column("id", Integer, primary_key=True), Column("name", String)
+    )
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(items.insert(), [{"id": i, "name": f"item-{i}"} for i in range(1, 26)])
+    with Session(engine) as session:
+        yield session, items
+
+
+class TestCleanExportValue:
+    """Tests for clean_export_value"""
+
+    def test_converts_special_types(self):
+        assert clean_export_value(None) == ""
+        assert clean_export_value(Decimal("2.5")) == 2.5
+        assert clean_export_value(date(2024, 1, 2)) == "2024-01-02"
+        assert clean_export_value(datetime(2024, 1, 2, 3, 4)) == "2024-01-02T03:04:00"
+        assert clean_export_value(DeliveryStatus.DELIVERED) == "delivered"
+
+
+class TestIterKeysetBatches:
+    """Tests for iter_keyset_batches"""
+
+    def test_reads_all_rows_in_order(self, items_session):
+        session, items = items_session
+        batches = list(iter_keyset_batches(session, select(items.c.id, items.c.name), items.c.id, 10))
+
+        assert [len(b) for b in batches] == [10, 10, 5]
+        assert [row["id"] for batch in batches for row in batch] == list(range(1, 26))
+
+    def test_respects_filters(self, items_session):
+        session, items = items_session
+        stmt = select(items.c.id, items.c.name).where(items.c.id > 20)
+        batches = list(iter_keyset_batches(session, stmt, items.c.id, 2))
+
+        assert [row["id"] for batch in batches for row in batch] == [21, 22, 23, 24, 25]
+
+    def test_empty_result(self, items_session):
+        session, items = items_session
+        stmt = select(items.c.id).where(items.c.id > 100)
+        assert list(iter_keyset_batches(session, stmt, items.c.id, 10)) == []
+
+    def test_release_connection_between_batches(self, items_session):
+        session, items = items_session
+        stmt = select(items.c.id)
+
+        seen = []
+        for batch in iter_keyset_batches(session, stmt, items.c.id, 10, release_connection=True):
+            seen.extend(row["id"] for row in batch)
+            assert not session.in_transaction()
+
+        assert seen == list(range(1, 26))
+
+
+class TestEncoders:
+    """Tests for the streaming encoders"""
+
+    def test_csv_yields_header_then_one_chunk_per_batch(self):
+        chunks = list(stream_csv(make_batches(), COLUMNS))
+
+        assert len(chunks) == 3
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+        assert rows == [COLUMNS, ["1", "a", "1.5"], ["2", "b,c", ""], ["3", "d", "3.0"]]
+
+    def test_jsonl(self):
+        lines = b"".join(stream_jsonl(make_batches(), COLUMNS)).decode().splitlines()
+
+        assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+
+    def test_json_array(self):
+        document = json.loads(b"".join(stream_json_array(make_batches(), COLUMNS)))
+
+        assert [row["name"] for row in document["data"]] == ["a", "b,c", "d"]
+
+    def test_json_array_empty(self):
+        assert json.loads(b"".join(stream_json_array([], COLUMNS))) == {"data": []}
+
+    def test_parquet_round_trip(self):
+        pq = pytest.importorskip("pyarrow.parquet")
+
+        table = pq.read_table(io.BytesIO(b"".join(stream_parquet(make_batches(), COLUMNS))))
+
+        assert table.num_rows == 3
+        assert table.column("id").to_pylist() == [1, 2, 3]
+        assert table.column("amount").to_pylist() == [1.5, None, 3.0]
+
+    def test_parquet_schema_from_column_types(self, items_session):
+        pq = pytest.importorskip("pyarrow.parquet")
+        session, items = items_session
+        batches = [
+            [{"id": 1, "name": None}, {"id": 2, "name": None}],
+            [{"id": 3, "name": "late"}],
+        ]
+        types = column_python_types(select(items.c.id, items.c.name))
+
+        table = pq.read_table(io.BytesIO(b"".join(stream_parquet(batches, ["id", "name"], types))))
+
+        assert str(table.schema.field("name").type) == "string"
+        assert table.column("name").to_pylist() == [None, None, "late"]
+
+    def test_parquet_untyped_column_empty_in_first_batch(self):
+        pq = pytest.importorskip("pyarrow.parquet")
+        batches = [[{"id": 1, "note": None}], [{"id": 2, "note": 7}]]
+
+        table = pq.read_table(io.BytesIO(b"".join(stream_parquet(batches, ["id", "note"]))))
+
+        assert table.column("note").to_pylist() == [None, "7"]
+
+    def test_gzip_stream_round_trip(self):
+        raw = b"".join(stream_csv(make_batches(), COLUMNS))
+        compressed = b"".join(gzip_stream(stream_csv(make_batches(), COLUMNS)))
+
+        assert gzip.decompress(compressed) == raw